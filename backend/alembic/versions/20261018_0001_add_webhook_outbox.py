@@ -0,0 +1,70 @@
+"""Add webhook_endpoints and webhook_outbox tables
+
+Revision ID: 20261018_0001
+Revises: 20260130_0010
+Create Date: 2026-10-18
+
+Durable outbox for asynchronous, batched webhook delivery.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20261018_0001"
+down_revision = "20260130_0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_endpoints",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("organization_id", sa.Integer(), sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("secret", sa.String(255), nullable=False),
+        sa.Column("events", postgresql.JSONB(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("max_concurrency", sa.Integer(), nullable=False, server_default="4"),
+        sa.Column("max_batch_size", sa.Integer(), nullable=False, server_default="50"),
+        sa.Column("consecutive_failures", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_success_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_failure_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_webhook_endpoints_organization_id", "webhook_endpoints", ["organization_id"])
+    op.create_index("ix_webhook_endpoints_is_active", "webhook_endpoints", ["is_active"])
+
+    op.create_table(
+        "webhook_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("endpoint_id", sa.Integer(), sa.ForeignKey("webhook_endpoints.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("organization_id", sa.Integer(), sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("last_status_code", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("delivered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_webhook_outbox_endpoint_id", "webhook_outbox", ["endpoint_id"])
+    op.create_index("ix_webhook_outbox_organization_id", "webhook_outbox", ["organization_id"])
+    op.create_index("ix_webhook_outbox_status_next_attempt", "webhook_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_outbox_status_next_attempt", table_name="webhook_outbox")
+    op.drop_index("ix_webhook_outbox_organization_id", table_name="webhook_outbox")
+    op.drop_index("ix_webhook_outbox_endpoint_id", table_name="webhook_outbox")
+    op.drop_table("webhook_outbox")
+    op.drop_index("ix_webhook_endpoints_is_active", table_name="webhook_endpoints")
+    op.drop_index("ix_webhook_endpoints_organization_id", table_name="webhook_endpoints")
+    op.drop_table("webhook_endpoints")
@@ -0,0 +1,56 @@
+"""Add committee_alerts.dedup_key with a partial unique index on open alerts
+
+Revision ID: 20261018_0002
+Revises: 20261018_0001
+Create Date: 2026-10-18
+
+Replaces the per-alert jsonb_extract_path_text(metadata, ...) lookup in alert
+deduplication with an indexed column, and lets batched inserts use
+INSERT ... ON CONFLICT (dedup_key) WHERE status IN ('ACTIVE', 'ACKNOWLEDGED').
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0002"
+down_revision = "20261018_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("committee_alerts", sa.Column("dedup_key", sa.String(64), nullable=True))
+
+    # Backfill from metadata for open alerts; only the newest alert per key keeps it
+    # so the unique index can be created over existing duplicates.
+    op.execute(
+        """
+        UPDATE committee_alerts AS ca
+        SET dedup_key = ranked.dedup_key
+        FROM (
+            SELECT id,
+                   metadata ->> 'dedup_key' AS dedup_key,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY metadata ->> 'dedup_key'
+                       ORDER BY created_at DESC, id DESC
+                   ) AS rn
+            FROM committee_alerts
+            WHERE metadata ->> 'dedup_key' IS NOT NULL
+              AND status IN ('ACTIVE', 'ACKNOWLEDGED')
+        ) AS ranked
+        WHERE ca.id = ranked.id AND ranked.rn = 1
+        """
+    )
+
+    op.create_index(
+        "uq_committee_alerts_dedup_key_open",
+        "committee_alerts",
+        ["dedup_key"],
+        unique=True,
+        postgresql_where=sa.text("status IN ('ACTIVE', 'ACKNOWLEDGED')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_committee_alerts_dedup_key_open", table_name="committee_alerts")
+    op.drop_column("committee_alerts", "dedup_key")
@@ -0,0 +1,33 @@
+"""Add extraction_logs.stage_timings for per-stage extraction timing breakdowns
+
+Revision ID: 20261018_0003
+Revises: 20261018_0002
+Create Date: 2026-10-18
+
+Compact JSON written by ExtractionOrchestrator at the end of each extraction:
+{"document_type", "total_ms", "stages": {stage: ms}, "failed": [...]}.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0003"
+down_revision = "20261018_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("extraction_logs", sa.Column("stage_timings", sa.JSON(), nullable=True))
+    # Percentile queries scan recent traced extractions only
+    op.create_index(
+        "ix_extraction_logs_created_at_timed",
+        "extraction_logs",
+        ["created_at"],
+        postgresql_where=sa.text("stage_timings IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extraction_logs_created_at_timed", table_name="extraction_logs")
+    op.drop_column("extraction_logs", "stage_timings")
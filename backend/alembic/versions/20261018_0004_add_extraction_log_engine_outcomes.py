@@ -0,0 +1,33 @@
+"""Add extraction_logs.template_fingerprint / engine_outcomes for adaptive engine selection
+
+Revision ID: 20261018_0004
+Revises: 20261018_0003
+Create Date: 2026-10-18
+
+EngineScheduler derives per-(property, document type, template) engine win
+rates from these columns and skips engines a proven engine makes redundant.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0004"
+down_revision = "20261018_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("extraction_logs", sa.Column("template_fingerprint", sa.String(length=32), nullable=True))
+    op.add_column("extraction_logs", sa.Column("engine_outcomes", sa.JSON(), nullable=True))
+    op.create_index(
+        "ix_extraction_logs_template_fingerprint",
+        "extraction_logs",
+        ["template_fingerprint"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_extraction_logs_template_fingerprint", table_name="extraction_logs")
+    op.drop_column("extraction_logs", "engine_outcomes")
+    op.drop_column("extraction_logs", "template_fingerprint")
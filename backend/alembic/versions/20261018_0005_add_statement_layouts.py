@@ -0,0 +1,43 @@
+"""Add statement_layouts for reusing statement column layouts across periods
+
+Revision ID: 20261018_0005
+Revises: 20261018_0004
+Create Date: 2026-10-18
+
+One row per (property, document type, layout fingerprint). FinancialTableParser
+slices known layouts directly instead of running table detection.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0005"
+down_revision = "20261018_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "statement_layouts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("property_id", sa.Integer(), sa.ForeignKey("properties.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("document_type", sa.String(length=50), nullable=False),
+        sa.Column("fingerprint", sa.String(length=32), nullable=False),
+        sa.Column("layout", sa.JSON(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint(
+            "property_id", "document_type", "fingerprint",
+            name="uq_statement_layouts_property_type_fingerprint"
+        ),
+    )
+    op.create_index("ix_statement_layouts_id", "statement_layouts", ["id"])
+    op.create_index("ix_statement_layouts_property_id", "statement_layouts", ["property_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_statement_layouts_property_id", table_name="statement_layouts")
+    op.drop_index("ix_statement_layouts_id", table_name="statement_layouts")
+    op.drop_table("statement_layouts")
@@ -0,0 +1,62 @@
+"""Add quota_reservations and reserved counters on organizations
+
+Revision ID: 20261018_0006
+Revises: 20261018_0005
+Create Date: 2026-10-18
+
+Uploads reserve document/storage quota with one conditional UPDATE on the
+organization row; the reservation is confirmed or released when the upload
+finishes, and expired if abandoned.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0006"
+down_revision = "20261018_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "organizations",
+        sa.Column("documents_reserved", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "organizations",
+        sa.Column("storage_reserved_bytes", sa.BigInteger(), nullable=False, server_default="0")
+    )
+
+    op.create_table(
+        "quota_reservations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "organization_id", sa.Integer(),
+            sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("documents", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column(
+            "upload_id", sa.Integer(),
+            sa.ForeignKey("document_uploads.id", ondelete="SET NULL"), nullable=True
+        ),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("resolved_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_quota_reservations_id", "quota_reservations", ["id"])
+    op.create_index("ix_quota_reservations_organization_id", "quota_reservations", ["organization_id"])
+    op.create_index(
+        "ix_quota_reservations_status_expires_at", "quota_reservations", ["status", "expires_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_quota_reservations_status_expires_at", table_name="quota_reservations")
+    op.drop_index("ix_quota_reservations_organization_id", table_name="quota_reservations")
+    op.drop_index("ix_quota_reservations_id", table_name="quota_reservations")
+    op.drop_table("quota_reservations")
+    op.drop_column("organizations", "storage_reserved_bytes")
+    op.drop_column("organizations", "documents_reserved")
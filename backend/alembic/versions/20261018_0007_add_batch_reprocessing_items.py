@@ -0,0 +1,43 @@
+"""Add batch_reprocessing_items (per-document reprocessing checkpoints)
+
+Revision ID: 20261018_0007
+Revises: 20261018_0006
+Create Date: 2026-10-18
+
+Batch reprocessing fans out into parallel chunk tasks; each document's outcome
+is checkpointed here so restarted or resumed jobs skip finished work.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0007"
+down_revision = "20261018_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "batch_reprocessing_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "job_id", sa.Integer(),
+            sa.ForeignKey("batch_reprocessing_jobs.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column(
+            "document_id", sa.Integer(),
+            sa.ForeignKey("document_uploads.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("error_type", sa.String(length=20), nullable=True),
+        sa.Column("reason", sa.Text(), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("job_id", "document_id", name="uq_batch_reprocessing_items_job_document"),
+    )
+    op.create_index("ix_batch_reprocessing_items_id", "batch_reprocessing_items", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_batch_reprocessing_items_id", table_name="batch_reprocessing_items")
+    op.drop_table("batch_reprocessing_items")
@@ -0,0 +1,30 @@
+"""Add cross_property_benchmarks.distribution
+
+Revision ID: 20261018_0008
+Revises: 20261018_0007
+Create Date: 2026-10-18
+
+The benchmark cube stores each cell's sorted (property_id, value) pairs so
+percentile ranks, rankings and outliers are read from the cell instead of
+rescanning statement data.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20261018_0008"
+down_revision = "20261018_0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "cross_property_benchmarks",
+        sa.Column("distribution", postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("cross_property_benchmarks", "distribution")
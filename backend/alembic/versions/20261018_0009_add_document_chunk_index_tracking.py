@@ -0,0 +1,29 @@
+"""Add document_chunks content_hash and vector_synced_at
+
+Revision ID: 20261018_0009
+Revises: 20261018_0008
+Create Date: 2026-10-18
+
+Incremental indexing re-chunks only documents whose text hash changed, and
+vector reconciliation compares only chunks changed since its last watermark.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261018_0009"
+down_revision = "20261018_0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("document_chunks", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.add_column("document_chunks", sa.Column("vector_synced_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("idx_chunk_updated_at", "document_chunks", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_chunk_updated_at", table_name="document_chunks")
+    op.drop_column("document_chunks", "vector_synced_at")
+    op.drop_column("document_chunks", "content_hash")
@@ -259,11 +259,11 @@ def refresh_all_orgs_usage_endpoint(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_superuser),
 ):
-    """Recalculate documents_used and storage_used_bytes for ALL orgs. Superuser only. Use after enabling quotas."""
+    """Reconcile usage and reserved quota counters for ALL orgs (also runs every 15 min). Superuser only."""
     from app.services.quota_service import refresh_all_orgs_usage
     count = refresh_all_orgs_usage(db)
     db.commit()
-    return {"message": f"Refreshed usage for {count} organizations", "orgs_updated": count}
+    return {"message": f"Reconciled usage; {count} organizations changed", "orgs_updated": count}
 
 
 @router.post("/admin/tenants/{org_id}/refresh-usage")
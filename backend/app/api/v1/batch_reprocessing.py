@@ -96,13 +96,15 @@ async def create_batch_job(
 
 
 def _job_belongs_to_org(db, job_id: int, org_id: int) -> bool:
-    """Verify batch job's properties belong to org. Returns True if accessible."""
+    """Verify batch job belongs to org (by organization_id, else by its properties). Returns True if accessible."""
     from app.models.batch_reprocessing_job import BatchReprocessingJob
     job = db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
     if not job:
         return False
+    if job.organization_id is not None:
+        return job.organization_id == org_id
     if not job.property_ids:
-        return True  # Job has no property filter; legacy jobs - allow (initiated_by filters by user)
+        return False  # Legacy job without org or property filter spans every tenant
     return all(get_property_for_org(db, org_id, pid) for pid in job.property_ids)
 
 
@@ -178,6 +180,41 @@ async def cancel_job(
         )
 
 
+@router.post("/jobs/{job_id}/resume", status_code=status.HTTP_200_OK)
+async def resume_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """
+    Resume a failed or stalled batch reprocessing job.
+    
+    Documents the job already processed are skipped; only the remainder is reprocessed.
+    Export and backfill jobs, and running jobs that are still making progress, are rejected.
+    """
+    if not _job_belongs_to_org(db, job_id, current_org.id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        service = BatchReprocessingService(db)
+        job_info = service.resume_batch_job(job_id)
+        from app.services.audit_service import log_action
+        log_action(db, "batch_job.resumed", current_user.id, current_org.id, "batch_reprocessing_job", str(job_id), f"Resumed job {job_id}")
+        return {"status": job_info["status"], "job_id": job_id, "task_id": job_info["task_id"], "message": "Job resumed successfully"}
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error resuming job: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume job: {str(e)}"
+        )
+
+
 @router.get("/jobs", response_model=List[BatchJobListItem])
 async def list_jobs(
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
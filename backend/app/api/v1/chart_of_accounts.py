@@ -6,6 +6,7 @@ from app.db.database import get_db
 from app.api.dependencies import get_current_user, get_current_organization, require_org_role
 from app.models.organization import Organization
 from app.models.chart_of_accounts import ChartOfAccounts
+from app.services.reference_data_cache import CHART_OF_ACCOUNTS, mark_reference_data_changed
 from app.schemas.chart_of_accounts import (
     ChartOfAccountsResponse,
     ChartOfAccountsListResponse,
@@ -212,6 +213,7 @@ async def create_account(
     db.add(db_account)
     from app.services.audit_service import log_action
     log_action(db, "chart_of_accounts.created", current_user.id, current_org.id, "chart_of_accounts", account_data.account_code, f"Created account {account_data.account_code}")
+    mark_reference_data_changed(db, CHART_OF_ACCOUNTS)
     db.commit()
     db.refresh(db_account)
     
@@ -244,6 +246,7 @@ async def update_account(
         setattr(account, field, value)
     from app.services.audit_service import log_action
     log_action(db, "chart_of_accounts.updated", current_user.id, current_org.id, "chart_of_accounts", account_code, f"Updated account {account_code}")
+    mark_reference_data_changed(db, CHART_OF_ACCOUNTS)
     db.commit()
     db.refresh(account)
     
@@ -272,6 +275,7 @@ async def delete_account(
     from app.services.audit_service import log_action
     log_action(db, "chart_of_accounts.deleted", current_user.id, current_org.id, "chart_of_accounts", account_code, f"Deleted account {account_code}")
     db.delete(account)
+    mark_reference_data_changed(db, CHART_OF_ACCOUNTS)
     db.commit()
     
     return None
@@ -15,6 +15,7 @@ from app.models.user import User
 from app.models.organization import Organization
 from app.services.document_service import DocumentService
 from app.services.pdf_generator_service import PDFGeneratorService
+from app.services.pdf_highlight_service import delete_annotated_variants
 from app.tasks.extraction_tasks import extract_document
 from fastapi.responses import StreamingResponse
 from app.models.document_upload import DocumentUpload
@@ -80,6 +81,7 @@ async def upload_document(
     document_type: DocumentTypeEnum = Form(..., description="Type of financial document"),
     file: UploadFile = File(..., description="PDF file to upload"),
     force_overwrite: bool = Form(False, description="Force overwrite if file exists"),
+    defer_validation: bool = Form(False, description="Accept immediately and validate in the background"),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_org_role("editor")),
     current_org: Organization = Depends(get_current_organization),
@@ -103,6 +105,12 @@ async def upload_document(
     - Old file removed from MinIO
     - New file uploaded and extracted
     - Prevents failed uploads from blocking new attempts
+
+    **Deferred validation (defer_validation=true):**
+    - File is streamed to MinIO and recorded with extraction_status "validating"
+    - Property/type/year detection and page-count checks run as a Celery pre-stage
+    - Mismatches are reported as extraction_status "validation_failed" on
+      /ws/extraction-status/{upload_id}; otherwise extraction is queued
     
     **Returns:**
     - upload_id: Unique identifier for tracking
@@ -172,35 +180,47 @@ async def upload_document(
         )
 
     # E3-S4: Validate page count (max 500 pages to prevent DoS)
+    # Deferred uploads check it in the validation pre-stage instead of reading the body here
     MAX_PAGE_COUNT = 500
-    try:
-        from pypdf import PdfReader
-        import io
-        content = file.file.read()
-        file.file.seek(0)
-        reader = PdfReader(io.BytesIO(content))
-        page_count = len(reader.pages)
-        if page_count > MAX_PAGE_COUNT:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"PDF exceeds maximum page count ({MAX_PAGE_COUNT} pages). This file has {page_count} pages."
-            )
-    except HTTPException:
-        raise
-    except Exception as e:
-        # If we cannot read page count, log but allow upload (e.g. corrupted PDF might still be processable)
-        import logging
-        logging.getLogger(__name__).warning(f"Could not validate PDF page count: {e}")
+    if not defer_validation:
+        try:
+            from pypdf import PdfReader
+            import io
+            content = file.file.read()
+            file.file.seek(0)
+            reader = PdfReader(io.BytesIO(content))
+            page_count = len(reader.pages)
+            if page_count > MAX_PAGE_COUNT:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"PDF exceeds maximum page count ({MAX_PAGE_COUNT} pages). This file has {page_count} pages."
+                )
+        except HTTPException:
+            raise
+        except Exception as e:
+            # If we cannot read page count, log but allow upload (e.g. corrupted PDF might still be processable)
+            import logging
+            logging.getLogger(__name__).warning(f"Could not validate PDF page count: {e}")
 
-    # P2: Check quota before upload
-    from app.services.quota_service import check_document_quota, check_storage_quota
-    allowed, err = check_document_quota(db, current_org.id)
-    if not allowed:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=err)
-    allowed, err = check_storage_quota(db, current_org.id, file_size)
-    if not allowed:
+    # P2: Reserve quota before upload; released again unless a new document is stored
+    from app.services.quota_service import reserve_quota, confirm_reservation, release_reservation
+    reservation, err = reserve_quota(db, current_org.id, documents=1, bytes_requested=file_size)
+    if reservation is None:
+        db.rollback()
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=err)
-    
+    reservation_id = reservation.id
+    db.commit()
+
+    def release_quota():
+        try:
+            db.rollback()
+            release_reservation(db, reservation_id)
+            db.commit()
+        except Exception as e:
+            import logging
+            # Left pending; the reconciliation task expires it
+            logging.getLogger(__name__).warning(f"Failed to release quota reservation {reservation_id}: {e}")
+
     try:
         # Create document service
         doc_service = DocumentService(db, organization_id=current_org.id)
@@ -213,7 +233,8 @@ async def upload_document(
             document_type=document_type.value,
             file=file,
             uploaded_by=None,  # TODO: Get from auth context
-            force_overwrite=force_overwrite
+            force_overwrite=force_overwrite,
+            defer_validation=defer_validation
         )
         
         # Check for property mismatch
@@ -278,6 +299,7 @@ async def upload_document(
         
         # Check if file already exists (and not forcing overwrite)
         if result.get("file_exists"):
+            release_quota()
             return DocumentUploadResponse(
                 upload_id=None,
                 task_id=None,
@@ -290,6 +312,7 @@ async def upload_document(
         
         # Check if duplicate (by hash) - no quota increment
         if result.get("is_duplicate"):
+            release_quota()
             return DocumentUploadResponse(
                 upload_id=result["upload_id"],
                 task_id="N/A",
@@ -299,10 +322,15 @@ async def upload_document(
             )
         
         # Trigger Celery extraction task with error handling
+        # (deferred uploads are queued by the validation pre-stage once they pass)
         try:
-            task = extract_document.delay(result["upload_id"])
-            task_id = task.id
-            extraction_status = "pending"
+            if result.get("deferred"):
+                task_id = result.get("task_id")
+                extraction_status = result["extraction_status"]
+            else:
+                task = extract_document.delay(result["upload_id"])
+                task_id = task.id
+                extraction_status = "pending"
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -311,11 +339,9 @@ async def upload_document(
             task_id = None
             extraction_status = "pending"  # Background task will pick it up
 
-        # P2: Increment quota counters and audit log
-        from app.services.quota_service import increment_document_count, increment_storage
+        # P2: Count the reserved quota as used and audit log
         from app.services.audit_service import log_action
-        increment_document_count(db, current_org.id)
-        increment_storage(db, current_org.id, file_size)
+        confirm_reservation(db, reservation_id, upload_id=result["upload_id"])
         log_action(
             db, "document.uploaded",
             user_id=current_user.id,
@@ -336,8 +362,10 @@ async def upload_document(
         )
     
     except HTTPException:
+        release_quota()
         raise
     except Exception as e:
+        release_quota()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Upload failed: {str(e)}"
@@ -1347,6 +1375,7 @@ async def delete_all_upload_history(
                 if upload.file_path:
                     try:
                         delete_file(upload.file_path)
+                        delete_annotated_variants(upload.file_path, upload.id)
                     except Exception as e:
                         # Log error but continue deletion
                         logger.warning(f"Failed to delete file from MinIO: {upload.file_path}, error: {str(e)}")
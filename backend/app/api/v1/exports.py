@@ -1,12 +1,21 @@
 """
 Export API Endpoints
 
-Provides endpoints for exporting financial data to Excel and CSV formats
+Provides endpoints for exporting financial data to Excel and CSV formats,
+plus streaming multi-property exports (CSV/XLSX/Parquet) and background export jobs
 """
+import tempfile
+from datetime import date
+from typing import List, Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
-from app.db.database import get_db
+from app.db.database import get_db, SessionLocal
 from app.services.export_service import ExportService
+from app.services.export_job_service import ExportJobService
+from app.services.streaming_export_service import CONTENT_TYPES, StreamingExportService
 from app.api.dependencies import get_current_user, get_current_organization
 from app.models.user import User
 
@@ -106,3 +115,170 @@ async def export_to_csv(
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+
+
+# ============================================================================
+# PORTFOLIO (MULTI-PROPERTY) STREAMING EXPORTS
+# ============================================================================
+
+class PortfolioExportRequest(BaseModel):
+    """Background portfolio export request"""
+    export_format: str = Field("xlsx", description="csv, xlsx or parquet")
+    statement_types: List[str] = Field(..., min_length=1)
+    property_ids: Optional[List[int]] = None
+    date_range_start: Optional[date] = None
+    date_range_end: Optional[date] = None
+    job_name: Optional[str] = None
+
+
+def _stream_export_file(
+    export_format: str,
+    statement_types: List[str],
+    organization_id: int,
+    property_ids: Optional[List[int]],
+    date_range_start: Optional[date],
+    date_range_end: Optional[date],
+    chunk_size: int = 1024 * 1024
+):
+    """
+    Yield export bytes using a dedicated session so the server-side cursor
+    lives exactly as long as the response body.
+    """
+    db = SessionLocal()
+    try:
+        service = StreamingExportService(db)
+        filters = dict(
+            organization_id=organization_id,
+            property_ids=property_ids,
+            date_range_start=date_range_start,
+            date_range_end=date_range_end,
+        )
+        if export_format == "csv":
+            yield from service.stream_csv(statement_types[0], **filters)
+            return
+
+        # XLSX and Parquet need a seekable container; spool to disk past 32MB
+        with tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024) as spool:
+            service.write_export(spool, export_format, statement_types, **filters)
+            spool.seek(0)
+            while True:
+                chunk = spool.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        db.close()
+
+
+@router.get("/portfolio/stream")
+def stream_portfolio_export(
+    export_format: str = Query("csv", description="csv, xlsx or parquet"),
+    statement_types: List[str] = Query(..., description="balance_sheet, income_statement, cash_flow, rent_roll, mortgage_statement"),
+    property_ids: Optional[List[int]] = Query(None, description="Limit to these properties (default: all)"),
+    date_range_start: Optional[date] = Query(None, description="First period (inclusive, month granularity)"),
+    date_range_end: Optional[date] = Query(None, description="Last period (inclusive, month granularity)"),
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
+):
+    """
+    Stream a multi-property, multi-period export.
+
+    CSV is streamed row-batch by row-batch from a server-side cursor and holds a
+    single statement type. XLSX (one sheet per statement type) and Parquet are
+    written in write-only/row-group mode and streamed once complete. For very
+    large exports prefer the background job endpoints below.
+    """
+    try:
+        StreamingExportService.validate_request(statement_types, export_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if export_format in ("csv", "parquet") and len(statement_types) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{export_format.upper()} exports contain one statement type; use xlsx or a background job for several"
+        )
+
+    label = statement_types[0] if len(statement_types) == 1 else "portfolio"
+    filename = f"{current_org.id}_{label}_export.{export_format}"
+
+    return StreamingResponse(
+        _stream_export_file(
+            export_format, statement_types, current_org.id,
+            property_ids, date_range_start, date_range_end
+        ),
+        media_type=CONTENT_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.post("/portfolio/jobs")
+async def create_portfolio_export_job(
+    request: PortfolioExportRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
+):
+    """
+    Queue a background portfolio export.
+
+    The file(s) are streamed to MinIO by a Celery worker; poll the job for
+    progress and fetch download URLs once completed.
+    """
+    service = ExportJobService(db)
+    try:
+        job = service.create_job(
+            user_id=current_user.id,
+            organization_id=current_org.id,
+            export_format=request.export_format,
+            statement_types=request.statement_types,
+            property_ids=request.property_ids,
+            date_range_start=request.date_range_start,
+            date_range_end=request.date_range_end,
+            job_name=request.job_name,
+        )
+        return service.start_job(job.id, organization_id=current_org.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/portfolio/jobs/{job_id}")
+async def get_portfolio_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
+):
+    """Get background export progress (rows written / total rows)"""
+    try:
+        return ExportJobService(db).get_job_status(job_id, organization_id=current_org.id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/portfolio/jobs/{job_id}/download")
+async def get_portfolio_export_download(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
+):
+    """Presigned download URLs for a completed export"""
+    try:
+        return {"job_id": job_id, "files": ExportJobService(db).get_download_urls(job_id, organization_id=current_org.id)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/portfolio/jobs/{job_id}/cancel")
+async def cancel_portfolio_export_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
+):
+    """Cancel a queued or running export"""
+    try:
+        ExportJobService(db).cancel_job(job_id, organization_id=current_org.id)
+        return {"job_id": job_id, "status": "cancelled"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -429,6 +429,38 @@ async def get_extraction_stats(
         )
 
 
+@router.get("/extract/stage-timings")
+async def get_extraction_stage_timings(
+    document_type: Optional[str] = Query(None, description="Financial document type, e.g. balance_sheet"),
+    days: int = Query(30, ge=1, le=365, description="Look-back window in days"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_hybrid),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """
+    Per-stage extraction latency (p50/p95/mean ms) by document type
+    
+    Aggregates the stage breakdowns recorded on extraction logs, so
+    optimization work can target the slowest stages
+    """
+    try:
+        from app.services.extraction_timing_service import ExtractionTimingService
+        
+        stages = ExtractionTimingService(db).stage_percentiles(document_type=document_type, days=days)
+        return {
+            "success": True,
+            "days": days,
+            "document_type": document_type,
+            "stages": stages
+        }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting stage timings: {str(e)}"
+        )
+
+
 class ModelScoreResult(BaseModel):
     """Individual model extraction result with score"""
     model: str
@@ -15,6 +15,7 @@ from app.models.organization import Organization
 from app.core.redis_client import cache_get, cache_set, invalidate_portfolio_cache
 from app.db.minio_client import get_file_url
 from app.services.metrics_service import MetricsService
+from app.services.bulk_metrics_service import BulkMetricsService
 from app.services.dscr_monitoring_service import DSCRMonitoringService
 from app.models.financial_metrics import FinancialMetrics
 from app.models.property import Property
@@ -197,6 +198,20 @@ class MetricsRecalculateResponse(BaseModel):
     metrics_calculated: int
 
 
+class BulkMetricsRecalculateRequest(BaseModel):
+    """Properties (and optionally one year) to recalculate; all of the organization's if omitted"""
+    property_codes: Optional[List[str]] = None
+    year: Optional[int] = None
+
+
+class BulkMetricsRecalculateResponse(BaseModel):
+    """Response after a bulk metrics recalculation"""
+    success: bool
+    message: str
+    properties: int
+    periods_recalculated: int
+
+
 class MetricsSummaryItem(BaseModel):
     """Summary metrics for dashboard"""
     property_code: str
@@ -480,6 +495,58 @@ async def recalculate_metrics(
         )
 
 
+@router.post("/metrics/recalculate", response_model=BulkMetricsRecalculateResponse)
+async def recalculate_metrics_bulk(
+    request: BulkMetricsRecalculateRequest,
+    db: Session = Depends(get_db),
+    current_org: Organization = Depends(get_current_organization)
+):
+    """
+    Recalculate metrics for many property-periods at once
+
+    Uses the set-based BulkMetricsService (grouped queries and one upsert per
+    chunk) instead of one calculate_all_metrics call per period. Useful after
+    bulk imports or formula changes.
+    """
+    try:
+        query = db.query(Property.id).filter(Property.organization_id == current_org.id)
+        if request.property_codes:
+            query = query.filter(Property.property_code.in_(request.property_codes))
+        property_ids = [property_id for (property_id,) in query.all()]
+
+        if request.property_codes and len(property_ids) < len(set(request.property_codes)):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="One or more properties not found"
+            )
+
+        periods = db.query(FinancialPeriod.property_id, FinancialPeriod.id).filter(
+            FinancialPeriod.property_id.in_(property_ids)
+        )
+        if request.year is not None:
+            periods = periods.filter(FinancialPeriod.period_year == request.year)
+
+        written = BulkMetricsService(db).calculate(periods.all()) if property_ids else 0
+
+        invalidate_portfolio_cache()
+        logger.info(f"Bulk recalculated {written} metrics rows for organization {current_org.id}")
+
+        return BulkMetricsRecalculateResponse(
+            success=True,
+            message="Metrics recalculated successfully (cache invalidated)",
+            properties=len(property_ids),
+            periods_recalculated=written
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to recalculate metrics: {str(e)}"
+        )
+
+
 @router.get("/metrics/summary", response_model=List[MetricsSummaryItem])
 async def get_metrics_summary(
     skip: int = Query(0, ge=0),
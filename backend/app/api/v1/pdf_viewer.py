@@ -1,20 +1,23 @@
 """
 PDF Viewer API - Endpoints for PDF viewing with highlighting support
 """
-from fastapi import APIRouter, HTTPException, status, Query, Path, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, status, Query, Path, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from pydantic import BaseModel
-import io
+import logging
 
 from app.db.database import get_db
-from app.db.minio_client import get_file_url, download_file
+from app.db.minio_client import get_file_info, stream_file_range
 from app.api.dependencies import get_current_user_hybrid, get_current_organization
 from app.models.user import User
 from app.models.organization import Organization
 from app.repositories.tenant_scoped import get_upload_for_org
+from app.services.pdf_highlight_service import get_annotated_variant, highlight_overlay
+from app.utils.http_range import RangeNotSatisfiable, etag_matches, parse_range, quote_etag
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -26,11 +29,13 @@ class PDFViewerResponse(BaseModel):
     pdf_url: str
     page_number: Optional[int] = None
     highlight_coords: Optional[dict] = None
+    overlay: Optional[dict] = None
     has_highlight: bool = False
 
 
 @router.get("/pdf-viewer/{upload_id}/stream")
 async def stream_pdf(
+    request: Request,
     upload_id: int = Path(..., description="Document upload ID"),
     page: Optional[int] = Query(None, description="Page number to highlight (1-indexed)"),
     x0: Optional[float] = Query(None, description="X0 coordinate for highlight"),
@@ -44,8 +49,13 @@ async def stream_pdf(
     """
     Stream PDF file directly through backend to avoid CORS issues
     
-    Optionally adds a red circle annotation at specified coordinates.
+    Supports HTTP range requests (served from ranged MinIO reads, so the PDF is
+    never held in memory) and ETag revalidation (If-None-Match / If-Range).
+    
+    Optionally serves a copy with a red circle annotation at specified coordinates.
     This works even in iframe viewers since the annotation is embedded in the PDF.
+    Annotated copies are generated once per upload and bbox and cached in storage;
+    viewers that can draw overlays should use the `overlay` from GET /pdf-viewer/{upload_id}.
     
     Query params (all optional):
     - page: Page number (1-indexed)
@@ -59,80 +69,64 @@ async def stream_pdf(
                 detail=f"Document upload {upload_id} not found"
             )
 
-        # Download PDF from MinIO
-        try:
-            pdf_data = download_file(upload.file_path)
-        except Exception as e:
-            print(f"Error downloading PDF from MinIO: {e}")
+        source = get_file_info(upload.file_path)
+        if not source:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"PDF file not found in storage: {upload.file_path}. Error: {str(e)}"
+                detail=f"PDF file not found in storage: {upload.file_path}"
             )
-        
-        if not pdf_data:
+
+        # Highlighted requests stream the cached annotated copy (original PDF if it can't be made)
+        object_info = source
+        if page is not None and x0 is not None and y0 is not None and x1 is not None and y1 is not None:
+            overlay = highlight_overlay(page, x0, y0, x1, y1)
+            variant = get_annotated_variant(upload.file_path, upload.id, source["etag"], overlay)
+            object_info = (variant and get_file_info(variant)) or source
+
+        etag = quote_etag(object_info["etag"])
+        size = object_info["size"]
+        headers = {
+            "Content-Disposition": f'inline; filename="{upload.file_name}"',
+            "Cache-Control": "public, max-age=3600",
+            "ETag": etag,
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, OPTIONS",
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Expose-Headers": "Accept-Ranges, Content-Range, Content-Length, ETag",
+            "Accept-Ranges": "bytes"
+        }
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        try:
+            byte_range = parse_range(request.headers.get("range"), size, request.headers.get("if-range"), etag)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+
+        status_code = status.HTTP_200_OK
+        offset, length = 0, size
+        if byte_range:
+            offset, end = byte_range
+            length = end - offset + 1
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {offset}-{end}/{size}"
+        headers["Content-Length"] = str(length)
+
+        try:
+            body = stream_file_range(object_info["object_name"], offset=offset, length=length)
+        except Exception as e:
+            logger.warning(f"Error reading PDF from MinIO: {e}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"PDF file not found in storage: {upload.file_path}"
+                detail=f"PDF file not found in storage: {upload.file_path}. Error: {str(e)}"
             )
-        
-        # If coordinates are provided, add red circle annotation to PDF
-        if page is not None and x0 is not None and y0 is not None and x1 is not None and y1 is not None:
-            try:
-                import fitz  # PyMuPDF
-                
-                # Open PDF from bytes
-                doc = fitz.open(stream=io.BytesIO(pdf_data), filetype="pdf")
-                page_idx = page - 1
-                
-                if 0 <= page_idx < len(doc):
-                    pdf_page = doc[page_idx]
-                    
-                    # Calculate center and radius for circle
-                    center_x = (x0 + x1) / 2
-                    center_y = (y0 + y1) / 2
-                    radius = max((x1 - x0) / 2, (y1 - y0) / 2) + 5  # Add 5pt padding
-                    
-                    # Create red circle annotation
-                    circle_rect = fitz.Rect(
-                        center_x - radius,
-                        center_y - radius,
-                        center_x + radius,
-                        center_y + radius
-                    )
-                    
-                    # Add circle annotation with red border
-                    annot = pdf_page.add_circle_annot(circle_rect)
-                    annot.set_border(width=3.0)  # 3pt border
-                    annot.set_colors(stroke=(1, 0, 0))  # Red color (RGB)
-                    annot.update()
-                    
-                    # Convert back to bytes
-                    pdf_data = doc.tobytes()
-                    doc.close()
-                    
-                    print(f"✅ Added red circle annotation at page {page}, center=({center_x:.2f}, {center_y:.2f}), radius={radius:.2f}")
-                else:
-                    doc.close()
-            except Exception as e:
-                import traceback
-                print(f"⚠️ Warning: Could not add annotation to PDF: {e}")
-                print(traceback.format_exc())
-                # Continue with original PDF if annotation fails
-        
+
         # Stream the PDF with CORS headers
-        return StreamingResponse(
-            io.BytesIO(pdf_data),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f'inline; filename="{upload.file_name}"',
-                "Cache-Control": "public, max-age=3600",
-                "Content-Length": str(len(pdf_data)),
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Methods": "GET, OPTIONS",
-                "Access-Control-Allow-Headers": "*",
-                "Accept-Ranges": "bytes"
-            }
-        )
+        return StreamingResponse(body, status_code=status_code, media_type="application/pdf", headers=headers)
     
     except HTTPException:
         raise
@@ -168,6 +162,7 @@ async def get_pdf_viewer_data(
     Returns:
     - pdf_url: Backend-proxied URL to access the PDF (no CORS issues)
     - highlight_coords: Coordinates for highlighting (if provided)
+    - overlay: Circle to draw over the rendered page for the highlight (if provided)
     - has_highlight: Whether highlight coordinates are available
     """
     try:
@@ -191,6 +186,7 @@ async def get_pdf_viewer_data(
         
         # Build highlight coordinates if provided
         highlight_coords = None
+        overlay = None
         has_highlight = False
         
         if highlight_page and highlight_x0 is not None and highlight_y0 is not None and highlight_x1 is not None and highlight_y1 is not None:
@@ -201,6 +197,7 @@ async def get_pdf_viewer_data(
                 "x1": highlight_x1,
                 "y1": highlight_y1
             }
+            overlay = highlight_overlay(highlight_page, highlight_x0, highlight_y0, highlight_x1, highlight_y1)
             has_highlight = True
         
         return PDFViewerResponse(
@@ -209,6 +206,7 @@ async def get_pdf_viewer_data(
             pdf_url=pdf_url,
             page_number=highlight_page,
             highlight_coords=highlight_coords,
+            overlay=overlay,
             has_highlight=has_highlight
         )
     
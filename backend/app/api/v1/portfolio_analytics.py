@@ -14,7 +14,7 @@ from app.api.dependencies import get_current_user, get_current_organization
 from app.models.user import User
 from app.models.organization import Organization
 from app.repositories.tenant_scoped import get_property_for_org
-from app.services.cross_property_intelligence import CrossPropertyIntelligenceService
+from app.services.cross_property_intelligence import BENCHMARK_SOURCES, CrossPropertyIntelligenceService
 from app.models.property import Property
 import logging
 
@@ -73,9 +73,8 @@ class OutlierResponse(BaseModel):
 
 @router.post("/calculate-benchmarks", response_model=BenchmarkCalculationResponse)
 async def calculate_benchmarks(
-    account_codes: Optional[List[str]] = Query(None, description="Specific account codes to calculate (all if None)"),
+    account_codes: Optional[List[str]] = Query(None, description="Specific account codes to calculate (all accounts of metric_type if None)"),
     metric_type: str = Query("balance_sheet", description="Metric type: balance_sheet, income_statement"),
-    property_group: Optional[str] = Query(None, description="Property group filter (optional)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
@@ -84,15 +83,15 @@ async def calculate_benchmarks(
     Calculate portfolio benchmarks for specified accounts.
     
     Creates or updates CrossPropertyBenchmark records with statistical data
-    (mean, median, std, percentiles) for portfolio-wide comparison.
+    (mean, median, std, percentiles) for portfolio-wide comparison. Every
+    account is rebuilt for the whole portfolio and for each property type.
     
     Args:
-        account_codes: List of account codes to calculate benchmarks for (all if None)
-        metric_type: Type of financial metric
-        property_group: Optional property group filter
+        account_codes: List of account codes to calculate benchmarks for
+        metric_type: Statement whose accounts are rebuilt when no account codes are given
     
     Returns:
-        Number of benchmarks created/updated
+        Number of benchmarks created/updated and the accounts rebuilt
     """
     try:
         cross_property_service = CrossPropertyIntelligenceService(db)
@@ -102,41 +101,26 @@ async def calculate_benchmarks(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Portfolio benchmarks are not enabled"
             )
+        if metric_type not in BENCHMARK_SOURCES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown metric_type '{metric_type}'; expected one of {sorted(BENCHMARK_SOURCES)}"
+            )
         
-        # If no account codes specified, get all unique account codes from properties
-        if not account_codes:
-            # Get all account codes from the specified metric type
-            if metric_type == 'balance_sheet':
-                from app.models.balance_sheet_data import BalanceSheetData
-                account_codes = db.query(BalanceSheetData.account_code).distinct().all()
-                account_codes = [ac[0] for ac in account_codes]
-            elif metric_type == 'income_statement':
-                from app.models.income_statement_data import IncomeStatementData
-                account_codes = db.query(IncomeStatementData.account_code).distinct().all()
-                account_codes = [ac[0] for ac in account_codes]
-            else:
-                account_codes = []
-        
-        benchmarks_created = 0
-        
-        for account_code in account_codes:
-            try:
-                benchmark = cross_property_service.calculate_benchmarks(
-                    account_code=account_code,
-                    metric_type=metric_type,
-                    property_group=property_group
-                )
-                if benchmark:
-                    benchmarks_created += 1
-            except Exception as e:
-                logger.warning(f"Failed to calculate benchmark for {account_code}: {e}")
-                continue
+        account_codes = (
+            list(dict.fromkeys(account_codes)) if account_codes
+            else cross_property_service.benchmark_account_codes(metric_type)
+        )
+        # One grouped pass fills the cube for every account (an empty list would rebuild all)
+        benchmarks_created = (
+            cross_property_service.build_benchmark_cube(account_codes=account_codes) if account_codes else 0
+        )
         
         return BenchmarkCalculationResponse(
             success=True,
             benchmarks_created=benchmarks_created,
-            account_codes=account_codes[:10],  # Return first 10 for display
-            message=f"Successfully calculated {benchmarks_created} benchmarks"
+            account_codes=account_codes,
+            message=f"Successfully calculated {benchmarks_created} benchmarks for {len(account_codes)} accounts"
         )
     
     except HTTPException:
@@ -376,84 +360,18 @@ async def get_portfolio_outliers(
                 detail=f"No benchmark data available for account {account_code}"
             )
         
-        # Get all property values for this account
-        if metric_type == 'balance_sheet':
-            from app.models.balance_sheet_data import BalanceSheetData
-            from app.models.financial_period import FinancialPeriod
-            from sqlalchemy import and_
-            
-            # Get latest period for each property
-            latest_periods = db.query(
-                FinancialPeriod.property_id,
-                func.max(FinancialPeriod.id).label('period_id')
-            ).group_by(FinancialPeriod.property_id).subquery()
-            
-            property_values = db.query(
-                BalanceSheetData.property_id,
-                BalanceSheetData.account_value
-            ).join(
-                latest_periods,
-                and_(
-                    BalanceSheetData.period_id == latest_periods.c.period_id,
-                    BalanceSheetData.property_id == latest_periods.c.property_id
-                )
-            ).filter(
-                BalanceSheetData.account_code == account_code
-            ).all()
-        else:
-            # Similar for income_statement
-            from app.models.income_statement_data import IncomeStatementData
-            from app.models.financial_period import FinancialPeriod
-            from sqlalchemy import and_
-            
-            latest_periods = db.query(
-                FinancialPeriod.property_id,
-                func.max(FinancialPeriod.id).label('period_id')
-            ).group_by(FinancialPeriod.property_id).subquery()
-            
-            property_values = db.query(
-                IncomeStatementData.property_id,
-                IncomeStatementData.account_value
-            ).join(
-                latest_periods,
-                and_(
-                    IncomeStatementData.period_id == latest_periods.c.period_id,
-                    IncomeStatementData.property_id == latest_periods.c.property_id
-                )
-            ).filter(
-                IncomeStatementData.account_code == account_code
-            ).all()
-        
-        # Calculate outliers
+        # Property values come from the benchmark's own distribution
         outliers = []
-        for property_id, value in property_values:
-            if value is None:
-                continue
-            
-            z_score = (value - benchmark.mean_value) / benchmark.std_value if benchmark.std_value > 0 else 0
-            
-            if abs(z_score) >= threshold:
-                property_obj = get_property_for_org(db, current_org.id, property_id)
-                if property_obj:
-                    percentile_rank = cross_property_service._calculate_percentile_rank(value, benchmark)
-                    
-                    outlier_type = 'extreme' if abs(z_score) >= 3.0 else ('high' if z_score > 0 else 'low')
-                    
-                    outliers.append({
-                        'property_id': property_id,
-                        'property_name': property_obj.property_name,
-                        'property_code': property_obj.property_code,
-                        'account_code': account_code,
-                        'value': float(value),
-                        'outlier_type': outlier_type,
-                        'z_score': z_score,
-                        'percentile_rank': percentile_rank,
-                        'portfolio_mean': benchmark.mean_value,
-                        'portfolio_std': benchmark.std_value
-                    })
-        
-        # Sort by absolute z-score (descending)
-        outliers.sort(key=lambda x: abs(x['z_score']), reverse=True)
+        for outlier in cross_property_service.get_outliers(
+            account_code, threshold=threshold, benchmark_period=benchmark.benchmark_period
+        ):
+            property_obj = get_property_for_org(db, current_org.id, outlier['property_id'])
+            if property_obj:
+                outliers.append({
+                    **outlier,
+                    'property_name': property_obj.property_name,
+                    'property_code': property_obj.property_code
+                })
         
         # Limit results
         outliers = outliers[:limit]
@@ -9,9 +9,10 @@ from pydantic import BaseModel
 from datetime import datetime
 
 from app.db.database import get_db
-from app.api.dependencies import get_current_user
+from app.api.dependencies import get_current_user, get_current_organization
 from app.models.user import User
 from app.services.public_api_service import PublicAPIService
+from app.services.webhook_service import WebhookService
 
 
 router = APIRouter()
@@ -40,11 +41,13 @@ class WebhookCreateRequest(BaseModel):
     url: str
     events: List[str]  # extraction_complete, validation_failed, alert_triggered
     secret: Optional[str] = None
+    max_concurrency: int = 4
+    max_batch_size: int = 50
 
 
 class WebhookResponse(BaseModel):
     """Webhook registration response."""
-    webhook_id: str
+    webhook_id: int
     url: str
     events: List[str]
     secret: str
@@ -108,16 +111,20 @@ async def get_api_key_stats(
 async def register_webhook(
     request: WebhookCreateRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
 ):
     """Register a webhook URL for event notifications."""
-    api_service = PublicAPIService(db)
+    webhook_service = WebhookService(db)
     
-    webhook_data = api_service.register_webhook(
-        user_id=current_user.id,
+    webhook_data = webhook_service.register_webhook(
         url=request.url,
         events=request.events,
-        secret=request.secret
+        secret=request.secret,
+        organization_id=current_org.id,
+        user_id=current_user.id,
+        max_concurrency=max(1, min(request.max_concurrency, 16)),
+        max_batch_size=max(1, min(request.max_batch_size, 500))
     )
     
     return WebhookResponse(**webhook_data)
@@ -127,10 +134,12 @@ async def register_webhook(
 async def delete_webhook(
     webhook_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
 ):
-    """Delete a webhook registration."""
-    # Would delete from webhooks table
+    """Deactivate a webhook registration."""
+    if not WebhookService(db).deactivate_webhook(webhook_id, organization_id=current_org.id):
+        raise HTTPException(status_code=404, detail="Webhook not found")
     return {
         "webhook_id": webhook_id,
         "deleted": True
@@ -142,12 +151,19 @@ async def get_webhook_deliveries(
     webhook_id: int,
     limit: int = Query(100, le=1000),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    current_org = Depends(get_current_organization)
 ):
     """Get delivery history for a webhook."""
-    # Would query webhook_deliveries table
+    from app.models.webhook import WebhookEndpoint
+    
+    endpoint = db.query(WebhookEndpoint).filter(
+        WebhookEndpoint.id == webhook_id,
+        WebhookEndpoint.organization_id == current_org.id
+    ).first()
+    if not endpoint:
+        raise HTTPException(status_code=404, detail="Webhook not found")
     return {
         "webhook_id": webhook_id,
-        "deliveries": []
+        "deliveries": WebhookService(db).get_deliveries(webhook_id, limit=limit)
     }
-
@@ -19,6 +19,7 @@ from app.models.batch_reprocessing_job import BatchReprocessingJob
 from app.models.property import Property
 from datetime import datetime, timedelta
 import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -173,6 +174,13 @@ async def websocket_extraction_status(websocket: WebSocket, upload_id: int):
                 "records_loaded": records_loaded,
                 "error": upload.notes if upload.extraction_status == 'failed' else None
             }
+            if upload.extraction_status == 'validation_failed':
+                # Deferred upload rejected by the validation pre-stage; notes holds the mismatch payload
+                try:
+                    status_data["validation"] = json.loads(upload.notes or "{}")
+                except ValueError:
+                    status_data["validation"] = {"message": upload.notes}
+                status_data["error"] = status_data["validation"].get("message")
             
             # Only send if status changed or every 5th iteration (to reduce traffic)
             if status_data["status"] != last_status or progress > 0:
@@ -180,7 +188,7 @@ async def websocket_extraction_status(websocket: WebSocket, upload_id: int):
                 last_status = status_data["status"]
             
             # Close if completed or failed
-            if upload.extraction_status in ['completed', 'failed']:
+            if upload.extraction_status in ['completed', 'failed', 'validation_failed']:
                 # Send final update
                 await websocket.send_json(status_data)
                 break
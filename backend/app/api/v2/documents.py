@@ -29,6 +29,7 @@ from app.schemas.document import (
     DocumentTypeEnum,
 )
 from app.core.constants import FileUploadLimits, BatchProcessingLimits
+from app.services.pdf_highlight_service import delete_annotated_variants
 
 router = APIRouter(prefix="/documents", tags=["documents-v2"])
 
@@ -221,10 +222,11 @@ async def delete_document(
             }
         )
 
-    # Soft delete
+    # Soft delete (the source PDF is kept; its annotated copies are only a cache)
     document.is_active = False
     document.notes = f"Deleted by user {current_user.id} at {datetime.utcnow().isoformat()}"
     db.commit()
+    delete_annotated_variants(document.file_path, document.id)
 
     return DeleteResponse(
         message="Document deleted successfully",
@@ -351,6 +351,14 @@ class NLQConfig(BaseSettings):
         default=True,
         description="Show SQL query explanation to users"
     )
+    SQL_MAX_PLAN_COST: float = Field(
+        default=100000.0,
+        description="Maximum EXPLAIN total cost for generated SQL to be executed"
+    )
+    SQL_CACHE_TTL_SECONDS: int = Field(
+        default=300,
+        description="Cache TTL for generated SQL results (keyed by SQL and data version)"
+    )
 
     # ============================================================================
     # CACHING CONFIGURATION
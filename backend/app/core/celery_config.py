@@ -16,7 +16,11 @@ celery_app = Celery(
         "app.tasks.alert_monitoring_tasks",  # Alert evaluation, escalation, monitoring
         "app.tasks.learning_tasks",  # Self-learning system tasks
         "app.tasks.forensic_audit_tasks",  # Forensic audit pipeline
-        "app.tasks.market_intelligence_tasks"  # Market intelligence ingestion/refresh
+        "app.tasks.market_intelligence_tasks",  # Market intelligence ingestion/refresh
+        "app.tasks.export_tasks",  # Streaming portfolio exports
+        "app.tasks.webhook_tasks",  # Webhook outbox delivery
+        "app.tasks.quota_tasks",  # Quota reservation expiry and usage reconciliation
+        "app.tasks.document_indexing_tasks"  # Incremental RAG chunking/embedding and vector reconciliation
     ]
 )
 
@@ -107,6 +111,34 @@ celery_app.conf.beat_schedule = {
             'expires': 7200,  # Task expires after 2 hours if not picked up
         }
     },
+    'dispatch-webhook-outbox': {
+        'task': 'app.tasks.webhook_tasks.dispatch_webhook_outbox',
+        'schedule': crontab(minute='*'),  # Every minute (each run polls for ~50s)
+        'options': {
+            'expires': 60,  # Task expires after 1 minute if not picked up
+        }
+    },
+    'reconcile-quota-usage': {
+        'task': 'app.tasks.quota_tasks.reconcile_quota_usage',
+        'schedule': crontab(minute='*/15'),  # Every 15 minutes
+        'options': {
+            'expires': 600,  # Task expires after 10 minutes if not picked up
+        }
+    },
+    'index-documents': {
+        'task': 'app.tasks.document_indexing_tasks.index_documents',
+        'schedule': crontab(minute=30),  # Hourly; skipped while a chain runs, unchanged documents skipped by hash
+        'options': {
+            'expires': 3600,  # Task expires after 1 hour if not picked up
+        }
+    },
+    'reconcile-vector-sync': {
+        'task': 'app.tasks.document_indexing_tasks.reconcile_vector_sync',
+        'schedule': crontab(minute=45),  # Hourly; only chunks changed since the watermark
+        'options': {
+            'expires': 3600,  # Task expires after 1 hour if not picked up
+        }
+    },
 }
 
 # Task routing (optional - for multiple queues) - E5-S2
@@ -116,12 +148,18 @@ celery_app.conf.task_routes = {
     "app.tasks.extraction_tasks.extract_document": {"queue": "extraction"},
     "app.tasks.extraction_tasks.batch_extract_documents": {"queue": "extraction"},
     "app.tasks.extraction_tasks.recover_stuck_extractions": {"queue": "extraction"},
+    # Upload validation pre-stage is short and user-facing; keep it off the long extraction queue
+    "app.tasks.extraction_tasks.validate_upload": {"queue": "celery"},
     "app.tasks.anomaly_detection_tasks.run_nightly_anomaly_detection": {"queue": "analytics"},
     "app.tasks.batch_reprocessing_tasks.*": {"queue": "analytics"},
     "app.tasks.learning_tasks.*": {"queue": "analytics"},
     "app.tasks.alert_backfill_tasks.*": {"queue": "analytics"},
     "app.tasks.alert_monitoring_tasks.*": {"queue": "analytics"},
     "app.tasks.market_intelligence_tasks.*": {"queue": "analytics"},
+    "app.tasks.export_tasks.*": {"queue": "analytics"},
+    "app.tasks.webhook_tasks.*": {"queue": "celery"},
+    "app.tasks.quota_tasks.*": {"queue": "celery"},
+    "app.tasks.document_indexing_tasks.*": {"queue": "analytics"},
     "forensic_audit.run_complete_audit": {"queue": "forensic_audit"},
 }
 
@@ -22,6 +22,8 @@ class AISettings(BaseSettings):
     LLM_ENABLE_CACHING: bool = True  # Cache LLM responses (semantic caching)
     LLM_CACHE_TTL_HOURS: int = 24  # Cache duration
     LLM_AUTO_SELECT: bool = True  # Automatically choose model based on task
+    LLM_CACHE_MAX_ENTRIES: int = 512  # In-process response cache size (Redis tier is unbounded by TTL)
+    LLM_MAX_CONCURRENT_PER_MODEL: int = 2  # In-flight requests per model before queueing
     
     # External API Keys (Optional - for higher rate limits)
     CENSUS_API_KEY: Optional[str] = None  # Optional - Census API works without key for basic queries
@@ -77,6 +79,21 @@ class AISettings(BaseSettings):
     BATCH_PROCESSING_CHUNK_SIZE: int = 10  # Number of documents to process in parallel
     BATCH_PROCESSING_MAX_CONCURRENT: int = 3  # Maximum concurrent batch jobs
     BATCH_PROCESSING_TIMEOUT_MINUTES: int = 60  # Timeout for batch jobs
+    BATCH_REPROCESSING_CHUNK_SIZE: int = 25  # Documents per reprocessing chunk task
+    BATCH_REPROCESSING_PARALLEL_CHUNKS: int = 4  # Chunk tasks of one job running at once
+    BATCH_REPROCESSING_STALE_MINUTES: int = 30  # A running job without a checkpoint for this long may be resumed
+
+    # ---------- Document Indexing (RAG) ----------
+    DOCUMENT_INDEX_EMBED_BATCH_SIZE: int = 64  # Chunks embedded and upserted per batch
+    DOCUMENT_INDEX_PAGE_SIZE: int = 200  # Document ids fetched per keyset page
+    DOCUMENT_INDEX_MAX_DOCUMENTS_PER_RUN: int = 500  # Documents one indexing task handles before re-queuing
+
+    # ---------- Adaptive Engine Selection ----------
+    ENGINE_SCHEDULER_ENABLED: bool = True  # Skip engines a template's proven engine makes redundant
+    ENGINE_SCHEDULER_CONFIDENCE_THRESHOLD: float = 0.85  # Engine confidence (0-1) that ends escalation
+    ENGINE_SCHEDULER_MIN_SAMPLES: int = 3  # Runs before an engine's win rate is trusted
+    ENGINE_SCHEDULER_MIN_WIN_RATE: float = 0.9  # Win rate that makes an engine "proven" for a template
+    ENGINE_SCHEDULER_HISTORY: int = 20  # Recent extractions per template used for win rates
 
     # ---------- Anomaly Threshold Overrides ----------
     ANOMALY_Z_SCORE_THRESHOLD: float = 2.0
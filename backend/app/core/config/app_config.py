@@ -17,6 +17,18 @@ class AppSettings(BaseSettings):
     ALERT_EMAIL_RECIPIENTS: List[str] = ["admin@reims.com"]
     ALERT_IN_APP_ENABLED: bool = True
 
+    # ---------- Anomaly Alerts ----------
+    # Raise a requires-approval committee alert per high/critical anomaly (off: a
+    # batch reprocessing run would flood the committee approval queue)
+    ANOMALY_COMMITTEE_ALERTS_ENABLED: bool = False
+
+    # ---------- Alert Correlation ----------
+    ALERT_CORRELATION_ENABLED: bool = False  # Group newly triggered alerts into incidents (by property period)
+    ALERT_CORRELATION_WINDOW_DAYS: int = 30  # Open alerts this recent are correlation candidates
+
+    # ---------- Plan Quotas ----------
+    QUOTA_RESERVATION_TTL_MINUTES: int = 60  # Pending upload reservations older than this are expired
+
     @field_validator("ALERT_EMAIL_RECIPIENTS", mode="before")
     @classmethod
     def _parse_alert_email_recipients(cls, v):
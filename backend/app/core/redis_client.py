@@ -172,11 +172,41 @@ def invalidate_portfolio_cache():
     total_deleted = 0
     for pattern in patterns:
         total_deleted += cache_delete_pattern(pattern)
+    bump_data_version()
 
     logger.info(f"Invalidated portfolio cache: {total_deleted} keys deleted")
     return total_deleted
 
 
+DATA_VERSION_KEY = "data:version"
+
+
+def get_data_version() -> int:
+    """
+    Counter bumped whenever portfolio data changes (see invalidate_portfolio_cache);
+    part of cache keys for results computed from arbitrary tables.
+    """
+    client = get_redis_client()
+    if client is None:
+        return 0
+    try:
+        return int(client.get(DATA_VERSION_KEY) or 0)
+    except Exception as e:
+        logger.warning(f"Data version lookup failed: {e}")
+        return 0
+
+
+def bump_data_version() -> int:
+    client = get_redis_client()
+    if client is None:
+        return 0
+    try:
+        return int(client.incr(DATA_VERSION_KEY))
+    except Exception as e:
+        logger.warning(f"Data version bump failed: {e}")
+        return 0
+
+
 def cached(key_prefix: str, ttl: int = 300):
     """
     Decorator for caching function results - supports both sync and async functions
@@ -1,8 +1,9 @@
 from minio import Minio
 from minio.error import S3Error
 from app.core.config import settings
+import hashlib
 import io
-from typing import Optional
+from typing import BinaryIO, Optional
 import os
 from urllib.parse import urlparse, urlunparse
 
@@ -69,6 +70,71 @@ def upload_file(
         return False
 
 
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # 8MB parts (MinIO minimum is 5MB)
+
+
+class HashingReader:
+    """File-like wrapper that hashes and counts bytes as they are read."""
+
+    def __init__(self, stream: BinaryIO, algorithm: str = "sha256"):
+        self._stream = stream
+        self._hash = hashlib.new(algorithm)
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._stream.read(size)
+        if chunk:
+            self._hash.update(chunk)
+            self.bytes_read += len(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def upload_stream(
+    stream: BinaryIO,
+    object_name: str,
+    content_type: str = "application/octet-stream",
+    bucket_name: str = settings.MINIO_BUCKET_NAME,
+    part_size: int = MULTIPART_PART_SIZE,
+    hash_algorithm: str = "sha256"
+) -> Optional[dict]:
+    """
+    Stream a file-like object to MinIO as a multipart upload, hashing it on the way
+
+    The body is never held in memory as a whole; MinIO reads it part by part and
+    the content hash is computed from the same reads.
+
+    Args:
+        stream: Readable binary stream (e.g. UploadFile.file)
+        object_name: Name of the object in MinIO
+        content_type: MIME type of the file
+        bucket_name: Target bucket name
+        part_size: Multipart part size in bytes
+        hash_algorithm: hashlib algorithm used for the content hash
+
+    Returns:
+        dict: {"file_hash": str, "file_size": int} if successful, None otherwise
+    """
+    try:
+        ensure_bucket_exists(bucket_name)
+
+        reader = HashingReader(stream, hash_algorithm)
+        minio_client.put_object(
+            bucket_name,
+            object_name,
+            reader,
+            length=-1,
+            part_size=part_size,
+            content_type=content_type
+        )
+        return {"file_hash": reader.hexdigest(), "file_size": reader.bytes_read}
+    except S3Error as e:
+        print(f"Error streaming file upload: {e}")
+        return None
+
+
 def download_file(
     object_name: str,
     bucket_name: str = settings.MINIO_BUCKET_NAME
@@ -94,6 +160,45 @@ def download_file(
         return None
 
 
+STREAM_CHUNK_SIZE = 256 * 1024  # 256KB reads when proxying objects
+
+
+def stream_file_range(
+    object_name: str,
+    offset: int = 0,
+    length: int = 0,
+    bucket_name: str = settings.MINIO_BUCKET_NAME,
+    chunk_size: int = STREAM_CHUNK_SIZE
+):
+    """
+    Open a (ranged) read of an object and return a chunk iterator over it
+
+    The object is opened before returning, so a missing object raises S3Error
+    here rather than midway through a streamed response. The connection is
+    released when the iterator is exhausted or closed.
+
+    Args:
+        object_name: Name of the object in MinIO
+        offset: First byte to read
+        length: Number of bytes to read (0 = to the end of the object)
+        bucket_name: Source bucket name
+        chunk_size: Bytes per yielded chunk
+
+    Returns:
+        Iterator[bytes] over the requested range
+    """
+    response = minio_client.get_object(bucket_name, object_name, offset=offset, length=length)
+
+    def chunks():
+        try:
+            yield from response.stream(chunk_size)
+        finally:
+            response.close()
+            response.release_conn()
+
+    return chunks()
+
+
 def delete_file(
     object_name: str,
     bucket_name: str = settings.MINIO_BUCKET_NAME
@@ -17,14 +17,14 @@ from app.models.property import Property
 from app.models.financial_period import FinancialPeriod
 
 
-def _load_metrics_service():
-    """Load MetricsService without importing heavy app.services package."""
+def _load_service(module_name: str, class_name: str):
+    """Load a service class without importing heavy app.services package."""
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    path = os.path.join(base_dir, "services", "metrics_service.py")
-    spec = importlib.util.spec_from_file_location("metrics_service", path)
+    path = os.path.join(base_dir, "services", f"{module_name}.py")
+    spec = importlib.util.spec_from_file_location(module_name, path)
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)  # type: ignore
-    return module.MetricsService
+    return getattr(module, class_name)
 
 
 def _calc_months_diff(base_year: int, base_month: int, target_date) -> int:
@@ -145,23 +145,36 @@ def _compute_tenant_risk_for_period(db, property_id: int, period: FinancialPerio
     )
 
 
+def _backfill_metrics_per_period(db) -> None:
+    """Per-record metrics path, one calculate_all_metrics call per property/period."""
+    MetricsService = _load_service("metrics_service", "MetricsService")
+    metrics_service = MetricsService(db)
+    for property_id, period_id in db.query(FinancialPeriod.property_id, FinancialPeriod.id).all():
+        try:
+            metrics_service.calculate_all_metrics(property_id=property_id, period_id=period_id)
+        except Exception as exc:
+            # Continue with other periods even if one fails
+            print(f"Metrics calc failed for property {property_id} period {period_id}: {exc}")
+
+
 def backfill_all_metrics_and_tenant_risk() -> None:
     """Backfill metrics and tenant risk for all properties/periods."""
     db = SessionLocal()
     try:
-        MetricsService = _load_metrics_service()
-        metrics_service = MetricsService(db)
+        # Metrics upsert: set-based for all property/periods at once
+        try:
+            BulkMetricsService = _load_service("bulk_metrics_service", "BulkMetricsService")
+            written = BulkMetricsService(db).calculate_for_properties()
+            print(f"✓ Metrics upserted for {written} property/periods")
+        except Exception as exc:
+            db.rollback()
+            print(f"Bulk metrics calc failed, falling back to per-period: {exc}")
+            _backfill_metrics_per_period(db)
+
         properties = db.query(Property).all()
         for prop in properties:
             periods = db.query(FinancialPeriod).filter(FinancialPeriod.property_id == prop.id).all()
             for period in periods:
-                # Metrics upsert
-                try:
-                    metrics_service.calculate_all_metrics(property_id=prop.id, period_id=period.id)
-                except Exception as exc:
-                    # Continue with other periods even if one fails
-                    print(f"Metrics calc failed for property {prop.id} period {period.id}: {exc}")
-
                 # Tenant risk upsert
                 try:
                     _compute_tenant_risk_for_period(db, prop.id, period)
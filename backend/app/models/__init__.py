@@ -25,6 +25,7 @@ from app.models.validation_result import ValidationResult
 from app.models.validation_run import ValidationRun
 from app.models.audit_trail import AuditTrail
 from app.models.extraction_template import ExtractionTemplate
+from app.models.statement_layout import StatementLayout
 from app.models.reconciliation_session import ReconciliationSession
 from app.models.reconciliation_difference import ReconciliationDifference
 from app.models.reconciliation_resolution import ReconciliationResolution
@@ -77,6 +78,7 @@ from app.models.cross_property_benchmark import CrossPropertyBenchmark
 from app.models.data_governance import DataOwner, DataGovernancePolicy, DataAccessControl, DataRetentionPolicy, DataQualityIssue, DataQualityCorrection
 from app.models.general_ledger import GLImportBatch, GeneralLedgerEntry
 from app.models.batch_reprocessing_job import BatchReprocessingJob
+from app.models.batch_reprocessing_item import BatchReprocessingItem
 from app.models.pdf_field_coordinate import PDFFieldCoordinate
 from app.models.pyod_model_selection_log import PyODModelSelectionLog
 
@@ -129,6 +131,10 @@ from app.models.ai_insights_embedding import AIInsightsEmbedding
 # SaaS Models
 from app.models.organization import Organization, OrganizationMember
 from app.models.audit_log import AuditLog
+from app.models.quota_reservation import QuotaReservation
+
+# Webhook delivery models
+from app.models.webhook import WebhookEndpoint, WebhookOutbox
 
 __all__ = [
     "User",
@@ -156,6 +162,7 @@ __all__ = [
     "ValidationResult",
     "AuditTrail",
     "ExtractionTemplate",
+    "StatementLayout",
     "ReconciliationSession",
     "ReconciliationDifference",
     "ReconciliationResolution",
@@ -208,6 +215,7 @@ __all__ = [
     "GLImportBatch",
     "GeneralLedgerEntry",
     "BatchReprocessingJob",
+    "BatchReprocessingItem",
     "PDFFieldCoordinate",
     "PyODModelSelectionLog",
     # Data quality
@@ -261,4 +269,8 @@ __all__ = [
     "Organization",
     "OrganizationMember",
     "AuditLog",
+    "QuotaReservation",
+    # Webhooks
+    "WebhookEndpoint",
+    "WebhookOutbox",
 ]
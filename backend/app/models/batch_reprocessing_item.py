@@ -0,0 +1,33 @@
+"""
+Batch Reprocessing Item Model
+
+Per-document checkpoint of a batch reprocessing job. A row is written in the
+same transaction as the document's reprocessing, so a restarted or resumed
+job skips every document that already has one.
+"""
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class BatchReprocessingItem(Base):
+    """Outcome of one document in a batch reprocessing job."""
+
+    __tablename__ = "batch_reprocessing_items"
+    __table_args__ = (
+        UniqueConstraint('job_id', 'document_id', name='uq_batch_reprocessing_items_job_document'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey('batch_reprocessing_jobs.id', ondelete='CASCADE'), nullable=False)
+    document_id = Column(Integer, ForeignKey('document_uploads.id', ondelete='CASCADE'), nullable=False)
+
+    status = Column(String(20), nullable=False)  # successful, failed, skipped
+    error_type = Column(String(20), nullable=True)  # validation, error
+    reason = Column(Text, nullable=True)
+
+    processed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<BatchReprocessingItem(job_id={self.job_id}, document_id={self.document_id}, status='{self.status}')>"
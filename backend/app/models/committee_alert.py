@@ -2,7 +2,7 @@
 Committee Alert Model
 Tracks risk alerts that require committee review/approval
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, Text, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Numeric, Text, Enum as SQLEnum, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from datetime import datetime
@@ -42,6 +42,15 @@ class AlertSeverity(str, enum.Enum):
     URGENT = "URGENT"
 
 
+# Escalation order of AlertSeverity (higher is more severe)
+SEVERITY_RANK = {
+    AlertSeverity.INFO: 0,
+    AlertSeverity.WARNING: 1,
+    AlertSeverity.CRITICAL: 2,
+    AlertSeverity.URGENT: 3,
+}
+
+
 class AlertStatus(str, enum.Enum):
     """Alert status"""
     ACTIVE = "ACTIVE"
@@ -66,6 +75,14 @@ class CommitteeAlert(Base):
     Linked to workflow locks for governance enforcement.
     """
     __tablename__ = "committee_alerts"
+    __table_args__ = (
+        Index(
+            "uq_committee_alerts_dedup_key_open",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("status IN ('ACTIVE', 'ACKNOWLEDGED')"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -114,6 +131,9 @@ class CommitteeAlert(Base):
     # Related data (for traceability)
     related_metric = Column(String(100), nullable=True)  # e.g., "DSCR", "Occupancy Rate"
     br_id = Column(String(20), nullable=True)  # Business Requirement ID
+
+    # Deduplication key (property|period|metric|anomaly family hash), unique among open alerts
+    dedup_key = Column(String(64), nullable=True)
     
     # Enhanced fields (from Phase 9 migration)
     priority_score = Column(Numeric(10, 4), nullable=True)
@@ -176,6 +196,7 @@ class CommitteeAlert(Base):
             "alert_metadata": self.alert_metadata,  # Column name is 'metadata' in DB
             "related_metric": self.related_metric,
             "br_id": self.br_id,
+            "dedup_key": self.dedup_key,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
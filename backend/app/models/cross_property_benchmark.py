@@ -39,6 +39,7 @@ class CrossPropertyBenchmark(Base):
     # Sample Info
     property_count = Column(Integer, nullable=False)  # Number of properties in benchmark
     property_ids = Column(JSONB, nullable=True)  # Array of property IDs included in benchmark
+    distribution = Column(JSONB, nullable=True)  # [[property_id, value], ...] sorted by value
     
     # Metadata
     calculated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -28,6 +28,10 @@ class DocumentChunk(Base):
     embedding_model = Column(String(100), nullable=True)  # e.g., 'text-embedding-3-small'
     embedding_dimension = Column(Integer, nullable=True)  # Dimension of embedding vector
     
+    # Incremental indexing
+    content_hash = Column(String(64), nullable=True)  # Hash of the source text; set once the document's chunks are complete
+    vector_synced_at = Column(DateTime(timezone=True), nullable=True)  # Last upsert to Pinecone
+    
     # Metadata
     chunk_metadata = Column(JSON, nullable=True)  # Additional metadata (page numbers, section, etc.)
     property_id = Column(Integer, ForeignKey('properties.id', ondelete='CASCADE'), nullable=True, index=True)
@@ -48,6 +52,7 @@ class DocumentChunk(Base):
     __table_args__ = (
         Index('idx_chunk_document_index', 'document_id', 'chunk_index'),
         Index('idx_chunk_property_period', 'property_id', 'period_id'),
+        Index('idx_chunk_updated_at', 'updated_at'),
     )
     
     def to_dict(self):
@@ -24,6 +24,8 @@ class ExtractionLog(Base):
     strategy_used = Column(String)  # auto, fast, accurate, multi_engine
     engines_used = Column(JSON)  # List of engines used
     primary_engine = Column(String)
+    template_fingerprint = Column(String(32), nullable=True, index=True)  # Header-layout hash (services/engine_scheduler.py)
+    engine_outcomes = Column(JSON, nullable=True)  # Per-engine confidence/skips feeding adaptive engine selection
     
     # Quality metrics
     confidence_score = Column(Float)  # 0-100
@@ -33,6 +35,7 @@ class ExtractionLog(Base):
     
     # Processing details
     processing_time_seconds = Column(Float)
+    stage_timings = Column(JSON, nullable=True)  # Per-stage ms breakdown (monitoring/extraction_tracing.py)
     extraction_timestamp = Column(DateTime(timezone=True), server_default=func.now())
     
     # Validation results
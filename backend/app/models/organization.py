@@ -26,6 +26,9 @@ class Organization(Base):
     storage_limit_gb = Column(Numeric(10, 2), nullable=True)
     documents_used = Column(Integer, default=0, nullable=True)
     storage_used_bytes = Column(BigInteger, default=0, nullable=True)
+    # Held by pending QuotaReservations (uploads in flight)
+    documents_reserved = Column(Integer, default=0, nullable=False, server_default="0")
+    storage_reserved_bytes = Column(BigInteger, default=0, nullable=False, server_default="0")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
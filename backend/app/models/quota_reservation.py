@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class QuotaReservation(Base):
+    """
+    Document/storage quota held for an upload in flight
+
+    Created by quota_service.reserve_quota together with the matching bump of
+    Organization.documents_reserved / storage_reserved_bytes. Confirming moves
+    the amounts into the used counters; releasing or expiring gives them back.
+    """
+
+    __tablename__ = "quota_reservations"
+    __table_args__ = (
+        Index('ix_quota_reservations_status_expires_at', 'status', 'expires_at'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey('organizations.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    documents = Column(Integer, nullable=False, default=1)
+    bytes = Column(BigInteger, nullable=False, default=0)
+
+    status = Column(String(20), nullable=False, default='pending')  # pending, confirmed, released, expired
+    upload_id = Column(Integer, ForeignKey('document_uploads.id', ondelete='SET NULL'), nullable=True)
+
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, JSON, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class StatementLayout(Base):
+    """
+    Column layout of a property's statements, reused across periods
+
+    Learned from the first table FinancialTableParser detects on page one; later
+    documents whose header matches are parsed by direct column slicing
+    (see utils/layout_template.py).
+    """
+
+    __tablename__ = "statement_layouts"
+    __table_args__ = (
+        UniqueConstraint('property_id', 'document_type', 'fingerprint', name='uq_statement_layouts_property_type_fingerprint'),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey('properties.id', ondelete='CASCADE'), nullable=False, index=True)
+    document_type = Column(String(50), nullable=False)
+    fingerprint = Column(String(32), nullable=False)  # Hash of header text + column positions
+
+    layout = Column(JSON, nullable=False)  # {"fingerprint", "header", "columns", "top", ...extras}
+
+    hit_count = Column(Integer, nullable=False, default=0)  # Documents parsed with this layout
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,82 @@
+"""
+Webhook Models
+
+Webhook endpoint subscriptions and the durable delivery outbox.
+
+Event producers (alerts, extraction) only insert WebhookOutbox rows inside
+their own transaction; the async dispatcher claims due rows, batches them per
+endpoint and records the delivery outcome.
+"""
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class WebhookEndpoint(Base):
+    """A subscriber URL and the events it receives"""
+    __tablename__ = "webhook_endpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+
+    url = Column(Text, nullable=False)
+    secret = Column(String(255), nullable=False)  # HMAC-SHA256 signing secret
+    events = Column(JSONB, nullable=False)  # ["alert_triggered", "extraction_complete"] or ["*"]
+    is_active = Column(Boolean, default=True, nullable=False, index=True)
+
+    # Delivery tuning
+    max_concurrency = Column(Integer, default=4, nullable=False)  # Parallel POSTs to this endpoint
+    max_batch_size = Column(Integer, default=50, nullable=False)  # Events per POST
+
+    # Health
+    consecutive_failures = Column(Integer, default=0, nullable=False)
+    last_success_at = Column(DateTime(timezone=True), nullable=True)
+    last_failure_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    outbox_events = relationship("WebhookOutbox", back_populates="endpoint", cascade="all, delete-orphan")
+
+    def subscribes_to(self, event_type: str) -> bool:
+        events = self.events or []
+        return "*" in events or event_type in events
+
+    def __repr__(self):
+        return f"<WebhookEndpoint(id={self.id}, url='{self.url}', active={self.is_active})>"
+
+
+class WebhookOutbox(Base):
+    """One pending/delivered event for one endpoint"""
+    __tablename__ = "webhook_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint_id = Column(Integer, ForeignKey("webhook_endpoints.id", ondelete="CASCADE"), nullable=False, index=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    event_type = Column(String(100), nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    # pending -> delivering -> delivered | pending (retry) | dead
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # Lease while a dispatcher delivers
+    last_error = Column(Text, nullable=True)
+    last_status_code = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    latency_ms = Column(Integer, nullable=True)  # created_at -> delivered_at
+
+    endpoint = relationship("WebhookEndpoint", back_populates="outbox_events")
+
+    __table_args__ = (
+        Index("ix_webhook_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<WebhookOutbox(id={self.id}, event='{self.event_type}', status='{self.status}', attempts={self.attempts})>"
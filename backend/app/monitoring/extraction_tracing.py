@@ -0,0 +1,177 @@
+"""
+Per-stage tracing for the extraction pipeline.
+
+ExtractionTrace wraps each orchestrator stage (download, engine extraction,
+parse, match, dedup, insert, metrics, benchmarks, anomalies, validate,
+metadata, concordance, alerts) in:
+- an OpenTelemetry span (child of one `extraction.document` span), exported
+  when tracing is enabled via monitoring/otel_tracing.py, no-op otherwise
+- a Prometheus histogram observation labelled by stage and document type
+- an in-memory timing used for the compact breakdown stored on ExtractionLog
+
+Stages can nest (dedup runs inside insert); timings are exclusive, so a parent
+stage is only charged for time not spent in its child stages and the breakdown
+adds up to the traced wall time.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from prometheus_client import Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+try:
+    from opentelemetry import trace as otel_trace
+    from opentelemetry.trace import Status, StatusCode
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "download", "engine_extraction", "parse", "match", "dedup", "insert",
+    "metrics", "benchmarks", "anomalies", "validate", "metadata", "concordance", "alerts",
+)
+
+if PROMETHEUS_AVAILABLE:
+    extraction_stage_duration_seconds = Histogram(
+        'extraction_stage_duration_seconds',
+        'Exclusive duration of extraction pipeline stages',
+        ['stage', 'document_type'],
+        buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0]
+    )
+
+    extraction_stage_failures_total = Counter(
+        'extraction_stage_failures_total',
+        'Extraction pipeline stages that raised',
+        ['stage', 'document_type']
+    )
+else:
+    class _DummyMetric:
+        def labels(self, *args, **kwargs): return self
+        def inc(self, *args, **kwargs): pass
+        def observe(self, *args, **kwargs): pass
+
+    extraction_stage_duration_seconds = _DummyMetric()
+    extraction_stage_failures_total = _DummyMetric()
+
+
+def _tracer():
+    return otel_trace.get_tracer("reims.extraction") if OTEL_AVAILABLE else None
+
+
+class ExtractionTrace:
+    """Stage timings, spans and metrics for one document extraction."""
+
+    def __init__(
+        self,
+        document_type: Optional[str] = None,
+        upload_id: Optional[int] = None,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        self.document_type = document_type or "unknown"
+        self.upload_id = upload_id
+        self._clock = clock
+        self._started = clock()
+        self._seconds: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+        self._failed: List[str] = []
+        self._stack: List[List] = []  # [stage, seconds spent in child stages]
+
+    @contextmanager
+    def document(self):
+        """Root `extraction.document` span; stage spans opened inside become its children."""
+        tracer = _tracer()
+        if tracer is None:
+            yield self
+            return
+        with tracer.start_as_current_span("extraction.document") as span:
+            span.set_attribute("reims.document_type", self.document_type)
+            if self.upload_id is not None:
+                span.set_attribute("reims.upload_id", self.upload_id)
+            try:
+                yield self
+            finally:
+                span.set_attribute("reims.stage_ms", str(self.breakdown()["stages"]))
+
+    @contextmanager
+    def stage(self, name: str, **attributes: Any):
+        """Time a stage; exceptions are recorded on the span and re-raised."""
+        tracer = _tracer()
+        span_cm = tracer.start_as_current_span(f"extraction.{name}") if tracer else None
+        span = span_cm.__enter__() if span_cm else None
+        if span is not None:
+            span.set_attribute("reims.document_type", self.document_type)
+            for key, value in attributes.items():
+                span.set_attribute(f"reims.{key}", value)
+
+        start = self._clock()
+        self._stack.append([name, 0.0])
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            elapsed = self._clock() - start
+            _, child_seconds = self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            exclusive = max(elapsed - child_seconds, 0.0)
+            self._seconds[name] = self._seconds.get(name, 0.0) + exclusive
+            self._calls[name] = self._calls.get(name, 0) + 1
+            extraction_stage_duration_seconds.labels(stage=name, document_type=self.document_type).observe(exclusive)
+            if error is not None:
+                self._failed.append(name)
+                extraction_stage_failures_total.labels(stage=name, document_type=self.document_type).inc()
+            if span is not None:
+                if error is not None:
+                    span.record_exception(error)
+                    span.set_status(Status(StatusCode.ERROR, str(error)[:200]))
+                span_cm.__exit__(None, None, None)
+
+    @property
+    def failed(self) -> List[str]:
+        return list(self._failed)
+
+    def mark_failed(self, name: str) -> None:
+        """Record a stage that reported failure without raising (e.g. success=False results)."""
+        if name not in self._failed:
+            self._failed.append(name)
+            extraction_stage_failures_total.labels(stage=name, document_type=self.document_type).inc()
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Compact timing summary persisted on ExtractionLog.stage_timings:
+        {"document_type", "total_ms", "stages": {stage: ms}, "calls": {stage: n} (only when > 1),
+        "failed": [stage, ...]}. Stages appear in pipeline order.
+        """
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        names = sorted(self._seconds, key=lambda s: (order.get(s, len(order)), s))
+        summary: Dict[str, Any] = {
+            "document_type": self.document_type,
+            "total_ms": round((self._clock() - self._started) * 1000, 1),
+            "stages": {name: round(self._seconds[name] * 1000, 1) for name in names},
+        }
+        repeated = {name: self._calls[name] for name in names if self._calls[name] > 1}
+        if repeated:
+            summary["calls"] = repeated
+        if self._failed:
+            summary["failed"] = list(self._failed)
+        return summary
+
+
+@contextmanager
+def traced_stage(trace: Optional[ExtractionTrace], name: str, **attributes: Any):
+    """trace.stage(name) when a trace is active, otherwise a no-op."""
+    if trace is None:
+        yield None
+    else:
+        with trace.stage(name, **attributes) as span:
+            yield span
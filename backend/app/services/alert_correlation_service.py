@@ -3,36 +3,85 @@ Alert Correlation Service
 
 Groups related anomalies into incidents based on shared properties,
 periods, related accounts, or root causes.
+
+Each alert is reduced once to a few bucket keys for the correlation type
+(property id, period id, account category / metric, root cause). Alerts that
+share a key are connected, and incidents are the connected components, found
+with union-find in linear time instead of comparing every pair. Alerts that
+already belong to an incident carry that incident as a key too, so new alerts
+join (and bridge) existing incidents rather than opening duplicates.
+
+Incident membership (`incident_group_id`, and `correlation_group_id` pointing
+at the parent alert) is written with bulk UPDATEs in a single transaction.
 """
 
-from typing import List, Dict, Optional, Any
-from datetime import datetime
+from typing import List, Dict, Optional, Any, Hashable, Iterable, Tuple
+from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, or_
+from sqlalchemy import update
 import uuid
 import logging
 
-from app.models.committee_alert import CommitteeAlert, AlertType, AlertStatus
-from app.models.anomaly_detection import AnomalyDetection
+from app.core.config import settings
+from app.models.committee_alert import CommitteeAlert, AlertType, AlertStatus, AlertSeverity, CommitteeType, SEVERITY_RANK
 
 logger = logging.getLogger(__name__)
 
+# Related account keywords (matched against the lower-cased related_metric)
+ACCOUNT_CATEGORIES = {
+    'utility': ('electricity', 'gas', 'water', 'utility'),
+    'maintenance': ('repairs', 'maintenance', 'r&m'),
+    'revenue': ('rent', 'revenue', 'income'),
+}
+
+OPEN_STATUSES = (AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED)
+
+
+class _DisjointSet:
+    """Union-find over alert ids (path halving, union by size)."""
+
+    def __init__(self, items: Iterable[int]):
+        self.parent = {item: item for item in items}
+        self.size = {item: 1 for item in self.parent}
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+    def components(self) -> List[List[int]]:
+        groups: Dict[int, List[int]] = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
 
 class AlertCorrelationService:
     """
     Correlates and groups related alerts into incidents.
-    
+
     Groups by:
     - Shared properties
     - Shared periods
     - Related accounts (e.g., utility expenses)
     - Root causes
     """
-    
+
     def __init__(self, db: Session):
         """Initialize correlation service."""
         self.db = db
-    
+
     def correlate_alerts(
         self,
         alert_ids: List[int],
@@ -40,164 +89,265 @@ class AlertCorrelationService:
     ) -> Dict[str, Any]:
         """
         Correlate alerts into incident groups.
-        
+
         Args:
             alert_ids: List of alert IDs to correlate
             correlation_type: 'auto', 'property', 'period', 'account', 'root_cause'
-            
+
         Returns:
             Dict with correlation results
         """
-        alerts = self.db.query(CommitteeAlert).filter(
-            CommitteeAlert.id.in_(alert_ids)
-        ).all()
-        
+        alerts = self._child_alerts(
+            self.db.query(CommitteeAlert).filter(CommitteeAlert.id.in_(alert_ids)).all()
+        )
         if not alerts:
             return {'correlated_groups': [], 'uncorrelated': []}
-        
+
         if correlation_type == 'auto':
             # Auto-detect correlation type
             correlation_type = self._detect_correlation_type(alerts)
-        
-        # Group alerts
-        groups = self._group_alerts(alerts, correlation_type)
-        
-        # Create incident groups
-        incident_groups = []
-        for group in groups:
-            incident_group_id = uuid.uuid4()
-            
-            # Create parent alert for the group
-            parent_alert = self._create_parent_alert(group, incident_group_id)
-            
-            # Update child alerts
-            for alert in group:
-                alert.incident_group_id = incident_group_id
-                alert.correlation_id = parent_alert.id
-                self.db.commit()
-            
-            incident_groups.append({
-                'incident_group_id': str(incident_group_id),
-                'parent_alert_id': parent_alert.id,
-                'child_alert_count': len(group),
-                'alerts': [a.id for a in group]
-            })
-        
+
+        return self._correlate(alerts, [], correlation_type)
+
+    def correlate_new_alerts(
+        self,
+        alert_ids: List[int],
+        correlation_type: str = 'auto',
+        window_days: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Incrementally correlate newly created alerts.
+
+        New alerts are bucketed together with the open alerts of the last
+        `window_days` that could share a key with them; they join the
+        incidents those alerts belong to, or open new ones.
+        """
+        new_alerts = self._child_alerts(
+            self.db.query(CommitteeAlert).filter(CommitteeAlert.id.in_(alert_ids)).all()
+        )
+        if not new_alerts:
+            return {'correlated_groups': [], 'uncorrelated': []}
+
+        if correlation_type == 'auto':
+            correlation_type = self._detect_correlation_type(new_alerts)
+
+        window_days = settings.ALERT_CORRELATION_WINDOW_DAYS if window_days is None else window_days
+        candidates = self._child_alerts(self._candidate_query(new_alerts, correlation_type, window_days).all())
+        return self._correlate(new_alerts, candidates, correlation_type)
+
+    # ------------------------------------------------------------------
+    # Grouping
+    # ------------------------------------------------------------------
+
+    def _correlate(
+        self,
+        alerts: List[CommitteeAlert],
+        candidates: List[CommitteeAlert],
+        correlation_type: str
+    ) -> Dict[str, Any]:
+        """Group `alerts` (with `candidates` as possible partners) and persist the incidents."""
+        by_id = {a.id: a for a in candidates}
+        by_id.update((a.id, a) for a in alerts)
+        new_ids = {a.id for a in alerts}
+        # Only components containing one of `alerts` change
+        groups = [
+            group for group in self._group_alerts(list(by_id.values()), correlation_type)
+            if any(a.id in new_ids for a in group)
+        ]
+
+        incident_groups = self._persist_groups(groups) if groups else []
+        grouped = {alert_id for group in incident_groups for alert_id in group['alerts']}
         return {
             'correlated_groups': incident_groups,
+            'uncorrelated': sorted(new_ids - grouped),
             'correlation_type': correlation_type,
             'total_groups': len(incident_groups)
         }
-    
+
+    def _group_alerts(
+        self,
+        alerts: List[CommitteeAlert],
+        correlation_type: str
+    ) -> List[List[CommitteeAlert]]:
+        """Connected components (of two or more alerts) over shared bucket keys."""
+        by_id = {a.id: a for a in alerts}
+        components = _DisjointSet(by_id)
+        first_in_bucket: Dict[Hashable, int] = {}
+        for alert in alerts:
+            for key in self._bucket_keys(alert, correlation_type):
+                first = first_in_bucket.setdefault(key, alert.id)
+                if first != alert.id:
+                    components.union(first, alert.id)
+
+        return [
+            [by_id[alert_id] for alert_id in sorted(component)]
+            for component in components.components()
+            if len(component) > 1
+        ]
+
+    def _bucket_keys(self, alert: CommitteeAlert, correlation_type: str) -> List[Tuple]:
+        """Keys two alerts must share (any one of) to be related."""
+        keys: List[Tuple] = []
+        if alert.incident_group_id:
+            keys.append(('incident', alert.incident_group_id))
+
+        if correlation_type == 'property':
+            keys.append(('property', alert.property_id))
+
+        elif correlation_type == 'period':
+            period = self._period_of(alert)
+            if period is not None:
+                keys.append(('period', period))
+
+        elif correlation_type == 'account':
+            # Related accounts (e.g., utility expenses) or the same metric
+            metric = alert.related_metric
+            if metric:
+                lowered = metric.lower()
+                keys.extend(
+                    ('account', category)
+                    for category, keywords in ACCOUNT_CATEGORIES.items()
+                    if any(k in lowered for k in keywords)
+                )
+                keys.append(('metric', metric))
+
+        elif correlation_type == 'root_cause':
+            root_cause = (alert.alert_metadata or {}).get('root_cause')
+            if root_cause is not None:
+                keys.append(('root_cause', str(root_cause)))
+
+        return keys
+
     def _detect_correlation_type(self, alerts: List[CommitteeAlert]) -> str:
         """Auto-detect best correlation type."""
         # Check if all share same property
         properties = set(a.property_id for a in alerts)
         if len(properties) == 1:
             return 'property'
-        
+
         # Check if all share same period
-        periods = set()
-        for alert in alerts:
-            if alert.metadata and 'period_id' in alert.metadata:
-                periods.add(alert.metadata['period_id'])
-        
-        if len(periods) == 1:
+        periods = set(self._period_of(a) for a in alerts)
+        if len(periods) == 1 and None not in periods:
             return 'period'
-        
+
         # Check for related accounts
         metrics = set(a.related_metric for a in alerts if a.related_metric)
         if len(metrics) <= len(alerts) * 0.5:  # At least 50% share metrics
             return 'account'
-        
+
         return 'root_cause'
-    
-    def _group_alerts(
-        self,
-        alerts: List[CommitteeAlert],
-        correlation_type: str
-    ) -> List[List[CommitteeAlert]]:
-        """Group alerts based on correlation type."""
-        groups = []
-        processed = set()
-        
-        for alert in alerts:
-            if alert.id in processed:
-                continue
-            
-            group = [alert]
-            processed.add(alert.id)
-            
-            # Find related alerts
-            for other_alert in alerts:
-                if other_alert.id in processed:
-                    continue
-                
-                if self._are_related(alert, other_alert, correlation_type):
-                    group.append(other_alert)
-                    processed.add(other_alert.id)
-            
-            if len(group) > 1:
-                groups.append(group)
-        
-        return groups
-    
-    def _are_related(
-        self,
-        alert1: CommitteeAlert,
-        alert2: CommitteeAlert,
-        correlation_type: str
-    ) -> bool:
-        """Check if two alerts are related."""
+
+    def _candidate_query(self, new_alerts: List[CommitteeAlert], correlation_type: str, window_days: int):
+        """Open alerts of the correlation window that could share a bucket key with the new ones."""
+        query = self.db.query(CommitteeAlert).filter(
+            CommitteeAlert.id.notin_([a.id for a in new_alerts]),
+            CommitteeAlert.status.in_(OPEN_STATUSES),
+            CommitteeAlert.triggered_at >= datetime.utcnow() - timedelta(days=window_days)
+        )
         if correlation_type == 'property':
-            return alert1.property_id == alert2.property_id
-        
-        elif correlation_type == 'period':
-            period1 = alert1.metadata.get('period_id') if alert1.metadata else None
-            period2 = alert2.metadata.get('period_id') if alert2.metadata else None
-            return period1 == period2
-        
+            query = query.filter(CommitteeAlert.property_id.in_({a.property_id for a in new_alerts}))
         elif correlation_type == 'account':
-            # Related accounts (e.g., utility expenses)
-            metric1 = alert1.related_metric
-            metric2 = alert2.related_metric
-            
-            if not metric1 or not metric2:
-                return False
-            
-            # Check if same account category
-            account_categories = {
-                'utility': ['electricity', 'gas', 'water', 'utility'],
-                'maintenance': ['repairs', 'maintenance', 'r&m'],
-                'revenue': ['rent', 'revenue', 'income']
-            }
-            
-            for category, keywords in account_categories.items():
-                if any(k in metric1.lower() for k in keywords) and any(k in metric2.lower() for k in keywords):
-                    return True
-            
-            return metric1 == metric2
-        
+            query = query.filter(CommitteeAlert.related_metric.isnot(None))
         elif correlation_type == 'root_cause':
-            # Check metadata for root cause
-            root_cause1 = alert1.metadata.get('root_cause') if alert1.metadata else None
-            root_cause2 = alert2.metadata.get('root_cause') if alert2.metadata else None
-            return root_cause1 == root_cause2
-        
-        return False
-    
+            query = query.filter(CommitteeAlert.alert_metadata.isnot(None))
+        return query
+
+    @staticmethod
+    def _period_of(alert: CommitteeAlert) -> Optional[int]:
+        if alert.financial_period_id is not None:
+            return alert.financial_period_id
+        return (alert.alert_metadata or {}).get('period_id')
+
+    @staticmethod
+    def _child_alerts(alerts: List[CommitteeAlert]) -> List[CommitteeAlert]:
+        return [a for a in alerts if not (a.alert_metadata or {}).get('is_parent_alert')]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _persist_groups(self, groups: List[List[CommitteeAlert]]) -> List[Dict[str, Any]]:
+        """
+        Create or extend one incident per group and write membership in bulk.
+
+        A group touching existing incidents extends the oldest of them (lowest
+        parent alert id). Incidents are never merged: members of the other
+        incidents stay where they are, and no parent alert is dismissed.
+        """
+        existing_ids = {a.incident_group_id for group in groups for a in group if a.incident_group_id}
+        parents: Dict[uuid.UUID, CommitteeAlert] = {}
+        if existing_ids:
+            for parent in self.db.query(CommitteeAlert).filter(CommitteeAlert.incident_group_id.in_(existing_ids)).all():
+                if (parent.alert_metadata or {}).get('is_parent_alert'):
+                    current = parents.get(parent.incident_group_id)
+                    if current is None or parent.id < current.id:
+                        parents[parent.incident_group_id] = parent
+
+        plans = []
+        new_parents = []
+        for group in groups:
+            group_parents = sorted(
+                (parents[gid] for gid in {a.incident_group_id for a in group} if gid in parents),
+                key=lambda p: p.id
+            )
+            if group_parents:
+                parent = group_parents[0]
+                group = [a for a in group if a.incident_group_id in (None, parent.incident_group_id)]
+            else:
+                parent = self._create_parent_alert(group, uuid.uuid4())
+                new_parents.append(parent)
+            plans.append((group, parent))
+
+        if new_parents:
+            self.db.add_all(new_parents)
+            self.db.flush()
+
+        membership = []
+        incident_groups = []
+        for group, parent in plans:
+            child_ids = set((parent.alert_metadata or {}).get('child_alert_ids') or [])
+            child_ids.update(a.id for a in group)
+
+            membership.extend(
+                {'id': a.id, 'incident_group_id': parent.incident_group_id, 'correlation_group_id': parent.id}
+                for a in group
+                if a.incident_group_id != parent.incident_group_id or a.correlation_group_id != parent.id
+            )
+            parent.alert_metadata = {
+                **(parent.alert_metadata or {}),
+                'is_parent_alert': True,
+                'child_alert_count': len(child_ids),
+                'child_alert_ids': sorted(child_ids)
+            }
+            parent.severity = max([parent.severity] + [a.severity for a in group], key=SEVERITY_RANK.get)
+
+            incident_groups.append({
+                'incident_group_id': str(parent.incident_group_id),
+                'parent_alert_id': parent.id,
+                'child_alert_count': len(child_ids),
+                'alerts': [a.id for a in group]
+            })
+
+        if membership:
+            # ORM bulk UPDATE by primary key: one executemany for every child
+            self.db.execute(update(CommitteeAlert), membership)
+        self.db.commit()
+
+        logger.info(
+            f"Correlated {sum(len(g) for g, _ in plans)} alerts into {len(plans)} incidents "
+            f"({len(new_parents)} new)"
+        )
+        return incident_groups
+
     def _create_parent_alert(
         self,
         child_alerts: List[CommitteeAlert],
         incident_group_id: uuid.UUID
     ) -> CommitteeAlert:
-        """Create parent alert for incident group."""
-        from app.models.committee_alert import AlertSeverity, CommitteeType
-        
+        """Build (unsaved) parent alert for incident group."""
         # Determine highest severity
-        severities = [a.severity for a in child_alerts]
-        max_severity = max(severities, key=lambda s: s.value)
-        
+        max_severity = max((a.severity for a in child_alerts), key=SEVERITY_RANK.get)
+
         # Create summary
         title = f"Incident Group: {len(child_alerts)} Related Anomalies"
         description = f"Grouped {len(child_alerts)} related anomalies:\n"
@@ -205,8 +355,8 @@ class AlertCorrelationService:
             description += f"- {alert.title}\n"
         if len(child_alerts) > 5:
             description += f"... and {len(child_alerts) - 5} more"
-        
-        parent = CommitteeAlert(
+
+        return CommitteeAlert(
             property_id=child_alerts[0].property_id,
             alert_type=AlertType.ANOMALY_DETECTED,
             severity=max_severity,
@@ -215,15 +365,9 @@ class AlertCorrelationService:
             description=description,
             assigned_committee=CommitteeType.RISK_COMMITTEE,
             incident_group_id=incident_group_id,
-            metadata={
+            alert_metadata={
                 'is_parent_alert': True,
                 'child_alert_count': len(child_alerts),
                 'child_alert_ids': [a.id for a in child_alerts]
             }
         )
-        
-        self.db.add(parent)
-        self.db.commit()
-        self.db.refresh(parent)
-        
-        return parent
@@ -49,7 +49,8 @@ class AlertCreationService:
         property_id: int,
         period_id: int,
         evaluation_result: Dict[str, Any],
-        metrics: Optional[FinancialMetrics] = None
+        metrics: Optional[FinancialMetrics] = None,
+        commit: bool = True
     ) -> Optional[CommitteeAlert]:
         """
         Create a CommitteeAlert from rule evaluation result
@@ -60,6 +61,9 @@ class AlertCreationService:
             period_id: Financial period ID
             evaluation_result: Result from AlertRulesService.evaluate_rule()
             metrics: FinancialMetrics object
+            commit: Commit the alert and run its follow-up actions (notifications,
+                workflow lock). With False the alert is only flushed, errors are
+                raised, and the caller commits and then calls run_follow_up_actions.
         
         Returns:
             Created CommitteeAlert or None if duplicate
@@ -127,6 +131,9 @@ class AlertCreationService:
             )
             
             self.db.add(alert)
+            if not commit:
+                self.db.flush()
+                return alert
             self.db.commit()
             self.db.refresh(alert)
             
@@ -135,29 +142,12 @@ class AlertCreationService:
                 f"(property {property_id}, period {period_id})"
             )
             
-            # Send notifications (non-blocking)
-            try:
-                notification_service = AlertNotificationService(self.db)
-                notification_service.notify_alert_created(alert)
-            except Exception as e:
-                logger.error(f"Error sending notifications for alert {alert.id}: {str(e)}")
-                # Don't fail alert creation if notification fails
-            
-            # Create workflow lock for critical/urgent alerts that require approval
-            if (
-                severity in [AlertSeverity.CRITICAL, AlertSeverity.URGENT]
-                and alert.requires_approval
-                and self._workflow_lock_supported()
-            ):
-                try:
-                    self._create_workflow_lock_for_alert(alert)
-                except Exception as e:
-                    logger.error(f"Error creating workflow lock for alert {alert.id}: {str(e)}")
-                    # Don't fail alert creation if lock creation fails
-            
+            self.run_follow_up_actions(alert)
             return alert
         
         except Exception as e:
+            if not commit:
+                raise
             logger.error(
                 f"Error creating alert from rule {rule.id}: {str(e)}",
                 exc_info=True
@@ -165,6 +155,28 @@ class AlertCreationService:
             self.db.rollback()
             return None
     
+    def run_follow_up_actions(self, alert: CommitteeAlert) -> None:
+        """Notifications and workflow lock for a committed alert (non-blocking)"""
+        # Send notifications (non-blocking)
+        try:
+            notification_service = AlertNotificationService(self.db)
+            notification_service.notify_alert_created(alert)
+        except Exception as e:
+            logger.error(f"Error sending notifications for alert {alert.id}: {str(e)}")
+            # Don't fail alert creation if notification fails
+        
+        # Create workflow lock for critical/urgent alerts that require approval
+        if (
+            alert.severity in [AlertSeverity.CRITICAL, AlertSeverity.URGENT]
+            and alert.requires_approval
+            and self._workflow_lock_supported()
+        ):
+            try:
+                self._create_workflow_lock_for_alert(alert)
+            except Exception as e:
+                logger.error(f"Error creating workflow lock for alert {alert.id}: {str(e)}")
+                # Don't fail alert creation if lock creation fails
+    
     def _map_rule_to_alert_type(
         self,
         rule: AlertRule,
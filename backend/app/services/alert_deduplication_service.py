@@ -8,15 +8,25 @@ Updates existing alerts instead of creating new ones.
 from typing import Dict, Optional, Any, List
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, case, cast, func, literal
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 import logging
 import hashlib
-import json
 
-from app.models.committee_alert import CommitteeAlert, AlertType, AlertStatus
+from app.models.committee_alert import CommitteeAlert, AlertType, AlertStatus, AlertSeverity, CommitteeType, SEVERITY_RANK
 
 logger = logging.getLogger(__name__)
 
+# Statuses covered by the partial unique index on committee_alerts.dedup_key
+OPEN_STATUSES = [AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED]
+
+SEVERITY_MAP = {
+    'info': AlertSeverity.INFO,
+    'low': AlertSeverity.WARNING,
+    'medium': AlertSeverity.WARNING,
+    'high': AlertSeverity.URGENT,
+    'critical': AlertSeverity.CRITICAL
+}
 
 class AlertDeduplicationService:
     """
@@ -71,30 +81,96 @@ class AlertDeduplicationService:
         key_string = '|'.join(key_parts)
         return hashlib.md5(key_string.encode()).hexdigest()
     
+    def deduplicate_alerts(
+        self,
+        alerts_data: List[Dict[str, Any]]
+    ) -> List[CommitteeAlert]:
+        """
+        Deduplicate a batch of alerts (e.g. one anomaly detection run) in one statement.
+        
+        Alerts sharing a dedup key within the batch are merged first, then the batch is
+        written with a single INSERT ... ON CONFLICT (dedup_key) DO UPDATE against the
+        partial unique index on open alerts: new keys create ACTIVE alerts, existing
+        open alerts get the new occurrences appended and their severity raised.
+        
+        Args:
+            alerts_data: Alert data dictionaries
+            
+        Returns:
+            One CommitteeAlert per distinct dedup key, in first-seen order
+        """
+        if not alerts_data:
+            return []
+        
+        now = datetime.utcnow()
+        rows: Dict[str, Dict[str, Any]] = {}
+        for alert_data in alerts_data:
+            dedup_key = self._generate_dedup_key(alert_data)
+            occurrence = self._occurrence(alert_data, now)
+            severity = self._map_severity(alert_data)
+            row = rows.get(dedup_key)
+            if row is None:
+                rows[dedup_key] = self._new_alert_row(alert_data, dedup_key, severity, [occurrence], now)
+                continue
+            row['metadata']['occurrences'].append(occurrence)
+            row['metadata']['occurrence_count'] = len(row['metadata']['occurrences'])
+            if SEVERITY_RANK[severity] > SEVERITY_RANK[row['severity']]:
+                row['severity'] = severity
+        
+        table = CommitteeAlert.__table__
+        stmt = pg_insert(table).values(list(rows.values()))
+        excluded = stmt.excluded
+        
+        merged_metadata = self._merged_metadata_sql(table.c['metadata'], excluded['metadata'], now)
+        raised_severity = case(
+            (self._severity_rank_sql(excluded.severity) > self._severity_rank_sql(table.c.severity), excluded.severity),
+            else_=table.c.severity
+        )
+        
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.dedup_key],
+            index_where=table.c.status.in_(OPEN_STATUSES),
+            set_={
+                'metadata': merged_metadata,
+                'severity': raised_severity,
+                'updated_at': now,
+            }
+        ).returning(
+            table.c.id,
+            table.c.dedup_key,
+            # Updated rows get a fresh updated_at; inserted rows still carry created_at == updated_at
+            (table.c.created_at == table.c.updated_at).label('inserted')
+        )
+        
+        returned = self.db.execute(stmt).all()
+        self.db.commit()
+        
+        ids_by_key = {row.dedup_key: row.id for row in returned}
+        created = sum(1 for row in returned if row.inserted)
+        alerts_by_id = {
+            alert.id: alert
+            for alert in self.db.query(CommitteeAlert).filter(CommitteeAlert.id.in_(list(ids_by_key.values()))).all()
+        }
+        
+        logger.info(
+            f"Deduplicated {len(alerts_data)} alerts into {len(rows)} keys: "
+            f"{created} created, {len(returned) - created} updated"
+        )
+        
+        return [alerts_by_id[ids_by_key[key]] for key in rows if ids_by_key.get(key) in alerts_by_id]
+    
     def _find_existing_alert(
         self,
         dedup_key: str,
         alert_data: Dict[str, Any]
     ) -> Optional[CommitteeAlert]:
-        """Find existing alert matching deduplication criteria."""
-        # Query by deduplication criteria
-        query = self.db.query(CommitteeAlert).filter(
+        """Find the open alert with this deduplication key (uses the partial unique index)."""
+        return self.db.query(CommitteeAlert).filter(
             and_(
-                CommitteeAlert.property_id == alert_data.get('property_id'),
-                CommitteeAlert.related_metric == (alert_data.get('related_metric') or alert_data.get('field_name')),
-                CommitteeAlert.alert_type == AlertType.ANOMALY_DETECTED,
-                CommitteeAlert.status.in_([AlertStatus.ACTIVE, AlertStatus.ACKNOWLEDGED])
-            )
-        )
-        
-        # If period_id available, filter by it
-        if alert_data.get('period_id'):
-            # Check metadata for period_id
-            query = query.filter(
-                func.jsonb_extract_path_text(CommitteeAlert.metadata, 'period_id') == str(alert_data['period_id'])
+                CommitteeAlert.dedup_key == dedup_key,
+                CommitteeAlert.status.in_(OPEN_STATUSES)
             )
-        
-        return query.order_by(CommitteeAlert.created_at.desc()).first()
+        ).first()
     
     def _update_existing_alert(
         self,
@@ -102,34 +178,19 @@ class AlertDeduplicationService:
         alert_data: Dict[str, Any]
     ) -> CommitteeAlert:
         """Update existing alert with new information."""
-        # Update metadata with new occurrence
-        if not existing.metadata:
-            existing.metadata = {}
+        # Update metadata with new occurrence (reassigned so the JSONB change is flushed)
+        metadata = dict(existing.alert_metadata or {})
+        occurrences = list(metadata.get('occurrences', []))
+        occurrences.append(self._occurrence(alert_data, datetime.utcnow()))
         
-        if 'occurrences' not in existing.metadata:
-            existing.metadata['occurrences'] = []
-        
-        existing.metadata['occurrences'].append({
-            'timestamp': datetime.utcnow().isoformat(),
-            'severity': alert_data.get('severity'),
-            'anomaly_id': alert_data.get('anomaly_id')
-        })
-        
-        existing.metadata['last_updated'] = datetime.utcnow().isoformat()
-        existing.metadata['occurrence_count'] = len(existing.metadata['occurrences'])
+        metadata['occurrences'] = occurrences
+        metadata['last_updated'] = datetime.utcnow().isoformat()
+        metadata['occurrence_count'] = len(occurrences)
+        existing.alert_metadata = metadata
         
         # Update severity if new one is higher
-        from app.models.committee_alert import AlertSeverity
-        severity_map = {
-            'info': AlertSeverity.INFO,
-            'low': AlertSeverity.WARNING,
-            'medium': AlertSeverity.WARNING,
-            'high': AlertSeverity.URGENT,
-            'critical': AlertSeverity.CRITICAL
-        }
-        
-        new_severity = severity_map.get(alert_data.get('severity', 'medium').lower(), AlertSeverity.WARNING)
-        if new_severity.value > existing.severity.value:
+        new_severity = self._map_severity(alert_data)
+        if SEVERITY_RANK[new_severity] > SEVERITY_RANK.get(existing.severity, 0):
             existing.severity = new_severity
         
         # Update timestamp
@@ -138,7 +199,7 @@ class AlertDeduplicationService:
         self.db.commit()
         self.db.refresh(existing)
         
-        logger.info(f"Updated existing alert {existing.id} (occurrence count: {existing.metadata.get('occurrence_count', 1)})")
+        logger.info(f"Updated existing alert {existing.id} (occurrence count: {metadata['occurrence_count']})")
         
         return existing
     
@@ -148,38 +209,13 @@ class AlertDeduplicationService:
         dedup_key: str
     ) -> CommitteeAlert:
         """Create new alert with deduplication key."""
-        from app.models.committee_alert import AlertSeverity, CommitteeType
-        
-        severity_map = {
-            'info': AlertSeverity.INFO,
-            'low': AlertSeverity.WARNING,
-            'medium': AlertSeverity.WARNING,
-            'high': AlertSeverity.URGENT,
-            'critical': AlertSeverity.CRITICAL
-        }
-        
-        severity = severity_map.get(alert_data.get('severity', 'medium').lower(), AlertSeverity.WARNING)
-        
-        metadata = alert_data.get('metadata', {})
-        metadata['dedup_key'] = dedup_key
-        metadata['occurrences'] = [{
-            'timestamp': datetime.utcnow().isoformat(),
-            'severity': alert_data.get('severity'),
-            'anomaly_id': alert_data.get('anomaly_id')
-        }]
-        metadata['occurrence_count'] = 1
-        
-        alert = CommitteeAlert(
-            property_id=alert_data.get('property_id'),
-            alert_type=AlertType.ANOMALY_DETECTED,
-            severity=severity,
-            status=AlertStatus.ACTIVE,
-            title=alert_data.get('title', 'Anomaly Detected'),
-            description=alert_data.get('description', ''),
-            assigned_committee=CommitteeType.RISK_COMMITTEE,
-            related_metric=alert_data.get('related_metric') or alert_data.get('field_name'),
-            metadata=metadata
+        now = datetime.utcnow()
+        row = self._new_alert_row(
+            alert_data, dedup_key, self._map_severity(alert_data), [self._occurrence(alert_data, now)], now
         )
+        row['alert_metadata'] = row.pop('metadata')
+        
+        alert = CommitteeAlert(**row)
         
         self.db.add(alert)
         self.db.commit()
@@ -188,3 +224,71 @@ class AlertDeduplicationService:
         logger.info(f"Created new alert {alert.id} with dedup_key {dedup_key}")
         
         return alert
+    
+    def _new_alert_row(
+        self,
+        alert_data: Dict[str, Any],
+        dedup_key: str,
+        severity: AlertSeverity,
+        occurrences: List[Dict[str, Any]],
+        now: datetime
+    ) -> Dict[str, Any]:
+        """Column values for a new deduplicated anomaly alert (keyed by table column name)."""
+        metadata = dict(alert_data.get('metadata') or {})
+        metadata['dedup_key'] = dedup_key
+        metadata['occurrences'] = occurrences
+        metadata['occurrence_count'] = len(occurrences)
+        if alert_data.get('period_id') and 'period_id' not in metadata:
+            metadata['period_id'] = alert_data['period_id']
+        
+        return {
+            'property_id': alert_data.get('property_id'),
+            'financial_period_id': alert_data.get('period_id'),
+            'alert_type': AlertType.ANOMALY_DETECTED,
+            'severity': severity,
+            'status': AlertStatus.ACTIVE,
+            'title': alert_data.get('title', 'Anomaly Detected'),
+            'description': alert_data.get('description', ''),
+            'assigned_committee': CommitteeType.RISK_COMMITTEE,
+            'requires_approval': True,
+            'related_metric': alert_data.get('related_metric') or alert_data.get('field_name'),
+            'dedup_key': dedup_key,
+            'metadata': metadata,
+            'triggered_at': now,
+            'created_at': now,
+            'updated_at': now,
+        }
+    
+    @staticmethod
+    def _occurrence(alert_data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        return {
+            'timestamp': now.isoformat(),
+            'severity': alert_data.get('severity'),
+            'anomaly_id': alert_data.get('anomaly_id')
+        }
+    
+    @staticmethod
+    def _map_severity(alert_data: Dict[str, Any]) -> AlertSeverity:
+        return SEVERITY_MAP.get((alert_data.get('severity') or 'medium').lower(), AlertSeverity.WARNING)
+    
+    @staticmethod
+    def _merged_metadata_sql(current, new, now: datetime):
+        """SQL for an open alert's metadata with the new occurrences appended (ON CONFLICT update)."""
+        occurrences = func.coalesce(
+            current['occurrences'], cast(literal('[]'), JSONB)
+        ).op('||')(new['occurrences'])
+        return func.coalesce(current, cast(literal('{}'), JSONB)).op('||')(
+            func.jsonb_build_object(
+                'occurrences', occurrences,
+                'occurrence_count', func.jsonb_array_length(occurrences),
+                'last_updated', now.isoformat()
+            )
+        )
+    
+    @staticmethod
+    def _severity_rank_sql(column):
+        """SQL CASE expression ranking a severity column like SEVERITY_RANK."""
+        return case(
+            *[(column == severity.name, rank) for severity, rank in SEVERITY_RANK.items()],
+            else_=0
+        )
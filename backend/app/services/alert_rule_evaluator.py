@@ -0,0 +1,279 @@
+"""
+Compiled Alert Rule Evaluator
+
+Turns the active alert rule set into column predicates over a financial_metrics
+DataFrame and evaluates every rule against every (property, period) target in
+vectorized form. Lagged (previous period) and rolling z-score columns are computed
+once per metric with window functions, so percentage_change and z_score rules need
+no per-rule history queries.
+
+Only the hits come back as RuleHit objects; cooldown handling, execution tracking
+and alert creation are applied to those by AlertRulesService / AlertTriggerService.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Integer, Numeric, and_
+from sqlalchemy.orm import Session
+
+from app.models.alert_rule import AlertRule, RuleCondition
+from app.models.financial_metrics import FinancialMetrics
+from app.models.financial_period import FinancialPeriod
+
+Target = Tuple[int, int]  # (property_id, period_id)
+
+# Common metric aliases accepted in AlertRule.field_name
+METRIC_ALIASES = {
+    "dscr": "dscr",
+    "debt_service_coverage_ratio": "dscr",
+    "ltv": "ltv",
+    "loan_to_value": "ltv",
+    "occupancy": "occupancy_rate",
+    "occupancy_rate": "occupancy_rate",
+    "noi": "net_operating_income",
+    "net_operating_income": "net_operating_income",
+    "debt_yield": "debt_yield",
+    "interest_coverage": "interest_coverage_ratio",
+    "current_ratio": "current_ratio",
+    "debt_to_equity": "debt_to_equity_ratio",
+}
+
+EQUALS_TOLERANCE = 0.01
+ZSCORE_WINDOW = 12  # Periods of history (including the current one)
+ZSCORE_MIN_PERIODS = 3
+
+LAG_SUFFIX = "__prev"
+ZSCORE_SUFFIX = "__z"
+
+_LAG_CONDITIONS = {RuleCondition.PERCENTAGE_CHANGE.value}
+_ZSCORE_CONDITIONS = {RuleCondition.Z_SCORE.value}
+
+_METRIC_COLUMNS = {
+    c.name for c in FinancialMetrics.__table__.columns
+    if isinstance(c.type, (Numeric, Integer)) and c.name not in ("id", "property_id", "period_id")
+}
+
+
+def resolve_metric_column(field_name: Optional[str]) -> Optional[str]:
+    """Map a rule field name (column or alias) to a financial_metrics column."""
+    if not field_name:
+        return None
+    if field_name in _METRIC_COLUMNS:
+        return field_name
+    alias = METRIC_ALIASES.get(field_name.lower())
+    if alias in _METRIC_COLUMNS:
+        return alias
+    return None
+
+
+def _condition_value(condition: Any) -> str:
+    if condition is None:
+        return ""
+    if hasattr(condition, "value"):
+        return str(condition.value)
+    return str(condition)
+
+
+@dataclass
+class CompiledRule:
+    """One active rule reduced to a metric column, a condition and a numeric threshold."""
+    index: int
+    rule: AlertRule
+    column: str
+    condition: str
+    threshold: float
+    property_id: Optional[int]  # None for global rules
+
+    def applies_to(self, property_ids: np.ndarray) -> np.ndarray:
+        if self.property_id is None:
+            return np.ones(len(property_ids), dtype=bool)
+        return property_ids == self.property_id
+
+
+@dataclass
+class RuleHit:
+    """A (rule, property, period) combination whose condition is met."""
+    rule: AlertRule
+    rule_index: int
+    property_id: int
+    period_id: int
+    actual_value: float
+    threshold_value: float
+    breach_magnitude: float
+    condition: str
+    details: Dict[str, float] = field(default_factory=dict)
+
+
+def compile_rules(rules: Sequence[AlertRule]) -> List[CompiledRule]:
+    """
+    Compile rules into column predicates.
+
+    Mirrors AlertRulesService.evaluate_rule: rules without a usable threshold or
+    whose field is not a metrics column can never trigger and are dropped.
+    """
+    compiled = []
+    for index, rule in enumerate(rules):
+        column = resolve_metric_column(rule.field_name)
+        threshold = float(rule.threshold_value) if rule.threshold_value else None
+        if column is None or threshold is None:
+            continue
+        is_global = rule.property_specific is not None and not rule.property_specific
+        compiled.append(CompiledRule(
+            index=index,
+            rule=rule,
+            column=column,
+            condition=_condition_value(rule.condition),
+            threshold=threshold,
+            property_id=None if is_global else rule.property_id,
+        ))
+    return compiled
+
+
+def add_window_columns(
+    frame: pd.DataFrame,
+    lag_columns: Iterable[str],
+    zscore_columns: Iterable[str],
+    window: int = ZSCORE_WINDOW,
+    min_periods: int = ZSCORE_MIN_PERIODS
+) -> pd.DataFrame:
+    """
+    Add previous-period ("<col>__prev") and rolling z-score ("<col>__z") columns.
+
+    The frame must be sorted by property_id, period_end_date. Windows run over the
+    property's periods; periods without metrics are NaN and do not count toward
+    min_periods. A zero standard deviation gives a z-score of 0.
+    """
+    lag_columns = list(lag_columns)
+    zscore_columns = list(zscore_columns)
+    if not lag_columns and not zscore_columns:
+        return frame
+
+    grouped = frame.groupby("property_id", sort=False)
+    for column in lag_columns:
+        frame[column + LAG_SUFFIX] = grouped[column].shift(1)
+
+    if zscore_columns:
+        rolling = grouped[zscore_columns].rolling(window, min_periods=min_periods)
+        mean = rolling.mean().reset_index(level=0, drop=True)
+        std = rolling.std(ddof=1).reset_index(level=0, drop=True)
+        for column in zscore_columns:
+            col_std = std[column]
+            z = (frame[column] - mean[column]) / col_std.where(col_std != 0)
+            frame[column + ZSCORE_SUFFIX] = z.where(col_std != 0, 0.0).where(col_std.notna())
+    return frame
+
+
+class CompiledAlertEvaluator:
+    """Evaluates a compiled rule set against a metrics frame in one vectorized pass per rule."""
+
+    def __init__(self, rules: Sequence[AlertRule]):
+        self.rules = compile_rules(rules)
+        self.columns = sorted({r.column for r in self.rules})
+        self.lag_columns = sorted({r.column for r in self.rules if r.condition in _LAG_CONDITIONS})
+        self.zscore_columns = sorted({r.column for r in self.rules if r.condition in _ZSCORE_CONDITIONS})
+
+    def load_frame(self, db: Session, property_ids: Sequence[int]) -> pd.DataFrame:
+        """
+        One row per financial period of the given properties with the metric columns
+        the rules need (NaN where a period has no metrics), sorted for window functions.
+        """
+        metric_attrs = [getattr(FinancialMetrics, c) for c in self.columns]
+        rows = db.query(
+            FinancialPeriod.property_id,
+            FinancialPeriod.id.label("period_id"),
+            FinancialPeriod.period_end_date,
+            *metric_attrs
+        ).outerjoin(
+            FinancialMetrics,
+            and_(
+                FinancialMetrics.period_id == FinancialPeriod.id,
+                FinancialMetrics.property_id == FinancialPeriod.property_id
+            )
+        ).filter(
+            FinancialPeriod.property_id.in_(list(property_ids))
+        ).all()
+
+        frame = pd.DataFrame(
+            [tuple(row) for row in rows],
+            columns=["property_id", "period_id", "period_end_date", *self.columns]
+        )
+        return self.prepare_frame(frame)
+
+    def prepare_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Coerce metric columns to float, sort, and add the lag/z-score columns."""
+        for column in self.columns:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce").astype(float)
+        frame = frame.sort_values(["property_id", "period_end_date", "period_id"], kind="stable")
+        frame = frame.reset_index(drop=True)
+        return add_window_columns(frame, self.lag_columns, self.zscore_columns)
+
+    def evaluate(self, frame: pd.DataFrame, targets: Optional[Set[Target]] = None) -> List[RuleHit]:
+        """Return every rule hit among the target rows (all rows when targets is None)."""
+        if not self.rules or frame.empty:
+            return []
+
+        if targets is not None:
+            keys = pd.MultiIndex.from_arrays([frame["property_id"], frame["period_id"]])
+            frame = frame[keys.isin(list(targets))]
+            if frame.empty:
+                return []
+
+        property_ids = frame["property_id"].to_numpy()
+        period_ids = frame["period_id"].to_numpy()
+        hits: List[RuleHit] = []
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for compiled in self.rules:
+                values = frame[compiled.column].to_numpy(dtype=float)
+                mask, breach, details = self._predicate(compiled, frame, values)
+                if mask is None:
+                    continue
+                mask &= compiled.applies_to(property_ids)
+                for i in np.flatnonzero(mask):
+                    hits.append(RuleHit(
+                        rule=compiled.rule,
+                        rule_index=compiled.index,
+                        property_id=int(property_ids[i]),
+                        period_id=int(period_ids[i]),
+                        actual_value=float(values[i]),
+                        threshold_value=compiled.threshold,
+                        breach_magnitude=float(breach[i]),
+                        condition=compiled.condition,
+                        details={k: float(v[i]) for k, v in details.items()},
+                    ))
+        return hits
+
+    @staticmethod
+    def _predicate(compiled: CompiledRule, frame: pd.DataFrame, values: np.ndarray):
+        """(mask, breach_magnitude, detail columns) for one rule; mask None if unsupported."""
+        threshold = compiled.threshold
+        condition = compiled.condition
+        zeros = np.zeros(len(values))
+
+        if condition in ("less_than", "greater_than"):
+            mask = values < threshold if condition == "less_than" else values > threshold
+            breach = (values - threshold) / threshold if threshold != 0 else zeros
+            return mask, breach, {}
+
+        if condition == "equals":
+            return np.abs(values - threshold) < EQUALS_TOLERANCE, zeros, {}
+
+        if condition == "not_equals":
+            return np.abs(values - threshold) >= EQUALS_TOLERANCE, zeros, {}
+
+        if condition == RuleCondition.PERCENTAGE_CHANGE.value:
+            # Threshold is a percentage (10.0 = 10%); breach is the signed fractional change
+            previous = frame[compiled.column + LAG_SUFFIX].to_numpy(dtype=float)
+            change = np.where(previous != 0, (values - previous) / np.abs(previous), np.nan)
+            mask = np.abs(change) * 100 >= abs(threshold)
+            return mask, change, {"previous_value": previous, "percentage_change": change * 100}
+
+        if condition == RuleCondition.Z_SCORE.value:
+            z = frame[compiled.column + ZSCORE_SUFFIX].to_numpy(dtype=float)
+            mask = np.abs(z) >= abs(threshold)
+            breach = (np.abs(z) - abs(threshold)) / abs(threshold)
+            return mask, breach, {"z_score": z}
+
+        return None, zeros, {}
@@ -4,7 +4,7 @@ Evaluates alert rules against financial metrics and determines if alerts should
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from decimal import Decimal
 from datetime import datetime, timedelta
 import logging
@@ -14,6 +14,7 @@ from app.models.alert_rule import AlertRule, RuleType, RuleCondition
 from app.models.financial_metrics import FinancialMetrics
 from app.models.property import Property
 from app.models.financial_period import FinancialPeriod
+from app.services.alert_rule_evaluator import CompiledAlertEvaluator, METRIC_ALIASES, RuleHit, Target
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +64,16 @@ class AlertRulesService:
             query = query.filter(AlertRule.rule_type == rule_type)
         
         return query.all()
+
+    def get_active_rules_for_properties(self, property_ids: Sequence[int]) -> List[AlertRule]:
+        """Active global rules plus the property-specific rules of any of the given properties."""
+        return self.db.query(AlertRule).filter(
+            AlertRule.is_active == True,
+            or_(
+                AlertRule.property_id.in_(list(property_ids)),
+                AlertRule.property_specific == False
+            )
+        ).order_by(AlertRule.id).all()
     
     def evaluate_rule(
         self,
@@ -195,18 +206,120 @@ class AlertRulesService:
         Returns:
             List of evaluation results (only triggered rules)
         """
-        rules = self.get_active_rules(property_id=property_id)
-        results = []
-        
-        for rule in rules:
-            result = self.evaluate_rule(rule, property_id, period_id, metrics, ignore_cooldown=ignore_cooldown)
-            if result.get("triggered"):
-                results.append({
-                    "rule": rule,
-                    **result
-                })
-        
+        target = (property_id, period_id)
+        overrides = {target: metrics} if metrics is not None else None
+        return self.evaluate_rules_bulk([target], ignore_cooldown=ignore_cooldown, metrics_overrides=overrides).get(target, [])
+
+    def evaluate_rules_bulk(
+        self,
+        targets: Sequence[Target],
+        ignore_cooldown: bool = False,
+        metrics_overrides: Optional[Dict[Target, FinancialMetrics]] = None
+    ) -> Dict[Target, List[Dict[str, Any]]]:
+        """
+        Evaluate all active rules for many (property_id, period_id) targets at once
+
+        Rules are loaded once and compiled into column predicates; metrics for the
+        target properties (with lag and z-score window columns) are loaded in one
+        query. Cooldown and execution tracking are then applied to the hits only,
+        in target order: a rule in cooldown drops all its hits, and a rule with a
+        cooldown period keeps only its first hit, as sequential evaluation would.
+
+        Args:
+            targets: (property_id, period_id) pairs, in evaluation order
+            ignore_cooldown: Evaluate rules even if they are in cooldown
+            metrics_overrides: FinancialMetrics objects to use instead of stored rows
+
+        Returns:
+            {(property_id, period_id): [triggered results in rule order]}
+        """
+        targets = list(dict.fromkeys(targets))
+        if not targets:
+            return {}
+
+        property_ids = sorted({property_id for property_id, _ in targets})
+        evaluator = CompiledAlertEvaluator(self.get_active_rules_for_properties(property_ids))
+        if not evaluator.rules:
+            return {}
+
+        frame = evaluator.load_frame(self.db, property_ids)
+        if metrics_overrides:
+            frame = self._apply_metrics_overrides(evaluator, frame, metrics_overrides)
+        hits = evaluator.evaluate(frame, set(targets))
+
+        order = {target: i for i, target in enumerate(targets)}
+        hits.sort(key=lambda h: (order[(h.property_id, h.period_id)], h.rule_index))
+
+        hits_by_rule: Dict[int, List[RuleHit]] = {}
+        for hit in hits:
+            hits_by_rule.setdefault(hit.rule_index, []).append(hit)
+
+        kept: List[RuleHit] = []
+        now = datetime.utcnow()
+        for rule_hits in hits_by_rule.values():
+            rule = rule_hits[0].rule
+            if not ignore_cooldown:
+                if rule.is_in_cooldown():
+                    continue
+                if rule.cooldown_period:
+                    rule_hits = rule_hits[:1]
+            rule.execution_count = (rule.execution_count or 0) + len(rule_hits)
+            rule.last_triggered_at = now
+            kept.extend(rule_hits)
+
+        if kept:
+            self.db.commit()
+
+        kept.sort(key=lambda h: (order[(h.property_id, h.period_id)], h.rule_index))
+        results: Dict[Target, List[Dict[str, Any]]] = {}
+        for hit in kept:
+            results.setdefault((hit.property_id, hit.period_id), []).append(self._hit_to_result(hit))
         return results
+
+    def _apply_metrics_overrides(
+        self,
+        evaluator: CompiledAlertEvaluator,
+        frame,
+        metrics_overrides: Dict[Target, FinancialMetrics]
+    ):
+        """Replace stored metric values with in-memory FinancialMetrics (may be uncommitted)."""
+        raw = frame[["property_id", "period_id", "period_end_date", *evaluator.columns]].copy()
+        for (property_id, period_id), metrics in metrics_overrides.items():
+            if metrics is None:
+                continue
+            row = (raw["property_id"] == property_id) & (raw["period_id"] == period_id)
+            if not row.any():
+                continue
+            for column in evaluator.columns:
+                value = getattr(metrics, column, None)
+                raw.loc[row, column] = float(value) if value is not None else None
+        return evaluator.prepare_frame(raw)
+
+    def _hit_to_result(self, hit: RuleHit) -> Dict[str, Any]:
+        """Shape a RuleHit like a triggered evaluate_rule() result."""
+        rule = hit.rule
+        severity = self._determine_severity(rule, hit.breach_magnitude, hit.actual_value, hit.threshold_value)
+        message = self._generate_alert_message(
+            rule, hit.actual_value, hit.threshold_value, hit.breach_magnitude, hit.condition
+        )
+        metadata = {
+            "rule_id": rule.id,
+            "rule_name": rule.rule_name,
+            "field_name": rule.field_name,
+            "condition": hit.condition or None,
+            "breach_percentage": abs(hit.breach_magnitude) * 100 if hit.breach_magnitude else 0
+        }
+        metadata.update({k: v for k, v in hit.details.items() if v == v})  # drop NaN
+        return {
+            "rule": rule,
+            "triggered": True,
+            "severity": severity,
+            "actual_value": hit.actual_value,
+            "threshold_value": hit.threshold_value,
+            "breach_magnitude": hit.breach_magnitude,
+            "message": message,
+            "metadata": metadata
+        }
     
     def _get_field_value(self, field_name: str, metrics: FinancialMetrics) -> Optional[Decimal]:
         """
@@ -224,23 +337,8 @@ class AlertRulesService:
                 return Decimal(str(value))
         
         # Try common metric aliases
-        metric_aliases = {
-            "dscr": "dscr",
-            "debt_service_coverage_ratio": "dscr",
-            "ltv": "ltv",
-            "loan_to_value": "ltv",
-            "occupancy": "occupancy_rate",
-            "occupancy_rate": "occupancy_rate",
-            "noi": "net_operating_income",
-            "net_operating_income": "net_operating_income",
-            "debt_yield": "debt_yield",
-            "interest_coverage": "interest_coverage_ratio",
-            "current_ratio": "current_ratio",
-            "debt_to_equity": "debt_to_equity_ratio",
-        }
-        
-        if field_name.lower() in metric_aliases:
-            attr_name = metric_aliases[field_name.lower()]
+        if field_name.lower() in METRIC_ALIASES:
+            attr_name = METRIC_ALIASES[field_name.lower()]
             if hasattr(metrics, attr_name):
                 value = getattr(metrics, attr_name)
                 if value is not None:
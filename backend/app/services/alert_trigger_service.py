@@ -2,11 +2,13 @@
 Alert Trigger Service
 Automatically triggers alerts based on rule evaluation after document processing
 """
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import logging
 
+from app.core.config import settings
 from app.models.financial_metrics import FinancialMetrics
 from app.models.property import Property
 from app.models.financial_period import FinancialPeriod
@@ -71,38 +73,7 @@ class AlertTriggerService:
                 logger.debug(f"No rules triggered for property {property_id}, period {period_id}")
                 return []
             
-            # Create alerts for triggered rules
-            created_alerts = []
-            for result in evaluation_results:
-                try:
-                    alert = self.creation_service.create_alert_from_rule_result(
-                        rule=result["rule"],
-                        property_id=property_id,
-                        period_id=period_id,
-                        evaluation_result=result,
-                        metrics=metrics
-                    )
-                    
-                    if alert:
-                        created_alerts.append({
-                            "alert_id": alert.id,
-                            "alert_type": alert.alert_type.value if alert.alert_type else None,
-                            "severity": alert.severity.value if alert.severity else None,
-                            "title": alert.title
-                        })
-                
-                except Exception as e:
-                    logger.error(
-                        f"Error creating alert from rule {result['rule'].id}: {str(e)}",
-                        exc_info=True
-                    )
-                    continue
-            
-            logger.info(
-                f"Triggered {len(created_alerts)} alerts for property {property_id}, period {period_id}"
-            )
-            
-            return created_alerts
+            return self.create_alerts_for_results(property_id, period_id, evaluation_results, metrics)
         
         except Exception as e:
             logger.error(
@@ -112,6 +83,152 @@ class AlertTriggerService:
             # Don't fail document processing if alert generation fails
             return []
     
+    def evaluate_and_trigger_alerts_bulk(
+        self,
+        targets: List[Tuple[int, int]],
+        ignore_cooldown: bool = False
+    ) -> Dict[Tuple[int, int], List[Dict[str, Any]]]:
+        """
+        Evaluate all active rules for many (property_id, period_id) targets in one
+        vectorized pass and create alerts for the hits
+        
+        Returns:
+            {(property_id, period_id): created alerts} for targets with alerts
+        """
+        evaluation = self.rules_service.evaluate_rules_bulk(targets, ignore_cooldown=ignore_cooldown)
+        if not evaluation:
+            return {}
+        
+        # Metrics objects are only needed for the targets that produced hits
+        metrics_by_target = {
+            (m.property_id, m.period_id): m
+            for m in self.db.query(FinancialMetrics).filter(
+                tuple_(FinancialMetrics.property_id, FinancialMetrics.period_id).in_(list(evaluation))
+            ).all()
+        }
+        
+        created = {}
+        for (property_id, period_id), results in evaluation.items():
+            try:
+                alerts = self.create_alerts_for_results(
+                    property_id, period_id, results, metrics_by_target.get((property_id, period_id))
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error creating alerts for property {property_id}, period {period_id}: {str(e)}",
+                    exc_info=True
+                )
+                continue
+            if alerts:
+                created[(property_id, period_id)] = alerts
+        return created
+    
+    def create_alerts_for_results(
+        self,
+        property_id: int,
+        period_id: int,
+        evaluation_results: List[Dict[str, Any]],
+        metrics: Optional[FinancialMetrics] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Create alerts (deduplicated by AlertCreationService) for triggered rule results
+        
+        The alerts and their alert_triggered webhook outbox rows are persisted by
+        one commit, so a crash can't keep the alerts and lose their deliveries.
+        Each alert is created in a savepoint, so one failing rule doesn't discard
+        the others.
+        """
+        alerts = []
+        for result in evaluation_results:
+            savepoint = self.db.begin_nested()
+            try:
+                alert = self.creation_service.create_alert_from_rule_result(
+                    rule=result["rule"],
+                    property_id=property_id,
+                    period_id=period_id,
+                    evaluation_result=result,
+                    metrics=metrics,
+                    commit=False
+                )
+                savepoint.commit()
+            except Exception as e:
+                savepoint.rollback()
+                logger.error(
+                    f"Error creating alert from rule {result['rule'].id}: {str(e)}",
+                    exc_info=True
+                )
+                continue
+            if alert:
+                alerts.append(alert)
+        
+        created_alerts = [
+            {
+                "alert_id": alert.id,
+                "alert_type": alert.alert_type.value if alert.alert_type else None,
+                "severity": alert.severity.value if alert.severity else None,
+                "title": alert.title
+            }
+            for alert in alerts
+        ]
+        if created_alerts:
+            self._enqueue_alert_webhooks(property_id, period_id, created_alerts)
+        self.db.commit()
+        
+        logger.info(
+            f"Triggered {len(created_alerts)} alerts for property {property_id}, period {period_id}"
+        )
+        
+        if created_alerts:
+            for alert in alerts:
+                self.creation_service.run_follow_up_actions(alert)
+            self._correlate_alerts(property_id, created_alerts)
+        
+        return created_alerts
+    
+    def _correlate_alerts(self, property_id: int, created_alerts: List[Dict[str, Any]]) -> None:
+        """
+        Fold new alerts into open incidents (incremental correlation).
+        
+        Correlates by period: the alerts of one run share a property, so 'auto'
+        would pick property keys and fold every open alert of the property in.
+        """
+        if not settings.ALERT_CORRELATION_ENABLED:
+            return
+        try:
+            from app.services.alert_correlation_service import AlertCorrelationService
+            
+            AlertCorrelationService(self.db).correlate_new_alerts(
+                [a["alert_id"] for a in created_alerts], correlation_type='period'
+            )
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"Failed to correlate alerts for property {property_id}: {str(e)}")
+    
+    def _enqueue_alert_webhooks(
+        self,
+        property_id: int,
+        period_id: int,
+        created_alerts: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Add alert_triggered webhook outbox rows to the alerts' transaction (the
+        caller commits both); delivery happens in the webhook dispatcher.
+        """
+        savepoint = self.db.begin_nested()
+        try:
+            from app.services.webhook_service import WebhookService
+            
+            property_obj = self.db.query(Property).filter(Property.id == property_id).first()
+            WebhookService(self.db).trigger_webhook(
+                "alert_triggered",
+                {"property_id": property_id, "period_id": period_id, "alerts": created_alerts},
+                organization_id=getattr(property_obj, "organization_id", None)
+            )
+            savepoint.commit()
+        except Exception as e:
+            savepoint.rollback()
+            logger.warning(f"Failed to enqueue alert webhooks for property {property_id}: {str(e)}")
+    
     def evaluate_property_alerts(
         self,
         property_id: int,
@@ -135,17 +252,16 @@ class AlertTriggerService:
                 FinancialPeriod.property_id == property_id
             ).order_by(FinancialPeriod.period_end_date.desc()).all()
         
+        periods = [period for period in periods if period]
+        created = self.evaluate_and_trigger_alerts_bulk(
+            [(property_id, period.id) for period in periods]
+        )
+        
         total_alerts = 0
         alerts_by_period = {}
         
         for period in periods:
-            if not period:
-                continue
-            
-            alerts = self.evaluate_and_trigger_alerts(
-                property_id=property_id,
-                period_id=period.id
-            )
+            alerts = created.get((property_id, period.id), [])
             
             alerts_by_period[period.id] = {
                 "period_id": period.id,
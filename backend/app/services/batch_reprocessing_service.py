@@ -5,18 +5,87 @@ Handles batch reprocessing of documents for anomaly detection.
 Allows filtering by property, date range, document type, and extraction status.
 """
 
-from typing import List, Optional, Dict, Any
-from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Callable, List, Optional, Dict, Any, Iterator, Tuple
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, or_, select, update, func
 import logging
 
+from app.core.config import settings
+from app.models.anomaly_detection import AnomalyDetection
+from app.models.batch_reprocessing_item import BatchReprocessingItem
 from app.models.batch_reprocessing_job import BatchReprocessingJob
 from app.models.document_upload import DocumentUpload
+from app.models.financial_period import FinancialPeriod
 from app.models.property import Property
+from app.services.export_job_service import JOB_TYPE as EXPORT_JOB_TYPE
 
 logger = logging.getLogger(__name__)
 
+# Job counter column incremented for each checkpoint status
+STATUS_COUNTERS = {
+    'successful': 'successful_count',
+    'failed': 'failed_count',
+    'skipped': 'skipped_count',
+}
+
+# Per-document errors kept in results_summary
+MAX_ERROR_DETAILS = 100
+
+# results_summary job_type of reprocessing jobs (jobs from before job_type have none)
+JOB_TYPE = "anomaly_reprocessing"
+
+
+def is_reprocessing_job(job: BatchReprocessingJob) -> bool:
+    """Whether a BatchReprocessingJob row is an anomaly reprocessing job (not an export or backfill)."""
+    return (job.results_summary or {}).get("job_type", JOB_TYPE) == JOB_TYPE
+
+
+def document_filters(
+    organization_id: Optional[int] = None,
+    property_ids: Optional[List[int]] = None,
+    date_range_start: Optional[date] = None,
+    date_range_end: Optional[date] = None,
+    document_types: Optional[List[str]] = None,
+    extraction_status_filter: Optional[str] = 'all',
+) -> list:
+    """Filters selecting the DocumentUploads of a reprocessing job (tenant-scoped when organization_id is set)."""
+    filters = []
+    if organization_id:
+        filters.append(DocumentUpload.property_id.in_(
+            select(Property.id).where(Property.organization_id == organization_id)
+        ))
+
+    if property_ids:
+        filters.append(DocumentUpload.property_id.in_(property_ids))
+
+    if date_range_start:
+        filters.append(DocumentUpload.upload_date >= date_range_start)
+
+    if date_range_end:
+        filters.append(DocumentUpload.upload_date <= date_range_end)
+
+    if document_types:
+        filters.append(DocumentUpload.document_type.in_(document_types))
+
+    if extraction_status_filter and extraction_status_filter != 'all':
+        filters.append(DocumentUpload.extraction_status == extraction_status_filter)
+
+    return filters
+
+
+def job_document_filters(job: BatchReprocessingJob) -> list:
+    return document_filters(
+        organization_id=job.organization_id,
+        property_ids=job.property_ids,
+        date_range_start=job.date_range_start,
+        date_range_end=job.date_range_end,
+        document_types=job.document_types,
+        extraction_status_filter=job.extraction_status_filter,
+    )
+
 
 class BatchReprocessingService:
     """Service for managing batch reprocessing jobs."""
@@ -24,6 +93,12 @@ class BatchReprocessingService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _get_reprocessing_job(self, job_id: int) -> BatchReprocessingJob:
+        job = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
+        if not job or not is_reprocessing_job(job):
+            raise ValueError(f"Batch job {job_id} not found")
+        return job
+
     def create_batch_job(
         self,
         user_id: int,
@@ -64,28 +139,14 @@ class BatchReprocessingService:
 
         # Query documents matching filters (tenant-scoped when organization_id provided)
         query = self.db.query(DocumentUpload)
-        if organization_id:
-            query = query.join(Property, DocumentUpload.property_id == Property.id).filter(
-                Property.organization_id == organization_id
-            )
-
-        # Apply filters
-        filters = []
-        if property_ids:
-            filters.append(DocumentUpload.property_id.in_(property_ids))
-
-        if date_range_start:
-            filters.append(DocumentUpload.upload_date >= date_range_start)
-
-        if date_range_end:
-            filters.append(DocumentUpload.upload_date <= date_range_end)
-
-        if document_types:
-            filters.append(DocumentUpload.document_type.in_(document_types))
-
-        if extraction_status_filter != 'all':
-            filters.append(DocumentUpload.extraction_status == extraction_status_filter)
-
+        filters = document_filters(
+            organization_id=organization_id,
+            property_ids=property_ids,
+            date_range_start=date_range_start,
+            date_range_end=date_range_end,
+            document_types=document_types,
+            extraction_status_filter=extraction_status_filter,
+        )
         if filters:
             query = query.filter(and_(*filters))
 
@@ -114,7 +175,7 @@ class BatchReprocessingService:
             failed_count=0,
             skipped_count=0,
             results_summary={
-                "job_type": "anomaly_reprocessing"
+                "job_type": JOB_TYPE
             }
         )
 
@@ -138,10 +199,7 @@ class BatchReprocessingService:
         """
         from app.tasks.batch_reprocessing_tasks import reprocess_documents_batch
 
-        job = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
-
-        if not job:
-            raise ValueError(f"Batch job {job_id} not found")
+        job = self._get_reprocessing_job(job_id)
 
         if job.status != 'queued':
             raise ValueError(f"Batch job {job_id} is not in 'queued' status (current: {job.status})")
@@ -164,6 +222,298 @@ class BatchReprocessingService:
             "total_documents": job.total_documents
         }
 
+    def resume_batch_job(self, job_id: int) -> Dict[str, Any]:
+        """
+        Restart a failed (or stalled running) reprocessing job.
+
+        Documents already checkpointed for the job are skipped, so only the
+        unfinished remainder is reprocessed. A running job counts as stalled
+        once it has recorded no checkpoint for BATCH_REPROCESSING_STALE_MINUTES;
+        resuming one that is still making progress would start a second chord.
+        The job is claimed with a conditional UPDATE, so two concurrent resumes
+        cannot both dispatch it.
+        """
+        from app.tasks.batch_reprocessing_tasks import reprocess_documents_batch
+        from app.utils.task_idempotency import release_job_lock
+
+        job = self._get_reprocessing_job(job_id)
+
+        if job.status not in ('failed', 'running'):
+            raise ValueError(f"Batch job {job_id} cannot be resumed (current: {job.status})")
+
+        stale_before = datetime.now(timezone.utc) - timedelta(minutes=settings.BATCH_REPROCESSING_STALE_MINUTES)
+        last_activity = func.coalesce(
+            BatchReprocessingJob.updated_at, BatchReprocessingJob.started_at, BatchReprocessingJob.created_at
+        )
+        claimed = self.db.execute(
+            update(BatchReprocessingJob)
+            .where(
+                BatchReprocessingJob.id == job_id,
+                or_(
+                    BatchReprocessingJob.status == 'failed',
+                    and_(BatchReprocessingJob.status == 'running', last_activity < stale_before),
+                ),
+            )
+            .values(status='running', completed_at=None, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        if not claimed:
+            self.db.refresh(job)
+            if job.status == 'running':
+                raise ValueError(
+                    f"Batch job {job_id} is still running; it can be resumed after "
+                    f"{settings.BATCH_REPROCESSING_STALE_MINUTES} minutes without progress"
+                )
+            raise ValueError(f"Batch job {job_id} cannot be resumed (current: {job.status})")
+
+        # The claim proves no dispatch is live: drop a lock a stalled dispatcher still holds
+        release_job_lock(job_id, None)
+        task = reprocess_documents_batch.delay(job_id)
+
+        self.db.refresh(job)
+        job.celery_task_id = task.id
+        job.started_at = job.started_at or datetime.now()
+        self.db.commit()
+
+        logger.info(f"Resumed batch job {job_id} with Celery task {task.id}")
+
+        return {
+            "job_id": job.id,
+            "task_id": task.id,
+            "status": job.status,
+            "total_documents": job.total_documents,
+            "processed_documents": job.processed_documents
+        }
+
+    # ------------------------------------------------------------------
+    # Execution (called from the Celery tasks)
+    # ------------------------------------------------------------------
+
+    def _unfinished_documents(self, job: BatchReprocessingJob):
+        """Job documents without a checkpoint yet."""
+        done = select(BatchReprocessingItem.id).where(
+            BatchReprocessingItem.job_id == job.id,
+            BatchReprocessingItem.document_id == DocumentUpload.id
+        )
+        return self.db.query(DocumentUpload.id).filter(*job_document_filters(job), ~done.exists())
+
+    def iter_chunk_bounds(self, job: BatchReprocessingJob, chunk_size: int) -> Iterator[Tuple[int, int]]:
+        """
+        (after_id, last_id] document id ranges holding up to chunk_size unfinished
+        documents each, found by keyset iteration so ids are never all loaded.
+        """
+        after_id = 0
+        while True:
+            ids = [
+                document_id for (document_id,) in
+                self._unfinished_documents(job)
+                .filter(DocumentUpload.id > after_id)
+                .order_by(DocumentUpload.id)
+                .limit(chunk_size)
+            ]
+            if not ids:
+                return
+            yield after_id, ids[-1]
+            after_id = ids[-1]
+
+    def process_chunk(
+        self,
+        job_id: int,
+        after_id: int,
+        last_id: int,
+        detect: Optional[Callable[[DocumentUpload], Any]] = None,
+        raise_alerts: Optional[Callable[..., Any]] = None
+    ) -> Dict[str, int]:
+        """
+        Reprocess the job's unfinished documents with after_id < id <= last_id.
+
+        A document's checkpoint row and job counter increment commit together,
+        so parallel chunks (and redelivered ones) never count a document twice.
+        Detection commits its anomalies as it goes, so they are tagged with the
+        job and a retry of a document that was never checkpointed (worker crash,
+        redelivered task) first deletes what the earlier attempt stored. The
+        run's committee alerts are raised only after the checkpoint commits.
+        Stops early once the job is cancelled.
+        """
+        job = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
+        counts = {status: 0 for status in STATUS_COUNTERS}
+        if not job or job.status != 'running':
+            return counts
+
+        if detect is None:
+            from app.services.extraction_orchestrator import ExtractionOrchestrator
+            orchestrator = ExtractionOrchestrator(self.db)
+            detect = partial(orchestrator._detect_anomalies_for_document, batch_job_id=job_id)
+            raise_alerts = orchestrator._raise_anomaly_alerts
+
+        documents = (
+            self.db.query(DocumentUpload)
+            .filter(DocumentUpload.id.in_(
+                self._unfinished_documents(job)
+                .filter(DocumentUpload.id > after_id, DocumentUpload.id <= last_id)
+                .scalar_subquery()
+            ))
+            .order_by(DocumentUpload.id)
+            .all()
+        )
+        period_ids = {doc.period_id for doc in documents if doc.period_id}
+        known_periods = {
+            period_id for (period_id,) in
+            self.db.query(FinancialPeriod.id).filter(FinancialPeriod.id.in_(period_ids))
+        } if period_ids else set()
+
+        for doc in documents:
+            if self._job_status(job_id) != 'running':
+                logger.info(f"Batch job {job_id} no longer running, stopping chunk ({after_id}, {last_id}]")
+                break
+
+            # Pre-validate document before processing
+            validation_error = None
+            if doc.extraction_status != 'completed':
+                validation_error = f"Extraction status is '{doc.extraction_status}', not 'completed'"
+            elif not doc.period_id:
+                validation_error = "Missing period_id"
+            elif doc.period_id not in known_periods:
+                validation_error = f"Period {doc.period_id} not found in database"
+
+            if validation_error:
+                logger.warning(f"Document {doc.id} ({doc.file_name}): Skipping - {validation_error}")
+                status, error_type, reason = 'skipped', 'validation', validation_error
+            else:
+                try:
+                    self._discard_partial_detection(job_id, doc.id)
+                    detect(doc)
+                    status, error_type, reason = 'successful', None, None
+                except ValueError as e:
+                    logger.warning(f"Document {doc.id} ({doc.file_name}): Validation error - {str(e)}")
+                    self.db.rollback()  # Rollback any partial changes
+                    status, error_type, reason = 'skipped', 'validation', str(e)
+                except Exception as e:
+                    logger.error(f"Document {doc.id} ({doc.file_name}): Processing error - {str(e)}", exc_info=True)
+                    self.db.rollback()  # Rollback any partial changes
+                    status, error_type, reason = 'failed', 'error', str(e)
+
+            checkpointed = self._checkpoint(job_id, doc.id, status, error_type, reason)
+            if checkpointed:
+                counts[status] += 1
+            if raise_alerts is not None:
+                raise_alerts(discard=not checkpointed or status != 'successful')
+
+        return counts
+
+    def _discard_partial_detection(self, job_id: int, document_id: int) -> None:
+        """Delete the anomalies an earlier, uncheckpointed attempt of this job stored for a document."""
+        deleted = self.db.query(AnomalyDetection).filter(
+            AnomalyDetection.document_id == document_id,
+            AnomalyDetection.metadata_json['batch_job_id'].as_integer() == job_id
+        ).delete(synchronize_session=False)
+        if deleted:
+            self.db.commit()
+            logger.info(f"Discarded {deleted} anomalies of an interrupted attempt on document {document_id} (batch job {job_id})")
+
+    def _job_status(self, job_id: int) -> Optional[str]:
+        return self.db.query(BatchReprocessingJob.status).filter(BatchReprocessingJob.id == job_id).scalar()
+
+    def _checkpoint(self, job_id: int, document_id: int, status: str, error_type: Optional[str], reason: Optional[str]) -> bool:
+        """Record a document's outcome and bump the job counters in the current transaction, then commit."""
+        counter = STATUS_COUNTERS[status]
+        try:
+            self.db.add(BatchReprocessingItem(
+                job_id=job_id, document_id=document_id, status=status, error_type=error_type, reason=reason
+            ))
+            self.db.execute(
+                update(BatchReprocessingJob)
+                .where(BatchReprocessingJob.id == job_id)
+                .values({
+                    'processed_documents': BatchReprocessingJob.processed_documents + 1,
+                    counter: getattr(BatchReprocessingJob, counter) + 1,
+                    'updated_at': func.now(),
+                })
+                .execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            return True
+        except IntegrityError:
+            # Another (redelivered) chunk task finished this document first
+            self.db.rollback()
+            logger.info(f"Document {document_id} already checkpointed for batch job {job_id}")
+            return False
+
+    def finalize_job(self, job_id: int) -> Dict[str, Any]:
+        """
+        Settle a job after its chunk tasks: counters are recomputed from the
+        checkpoints, and the job completes unless documents remain unfinished
+        (e.g. a chunk hit its time limit), in which case it fails and can be resumed.
+        """
+        job = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
+        if not job:
+            raise ValueError(f"Batch job {job_id} not found")
+
+        counts = {status: 0 for status in STATUS_COUNTERS}
+        counts.update(
+            self.db.query(BatchReprocessingItem.status, func.count(BatchReprocessingItem.id))
+            .filter(BatchReprocessingItem.job_id == job_id)
+            .group_by(BatchReprocessingItem.status)
+            .all()
+        )
+        job.successful_count = counts['successful']
+        job.failed_count = counts['failed']
+        job.skipped_count = counts['skipped']
+        job.processed_documents = sum(counts.values())
+
+        errors = (
+            self.db.query(BatchReprocessingItem, DocumentUpload.file_name)
+            .outerjoin(DocumentUpload, DocumentUpload.id == BatchReprocessingItem.document_id)
+            .filter(BatchReprocessingItem.job_id == job_id, BatchReprocessingItem.status != 'successful')
+            .order_by(BatchReprocessingItem.document_id)
+            .limit(MAX_ERROR_DETAILS)
+            .all()
+        )
+        error_details = [
+            {"document_id": item.document_id, "file_name": file_name, "reason": item.reason, "type": item.error_type}
+            for item, file_name in errors
+        ]
+        remaining = self._unfinished_documents(job).count() if job.status == 'running' else 0
+
+        summary = dict(job.results_summary or {})
+        summary.update({
+            "total_processed": job.processed_documents,
+            "successful": job.successful_count,
+            "failed": job.failed_count,
+            "skipped": job.skipped_count,
+            "completion_time": datetime.now().isoformat(),
+            "error_details": error_details
+        })
+        summary.pop("error", None)
+        if job.status == 'running':
+            if remaining:
+                job.status = 'failed'
+                summary["error"] = f"{remaining} documents not processed; resume the job to finish them"
+            else:
+                job.status = 'completed'
+        job.completed_at = datetime.now()
+        job.results_summary = summary
+        self.db.commit()
+
+        logger.info(
+            f"Finalized batch job {job_id} ({job.status}): {job.successful_count} successful, "
+            f"{job.failed_count} failed, {job.skipped_count} skipped, {remaining} remaining"
+        )
+        return {
+            "status": job.status,
+            "job_id": job_id,
+            "total_processed": job.processed_documents,
+            "successful": job.successful_count,
+            "failed": job.failed_count,
+            "skipped": job.skipped_count,
+            "remaining": remaining,
+            "error_summary": {
+                "validation_errors": len([e for e in error_details if e.get("type") == "validation"]),
+                "processing_errors": len([e for e in error_details if e.get("type") == "error"])
+            }
+        }
+
     def get_job_status(self, job_id: int) -> Dict[str, Any]:
         """
         Get current status of batch job.
@@ -174,10 +524,7 @@ class BatchReprocessingService:
         Returns:
             Job status information
         """
-        job = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
-
-        if not job:
-            raise ValueError(f"Batch job {job_id} not found")
+        job = self._get_reprocessing_job(job_id)
 
         # Calculate progress percentage
         progress_pct = 0
@@ -223,10 +570,7 @@ class BatchReprocessingService:
         """
         from app.core.celery_config import celery_app
 
-        job = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
-
-        if not job:
-            raise ValueError(f"Batch job {job_id} not found")
+        job = self._get_reprocessing_job(job_id)
 
         if job.status not in ['queued', 'running']:
             raise ValueError(f"Cannot cancel job in status: {job.status}")
@@ -257,16 +601,23 @@ class BatchReprocessingService:
         Args:
             user_id: Filter by user
             status: Filter by status
+            job_type: Filter by job type (export jobs are managed by ExportJobService and never listed here)
             limit: Maximum number of jobs to return
 
         Returns:
             List of batch jobs
         """
-        query = self.db.query(BatchReprocessingJob)
+        job_type_expr = BatchReprocessingJob.results_summary['job_type'].astext
+        query = self.db.query(BatchReprocessingJob).filter(
+            or_(
+                BatchReprocessingJob.results_summary.is_(None),
+                job_type_expr.is_(None),
+                job_type_expr != EXPORT_JOB_TYPE
+            )
+        )
 
         if job_type:
-            job_type_expr = BatchReprocessingJob.results_summary['job_type'].astext
-            if job_type == "anomaly_reprocessing":
+            if job_type == JOB_TYPE:
                 query = query.filter(
                     or_(
                         BatchReprocessingJob.results_summary.is_(None),
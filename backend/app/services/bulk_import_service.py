@@ -27,6 +27,7 @@ from app.models.cash_flow_header import CashFlowHeader
 from app.models.balance_sheet_data import BalanceSheetData
 from app.models.property import Property
 from app.models.financial_period import FinancialPeriod
+from app.services.reference_data_cache import CHART_OF_ACCOUNTS, mark_reference_data_changed
 
 logger = logging.getLogger(__name__)
 
@@ -377,6 +378,7 @@ class BulkImportService:
                     failed += 1
 
             if imported > 0 or updated > 0:
+                mark_reference_data_changed(self.db, CHART_OF_ACCOUNTS)
                 self.db.commit()
 
             return {
@@ -0,0 +1,768 @@
+"""
+Bulk Metrics Service - set-based FinancialMetrics calculation
+
+Computes the same FinancialMetrics fields as MetricsService.calculate_all_metrics
+for many (property, period) pairs at once, for portfolio recalculations after a
+chart-of-accounts change or rule fix.
+
+Per chunk of pairs:
+- a handful of grouped aggregate queries (account lookups, pattern/range sums,
+  rent roll and mortgage aggregates, existence flags) replace the dozens of
+  small queries and the full RentRollData / MortgageStatementData row loads
+  of the per-record path
+- the results are assembled into one DataFrame indexed by (property_id,
+  period_id) and the derived ratios are applied column-wise
+- all rows are written with one INSERT ... ON CONFLICT (property_id, period_id)
+  DO UPDATE statement
+
+Column values are Decimal (object dtype) and every formula, fallback and
+"missing data" rule mirrors MetricsService, so both paths store identical values.
+"""
+import logging
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import and_, case, func, null, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.constants import account_codes, financial_thresholds
+from app.models.balance_sheet_data import BalanceSheetData
+from app.models.cash_account_reconciliation import CashAccountReconciliation
+from app.models.cash_flow_data import CashFlowData
+from app.models.cash_flow_header import CashFlowHeader
+from app.models.financial_metrics import FinancialMetrics
+from app.models.financial_period import FinancialPeriod
+from app.models.income_statement_data import IncomeStatementData
+from app.models.income_statement_header import IncomeStatementHeader
+from app.models.mortgage_statement_data import MortgageStatementData
+from app.models.rent_roll_data import RentRollData
+
+logger = logging.getLogger(__name__)
+
+KEYS = ["property_id", "period_id"]
+
+ZERO = Decimal('0')
+HUNDRED = Decimal('100')
+TWELVE = Decimal('12')
+
+# Pairs per chunk: bounds IN lists and the upsert's bind parameters (~95 per row)
+DEFAULT_CHUNK_SIZE = 300
+
+# Balance sheet accounts read directly (first row per code, as in _get_balance_sheet_account)
+BS_ACCOUNTS = {
+    "total_assets": '1999-0000',
+    "total_current_assets": '0499-9000',
+    "total_property_equipment": '1099-0000',
+    "total_other_assets": '1998-0000',
+    "total_liabilities": '2999-0000',
+    "total_current_liabilities": '2590-0000',
+    "total_long_term_liabilities": '2900-0000',
+    "total_equity": '3999-0000',
+    "land": '0510-0000',
+    "buildings": '0610-0000',
+    "accum_depr_buildings": '1061-0000',
+    "tenant_ar": '0305-0000',
+    "partners_contribution": '3050-1000',
+    "beginning_equity": '3910-0000',
+    "partners_draw": '3920-0000',
+    "distributions": '3990-0000',
+    "current_period_earnings": '3995-0000',
+}
+
+# Non-calculated balance sheet sums: ("codes", [...]) or ("range", start, end)
+BS_SUMS = {
+    "quick_receivables": ("codes", ['0305-0000', '0306-0000', '0307-0000']),
+    "total_cash": ("range", '0122', '0127'),
+    "improvements_gross": ("range", '0710', '0950'),
+    "accum_depr": ("range", '1061', '1091'),
+    "operating_cash": ("range", '0122', '0125'),
+    "restricted_cash": ("range", '1310', '1340'),
+    "intercompany_ar": ("range", '0315', '0345'),
+    "other_ar": ("codes", ['0210-0000', '0306-0000', '0307-0000', '0310-0000', '0347-0000']),
+    "short_term": ("codes", ['2197-0000', '2411-0000']),
+    "institutional": ("range", '2611', '2621'),
+    "mezzanine": ("codes", ['2611-1000', '2613-0000', '2618-0000']),
+    "shareholder": ("range", '2650', '2671'),
+}
+
+# Income statement totals read directly (first row per code)
+IS_ACCOUNTS = {
+    "total_revenue": '4999-0000',
+    "total_expenses": '8999-0000',
+    "stored_noi": '6299-0000',
+    "net_income": '9090-0000',
+    "other_income": '4090-0000',
+}
+
+# Non-calculated income statement sums: (leading digits, excluded codes)
+IS_SUMS = {
+    "revenue_4": ('4', []),
+    "expenses_5_8": ('5678', ['6299-0000']),
+    "operating_expenses_5_6": ('56', ['6299-0000']),
+}
+
+# Fields calculate_all_metrics clears when a statement is missing
+IS_FIELDS = ['total_revenue', 'total_expenses', 'net_operating_income', 'net_income', 'operating_margin', 'profit_margin']
+CF_FIELDS = [
+    'operating_cash_flow', 'investing_cash_flow', 'financing_cash_flow',
+    'net_cash_flow', 'beginning_cash_balance', 'ending_cash_balance',
+]
+RR_CLEAR_FIELDS = [
+    'total_units', 'occupied_units', 'vacant_units', 'occupancy_rate',
+    'total_leasable_sqft', 'occupied_sqft', 'total_monthly_rent', 'total_annual_rent',
+]
+BS_FIELDS = [
+    'total_assets', 'total_current_assets', 'total_property_equipment', 'total_other_assets',
+    'total_liabilities', 'total_current_liabilities', 'total_long_term_liabilities', 'total_equity',
+    'current_ratio', 'quick_ratio', 'cash_ratio', 'working_capital',
+    'debt_to_assets_ratio', 'debt_to_equity_ratio', 'equity_ratio', 'ltv_ratio',
+    'gross_property_value', 'accumulated_depreciation', 'net_property_value', 'depreciation_rate',
+    'land_value', 'building_value_net', 'improvements_value_net',
+    'operating_cash', 'restricted_cash', 'total_cash_position',
+    'tenant_receivables', 'intercompany_receivables', 'other_receivables', 'total_receivables',
+    'ar_percentage_of_assets',
+    'short_term_debt', 'institutional_debt', 'mezzanine_debt', 'shareholder_loans', 'long_term_debt', 'total_debt',
+    'partners_contribution', 'beginning_equity', 'partners_draw', 'distributions',
+    'current_period_earnings', 'ending_equity', 'equity_change',
+]
+RR_FIELDS = RR_CLEAR_FIELDS + ['avg_rent_per_sqft']
+PERFORMANCE_FIELDS = ['noi_per_sqft', 'revenue_per_sqft', 'expense_ratio']
+MORTGAGE_FIELDS = [
+    'total_mortgage_debt', 'weighted_avg_interest_rate', 'total_monthly_debt_service',
+    'total_annual_debt_service', 'dscr', 'interest_coverage_ratio', 'debt_yield', 'break_even_occupancy',
+]
+METRIC_FIELDS = BS_FIELDS + IS_FIELDS + CF_FIELDS + RR_FIELDS + PERFORMANCE_FIELDS + MORTGAGE_FIELDS
+
+
+# ==================== COLUMN HELPERS ====================
+
+def _none(index: pd.Index) -> pd.Series:
+    return pd.Series([None] * len(index), index=index, dtype=object)
+
+
+def _col(frame: pd.DataFrame, name: str) -> pd.Series:
+    """Object column with None for missing values."""
+    series = frame[name].astype(object)
+    return series.where(series.notna(), None)
+
+
+def _truthy(series: pd.Series) -> pd.Series:
+    """Python truthiness of Decimal/int values (None and 0 are false)."""
+    return series.notna() & (series != 0)
+
+
+def _or_zero(series: pd.Series) -> pd.Series:
+    """`value or Decimal('0')`"""
+    return series.where(_truthy(series), ZERO)
+
+
+def _or_none(series: pd.Series) -> pd.Series:
+    """`value if value else None`"""
+    return series.where(_truthy(series), None)
+
+
+def _safe_divide(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """MetricsService.safe_divide: None if either is None, 0 on zero denominator."""
+    result = _none(numerator.index)
+    valid = numerator.notna() & denominator.notna()
+    zero = valid & (denominator == 0)
+    ok = valid & ~zero
+    result[ok] = numerator[ok] / denominator[ok]
+    result[zero] = ZERO
+    return result
+
+
+def _times(series: pd.Series, factor: Decimal) -> pd.Series:
+    result = series.copy()
+    present = series.notna()
+    result[present] = series[present] * factor
+    return result
+
+
+def _gt_zero(series: pd.Series) -> pd.Series:
+    present = series.notna()
+    result = pd.Series(False, index=series.index)
+    result[present] = series[present] > 0
+    return result
+
+
+def _decimal(series: pd.Series) -> pd.Series:
+    return series.map(lambda value: None if value is None else Decimal(str(value)))
+
+
+def _sql_truthy(column):
+    return and_(column.isnot(None), column != 0)
+
+
+class BulkMetricsService:
+    """Set-based FinancialMetrics calculation for many property-periods"""
+
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def calculate_for_properties(self, property_ids: Optional[Sequence[int]] = None) -> int:
+        """Recalculate every period of the given properties (all properties if None)."""
+        query = self.db.query(FinancialPeriod.property_id, FinancialPeriod.id)
+        if property_ids is not None:
+            query = query.filter(FinancialPeriod.property_id.in_(list(property_ids)))
+        pairs = query.order_by(
+            FinancialPeriod.property_id, FinancialPeriod.period_year, FinancialPeriod.period_month
+        ).all()
+        return self.calculate(pairs)
+
+    def calculate(self, pairs: Iterable[Tuple[int, int]]) -> int:
+        """
+        Calculate and upsert metrics for (property_id, period_id) pairs.
+
+        Returns:
+            Number of FinancialMetrics rows written
+        """
+        unique_pairs = list(dict.fromkeys((int(p), int(q)) for p, q in pairs))
+        written = 0
+        for start in range(0, len(unique_pairs), self.chunk_size):
+            metrics = self.compute(unique_pairs[start:start + self.chunk_size])
+            written += self._upsert(metrics)
+            self.db.commit()
+        logger.info(f"Bulk metrics: {written} property-periods recalculated")
+        return written
+
+    def compute(self, pairs: Sequence[Tuple[int, int]]) -> pd.DataFrame:
+        """Metrics frame (index property_id, period_id; columns METRIC_FIELDS) without writing it."""
+        index = pd.MultiIndex.from_tuples(list(pairs), names=KEYS)
+        property_ids = sorted({p for p, _ in pairs})
+        period_ids = sorted({q for _, q in pairs})
+
+        existing = self._existing_metrics(index, property_ids, period_ids)
+        periods = self._periods(index, period_ids)
+        bs = self._balance_sheet(index, property_ids, period_ids)
+        inc = self._income_statement(index, property_ids, period_ids)
+        cf = self._cash_flow(index, property_ids, period_ids)
+        rr = self._rent_roll(index, property_ids, period_ids)
+        mortgage = self._mortgages(index, property_ids, period_ids, periods)
+
+        has_bs = bs["has_data"]
+        has_is = inc["has_data"]
+        has_cf = cf["has_data"]
+        has_rr = rr["has_data"]
+        has_mortgage = mortgage["has_data"]
+
+        # Start from stored values: calculate_all_metrics leaves fields it doesn't set untouched
+        out = pd.DataFrame({field: _col(existing, field) for field in METRIC_FIELDS}, index=index)
+
+        out.loc[has_bs, BS_FIELDS] = self._balance_sheet_metrics(bs, existing, mortgage).loc[has_bs, BS_FIELDS]
+
+        is_metrics = self._income_statement_metrics(inc)
+        out.loc[has_is, IS_FIELDS] = is_metrics.loc[has_is, IS_FIELDS]
+        out.loc[~has_is, IS_FIELDS] = None
+
+        out.loc[has_cf, CF_FIELDS] = self._cash_flow_metrics(cf).loc[has_cf, CF_FIELDS]
+        out.loc[~has_cf, CF_FIELDS] = None
+
+        rr_metrics = self._rent_roll_metrics(rr)
+        out.loc[has_rr, RR_FIELDS] = rr_metrics.loc[has_rr, RR_FIELDS]
+        out.loc[~has_rr, RR_CLEAR_FIELDS] = None
+
+        performance = has_is & has_rr
+        perf_metrics = self._performance_metrics(is_metrics, rr_metrics)
+        out.loc[performance, PERFORMANCE_FIELDS] = perf_metrics.loc[performance, PERFORMANCE_FIELDS]
+
+        # NOI for DSCR: this period's when calculated, else the stored one
+        is_noi = _col(is_metrics, "net_operating_income").where(has_is, None)
+        noi = is_noi.where(is_noi.notna(), _or_none(_col(existing, "net_operating_income")))
+        out.loc[has_mortgage, "net_operating_income"] = noi[has_mortgage]
+
+        mortgage_metrics = self._mortgage_metrics(
+            mortgage, periods, noi,
+            total_expenses=_col(is_metrics, "total_expenses").where(has_is, None),
+            annual_rent=_col(rr_metrics, "total_annual_rent").where(has_rr, None)
+        )
+        found = has_mortgage & mortgage["found"]
+        out.loc[found, MORTGAGE_FIELDS] = mortgage_metrics.loc[found, MORTGAGE_FIELDS]
+
+        out = out.astype(object)
+        return out.where(out.notna(), None)
+
+    # ==================== QUERIES ====================
+
+    def _rows(self, statement, columns: List[str]) -> pd.DataFrame:
+        rows = self.db.execute(statement).all()
+        return pd.DataFrame([tuple(row) for row in rows], columns=columns, dtype=object)
+
+    def _frame(self, statement, index: pd.MultiIndex, columns: List[str]) -> pd.DataFrame:
+        """Rows of a (property_id, period_id, ...) query aligned to the chunk index."""
+        frame = self._rows(statement, KEYS + columns).drop_duplicates(subset=KEYS).set_index(KEYS)
+        frame = frame.reindex(index).astype(object)
+        return frame.where(frame.notna(), None)
+
+    @staticmethod
+    def _in_chunk(model, property_ids, period_ids):
+        return and_(model.property_id.in_(property_ids), model.period_id.in_(period_ids))
+
+    def _first_rows(self, model, columns: List, property_ids, period_ids, *filters, partition=()):
+        """First row (lowest id) per (property, period[, partition]) - what `.first()` returns."""
+        rank = func.row_number().over(
+            partition_by=[model.property_id, model.period_id, *partition], order_by=model.id
+        ).label("row_rank")
+        ranked = (
+            select(model.property_id, model.period_id, *partition, *columns, rank)
+            .where(self._in_chunk(model, property_ids, period_ids), *filters)
+            .subquery()
+        )
+        return select(*[c for c in ranked.c if c.name != "row_rank"]).where(ranked.c.row_rank == 1)
+
+    def _accounts(self, model, amount, accounts: Dict[str, str], index, property_ids, period_ids) -> pd.DataFrame:
+        """One column per named account: the amount of the first row with that code."""
+        statement = self._first_rows(
+            model, [amount], property_ids, period_ids,
+            model.account_code.in_(sorted(set(accounts.values()))),
+            partition=(model.account_code,)
+        )
+        rows = self._rows(statement, KEYS + ["account_code", "amount"])
+        pivot = rows.pivot(index=KEYS, columns="account_code", values="amount")
+        frame = pd.DataFrame(
+            {name: pivot[code] if code in pivot.columns else None for name, code in accounts.items()},
+            index=pivot.index
+        ).reindex(index).astype(object)
+        return frame.where(frame.notna(), None)
+
+    def _existing_metrics(self, index, property_ids, period_ids) -> pd.DataFrame:
+        statement = select(
+            FinancialMetrics.property_id, FinancialMetrics.period_id,
+            *[getattr(FinancialMetrics, field) for field in METRIC_FIELDS]
+        ).where(self._in_chunk(FinancialMetrics, property_ids, period_ids))
+        return self._frame(statement, index, METRIC_FIELDS)
+
+    def _periods(self, index, period_ids) -> pd.DataFrame:
+        """Period year/month (as a month number) and length, looked up by period id like the per-record path."""
+        rows = self._rows(
+            select(
+                FinancialPeriod.id, FinancialPeriod.period_year, FinancialPeriod.period_month,
+                FinancialPeriod.period_start_date, FinancialPeriod.period_end_date
+            ).where(FinancialPeriod.id.in_(period_ids)),
+            ["period_id", "year", "month", "start_date", "end_date"]
+        ).set_index("period_id")
+        frame = rows.reindex(index.get_level_values("period_id"))
+        frame.index = index
+        frame["month_number"] = pd.to_numeric(frame["year"]) * 12 + pd.to_numeric(frame["month"])
+        frame["days"] = (pd.to_datetime(frame["end_date"]) - pd.to_datetime(frame["start_date"])).dt.days
+        return frame
+
+    def _balance_sheet(self, index, property_ids, period_ids) -> pd.DataFrame:
+        not_calculated = BalanceSheetData.is_calculated == False  # noqa: E712
+        sums = []
+        for name, spec in BS_SUMS.items():
+            if spec[0] == "codes":
+                match = BalanceSheetData.account_code.in_(spec[1])
+            else:
+                match = and_(
+                    BalanceSheetData.account_code >= f"{spec[1]}-0000",
+                    BalanceSheetData.account_code <= f"{spec[2]}-9999"
+                )
+            sums.append(func.sum(case((and_(not_calculated, match), BalanceSheetData.amount))))
+        statement = (
+            select(BalanceSheetData.property_id, BalanceSheetData.period_id, func.count(BalanceSheetData.id), *sums)
+            .where(self._in_chunk(BalanceSheetData, property_ids, period_ids))
+            .group_by(BalanceSheetData.property_id, BalanceSheetData.period_id)
+        )
+        frame = self._frame(statement, index, ["rows"] + list(BS_SUMS)).join(
+            self._accounts(BalanceSheetData, BalanceSheetData.amount, BS_ACCOUNTS, index, property_ids, period_ids)
+        )
+        frame["has_data"] = _truthy(frame["rows"])
+        return frame
+
+    def _income_statement(self, index, property_ids, period_ids) -> pd.DataFrame:
+        not_calculated = IncomeStatementData.is_calculated == False  # noqa: E712
+        sums = []
+        for digits, excluded in IS_SUMS.values():
+            match = or_(*[IncomeStatementData.account_code.like(f"{digit}%") for digit in digits])
+            if excluded:
+                match = and_(match, ~IncomeStatementData.account_code.in_(excluded))
+            sums.append(func.sum(case((and_(not_calculated, match), IncomeStatementData.period_amount))))
+        statement = (
+            select(
+                IncomeStatementData.property_id, IncomeStatementData.period_id,
+                func.count(IncomeStatementData.id), *sums
+            )
+            .where(self._in_chunk(IncomeStatementData, property_ids, period_ids))
+            .group_by(IncomeStatementData.property_id, IncomeStatementData.period_id)
+        )
+        frame = self._frame(statement, index, ["rows"] + list(IS_SUMS)).join(
+            self._accounts(
+                IncomeStatementData, IncomeStatementData.period_amount, IS_ACCOUNTS, index, property_ids, period_ids
+            )
+        )
+        headers = self._frame(
+            self._first_rows(IncomeStatementHeader, [IncomeStatementHeader.period_type], property_ids, period_ids),
+            index, ["period_type"]
+        )
+        frame["is_monthly"] = headers["period_type"].str.upper().isin(["MONTHLY", "MONTH"])
+        frame["has_data"] = _truthy(frame["rows"])
+        return frame
+
+    def _cash_flow(self, index, property_ids, period_ids) -> pd.DataFrame:
+        statement = (
+            select(
+                CashFlowData.property_id, CashFlowData.period_id, func.count(CashFlowData.id),
+                *[
+                    func.sum(case((CashFlowData.cash_flow_category == category, CashFlowData.period_amount)))
+                    for category in ("operating", "investing", "financing")
+                ]
+            )
+            .where(self._in_chunk(CashFlowData, property_ids, period_ids))
+            .group_by(CashFlowData.property_id, CashFlowData.period_id)
+        )
+        frame = self._frame(statement, index, ["rows", "operating", "investing", "financing"])
+        headers = self._frame(
+            self._first_rows(
+                CashFlowHeader, [CashFlowHeader.beginning_cash_balance, CashFlowHeader.ending_cash_balance],
+                property_ids, period_ids
+            ),
+            index, ["header_beginning", "header_ending"]
+        )
+        total_rows = self._frame(
+            self._first_rows(
+                CashAccountReconciliation,
+                [
+                    CashAccountReconciliation.id,
+                    CashAccountReconciliation.beginning_balance,
+                    CashAccountReconciliation.ending_balance
+                ],
+                property_ids, period_ids,
+                CashAccountReconciliation.is_total_row == True  # noqa: E712
+            ),
+            index, ["total_row_id", "total_beginning", "total_ending"]
+        )
+        frame = frame.join(headers).join(total_rows)
+        frame["has_data"] = _truthy(frame["rows"])
+        return frame
+
+    def _rent_roll(self, index, property_ids, period_ids) -> pd.DataFrame:
+        special = or_(*[
+            func.upper(RentRollData.unit_number).contains(unit_type.upper(), autoescape=True)
+            for unit_type in account_codes.SPECIAL_UNIT_TYPES
+        ])
+        occupied_leasable = case((special, False), else_=RentRollData.occupancy_status == 'occupied')
+        statement = (
+            select(
+                RentRollData.property_id, RentRollData.period_id,
+                func.count(RentRollData.id),
+                func.sum(case((special, 0), else_=1)),
+                func.sum(case((occupied_leasable, 1), else_=0)),
+                func.sum(RentRollData.unit_area_sqft),
+                func.sum(case((occupied_leasable, RentRollData.unit_area_sqft), else_=null())),
+                func.sum(RentRollData.monthly_rent),
+                func.sum(RentRollData.annual_rent),
+            )
+            .where(self._in_chunk(RentRollData, property_ids, period_ids))
+            .group_by(RentRollData.property_id, RentRollData.period_id)
+        )
+        frame = self._frame(statement, index, [
+            "rows", "total_units", "occupied_units", "total_sqft", "occupied_sqft", "monthly_rent", "annual_rent"
+        ])
+        frame["has_data"] = _truthy(frame["rows"])
+        return frame
+
+    def _mortgages(self, index, property_ids, period_ids, periods: pd.DataFrame) -> pd.DataFrame:
+        """
+        Mortgage aggregates per target period: its own statements, else those of the
+        property's latest earlier period with mortgage data (calculate_mortgage_metrics).
+        """
+        m = MortgageStatementData
+        rated = and_(_sql_truthy(m.interest_rate), _sql_truthy(m.principal_balance))
+        monthly = case(
+            (_sql_truthy(m.annual_debt_service), 0),
+            (_sql_truthy(m.monthly_debt_service), m.monthly_debt_service),
+            (and_(_sql_truthy(m.principal_due), _sql_truthy(m.interest_due)), m.principal_due + m.interest_due),
+            (_sql_truthy(m.total_payment_due), m.total_payment_due),
+            else_=0
+        )
+        annual = case((_sql_truthy(m.annual_debt_service), m.annual_debt_service), else_=monthly * 12)
+        statement = (
+            select(
+                m.property_id, m.period_id, FinancialPeriod.period_year, FinancialPeriod.period_month,
+                func.sum(func.coalesce(m.principal_balance, 0)),
+                func.sum(case((rated, m.principal_balance * m.interest_rate), else_=0)),
+                func.sum(case((rated, m.principal_balance), else_=0)),
+                func.sum(monthly),
+                func.sum(annual),
+                func.sum(func.coalesce(m.ytd_interest_paid, 0)),
+            )
+            .outerjoin(
+                FinancialPeriod,
+                and_(FinancialPeriod.id == m.period_id, FinancialPeriod.property_id == m.property_id)
+            )
+            .where(m.property_id.in_(property_ids))
+            .group_by(m.property_id, m.period_id, FinancialPeriod.period_year, FinancialPeriod.period_month)
+        )
+        values = ["debt", "rate_weighted", "rate_principal", "monthly_service", "annual_service", "ytd_interest"]
+        rows = self._rows(statement, ["property_id", "mortgage_period_id", "year", "month"] + values)
+
+        dated = rows[rows["year"].notna()].copy()
+        dated["month_number"] = (dated["year"] * 12 + dated["month"]).astype("int64")
+        dated["property_id"] = dated["property_id"].astype("int64")
+        targets = pd.DataFrame({
+            "property_id": index.get_level_values("property_id").astype("int64"),
+            "period_id": index.get_level_values("period_id"),
+            "month_number": periods["month_number"].to_numpy(),
+        })
+        targets = targets[targets["month_number"].notna()].astype({"month_number": "int64"})
+        resolved = pd.merge_asof(
+            targets.sort_values("month_number"),
+            dated.drop(columns=["year", "month"]).sort_values("month_number"),
+            on="month_number", by="property_id", direction="backward"
+        ).set_index(KEYS).reindex(index)
+
+        frame = resolved[values].astype(object)
+        frame = frame.where(frame.notna(), None)
+        frame["found"] = frame["debt"].notna()
+        frame["has_data"] = index.get_level_values("property_id").isin(set(rows["property_id"]))
+        loan_balances = self._frame(
+            self._first_rows(m, [m.total_loan_balance], property_ids, period_ids), index, ["total_loan_balance"]
+        )
+        return frame.join(loan_balances)
+
+    # ==================== METRICS ====================
+
+    def _balance_sheet_metrics(self, bs: pd.DataFrame, existing: pd.DataFrame, mortgage: pd.DataFrame) -> pd.DataFrame:
+        account = lambda name: _col(bs, name)  # noqa: E731
+        summed = lambda name: _or_zero(_col(bs, name))  # noqa: E731
+        m = pd.DataFrame({name: account(name) for name in BS_FIELDS[:8]}, index=bs.index)
+
+        # Liquidity
+        current_assets = _or_zero(m["total_current_assets"])
+        current_liabilities = _or_zero(m["total_current_liabilities"])
+        m["current_ratio"] = _safe_divide(current_assets, current_liabilities)
+        m["quick_ratio"] = _safe_divide(current_assets - summed("quick_receivables"), current_liabilities)
+        m["cash_ratio"] = _safe_divide(summed("total_cash"), current_liabilities)
+        m["working_capital"] = current_assets - current_liabilities
+
+        # Leverage
+        total_assets = _or_zero(m["total_assets"])
+        total_liabilities = _or_zero(m["total_liabilities"])
+        total_equity = _or_zero(m["total_equity"])
+        property_value = m["total_property_equipment"]
+        property_value = property_value.where(
+            _truthy(property_value), _or_zero(_col(existing, "net_property_value"))
+        )
+        loan_balance = _or_zero(_col(mortgage, "total_loan_balance"))
+        loan_balance = loan_balance.where(loan_balance != 0, _or_zero(m["total_long_term_liabilities"]))
+        m["debt_to_assets_ratio"] = _safe_divide(total_liabilities, total_assets)
+        m["debt_to_equity_ratio"] = _safe_divide(total_liabilities, total_equity)
+        m["equity_ratio"] = _safe_divide(total_equity, total_assets)
+        m["ltv_ratio"] = _safe_divide(loan_balance, property_value)
+
+        # Property
+        land = _or_zero(account("land"))
+        buildings = _or_zero(account("buildings"))
+        improvements = summed("improvements_gross")
+        accumulated = summed("accum_depr")
+        accumulated_buildings = _or_zero(account("accum_depr_buildings"))
+        gross = land + buildings + improvements
+        m["gross_property_value"] = gross
+        m["accumulated_depreciation"] = accumulated
+        m["net_property_value"] = gross + accumulated
+        m["depreciation_rate"] = _safe_divide(accumulated.abs(), gross)
+        m["land_value"] = land
+        m["building_value_net"] = buildings + accumulated_buildings
+        m["improvements_value_net"] = improvements + (accumulated - accumulated_buildings)
+
+        # Cash
+        m["operating_cash"] = summed("operating_cash")
+        m["restricted_cash"] = summed("restricted_cash")
+        m["total_cash_position"] = m["operating_cash"] + m["restricted_cash"]
+
+        # Receivables
+        m["tenant_receivables"] = _or_zero(account("tenant_ar"))
+        m["intercompany_receivables"] = summed("intercompany_ar")
+        m["other_receivables"] = summed("other_ar")
+        m["total_receivables"] = m["tenant_receivables"] + m["intercompany_receivables"] + m["other_receivables"]
+        m["ar_percentage_of_assets"] = _safe_divide(m["total_receivables"], current_assets)
+
+        # Debt
+        short_term = summed("short_term")
+        long_term = _or_zero(m["total_long_term_liabilities"])
+        m["short_term_debt"] = short_term
+        m["institutional_debt"] = summed("institutional") - summed("mezzanine")
+        m["mezzanine_debt"] = summed("mezzanine")
+        m["shareholder_loans"] = summed("shareholder")
+        m["long_term_debt"] = long_term
+        m["total_debt"] = short_term + long_term
+
+        # Equity
+        for name in ("partners_contribution", "beginning_equity", "partners_draw", "distributions", "current_period_earnings"):
+            m[name] = _or_zero(account(name))
+        m["ending_equity"] = total_equity
+        m["equity_change"] = m["ending_equity"] - m["beginning_equity"]
+        return m
+
+    def _income_statement_metrics(self, inc: pd.DataFrame) -> pd.DataFrame:
+        index = inc.index
+        revenue_4 = _or_none(_col(inc, "revenue_4"))
+        total_revenue = _col(inc, "total_revenue")
+        total_revenue = total_revenue.where(_truthy(total_revenue), revenue_4)
+        total_expenses = _col(inc, "total_expenses")
+        total_expenses = total_expenses.where(_truthy(total_expenses), _or_none(_col(inc, "expenses_5_8")))
+        operating_expenses = _or_zero(_col(inc, "operating_expenses_5_6"))
+
+        # Exclude a large negative Other Income adjustment (4090) from margin revenue
+        gross_revenue = revenue_4
+        other_income = _col(inc, "other_income")
+        threshold = pd.Series(financial_thresholds.noi_large_negative_adjustment_threshold, index=index, dtype=object)
+        has_gross = _truthy(gross_revenue)
+        threshold[has_gross] = gross_revenue[has_gross] * financial_thresholds.noi_large_negative_adjustment_percentage
+        large_adjustment = pd.Series(False, index=index)
+        has_other = _truthy(other_income)
+        large_adjustment[has_other] = other_income[has_other] < -threshold[has_other].abs()
+        revenue_for_noi = gross_revenue.copy()
+        excluded = large_adjustment & has_gross
+        revenue_for_noi[excluded] = gross_revenue[excluded] - other_income[excluded]
+        revenue_for_noi[large_adjustment & ~has_gross] = None
+
+        # NOI: calculated when possible, else the stored 6299 total; annualized for monthly statements
+        noi = _none(index)
+        calculated = revenue_for_noi.notna()
+        noi[calculated] = revenue_for_noi[calculated] - operating_expenses[calculated]
+        stored_noi = _col(inc, "stored_noi")
+        use_stored = ~calculated & stored_noi.notna()
+        noi[use_stored] = stored_noi[use_stored]
+        annualize = inc["is_monthly"].astype(bool) & noi.notna()
+        noi[annualize] = noi[annualize] * TWELVE
+
+        revenue_for_margin = revenue_for_noi.where(_truthy(revenue_for_noi), total_revenue)
+        operating_margin = _none(index)
+        margin = noi.notna() & revenue_for_margin.notna()
+        operating_margin[margin] = _times(_safe_divide(noi[margin], revenue_for_margin[margin]), HUNDRED)
+        net_income = _col(inc, "net_income")
+
+        return pd.DataFrame({
+            "total_revenue": total_revenue,
+            "total_expenses": total_expenses,
+            "net_operating_income": noi,
+            "net_income": net_income,
+            "operating_expenses": operating_expenses,
+            "operating_margin": operating_margin,
+            "profit_margin": _times(_safe_divide(net_income, total_revenue), HUNDRED),
+        }, index=index)
+
+    def _cash_flow_metrics(self, cf: pd.DataFrame) -> pd.DataFrame:
+        operating = _or_none(_col(cf, "operating"))
+        investing = _or_none(_col(cf, "investing"))
+        financing = _or_none(_col(cf, "financing"))
+        has_total_row = cf["total_row_id"].notna()
+        return pd.DataFrame({
+            "operating_cash_flow": operating,
+            "investing_cash_flow": investing,
+            "financing_cash_flow": financing,
+            "net_cash_flow": _or_zero(operating) + _or_zero(investing) + _or_zero(financing),
+            "beginning_cash_balance": _col(cf, "total_beginning").where(has_total_row, _col(cf, "header_beginning")),
+            "ending_cash_balance": _col(cf, "total_ending").where(has_total_row, _col(cf, "header_ending")),
+        }, index=cf.index)
+
+    def _rent_roll_metrics(self, rr: pd.DataFrame) -> pd.DataFrame:
+        total_units = _col(rr, "total_units")
+        occupied_units = _col(rr, "occupied_units")
+        has_units = total_units.notna()
+        vacant_units = _none(rr.index)
+        vacant_units[has_units] = total_units[has_units] - occupied_units[has_units]
+
+        monthly_rent = _col(rr, "monthly_rent")
+        annual_rent = _col(rr, "annual_rent")
+        from_monthly = ~_truthy(annual_rent) & _truthy(monthly_rent)
+        annual_rent[from_monthly] = monthly_rent[from_monthly] * TWELVE
+        total_monthly_rent = _or_none(monthly_rent)
+        total_leasable_sqft = _or_none(_col(rr, "total_sqft"))
+
+        return pd.DataFrame({
+            "total_units": total_units,
+            "occupied_units": occupied_units,
+            "vacant_units": vacant_units,
+            "occupancy_rate": _times(_safe_divide(_decimal(occupied_units), _decimal(total_units)), HUNDRED),
+            "total_leasable_sqft": total_leasable_sqft,
+            "occupied_sqft": _or_none(_col(rr, "occupied_sqft")),
+            "total_monthly_rent": total_monthly_rent,
+            "total_annual_rent": _or_none(annual_rent),
+            "avg_rent_per_sqft": _safe_divide(total_monthly_rent, total_leasable_sqft),
+        }, index=rr.index)
+
+    def _performance_metrics(self, is_metrics: pd.DataFrame, rr_metrics: pd.DataFrame) -> pd.DataFrame:
+        revenue = _col(is_metrics, "total_revenue")
+        total_sqft = _col(rr_metrics, "total_leasable_sqft")
+        return pd.DataFrame({
+            "noi_per_sqft": _safe_divide(_col(is_metrics, "net_operating_income"), total_sqft),
+            "revenue_per_sqft": _safe_divide(revenue, total_sqft),
+            "expense_ratio": _times(_safe_divide(_col(is_metrics, "operating_expenses"), revenue), HUNDRED),
+        }, index=is_metrics.index)
+
+    def _mortgage_metrics(
+        self,
+        mortgage: pd.DataFrame,
+        periods: pd.DataFrame,
+        noi: pd.Series,
+        total_expenses: pd.Series,
+        annual_rent: pd.Series
+    ) -> pd.DataFrame:
+        index = mortgage.index
+        debt = _col(mortgage, "debt")
+        annual_service = _col(mortgage, "annual_service")
+        monthly_service = _col(mortgage, "monthly_service")
+        rate_principal = _col(mortgage, "rate_principal")
+        has_noi = _truthy(noi)
+
+        weighted_rate = _none(index)
+        rated = _gt_zero(rate_principal)
+        weighted_rate[rated] = _col(mortgage, "rate_weighted")[rated] / rate_principal[rated]
+
+        dscr = _none(index)
+        covered = has_noi & _gt_zero(annual_service)
+        dscr[covered] = noi[covered] / annual_service[covered]
+
+        # YTD interest annualized for monthly periods
+        interest = _col(mortgage, "ytd_interest")
+        monthly_period = (periods["days"] <= 35).fillna(False).astype(bool)
+        interest = interest.where(~monthly_period, _times(interest, TWELVE))
+        interest_coverage = _none(index)
+        covered = has_noi & _gt_zero(interest)
+        interest_coverage[covered] = noi[covered] / interest[covered]
+
+        debt_yield = _none(index)
+        covered = has_noi & _gt_zero(debt)
+        debt_yield[covered] = noi[covered] / debt[covered] * HUNDRED
+
+        # (Expenses + debt service) / gross potential rent
+        break_even = _none(index)
+        covered = _truthy(annual_rent) & _gt_zero(annual_rent)
+        required = _or_zero(total_expenses)
+        break_even[covered] = (required[covered] + annual_service[covered]) / annual_rent[covered] * HUNDRED
+
+        return pd.DataFrame({
+            "total_mortgage_debt": debt.where(_gt_zero(debt), None),
+            "weighted_avg_interest_rate": weighted_rate,
+            "total_monthly_debt_service": monthly_service.where(_gt_zero(monthly_service), None),
+            "total_annual_debt_service": annual_service.where(_gt_zero(annual_service), None),
+            "dscr": dscr,
+            "interest_coverage_ratio": interest_coverage,
+            "debt_yield": debt_yield,
+            "break_even_occupancy": break_even,
+        }, index=index)
+
+    # ==================== STORAGE ====================
+
+    def _upsert(self, metrics: pd.DataFrame) -> int:
+        """Write all rows with one INSERT ... ON CONFLICT (property_id, period_id) DO UPDATE."""
+        if metrics.empty:
+            return 0
+        records = [
+            {"property_id": int(property_id), "period_id": int(period_id), **values}
+            for (property_id, period_id), values in zip(metrics.index, metrics[METRIC_FIELDS].to_dict("records"))
+        ]
+        table = FinancialMetrics.__table__
+        statement = pg_insert(table).values(records)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.property_id, table.c.period_id],
+            set_={**{field: statement.excluded[field] for field in METRIC_FIELDS}, "updated_at": func.now()}
+        )
+        self.db.execute(statement)
+        return len(records)
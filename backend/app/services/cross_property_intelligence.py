@@ -6,18 +6,26 @@ Provides portfolio-level intelligence for anomaly detection:
 - Portfolio-wide anomaly detection
 - Property comparison and ranking
 - Statistical benchmarks calculation
+
+Benchmarks live in a precomputed cube (cross_property_benchmarks) keyed by
+(account code, period, property group), where the group is a property type or
+'all'. One grouped query over both statements produces every account's
+distribution; percentile and z-score lookups then read single cube cells.
+Extraction refreshes the cells of the period it touched.
 """
 
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, select, union_all
+from sqlalchemy.exc import IntegrityError
 import numpy as np
 import pandas as pd
 import logging
 
 from app.models.property import Property
-from app.models.anomaly_detection import AnomalyDetection
+from app.models.financial_period import FinancialPeriod
 from app.models.cross_property_benchmark import CrossPropertyBenchmark
 from app.models.balance_sheet_data import BalanceSheetData
 from app.models.income_statement_data import IncomeStatementData
@@ -26,6 +34,18 @@ from app.core.feature_flags import FeatureFlags
 
 logger = logging.getLogger(__name__)
 
+# Property group for portfolio-wide cells (NULL would defeat the unique constraint)
+ALL_PROPERTIES_GROUP = 'all'
+
+# Statement line items feeding the cube; account codes are unique across the chart of accounts
+BENCHMARK_SOURCES = {
+    'balance_sheet': (BalanceSheetData, BalanceSheetData.amount),
+    'income_statement': (IncomeStatementData, IncomeStatementData.period_amount),
+}
+
+# How many recent cells get_property_ranking scans for the property
+RANKING_LOOKBACK_PERIODS = 12
+
 
 class CrossPropertyIntelligenceService:
     """
@@ -44,148 +64,236 @@ class CrossPropertyIntelligenceService:
         self.enabled = FeatureFlags.is_portfolio_benchmarks_enabled()
         self.min_properties = settings.BENCHMARK_MIN_PROPERTIES
     
+    def build_benchmark_cube(
+        self,
+        benchmark_period: Optional[date] = None,
+        account_codes: Optional[List[str]] = None
+    ) -> int:
+        """
+        (Re)compute benchmark cube cells with one grouped query.
+
+        Args:
+            benchmark_period: Only this period (first day of the month); all periods if None
+            account_codes: Only these accounts; all if None
+
+        Returns:
+            Number of cells written
+        """
+        if not self.enabled:
+            logger.warning("Cross-property intelligence is disabled")
+            return 0
+
+        cells = self._compute_cells(self._load_distribution_rows(benchmark_period, account_codes))
+        try:
+            return self._upsert_cells(cells, benchmark_period, account_codes)
+        except IntegrityError:
+            # A concurrent refresh inserted the same cells first: retry as updates
+            self.db.rollback()
+            return self._upsert_cells(cells, benchmark_period, account_codes)
+
+    def benchmark_account_codes(self, metric_type: str = 'balance_sheet') -> List[str]:
+        """Account codes one statement reports for active properties, sorted."""
+        model, _ = BENCHMARK_SOURCES[metric_type]
+        stmt = select(model.account_code).distinct().join(
+            Property, Property.id == model.property_id
+        ).where(
+            Property.status == 'active', model.account_code.is_not(None)
+        ).order_by(model.account_code)
+        return list(self.db.scalars(stmt))
+
+    def refresh_for_period(self, property_id: int, period_id: int) -> int:
+        """Refresh the cube cells for the period a property's statements were extracted for."""
+        period = self.db.get(FinancialPeriod, period_id)
+        if not self.enabled or period is None or period.property_id != property_id:
+            return 0
+        return self.build_benchmark_cube(benchmark_period=period.period_start_date)
+
+    def _load_distribution_rows(
+        self,
+        benchmark_period: Optional[date],
+        account_codes: Optional[List[str]]
+    ) -> pd.DataFrame:
+        """Per (account, period, property) totals for active properties, both statements at once."""
+        selects = []
+        for model, amount in BENCHMARK_SOURCES.values():
+            stmt = select(
+                model.account_code.label('account_code'),
+                FinancialPeriod.period_start_date.label('benchmark_period'),
+                model.property_id.label('property_id'),
+                Property.property_type.label('property_type'),
+                func.sum(amount).label('value')
+            ).join(
+                FinancialPeriod, FinancialPeriod.id == model.period_id
+            ).join(
+                Property, Property.id == model.property_id
+            ).where(
+                Property.status == 'active'
+            ).group_by(
+                model.account_code, FinancialPeriod.period_start_date, model.property_id, Property.property_type
+            )
+            if benchmark_period is not None:
+                stmt = stmt.where(FinancialPeriod.period_start_date == benchmark_period)
+            if account_codes:
+                stmt = stmt.where(model.account_code.in_(account_codes))
+            selects.append(stmt)
+
+        rows = self.db.execute(union_all(*selects)).all()
+        frame = pd.DataFrame(
+            rows, columns=['account_code', 'benchmark_period', 'property_id', 'property_type', 'value']
+        )
+        frame = frame.dropna(subset=['value'])
+        frame['value'] = frame['value'].astype(float)
+        return frame
+
+    def _compute_cells(self, frame: pd.DataFrame) -> Dict[Tuple[str, date, str], Dict[str, Any]]:
+        """Statistics for every (account, period, group) with enough properties."""
+        if frame.empty:
+            return {}
+        typed = frame[frame['property_type'].notna()]
+        grouped = pd.concat([
+            frame.assign(property_group=ALL_PROPERTIES_GROUP),
+            typed.assign(property_group=typed['property_type'].astype(str).str[:50]),
+        ])
+
+        cells = {}
+        keys = ['account_code', 'benchmark_period', 'property_group']
+        for key, group in grouped.groupby(keys, sort=False):
+            # A property appearing in both statements for one account is summed
+            per_property = group.groupby('property_id')['value'].sum().sort_values()
+            if len(per_property) < self.min_properties:
+                continue
+            values = per_property.to_numpy()
+            p25, median, p75, p90, p95 = np.percentile(values, [25, 50, 75, 90, 95])
+            cells[key] = {
+                'portfolio_mean': float(values.mean()),
+                'portfolio_median': float(median),
+                'portfolio_std': float(values.std()),
+                'percentile_25': float(p25),
+                'percentile_75': float(p75),
+                'percentile_90': float(p90),
+                'percentile_95': float(p95),
+                'property_count': len(values),
+                'property_ids': sorted(int(pid) for pid in per_property.index),
+                'distribution': [[int(pid), round(float(v), 2)] for pid, v in per_property.items()],
+            }
+        return cells
+
+    def _upsert_cells(
+        self,
+        cells: Dict[Tuple[str, date, str], Dict[str, Any]],
+        benchmark_period: Optional[date],
+        account_codes: Optional[List[str]]
+    ) -> int:
+        """Write computed cells and drop in-scope cells that no longer qualify."""
+        query = self.db.query(CrossPropertyBenchmark)
+        if benchmark_period is not None:
+            query = query.filter(CrossPropertyBenchmark.benchmark_period == benchmark_period)
+        if account_codes:
+            query = query.filter(CrossPropertyBenchmark.account_code.in_(account_codes))
+        existing = {
+            (b.account_code, b.benchmark_period, b.property_group): b
+            for b in query.all()
+        }
+
+        now = datetime.utcnow()
+        for key, stats in cells.items():
+            benchmark = existing.pop(key, None)
+            if benchmark is None:
+                account_code, period, group = key
+                benchmark = CrossPropertyBenchmark(
+                    account_code=account_code, benchmark_period=period, property_group=group
+                )
+                self.db.add(benchmark)
+            for column, value in stats.items():
+                setattr(benchmark, column, value)
+            benchmark.calculated_at = now
+        for stale in existing.values():
+            self.db.delete(stale)
+
+        self.db.commit()
+        logger.info(f"Benchmark cube: {len(cells)} cells written, {len(existing)} removed")
+        return len(cells)
+
+    def get_benchmark(
+        self,
+        account_code: str,
+        benchmark_period: Optional[date] = None,
+        property_group: Optional[str] = None
+    ) -> Optional[CrossPropertyBenchmark]:
+        """Cube cell for an account (latest period if none given)."""
+        query = self.db.query(CrossPropertyBenchmark).filter(
+            CrossPropertyBenchmark.account_code == account_code,
+            CrossPropertyBenchmark.property_group == (property_group or ALL_PROPERTIES_GROUP)
+        )
+        if benchmark_period is not None:
+            query = query.filter(CrossPropertyBenchmark.benchmark_period == benchmark_period)
+        return query.order_by(CrossPropertyBenchmark.benchmark_period.desc()).first()
+
+    def get_benchmarks(
+        self,
+        account_codes: List[str],
+        benchmark_period: Optional[date] = None,
+        property_group: Optional[str] = None
+    ) -> Dict[str, CrossPropertyBenchmark]:
+        """Cube cells for many accounts in one query (latest period per account if none given)."""
+        query = self.db.query(CrossPropertyBenchmark).filter(
+            CrossPropertyBenchmark.account_code.in_(account_codes),
+            CrossPropertyBenchmark.property_group == (property_group or ALL_PROPERTIES_GROUP)
+        )
+        if benchmark_period is not None:
+            query = query.filter(CrossPropertyBenchmark.benchmark_period == benchmark_period)
+        benchmarks = {}
+        for benchmark in query.order_by(CrossPropertyBenchmark.benchmark_period.desc()):
+            benchmarks.setdefault(benchmark.account_code, benchmark)
+        return benchmarks
+
     def calculate_benchmarks(
         self,
         account_code: str,
         metric_type: str = 'balance_sheet',  # 'balance_sheet', 'income_statement'
-        period_id: Optional[int] = None
-    ) -> CrossPropertyBenchmark:
+        period_id: Optional[int] = None,
+        property_group: Optional[str] = None
+    ) -> Optional[CrossPropertyBenchmark]:
         """
-        Calculate portfolio benchmarks for a specific account/metric.
+        Portfolio benchmark for a specific account, computing its cube cells if missing.
         
         Args:
             account_code: Account code to benchmark
-            metric_type: Type of financial metric
+            metric_type: Type of financial metric (both statements share the cube)
             period_id: Optional specific period, otherwise uses latest
+            property_group: Property type to compare within (whole portfolio if None)
         
         Returns:
-            CrossPropertyBenchmark object
+            CrossPropertyBenchmark cube cell
         """
         if not self.enabled:
             logger.warning("Cross-property intelligence is disabled")
             return None
-        
-        # Get all properties
-        properties = self.db.query(Property).filter(
-            Property.is_active == True
-        ).all()
-        
-        if len(properties) < self.min_properties:
-            logger.warning(f"Insufficient properties for benchmarking: {len(properties)} < {self.min_properties}")
+        if metric_type not in BENCHMARK_SOURCES:
             return None
-        
-        property_ids = [p.id for p in properties]
-        
-        # Get data for the account across all properties
-        if metric_type == 'balance_sheet':
-            data_query = self.db.query(
-                BalanceSheetData.property_id,
-                BalanceSheetData.period_id,
-                func.sum(BalanceSheetData.period_amount).label('value')
-            ).filter(
-                and_(
-                    BalanceSheetData.account_code == account_code,
-                    BalanceSheetData.property_id.in_(property_ids)
-                )
-            )
-        elif metric_type == 'income_statement':
-            data_query = self.db.query(
-                IncomeStatementData.property_id,
-                IncomeStatementData.period_id,
-                func.sum(IncomeStatementData.period_amount).label('value')
-            ).filter(
-                and_(
-                    IncomeStatementData.account_code == account_code,
-                    IncomeStatementData.property_id.in_(property_ids)
-                )
-            )
-        else:
-            return None
-        
+
+        benchmark_period = None
         if period_id:
-            data_query = data_query.filter(
-                BalanceSheetData.period_id == period_id if metric_type == 'balance_sheet' 
-                else IncomeStatementData.period_id == period_id
-            )
-        else:
-            # Get latest period for each property
-            # This is simplified - in production, you'd want to get the most recent common period
-            pass
-        
-        data = data_query.group_by(
-            BalanceSheetData.property_id if metric_type == 'balance_sheet' else IncomeStatementData.property_id,
-            BalanceSheetData.period_id if metric_type == 'balance_sheet' else IncomeStatementData.period_id
-        ).all()
-        
-        if len(data) < self.min_properties:
-            return None
-        
-        values = [float(row.value) for row in data if row.value is not None]
-        
-        if not values:
-            return None
-        
-        # Calculate statistics
-        mean_value = np.mean(values)
-        median_value = np.median(values)
-        std_value = np.std(values)
-        p25 = np.percentile(values, 25)
-        p75 = np.percentile(values, 75)
-        p90 = np.percentile(values, 90)
-        p95 = np.percentile(values, 95)
-        min_value = np.min(values)
-        max_value = np.max(values)
-        
-        # Check if benchmark already exists
-        existing = self.db.query(CrossPropertyBenchmark).filter(
-            and_(
-                CrossPropertyBenchmark.account_code == account_code,
-                CrossPropertyBenchmark.metric_type == metric_type,
-                CrossPropertyBenchmark.period_id == period_id
-            )
-        ).first()
-        
-        if existing:
-            # Update existing benchmark
-            existing.mean_value = mean_value
-            existing.median_value = median_value
-            existing.std_value = std_value
-            existing.p25_value = p25
-            existing.p75_value = p75
-            existing.p90_value = p90
-            existing.p95_value = p95
-            existing.p5_value = p25  # Use p25 as approximation for p5 if not calculated
-            existing.min_value = min_value
-            existing.max_value = max_value
-            existing.property_count = len(values)
-            existing.last_calculated_at = datetime.utcnow()
-            benchmark = existing
-        else:
-            # Create new benchmark
-            benchmark = CrossPropertyBenchmark(
-                account_code=account_code,
-                metric_type=metric_type,
-                period_id=period_id,
-                mean_value=mean_value,
-                median_value=median_value,
-                std_value=std_value,
-                p25_value=p25,
-                p75_value=p75,
-                p90_value=p90,
-                p95_value=p95,
-                p5_value=p25,  # Use p25 as approximation for p5 if not calculated
-                min_value=min_value,
-                max_value=max_value,
-                property_count=len(values),
-                last_calculated_at=datetime.utcnow()
-            )
-            self.db.add(benchmark)
-        
-        self.db.commit()
-        self.db.refresh(benchmark)
-        
+            period = self.db.get(FinancialPeriod, period_id)
+            if period is None:
+                return None
+            benchmark_period = period.period_start_date
+
+        benchmark = self.get_benchmark(account_code, benchmark_period, property_group)
+        if benchmark is None:
+            self.build_benchmark_cube(benchmark_period, account_codes=[account_code])
+            benchmark = self.get_benchmark(account_code, benchmark_period, property_group)
         return benchmark
-    
+
+    def _property_benchmark(self, property_id: int, account_code: str) -> Optional[CrossPropertyBenchmark]:
+        """Latest cell for the property's type, falling back to the whole portfolio."""
+        property_obj = self.db.get(Property, property_id)
+        if property_obj is not None and property_obj.property_type:
+            benchmark = self.get_benchmark(account_code, property_group=property_obj.property_type[:50])
+            if benchmark is not None:
+                return benchmark
+        return self.get_benchmark(account_code)
+
     def detect_cross_property_anomalies(
         self,
         property_id: int,
@@ -208,49 +316,52 @@ class CrossPropertyIntelligenceService:
         if not self.enabled:
             return None
         
-        # Get benchmark
-        benchmark = self.db.query(CrossPropertyBenchmark).filter(
-            and_(
-                CrossPropertyBenchmark.account_code == account_code,
-                CrossPropertyBenchmark.metric_type == metric_type
-            )
-        ).order_by(
-            CrossPropertyBenchmark.last_calculated_at.desc()
-        ).first()
-        
+        benchmark = self._property_benchmark(property_id, account_code)
         if not benchmark:
             # Calculate benchmark if it doesn't exist
             benchmark = self.calculate_benchmarks(account_code, metric_type)
             if not benchmark:
                 return None
+
+        value = float(value)
+        mean = float(benchmark.portfolio_mean or 0)
+        median = float(benchmark.portfolio_median or 0)
+        std = float(benchmark.portfolio_std or 0)
+        z_score = self.z_score(value, benchmark)
+        percentile_rank = self._calculate_percentile_rank(value, benchmark)
         
         # Check if value is outside normal range (beyond 2 standard deviations)
-        z_score = (value - benchmark.mean_value) / benchmark.std_value if benchmark.std_value > 0 else 0
-        
         if abs(z_score) > 2.0:
             return {
                 'type': 'cross_property_outlier',
                 'severity': 'high' if abs(z_score) > 3.0 else 'medium',
                 'z_score': z_score,
-                'portfolio_mean': benchmark.mean_value,
-                'portfolio_median': benchmark.median_value,
-                'portfolio_std': benchmark.std_value,
-                'percentile_rank': self._calculate_percentile_rank(value, benchmark),
-                'message': f"Value {value:,.2f} is {abs(z_score):.2f} standard deviations from portfolio mean ({benchmark.mean_value:,.2f})"
+                'portfolio_mean': mean,
+                'portfolio_median': median,
+                'portfolio_std': std,
+                'percentile_rank': percentile_rank,
+                'property_group': benchmark.property_group,
+                'message': f"Value {value:,.2f} is {abs(z_score):.2f} standard deviations from portfolio mean ({mean:,.2f})"
             }
         
         # Check if value is in extreme percentiles
-        if value < benchmark.p5_value or value > benchmark.p95_value:
+        if percentile_rank < 5.0 or percentile_rank > 95.0:
             return {
                 'type': 'cross_property_extreme',
                 'severity': 'medium',
-                'percentile_rank': self._calculate_percentile_rank(value, benchmark),
-                'portfolio_p5': benchmark.p5_value if hasattr(benchmark, 'p5_value') else benchmark.p25_value,
-                'portfolio_p95': benchmark.p95_value,
+                'z_score': z_score,
+                'percentile_rank': percentile_rank,
+                'portfolio_p95': float(benchmark.percentile_95 or 0),
+                'property_group': benchmark.property_group,
                 'message': f"Value {value:,.2f} is in extreme percentile compared to portfolio"
             }
         
         return None
+
+    @staticmethod
+    def z_score(value: float, benchmark: CrossPropertyBenchmark) -> float:
+        std = float(benchmark.portfolio_std or 0)
+        return (float(value) - float(benchmark.portfolio_mean or 0)) / std if std > 0 else 0.0
     
     def _calculate_percentile_rank(
         self,
@@ -267,27 +378,33 @@ class CrossPropertyIntelligenceService:
         Returns:
             Percentile rank (0-100)
         """
-        # Simplified percentile calculation
-        # In production, you'd use the actual distribution
-        if value <= benchmark.p25_value:
-            return 25.0 * (value / benchmark.p25_value) if benchmark.p25_value > 0 else 0.0
-        elif value <= benchmark.median_value:
-            return 25.0 + 25.0 * ((value - benchmark.p25_value) / (benchmark.median_value - benchmark.p25_value))
-        elif value <= benchmark.p75_value:
-            return 50.0 + 25.0 * ((value - benchmark.median_value) / (benchmark.p75_value - benchmark.median_value))
-        elif value <= benchmark.p95_value:
-            return 75.0 + 20.0 * ((value - benchmark.p75_value) / (benchmark.p95_value - benchmark.p75_value))
-        else:
-            return 95.0 + 5.0 * min(1.0, (value - benchmark.p95_value) / (benchmark.max_value - benchmark.p95_value))
+        value = float(value)
+        values = [v for _, v in benchmark.distribution or []]
+        if values:
+            # Share of the portfolio below the value (ties count half)
+            below = bisect_left(values, value)
+            ties = bisect_right(values, value) - below
+            return 100.0 * (below + 0.5 * ties) / len(values)
+
+        # Cells written before distributions were stored: interpolate the quartiles
+        knots = [
+            (float(benchmark.percentile_25 or 0), 25.0),
+            (float(benchmark.portfolio_median or 0), 50.0),
+            (float(benchmark.percentile_75 or 0), 75.0),
+            (float(benchmark.percentile_95 or 0), 95.0),
+        ]
+        return float(np.interp(value, [k for k, _ in knots], [p for _, p in knots], left=0.0, right=100.0))
     
     def get_property_ranking(
         self,
         property_id: int,
         account_code: str,
         metric_type: str = 'balance_sheet'
-    ) -> Dict[str, Any]:
+    ) -> Optional[Dict[str, Any]]:
         """
         Get property ranking compared to portfolio for a specific metric.
+
+        Reads the property's value from the latest cube cell that includes it.
         
         Args:
             property_id: Property ID
@@ -297,48 +414,65 @@ class CrossPropertyIntelligenceService:
         Returns:
             Dictionary with ranking information
         """
-        benchmark = self.db.query(CrossPropertyBenchmark).filter(
-            and_(
-                CrossPropertyBenchmark.account_code == account_code,
-                CrossPropertyBenchmark.metric_type == metric_type
-            )
+        cells = self.db.query(CrossPropertyBenchmark).filter(
+            CrossPropertyBenchmark.account_code == account_code,
+            CrossPropertyBenchmark.property_group == ALL_PROPERTIES_GROUP
         ).order_by(
-            CrossPropertyBenchmark.last_calculated_at.desc()
-        ).first()
-        
-        if not benchmark:
-            return None
-        
-        # Get property's value
-        if metric_type == 'balance_sheet':
-            property_data = self.db.query(BalanceSheetData).filter(
-                and_(
-                    BalanceSheetData.property_id == property_id,
-                    BalanceSheetData.account_code == account_code
-                )
-            ).order_by(BalanceSheetData.id.desc()).first()
-        else:
-            property_data = self.db.query(IncomeStatementData).filter(
-                and_(
-                    IncomeStatementData.property_id == property_id,
-                    IncomeStatementData.account_code == account_code
-                )
-            ).order_by(IncomeStatementData.id.desc()).first()
-        
-        if not property_data:
-            return None
-        
-        value = float(property_data.period_amount or 0)
-        percentile_rank = self._calculate_percentile_rank(value, benchmark)
-        
-        return {
-            'property_id': property_id,
-            'account_code': account_code,
-            'value': value,
-            'portfolio_mean': benchmark.mean_value,
-            'portfolio_median': benchmark.median_value,
-            'percentile_rank': percentile_rank,
-            'ranking': 'top' if percentile_rank >= 90 else 'bottom' if percentile_rank <= 10 else 'middle',
-            'property_count': benchmark.property_count
-        }
+            CrossPropertyBenchmark.benchmark_period.desc()
+        ).limit(RANKING_LOOKBACK_PERIODS).all()
+
+        for benchmark in cells:
+            distribution = benchmark.distribution or []
+            position = next((i for i, (pid, _) in enumerate(distribution) if pid == property_id), None)
+            if position is None:
+                continue
+
+            value = float(distribution[position][1])
+            percentile_rank = self._calculate_percentile_rank(value, benchmark)
+            return {
+                'property_id': property_id,
+                'account_code': account_code,
+                'benchmark_period': benchmark.benchmark_period.isoformat(),
+                'value': value,
+                'property_value': value,
+                'portfolio_mean': float(benchmark.portfolio_mean or 0),
+                'portfolio_median': float(benchmark.portfolio_median or 0),
+                'portfolio_std': float(benchmark.portfolio_std or 0),
+                'z_score': self.z_score(value, benchmark),
+                'percentile_rank': percentile_rank,
+                'percentile': percentile_rank,
+                'rank': len(distribution) - position,  # 1 = highest value
+                'ranking': 'top' if percentile_rank >= 90 else 'bottom' if percentile_rank <= 10 else 'middle',
+                'property_count': benchmark.property_count,
+                'total_properties': benchmark.property_count
+            }
+        return None
+
+    def get_outliers(
+        self,
+        account_code: str,
+        threshold: float = 2.0,
+        benchmark_period: Optional[date] = None,
+        property_group: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Properties whose |z-score| in a cube cell reaches the threshold, most extreme first."""
+        benchmark = self.get_benchmark(account_code, benchmark_period, property_group)
+        if benchmark is None:
+            return []
 
+        outliers = []
+        for property_id, value in benchmark.distribution or []:
+            z_score = self.z_score(value, benchmark)
+            if abs(z_score) >= threshold:
+                outliers.append({
+                    'property_id': property_id,
+                    'account_code': account_code,
+                    'value': float(value),
+                    'outlier_type': 'extreme' if abs(z_score) >= 3.0 else ('high' if z_score > 0 else 'low'),
+                    'z_score': z_score,
+                    'percentile_rank': self._calculate_percentile_rank(value, benchmark),
+                    'portfolio_mean': float(benchmark.portfolio_mean or 0),
+                    'portfolio_std': float(benchmark.portfolio_std or 0)
+                })
+        outliers.sort(key=lambda o: abs(o['z_score']), reverse=True)
+        return outliers
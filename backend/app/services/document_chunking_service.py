@@ -1,10 +1,14 @@
 """
 Document Chunking Service for RAG
 
-Splits documents into manageable chunks for embedding and retrieval
+Splits documents into manageable chunks for embedding and retrieval.
+Chunks are generated lazily and tagged with a hash of the source text, so
+unchanged documents are never re-chunked.
 """
+import hashlib
 import re
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from app.models.document_upload import DocumentUpload
 from app.models.extraction_log import ExtractionLog
@@ -32,7 +36,7 @@ class DocumentChunkingService:
         
         Args:
             document_id: DocumentUpload ID
-            force_rechunk: If True, delete existing chunks and re-chunk
+            force_rechunk: If True, re-chunk even if the text is unchanged
         
         Returns:
             dict: Result with chunk count and status
@@ -49,12 +53,19 @@ class DocumentChunkingService:
                     "error": f"Document {document_id} not found"
                 }
             
-            # Check if already chunked
-            existing_chunks = self.db.query(DocumentChunk).filter(
+            text, extraction_log = self.get_document_text(document)
+            content_hash = self.content_hash(text) if text else None
+            
+            # Skip documents whose chunks were all built from the same text
+            existing_chunks, matching_chunks = self.db.query(
+                func.count(DocumentChunk.id),
+                func.coalesce(func.sum(case((DocumentChunk.content_hash == content_hash, 1), else_=0)), 0)
+            ).filter(
                 DocumentChunk.document_id == document_id
-            ).count()
+            ).one()
             
-            if existing_chunks > 0 and not force_rechunk:
+            unchanged = content_hash is not None and matching_chunks == existing_chunks
+            if existing_chunks > 0 and not force_rechunk and (unchanged or not text):
                 return {
                     "success": True,
                     "message": f"Document already chunked ({existing_chunks} chunks)",
@@ -62,32 +73,20 @@ class DocumentChunkingService:
                     "skipped": True
                 }
             
-            # Delete existing chunks if force_rechunk
-            if force_rechunk and existing_chunks > 0:
-                self.db.query(DocumentChunk).filter(
-                    DocumentChunk.document_id == document_id
-                ).delete()
-                self.db.commit()
-            
-            # Get extraction log with text
-            extraction_log = None
-            if document.extraction_id:
-                extraction_log = self.db.query(ExtractionLog).filter(
-                    ExtractionLog.id == document.extraction_id
-                ).first()
-            
-            # Get text from extraction log
-            text = None
-            if extraction_log and extraction_log.extracted_text:
-                text = extraction_log.extracted_text
-            else:
+            if not text:
                 return {
                     "success": False,
                     "error": "No extracted text found for document. Please ensure extraction is complete."
                 }
             
+            # Delete chunks built from older text
+            if existing_chunks > 0:
+                self.db.query(DocumentChunk).filter(
+                    DocumentChunk.document_id == document_id
+                ).delete(synchronize_session=False)
+            
             # Chunk the text
-            chunks = self._chunk_text(
+            chunks = self._iter_chunks(
                 text=text,
                 document_id=document_id,
                 extraction_log_id=extraction_log.id if extraction_log else None,
@@ -108,7 +107,8 @@ class DocumentChunkingService:
                     chunk_metadata=chunk_data.get('metadata'),
                     property_id=chunk_data.get('property_id'),
                     period_id=chunk_data.get('period_id'),
-                    document_type=chunk_data.get('document_type')
+                    document_type=chunk_data.get('document_type'),
+                    content_hash=content_hash
                 )
                 self.db.add(chunk)
                 chunk_count += 1
@@ -132,6 +132,37 @@ class DocumentChunkingService:
                 "error": str(e)
             }
     
+    def content_hash(self, text: str) -> str:
+        """Hash of the source text and chunking parameters (a change means re-chunk)"""
+        digest = hashlib.sha256(f"{self.chunk_size}:{self.chunk_overlap}:".encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get_document_text(self, document: DocumentUpload) -> Tuple[Optional[str], Optional[ExtractionLog]]:
+        """Extracted text of a document and the extraction log it came from"""
+        if not document.extraction_id:
+            return None, None
+        extraction_log = self.db.query(ExtractionLog).filter(
+            ExtractionLog.id == document.extraction_id
+        ).first()
+        if not extraction_log or not extraction_log.extracted_text:
+            return None, extraction_log
+        return extraction_log.extracted_text, extraction_log
+    
+    def iter_document_ids(self, page_size: int = 200, after_id: int = 0) -> Iterator[int]:
+        """Ids of documents with completed extraction, fetched in keyset pages"""
+        while True:
+            page = [
+                doc_id for (doc_id,) in self.db.query(DocumentUpload.id).filter(
+                    DocumentUpload.extraction_status == 'completed',
+                    DocumentUpload.id > after_id
+                ).order_by(DocumentUpload.id).limit(page_size)
+            ]
+            if not page:
+                return
+            yield from page
+            after_id = page[-1]
+    
     def _chunk_text(
         self,
         text: str,
@@ -141,8 +172,22 @@ class DocumentChunkingService:
         period_id: Optional[int] = None,
         document_type: Optional[str] = None
     ) -> List[Dict]:
+        """Split text into chunks with overlap (list form of _iter_chunks)"""
+        return list(self._iter_chunks(
+            text, document_id, extraction_log_id, property_id, period_id, document_type
+        ))
+    
+    def _iter_chunks(
+        self,
+        text: str,
+        document_id: int,
+        extraction_log_id: Optional[int] = None,
+        property_id: Optional[int] = None,
+        period_id: Optional[int] = None,
+        document_type: Optional[str] = None
+    ) -> Iterator[Dict]:
         """
-        Split text into chunks with overlap
+        Split text into chunks with overlap, yielding each as soon as it is formed
         
         Args:
             text: Text to chunk
@@ -152,11 +197,11 @@ class DocumentChunkingService:
             period_id: Period ID
             document_type: Document type
         
-        Returns:
-            List of chunk dictionaries
+        Yields:
+            Chunk dictionaries in chunk_index order
         """
         if not text or len(text.strip()) == 0:
-            return []
+            return
         
         # Clean text
         text = text.strip()
@@ -164,7 +209,6 @@ class DocumentChunkingService:
         # Try to split by paragraphs first (better semantic boundaries)
         paragraphs = re.split(r'\n\s*\n', text)
         
-        chunks = []
         current_chunk = ""
         chunk_index = 0
         
@@ -180,20 +224,12 @@ class DocumentChunkingService:
                 else:
                     current_chunk = para
             else:
-                # Save current chunk if it exists
+                # Emit current chunk if it exists
                 if current_chunk:
-                    chunks.append({
-                        'chunk_index': chunk_index,
-                        'chunk_text': current_chunk,
-                        'extraction_log_id': extraction_log_id,
-                        'property_id': property_id,
-                        'period_id': period_id,
-                        'document_type': document_type,
-                        'metadata': {
-                            'chunk_method': 'paragraph',
-                            'char_count': len(current_chunk)
-                        }
-                    })
+                    yield self._chunk_dict(
+                        chunk_index, current_chunk, 'paragraph',
+                        extraction_log_id, property_id, period_id, document_type
+                    )
                     chunk_index += 1
                 
                 # Start new chunk with overlap
@@ -206,33 +242,47 @@ class DocumentChunkingService:
                 
                 # If single paragraph is too large, split by sentences
                 if len(current_chunk) > self.chunk_size:
-                    chunks.extend(self._split_large_paragraph(
+                    for chunk in self._split_large_paragraph(
                         current_chunk,
                         chunk_index,
                         extraction_log_id,
                         property_id,
                         period_id,
                         document_type
-                    ))
-                    chunk_index += len(chunks) - chunk_index
+                    ):
+                        yield chunk
+                        chunk_index += 1
                     current_chunk = ""
         
-        # Add final chunk
+        # Emit final chunk
         if current_chunk:
-            chunks.append({
-                'chunk_index': chunk_index,
-                'chunk_text': current_chunk,
-                'extraction_log_id': extraction_log_id,
-                'property_id': property_id,
-                'period_id': period_id,
-                'document_type': document_type,
-                'metadata': {
-                    'chunk_method': 'paragraph',
-                    'char_count': len(current_chunk)
-                }
-            })
-        
-        return chunks
+            yield self._chunk_dict(
+                chunk_index, current_chunk, 'paragraph',
+                extraction_log_id, property_id, period_id, document_type
+            )
+    
+    def _chunk_dict(
+        self,
+        chunk_index: int,
+        chunk_text: str,
+        chunk_method: str,
+        extraction_log_id: Optional[int],
+        property_id: Optional[int],
+        period_id: Optional[int],
+        document_type: Optional[str]
+    ) -> Dict:
+        return {
+            'chunk_index': chunk_index,
+            'chunk_text': chunk_text,
+            'extraction_log_id': extraction_log_id,
+            'property_id': property_id,
+            'period_id': period_id,
+            'document_type': document_type,
+            'metadata': {
+                'chunk_method': chunk_method,
+                'char_count': len(chunk_text)
+            }
+        }
     
     def _split_large_paragraph(
         self,
@@ -300,19 +350,18 @@ class DocumentChunkingService:
         """
         Chunk all documents that have extracted text
         
+        Documents are streamed by id in keyset pages and only those whose text
+        changed are re-chunked. For embedding and vector sync as well, run
+        DocumentIndexingService (or the index_documents task) instead.
+        
         Args:
-            force_rechunk: If True, re-chunk even if already chunked
+            force_rechunk: If True, re-chunk even if the text is unchanged
         
         Returns:
             dict: Summary of chunking results
         """
-        # Get all documents with completed extraction
-        documents = self.db.query(DocumentUpload).filter(
-            DocumentUpload.extraction_status == 'completed'
-        ).all()
-        
         results = {
-            "total_documents": len(documents),
+            "total_documents": 0,
             "successful": 0,
             "failed": 0,
             "skipped": 0,
@@ -320,8 +369,9 @@ class DocumentChunkingService:
             "errors": []
         }
         
-        for doc in documents:
-            result = self.chunk_document(doc.id, force_rechunk=force_rechunk)
+        for document_id in self.iter_document_ids():
+            results["total_documents"] += 1
+            result = self.chunk_document(document_id, force_rechunk=force_rechunk)
             
             if result.get('success'):
                 if result.get('skipped'):
@@ -332,10 +382,11 @@ class DocumentChunkingService:
             else:
                 results["failed"] += 1
                 results["errors"].append({
-                    "document_id": doc.id,
-                    "file_name": doc.file_name,
+                    "document_id": document_id,
+                    "file_name": self.db.query(DocumentUpload.file_name).filter(
+                        DocumentUpload.id == document_id
+                    ).scalar(),
                     "error": result.get('error')
                 })
         
         return results
-
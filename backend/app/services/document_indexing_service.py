@@ -0,0 +1,294 @@
+"""
+Document Indexing Service
+
+Incremental, bounded indexing of the document corpus for RAG:
+
+1. Documents with completed extraction are streamed by id (keyset pages)
+2. A document whose chunks were built from the same text (content hash) is skipped
+3. Changed documents are re-chunked lazily; chunks are buffered and every
+   DOCUMENT_INDEX_EMBED_BATCH_SIZE of them are embedded in one call, inserted
+   in one flush and upserted to Pinecone in one request per namespace
+4. A document's chunks receive its content hash only when all of them are
+   committed, so a run interrupted mid-document redoes that document
+
+A run handles at most max_documents and reports where it stopped, so the
+index_documents task re-queues itself until the corpus is done.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_chunk import DocumentChunk
+from app.models.document_upload import DocumentUpload
+from app.models.financial_period import FinancialPeriod
+from app.services.document_chunking_service import DocumentChunkingService
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentIndexingService:
+    """Chunks, embeds and syncs changed documents in bounded batches"""
+
+    def __init__(
+        self,
+        db: Session,
+        embedding_service=None,
+        pinecone_service=None,
+        chunking_service: Optional[DocumentChunkingService] = None,
+        batch_size: Optional[int] = None
+    ):
+        self.db = db
+        self.chunking = chunking_service or DocumentChunkingService(db)
+        if embedding_service is None:
+            from app.services.embedding_service import EmbeddingService
+            embedding_service = EmbeddingService(db)
+        self.embedding_service = embedding_service
+        self._pinecone = pinecone_service
+        self._pinecone_checked = pinecone_service is not None
+        self.batch_size = batch_size or settings.DOCUMENT_INDEX_EMBED_BATCH_SIZE
+
+        self._pending: List[Tuple[Dict, Dict]] = []  # (chunk, document meta) awaiting flush
+        self._completed: List[Dict] = []  # Documents whose last chunk is pending
+        self._stats: Dict[str, Any] = {}
+
+    @property
+    def pinecone_service(self):
+        """Pinecone is optional: chunks stay unsynced (for reconciliation) when it is unavailable"""
+        if not self._pinecone_checked:
+            self._pinecone_checked = True
+            try:
+                from app.services.pinecone_service import PineconeService
+                self._pinecone = PineconeService(db=self.db)
+            except Exception as e:
+                logger.warning(f"Pinecone unavailable, indexing without vector sync: {e}")
+        return self._pinecone
+
+    def index_documents(
+        self,
+        document_ids: Optional[Iterable[int]] = None,
+        force: bool = False,
+        after_id: int = 0,
+        max_documents: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Index changed documents.
+
+        Args:
+            document_ids: Specific documents (all with completed extraction if None)
+            force: Re-index even if the text is unchanged
+            after_id: Resume the corpus scan after this document id
+            max_documents: Documents to look at in this run
+
+        Returns:
+            dict: Counters, plus last_document_id / has_more for continuation
+        """
+        max_documents = max_documents or settings.DOCUMENT_INDEX_MAX_DOCUMENTS_PER_RUN
+        if document_ids is None:
+            document_ids = self.chunking.iter_document_ids(
+                page_size=settings.DOCUMENT_INDEX_PAGE_SIZE, after_id=after_id
+            )
+
+        self._stats = {
+            "total_documents": 0,
+            "indexed": 0,
+            "unchanged": 0,
+            "skipped": 0,
+            "failed": 0,
+            "total_chunks": 0,
+            "embedded": 0,
+            "synced": 0,
+            "errors": [],
+            "last_document_id": after_id,
+            "has_more": False
+        }
+
+        for document_id in document_ids:
+            if self._stats["total_documents"] >= max_documents:
+                self._stats["has_more"] = True
+                break
+            self._stats["total_documents"] += 1
+            try:
+                outcome = self._index_document(document_id, force)
+                if outcome != "queued":
+                    self._stats[outcome] += 1
+            except Exception as e:
+                self._fail_pending(e, document_id)
+            self._stats["last_document_id"] = document_id
+
+        try:
+            self._flush()
+        except Exception as e:
+            self._fail_pending(e)
+
+        logger.info(
+            f"Indexed {self._stats['indexed']} documents ({self._stats['total_chunks']} chunks), "
+            f"{self._stats['unchanged']} unchanged, {self._stats['failed']} failed"
+        )
+        self._stats["errors"] = self._stats["errors"][:20]
+        return self._stats
+
+    def _index_document(self, document_id: int, force: bool) -> str:
+        """Queue a changed document's chunks; returns 'queued', 'unchanged' or 'skipped'"""
+        document = self.db.get(DocumentUpload, document_id)
+        if document is None:
+            return "skipped"
+        text, extraction_log = self.chunking.get_document_text(document)
+        if not text:
+            return "skipped"
+
+        content_hash = self.chunking.content_hash(text)
+        existing = self.db.query(DocumentChunk.id, DocumentChunk.content_hash).filter(
+            DocumentChunk.document_id == document_id
+        ).all()
+        if existing and not force and all(h == content_hash for _, h in existing):
+            return "unchanged"
+
+        if existing:
+            self.db.query(DocumentChunk).filter(
+                DocumentChunk.document_id == document_id
+            ).delete(synchronize_session=False)
+
+        period = self.db.get(FinancialPeriod, document.period_id) if document.period_id else None
+        meta = {
+            "document_id": document_id,
+            "document_type": document.document_type,
+            "content_hash": content_hash,
+            "period_year": period.period_year if period else None,
+            "period_month": period.period_month if period else None,
+            "stale_chunk_ids": [chunk_id for chunk_id, _ in existing],
+            "unembedded": 0,
+        }
+        for chunk in self.chunking._iter_chunks(
+            text=text,
+            document_id=document_id,
+            extraction_log_id=extraction_log.id if extraction_log else None,
+            property_id=document.property_id,
+            period_id=document.period_id,
+            document_type=document.document_type
+        ):
+            self._pending.append((chunk, meta))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+        self._completed.append(meta)
+        if not self._pending:
+            self._flush()  # No chunks (blank text): still record the document
+        return "queued"
+
+    def _flush(self):
+        """Embed, insert and upsert the pending chunks, then mark finished documents."""
+        if not self._pending and not self._completed:
+            return
+
+        texts = [chunk["chunk_text"] for chunk, _ in self._pending]
+        embeddings = self.embedding_service.generate_embeddings_batch(texts, batch_size=len(texts)) if texts else []
+        model = (
+            self.embedding_service.OPENAI_MODEL if self.embedding_service.embedding_method == 'openai'
+            else self.embedding_service.SENTENCE_TRANSFORMER_MODEL
+        )
+
+        rows = []
+        for (chunk, meta), embedding in zip(self._pending, embeddings):
+            if not embedding:
+                meta["unembedded"] += 1
+            rows.append(DocumentChunk(
+                document_id=meta["document_id"],
+                extraction_log_id=chunk.get("extraction_log_id"),
+                chunk_index=chunk["chunk_index"],
+                chunk_text=chunk["chunk_text"],
+                chunk_size=len(chunk["chunk_text"]),
+                chunk_metadata=chunk.get("metadata"),
+                property_id=chunk.get("property_id"),
+                period_id=chunk.get("period_id"),
+                document_type=chunk.get("document_type"),
+                embedding=embedding,
+                embedding_model=model if embedding else None,
+                embedding_dimension=len(embedding) if embedding else None
+            ))
+        self.db.add_all(rows)
+        self.db.flush()  # Assigns chunk ids for the vector ids
+
+        synced = self._upsert_vectors(rows, [meta for _, meta in self._pending])
+
+        for meta in self._completed:
+            if meta["unembedded"]:
+                continue  # Leave the hash unset so the next run retries the embeddings
+            self.db.execute(
+                update(DocumentChunk)
+                .where(DocumentChunk.document_id == meta["document_id"])
+                .values(content_hash=meta["content_hash"])
+            )
+        self.db.commit()
+
+        self._stats["total_chunks"] += len(rows)
+        self._stats["embedded"] += sum(1 for row in rows if row.embedding)
+        self._stats["synced"] += synced
+        self._stats["indexed"] += len(self._completed)
+        self._remove_stale_vectors(self._completed)
+        self._pending = []
+        self._completed = []
+        self.db.expunge_all()  # Bound the identity map across the corpus
+
+    def _upsert_vectors(self, rows: List[DocumentChunk], metas: List[Dict]) -> int:
+        """One upsert per namespace for the batch; marks the rows that made it"""
+        pinecone = self.pinecone_service
+        if pinecone is None:
+            return 0
+
+        by_namespace: Dict[str, List[Tuple[DocumentChunk, Dict]]] = {}
+        for row, meta in zip(rows, metas):
+            if row.embedding:
+                by_namespace.setdefault(pinecone._get_namespace(row.document_type), []).append((row, {
+                    'id': pinecone._build_vector_id(row.id),
+                    'values': row.embedding,
+                    'metadata': pinecone._build_metadata(
+                        property_id=row.property_id,
+                        document_type=row.document_type,
+                        period_year=meta["period_year"],
+                        period_month=meta["period_month"],
+                        document_id=row.document_id,
+                        chunk_index=row.chunk_index
+                    )
+                }))
+
+        synced = 0
+        now = datetime.now(timezone.utc)
+        for namespace, entries in by_namespace.items():
+            result = pinecone.upsert_vectors([vector for _, vector in entries], namespace=namespace)
+            if result.get("success"):
+                for row, _ in entries:
+                    row.vector_synced_at = now
+                synced += len(entries)
+            else:
+                logger.warning(f"Vector upsert failed for namespace '{namespace}': {result.get('error')}")
+        return synced
+
+    def _remove_stale_vectors(self, metas: List[Dict]):
+        """Best effort: vectors of replaced chunks, once their replacements are committed"""
+        pinecone = self.pinecone_service
+        if pinecone is None:
+            return
+        for meta in metas:
+            if meta["stale_chunk_ids"]:
+                pinecone.delete_vectors(
+                    vector_ids=[pinecone._build_vector_id(chunk_id) for chunk_id in meta["stale_chunk_ids"]],
+                    namespace=pinecone._get_namespace(meta["document_type"])
+                )
+
+    def _fail_pending(self, error: Exception, document_id: Optional[int] = None):
+        """Roll back and count every document with uncommitted work as failed"""
+        self.db.rollback()
+        failed = {meta["document_id"] for _, meta in self._pending}
+        failed.update(meta["document_id"] for meta in self._completed)
+        if document_id is not None:
+            failed.add(document_id)
+        logger.error(f"Indexing failed for documents {sorted(failed)}: {error}")
+        self._stats["failed"] += len(failed)
+        self._stats["errors"].extend(
+            {"document_id": failed_id, "error": str(error)} for failed_id in sorted(failed)
+        )
+        self._pending = []
+        self._completed = []
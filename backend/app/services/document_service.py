@@ -5,13 +5,16 @@ from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException, status
 from typing import Optional, Dict, Any, List
 from datetime import datetime, date
+import asyncio
 import hashlib
+import io
+import json
 import os
 
 from app.models.property import Property
 from app.models.financial_period import FinancialPeriod
 from app.models.document_upload import DocumentUpload
-from app.db.minio_client import upload_file, get_minio_client
+from app.db.minio_client import upload_file, upload_stream, get_minio_client
 from app.core.config import settings
 from app.services.document_type_detector import DocumentTypeDetector
 # Lazy import to avoid circular dependency
@@ -26,6 +29,18 @@ PROPERTY_NAME_MAPPING = {
     'WEND001': 'Wendover-Commons'
 }
 
+# E3-S4: Same limit as the upload endpoint; enforced here for deferred uploads
+MAX_PDF_PAGE_COUNT = 500
+
+
+def _detect_document_content(file_content: bytes, include_period: bool = True):
+    """Document type (and period) detection from file content; runs in a worker thread."""
+    from app.utils.extraction_engine import MultiEngineExtractor
+    content_detector = MultiEngineExtractor()
+    type_detection = content_detector.detect_document_type(file_content)
+    period_detection = content_detector.detect_year_and_period(file_content) if include_period else None
+    return type_detection, period_detection
+
 
 class DocumentService:
     """Handle document upload workflow and storage"""
@@ -122,62 +137,23 @@ class DocumentService:
         except Exception as e:
             print(f"⚠️  Failed to capture period range learning issue: {e}")
     
-    async def upload_document(
+    async def _validate_document_content(
         self,
+        file_content: bytes,
+        property_obj: Property,
+        period: FinancialPeriod,
         property_code: str,
         period_year: int,
         period_month: int,
-        document_type: str,
-        file: UploadFile,
-        uploaded_by: Optional[int] = None,
-        force_overwrite: bool = False
-    ) -> Dict:
+        document_type: str
+    ) -> Optional[Dict[str, Any]]:
         """
-        Complete document upload workflow
-        
-        Steps:
-        1. Validate property exists
-        2. Get/create financial period
-        3. Calculate file hash for deduplication
-        4. Check for duplicate uploads
-        5. Upload to MinIO
-        6. Create DocumentUpload record
-        
-        Args:
-            property_code: Property code (e.g., WEND001)
-            period_year: Financial period year
-            period_month: Financial period month (1-12)
-            document_type: Type of document (balance_sheet, income_statement, etc.)
-            file: Uploaded PDF file
-            uploaded_by: User ID (optional)
-        
-        Returns:
-            dict: Upload result with upload_id and file_path
-        
-        Raises:
-            HTTPException: If validation fails or upload errors occur
+        Intelligent document validation (property, type, year) from PDF content.
+
+        Returns the mismatch payload (property_mismatch / type_mismatch / year_mismatch)
+        when the document does not match the selection, None when it passes.
+        Used inline by upload_document and by the deferred validation pre-stage.
         """
-        # Step 1: Validate property exists
-        property_obj = self.get_property_by_code(property_code)
-        if not property_obj:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Property '{property_code}' not found"
-            )
-        
-        # Step 2: Get or create period
-        period = self.get_or_create_period(
-            property_obj.id,
-            period_year,
-            period_month
-        )
-        
-        # Step 3: Read file and calculate hash
-        file_content = await file.read()
-        file_hash = self.calculate_file_hash(file_content)
-        file_size = len(file_content)
-        
-        # Step 3.5: Intelligent document validation (property, type, year)
         print(f"🔍 Validating property, document type, and year from PDF content...")
         from app.utils.extraction_engine import MultiEngineExtractor
         detector = MultiEngineExtractor()
@@ -341,6 +317,91 @@ class DocumentService:
         # Users can select any month - only year and type are validated
         
         print(f"✅ Document validated: {detected_type} | Year: {detected_year or 'N/A'} | Month: {detected_month or 'N/A'} (month check disabled)")
+
+        return None
+
+    async def upload_document(
+        self,
+        property_code: str,
+        period_year: int,
+        period_month: int,
+        document_type: str,
+        file: UploadFile,
+        uploaded_by: Optional[int] = None,
+        force_overwrite: bool = False,
+        defer_validation: bool = False
+    ) -> Dict:
+        """
+        Complete document upload workflow
+        
+        Steps:
+        1. Validate property exists
+        2. Get/create financial period
+        3. Calculate file hash for deduplication
+        4. Check for duplicate uploads
+        5. Upload to MinIO
+        6. Create DocumentUpload record
+        
+        Args:
+            property_code: Property code (e.g., WEND001)
+            period_year: Financial period year
+            period_month: Financial period month (1-12)
+            document_type: Type of document (balance_sheet, income_statement, etc.)
+            file: Uploaded PDF file
+            uploaded_by: User ID (optional)
+            force_overwrite: Overwrite an existing object at the generated path
+            defer_validation: Accept immediately (stream to MinIO, record a
+                'validating' upload) and run content validation in Celery
+        
+        Returns:
+            dict: Upload result with upload_id and file_path
+        
+        Raises:
+            HTTPException: If validation fails or upload errors occur
+        """
+        # Step 1: Validate property exists
+        property_obj = self.get_property_by_code(property_code)
+        if not property_obj:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Property '{property_code}' not found"
+            )
+        
+        # Step 2: Get or create period
+        period = self.get_or_create_period(
+            property_obj.id,
+            period_year,
+            period_month
+        )
+
+        if defer_validation:
+            return await self.accept_upload(
+                property_obj,
+                period,
+                period_year,
+                period_month,
+                document_type,
+                file,
+                uploaded_by=uploaded_by
+            )
+        
+        # Step 3: Read file and calculate hash
+        file_content = await file.read()
+        file_hash = self.calculate_file_hash(file_content)
+        file_size = len(file_content)
+        
+        # Step 3.5: Intelligent document validation (property, type, year)
+        mismatch = await self._validate_document_content(
+            file_content,
+            property_obj,
+            period,
+            property_code,
+            period_year,
+            period_month,
+            document_type
+        )
+        if mismatch:
+            return mismatch
         
         # Step 4: Check for duplicate and auto-replace
         existing_upload = self.check_duplicate(
@@ -352,31 +413,7 @@ class DocumentService:
         if existing_upload:
             # Auto-replace: Delete old upload (cascade deletes all related data)
             print(f"🔄 Duplicate detected (ID {existing_upload.id}). Auto-replacing with new upload...")
-            
-            # Delete old file from MinIO if exists
-            if existing_upload.file_path:
-                try:
-                    from app.db.minio_client import delete_file
-                    delete_file(existing_upload.file_path, settings.MINIO_BUCKET_NAME)
-                    print(f"🗑️  Deleted old file from MinIO: {existing_upload.file_path}")
-                except Exception as e:
-                    print(f"⚠️  Warning: Could not delete old file from MinIO: {e}")
-            
-            # Decrement quota before delete (replace = net 0, we'll increment for new)
-            org_id = self.organization_id or getattr(existing_upload, "organization_id", None)
-            if org_id is None and existing_upload.property_id:
-                from app.models.property import Property
-                prop = self.db.query(Property).filter(Property.id == existing_upload.property_id).first()
-                org_id = prop.organization_id if prop else None
-            if org_id is not None:
-                from app.services.quota_service import decrement_document_count, decrement_storage
-                decrement_document_count(self.db, org_id)
-                size = getattr(existing_upload, "file_size_bytes", None) or 0
-                if size:
-                    decrement_storage(self.db, org_id, int(size))
-            # Delete old database record (cascades to all related financial data)
-            self.db.delete(existing_upload)
-            self.db.commit()
+            self._replace_existing_upload(existing_upload)
             print(f"✅ Old upload deleted. Proceeding with new upload...")
         
         # Step 5: Generate file path and check if exists (server-side only, never from client)
@@ -462,6 +499,189 @@ class DocumentService:
             "message": "Document uploaded successfully"
         }
     
+    async def accept_upload(
+        self,
+        property_obj: Property,
+        period: FinancialPeriod,
+        period_year: int,
+        period_month: int,
+        document_type: str,
+        file: UploadFile,
+        uploaded_by: Optional[int] = None
+    ) -> Dict:
+        """
+        Phase 1 of a two-phase upload: accept the file without inspecting it.
+
+        The request body is streamed to MinIO as a multipart upload and hashed on
+        the way. An identical earlier upload is replaced (as the inline flow
+        does), a DocumentUpload is recorded with the streamed hash and status
+        'validating', and validate_upload (Celery) runs document intelligence and
+        mismatch checks before queuing extraction. Results are reported through
+        extraction_status (validation_failed + JSON payload in notes) on the
+        status channel.
+        """
+        file_path = await self.generate_file_path(
+            property_obj,
+            period,
+            period_year,
+            document_type,
+            file.filename,
+            period_month=period_month
+        )
+
+        await file.seek(0)
+        print(f"📤 Streaming to MinIO: {file_path}")
+        stored = await asyncio.to_thread(
+            upload_stream,
+            file.file,
+            file_path,
+            "application/pdf",
+            settings.MINIO_BUCKET_NAME
+        )
+        if not stored:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to upload file to storage"
+            )
+
+        # Replaced before the insert, so the new row never collides with it on the
+        # (org, property, period, type, hash) unique index
+        replaced_ids = []
+        existing_upload = self.check_duplicate(property_obj.id, period.id, document_type, stored["file_hash"])
+        if existing_upload:
+            print(f"🔄 Duplicate detected (ID {existing_upload.id}). Auto-replacing with new upload...")
+            replaced_ids.append(existing_upload.id)
+            self._replace_existing_upload(existing_upload)
+
+        upload = DocumentUpload(
+            property_id=property_obj.id,
+            period_id=period.id,
+            organization_id=getattr(property_obj, 'organization_id', None),
+            document_type=document_type,
+            file_name=file.filename,
+            file_path=file_path,
+            file_hash=stored["file_hash"],
+            file_size_bytes=stored["file_size"],
+            uploaded_by=uploaded_by,
+            extraction_status='validating',
+            version=self._get_next_version(property_obj.id, period.id, document_type),
+            is_active=True
+        )
+        self.db.add(upload)
+        self.db.commit()
+        self.db.refresh(upload)
+
+        task_id = None
+        try:
+            from app.tasks.extraction_tasks import validate_upload
+            task = validate_upload.delay(upload.id)
+            task_id = task.id
+            upload.extraction_task_id = task.id
+            self.db.commit()
+            print(f"✅ Validation task queued: task_id={task.id} for upload_id={upload.id}")
+        except Exception as e:
+            # recover_stuck_extractions re-queues 'validating' uploads without a task id
+            upload.notes = f"Validation queuing failed, will retry: {str(e)}"
+            self.db.commit()
+            print(f"⚠️  Validation queuing failed for upload_id={upload.id}, will be recovered by background task")
+
+        return {
+            "is_duplicate": False,
+            "deferred": True,
+            "upload_id": upload.id,
+            "task_id": task_id,
+            "file_path": file_path,
+            "file_size": stored["file_size"],
+            "replaced": replaced_ids,
+            "extraction_status": upload.extraction_status,
+            "message": "Document accepted; validation queued"
+        }
+
+    async def run_deferred_validation(self, upload_id: int) -> Dict:
+        """
+        Phase 2 of a two-phase upload (runs in Celery): validate an accepted upload.
+
+        On a property/type/year mismatch the upload is marked 'validation_failed'
+        with the mismatch payload as JSON in notes, deactivated, its object removed,
+        its file hash cleared (so it no longer holds the file-hash unique index
+        slot) and its quota released. Otherwise extraction is queued.
+        """
+        upload = self.get_upload_by_id(upload_id)
+        if not upload:
+            return {"success": False, "error": f"Upload {upload_id} not found"}
+        if upload.extraction_status != 'validating':
+            return {"success": True, "skipped": True, "status": upload.extraction_status}
+
+        property_obj = self.db.query(Property).filter(Property.id == upload.property_id).first()
+        period = self.db.query(FinancialPeriod).filter(FinancialPeriod.id == upload.period_id).first()
+        if self.organization_id is None and property_obj is not None:
+            self.organization_id = property_obj.organization_id
+
+        from app.db.minio_client import download_file, delete_file
+        file_content = await asyncio.to_thread(download_file, upload.file_path, settings.MINIO_BUCKET_NAME)
+        if file_content is None:
+            upload.extraction_status = 'failed'
+            upload.notes = "Validation failed: uploaded file not found in storage"
+            self.db.commit()
+            return {"success": False, "error": upload.notes}
+
+        # E3-S4 page limit, checked here because deferred uploads skip it at the endpoint
+        try:
+            from pypdf import PdfReader
+            page_count = len(PdfReader(io.BytesIO(file_content)).pages)
+        except Exception:
+            page_count = None
+
+        if page_count and page_count > MAX_PDF_PAGE_COUNT:
+            mismatch = {
+                "page_limit_exceeded": True,
+                "page_count": page_count,
+                "message": f"PDF exceeds maximum page count ({MAX_PDF_PAGE_COUNT} pages). This file has {page_count} pages."
+            }
+        else:
+            mismatch = await self._validate_document_content(
+                file_content,
+                property_obj,
+                period,
+                property_obj.property_code,
+                period.period_year,
+                period.period_month,
+                upload.document_type
+            )
+        if mismatch:
+            upload.extraction_status = 'validation_failed'
+            upload.is_active = False
+            upload.file_hash = None
+            upload.notes = json.dumps(mismatch, default=str)
+            upload.extraction_completed_at = datetime.now()
+            if upload.organization_id is not None:
+                from app.services.quota_service import decrement_document_count, decrement_storage
+                decrement_document_count(self.db, upload.organization_id)
+                if upload.file_size_bytes:
+                    decrement_storage(self.db, upload.organization_id, int(upload.file_size_bytes))
+            self.db.commit()
+            delete_file(upload.file_path, settings.MINIO_BUCKET_NAME)
+            return {"success": False, "upload_id": upload.id, "mismatch": mismatch}
+
+        upload.extraction_status = 'pending'
+        upload.extraction_task_id = None
+        upload.notes = None
+        self.db.commit()
+        try:
+            from app.tasks.extraction_tasks import extract_document
+            task = extract_document.delay(upload.id)
+            upload.extraction_task_id = task.id
+            self.db.commit()
+        except Exception as e:
+            upload.notes = f"Extraction queuing failed, will retry: {str(e)}"
+            self.db.commit()
+
+        return {
+            "success": True,
+            "upload_id": upload.id,
+            "extraction_task_id": upload.extraction_task_id
+        }
+
     def get_property_by_code(self, property_code: str) -> Optional[Property]:
         """
         Get property by code or ID.
@@ -654,6 +874,35 @@ class DocumentService:
         
         return max_version + 1
     
+    def _replace_existing_upload(self, existing_upload: DocumentUpload) -> None:
+        """
+        Remove an upload that is being replaced: its MinIO object, its quota usage
+        (replace = net 0, the new upload increments again) and its database record,
+        which cascades to all related financial data.
+        """
+        if existing_upload.file_path:
+            try:
+                from app.db.minio_client import delete_file
+                from app.services.pdf_highlight_service import delete_annotated_variants
+                delete_file(existing_upload.file_path, settings.MINIO_BUCKET_NAME)
+                delete_annotated_variants(existing_upload.file_path, existing_upload.id)
+                print(f"🗑️  Deleted old file from MinIO: {existing_upload.file_path}")
+            except Exception as e:
+                print(f"⚠️  Warning: Could not delete old file from MinIO: {e}")
+
+        org_id = self.organization_id or getattr(existing_upload, "organization_id", None)
+        if org_id is None and existing_upload.property_id:
+            prop = self.db.query(Property).filter(Property.id == existing_upload.property_id).first()
+            org_id = prop.organization_id if prop else None
+        if org_id is not None:
+            from app.services.quota_service import decrement_document_count, decrement_storage
+            decrement_document_count(self.db, org_id)
+            size = getattr(existing_upload, "file_size_bytes", None) or 0
+            if size:
+                decrement_storage(self.db, org_id, int(size))
+        self.db.delete(existing_upload)
+        self.db.commit()
+
     def get_upload_by_id(self, upload_id: int) -> Optional[DocumentUpload]:
         """Get upload by ID"""
         return self.db.query(DocumentUpload).filter(
@@ -724,13 +973,78 @@ class DocumentService:
             "error": f"Unsupported file format. Supported: PDF, CSV, Excel (.xlsx, .xls), DOC (.doc, .docx)"
         }
     
+    async def _prescan_bulk_files(
+        self,
+        files: List[UploadFile],
+        detector: DocumentTypeDetector,
+        max_concurrency: int = 4
+    ) -> List[Dict[str, Any]]:
+        """
+        Read every file and run PDF content detection concurrently.
+
+        Returns one dict per file (same order) with content, type_detection,
+        period_detection and error. Content detection runs for PDFs and for files
+        whose type cannot be detected from the filename; no database access here.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def scan_file(file: UploadFile) -> Dict[str, Any]:
+            scan = {"content": None, "type_detection": None, "period_detection": None, "error": None}
+            format_validation = self._validate_file_format(file)
+            if not format_validation["valid"]:
+                return scan
+
+            try:
+                scan["content"] = await file.read()
+                await file.seek(0)
+            except Exception as e:
+                scan["error"] = e
+                return scan
+            is_pdf = format_validation["file_type"] == "pdf"
+            filename_type = detector.detect_from_filename(file.filename or "").get("document_type", "unknown")
+            if not is_pdf and filename_type != "unknown":
+                return scan
+
+            async with semaphore:
+                try:
+                    scan["type_detection"], scan["period_detection"] = await asyncio.to_thread(
+                        _detect_document_content, scan["content"], is_pdf
+                    )
+                except Exception as e:
+                    scan["error"] = e
+            return scan
+
+        return await asyncio.gather(*(scan_file(file) for file in files))
+
+    async def _iter_bulk_scans(
+        self,
+        files: List[UploadFile],
+        detector: DocumentTypeDetector,
+        max_concurrency: int = 4
+    ):
+        """
+        Yield (file, scan) pairs, prescanning files a window at a time.
+
+        A window is twice max_concurrency files, so detection for the window stays
+        parallel while at most one window of file contents is held in memory;
+        each file's content is dropped once the caller has processed it.
+        """
+        window = max(1, max_concurrency) * 2
+        for start in range(0, len(files), window):
+            batch = files[start:start + window]
+            scans = await self._prescan_bulk_files(batch, detector, max_concurrency)
+            for file, scan in zip(batch, scans):
+                yield file, scan
+                scan["content"] = None
+
     async def bulk_upload_documents(
         self,
         property_code: str,
         year: int,
         files: List[UploadFile],
         uploaded_by: Optional[int] = None,
-        duplicate_strategy: str = "skip"
+        duplicate_strategy: str = "skip",
+        max_concurrency: int = 4
     ) -> Dict:
         """
         Bulk upload multiple documents for a year with intelligent duplicate handling.
@@ -754,6 +1068,7 @@ class DocumentService:
                 - "skip": Skip files that already exist (default)
                 - "replace": Replace existing files with new ones
                 - "version": Create new version (keep both)
+            max_concurrency: Files whose PDF content is analysed in parallel
 
         Returns:
             {
@@ -817,7 +1132,9 @@ class DocumentService:
                 "results": []
             }
         
-        for file in files:
+        # PDF content analysis is the slow part of every file; run it a window of
+        # files ahead in worker threads, then apply the per-file database steps in order
+        async for file, scan in self._iter_bulk_scans(files, detector, max_concurrency):
             result = {
                 "filename": file.filename or "unknown",
                 "document_type": "unknown",
@@ -849,12 +1166,9 @@ class DocumentService:
                 if detected_type == "unknown":
                     # Try to detect from PDF content as fallback
                     try:
-                        file_content = await file.read()
-                        await file.seek(0)  # Reset file pointer for later use
-
-                        from app.utils.extraction_engine import MultiEngineExtractor
-                        content_detector = MultiEngineExtractor()
-                        content_type_detection = content_detector.detect_document_type(file_content)
+                        if scan["error"]:
+                            raise scan["error"]
+                        content_type_detection = scan["type_detection"] or {}
                         content_detected_type = content_type_detection.get("detected_type", "unknown")
 
                         if content_detected_type != "unknown":
@@ -916,6 +1230,7 @@ class DocumentService:
                 )
 
                 filename_month = None
+                detected_month = None
                 detected_year = year
                 is_period_range = False
                 used_learned_pattern = False
@@ -953,8 +1268,7 @@ class DocumentService:
                     detected_year = year
 
                 # Step 4: Read file content early to detect month from PDF for mortgage statements
-                file_content = await file.read()
-                file.file.seek(0)  # Reset for potential reuse
+                file_content = scan["content"]
 
                 # Step 5: INTELLIGENT PDF CONTENT ANALYSIS (if PDF)
                 # For mortgage statements, prioritize statement date over filename date
@@ -967,16 +1281,16 @@ class DocumentService:
 
                 if format_validation["file_type"] == "pdf":
                     try:
-                        from app.utils.extraction_engine import MultiEngineExtractor
-                        content_detector = MultiEngineExtractor()
+                        if scan["error"]:
+                            raise scan["error"]
 
                         # Detect document type from PDF content
-                        pdf_type_detection = content_detector.detect_document_type(file_content)
+                        pdf_type_detection = scan["type_detection"]
                         pdf_detected_type = pdf_type_detection.get("detected_type")
                         pdf_type_confidence = pdf_type_detection.get("confidence", 0)
 
                         # Detect year and period from PDF content
-                        pdf_period_detection = content_detector.detect_year_and_period(file_content)
+                        pdf_period_detection = scan["period_detection"]
                         pdf_detected_year = pdf_period_detection.get("year")
                         pdf_detected_month = pdf_period_detection.get("month")
                         pdf_period_confidence = pdf_period_detection.get("confidence", 0)
@@ -1178,30 +1492,8 @@ class DocumentService:
                     elif duplicate_strategy == "replace":
                         # Replace existing upload
                         try:
-                            from app.db.minio_client import delete_file
-                            # Delete old file from MinIO
-                            if existing_upload.file_path:
-                                try:
-                                    delete_file(existing_upload.file_path, settings.MINIO_BUCKET_NAME)
-                                except Exception as e:
-                                    print(f"⚠️  Warning: Could not delete old MinIO file: {e}")
-
                             old_upload_id = existing_upload.id
-                            # Decrement quota before delete (replace = net 0)
-                            org_id = self.organization_id or getattr(existing_upload, "organization_id", None)
-                            if org_id is None and existing_upload.property_id:
-                                from app.models.property import Property
-                                prop = self.db.query(Property).filter(Property.id == existing_upload.property_id).first()
-                                org_id = prop.organization_id if prop else None
-                            if org_id is not None:
-                                from app.services.quota_service import decrement_document_count, decrement_storage
-                                decrement_document_count(self.db, org_id)
-                                size = getattr(existing_upload, "file_size_bytes", None) or 0
-                                if size:
-                                    decrement_storage(self.db, org_id, int(size))
-                            # Delete associated data (cascades via relationships)
-                            self.db.delete(existing_upload)
-                            self.db.commit()
+                            self._replace_existing_upload(existing_upload)
                             print(f"✅ Replacing existing upload (id: {old_upload_id}) with new file")
                             # Continue with upload - will mark as "replaced" later
 
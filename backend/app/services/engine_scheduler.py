@@ -0,0 +1,308 @@
+"""
+Engine Scheduler
+
+Adaptive engine selection for the multi-engine extraction paths
+(MultiEngineExtractor.extract_with_confidence, extract_with_all_models_scored,
+_extract_multi_engine).
+
+Statements from the same property management system usually come out right from
+the first (cheapest) engine. For each (property, document type, template
+fingerprint) the scheduler derives engine win rates from the outcomes recorded
+on recent ExtractionLog rows (engine -> confidence, as scored by the
+ConfidenceEngine / ModelScoringService). An engine "wins" a run when its
+confidence reaches the threshold.
+
+- Until some engine is proven for a template (enough runs, high win rate) every
+  engine runs, which is also how win rates are learned.
+- Once one is, engines run cheapest-proven first and the rest are only run when
+  confidence falls below the threshold or the result fails validation
+  (escalation). Skipped engines and escalations are counted in Prometheus.
+
+The main text extraction runs before the document's own fingerprint is known,
+so it is planned with the fingerprint of the property's latest extraction of
+that document type; the plan is rebuilt once the text is in (EnginePlan.absorb).
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_upload import DocumentUpload
+from app.models.extraction_log import ExtractionLog
+
+try:
+    from prometheus_client import Counter
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Relative cost per document; decides the order among equally trusted engines
+ENGINE_COSTS = {
+    "pymupdf": 1.0,
+    "pdfplumber": 3.0,
+    "camelot": 10.0,
+    "easyocr": 40.0,
+    "ocr": 50.0,
+    "layoutlm": 80.0,
+}
+
+# Display names used by extract_with_all_models_scored -> engine keys
+ENGINE_KEYS = {
+    "PyMuPDF": "pymupdf",
+    "PDFPlumber": "pdfplumber",
+    "Camelot": "camelot",
+    "Tesseract OCR": "ocr",
+    "LayoutLMv3": "layoutlm",
+    "EasyOCR": "easyocr",
+}
+
+# Header lines hashed into the template fingerprint
+FINGERPRINT_HEADER_LINES = 6
+
+_MONTHS = r"jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|sep(t|tember)?|oct(ober)?|nov(ember)?|dec(ember)?"
+_PERIOD_TOKENS = re.compile(rf"\b({_MONTHS})\b|[\d\W_]+", re.IGNORECASE)
+
+if PROMETHEUS_AVAILABLE:
+    extraction_engines_skipped_total = Counter(
+        'extraction_engines_skipped_total',
+        'Extraction engines not run because a proven engine was sufficient',
+        ['engine', 'call']
+    )
+
+    extraction_engine_escalations_total = Counter(
+        'extraction_engine_escalations_total',
+        'Extractions that escalated past the scheduled first engine',
+        ['engine', 'call']
+    )
+else:
+    class _DummyMetric:
+        def labels(self, *args, **kwargs): return self
+        def inc(self, *args, **kwargs): pass
+
+    extraction_engines_skipped_total = _DummyMetric()
+    extraction_engine_escalations_total = _DummyMetric()
+
+
+def template_fingerprint(text: str, classification: Optional[str] = None) -> Optional[str]:
+    """
+    Fingerprint of a statement's template from its header lines.
+
+    Digits, punctuation and month names are dropped so the same report for another
+    period hashes the same. Returns None when the text has no usable header.
+    """
+    lines = []
+    for line in (text or "").splitlines():
+        normalized = " ".join(_PERIOD_TOKENS.sub(" ", line).lower().split())
+        if normalized:
+            lines.append(normalized)
+            if len(lines) == FINGERPRINT_HEADER_LINES:
+                break
+    if not lines:
+        return None
+    return hashlib.sha1("\n".join([str(classification or "")] + lines).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class EngineStats:
+    runs: int = 0
+    wins: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.runs if self.runs else 0.0
+
+
+class EnginePlan:
+    """
+    Engine order and stop rule for one document.
+
+    Also collects the per-engine confidences seen while extracting, which the
+    orchestrator stores on ExtractionLog.engine_outcomes for future plans.
+    """
+
+    def __init__(
+        self,
+        stats: Optional[Dict[str, EngineStats]] = None,
+        fingerprint: Optional[str] = None,
+        confidence_threshold: float = 0.85,
+        min_samples: int = 3,
+        min_win_rate: float = 0.9,
+        enabled: bool = True
+    ):
+        self.stats = stats or {}
+        self.fingerprint = fingerprint
+        self.confidence_threshold = confidence_threshold
+        self.min_samples = min_samples
+        self.min_win_rate = min_win_rate
+        self.enabled = enabled
+        self.confidences: Dict[str, float] = {}
+        self.skipped: List[str] = []
+        self.escalated = False
+
+    def is_proven(self, engine: str) -> bool:
+        stats = self.stats.get(engine)
+        return bool(stats) and stats.runs >= self.min_samples and stats.win_rate >= self.min_win_rate
+
+    @property
+    def exploring(self) -> bool:
+        """No engine proven for this template yet: run everything and learn."""
+        return not self.enabled or not any(self.is_proven(engine) for engine in self.stats)
+
+    def order(self, engines: Iterable[str]) -> List[str]:
+        """Proven engines first, then untried, then proven-unreliable; cheapest first within each."""
+        def tier(engine: str) -> int:
+            if self.is_proven(engine):
+                return 0
+            stats = self.stats.get(engine)
+            return 2 if stats and stats.runs >= self.min_samples else 1
+
+        return sorted(engines, key=lambda engine: (tier(engine), ENGINE_COSTS.get(engine, 100.0)))
+
+    def run(
+        self,
+        call: str,
+        runners: Dict[str, Callable[[], Any]],
+        confidence: Callable[[Any], float],
+        validated: Optional[Callable[[Any], bool]] = None
+    ) -> List[Any]:
+        """
+        Run engines in plan order and return their results in run order.
+
+        `confidence(result)` maps a result to 0-1 (0 for failures) and the
+        optional `validated(result)` says whether it passed validation. Outside
+        exploration, stops at the first result reaching the threshold that
+        also passes validation.
+        """
+        ordered = self.order(runners)
+        results = []
+        for position, engine in enumerate(ordered):
+            result = runners[engine]()
+            results.append(result)
+            score = confidence(result)
+            self.confidences[engine] = max(self.confidences.get(engine, 0.0), score)
+
+            if self.exploring:
+                continue
+            if score >= self.confidence_threshold and (validated is None or validated(result)):
+                skipped = ordered[position + 1:]
+                for skipped_engine in skipped:
+                    extraction_engines_skipped_total.labels(engine=skipped_engine, call=call).inc()
+                self.skipped.extend(e for e in skipped if e not in self.skipped)
+                if skipped:
+                    logger.debug(f"{call}: {engine} sufficient ({score:.2f}), skipped {skipped}")
+                break
+            if position == 0 and len(ordered) > 1:
+                self.escalated = True
+                extraction_engine_escalations_total.labels(engine=engine, call=call).inc()
+        return results
+
+    def absorb(self, other: 'EnginePlan') -> None:
+        """Take over what ran under an earlier plan for the same document."""
+        for engine, score in other.confidences.items():
+            self.confidences[engine] = max(self.confidences.get(engine, 0.0), score)
+        self.skipped.extend(e for e in other.skipped if e not in self.skipped)
+        self.escalated = self.escalated or other.escalated
+
+    def outcomes(self) -> Optional[Dict[str, Any]]:
+        """Compact summary for ExtractionLog.engine_outcomes, None if nothing ran under this plan."""
+        if not self.confidences:
+            return None
+        return {
+            "confidences": {engine: round(score, 4) for engine, score in self.confidences.items()},
+            "skipped": list(self.skipped),
+            "escalated": self.escalated,
+        }
+
+
+class EngineScheduler:
+    """Builds EnginePlans from engine win rates on recent extractions of the same template"""
+
+    def __init__(
+        self,
+        db: Session,
+        confidence_threshold: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        min_win_rate: Optional[float] = None,
+        history: Optional[int] = None
+    ):
+        self.db = db
+        self.confidence_threshold = (
+            confidence_threshold if confidence_threshold is not None
+            else settings.ENGINE_SCHEDULER_CONFIDENCE_THRESHOLD
+        )
+        self.min_samples = min_samples if min_samples is not None else settings.ENGINE_SCHEDULER_MIN_SAMPLES
+        self.min_win_rate = min_win_rate if min_win_rate is not None else settings.ENGINE_SCHEDULER_MIN_WIN_RATE
+        self.history = history if history is not None else settings.ENGINE_SCHEDULER_HISTORY
+
+    def plan(
+        self,
+        property_id: Optional[int],
+        document_type: Optional[str],
+        fingerprint: Optional[str]
+    ) -> EnginePlan:
+        """Plan for a document; without a fingerprint every engine runs."""
+        stats: Dict[str, EngineStats] = {}
+        if settings.ENGINE_SCHEDULER_ENABLED and property_id is not None and fingerprint:
+            try:
+                stats = self.win_rates(property_id, document_type, fingerprint)
+            except Exception as e:
+                logger.warning(f"Engine win rates unavailable, running all engines: {e}")
+        return EnginePlan(
+            stats=stats,
+            fingerprint=fingerprint,
+            confidence_threshold=self.confidence_threshold,
+            min_samples=self.min_samples,
+            min_win_rate=self.min_win_rate,
+            enabled=settings.ENGINE_SCHEDULER_ENABLED,
+        )
+
+    def latest_fingerprint(self, property_id: Optional[int], document_type: Optional[str]) -> Optional[str]:
+        """Template fingerprint of the property's latest extraction of this document type."""
+        if not settings.ENGINE_SCHEDULER_ENABLED or property_id is None:
+            return None
+        try:
+            return (
+                self.db.query(ExtractionLog.template_fingerprint)
+                .join(DocumentUpload, DocumentUpload.extraction_id == ExtractionLog.id)
+                .filter(
+                    DocumentUpload.property_id == property_id,
+                    DocumentUpload.document_type == document_type,
+                    ExtractionLog.template_fingerprint.isnot(None)
+                )
+                .order_by(ExtractionLog.id.desc())
+                .limit(1)
+                .scalar()
+            )
+        except Exception as e:
+            logger.warning(f"Latest template fingerprint unavailable: {e}")
+            return None
+
+    def win_rates(self, property_id: int, document_type: Optional[str], fingerprint: str) -> Dict[str, EngineStats]:
+        """Per-engine runs/wins over the last `history` extractions of this template."""
+        rows = (
+            self.db.query(ExtractionLog.engine_outcomes)
+            .join(DocumentUpload, DocumentUpload.extraction_id == ExtractionLog.id)
+            .filter(
+                DocumentUpload.property_id == property_id,
+                DocumentUpload.document_type == document_type,
+                ExtractionLog.template_fingerprint == fingerprint,
+                ExtractionLog.engine_outcomes.isnot(None)
+            )
+            .order_by(ExtractionLog.id.desc())
+            .limit(self.history)
+            .all()
+        )
+        stats: Dict[str, EngineStats] = {}
+        for (outcomes,) in rows:
+            for engine, score in ((outcomes or {}).get("confidences") or {}).items():
+                engine_stats = stats.setdefault(engine, EngineStats())
+                engine_stats.runs += 1
+                if float(score) >= self.confidence_threshold:
+                    engine_stats.wins += 1
+        return stats
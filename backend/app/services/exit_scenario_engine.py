@@ -0,0 +1,227 @@
+"""
+Exit Scenario Engine
+
+Vectorized cash-flow math for exit strategy analysis. Every function takes
+NumPy arrays (one element or row per scenario), so a grid of cap rates,
+interest rates, NOI growth and hold periods - or thousands of Monte Carlo
+draws - is evaluated in a handful of array operations instead of Python
+loops per scenario.
+
+Cash flows are a (scenarios, years + 1) matrix with year 0 first. Scenarios
+with shorter hold periods are zero-padded after their exit year, which
+leaves their NPV and IRR unchanged.
+"""
+from typing import Optional
+
+import numpy as np
+
+IRR_LOWER_BOUND = -0.9999
+IRR_UPPER_BOUND = 10.0  # 1,000%; flows that need a higher rate report no IRR
+
+
+def npv(rates, cash_flows) -> np.ndarray:
+    """NPV of each cash flow row at its rate (rates broadcast against rows)"""
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    rates = np.broadcast_to(np.asarray(rates, dtype=float), cash_flows.shape[:1])
+    periods = np.arange(cash_flows.shape[1])
+    return (cash_flows / (1.0 + rates[:, None]) ** periods).sum(axis=1)
+
+
+def irr(cash_flows, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+    """
+    IRR of each cash flow row.
+
+    Safeguarded Newton iteration on all rows at once: a Newton step that
+    leaves the row's sign-change bracket falls back to bisection, so every
+    row converges. Rows without a sign change between IRR_LOWER_BOUND and
+    IRR_UPPER_BOUND (no IRR) are NaN.
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    periods = np.arange(cash_flows.shape[1])
+    n = cash_flows.shape[0]
+
+    lo = np.full(n, IRR_LOWER_BOUND)
+    hi = np.full(n, IRR_UPPER_BOUND)
+    f_lo = npv(lo, cash_flows)
+    f_hi = npv(hi, cash_flows)
+    valid = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) != np.sign(f_hi))
+
+    rate = np.full(n, 0.1)
+    active = np.flatnonzero(valid)  # Rows still iterating; converged rows drop out
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        flows, r = cash_flows[active], rate[active]
+        discount = (1.0 + r[:, None]) ** periods
+        value = (flows / discount).sum(axis=1)
+        slope = -(periods * flows / (discount * (1.0 + r[:, None]))).sum(axis=1)
+
+        same_side = np.sign(value) == np.sign(f_lo[active])
+        lo[active] = np.where(same_side, r, lo[active])
+        f_lo[active] = np.where(same_side, value, f_lo[active])
+        hi[active] = np.where(same_side, hi[active], r)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = r - value / slope
+        use_bisection = ~np.isfinite(newton) | (newton < lo[active]) | (newton > hi[active])
+        next_rate = np.where(use_bisection, (lo[active] + hi[active]) / 2, newton)
+        next_rate = np.where(value == 0, r, next_rate)  # Exact root: keep it
+
+        rate[active] = next_rate
+        active = active[np.abs(next_rate - r) >= tol]
+
+    return np.where(valid, rate, np.nan)
+
+
+def monthly_payment(principal, annual_rate, term_years) -> np.ndarray:
+    """Level monthly payment: P * r(1+r)^n / ((1+r)^n - 1), or P / n at 0%"""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 12
+    payments = np.asarray(term_years, dtype=float) * 12
+    growth = (1.0 + monthly_rate) ** payments
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortizing = principal * monthly_rate * growth / (growth - 1.0)
+    return np.where(monthly_rate == 0, principal / payments, amortizing)
+
+
+def remaining_balance(principal, annual_rate, term_years, years_paid) -> np.ndarray:
+    """Loan balance after years_paid years of level monthly payments (never negative)"""
+    principal = np.asarray(principal, dtype=float)
+    monthly_rate = np.asarray(annual_rate, dtype=float) / 12
+    payments_made = np.asarray(years_paid, dtype=float) * 12
+    payment = monthly_payment(principal, annual_rate, term_years)
+    growth = (1.0 + monthly_rate) ** payments_made
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortizing = principal * growth - payment * (growth - 1.0) / monthly_rate
+    balance = np.where(monthly_rate == 0, principal - payment * payments_made, amortizing)
+    return np.maximum(balance, 0.0)
+
+
+def project_noi(noi, growth_rate, years: int) -> np.ndarray:
+    """NOI for years 1..years of each scenario, shape (scenarios, years)"""
+    noi = np.atleast_1d(np.asarray(noi, dtype=float))
+    growth_rate = np.atleast_1d(np.asarray(growth_rate, dtype=float))
+    return noi[:, None] * (1.0 + growth_rate[:, None]) ** np.arange(1, years + 1)
+
+
+def hold_and_sell_cash_flows(
+    noi,
+    equity,
+    loan_amount,
+    interest_rate,
+    noi_growth,
+    exit_cap_rate,
+    hold_years,
+    loan_term_years: int = 10,
+    selling_cost_rate: float = 0.0,
+) -> np.ndarray:
+    """
+    Levered cash flows for holding, then selling, under each scenario.
+
+    Year 0 is -equity; years 1..hold are NOI less debt service on the loan
+    at the scenario's interest rate (none once the loan term has run out);
+    the exit year adds the sale at NOI / exit cap rate, net of selling costs
+    and the remaining loan balance.
+
+    All arguments broadcast to one value per scenario; the result has
+    max(hold_years) + 1 columns.
+    """
+    noi, equity, loan_amount, interest_rate, noi_growth, exit_cap_rate, hold_years = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (
+            noi, equity, loan_amount, interest_rate, noi_growth, exit_cap_rate, hold_years
+        ))
+    )
+    hold_years = hold_years.astype(int)
+    horizon = int(hold_years.max())
+    years = np.arange(1, horizon + 1)
+    held = years[None, :] <= hold_years[:, None]
+
+    projected = project_noi(noi, noi_growth, horizon)
+    debt_service = 12 * monthly_payment(loan_amount, interest_rate, loan_term_years)
+    amortizing = years[None, :] <= loan_term_years
+    operating = np.where(held, projected - np.where(amortizing, debt_service[:, None], 0.0), 0.0)
+
+    exit_noi = np.take_along_axis(projected, (hold_years - 1)[:, None], axis=1)[:, 0]
+    sale_price = exit_noi / exit_cap_rate
+    net_sale = (
+        sale_price * (1.0 - selling_cost_rate)
+        - remaining_balance(loan_amount, interest_rate, loan_term_years, hold_years)
+    )
+
+    cash_flows = np.zeros((noi.shape[0], horizon + 1))
+    cash_flows[:, 0] = -equity
+    cash_flows[:, 1:] = operating
+    cash_flows[np.arange(noi.shape[0]), hold_years] += net_sale
+    return cash_flows
+
+
+def equity_multiple(cash_flows, equity) -> np.ndarray:
+    """Total distributions (years 1+) over equity invested"""
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    equity = np.asarray(equity, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(equity > 0, cash_flows[:, 1:].sum(axis=1) / equity, 0.0)
+
+
+def scenario_grid(exit_cap_rates, interest_rates, noi_growth_rates, hold_periods) -> dict:
+    """Cartesian product of the assumptions as flat, equally long arrays"""
+    cap, rate, growth, hold = np.meshgrid(
+        np.asarray(exit_cap_rates, dtype=float),
+        np.asarray(interest_rates, dtype=float),
+        np.asarray(noi_growth_rates, dtype=float),
+        np.asarray(hold_periods, dtype=int),
+        indexing="ij",
+    )
+    return {
+        "exit_cap_rate": cap.ravel(),
+        "interest_rate": rate.ravel(),
+        "noi_growth": growth.ravel(),
+        "hold_years": hold.ravel(),
+    }
+
+
+def monte_carlo_draws(
+    n_draws: int,
+    noi_growth_mean: float,
+    noi_growth_std: float,
+    exit_cap_rate_mean: float,
+    exit_cap_rate_std: float,
+    seed: Optional[int] = None,
+    min_exit_cap_rate: float = 0.01,
+) -> dict:
+    """Normal draws of NOI growth and exit cap rate (cap rates floored at min_exit_cap_rate)"""
+    rng = np.random.default_rng(seed)
+    return {
+        "noi_growth": rng.normal(noi_growth_mean, noi_growth_std, n_draws),
+        "exit_cap_rate": np.maximum(rng.normal(exit_cap_rate_mean, exit_cap_rate_std, n_draws), min_exit_cap_rate),
+    }
+
+
+def loss_adjusted_irr(cash_flows, irrs) -> np.ndarray:
+    """
+    IRRs with the no-IRR rows that never recover their outlay (undiscounted
+    total <= 0, e.g. total-loss draws) set to -100%, so they rank as the
+    worst outcomes instead of dropping out of the distribution. Rows with no
+    IRR because it exceeds IRR_UPPER_BOUND stay NaN.
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    irrs = np.asarray(irrs, dtype=float)
+    return np.where(np.isnan(irrs) & (cash_flows.sum(axis=1) <= 0), -1.0, irrs)
+
+
+def distribution_summary(values, percentiles=(10, 50, 90)) -> dict:
+    """
+    Percentiles (P10/P50/P90 by default), mean and std of the finite values,
+    plus missing_share: the share of values left out as NaN/inf.
+    """
+    values = np.asarray(values, dtype=float)
+    is_finite = np.isfinite(values)
+    finite = values[is_finite]
+    missing_share = float(1.0 - is_finite.mean()) if values.size else 0.0
+    if finite.size == 0:
+        return {**{f"p{p}": None for p in percentiles}, "mean": None, "std": None, "missing_share": missing_share}
+    summary = {f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(finite, percentiles))}
+    summary["mean"] = float(finite.mean())
+    summary["std"] = float(finite.std())
+    summary["missing_share"] = missing_share
+    return summary
@@ -12,6 +12,7 @@ Includes:
 - Cap rate impact modeling
 - Interest rate sensitivity
 - Optimal exit timing recommendations
+- Scenario grids and Monte Carlo distributions (see exit_scenario_engine)
 """
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional, Tuple
@@ -22,11 +23,22 @@ import numpy as np
 
 from app.models.property import Property
 from app.models.financial_period import FinancialPeriod
+from app.services import exit_scenario_engine as engine
 from app.services.cap_rate_service import CapRateService
 from app.services.ltv_monitoring_service import LTVMonitoringService
 
 logger = logging.getLogger(__name__)
 
+# Projection assumptions shared by the strategies and the scenario engine
+NOI_GROWTH_RATE = Decimal("0.03")  # 3% per year
+HOLD_EXIT_CAP_RATE = Decimal("0.075")  # Assume 7.5% exit cap rate
+REFINANCE_TARGET_LTV = Decimal("0.75")  # Refinance to 75% LTV
+REFINANCE_INTEREST_RATE = Decimal("0.055")  # 5.5% interest rate
+LOAN_TERM_YEARS = 10
+REFINANCE_PROJECTION_YEARS = 5
+SELLING_COSTS_RATE = Decimal("0.06")  # Typically 5-7%
+DEFAULT_LTV = 0.70
+
 
 class ExitStrategyService:
     """
@@ -191,23 +203,17 @@ class ExitStrategyService:
         """
         try:
             # Project cash flows (NOI growth at 3% per year)
-            noi_growth_rate = Decimal("0.03")
-            cash_flows = []
-
-            # Initial investment (negative)
-            cash_flows.append(-float(investment_amount))
+            noi_growth_rate = NOI_GROWTH_RATE
+            projected_noi = engine.project_noi(float(current_noi), float(noi_growth_rate), holding_period_years)[0]
 
-            # Annual NOI for holding period
-            projected_noi = current_noi
-            for year in range(holding_period_years):
-                projected_noi = projected_noi * (1 + noi_growth_rate)
-                cash_flows.append(float(projected_noi))
+            # Initial investment (negative), then annual NOI for holding period
+            cash_flows = [-float(investment_amount)] + projected_noi.tolist()
 
             # Terminal value at end of holding period (property value)
-            exit_cap_rate = Decimal("0.075")  # Assume 7.5% exit cap rate
-            terminal_noi = projected_noi
-            terminal_value = terminal_noi / exit_cap_rate
-            cash_flows[-1] += float(terminal_value)  # Add terminal value to last year
+            exit_cap_rate = HOLD_EXIT_CAP_RATE
+            terminal_noi = projected_noi[-1] if holding_period_years else float(current_noi)
+            terminal_value = terminal_noi / float(exit_cap_rate)
+            cash_flows[-1] += terminal_value  # Add terminal value to last year
 
             # Calculate IRR and NPV
             irr = self._calculate_irr(cash_flows)
@@ -255,48 +261,21 @@ class ExitStrategyService:
         try:
             # Get current LTV
             ltv_result = self.ltv_service.calculate_ltv(property_id)
-            current_ltv = Decimal(str(ltv_result.get("ltv", 0.70)))
+            current_ltv = Decimal(str(ltv_result.get("ltv", DEFAULT_LTV)))
 
             # Refinance parameters
-            target_ltv = Decimal("0.75")  # Refinance to 75% LTV
-            new_loan_amount = current_value * target_ltv
+            new_loan_amount = current_value * REFINANCE_TARGET_LTV
             current_loan_balance = current_value * current_ltv
             equity_extracted = new_loan_amount - current_loan_balance
 
-            # New loan terms
-            interest_rate = Decimal("0.055")  # 5.5% interest rate
-            loan_term_years = 10
-            monthly_payment = self._calculate_mortgage_payment(
-                new_loan_amount,
-                interest_rate,
-                loan_term_years
-            )
-            annual_debt_service = monthly_payment * 12
-
-            # Cash flows after refinance
-            # Year 0: Initial investment + equity extracted
-            cash_flows = [-float(investment_amount), float(equity_extracted)]
-
-            # Annual cash flows (NOI - debt service)
-            noi_growth_rate = Decimal("0.03")
-            projected_noi = current_noi
-            for year in range(1, 6):  # 5-year projection
-                projected_noi = projected_noi * (1 + noi_growth_rate)
-                annual_cash_flow = projected_noi - annual_debt_service
-                cash_flows.append(float(annual_cash_flow))
-
-            # Terminal value (property sale)
-            exit_cap_rate = Decimal("0.075")
-            terminal_noi = projected_noi
-            terminal_value = terminal_noi / exit_cap_rate
-            remaining_loan_balance = self._calculate_remaining_balance(
-                new_loan_amount,
-                interest_rate,
-                loan_term_years,
-                5  # 5 years of payments
+            projection = self._refinance_cash_flows(
+                current_noi=float(current_noi),
+                investment_amount=float(investment_amount),
+                equity_extracted=float(equity_extracted),
+                new_loan_amount=float(new_loan_amount),
+                interest_rates=float(REFINANCE_INTEREST_RATE),
             )
-            net_sale_proceeds = terminal_value - remaining_loan_balance
-            cash_flows[-1] += float(net_sale_proceeds)
+            cash_flows = projection["cash_flows"][0].tolist()
 
             # Calculate IRR and NPV
             irr = self._calculate_irr(cash_flows)
@@ -310,10 +289,11 @@ class ExitStrategyService:
                 "npv": npv,
                 "equity_extracted": float(equity_extracted),
                 "new_loan_amount": float(new_loan_amount),
-                "annual_debt_service": float(annual_debt_service),
-                "remaining_balance_at_exit": float(remaining_loan_balance),
-                "terminal_value": float(terminal_value),
-                "net_sale_proceeds": float(net_sale_proceeds),
+                "interest_rate": float(REFINANCE_INTEREST_RATE),
+                "annual_debt_service": float(projection["annual_debt_service"][0]),
+                "remaining_balance_at_exit": float(projection["remaining_balance"][0]),
+                "terminal_value": float(projection["terminal_value"]),
+                "net_sale_proceeds": float(projection["net_sale_proceeds"][0]),
                 "cash_flows": cash_flows,
             }
 
@@ -321,6 +301,46 @@ class ExitStrategyService:
             logger.error(f"Refinance strategy analysis failed: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def _refinance_cash_flows(
+        self,
+        current_noi: float,
+        investment_amount: float,
+        equity_extracted: float,
+        new_loan_amount: float,
+        interest_rates,
+    ) -> Dict:
+        """
+        Refinance cash flows for one or more loan interest rates
+
+        Year 0: initial investment; year 1: equity extracted; then
+        REFINANCE_PROJECTION_YEARS of NOI less debt service, with the sale
+        (net of the remaining loan balance) in the last year. One row per rate.
+        """
+        interest_rates = np.atleast_1d(np.asarray(interest_rates, dtype=float))
+        annual_debt_service = 12 * engine.monthly_payment(new_loan_amount, interest_rates, LOAN_TERM_YEARS)
+        projected_noi = engine.project_noi(current_noi, float(NOI_GROWTH_RATE), REFINANCE_PROJECTION_YEARS)[0]
+
+        # Terminal value (property sale)
+        terminal_value = projected_noi[-1] / float(HOLD_EXIT_CAP_RATE)
+        remaining_balance = engine.remaining_balance(
+            new_loan_amount, interest_rates, LOAN_TERM_YEARS, REFINANCE_PROJECTION_YEARS
+        )
+        net_sale_proceeds = terminal_value - remaining_balance
+
+        cash_flows = np.empty((interest_rates.size, REFINANCE_PROJECTION_YEARS + 2))
+        cash_flows[:, 0] = -investment_amount
+        cash_flows[:, 1] = equity_extracted
+        cash_flows[:, 2:] = projected_noi[None, :] - annual_debt_service[:, None]
+        cash_flows[:, -1] += net_sale_proceeds
+
+        return {
+            "cash_flows": cash_flows,
+            "annual_debt_service": annual_debt_service,
+            "remaining_balance": remaining_balance,
+            "terminal_value": terminal_value,
+            "net_sale_proceeds": net_sale_proceeds,
+        }
+
     def _analyze_sale_strategy(
         self,
         property_id: int,
@@ -340,11 +360,11 @@ class ExitStrategyService:
 
             # Get current loan balance
             ltv_result = self.ltv_service.calculate_ltv(property_id)
-            current_ltv = Decimal(str(ltv_result.get("ltv", 0.70)))
+            current_ltv = Decimal(str(ltv_result.get("ltv", DEFAULT_LTV)))
             loan_balance = current_value * current_ltv
 
             # Calculate selling costs (typically 5-7%)
-            selling_costs_rate = Decimal("0.06")  # 6%
+            selling_costs_rate = SELLING_COSTS_RATE
             selling_costs = sale_price * selling_costs_rate
 
             # Net proceeds
@@ -389,14 +409,14 @@ class ExitStrategyService:
 
     def _calculate_irr(self, cash_flows: List[float]) -> float:
         """
-        Calculate Internal Rate of Return using numpy
+        Calculate Internal Rate of Return (batched solver, one row)
 
         IRR is the discount rate that makes NPV = 0
         """
         try:
-            irr = np.irr(cash_flows)
+            irr = engine.irr([cash_flows])[0]
             return float(irr) if not np.isnan(irr) else 0.0
-        except (ValueError, RuntimeWarning, FloatingPointError):
+        except (ValueError, FloatingPointError):
             # IRR calculation can fail with invalid cash flows
             return 0.0
 
@@ -407,7 +427,7 @@ class ExitStrategyService:
         NPV = Sum of (Cash Flow / (1 + r)^t)
         """
         try:
-            npv = np.npv(float(discount_rate), cash_flows)
+            npv = engine.npv(float(discount_rate), [cash_flows])[0]
             return float(npv)
         except (ValueError, TypeError, ZeroDivisionError):
             # NPV calculation can fail with invalid inputs
@@ -424,19 +444,8 @@ class ExitStrategyService:
 
         Payment = P * (r * (1 + r)^n) / ((1 + r)^n - 1)
         """
-        monthly_rate = annual_interest_rate / 12
-        num_payments = loan_term_years * 12
-
-        if monthly_rate == 0:
-            return loan_amount / num_payments
-
-        payment = loan_amount * (
-            monthly_rate * (1 + monthly_rate) ** num_payments
-        ) / (
-            (1 + monthly_rate) ** num_payments - 1
-        )
-
-        return payment
+        payment = engine.monthly_payment(float(loan_amount), float(annual_interest_rate), loan_term_years)
+        return Decimal(str(float(payment)))
 
     def _calculate_remaining_balance(
         self,
@@ -448,24 +457,10 @@ class ExitStrategyService:
         """
         Calculate remaining loan balance after N years
         """
-        monthly_rate = annual_interest_rate / 12
-        total_payments = loan_term_years * 12
-        payments_made = years_paid * 12
-
-        monthly_payment = self._calculate_mortgage_payment(
-            original_loan,
-            annual_interest_rate,
-            loan_term_years
-        )
-
-        # Remaining balance formula
-        remaining_balance = original_loan * (
-            (1 + monthly_rate) ** payments_made
-        ) - monthly_payment * (
-            ((1 + monthly_rate) ** payments_made - 1) / monthly_rate
+        remaining_balance = engine.remaining_balance(
+            float(original_loan), float(annual_interest_rate), loan_term_years, years_paid
         )
-
-        return max(remaining_balance, Decimal("0"))
+        return Decimal(str(float(remaining_balance)))
 
     def _generate_recommendation_rationale(
         self,
@@ -506,6 +501,10 @@ class ExitStrategyService:
     ) -> Dict:
         """
         Analyze impact of interest rate changes on exit strategies
+
+        Each rate change (in percentage points) shifts both the discount rate
+        and the refinance loan rate. The base analysis runs once; the
+        scenarios are evaluated together from its cash flows.
         """
         if rate_scenarios is None:
             rate_scenarios = [-2.0, -1.0, 0.0, 1.0, 2.0]  # % changes
@@ -515,27 +514,46 @@ class ExitStrategyService:
         if not base_analysis.get("success"):
             return base_analysis
 
-        results = []
-
-        for rate_change in rate_scenarios:
-            # Adjust discount rate
-            base_discount_rate = Decimal(str(base_analysis["assumptions"]["discount_rate"]))
-            new_discount_rate = base_discount_rate + Decimal(str(rate_change)) / 100
-
-            analysis = self.analyze_exit_strategies(
-                property_id=property_id,
-                discount_rate=new_discount_rate
+        strategies = base_analysis["strategies"]
+        rate_changes = np.asarray(rate_scenarios, dtype=float) / 100
+        discount_rates = base_analysis["assumptions"]["discount_rate"] + rate_changes
+
+        irrs = {}
+        npvs = {}
+        for name in ("hold", "sale"):
+            result = strategies[name]
+            if result.get("success"):
+                # Cash flows do not depend on rates; only the discounting does
+                cash_flows = np.tile(result["cash_flows"], (rate_changes.size, 1))
+                irrs[name] = np.full(rate_changes.size, result["irr"])
+                npvs[name] = engine.npv(discount_rates, cash_flows)
+
+        refinance = strategies["refinance"]
+        if refinance.get("success"):
+            projection = self._refinance_cash_flows(
+                current_noi=base_analysis["assumptions"]["current_noi"],
+                investment_amount=base_analysis["assumptions"]["investment_amount"],
+                equity_extracted=refinance["equity_extracted"],
+                new_loan_amount=refinance["new_loan_amount"],
+                interest_rates=refinance["interest_rate"] + rate_changes,
             )
+            irrs["refinance"] = np.nan_to_num(engine.irr(projection["cash_flows"]), nan=0.0)
+            npvs["refinance"] = engine.npv(discount_rates, projection["cash_flows"])
 
-            if analysis.get("success"):
-                results.append({
-                    "rate_change": rate_change,
-                    "discount_rate": float(new_discount_rate),
-                    "hold_irr": analysis["strategies"]["hold"].get("irr_percentage", 0),
-                    "refinance_irr": analysis["strategies"]["refinance"].get("irr_percentage", 0),
-                    "sale_irr": analysis["strategies"]["sale"].get("irr_percentage", 0),
-                    "recommended_strategy": analysis["recommendation"]["strategy"],
-                })
+        results = []
+        for i, rate_change in enumerate(rate_scenarios):
+            scenario_irrs = {name: float(values[i]) for name, values in irrs.items()}
+            results.append({
+                "rate_change": rate_change,
+                "discount_rate": float(discount_rates[i]),
+                "hold_irr": scenario_irrs.get("hold", 0) * 100,
+                "refinance_irr": scenario_irrs.get("refinance", 0) * 100,
+                "sale_irr": scenario_irrs.get("sale", 0) * 100,
+                "hold_npv": float(npvs["hold"][i]) if "hold" in npvs else None,
+                "refinance_npv": float(npvs["refinance"][i]) if "refinance" in npvs else None,
+                "sale_npv": float(npvs["sale"][i]) if "sale" in npvs else None,
+                "recommended_strategy": max(scenario_irrs, key=scenario_irrs.get) if scenario_irrs else None,
+            })
 
         return {
             "success": True,
@@ -543,3 +561,197 @@ class ExitStrategyService:
             "base_case": base_analysis,
             "sensitivity_analysis": results,
         }
+
+    def _load_base_inputs(self, property_id: int, investment_amount: Optional[Decimal] = None) -> Dict:
+        """Current NOI, value, cap rate and loan balance that scenarios start from"""
+        property = self.db.query(Property).filter(Property.id == property_id).first()
+        if not property:
+            return {"success": False, "error": "Property not found"}
+
+        cap_rate_result = self.cap_rate_service.calculate_cap_rate(property_id)
+        if not cap_rate_result.get("success"):
+            return {"success": False, "error": "Failed to calculate cap rate"}
+
+        current_value = float(cap_rate_result["property_value"])
+        ltv_result = self.ltv_service.calculate_ltv(property_id)
+        ltv = float(ltv_result.get("ltv", DEFAULT_LTV)) if ltv_result.get("success", True) else DEFAULT_LTV
+
+        return {
+            "success": True,
+            "property_name": property.property_name,
+            "current_noi": float(cap_rate_result["noi"]),
+            "current_cap_rate": float(cap_rate_result["cap_rate"]),
+            "current_value": current_value,
+            "loan_balance": current_value * ltv,
+            "investment_amount": float(investment_amount) if investment_amount is not None else current_value * 0.30,
+        }
+
+    def run_scenario_grid(
+        self,
+        property_id: int,
+        exit_cap_rates: Optional[List[float]] = None,
+        interest_rates: Optional[List[float]] = None,
+        noi_growth_rates: Optional[List[float]] = None,
+        hold_periods: Optional[List[int]] = None,
+        discount_rate: float = 0.10,
+        investment_amount: Optional[Decimal] = None,
+    ) -> Dict:
+        """
+        Evaluate every combination of exit cap rate, interest rate, NOI growth
+        and hold period for a levered hold-and-sell of the property
+
+        The existing loan balance is assumed to carry the scenario's interest
+        rate; the sale is net of selling costs and the remaining balance.
+        """
+        try:
+            base = self._load_base_inputs(property_id, investment_amount)
+            if not base["success"]:
+                return base
+
+            if exit_cap_rates is None:
+                exit_cap_rates = [base["current_cap_rate"] + delta for delta in (0.0, 0.005, 0.01)]
+            if interest_rates is None:
+                interest_rates = [0.045, 0.055, 0.065, 0.075]
+            if noi_growth_rates is None:
+                noi_growth_rates = [0.0, 0.02, 0.03, 0.04]
+            if hold_periods is None:
+                hold_periods = [3, 5, 7, 10]
+
+            grid = engine.scenario_grid(exit_cap_rates, interest_rates, noi_growth_rates, hold_periods)
+            cash_flows = engine.hold_and_sell_cash_flows(
+                noi=base["current_noi"],
+                equity=base["investment_amount"],
+                loan_amount=base["loan_balance"],
+                interest_rate=grid["interest_rate"],
+                noi_growth=grid["noi_growth"],
+                exit_cap_rate=grid["exit_cap_rate"],
+                hold_years=grid["hold_years"],
+                loan_term_years=LOAN_TERM_YEARS,
+                selling_cost_rate=float(SELLING_COSTS_RATE),
+            )
+            irr = engine.loss_adjusted_irr(cash_flows, engine.irr(cash_flows))
+            npv = engine.npv(discount_rate, cash_flows)
+            multiple = engine.equity_multiple(cash_flows, base["investment_amount"])
+
+            scenarios = [
+                {
+                    "exit_cap_rate": cap,
+                    "interest_rate": rate,
+                    "noi_growth_rate": growth,
+                    "holding_period_years": hold,
+                    "irr": None if np.isnan(scenario_irr) else scenario_irr,
+                    "npv": scenario_npv,
+                    "equity_multiple": scenario_multiple,
+                }
+                for cap, rate, growth, hold, scenario_irr, scenario_npv, scenario_multiple in zip(
+                    grid["exit_cap_rate"].tolist(), grid["interest_rate"].tolist(),
+                    grid["noi_growth"].tolist(), grid["hold_years"].tolist(),
+                    irr.tolist(), npv.tolist(), multiple.tolist()
+                )
+            ]
+            best = int(np.nanargmax(irr)) if np.isfinite(irr).any() else None
+            worst = int(np.nanargmin(irr)) if np.isfinite(irr).any() else None
+
+            return {
+                "success": True,
+                "property_id": property_id,
+                "property_name": base["property_name"],
+                "assumptions": {
+                    "current_noi": base["current_noi"],
+                    "current_value": base["current_value"],
+                    "loan_balance": base["loan_balance"],
+                    "investment_amount": base["investment_amount"],
+                    "discount_rate": discount_rate,
+                    "selling_costs_rate": float(SELLING_COSTS_RATE),
+                },
+                "scenario_count": len(scenarios),
+                "scenarios": scenarios,
+                "best_scenario": scenarios[best] if best is not None else None,
+                "worst_scenario": scenarios[worst] if worst is not None else None,
+                "irr_distribution": engine.distribution_summary(irr),
+                "npv_distribution": engine.distribution_summary(npv),
+            }
+
+        except Exception as e:
+            logger.error(f"Exit scenario grid failed: {str(e)}")
+            return {"success": False, "error": str(e)}
+
+    def run_monte_carlo(
+        self,
+        property_id: int,
+        n_draws: int = 10000,
+        noi_growth_mean: float = 0.03,
+        noi_growth_std: float = 0.015,
+        exit_cap_rate_mean: Optional[float] = None,
+        exit_cap_rate_std: float = 0.005,
+        interest_rate: float = float(REFINANCE_INTEREST_RATE),
+        holding_period_years: int = 5,
+        discount_rate: float = 0.10,
+        investment_amount: Optional[Decimal] = None,
+        seed: Optional[int] = None,
+    ) -> Dict:
+        """
+        Monte Carlo over NOI growth and exit cap rate for a levered hold-and-sell
+
+        Returns P10/P50/P90 (plus mean/std) of IRR and NPV across the draws and
+        the probability that NPV is negative. Draws that never recover the
+        equity count as -100% IRR, so they weigh on P10 instead of dropping out. Exit cap rate defaults to the
+        current cap rate + 0.5%, as in analyze_exit_strategies.
+        """
+        try:
+            base = self._load_base_inputs(property_id, investment_amount)
+            if not base["success"]:
+                return base
+
+            if exit_cap_rate_mean is None:
+                exit_cap_rate_mean = base["current_cap_rate"] + 0.005
+
+            draws = engine.monte_carlo_draws(
+                n_draws=n_draws,
+                noi_growth_mean=noi_growth_mean,
+                noi_growth_std=noi_growth_std,
+                exit_cap_rate_mean=exit_cap_rate_mean,
+                exit_cap_rate_std=exit_cap_rate_std,
+                seed=seed,
+            )
+            cash_flows = engine.hold_and_sell_cash_flows(
+                noi=base["current_noi"],
+                equity=base["investment_amount"],
+                loan_amount=base["loan_balance"],
+                interest_rate=interest_rate,
+                noi_growth=draws["noi_growth"],
+                exit_cap_rate=draws["exit_cap_rate"],
+                hold_years=holding_period_years,
+                loan_term_years=LOAN_TERM_YEARS,
+                selling_cost_rate=float(SELLING_COSTS_RATE),
+            )
+            raw_irr = engine.irr(cash_flows)
+            irr = engine.loss_adjusted_irr(cash_flows, raw_irr)
+            npv = engine.npv(discount_rate, cash_flows)
+
+            return {
+                "success": True,
+                "property_id": property_id,
+                "property_name": base["property_name"],
+                "assumptions": {
+                    "n_draws": n_draws,
+                    "noi_growth_mean": noi_growth_mean,
+                    "noi_growth_std": noi_growth_std,
+                    "exit_cap_rate_mean": exit_cap_rate_mean,
+                    "exit_cap_rate_std": exit_cap_rate_std,
+                    "interest_rate": interest_rate,
+                    "holding_period_years": holding_period_years,
+                    "discount_rate": discount_rate,
+                    "investment_amount": base["investment_amount"],
+                    "loan_balance": base["loan_balance"],
+                },
+                "irr": engine.distribution_summary(irr),
+                "npv": engine.distribution_summary(npv),
+                "probability_negative_npv": float((npv < 0).mean()),
+                "draws_without_irr": int(np.isnan(raw_irr).sum()),
+                "probability_total_loss": float((irr == -1.0).mean()),
+            }
+
+        except Exception as e:
+            logger.error(f"Exit strategy Monte Carlo failed: {str(e)}")
+            return {"success": False, "error": str(e)}
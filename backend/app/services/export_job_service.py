@@ -0,0 +1,166 @@
+"""
+Portfolio Export Job Service
+
+Creates and tracks background portfolio exports. Jobs reuse the
+BatchReprocessingJob table (job_type "portfolio_export" in results_summary),
+which BatchReprocessingService excludes from its queries; total/processed
+counts are in rows rather than documents.
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.models.batch_reprocessing_job import BatchReprocessingJob
+from app.services.streaming_export_service import StreamingExportService
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPE = "portfolio_export"
+
+
+class ExportJobService:
+    """Service for creating and monitoring background portfolio exports."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _get_job(self, job_id: int, organization_id: Optional[int] = None) -> BatchReprocessingJob:
+        query = self.db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id)
+        if organization_id is not None:
+            query = query.filter(BatchReprocessingJob.organization_id == organization_id)
+        job = query.first()
+        if not job or (job.results_summary or {}).get("job_type") != JOB_TYPE:
+            raise ValueError(f"Export job {job_id} not found")
+        return job
+
+    def create_job(
+        self,
+        user_id: int,
+        organization_id: Optional[int],
+        export_format: str,
+        statement_types: List[str],
+        property_ids: Optional[List[int]] = None,
+        date_range_start: Optional[date] = None,
+        date_range_end: Optional[date] = None,
+        job_name: Optional[str] = None,
+    ) -> BatchReprocessingJob:
+        StreamingExportService.validate_request(statement_types, export_format)
+        if date_range_start and date_range_end and date_range_end < date_range_start:
+            raise ValueError("date_range_end must be >= date_range_start")
+
+        total_rows = StreamingExportService(self.db).count_rows(
+            statement_types,
+            organization_id=organization_id,
+            property_ids=property_ids,
+            date_range_start=date_range_start,
+            date_range_end=date_range_end,
+        )
+
+        if not job_name:
+            property_label = "all properties" if not property_ids else f"{len(property_ids)} properties"
+            job_name = f"{export_format.upper()} export of {', '.join(statement_types)} for {property_label}"
+
+        job = BatchReprocessingJob(
+            job_name=job_name,
+            initiated_by=user_id,
+            organization_id=organization_id,
+            property_ids=property_ids,
+            date_range_start=date_range_start,
+            date_range_end=date_range_end,
+            document_types=statement_types,
+            extraction_status_filter='all',
+            status='queued',
+            total_documents=total_rows,
+            processed_documents=0,
+            successful_count=0,
+            failed_count=0,
+            skipped_count=0,
+            results_summary={
+                "job_type": JOB_TYPE,
+                "export_format": export_format,
+                "files": [],
+            }
+        )
+        self.db.add(job)
+        self.db.commit()
+        self.db.refresh(job)
+
+        logger.info(f"Created export job {job.id}: {total_rows} rows ({export_format})")
+        return job
+
+    def start_job(self, job_id: int, organization_id: Optional[int] = None) -> Dict[str, Any]:
+        from app.tasks.export_tasks import run_portfolio_export
+
+        job = self._get_job(job_id, organization_id)
+        if job.status != 'queued':
+            raise ValueError(f"Export job {job_id} is not in 'queued' status (current: {job.status})")
+
+        task = run_portfolio_export.delay(job_id)
+
+        job.celery_task_id = task.id
+        job.status = 'running'
+        job.started_at = datetime.now()
+        self.db.commit()
+
+        return {
+            "job_id": job.id,
+            "task_id": task.id,
+            "status": job.status,
+            "total_rows": job.total_documents,
+        }
+
+    def get_job_status(self, job_id: int, organization_id: Optional[int] = None) -> Dict[str, Any]:
+        job = self._get_job(job_id, organization_id)
+        summary = job.results_summary or {}
+
+        progress_pct = 0
+        if job.total_documents > 0:
+            progress_pct = min(100, int((job.processed_documents / job.total_documents) * 100))
+        elif job.status == 'completed':
+            progress_pct = 100
+
+        return {
+            "job_id": job.id,
+            "job_name": job.job_name,
+            "status": job.status,
+            "export_format": summary.get("export_format"),
+            "statement_types": job.document_types,
+            "progress_pct": progress_pct,
+            "total_rows": job.total_documents,
+            "rows_written": job.processed_documents,
+            "files": summary.get("files", []),
+            "error": summary.get("error"),
+            "started_at": job.started_at,
+            "completed_at": job.completed_at,
+            "celery_task_id": job.celery_task_id,
+        }
+
+    def get_download_urls(self, job_id: int, organization_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        from app.db.minio_client import get_file_url
+
+        job = self._get_job(job_id, organization_id)
+        if job.status != 'completed':
+            raise ValueError(f"Export job {job_id} is not completed (current: {job.status})")
+
+        return [
+            {**f, "url": get_file_url(f["object_name"])}
+            for f in (job.results_summary or {}).get("files", [])
+        ]
+
+    def cancel_job(self, job_id: int, organization_id: Optional[int] = None) -> bool:
+        from app.core.celery_config import celery_app
+
+        job = self._get_job(job_id, organization_id)
+        if job.status not in ['queued', 'running']:
+            raise ValueError(f"Cannot cancel job in status: {job.status}")
+
+        if job.celery_task_id:
+            celery_app.control.revoke(job.celery_task_id, terminate=True)
+
+        job.status = 'cancelled'
+        job.completed_at = datetime.now()
+        self.db.commit()
+        return True
@@ -3,6 +3,7 @@ Extraction Orchestrator - Coordinates PDF extraction and financial data parsing
 """
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional, Any
+from contextlib import ExitStack
 from decimal import Decimal
 from datetime import datetime
 import re
@@ -31,6 +32,10 @@ from app.services.model_monitoring_service import ModelMonitoringService
 from app.services.anomaly_detector import StatisticalAnomalyDetector
 from app.services.concordance_service import ConcordanceService
 from app.services.period_completeness_service import PeriodCompletenessService
+from app.services.reference_data_cache import CHART_OF_ACCOUNTS, get_reference_data_cache, mark_reference_data_changed
+from app.monitoring.extraction_tracing import ExtractionTrace, traced_stage
+from app.services.engine_scheduler import EnginePlan, EngineScheduler, template_fingerprint
+from app.services.statement_layout_service import StatementLayoutService
 logger = logging.getLogger(__name__)
 
 try:
@@ -78,6 +83,7 @@ class ExtractionOrchestrator:
         self.extraction_engine = MultiEngineExtractor()
         self.template_extractor = TemplateExtractor(db)
         self.table_parser = FinancialTableParser()
+        self.layout_service = StatementLayoutService(db)
         self.confidence_engine = ConfidenceEngine()
         self.ensemble_engine = EnsembleEngine()
         self.metadata_service = MetadataStorageService(db, self.confidence_engine)
@@ -87,6 +93,15 @@ class ExtractionOrchestrator:
         self.anomaly_active_learning = AnomalyActiveLearning(db) if ACTIVE_LEARNING_AVAILABLE else None
         self.cross_property_intel = CrossPropertyIntelligenceService(db) if CROSS_PROP_AVAILABLE else None
         self.pyod_detector = PyODAnomalyDetector(db) if PYOD_AVAILABLE and FeatureFlags.is_pyod_enabled() else None
+        # Per-stage timings/spans for the extraction in progress (see monitoring/extraction_tracing.py)
+        self._trace: Optional[ExtractionTrace] = None
+        # Adaptive engine selection for the multi-engine stages (see services/engine_scheduler.py)
+        self.engine_scheduler = EngineScheduler(db)
+        self._engine_plan: Optional[EnginePlan] = None
+        # Committee alerts for the anomaly detection run in progress, upserted once per run
+        self._anomaly_alerts: Optional[List[Dict]] = None
+        # Batch reprocessing job the detection run in progress belongs to (tags its anomalies)
+        self._batch_job_id: Optional[int] = None
     
     def extract_and_parse_document(self, upload_id: int) -> Dict:
         """
@@ -103,6 +118,9 @@ class ExtractionOrchestrator:
         8. Create extraction log
         9. Update upload status
         
+        Each stage is traced (OpenTelemetry span + Prometheus histogram) and the
+        per-stage timing breakdown is stored on ExtractionLog.stage_timings.
+        
         ZERO DATA LOSS GUARANTEE:
         - All operations wrapped in transaction
         - Critical validation failures trigger rollback
@@ -117,6 +135,7 @@ class ExtractionOrchestrator:
         """
         upload = None
         extraction_log = None
+        trace_scope = ExitStack()
         
         try:
             # Get upload record
@@ -130,6 +149,9 @@ class ExtractionOrchestrator:
                     "error": f"Upload {upload_id} not found"
                 }
             
+            self._trace = ExtractionTrace(upload.document_type, upload_id)
+            trace_scope.enter_context(self._trace.document())
+            
             # Update status to extracting
             upload.extraction_status = "extracting"
             upload.extraction_started_at = datetime.now()
@@ -137,10 +159,11 @@ class ExtractionOrchestrator:
             
             # Step 1: Download PDF from MinIO
             print(f"📥 Downloading PDF from MinIO: {upload.file_path}")
-            pdf_data = download_file(
-                object_name=upload.file_path,
-                bucket_name=settings.MINIO_BUCKET_NAME
-            )
+            with traced_stage(self._trace, "download"):
+                pdf_data = download_file(
+                    object_name=upload.file_path,
+                    bucket_name=settings.MINIO_BUCKET_NAME
+                )
             
             if not pdf_data:
                 upload.extraction_status = "failed_download"
@@ -156,11 +179,22 @@ class ExtractionOrchestrator:
             
             # Step 2: Extract text with validation
             print(f"🔍 Extracting text from PDF...")
-            extraction_result = self.extraction_engine.extract_with_validation(
-                pdf_data=pdf_data,
-                strategy="auto",
-                lang="eng"
+            # Engines proven on earlier periods of this template let the extraction
+            # and metadata stages skip the redundant ones (concordance still runs every
+            # model, since its agreement scores need them all). The text isn't
+            # extracted yet, so plan with the template of the latest extraction
+            self._engine_plan = self.engine_scheduler.plan(
+                property_id=upload.property_id,
+                document_type=upload.document_type,
+                fingerprint=self.engine_scheduler.latest_fingerprint(upload.property_id, upload.document_type)
             )
+            with traced_stage(self._trace, "engine_extraction", pdf_bytes=len(pdf_data)):
+                extraction_result = self.extraction_engine.extract_with_validation(
+                    pdf_data=pdf_data,
+                    strategy="auto",
+                    lang="eng",
+                    plan=self._engine_plan
+                )
             
             if not extraction_result.get("success"):
                 upload.extraction_status = "failed_extraction"
@@ -180,6 +214,20 @@ class ExtractionOrchestrator:
                 extraction_result=extraction_result
             )
             
+            # The document's own template decides the plan for the later stages
+            fingerprint = template_fingerprint(
+                extraction_result["extraction"].get("text", ""),
+                extraction_result["classification"].get("document_type")
+            )
+            if fingerprint != self._engine_plan.fingerprint:
+                plan = self.engine_scheduler.plan(
+                    property_id=upload.property_id,
+                    document_type=upload.document_type,
+                    fingerprint=fingerprint
+                )
+                plan.absorb(self._engine_plan)
+                self._engine_plan = plan
+            
             # Link extraction log to upload
             upload.extraction_id = extraction_log.id
             self.db.commit()
@@ -208,6 +256,9 @@ class ExtractionOrchestrator:
                 upload.extraction_status = "failed_validation"
                 upload.extraction_completed_at = datetime.now()
                 upload.notes = f"Data parsing/validation failed: {parse_result.get('error')}"
+                if not self._trace.failed:
+                    self._trace.mark_failed("parse")
+                self._record_stage_timings(extraction_log)
                 self.db.commit()
                 
                 # Capture issue for learning
@@ -245,17 +296,29 @@ class ExtractionOrchestrator:
             # Step 5: Calculate and store comprehensive financial metrics
             print(f"📊 Calculating financial metrics...")
             try:
-                self._calculate_financial_metrics(upload)
+                with traced_stage(self._trace, "metrics"):
+                    self._calculate_financial_metrics(upload)
                 print(f"✅ Financial metrics calculated")
             except Exception as metrics_error:
                 # Metrics calculation is non-critical - log and continue
                 print(f"⚠️  Metrics calculation skipped: {str(metrics_error)}")
                 # Don't fail extraction if metrics fail
-            
+
+            # Step 5.25: Refresh portfolio benchmark cube cells for this period
+            if (self.cross_property_intel and self.cross_property_intel.enabled
+                    and upload.document_type in ('balance_sheet', 'income_statement')):
+                try:
+                    with traced_stage(self._trace, "benchmarks"):
+                        self.cross_property_intel.refresh_for_period(upload.property_id, upload.period_id)
+                except Exception as benchmark_error:
+                    self.db.rollback()
+                    print(f"⚠️  Benchmark refresh skipped: {str(benchmark_error)}")
+
             # Step 5.5: Detect anomalies in extracted financial data
             print(f"🔍 Detecting anomalies in financial data...")
             try:
-                self._detect_anomalies_for_document(upload)
+                with traced_stage(self._trace, "anomalies"):
+                    self._detect_anomalies_for_document(upload)
                 print(f"✅ Anomaly detection completed")
             except Exception as anomaly_error:
                 # Anomaly detection is non-critical - log and continue
@@ -269,7 +332,8 @@ class ExtractionOrchestrator:
             warnings = []
             
             try:
-                validation_results = self._run_validations(upload)
+                with traced_stage(self._trace, "validate"):
+                    validation_results = self._run_validations(upload)
                 
                 # Check for CRITICAL validation failures
                 if isinstance(validation_results, dict) and validation_results.get("validation_results"):
@@ -319,11 +383,12 @@ class ExtractionOrchestrator:
                 # Note: parse_result should contain the inserted records by table
                 inserted_records = parse_result.get("inserted_records", {})
 
-                metadata_result = self._capture_and_save_metadata(
-                    upload_id=upload_id,
-                    pdf_data=pdf_data,
-                    inserted_records=inserted_records
-                )
+                with traced_stage(self._trace, "metadata"):
+                    metadata_result = self._capture_and_save_metadata(
+                        upload_id=upload_id,
+                        pdf_data=pdf_data,
+                        inserted_records=inserted_records
+                    )
 
                 if not metadata_result.get("success"):
                     # CHANGED: Metadata failure is now NON-CRITICAL
@@ -353,13 +418,14 @@ class ExtractionOrchestrator:
             try:
                 concordance_service = ConcordanceService(self.db)
                 
-                concordance_result = concordance_service.generate_concordance_table(
-                    upload_id=upload_id,
-                    pdf_data=pdf_data,
-                    document_type=upload.document_type,
-                    property_id=upload.property_id,
-                    period_id=upload.period_id
-                )
+                with traced_stage(self._trace, "concordance"):
+                    concordance_result = concordance_service.generate_concordance_table(
+                        upload_id=upload_id,
+                        pdf_data=pdf_data,
+                        document_type=upload.document_type,
+                        property_id=upload.property_id,
+                        period_id=upload.period_id
+                    )
                 
                 if concordance_result.get("success"):
                     print(
@@ -380,6 +446,9 @@ class ExtractionOrchestrator:
             # Step 9: Update upload status to completed
             upload.extraction_status = "completed"
             upload.extraction_completed_at = datetime.now()
+            self._enqueue_extraction_webhook(upload, extraction_log, parse_result)
+            stage_timings = self._record_stage_timings(extraction_log)
+            self._record_engine_outcomes(extraction_log)
             self.db.commit()
             
             print(f"✅ Extraction completed successfully for upload_id={upload_id}")
@@ -394,6 +463,7 @@ class ExtractionOrchestrator:
                 "validation_results": validation_results,
                 "metadata": metadata_result,  # NEW: Metadata capture results
                 "concordance": concordance_result,  # NEW: Concordance table results
+                "stage_timings": stage_timings,
                 "message": "Extraction completed - all critical validations passed"
             }
         
@@ -419,6 +489,8 @@ class ExtractionOrchestrator:
                         upload.extraction_status = "failed"
                         upload.extraction_completed_at = datetime.now()
                         upload.notes = f"Extraction exception: {str(e)}"
+                        if extraction_log is not None:
+                            self._record_stage_timings(self.db.get(ExtractionLog, extraction_log.id))
                         self.db.commit()
                 except Exception as update_error:
                     print(f"⚠️  Failed to update status: {str(update_error)}")
@@ -428,6 +500,28 @@ class ExtractionOrchestrator:
                 "error": f"Extraction failed: {str(e)}",
                 "extraction_log_id": extraction_log.id if extraction_log else None
             }
+        
+        finally:
+            trace_scope.close()
+            self._trace = None
+            self._engine_plan = None
+    
+    def _record_stage_timings(self, extraction_log: Optional[ExtractionLog]) -> Optional[Dict]:
+        """Store the current trace's per-stage breakdown on the extraction log (committed by the caller)."""
+        if self._trace is None or extraction_log is None:
+            return None
+        stage_timings = self._trace.breakdown()
+        extraction_log.stage_timings = stage_timings
+        return stage_timings
+    
+    def _record_engine_outcomes(self, extraction_log: Optional[ExtractionLog]) -> None:
+        """Store this document's engine confidences/skips for future engine plans (committed by the caller)."""
+        if self._engine_plan is None or extraction_log is None:
+            return
+        outcomes = self._engine_plan.outcomes()
+        if outcomes is not None:
+            extraction_log.template_fingerprint = self._engine_plan.fingerprint
+            extraction_log.engine_outcomes = outcomes
     
     def _create_extraction_log(
         self,
@@ -468,9 +562,41 @@ class ExtractionOrchestrator:
         self.db.add(log_entry)
         self.db.commit()
         self.db.refresh(log_entry)
-        
+
         return log_entry
-    
+
+    def _enqueue_extraction_webhook(
+        self,
+        upload: DocumentUpload,
+        extraction_log: ExtractionLog,
+        parse_result: Dict
+    ) -> None:
+        """
+        Queue an extraction_complete webhook event in the current transaction.
+
+        Runs inside a savepoint so a webhook problem never blocks the upload
+        status change; the dispatcher delivers the event after commit.
+        """
+        try:
+            from app.services.webhook_service import WebhookService
+
+            with self.db.begin_nested():
+                WebhookService(self.db).trigger_webhook(
+                    "extraction_complete",
+                    {
+                        "upload_id": upload.id,
+                        "property_id": upload.property_id,
+                        "period_id": upload.period_id,
+                        "document_type": upload.document_type,
+                        "file_name": upload.file_name,
+                        "extraction_log_id": extraction_log.id if extraction_log else None,
+                        "records_inserted": parse_result.get("records_inserted", 0),
+                    },
+                    organization_id=upload.organization_id
+                )
+        except Exception as e:
+            logger.warning(f"Failed to enqueue extraction webhook for upload {upload.id}: {str(e)}")
+
     def _parse_and_insert_financial_data(
         self,
         upload: DocumentUpload,
@@ -501,10 +627,11 @@ class ExtractionOrchestrator:
             if upload.document_type == "mortgage_statement":
                 from app.services.mortgage_extraction_service import MortgageExtractionService
                 mortgage_service = MortgageExtractionService(self.db)
-                extraction_result = mortgage_service.extract_mortgage_data(
-                    extracted_text=extracted_text,
-                    pdf_data=pdf_data
-                )
+                with traced_stage(self._trace, "parse"):
+                    extraction_result = mortgage_service.extract_mortgage_data(
+                        extracted_text=extracted_text,
+                        pdf_data=pdf_data
+                    )
                 
                 if extraction_result.get("success"):
                     parsed_data = {
@@ -583,61 +710,68 @@ class ExtractionOrchestrator:
                             "error": extraction_result.get("error", "Mortgage extraction failed - no data extracted")
                         }
             else:
-                # Step 1: Try table extraction first (highest accuracy)
-                parsed_data = self._extract_with_tables(pdf_data, upload.document_type)
-                
-                # Step 2: If table extraction yields no results, try template extractor
-                if not parsed_data.get("success") or not parsed_data.get("line_items"):
-                    parsed_data = self.template_extractor.extract_using_template(
-                        extracted_text=extracted_text,
-                        document_type=upload.document_type,
-                        template_name=None
-                    )
-                
-                # Step 3: If still no success, try fallback regex extraction
-                if not parsed_data.get("success") or not parsed_data.get("line_items"):
-                    parsed_data = self._fallback_extraction(extracted_text, upload.document_type)
+                with traced_stage(self._trace, "parse"):
+                    # Step 1: Try table extraction first (highest accuracy); layouts learned
+                    # from this property's earlier periods skip table detection
+                    layouts = self.layout_service.get_layouts(upload.property_id, upload.document_type)
+                    parsed_data = self._extract_with_tables(pdf_data, upload.document_type, layouts=layouts)
+                    if parsed_data.get("success") and parsed_data.get("line_items"):
+                        self.layout_service.record(upload.property_id, upload.document_type, parsed_data)
+                    
+                    # Step 2: If table extraction yields no results, try template extractor
+                    if not parsed_data.get("success") or not parsed_data.get("line_items"):
+                        parsed_data = self.template_extractor.extract_using_template(
+                            extracted_text=extracted_text,
+                            document_type=upload.document_type,
+                            template_name=None
+                        )
+                    
+                    # Step 3: If still no success, try fallback regex extraction
+                    if not parsed_data.get("success") or not parsed_data.get("line_items"):
+                        parsed_data = self._fallback_extraction(extracted_text, upload.document_type)
             
             # Step 4: Intelligent account matching (skip for mortgage statements)
             if parsed_data.get("line_items") and upload.document_type != "mortgage_statement":
-                parsed_data["line_items"] = self._match_accounts_intelligent(
-                    parsed_data["line_items"],
-                    document_type=upload.document_type
-                )
+                with traced_stage(self._trace, "match", line_items=len(parsed_data["line_items"])):
+                    parsed_data["line_items"] = self._match_accounts_intelligent(
+                        parsed_data["line_items"],
+                        document_type=upload.document_type
+                    )
             
             # Step 5: Insert based on document type
             records_inserted = 0
             
-            if upload.document_type == "balance_sheet":
-                records_inserted = self._insert_balance_sheet_data(
-                    upload=upload,
-                    parsed_data=parsed_data,
-                    confidence_score=confidence_score
-                )
-            elif upload.document_type == "income_statement":
-                records_inserted = self._insert_income_statement_data(
-                    upload=upload,
-                    parsed_data=parsed_data,
-                    confidence_score=confidence_score
-                )
-            elif upload.document_type == "cash_flow":
-                records_inserted = self._insert_cash_flow_data(
-                    upload=upload,
-                    parsed_data=parsed_data,
-                    confidence_score=confidence_score
-                )
-            elif upload.document_type == "rent_roll":
-                records_inserted = self._insert_rent_roll_data(
-                    upload=upload,
-                    parsed_data=parsed_data,
-                    confidence_score=confidence_score
-                )
-            elif upload.document_type == "mortgage_statement":
-                records_inserted = self._insert_mortgage_statement_data(
-                    upload=upload,
-                    parsed_data=parsed_data,
-                    confidence_score=confidence_score
-                )
+            with traced_stage(self._trace, "insert"):
+                if upload.document_type == "balance_sheet":
+                    records_inserted = self._insert_balance_sheet_data(
+                        upload=upload,
+                        parsed_data=parsed_data,
+                        confidence_score=confidence_score
+                    )
+                elif upload.document_type == "income_statement":
+                    records_inserted = self._insert_income_statement_data(
+                        upload=upload,
+                        parsed_data=parsed_data,
+                        confidence_score=confidence_score
+                    )
+                elif upload.document_type == "cash_flow":
+                    records_inserted = self._insert_cash_flow_data(
+                        upload=upload,
+                        parsed_data=parsed_data,
+                        confidence_score=confidence_score
+                    )
+                elif upload.document_type == "rent_roll":
+                    records_inserted = self._insert_rent_roll_data(
+                        upload=upload,
+                        parsed_data=parsed_data,
+                        confidence_score=confidence_score
+                    )
+                elif upload.document_type == "mortgage_statement":
+                    records_inserted = self._insert_mortgage_statement_data(
+                        upload=upload,
+                        parsed_data=parsed_data,
+                        confidence_score=confidence_score
+                    )
             
             return {
                 "success": True,
@@ -691,13 +825,14 @@ class ExtractionOrchestrator:
                 item['line_number'] = idx + 1
         
         # Use constraint-aware deduplication: (account_code)
-        dedup_result = dedup_service.deduplicate_items(
-            items=items,
-            constraint_columns=['account_code'],
-            selection_strategy='confidence',  # Default, but will use 'amount' for totals/subtotals
-            document_type='balance_sheet',
-            is_total_or_subtotal=lambda item: item.get("is_subtotal", False) or item.get("is_total", False)
-        )
+        with traced_stage(self._trace, "dedup"):
+            dedup_result = dedup_service.deduplicate_items(
+                items=items,
+                constraint_columns=['account_code'],
+                selection_strategy='confidence',  # Default, but will use 'amount' for totals/subtotals
+                document_type='balance_sheet',
+                is_total_or_subtotal=lambda item: item.get("is_subtotal", False) or item.get("is_total", False)
+            )
         
         deduplicated_items = dedup_result['deduplicated_items']
         stats = dedup_result['statistics']
@@ -712,11 +847,12 @@ class ExtractionOrchestrator:
             print(f"📊 Balance Sheet extraction: {stats['total_items']} raw items → {stats['final_count']} unique records ({detail_count} detail + {totals_count} totals/subtotals)")
         
         # PRE-INSERTION VALIDATION: Ensure no duplicate constraint keys (safety check)
-        is_valid, error_msg = dedup_service.validate_no_duplicates(
-            items=deduplicated_items,
-            constraint_columns=['account_code'],
-            context=f"balance_sheet insertion (upload_id={upload.id})"
-        )
+        with traced_stage(self._trace, "dedup"):
+            is_valid, error_msg = dedup_service.validate_no_duplicates(
+                items=deduplicated_items,
+                constraint_columns=['account_code'],
+                context=f"balance_sheet insertion (upload_id={upload.id})"
+            )
         if not is_valid:
             raise ValueError(f"Pre-insertion validation failed: {error_msg}")
         
@@ -912,13 +1048,14 @@ class ExtractionOrchestrator:
                 item['line_number'] = idx + 1
         
         # Use constraint-aware deduplication: (account_code, account_name)
-        dedup_result = dedup_service.deduplicate_items(
-            items=items,
-            constraint_columns=['account_code', 'account_name'],
-            selection_strategy='confidence',  # Default, but will use 'amount' for totals/subtotals
-            document_type='income_statement',
-            is_total_or_subtotal=lambda item: item.get("is_subtotal", False) or item.get("is_total", False)
-        )
+        with traced_stage(self._trace, "dedup"):
+            dedup_result = dedup_service.deduplicate_items(
+                items=items,
+                constraint_columns=['account_code', 'account_name'],
+                selection_strategy='confidence',  # Default, but will use 'amount' for totals/subtotals
+                document_type='income_statement',
+                is_total_or_subtotal=lambda item: item.get("is_subtotal", False) or item.get("is_total", False)
+            )
         
         deduplicated_items = dedup_result['deduplicated_items']
         stats = dedup_result['statistics']
@@ -1550,13 +1687,14 @@ class ExtractionOrchestrator:
                     item['line_number'] = idx + 1
             
             # Use constraint-aware deduplication: (account_code, account_name, line_number)
-            dedup_result = dedup_service.deduplicate_items(
-                items=items,
-                constraint_columns=['account_code', 'account_name', 'line_number'],
-                selection_strategy='confidence',  # Default, but will use 'amount' for totals/subtotals
-                document_type='cash_flow',
-                is_total_or_subtotal=lambda item: item.get("is_subtotal", False) or item.get("is_total", False)
-            )
+            with traced_stage(self._trace, "dedup"):
+                dedup_result = dedup_service.deduplicate_items(
+                    items=items,
+                    constraint_columns=['account_code', 'account_name', 'line_number'],
+                    selection_strategy='confidence',  # Default, but will use 'amount' for totals/subtotals
+                    document_type='cash_flow',
+                    is_total_or_subtotal=lambda item: item.get("is_subtotal", False) or item.get("is_total", False)
+                )
             
             deduplicated_items = dedup_result['deduplicated_items']
             stats = dedup_result['statistics']
@@ -1571,11 +1709,12 @@ class ExtractionOrchestrator:
                 print(f"📊 Cash Flow extraction: {stats['total_items']} raw items → {stats['final_count']} unique records ({detail_count} detail + {totals_count} totals/subtotals)")
             
             # PRE-INSERTION VALIDATION: Ensure no duplicate constraint keys (safety check)
-            is_valid, error_msg = dedup_service.validate_no_duplicates(
-                items=deduplicated_items,
-                constraint_columns=['account_code', 'account_name', 'line_number'],
-                context=f"cash_flow insertion (upload_id={upload.id})"
-            )
+            with traced_stage(self._trace, "dedup"):
+                is_valid, error_msg = dedup_service.validate_no_duplicates(
+                    items=deduplicated_items,
+                    constraint_columns=['account_code', 'account_name', 'line_number'],
+                    context=f"cash_flow insertion (upload_id={upload.id})"
+                )
             if not is_valid:
                 raise ValueError(f"Pre-insertion validation failed: {error_msg}")
             
@@ -2232,11 +2371,12 @@ class ExtractionOrchestrator:
             if metrics:
                 try:
                     alert_trigger = AlertTriggerService(self.db)
-                    alerts = alert_trigger.evaluate_and_trigger_alerts(
-                        property_id=upload.property_id,
-                        period_id=upload.period_id,
-                        metrics=metrics
-                    )
+                    with traced_stage(self._trace, "alerts"):
+                        alerts = alert_trigger.evaluate_and_trigger_alerts(
+                            property_id=upload.property_id,
+                            period_id=upload.period_id,
+                            metrics=metrics
+                        )
                     if alerts:
                         print(f"✅ Triggered {len(alerts)} alerts for property {upload.property_id}, period {upload.period_id}")
                 except Exception as alert_error:
@@ -2250,13 +2390,17 @@ class ExtractionOrchestrator:
             print(f"Warning: Metrics calculation failed for upload {upload.id}: {str(e)}")
             return None
     
-    def _detect_anomalies_for_document(self, upload: DocumentUpload):
+    def _detect_anomalies_for_document(self, upload: DocumentUpload, batch_job_id: Optional[int] = None):
         """
         Detect anomalies in extracted financial data for a document.
         
         Compares current period values against historical data to identify
         statistical anomalies (Z-score, percentage change).
         
+        With batch_job_id, the anomalies are tagged with the job (so a retry can
+        discard them) and collected committee alerts are left for the caller to
+        raise with _raise_anomaly_alerts once the document is checkpointed.
+        
         Raises:
             ValueError: If document is missing required data (period, extracted data, etc.)
             Exception: For unexpected errors during anomaly detection
@@ -2287,6 +2431,9 @@ class ExtractionOrchestrator:
         
         # Initialize anomaly detector
         detector = StatisticalAnomalyDetector(self.db)
+        # Collect committee alerts for high-severity anomalies only when enabled
+        self._anomaly_alerts = [] if settings.ANOMALY_COMMITTEE_ALERTS_ENABLED else None
+        self._batch_job_id = batch_job_id
         
         # Detect anomalies based on document type
         try:
@@ -2315,6 +2462,29 @@ class ExtractionOrchestrator:
             error_msg = f"Document {upload.id} ({upload.file_name}): Anomaly detection error for {upload.document_type}: {str(e)}"
             logger.error(error_msg, exc_info=True)
             raise RuntimeError(error_msg) from e
+        finally:
+            self._batch_job_id = None
+            if batch_job_id is None:
+                self._raise_anomaly_alerts()
+    
+    def _raise_anomaly_alerts(self, discard: bool = False):
+        """
+        Upsert the committee alerts collected during a detection run in one batch.
+        
+        Repeats of an open alert (same property, period, account and anomaly type)
+        are appended to it as occurrences instead of creating new alerts.
+        Alert failures never fail anomaly detection. With discard, the collected
+        alerts are dropped instead.
+        """
+        alerts, self._anomaly_alerts = self._anomaly_alerts, None
+        if not alerts or discard:
+            return
+        try:
+            from app.services.alert_deduplication_service import AlertDeduplicationService
+            AlertDeduplicationService(self.db).deduplicate_alerts(alerts)
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"Anomaly alert creation failed (non-blocking): {e}")
     
     def _detect_income_statement_anomalies(
         self, 
@@ -2393,14 +2563,8 @@ class ExtractionOrchestrator:
         threshold_service = AnomalyThresholdService(self.db)
         
         # Check for calculated fields - skip them (includes totals, subtotals, and calculated metrics)
-        from app.models.chart_of_accounts import ChartOfAccounts
-        calculated_accounts = set()
-        coa_records = self.db.query(ChartOfAccounts).filter(
-            ChartOfAccounts.account_code.in_(account_groups.keys()),
-            ChartOfAccounts.is_calculated == True
-        ).all()
-        for coa in coa_records:
-            calculated_accounts.add(coa.account_code)
+        calculated_codes = get_reference_data_cache().chart_of_accounts(self.db).calculated_codes
+        calculated_accounts = {code for code in account_groups.keys() if code in calculated_codes}
         
         # Also check income_statement_data for is_calculated, is_total, and is_subtotal flags
         # These are metrics derived from multiple line items and should not have anomalies
@@ -2539,13 +2703,8 @@ class ExtractionOrchestrator:
         threshold_service = AnomalyThresholdService(self.db)
         
         # Check for calculated fields - skip them
-        calculated_accounts = set()
-        coa_records = self.db.query(ChartOfAccounts).filter(
-            ChartOfAccounts.account_code.in_(account_groups.keys()),
-            ChartOfAccounts.is_calculated == True
-        ).all()
-        for coa in coa_records:
-            calculated_accounts.add(coa.account_code)
+        calculated_codes = get_reference_data_cache().chart_of_accounts(self.db).calculated_codes
+        calculated_accounts = {code for code in account_groups.keys() if code in calculated_codes}
         
         # Also check balance_sheet_data for is_calculated, is_total, and is_subtotal flags
         # These are metrics derived from multiple line items and should not have anomalies
@@ -2682,13 +2841,8 @@ class ExtractionOrchestrator:
         threshold_service = AnomalyThresholdService(self.db)
         
         # Check for calculated fields - skip them
-        calculated_accounts = set()
-        coa_records = self.db.query(ChartOfAccounts).filter(
-            ChartOfAccounts.account_code.in_(account_groups.keys()),
-            ChartOfAccounts.is_calculated == True
-        ).all()
-        for coa in coa_records:
-            calculated_accounts.add(coa.account_code)
+        calculated_codes = get_reference_data_cache().chart_of_accounts(self.db).calculated_codes
+        calculated_accounts = {code for code in account_groups.keys() if code in calculated_codes}
         
         # Also check cash_flow_data for is_calculated, is_total, and is_subtotal flags
         # These are metrics derived from multiple line items and should not have anomalies
@@ -3322,6 +3476,8 @@ class ExtractionOrchestrator:
         # Add property_id and actual_value to metadata for reference
         metadata['property_id'] = upload.property_id
         metadata['account_code'] = field_name
+        if self._batch_job_id is not None:
+            metadata['batch_job_id'] = self._batch_job_id
         if actual_value is not None:
             metadata['actual_value'] = actual_value
         
@@ -3364,6 +3520,23 @@ class ExtractionOrchestrator:
         anomaly_id = result.scalar()
         self.db.commit()
         
+        # High-severity anomalies raise a committee alert when enabled (deduplicated at the end of the run)
+        if self._anomaly_alerts is not None and db_severity in ('high', 'critical'):
+            self._anomaly_alerts.append({
+                'anomaly_id': anomaly_id,
+                'property_id': upload.property_id,
+                'period_id': upload.period_id,
+                'field_name': field_name,
+                'anomaly_type': anomaly_type,
+                'severity': db_severity,
+                'title': f"Anomaly Detected: {field_name}"[:200],
+                'description': (
+                    f"{anomaly_type} anomaly in {upload.document_type} field {field_name}: "
+                    f"{field_value} (expected {expected_value})"
+                ),
+                'metadata': {'document_id': upload.id},
+            })
+        
         # Auto-generate XAI explanation for high-severity anomalies (optional, can be feature-flagged)
         if self.xai_service and db_severity in ('high', 'critical') and FeatureFlags.is_shap_enabled():
             try:
@@ -3376,7 +3549,13 @@ class ExtractionOrchestrator:
         
         return anomaly_id
     
-    def _extract_with_tables(self, pdf_data: bytes, document_type: str, use_multi_engine: bool = True) -> Dict:
+    def _extract_with_tables(
+        self,
+        pdf_data: bytes,
+        document_type: str,
+        use_multi_engine: bool = True,
+        layouts: Optional[List[Dict]] = None
+    ) -> Dict:
         """
         Extract financial data using table structure preservation
 
@@ -3387,23 +3566,24 @@ class ExtractionOrchestrator:
             pdf_data: PDF file bytes
             document_type: Type of financial statement
             use_multi_engine: Enable multi-engine consensus (Phase 2)
+            layouts: Stored statement layouts for the property (StatementLayoutService)
 
         Returns: structured data with proper column alignment
         """
         try:
             if document_type == "balance_sheet":
-                return self.table_parser.extract_balance_sheet_table(pdf_data)
+                return self.table_parser.extract_balance_sheet_table(pdf_data, layouts=layouts)
             elif document_type == "income_statement":
                 # Phase 2: Use multi-engine consensus for income statements
                 if use_multi_engine:
                     print("📊 Phase 2: Running multi-engine consensus extraction...")
-                    return self.table_parser.extract_income_statement_multi_engine(pdf_data)
+                    return self.table_parser.extract_income_statement_multi_engine(pdf_data, layouts=layouts)
                 else:
-                    return self.table_parser.extract_income_statement_table(pdf_data)
+                    return self.table_parser.extract_income_statement_table(pdf_data, layouts=layouts)
             elif document_type == "cash_flow":
-                return self.table_parser.extract_cash_flow_table(pdf_data)
+                return self.table_parser.extract_cash_flow_table(pdf_data, layouts=layouts)
             elif document_type == "rent_roll":
-                return self.table_parser.extract_rent_roll_table(pdf_data)
+                return self.table_parser.extract_rent_roll_table(pdf_data, layouts=layouts)
             elif document_type == "mortgage_statement":
                 # Mortgage statements use template-based extraction (field patterns)
                 # Table extraction not as applicable for mortgage statements
@@ -3442,22 +3622,12 @@ class ExtractionOrchestrator:
         """
         from fuzzywuzzy import fuzz
         
-        # Get all active accounts from chart
-        all_accounts = self.db.query(ChartOfAccounts).filter(
-            ChartOfAccounts.is_active == True
-        ).all()
-        
-        # Create lookup dictionaries
-        accounts_by_code = {acc.account_code: acc for acc in all_accounts}
-        accounts_by_name = {acc.account_name.lower(): acc for acc in all_accounts}
-        
-        # Group accounts by category for better matching
-        accounts_by_category = {}
-        for account in all_accounts:
-            category = account.category or 'unknown'
-            if category not in accounts_by_category:
-                accounts_by_category[category] = []
-            accounts_by_category[category].append(account)
+        # Active accounts and lookup indexes from the shared reference data cache
+        coa = get_reference_data_cache().chart_of_accounts(self.db)
+        all_accounts = coa.active_accounts
+        accounts_by_code = coa.active_by_code
+        accounts_by_name = coa.active_by_name
+        accounts_by_category = coa.active_by_category
         
         enhanced_items = []
         
@@ -3751,9 +3921,11 @@ class ExtractionOrchestrator:
             # Step 1: Run all 6 engines for comprehensive field-level confidence
             # Memory limit increased to 8GB to support all engines simultaneously
             # Engines: PyMuPDF, PDFPlumber, Camelot, OCR, LayoutLM, EasyOCR
+            # With a proven engine for this template, the others only run on low confidence
             extraction_results = self.extraction_engine.extract_with_confidence(
                 pdf_data=pdf_data,
-                run_all_engines=True  # Full metadata capture with 8GB memory
+                run_all_engines=True,  # Full metadata capture with 8GB memory
+                plan=self._engine_plan
             )
             
             if not extraction_results or len(extraction_results) == 0:
@@ -3876,6 +4048,7 @@ class ExtractionOrchestrator:
 
             self.db.add(new_account)
             self.db.flush()  # Get the ID without committing yet
+            mark_reference_data_changed(self.db, CHART_OF_ACCOUNTS)
 
             return new_account
 
@@ -0,0 +1,115 @@
+"""
+Extraction Timing Service
+
+Aggregates the per-stage timing breakdowns stored on ExtractionLog.stage_timings
+into p50/p95/mean per stage and document type, to show where extraction time
+goes. On PostgreSQL the percentiles are computed in the database
+(json_each_text + percentile_cont); other dialects aggregate in Python.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.extraction_log import ExtractionLog
+from app.monitoring.extraction_tracing import STAGES
+
+logger = logging.getLogger(__name__)
+
+# Whole-extraction wall time, reported alongside the stages
+TOTAL_STAGE = "total"
+
+_PERCENTILE_SQL = text("""
+    WITH samples AS (
+        SELECT el.stage_timings->>'document_type' AS document_type,
+               st.key AS stage,
+               st.value::float AS ms
+        FROM extraction_logs el
+        CROSS JOIN LATERAL json_each_text(el.stage_timings->'stages') AS st
+        WHERE el.stage_timings IS NOT NULL AND el.created_at >= :since
+        UNION ALL
+        SELECT el.stage_timings->>'document_type', 'total', (el.stage_timings->>'total_ms')::float
+        FROM extraction_logs el
+        WHERE el.stage_timings IS NOT NULL AND el.created_at >= :since
+    )
+    SELECT document_type,
+           stage,
+           count(*) AS samples,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY ms) AS p50_ms,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY ms) AS p95_ms,
+           avg(ms) AS mean_ms
+    FROM samples
+    WHERE (CAST(:document_type AS text) IS NULL OR document_type = :document_type)
+    GROUP BY document_type, stage
+""")
+
+
+class ExtractionTimingService:
+    """Per-stage extraction latency percentiles from ExtractionLog.stage_timings"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def stage_percentiles(self, document_type: Optional[str] = None, days: int = 30) -> List[Dict[str, Any]]:
+        """
+        p50/p95/mean milliseconds per (document_type, stage) over extractions from
+        the last `days` days, plus a "total" row per document type. Rows are ordered
+        by document type, then pipeline stage order.
+        """
+        since = datetime.utcnow() - timedelta(days=days)
+        if self.db.get_bind().dialect.name == "postgresql":
+            rows = [
+                dict(row._mapping)
+                for row in self.db.execute(_PERCENTILE_SQL, {"since": since, "document_type": document_type})
+            ]
+        else:
+            rows = self._aggregate_in_python(since, document_type)
+
+        order = {stage: i for i, stage in enumerate((TOTAL_STAGE,) + STAGES)}
+        rows.sort(key=lambda r: (r["document_type"] or "", order.get(r["stage"], len(order)), r["stage"]))
+        return [
+            {
+                "document_type": r["document_type"],
+                "stage": r["stage"],
+                "samples": int(r["samples"]),
+                "p50_ms": round(float(r["p50_ms"]), 1),
+                "p95_ms": round(float(r["p95_ms"]), 1),
+                "mean_ms": round(float(r["mean_ms"]), 1),
+            }
+            for r in rows
+        ]
+
+    def _aggregate_in_python(self, since: datetime, document_type: Optional[str]) -> List[Dict[str, Any]]:
+        samples: Dict[tuple, List[float]] = defaultdict(list)
+        timings = self.db.query(ExtractionLog.stage_timings).filter(
+            ExtractionLog.stage_timings.isnot(None),
+            ExtractionLog.created_at >= since
+        ).all()
+        for (breakdown,) in timings:
+            if not breakdown:
+                continue
+            doc_type = breakdown.get("document_type")
+            if document_type is not None and doc_type != document_type:
+                continue
+            for stage, ms in (breakdown.get("stages") or {}).items():
+                samples[(doc_type, stage)].append(float(ms))
+            if breakdown.get("total_ms") is not None:
+                samples[(doc_type, TOTAL_STAGE)].append(float(breakdown["total_ms"]))
+
+        rows = []
+        for (doc_type, stage), values in samples.items():
+            values = np.asarray(values)
+            # numpy's default linear interpolation matches percentile_cont
+            rows.append({
+                "document_type": doc_type,
+                "stage": stage,
+                "samples": len(values),
+                "p50_ms": np.percentile(values, 50),
+                "p95_ms": np.percentile(values, 95),
+                "mean_ms": values.mean(),
+            })
+        return rows
@@ -7,6 +7,11 @@ Learns patterns from successful uploads and applies them to future uploads.
 
 from sqlalchemy.orm import Session
 from app.models.filename_period_pattern import FilenamePeriodPattern
+from app.services.reference_data_cache import (
+    FILENAME_PATTERNS,
+    get_reference_data_cache,
+    mark_reference_data_changed,
+)
 import re
 from typing import Optional, Dict
 from datetime import datetime
@@ -102,6 +107,7 @@ class FilenamePatternLearningService:
                 self.db.add(new_pattern)
                 logger.info(f"Learned new pattern: {pattern} from {filename}")
 
+            mark_reference_data_changed(self.db, FILENAME_PATTERNS)
             self.db.commit()
 
         except Exception as e:
@@ -134,14 +140,10 @@ class FilenamePatternLearningService:
             if not pattern:
                 return None
 
-            # Find matching pattern
-            learned = self.db.query(FilenamePeriodPattern).filter(
-                FilenamePeriodPattern.filename_pattern == pattern,
-                FilenamePeriodPattern.property_id == property_id,
-                FilenamePeriodPattern.document_type == document_type
-            ).order_by(
-                FilenamePeriodPattern.times_seen.desc()
-            ).first()
+            # Find matching pattern (most-seen row, from the shared reference data cache)
+            learned = get_reference_data_cache().filename_patterns(self.db).by_key.get(
+                (pattern, property_id, document_type)
+            )
 
             if learned and learned.times_seen >= 2:  # Must be seen at least twice
                 # Calculate confidence based on success rate and times seen
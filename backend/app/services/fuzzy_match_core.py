@@ -0,0 +1,290 @@
+"""
+Fuzzy Match Core
+
+Blocking, vectorized scoring and one-to-one assignment for the forensic
+reconciliation matching engines:
+
+- Blocking keeps only plausible (source, target) pairs: account code prefix,
+  log-scale amount buckets (pairs within a relative tolerance always share or
+  neighbour a bucket), and character trigrams of account names (pairs must
+  share at least one trigram, computed as a sparse matrix product).
+- Scoring runs over whole blocks at once: rapidfuzz `process.cdist` for names
+  and NumPy arrays for amount differences.
+- Assignment picks a globally best one-to-one set of pairs: Hungarian
+  (scipy `linear_sum_assignment`) for moderate sizes, greedy by descending
+  confidence beyond that or when scipy is unavailable.
+"""
+import logging
+import math
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz, process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+try:
+    from scipy import sparse
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+AMOUNT_FIELDS = ('amount', 'period_amount', 'ytd_amount', 'total_amount', 'value')
+
+# Above this many name pairs, cdist runs per source name over its blocked candidates
+DENSE_NAME_CELLS = 250_000
+# Above this many cells the assignment falls back to greedy
+HUNGARIAN_MAX_CELLS = 4_000_000
+
+Candidate = Tuple[int, int, float, str]  # (source index, target index, confidence, algorithm)
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def get_amount(record: Dict[str, Any]) -> Optional[Decimal]:
+    """Amount from the first populated amount field of a record."""
+    for field in AMOUNT_FIELDS:
+        if field in record and record[field] is not None:
+            try:
+                return Decimal(str(record[field]))
+            except (ValueError, TypeError, InvalidOperation):
+                continue
+    return None
+
+
+def amount_array(records: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Record amounts as float64, NaN where a record has no amount."""
+    values = [get_amount(r) for r in records]
+    return np.array([float(v) if v is not None else np.nan for v in values], dtype=float)
+
+
+def diff_percent(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    |a - b| / max(|a|, |b|) * 100, broadcast over the inputs.
+
+    0 where both amounts are 0; NaN where either amount is missing.
+    """
+    source = np.asarray(source, dtype=float)
+    target = np.asarray(target, dtype=float)
+    max_abs = np.maximum(np.abs(source), np.abs(target))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.abs(source - target) / max_abs * 100
+    return np.where(max_abs == 0, 0.0, pct)
+
+
+def amount_similarity(pct: np.ndarray) -> np.ndarray:
+    """
+    Amount similarity (0-1) from a difference percentage: 1 within 1%, then
+    linear steps down to 0.9 at 1%, 0.6 at 5%, 0.3 at 10% and 0 at 100%.
+    """
+    pct = np.asarray(pct, dtype=float)
+    return np.select(
+        [pct <= 1.0, pct <= 5.0, pct <= 10.0],
+        [1.0, 0.9 - (pct - 1.0) / 4.0 * 0.3, 0.6 - (pct - 5.0) / 5.0 * 0.3],
+        np.maximum(0.0, 0.3 - (pct - 10.0) / 90.0 * 0.3)
+    )
+
+
+def max_diff_percent_for_similarity(min_similarity: float) -> Optional[float]:
+    """Largest difference percentage whose amount_similarity can reach min_similarity (None: none can)."""
+    if min_similarity > 1.0:
+        return None
+    if min_similarity > 0.9:
+        return 1.0
+    if min_similarity > 0.6:
+        return 1.0 + (0.9 - min_similarity) / 0.3 * 4.0
+    if min_similarity > 0.3:
+        return 5.0 + (0.6 - min_similarity) / 0.3 * 5.0
+    if min_similarity > 0.0:
+        return 10.0 + (0.3 - min_similarity) / 0.3 * 90.0
+    return 100.0
+
+
+def code_prefix(account_code: str) -> str:
+    """Account code range, e.g. "2610" for "2610-0000"."""
+    return account_code.split('-')[0] if '-' in account_code else account_code[:4]
+
+
+def block_by_key(keys: Iterable[Any]) -> Dict[Any, np.ndarray]:
+    """Indices grouped by blocking key (None keys are dropped), in input order."""
+    groups: Dict[Any, List[int]] = {}
+    for i, key in enumerate(keys):
+        if key is not None:
+            groups.setdefault(key, []).append(i)
+    return {key: np.array(idx, dtype=int) for key, idx in groups.items()}
+
+
+def amount_bucket(amount: float, max_diff_percent: float) -> Optional[Tuple[int, int]]:
+    """
+    (sign, log bucket) such that amounts within max_diff_percent of each other share
+    a sign and land in the same or adjacent buckets. Zero has its own bucket.
+    """
+    if amount is None or math.isnan(amount):
+        return None
+    if amount == 0:
+        return (0, 0)
+    ratio = 1.0 - max_diff_percent / 100.0
+    return (1 if amount > 0 else -1, int(math.floor(math.log(abs(amount)) / -math.log(ratio))))
+
+
+def amount_blocks(
+    source_amounts: np.ndarray,
+    target_amounts: np.ndarray,
+    max_diff_percent: float
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    (source indices, candidate target indices) blocks covering every pair whose
+    amounts differ by at most max_diff_percent. Targets stay in input order.
+    """
+    if max_diff_percent >= 100:
+        valid_source = np.flatnonzero(~np.isnan(source_amounts))
+        valid_target = np.flatnonzero(~np.isnan(target_amounts))
+        return [(valid_source, valid_target)] if len(valid_source) and len(valid_target) else []
+
+    target_groups = block_by_key(amount_bucket(a, max_diff_percent) for a in target_amounts)
+    source_groups = block_by_key(amount_bucket(a, max_diff_percent) for a in source_amounts)
+    blocks = []
+    for (sign, bucket), source_idx in source_groups.items():
+        neighbours = [target_groups.get((sign, bucket + d)) for d in (-1, 0, 1)]
+        candidates = [idx for idx in neighbours if idx is not None]
+        if candidates:
+            blocks.append((source_idx, np.sort(np.concatenate(candidates))))
+    return blocks
+
+
+def normalize_name(name: str) -> str:
+    return _NON_ALNUM.sub(' ', name.lower()).strip()
+
+
+def trigrams(name: str) -> set:
+    padded = f"  {normalize_name(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_candidate_pairs(source_names: Sequence[str], target_names: Sequence[str]) -> np.ndarray:
+    """(source, target) index pairs of names sharing at least one character trigram."""
+    vocabulary: Dict[str, int] = {}
+
+    def incidence(names):
+        rows, cols = [], []
+        for row, name in enumerate(names):
+            for gram in trigrams(name):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+        return rows, cols
+
+    source_rows, source_cols = incidence(source_names)
+    target_rows, target_cols = incidence(target_names)
+    if not source_rows or not target_rows:
+        return np.empty((0, 2), dtype=int)
+
+    if SCIPY_AVAILABLE:
+        shape_cols = len(vocabulary)
+        source_matrix = sparse.csr_matrix(
+            (np.ones(len(source_rows)), (source_rows, source_cols)), shape=(len(source_names), shape_cols)
+        )
+        target_matrix = sparse.csr_matrix(
+            (np.ones(len(target_rows)), (target_rows, target_cols)), shape=(len(target_names), shape_cols)
+        )
+        shared = (source_matrix @ target_matrix.T).tocoo()
+        return np.column_stack([shared.row, shared.col]).astype(int)
+
+    postings: Dict[int, set] = {}
+    for row, col in zip(target_rows, target_cols):
+        postings.setdefault(col, set()).add(row)
+    grams_by_source: Dict[int, set] = {}
+    for row, col in zip(source_rows, source_cols):
+        grams_by_source.setdefault(row, set()).add(col)
+    pairs = [
+        (row, target)
+        for row, grams in grams_by_source.items()
+        for target in set().union(*(postings.get(g, set()) for g in grams))
+    ]
+    return np.array(pairs, dtype=int).reshape(-1, 2)
+
+
+def name_scores(
+    source_names: Sequence[str],
+    target_names: Sequence[str],
+    score_cutoff: float
+) -> Dict[Tuple[int, int], float]:
+    """
+    WRatio scores >= score_cutoff between unique source and target names.
+
+    Small name sets are scored densely with one cdist call; larger ones only over
+    trigram-blocked candidates, one cdist row per source name.
+    """
+    if not source_names or not target_names:
+        return {}
+    scores: Dict[Tuple[int, int], float] = {}
+
+    if len(source_names) * len(target_names) <= DENSE_NAME_CELLS:
+        matrix = process.cdist(
+            source_names, target_names, scorer=fuzz.WRatio, score_cutoff=score_cutoff,
+            dtype=np.float32, workers=-1
+        )
+        for i, j in zip(*np.nonzero(matrix >= score_cutoff)):
+            scores[(int(i), int(j))] = float(matrix[i, j])
+        return scores
+
+    pairs = name_candidate_pairs(source_names, target_names)
+    if not len(pairs):
+        return scores
+    order = np.argsort(pairs[:, 0], kind='stable')
+    pairs = pairs[order]
+    splits = np.flatnonzero(np.diff(pairs[:, 0])) + 1
+    for group in np.split(pairs, splits):
+        i = int(group[0, 0])
+        candidates = np.sort(group[:, 1])
+        row = process.cdist(
+            [source_names[i]], [target_names[j] for j in candidates], scorer=fuzz.WRatio,
+            score_cutoff=score_cutoff, dtype=np.float32
+        )[0]
+        for k in np.flatnonzero(row >= score_cutoff):
+            scores[(i, int(candidates[k]))] = float(row[k])
+    return scores
+
+
+def assign(candidates: Sequence[Candidate]) -> List[Candidate]:
+    """
+    One-to-one assignment maximising total confidence over candidate pairs.
+
+    Candidates for the same pair keep their highest confidence. Returns the chosen
+    candidates ordered by source index.
+    """
+    best: Dict[Tuple[int, int], Candidate] = {}
+    for candidate in candidates:
+        key = (candidate[0], candidate[1])
+        if key not in best or candidate[2] > best[key][2]:
+            best[key] = candidate
+    if not best:
+        return []
+
+    sources = sorted({s for s, _ in best})
+    targets = sorted({t for _, t in best})
+    if SCIPY_AVAILABLE and len(sources) * len(targets) <= HUNGARIAN_MAX_CELLS:
+        row_of = {s: i for i, s in enumerate(sources)}
+        col_of = {t: j for j, t in enumerate(targets)}
+        weights = np.zeros((len(sources), len(targets)))
+        for (s, t), candidate in best.items():
+            weights[row_of[s], col_of[t]] = candidate[2]
+        rows, cols = linear_sum_assignment(weights, maximize=True)
+        chosen = [best.get((sources[r], targets[c])) for r, c in zip(rows, cols)]
+        chosen = [c for c in chosen if c is not None]
+    else:
+        chosen, used_sources, used_targets = [], set(), set()
+        for candidate in sorted(best.values(), key=lambda c: (-c[2], c[0], c[1])):
+            if candidate[0] in used_sources or candidate[1] in used_targets:
+                continue
+            chosen.append(candidate)
+            used_sources.add(candidate[0])
+            used_targets.add(candidate[1])
+    return sorted(chosen, key=lambda c: c[0])
@@ -0,0 +1,332 @@
+"""
+LLM Request Coordinator
+
+Generation layer that sits between LocalLLMService and the model servers:
+- Deterministic response cache keyed by provider, model, messages and parameters
+  (in-process LRU, optionally backed by Redis so workers share hits)
+- In-flight deduplication: identical concurrent requests share one upstream call
+- Per-model concurrency semaphore so bursts queue instead of thrashing Ollama
+- Queueing metrics (Prometheus + in-process stats)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "llm:response"
+
+if PROMETHEUS_AVAILABLE:
+    llm_cache_events_total = Counter(
+        'llm_cache_events_total',
+        'LLM request cache events',
+        ['model', 'result']  # result: 'hit', 'miss', 'coalesced'
+    )
+
+    llm_requests_waiting = Gauge(
+        'llm_requests_waiting',
+        'LLM requests queued behind the per-model concurrency limit',
+        ['model']
+    )
+
+    llm_requests_in_flight = Gauge(
+        'llm_requests_in_flight',
+        'LLM requests currently executing against the model server',
+        ['model']
+    )
+
+    llm_queue_wait_seconds = Histogram(
+        'llm_queue_wait_seconds',
+        'Time spent waiting for a per-model concurrency slot',
+        ['model'],
+        buckets=[0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0]
+    )
+
+    llm_generation_latency_seconds = Histogram(
+        'llm_generation_latency_seconds',
+        'Upstream LLM generation latency',
+        ['model', 'provider'],
+        buckets=[0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
+    )
+else:
+    class _DummyMetric:
+        def labels(self, *args, **kwargs): return self
+        def inc(self, *args, **kwargs): pass
+        def dec(self, *args, **kwargs): pass
+        def set(self, *args, **kwargs): pass
+        def observe(self, *args, **kwargs): pass
+
+    llm_cache_events_total = _DummyMetric()
+    llm_requests_waiting = _DummyMetric()
+    llm_requests_in_flight = _DummyMetric()
+    llm_queue_wait_seconds = _DummyMetric()
+    llm_generation_latency_seconds = _DummyMetric()
+
+
+@dataclass
+class _LoopState:
+    """Asyncio primitives are bound to an event loop, so they are kept per loop."""
+    inflight: Dict[str, "asyncio.Future[str]"] = field(default_factory=dict)
+    semaphores: Dict[str, asyncio.Semaphore] = field(default_factory=dict)
+
+
+class LLMRequestCoordinator:
+    """
+    Cache, coalesce and rate-limit LLM generation requests.
+
+    Usage:
+        key = coordinator.build_cache_key("ollama", model, messages, {"temperature": 0.3})
+        text = await coordinator.run(key, model, "ollama", lambda: call_model(...))
+    """
+
+    def __init__(
+        self,
+        max_concurrent_per_model: int = 2,
+        cache_ttl_seconds: int = 86400,
+        max_cache_entries: int = 512,
+        use_redis: bool = False,
+        enable_cache: bool = True,
+    ):
+        self.max_concurrent_per_model = max(1, int(max_concurrent_per_model))
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.max_cache_entries = max_cache_entries
+        self.use_redis = use_redis
+        self.enable_cache = enable_cache
+
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._loop_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats: Dict[str, Any] = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "total_queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+            "waiting": {},
+            "in_flight": {},
+        }
+
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_cache_key(
+        provider: str,
+        model: str,
+        messages: Any,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Build a stable key from the request that determines the model output."""
+        payload = {
+            "provider": str(provider),
+            "model": str(model),
+            "messages": messages,
+            "params": params or {},
+        }
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return f"{CACHE_KEY_PREFIX}:{digest}"
+
+    # ------------------------------------------------------------------
+    # Cache tiers
+    # ------------------------------------------------------------------
+
+    def _local_get(self, key: str) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._cache.pop(key, None)
+            return None
+        self._cache.move_to_end(key)
+        return value
+
+    def _local_set(self, key: str, value: str) -> None:
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_cache_entries:
+            self._cache.popitem(last=False)
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        value = self._local_get(key)
+        if value is not None or not self.use_redis:
+            return value
+
+        try:
+            from app.core.redis_client import cache_get
+            value = await asyncio.to_thread(cache_get, key)
+        except Exception as e:
+            logger.warning(f"LLM cache Redis lookup failed: {e}")
+            return None
+
+        if isinstance(value, str):
+            self._local_set(key, value)
+            return value
+        return None
+
+    async def _cache_set(self, key: str, value: str) -> None:
+        self._local_set(key, value)
+        if not self.use_redis:
+            return
+        try:
+            from app.core.redis_client import cache_set
+            await asyncio.to_thread(cache_set, key, value, self.cache_ttl_seconds)
+        except Exception as e:
+            logger.warning(f"LLM cache Redis write failed: {e}")
+
+    def clear_cache(self) -> None:
+        """Drop all in-process cache entries."""
+        self._cache.clear()
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._loop_states.get(loop)
+        if state is None:
+            state = _LoopState()
+            self._loop_states[loop] = state
+        return state
+
+    def _semaphore(self, state: _LoopState, model: str) -> asyncio.Semaphore:
+        semaphore = state.semaphores.get(model)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrent_per_model)
+            state.semaphores[model] = semaphore
+        return semaphore
+
+    def _adjust(self, bucket: str, model: str, delta: int) -> None:
+        counts = self._stats[bucket]
+        counts[model] = counts.get(model, 0) + delta
+
+    async def run(
+        self,
+        key: str,
+        model: str,
+        provider: str,
+        factory: Callable[[], Awaitable[str]],
+        use_cache: bool = True,
+    ) -> str:
+        """
+        Return the response for `key`, calling `factory` at most once per key.
+
+        Args:
+            key: Cache key from build_cache_key
+            model: Model name (concurrency is limited per model)
+            provider: Provider label for metrics
+            factory: Coroutine factory performing the upstream call
+            use_cache: Read/write the response cache (coalescing always applies)
+
+        Returns:
+            Generated text
+        """
+        use_cache = use_cache and self.enable_cache
+
+        if use_cache:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                self._stats["cache_hits"] += 1
+                llm_cache_events_total.labels(model=model, result="hit").inc()
+                return cached
+
+        state = self._state()
+        pending = state.inflight.get(key)
+        if pending is not None:
+            self._stats["coalesced"] += 1
+            llm_cache_events_total.labels(model=model, result="coalesced").inc()
+            return await asyncio.shield(pending)
+
+        self._stats["cache_misses"] += 1
+        llm_cache_events_total.labels(model=model, result="miss").inc()
+
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        state.inflight[key] = future
+        try:
+            result = await self._execute(state, model, provider, factory)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a future nobody else awaited does not log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if use_cache and result:
+                await self._cache_set(key, result)
+            return result
+        finally:
+            state.inflight.pop(key, None)
+
+    async def _execute(
+        self,
+        state: _LoopState,
+        model: str,
+        provider: str,
+        factory: Callable[[], Awaitable[str]],
+    ) -> str:
+        semaphore = self._semaphore(state, model)
+
+        queued_at = time.perf_counter()
+        self._adjust("waiting", model, 1)
+        llm_requests_waiting.labels(model=model).inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            self._adjust("waiting", model, -1)
+            llm_requests_waiting.labels(model=model).dec()
+
+        wait = time.perf_counter() - queued_at
+        self._stats["total_queue_wait_seconds"] += wait
+        self._stats["max_queue_wait_seconds"] = max(self._stats["max_queue_wait_seconds"], wait)
+        llm_queue_wait_seconds.labels(model=model).observe(wait)
+
+        self._adjust("in_flight", model, 1)
+        llm_requests_in_flight.labels(model=model).inc()
+        started_at = time.perf_counter()
+        try:
+            self._stats["upstream_calls"] += 1
+            return await factory()
+        except Exception:
+            self._stats["upstream_errors"] += 1
+            raise
+        finally:
+            llm_generation_latency_seconds.labels(model=model, provider=provider).observe(
+                time.perf_counter() - started_at
+            )
+            self._adjust("in_flight", model, -1)
+            llm_requests_in_flight.labels(model=model).dec()
+            semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of cache and queueing statistics."""
+        lookups = self._stats["cache_hits"] + self._stats["cache_misses"] + self._stats["coalesced"]
+        return {
+            **{k: v for k, v in self._stats.items() if k not in ("waiting", "in_flight")},
+            "waiting": {m: c for m, c in self._stats["waiting"].items() if c},
+            "in_flight": {m: c for m, c in self._stats["in_flight"].items() if c},
+            "cache_entries": len(self._cache),
+            "hit_rate": (self._stats["cache_hits"] + self._stats["coalesced"]) / lookups if lookups else 0.0,
+            "max_concurrent_per_model": self.max_concurrent_per_model,
+        }
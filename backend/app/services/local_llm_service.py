@@ -17,6 +17,8 @@ from enum import Enum
 import httpx
 from pydantic import BaseModel
 
+from app.services.llm_request_coordinator import LLMRequestCoordinator
+
 logger = logging.getLogger(__name__)
 
 
@@ -91,10 +93,16 @@ class LocalLLMService:
     - Streaming support for real-time responses
     - Cost tracking and optimization
     - GPU/CPU automatic detection
+    - Response caching, in-flight dedup and per-model concurrency limits
     """
 
-    def __init__(self, config: Optional[LLMConfig] = None):
+    def __init__(
+        self,
+        config: Optional[LLMConfig] = None,
+        coordinator: Optional[LLMRequestCoordinator] = None
+    ):
         self.config = config or LLMConfig()
+        self.coordinator = coordinator or LLMRequestCoordinator()
         self.client = httpx.AsyncClient(
             timeout=300.0,  # 5 min timeout for large models
             headers={"Content-Type": "application/json"}
@@ -246,11 +254,15 @@ class LocalLLMService:
         prefer_fast: bool = False,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
+        use_cache: bool = True,
         **kwargs
     ) -> str:
         """
         Generate text using local LLM
 
+        Identical requests (same provider, model, messages and parameters) are
+        served from the response cache or coalesced onto the in-flight call.
+
         Args:
             prompt: User prompt
             task_type: Type of task for model selection
@@ -258,6 +270,7 @@ class LocalLLMService:
             prefer_fast: Prefer faster models
             temperature: Override default temperature
             max_tokens: Override default max tokens
+            use_cache: Read/write the response cache for this request
             **kwargs: Additional model parameters
 
         Returns:
@@ -285,24 +298,73 @@ class LocalLLMService:
                 logger.warning("Ollama unavailable, falling back to Groq")
                 self.last_provider = LLMProvider.GROQ
                 self.last_model_used = LLMModel.GROQ_LLAMA_3_3_70B
-                return await self._generate_with_groq(prompt, system_prompt, temp, max_tok)
+                return await self._coordinated(
+                    LLMProvider.GROQ, LLMModel.GROQ_LLAMA_3_3_70B, prompt, system_prompt,
+                    temp, max_tok, use_cache, {},
+                    lambda: self._generate_with_groq(prompt, system_prompt, temp, max_tok)
+                )
 
             available_models = await self._ensure_ollama_models()
             model = self._resolve_model(model, task_type, prefer_fast, available_models)
             self.last_provider = LLMProvider.OLLAMA
             self.last_model_used = model
-            return await self._generate_with_ollama(
-                prompt, model, system_prompt, temp, max_tok, **kwargs
+            return await self._coordinated(
+                LLMProvider.OLLAMA, model, prompt, system_prompt, temp, max_tok, use_cache, kwargs,
+                lambda: self._generate_with_ollama(
+                    prompt, model, system_prompt, temp, max_tok, **kwargs
+                )
             )
 
         elif self.config.provider == LLMProvider.GROQ:
             self.last_provider = LLMProvider.GROQ
             self.last_model_used = LLMModel.GROQ_LLAMA_3_3_70B
-            return await self._generate_with_groq(prompt, system_prompt, temp, max_tok)
+            return await self._coordinated(
+                LLMProvider.GROQ, LLMModel.GROQ_LLAMA_3_3_70B, prompt, system_prompt,
+                temp, max_tok, use_cache, {},
+                lambda: self._generate_with_groq(prompt, system_prompt, temp, max_tok)
+            )
 
         else:
             raise ValueError(f"Unsupported provider: {self.config.provider}")
 
+    async def _coordinated(
+        self,
+        provider: LLMProvider,
+        model: Union[str, LLMModel],
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        use_cache: bool,
+        extra_params: Dict[str, Any],
+        factory
+    ) -> str:
+        """Route an upstream call through the cache/coalescing/concurrency layer."""
+        model_name = self._normalize_model(model)
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        key = self.coordinator.build_cache_key(
+            provider.value,
+            model_name,
+            messages,
+            {
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "top_p": self.config.top_p,
+                **extra_params,
+            },
+        )
+        return await self.coordinator.run(
+            key, model_name, provider.value, factory, use_cache=use_cache
+        )
+
+    def get_request_stats(self) -> Dict[str, Any]:
+        """Cache hit rate, coalescing and per-model queue statistics."""
+        return self.coordinator.get_stats()
+
     async def _generate_with_ollama(
         self,
         prompt: str,
@@ -600,6 +662,14 @@ def get_local_llm_service() -> LocalLLMService:
             max_tokens=getattr(settings, "LLM_MAX_TOKENS", 4000),
         )
 
-        _llm_service = LocalLLMService(config)
+        coordinator = LLMRequestCoordinator(
+            max_concurrent_per_model=getattr(settings, "LLM_MAX_CONCURRENT_PER_MODEL", 2),
+            cache_ttl_seconds=int(getattr(settings, "LLM_CACHE_TTL_HOURS", 24) * 3600),
+            max_cache_entries=getattr(settings, "LLM_CACHE_MAX_ENTRIES", 512),
+            use_redis=True,
+            enable_cache=getattr(settings, "LLM_ENABLE_CACHING", True),
+        )
+
+        _llm_service = LocalLLMService(config, coordinator=coordinator)
 
     return _llm_service
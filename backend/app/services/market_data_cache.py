@@ -0,0 +1,230 @@
+"""
+Market Data Cache
+
+Two-tier cache for external market data responses:
+- A size-bounded in-process LRU for repeat lookups inside one worker
+- A shared Redis tier so every API/Celery process reuses the same responses
+  and cached data survives restarts. The tier is bounded too: every entry is
+  indexed in a sorted set by expiry, and writes beyond max_redis_entries evict
+  the entries closest to expiring. Oversized values stay local only.
+
+Keys are built from the endpoint name and its canonicalised parameters
+(never the service instance), so the same lookup hits the same entry from
+any process. Values are stored as tagged JSON so tuples, sets, Decimals and
+dates come back from Redis as the types that were cached.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] entry key, KEYS[2] index key; ARGV: ttl (sec), payload, max entries
+# Stores the entry, drops index members whose entries already expired, then
+# evicts the soonest-expiring entries until the index is within max entries.
+_BOUNDED_SET_LUA = """
+local ttl = tonumber(ARGV[1])
+local max_entries = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1])
+redis.call('SETEX', KEYS[1], ttl, ARGV[2])
+redis.call('ZADD', KEYS[2], now + ttl, KEYS[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local excess = redis.call('ZCARD', KEYS[2]) - max_entries
+if excess > 0 then
+  local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+  for _, key in ipairs(evicted) do
+    redis.call('DEL', key)
+  end
+  redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+end
+return excess
+"""
+
+
+def _json_default(value: Any) -> Any:
+    """Convert values produced by the market data routines into plain JSON types."""
+    if NUMPY_AVAILABLE:
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _encode(value: Any) -> Any:
+    """Tag the types plain JSON would flatten so _decode_hook can rebuild them."""
+    if NUMPY_AVAILABLE:
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, np.ndarray):
+            return [_encode(v) for v in value.tolist()]
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {k: _encode(v) for k, v in value.items()}
+        return {"__items__": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, tuple):
+        return {"__tuple__": [_encode(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        return {"__set__": [_encode(v) for v in value]}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    return value
+
+
+def _decode_hook(obj: Dict[str, Any]) -> Any:
+    """json object_hook reversing _encode's tags."""
+    if len(obj) == 1:
+        tag, payload = next(iter(obj.items()))
+        if tag == "__tuple__":
+            return tuple(payload)
+        if tag == "__set__":
+            return set(payload)
+        if tag == "__decimal__":
+            return Decimal(payload)
+        if tag == "__datetime__":
+            return datetime.fromisoformat(payload)
+        if tag == "__date__":
+            return date.fromisoformat(payload)
+        if tag == "__items__":
+            return {k: v for k, v in payload}
+    return obj
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(_encode(value), default=_json_default, separators=(",", ":"))
+
+
+def _loads(raw: Any) -> Any:
+    return json.loads(raw, object_hook=_decode_hook)
+
+
+class MarketDataCache:
+    """Bounded local LRU in front of a bounded, shared Redis cache."""
+
+    def __init__(
+        self,
+        namespace: str = "market_data",
+        max_local_entries: int = 1024,
+        max_redis_entries: int = 50000,
+        max_value_bytes: int = 512 * 1024,
+        redis_getter: Optional[Callable[[], Any]] = None,
+    ):
+        self.namespace = namespace
+        self.max_local_entries = max_local_entries
+        self.max_redis_entries = max_redis_entries
+        self.max_value_bytes = max_value_bytes
+        self.index_key = f"{namespace}:__index__"
+        if redis_getter is None:
+            from app.core.redis_client import get_redis_client
+            redis_getter = get_redis_client
+        self._redis_getter = redis_getter
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._script = None
+        self._script_client = None
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "redis_evictions": 0}
+
+    def build_key(self, endpoint: str, params: Dict[str, Any]) -> str:
+        """Stable key from the endpoint name and canonical JSON of its parameters."""
+        canonical = json.dumps(params, sort_keys=True, default=_json_default, separators=(",", ":"))
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{endpoint}:{digest}"
+
+    def _redis(self):
+        try:
+            return self._redis_getter()
+        except Exception as e:
+            logger.debug(f"Market data cache Redis unavailable: {e}")
+            return None
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value). Redis hits are promoted into the local tier."""
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    self.stats["local_hits"] += 1
+                    return True, value
+                del self._local[key]
+
+        client = self._redis()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.get(key)
+                pipe.ttl(key)
+                raw, ttl = pipe.execute()
+                if raw is not None:
+                    value = _loads(raw)
+                    self._set_local(key, value, ttl if ttl and ttl > 0 else 60)
+                    self.stats["redis_hits"] += 1
+                    return True, value
+            except Exception as e:
+                logger.warning(f"Market data cache read failed for {key}: {e}")
+
+        self.stats["misses"] += 1
+        return False, None
+
+    def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        self._set_local(key, value, ttl_seconds)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            payload = _dumps(value)
+            if len(payload) > self.max_value_bytes:
+                logger.debug(f"Market data cache value for {key} is {len(payload)} bytes, keeping it local")
+                return
+            if self._script is None or self._script_client is not client:
+                self._script = client.register_script(_BOUNDED_SET_LUA)
+                self._script_client = client
+            evicted = self._script(
+                keys=[key, self.index_key],
+                args=[max(1, int(ttl_seconds)), payload, self.max_redis_entries],
+            )
+            if evicted and int(evicted) > 0:
+                self.stats["redis_evictions"] += int(evicted)
+        except Exception as e:
+            logger.warning(f"Market data cache write failed for {key}: {e}")
+
+    def _set_local(self, key: str, value: Any, ttl_seconds: int) -> None:
+        with self._lock:
+            self._local[key] = (time.time() + ttl_seconds, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def __len__(self) -> int:
+        return len(self._local)
@@ -12,6 +12,7 @@ Supports:
 - OpenStreetMap (geocoding)
 """
 
+import asyncio
 import logging
 import time
 import os
@@ -19,9 +20,13 @@ from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 import requests
 import httpx # For async/http2 requests (used by Overpass)
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 import hashlib
+import inspect
 import json
+import random
+import threading
 import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
@@ -45,54 +50,85 @@ from app.models.financial_metrics import FinancialMetrics
 from app.models.financial_period import FinancialPeriod
 from app.models.market_intelligence import MarketIntelligence
 from app.models.property import Property
+from app.services.market_data_cache import MarketDataCache
+from app.services.overpass_query_builder import (
+    AMENITY_KEYS,
+    build_batched_query,
+    count_features,
+    group_points,
+    point_key,
+)
+from app.utils.token_bucket import BucketConfig, TokenBucketRateLimiter
 
 logger = logging.getLogger(__name__)
 
 
-# In-memory cache with TTL (will upgrade to Redis in production)
-_market_data_cache: Dict[str, Dict[str, Any]] = {}
+# Shared response cache: bounded local LRU + Redis tier (see market_data_cache)
+_market_data_cache = MarketDataCache(namespace="market_data", max_local_entries=1024)
 
 
 def cache_with_ttl(ttl_seconds: int = 3600):
     """
     Decorator for caching API responses with TTL.
 
+    The key is built from the method name and its bound arguments (defaults
+    applied, ``self`` excluded), so identical lookups share one entry across
+    service instances and worker processes. ``None`` results are not cached
+    so transient failures are retried on the next call.
+
     Args:
         ttl_seconds: Time to live in seconds (default 1 hour)
     """
     def decorator(func):
+        signature = inspect.signature(func)
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Create cache key from function name and arguments
-            cache_key = hashlib.md5(
-                f"{func.__name__}_{str(args)}_{str(kwargs)}".encode()
-            ).hexdigest()
-
-            # Check cache
-            if cache_key in _market_data_cache:
-                cached = _market_data_cache[cache_key]
-                age = time.time() - cached['timestamp']
-                if age < ttl_seconds:
-                    logger.info(f"Cache HIT for {func.__name__} (age: {age:.1f}s)")
-                    return cached['data']
-                else:
-                    logger.info(f"Cache EXPIRED for {func.__name__} (age: {age:.1f}s)")
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != 'self'}
+            cache_key = _market_data_cache.build_key(func.__name__, params)
+
+            hit, cached = _market_data_cache.get(cache_key)
+            if hit:
+                logger.info(f"Cache HIT for {func.__name__}")
+                return cached
 
-            # Cache miss - fetch data
             logger.info(f"Cache MISS for {func.__name__}")
             result = func(*args, **kwargs)
-
-            # Store in cache
-            _market_data_cache[cache_key] = {
-                'data': result,
-                'timestamp': time.time()
-            }
-
+            if result is not None:
+                _market_data_cache.set(cache_key, result, ttl_seconds)
             return result
         return wrapper
     return decorator
 
 
+_rate_limiter: Optional[TokenBucketRateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+_http_local = threading.local()
+
+
+def _get_rate_limiter() -> TokenBucketRateLimiter:
+    """Process-wide token buckets built from MarketDataService.RATE_LIMITS (state lives in Redis)."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = TokenBucketRateLimiter(
+                    {source: BucketConfig.per_minute(limit) for source, limit in MarketDataService.RATE_LIMITS.items()},
+                    key_prefix="ratelimit:market_data",
+                )
+    return _rate_limiter
+
+
+def _http_session() -> requests.Session:
+    """Per-thread pooled HTTP session (requests.Session is not thread-safe to share)."""
+    session = getattr(_http_local, 'session', None)
+    if session is None:
+        session = _http_local.session = requests.Session()
+    return session
+
+
 class MarketDataService:
     """
     Centralized service for external market data integration.
@@ -127,8 +163,14 @@ class MarketDataService:
         'overpass': 30
     }
 
-    # Request tracking for rate limiting
-    _request_history: Dict[str, List[float]] = {}
+    CENSUS_GEOCODER_URL = "https://geocoding.geo.census.gov/geocoder/geographies/coordinates"
+
+    # Batched Overpass feature counts per location
+    OSM_FEATURES_TTL_SECONDS = 604800  # 7 days
+
+    # Retry policy for fetch_with_retry
+    MAX_BACKOFF_SECONDS = 30.0
+    MAX_RETRY_AFTER_SECONDS = 60.0
 
     def __init__(self, db: Session, census_api_key: Optional[str] = None, fred_api_key: Optional[str] = None):
         """
@@ -143,6 +185,10 @@ class MarketDataService:
         self.census_api_key = census_api_key
         self.fred_api_key = fred_api_key
         self.osrm_base_url = os.getenv('OSRM_BASE_URL')
+        # While fetching sources concurrently, audit rows are buffered here and
+        # written by the calling thread (the Session is not thread-safe)
+        self._audit_buffer: Optional[List[Dict[str, Any]]] = None
+        self._audit_lock = threading.Lock()
 
     def get_market_intelligence(self, property_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -173,45 +219,21 @@ class MarketDataService:
             logger.warning(f"Failed to load market intelligence for property {property_id}: {exc}")
             return None
 
-    def _check_rate_limit(self, source: str) -> bool:
-        """
-        Check if we can make a request without exceeding rate limit.
+    def _wait_for_rate_limit(self, source: str) -> bool:
+        """Take a token from the shared bucket for this source, sleeping only as long as needed."""
+        return _get_rate_limiter().acquire(source)
 
-        Args:
-            source: Data source name ('census', 'fred', 'bls', 'hud', 'nominatim')
-
-        Returns:
-            True if request is allowed, False if rate limit would be exceeded
-        """
-        if source not in self._request_history:
-            self._request_history[source] = []
-
-        # Clean up old requests (older than 1 minute)
-        current_time = time.time()
-        self._request_history[source] = [
-            t for t in self._request_history[source]
-            if current_time - t < 60
-        ]
-
-        # Check if we're under the limit
-        limit = self.RATE_LIMITS.get(source, 60)
-        if len(self._request_history[source]) >= limit:
-            logger.warning(f"Rate limit reached for {source} ({limit} requests/min)")
-            return False
-
-        return True
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter, capped at MAX_BACKOFF_SECONDS."""
+        return random.uniform(0, min(self.MAX_BACKOFF_SECONDS, float(2 ** attempt)))
 
-    def _record_request(self, source: str):
-        """Record a request for rate limiting."""
-        if source not in self._request_history:
-            self._request_history[source] = []
-        self._request_history[source].append(time.time())
-
-    def _wait_for_rate_limit(self, source: str):
-        """Wait if necessary to avoid rate limiting."""
-        while not self._check_rate_limit(source):
-            logger.info(f"Waiting for rate limit window for {source}...")
-            time.sleep(1)
+    def _retry_after_delay(self, response: Optional[requests.Response], attempt: int) -> float:
+        """Honour a numeric Retry-After header (capped), otherwise fall back to backoff."""
+        header = response.headers.get('Retry-After') if response is not None else None
+        try:
+            return min(self.MAX_RETRY_AFTER_SECONDS, max(0.0, float(header)))
+        except (TypeError, ValueError):
+            return self._backoff_delay(attempt + 2)
 
     def fetch_with_retry(
         self,
@@ -224,6 +246,10 @@ class MarketDataService:
         """
         Fetch data from external API with retry logic and rate limiting.
 
+        Every attempt takes a token from the source's distributed bucket.
+        Retries use jittered exponential backoff; 429 responses honour
+        Retry-After. No sleep happens after the final attempt.
+
         Args:
             source: Data source name
             url: API endpoint URL
@@ -234,38 +260,39 @@ class MarketDataService:
         Returns:
             API response as dict, or None on failure
         """
-        self._wait_for_rate_limit(source)
-
         for attempt in range(max_retries):
-            try:
-                self._record_request(source)
+            if not self._wait_for_rate_limit(source):
+                return None
 
+            delay = None
+            try:
                 logger.info(f"Fetching from {source}: {url} (attempt {attempt + 1}/{max_retries})")
-                response = requests.get(url, params=params, timeout=timeout)
+                response = _http_session().get(url, params=params, timeout=timeout)
                 response.raise_for_status()
 
                 return response.json()
 
             except requests.exceptions.Timeout:
                 logger.warning(f"Timeout fetching from {source} (attempt {attempt + 1}/{max_retries})")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
+                delay = self._backoff_delay(attempt)
 
             except requests.exceptions.HTTPError as e:
                 logger.error(f"HTTP error fetching from {source}: {e}")
-                if e.response.status_code == 429:  # Rate limit
-                    logger.warning(f"Rate limited by {source}, waiting 60 seconds...")
-                    time.sleep(60)
-                elif e.response.status_code >= 500:  # Server error
-                    if attempt < max_retries - 1:
-                        time.sleep(2 ** attempt)
+                status_code = e.response.status_code if e.response is not None else 0
+                if status_code == 429:  # Rate limit
+                    delay = self._retry_after_delay(e.response, attempt)
+                    logger.warning(f"Rate limited by {source}, retrying in {delay:.1f}s")
+                elif status_code >= 500:  # Server error
+                    delay = self._backoff_delay(attempt)
                 else:
                     break  # Don't retry client errors
 
             except Exception as e:
                 logger.error(f"Error fetching from {source}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                delay = self._backoff_delay(attempt)
+
+            if delay is not None and attempt < max_retries - 1:
+                time.sleep(delay)
 
         return None
 
@@ -358,28 +385,110 @@ class MarketDataService:
         """
         from app.models.audit_trail import AuditTrail
 
+        entry = {
+            'action': f"market_data_pull_{source}",
+            'entity_type': "market_data",
+            'entity_id': None,
+            'details': {
+                'source': source,
+                'endpoint': endpoint,
+                'status': status,
+                'records_fetched': records_fetched,
+                'error_message': error_message,
+                'timestamp': datetime.now().isoformat(),
+                'extra_metadata': extra_metadata or {}
+            }
+        }
+        with self._audit_lock:
+            if self._audit_buffer is not None:
+                self._audit_buffer.append(entry)
+                return
+
         try:
-            audit = AuditTrail(
-                action=f"market_data_pull_{source}",
-                entity_type="market_data",
-                entity_id=None,
-                details={
-                    'source': source,
-                    'endpoint': endpoint,
-                    'status': status,
-                    'records_fetched': records_fetched,
-                    'error_message': error_message,
-                    'timestamp': datetime.now().isoformat(),
-                    'extra_metadata': extra_metadata or {}
-                }
-            )
-            self.db.add(audit)
+            self.db.add(AuditTrail(**entry))
             self.db.commit()
             logger.info(f"Logged data pull: {source} - {status}")
         except Exception as e:
             logger.error(f"Failed to log data pull: {e}")
             self.db.rollback()
 
+    def _flush_audit_buffer(self, entries: List[Dict[str, Any]]):
+        """Write buffered audit rows in one commit."""
+        from app.models.audit_trail import AuditTrail
+
+        if not entries:
+            return
+        try:
+            self.db.add_all([AuditTrail(**entry) for entry in entries])
+            self.db.commit()
+            logger.info(f"Logged {len(entries)} data pulls")
+        except Exception as e:
+            logger.error(f"Failed to log data pulls: {e}")
+            self.db.rollback()
+
+    # ========== Concurrent Fetch ==========
+
+    def fetch_property_market_data(
+        self,
+        latitude: Optional[float],
+        longitude: Optional[float],
+        property_data: Optional[Dict[str, Any]] = None,
+        msa_code: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        max_workers: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Fetch census, FRED, OSM location and ESG data for one property in parallel.
+
+        Each source runs in its own thread and is throttled by the shared
+        token buckets, so the wall time is roughly the slowest source instead
+        of the sum. Audit rows produced while fetching are written afterwards
+        in a single commit.
+
+        Args:
+            latitude: Property latitude (location-based sources are skipped without it)
+            longitude: Property longitude
+            property_data: Property details passed to the ESG assessment
+            msa_code: MSA code for FRED MSA indicators
+            categories: Subset of demographics/economic/location/esg (default: all)
+            max_workers: Thread pool size
+
+        Returns:
+            Dict keyed by category with the fetched payload (or None), plus an
+            'errors' dict for categories that raised
+        """
+        has_location = latitude is not None and longitude is not None
+        tasks = {
+            'demographics': (lambda: self.fetch_enhanced_demographics(latitude, longitude)) if has_location else None,
+            'economic': lambda: self.fetch_fred_economic_indicators(msa_code),
+            'location': (lambda: self.fetch_location_intelligence(latitude, longitude)) if has_location else None,
+            'esg': (lambda: self.fetch_esg_assessment(latitude, longitude, property_data)) if has_location else None,
+        }
+        wanted = categories or list(tasks.keys())
+        results: Dict[str, Any] = {name: None for name in wanted}
+        results['errors'] = {}
+
+        with self._audit_lock:
+            self._audit_buffer = []
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="market-data") as pool:
+                futures = {
+                    name: pool.submit(tasks[name])
+                    for name in wanted if tasks.get(name) is not None
+                }
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Concurrent fetch of {name} failed: {e}")
+                        results['errors'][name] = str(e)
+        finally:
+            with self._audit_lock:
+                entries, self._audit_buffer = self._audit_buffer or [], None
+            self._flush_audit_buffer(entries)
+
+        return results
+
     # ========== Census API ==========
 
     @cache_with_ttl(ttl_seconds=604800)  # 7 days - vintages change rarely
@@ -455,7 +564,7 @@ class MarketDataService:
                 year = self.get_latest_census_vintage()
                 logger.info(f"Using auto-detected Census vintage: {year}")
             # First, get census tract from coordinates
-            geocode_url = "https://geocoding.geo.census.gov/geocoder/geographies/coordinates"
+            geocode_url = self.CENSUS_GEOCODER_URL
             geocode_params = {
                 'x': longitude,
                 'y': latitude,
@@ -826,8 +935,9 @@ class MarketDataService:
             }
 
             # Special handling for Nominatim (requires User-Agent)
-            self._wait_for_rate_limit('nominatim')
-            self._record_request('nominatim')
+            if not self._wait_for_rate_limit('nominatim'):
+                self.log_data_pull('nominatim', 'search', 'failure', error_message="Rate limit wait exceeded")
+                return None
 
             response = requests.get(url, params=params, headers=headers, timeout=30)
             response.raise_for_status()
@@ -950,7 +1060,7 @@ class MarketDataService:
         longitude: float
     ) -> Optional[Dict[str, int]]:
         """
-        Fetch amenity counts from OpenStreetMap Overpass API.
+        Amenity counts from OpenStreetMap (served by the batched Overpass features).
 
         Args:
             latitude: Center latitude
@@ -959,72 +1069,140 @@ class MarketDataService:
         Returns:
             Dictionary of amenity counts
         """
+        features = self._get_osm_features(latitude, longitude)
+        if features is None:
+            return None
+        amenities = {key: features.get(key, 0) for key in AMENITY_KEYS}
+        logger.info(f"Found amenities: {amenities}")
+        return amenities
+
+    def _get_osm_features(self, latitude: float, longitude: float) -> Optional[Dict[str, int]]:
+        """
+        All OSM category counts for one location.
+
+        Served from the market data cache when a portfolio prefetch (or an
+        earlier call) already covered this point; otherwise one batched
+        Overpass request fetches every category at once.
+        """
+        key = point_key(latitude, longitude)
+        cache_key = _market_data_cache.build_key('osm_features', {'lat': key[0], 'lon': key[1]})
+        hit, cached = _market_data_cache.get(cache_key)
+        if hit:
+            return cached
+
         try:
-            # Search radii in meters
-            radius_1mi = 1609  # 1 mile
-            radius_2mi = 3218  # 2 miles
-            radius_5mi = 8047  # 5 miles
-
-            # Build Overpass QL query
-            query = f"""
-            [out:json][timeout:25];
-            (
-              nwr["shop"="supermarket"](around:{radius_1mi},{latitude},{longitude});
-              nwr["amenity"="restaurant"](around:{radius_1mi},{latitude},{longitude});
-              nwr["amenity"="school"](around:{radius_2mi},{latitude},{longitude});
-              nwr["amenity"="hospital"](around:{radius_5mi},{latitude},{longitude});
-              nwr["leisure"="park"](around:{radius_1mi},{latitude},{longitude});
-            );
-            out tags;
-            """
-
-            self._wait_for_rate_limit('overpass')
-            self._record_request('overpass')
-
-            last_error = None
-            for overpass_url in self.OVERPASS_API_URLS:
-                try:
-                    response = httpx.post(
-                        overpass_url,
-                        data={'data': query},
-                        timeout=30.0
-                    )
-                    response.raise_for_status()
+            data = self._post_overpass(build_batched_query([key]), timeout=60.0)
+        except Exception as e:
+            logger.warning(f"Error fetching OSM features: {e}")
+            return None
 
-                    data = response.json()
+        features = count_features(data.get('elements', []), [key])[key]
+        _market_data_cache.set(cache_key, features, self.OSM_FEATURES_TTL_SECONDS)
+        return features
 
-                    # Parse counts from Overpass response (tags-only payload)
-                    amenities = {
-                        'grocery_stores_1mi': len([e for e in data.get('elements', []) if e.get('tags', {}).get('shop') == 'supermarket']),
-                        'restaurants_1mi': len([e for e in data.get('elements', []) if e.get('tags', {}).get('amenity') == 'restaurant']),
-                        'schools_2mi': len([e for e in data.get('elements', []) if e.get('tags', {}).get('amenity') == 'school']),
-                        'hospitals_5mi': len([e for e in data.get('elements', []) if e.get('tags', {}).get('amenity') == 'hospital']),
-                        'parks_1mi': len([e for e in data.get('elements', []) if e.get('tags', {}).get('leisure') == 'park']),
-                    }
+    def _post_overpass(self, query: str, timeout: float = 30.0) -> Dict[str, Any]:
+        """POST a query to the first Overpass mirror that answers."""
+        if not self._wait_for_rate_limit('overpass'):
+            raise RuntimeError("Overpass rate limit wait exceeded")
 
-                    logger.info(f"Found amenities: {amenities}")
-                    return amenities
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"Overpass amenities request failed via {overpass_url}: {e}")
+        last_error = None
+        for overpass_url in self.OVERPASS_API_URLS:
+            try:
+                response = httpx.post(overpass_url, data={'data': query}, timeout=timeout)
+                response.raise_for_status()
+                return response.json()
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Overpass request failed via {overpass_url}: {e}")
+        raise last_error or RuntimeError("No Overpass endpoint configured")
 
-            if last_error:
-                raise last_error
+    async def _apost_overpass(self, client: httpx.AsyncClient, query: str, timeout: float = 60.0) -> Dict[str, Any]:
+        """Async variant of _post_overpass sharing the same token bucket."""
+        if not await _get_rate_limiter().acquire_async('overpass'):
+            raise RuntimeError("Overpass rate limit wait exceeded")
 
-        except Exception as e:
-            logger.warning(f"Error fetching amenities from OSM: {e}")
-            return None
+        last_error = None
+        for overpass_url in self.OVERPASS_API_URLS:
+            try:
+                response = await client.post(overpass_url, data={'data': query}, timeout=timeout)
+                response.raise_for_status()
+                return response.json()
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Overpass request failed via {overpass_url}: {e}")
+        raise last_error or RuntimeError("No Overpass endpoint configured")
+
+    async def aprefetch_osm_features(
+        self,
+        points: List[Tuple[float, float]],
+        max_concurrency: int = 4,
+        tile_degrees: float = 0.1
+    ) -> Dict[Tuple[float, float], Dict[str, int]]:
+        """
+        Warm the OSM feature cache for many properties.
+
+        Points are grouped into tiles; each tile is fetched with one batched
+        Overpass query, and tiles are requested concurrently (bounded by
+        max_concurrency and the shared overpass token bucket).
+
+        Args:
+            points: (latitude, longitude) pairs
+            max_concurrency: Parallel Overpass requests
+            tile_degrees: Tile size used to group nearby properties
+
+        Returns:
+            Feature counts keyed by rounded (latitude, longitude)
+        """
+        pending = []
+        results: Dict[Tuple[float, float], Dict[str, int]] = {}
+        for point in dict.fromkeys(point_key(*p) for p in points):
+            hit, cached = _market_data_cache.get(
+                _market_data_cache.build_key('osm_features', {'lat': point[0], 'lon': point[1]})
+            )
+            if hit:
+                results[point] = cached
+            else:
+                pending.append(point)
+
+        if not pending:
+            return results
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch_tile(client: httpx.AsyncClient, tile: List[Tuple[float, float]]):
+            async with semaphore:
+                try:
+                    data = await self._apost_overpass(client, build_batched_query(tile))
+                except Exception as e:
+                    logger.warning(f"Overpass tile fetch failed for {len(tile)} properties: {e}")
+                    return {}
+                return count_features(data.get('elements', []), tile)
+
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            tiles = group_points(pending, tile_degrees=tile_degrees)
+            for tile_counts in await asyncio.gather(*(fetch_tile(client, tile) for tile in tiles)):
+                for point, features in tile_counts.items():
+                    _market_data_cache.set(
+                        _market_data_cache.build_key('osm_features', {'lat': point[0], 'lon': point[1]}),
+                        features,
+                        self.OSM_FEATURES_TTL_SECONDS
+                    )
+                    results[point] = features
+
+        logger.info(f"Prefetched OSM features for {len(pending)} locations in {len(tiles)} Overpass request(s)")
+        return results
 
     def _compute_drive_times(self, latitude: float, longitude: float) -> Dict[str, Any]:
         """
         Compute drive times using OSRM if configured. Returns sample if unavailable.
         """
         osrm_base = self.osrm_base_url
-        cache_key = f"drive:{round(latitude,4)}:{round(longitude,4)}"
-        if cache_key in _market_data_cache:
-            cached = _market_data_cache[cache_key]
-            if time.time() - cached['timestamp'] < 3600:
-                return cached['data']
+        cache_key = _market_data_cache.build_key(
+            'drive_times', {'lat': round(latitude, 4), 'lon': round(longitude, 4), 'osrm': osrm_base}
+        )
+        hit, cached = _market_data_cache.get(cache_key)
+        if hit:
+            return cached
         if not osrm_base:
             return {
                 'sample_drive_min': 15
@@ -1040,7 +1218,7 @@ class MarketDataService:
                 val = {
                     'sample_drive_min': round(duration_sec / 60, 1)
                 }
-                _market_data_cache[cache_key] = {'data': val, 'timestamp': time.time()}
+                _market_data_cache.set(cache_key, val, 3600)
                 return val
         except Exception as e:
             logger.warning(f"OSRM drive-time failed: {e}")
@@ -1053,11 +1231,12 @@ class MarketDataService:
         Compute simple isochrone polygons from OSRM if configured. Falls back to empty.
         """
         osrm_base = self.osrm_base_url
-        cache_key = f"iso:{round(latitude,4)}:{round(longitude,4)}"
-        if cache_key in _market_data_cache:
-            cached = _market_data_cache[cache_key]
-            if time.time() - cached['timestamp'] < 3600:
-                return cached['data']
+        cache_key = _market_data_cache.build_key(
+            'isochrones', {'lat': round(latitude, 4), 'lon': round(longitude, 4), 'osrm': osrm_base}
+        )
+        hit, cached = _market_data_cache.get(cache_key)
+        if hit:
+            return cached
         if not osrm_base:
             return []
         try:
@@ -1070,7 +1249,7 @@ class MarketDataService:
                 if res and res.get('features'):
                     poly = res['features'][0].get('geometry')
                     polys.append({'minutes': c, 'geometry': poly})
-            _market_data_cache[cache_key] = {'data': polys, 'timestamp': time.time()}
+            _market_data_cache.set(cache_key, polys, 3600)
             return polys
         except Exception as e:
             logger.warning(f"OSRM isochrone failed: {e}")
@@ -1091,50 +1270,14 @@ class MarketDataService:
         Returns:
             Transit access metrics
         """
-        try:
-            query = f"""
-            [out:json][timeout:15];
-            (
-              nwr["highway"="bus_stop"](around:805,{latitude},{longitude});
-              nwr["railway"="station"](around:1609,{latitude},{longitude});
-              nwr["railway"="subway_entrance"](around:1609,{latitude},{longitude});
-            );
-            out tags;
-            """
-
-            self._wait_for_rate_limit('overpass')
-            self._record_request('overpass')
-
-            last_error = None
-            for overpass_url in self.OVERPASS_API_URLS:
-                try:
-                    response = httpx.post(
-                        overpass_url,
-                        data={'data': query},
-                        timeout=20.0
-                    )
-                    response.raise_for_status()
-
-                    data = response.json()
-                    elements = data.get('elements', [])
-
-                    transit = {
-                        'bus_stops_0_5mi': len([e for e in elements if e.get('tags', {}).get('highway') == 'bus_stop']),
-                        'subway_stations_1mi': len([e for e in elements if e.get('tags', {}).get('railway') in ['station', 'subway_entrance']]),
-                        'commute_time_downtown_min': 30  # Placeholder - would calculate actual distance/time
-                    }
-
-                    return transit
-                except Exception as e:
-                    last_error = e
-                    logger.warning(f"Overpass transit request failed via {overpass_url}: {e}")
-
-            if last_error:
-                raise last_error
-
-        except Exception as e:
-            logger.warning(f"Error calculating transit access: {e}")
+        features = self._get_osm_features(latitude, longitude)
+        if features is None:
             return None
+        return {
+            'bus_stops_0_5mi': features.get('bus_stops_0_5mi', 0),
+            'subway_stations_1mi': features.get('subway_stations_1mi', 0),
+            'commute_time_downtown_min': 30  # Placeholder - would calculate actual distance/time
+        }
 
     def _calculate_walk_score(self, amenities: Dict[str, int]) -> int:
         """
@@ -1375,26 +1518,12 @@ class MarketDataService:
 
     def _fetch_green_space_osm(self, latitude: float, longitude: float) -> Dict[str, Any]:
         """Compute simple green space index using OSM parks within 1 mile."""
-        try:
-            parks_query = f"""
-            [out:json][timeout:20];
-            (
-              node["leisure"="park"](around:1609,{latitude},{longitude});
-              way["leisure"="park"](around:1609,{latitude},{longitude});
-              relation["leisure"="park"](around:1609,{latitude},{longitude});
-            );
-            out count;
-            """
-            overpass_url = "https://overpass-api.de/api/interpreter"
-            resp = requests.post(overpass_url, data={'data': parks_query}, timeout=20)
-            resp.raise_for_status()
-            data = resp.json()
-            parks = len(data.get('elements', []))
-            index = min(100, parks * 3)
-            return {'parks_1mi': parks, 'green_space_index': index}
-        except Exception as e:
-            logger.warning(f"Green space fetch failed: {e}")
+        features = self._get_osm_features(latitude, longitude)
+        if features is None:
+            logger.warning("Green space fetch failed")
             return {'parks_1mi': 0, 'green_space_index': 20}
+        parks = features.get('parks_1mi', 0)
+        return {'parks_1mi': parks, 'green_space_index': min(100, parks * 3)}
 
     def _assess_social_risk(
         self,
@@ -1445,25 +1574,9 @@ class MarketDataService:
         }
 
     def _fetch_schools_osm(self, latitude: float, longitude: float) -> int:
-        """Fetch count of schools within 2 miles using Overpass."""
-        try:
-            overpass_url = "https://overpass-api.de/api/interpreter"
-            query = f"""
-            [out:json][timeout:20];
-            (
-              node["amenity"="school"](around:3218,{latitude},{longitude});
-              way["amenity"="school"](around:3218,{latitude},{longitude});
-              relation["amenity"="school"](around:3218,{latitude},{longitude});
-            );
-            out count;
-            """
-            resp = requests.post(overpass_url, data={'data': query}, timeout=20)
-            resp.raise_for_status()
-            data = resp.json()
-            return len(data.get('elements', []))
-        except Exception as e:
-            logger.debug(f"School fetch failed: {e}")
-            return 0
+        """Count of schools within 2 miles from the batched Overpass features."""
+        features = self._get_osm_features(latitude, longitude)
+        return features.get('schools_2mi', 0) if features else 0
 
     def _assess_governance_risk(
         self,
@@ -2264,12 +2377,12 @@ class MarketDataService:
         """
         Fetch comparable POIs (retail/office/multifamily) around subject via Overpass.
         """
-        cache_key = f"comps:{round(latitude,4)}:{round(longitude,4)}"
-        if cache_key in _market_data_cache:
-            cached = _market_data_cache[cache_key]
-            age = time.time() - cached['timestamp']
-            if age < 3600:  # 1 hour cache
-                return cached['data']
+        cache_key = _market_data_cache.build_key(
+            'comparables_osm', {'lat': round(latitude, 4), 'lon': round(longitude, 4)}
+        )
+        hit, cached = _market_data_cache.get(cache_key)
+        if hit:  # 1 hour cache
+            return cached
 
         radius_m = 5000
         query = f"""
@@ -2284,8 +2397,10 @@ class MarketDataService:
         out tags center;
         """
 
-        self._wait_for_rate_limit('overpass')
-        self._record_request('overpass')
+        if not self._wait_for_rate_limit('overpass'):
+            # Not cached, so the next call retries once the bucket refills
+            raise RuntimeError("Overpass rate limit wait exceeded")
+
         last_error = None
         comps = []
         for overpass_url in self.OVERPASS_API_URLS:
@@ -2314,7 +2429,7 @@ class MarketDataService:
         if last_error and not comps:
             raise last_error
 
-        _market_data_cache[cache_key] = {'data': comps, 'timestamp': time.time()}
+        _market_data_cache.set(cache_key, comps, 3600)
         return comps
 
     def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -17,6 +17,12 @@ from app.models.account_code_synonym import AccountCodeSynonym
 from app.models.match_confidence_model import MatchConfidenceModel
 from app.models.forensic_match import ForensicMatch
 from app.models.reconciliation_learning_log import ReconciliationLearningLog
+from app.services.reference_data_cache import (
+    ACCOUNT_SYNONYMS,
+    MATCH_PATTERNS,
+    get_reference_data_cache,
+    mark_reference_data_changed,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -192,6 +198,7 @@ class MatchLearningService:
                 patterns.append(pattern)
                 self.db.add(pattern)
         
+        mark_reference_data_changed(self.db, MATCH_PATTERNS)
         self.db.commit()
         return patterns
     
@@ -257,6 +264,7 @@ class MatchLearningService:
                     synonyms.append(synonym)
                     self.db.add(synonym)
         
+        mark_reference_data_changed(self.db, ACCOUNT_SYNONYMS)
         self.db.commit()
         return synonyms
     
@@ -336,10 +344,12 @@ class MatchLearningService:
         source_document_type: Optional[str] = None,
         target_document_type: Optional[str] = None,
         min_success_rate: float = 70.0
-    ) -> List[LearnedMatchPattern]:
+    ) -> List[Any]:
         """
         Get learned patterns with filters
         
+        Served from the shared reference data cache (immutable pattern snapshots).
+        
         Args:
             source_document_type: Filter by source document type
             target_document_type: Filter by target document type
@@ -348,31 +358,24 @@ class MatchLearningService:
         Returns:
             List of learned patterns
         """
-        query = self.db.query(LearnedMatchPattern).filter(
-            and_(
-                LearnedMatchPattern.is_active == True,
-                LearnedMatchPattern.success_rate >= Decimal(str(min_success_rate))
-            )
-        )
-        
-        if source_document_type:
-            query = query.filter(LearnedMatchPattern.source_document_type == source_document_type)
-        if target_document_type:
-            query = query.filter(LearnedMatchPattern.target_document_type == target_document_type)
-        
-        return query.order_by(
-            LearnedMatchPattern.priority.desc(),
-            LearnedMatchPattern.success_rate.desc()
-        ).all()
+        min_rate = Decimal(str(min_success_rate))
+        return [
+            p for p in get_reference_data_cache().match_patterns(self.db).patterns
+            if p.success_rate is not None and p.success_rate >= min_rate
+            and (not source_document_type or p.source_document_type == source_document_type)
+            and (not target_document_type or p.target_document_type == target_document_type)
+        ]
     
     def get_synonyms(
         self,
         account_code: Optional[str] = None,
         account_name: Optional[str] = None
-    ) -> List[AccountCodeSynonym]:
+    ) -> List[Any]:
         """
         Get account code synonyms
         
+        Served from the shared reference data cache (immutable synonym snapshots).
+        
         Args:
             account_code: Filter by canonical account code
             account_name: Filter by synonym name
@@ -380,14 +383,9 @@ class MatchLearningService:
         Returns:
             List of synonyms
         """
-        query = self.db.query(AccountCodeSynonym).filter(
-            AccountCodeSynonym.is_active == True
-        )
-        
-        if account_code:
-            query = query.filter(AccountCodeSynonym.canonical_account_code == account_code)
+        snapshot = get_reference_data_cache().synonyms(self.db)
+        synonyms = snapshot.by_canonical_code.get(account_code, ()) if account_code else snapshot.synonyms
         if account_name:
-            query = query.filter(AccountCodeSynonym.synonym_name.ilike(f"%{account_name}%"))
-        
-        return query.order_by(AccountCodeSynonym.combined_confidence.desc()).all()
-
+            needle = account_name.lower()
+            synonyms = [s for s in synonyms if s.synonym_name and needle in s.synonym_name.lower()]
+        return list(synonyms)
@@ -3,7 +3,7 @@ Matching Engines for Forensic Reconciliation
 
 Implements four matching engines for cross-document financial data reconciliation:
 1. ExactMatchEngine - Exact account code and amount matching
-2. FuzzyMatchEngine - String similarity matching using rapidfuzz
+2. FuzzyMatchEngine - Blocked, vectorized string/amount similarity with global assignment
 3. CalculatedMatchEngine - Relationship-based matching (e.g., Net Income = Current Period Earnings)
 4. InferredMatchEngine - ML-based suggestions and historical pattern matching
 
@@ -16,6 +16,8 @@ from typing import Dict, List, Optional, Tuple, Any
 from decimal import Decimal
 from datetime import datetime
 
+import numpy as np
+
 try:
     from rapidfuzz import fuzz, process
     RAPIDFUZZ_AVAILABLE = True
@@ -30,6 +32,20 @@ except ImportError:
     NETWORKX_AVAILABLE = False
     logging.warning("networkx not available. Graph-based matching will be disabled.")
 
+from app.services.fuzzy_match_core import (
+    Candidate,
+    amount_array,
+    amount_blocks,
+    amount_similarity,
+    assign,
+    block_by_key,
+    code_prefix,
+    diff_percent,
+    get_amount,
+    max_diff_percent_for_similarity,
+    name_scores,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -204,147 +220,111 @@ class FuzzyMatchEngine:
         Returns:
             List of MatchResult objects with confidence scores
         """
-        matches = []
-        
-        # Build target index for efficient matching
-        target_account_names = {}
-        target_account_codes = {}
-        
-        for record in target_records:
-            record_id = record.get('id') or record.get('record_id')
-            account_name = record.get('account_name', '')
-            account_code = record.get('account_code', '')
-            
-            if account_name:
-                if account_name not in target_account_names:
-                    target_account_names[account_name] = []
-                target_account_names[account_name].append(record)
-            
-            if account_code:
-                if account_code not in target_account_codes:
-                    target_account_codes[account_code] = []
-                target_account_codes[account_code].append(record)
+        source_amounts = amount_array(source_records)
+        target_amounts = amount_array(target_records)
+        candidates = self._name_candidates(source_records, target_records, source_amounts, target_amounts)
+        
+        # Account code range matching (e.g., 2610-xxxx matches 2610-0000) for sources without a name match
+        named_sources = {c[0] for c in candidates}
+        candidates += self._code_range_candidates(
+            source_records, target_records, source_amounts, target_amounts, exclude=named_sources
+        )
         
-        # Match source records
-        for source_record in source_records:
-            source_id = source_record.get('id') or source_record.get('record_id')
-            source_account_name = source_record.get('account_name', '')
-            source_account_code = source_record.get('account_code', '')
+        # Solve the assignment globally so each target backs at most one fuzzy match
+        matches = []
+        for source_index, target_index, confidence, algorithm in assign(candidates):
+            source_record = source_records[source_index]
+            target_record = target_records[target_index]
             source_amount = self._get_amount(source_record)
+            target_amount = self._get_amount(target_record)
             
-            if not source_account_name and not source_account_code:
-                continue
-            
-            best_match = None
-            best_confidence = 0.0
+            amount_diff = None
+            amount_diff_percent = None
             
-            # Try account name matching
-            if source_account_name:
-                # Use rapidfuzz process.extractOne for best match
-                target_names_list = list(target_account_names.keys())
-                if target_names_list:
-                    result = process.extractOne(
-                        source_account_name,
-                        target_names_list,
-                        scorer=fuzz.WRatio,  # Weighted ratio for better accuracy
-                        score_cutoff=self.min_confidence
-                    )
-                    
-                    if result:
-                        matched_name, name_score, _ = result
-                        # Check amount similarity if available
-                        amount_score = 100.0
-                        if source_amount is not None:
-                            for target_record in target_account_names[matched_name]:
-                                target_amount = self._get_amount(target_record)
-                                if target_amount is not None:
-                                    # Calculate amount similarity (within 1% = 100, decreases linearly)
-                                    amount_diff = abs(source_amount - target_amount)
-                                    max_amount = max(abs(source_amount), abs(target_amount))
-                                    if max_amount > 0:
-                                        amount_diff_percent = float((amount_diff / max_amount) * 100)
-                                        if amount_diff_percent <= 1.0:
-                                            amount_score = 100.0 - (amount_diff_percent * 50)  # Penalize up to 50 points
-                                        else:
-                                            amount_score = max(0, 100.0 - (amount_diff_percent * 10))
-                                    
-                                    # Calculate combined confidence
-                                    combined_confidence = (
-                                        name_score * self.account_name_weight +
-                                        amount_score * (1 - self.account_name_weight)
-                                    )
-                                    
-                                    if combined_confidence > best_confidence and combined_confidence >= self.min_confidence:
-                                        best_confidence = combined_confidence
-                                        best_match = target_record
-                                        best_match['match_algorithm'] = 'fuzzy_string'
-                                        best_match['name_score'] = name_score
-                                        best_match['amount_score'] = amount_score
-            
-            # Try account code range matching (e.g., 2610-xxxx matches 2610-0000)
-            if source_account_code and not best_match:
-                code_prefix = source_account_code.split('-')[0] if '-' in source_account_code else source_account_code[:4]
-                
-                for code, records in target_account_codes.items():
-                    target_prefix = code.split('-')[0] if '-' in code else code[:4]
-                    
-                    if code_prefix == target_prefix:
-                        # Same account code range - check amounts
-                        for target_record in records:
-                            target_amount = self._get_amount(target_record)
-                            if source_amount is not None and target_amount is not None:
-                                amount_diff = abs(source_amount - target_amount)
-                                max_amount = max(abs(source_amount), abs(target_amount))
-                                
-                                if max_amount > 0:
-                                    amount_diff_percent = float((amount_diff / max_amount) * 100)
-                                    if amount_diff_percent <= 1.0:
-                                        # High confidence for same code range with similar amounts
-                                        confidence = 85.0 - (amount_diff_percent * 5)
-                                        
-                                        if confidence > best_confidence and confidence >= self.min_confidence:
-                                            best_confidence = confidence
-                                            best_match = target_record
-                                            best_match['match_algorithm'] = 'account_code_range'
+            if source_amount is not None and target_amount is not None:
+                amount_diff = abs(source_amount - target_amount)
+                max_amount = max(abs(source_amount), abs(target_amount))
+                if max_amount > 0:
+                    amount_diff_percent = float((amount_diff / max_amount) * 100)
             
-            # Create match result if found
-            if best_match and best_confidence >= self.min_confidence:
-                target_id = best_match.get('id') or best_match.get('record_id')
-                source_amount = self._get_amount(source_record)
-                target_amount = self._get_amount(best_match)
-                
-                amount_diff = None
-                amount_diff_percent = None
-                
-                if source_amount is not None and target_amount is not None:
-                    amount_diff = abs(source_amount - target_amount)
-                    max_amount = max(abs(source_amount), abs(target_amount))
-                    if max_amount > 0:
-                        amount_diff_percent = float((amount_diff / max_amount) * 100)
-                
-                matches.append(MatchResult(
-                    source_record_id=source_id,
-                    target_record_id=target_id,
-                    match_type='fuzzy',
-                    confidence_score=best_confidence,
-                    amount_difference=Decimal(str(amount_diff)) if amount_diff is not None else None,
-                    amount_difference_percent=amount_diff_percent,
-                    match_algorithm=best_match.get('match_algorithm', 'fuzzy_string'),
-                    relationship_type='equality'
-                ))
+            matches.append(MatchResult(
+                source_record_id=source_record.get('id') or source_record.get('record_id'),
+                target_record_id=target_record.get('id') or target_record.get('record_id'),
+                match_type='fuzzy',
+                confidence_score=confidence,
+                amount_difference=Decimal(str(amount_diff)) if amount_diff is not None else None,
+                amount_difference_percent=amount_diff_percent,
+                match_algorithm=algorithm,
+                relationship_type='equality'
+            ))
         
         logger.info(f"FuzzyMatchEngine found {len(matches)} fuzzy matches")
         return matches
     
+    def _name_candidates(
+        self,
+        source_records: List[Dict[str, Any]],
+        target_records: List[Dict[str, Any]],
+        source_amounts: np.ndarray,
+        target_amounts: np.ndarray
+    ) -> List[Candidate]:
+        """
+        Name + amount candidates: WRatio over distinct names (blocked by trigrams for
+        large sets), combined with amount similarity for every record pair behind
+        each scored name pair. Both amounts are required.
+        """
+        source_by_name = block_by_key(r.get('account_name') or None for r in source_records)
+        target_by_name = block_by_key(r.get('account_name') or None for r in target_records)
+        source_names = list(source_by_name)
+        target_names = list(target_by_name)
+        
+        candidates: List[Candidate] = []
+        scores = name_scores(source_names, target_names, self.min_confidence)
+        for (i, j), name_score in scores.items():
+            source_idx = source_by_name[source_names[i]]
+            target_idx = target_by_name[target_names[j]]
+            pct = diff_percent(source_amounts[source_idx][:, None], target_amounts[target_idx][None, :])
+            amount_score = np.where(pct <= 1.0, 100.0 - pct * 50, np.maximum(0.0, 100.0 - pct * 10))
+            combined = name_score * self.account_name_weight + amount_score * (1 - self.account_name_weight)
+            for a, b in zip(*np.nonzero(combined >= self.min_confidence)):
+                candidates.append((int(source_idx[a]), int(target_idx[b]), float(combined[a, b]), 'fuzzy_string'))
+        return candidates
+    
+    def _code_range_candidates(
+        self,
+        source_records: List[Dict[str, Any]],
+        target_records: List[Dict[str, Any]],
+        source_amounts: np.ndarray,
+        target_amounts: np.ndarray,
+        exclude: set
+    ) -> List[Candidate]:
+        """Same code range with amounts within 1%: confidence 85 minus 5 per percent of difference."""
+        target_by_prefix = block_by_key(
+            code_prefix(r['account_code']) if r.get('account_code') else None for r in target_records
+        )
+        source_by_prefix = block_by_key(
+            code_prefix(r['account_code']) if r.get('account_code') and i not in exclude else None
+            for i, r in enumerate(source_records)
+        )
+        
+        candidates: List[Candidate] = []
+        for prefix, source_idx in source_by_prefix.items():
+            target_idx = target_by_prefix.get(prefix)
+            if target_idx is None:
+                continue
+            source_block = source_amounts[source_idx][:, None]
+            target_block = target_amounts[target_idx][None, :]
+            pct = diff_percent(source_block, target_block)
+            nonzero = np.maximum(np.abs(source_block), np.abs(target_block)) > 0
+            confidence = 85.0 - pct * 5
+            eligible = nonzero & (pct <= 1.0) & (confidence >= self.min_confidence)
+            for a, b in zip(*np.nonzero(eligible)):
+                candidates.append((int(source_idx[a]), int(target_idx[b]), float(confidence[a, b]), 'account_code_range'))
+        return candidates
+    
     def _get_amount(self, record: Dict[str, Any]) -> Optional[Decimal]:
         """Extract amount from record"""
-        for field in ['amount', 'period_amount', 'ytd_amount', 'total_amount', 'value']:
-            if field in record and record[field] is not None:
-                try:
-                    return Decimal(str(record[field]))
-                except (ValueError, TypeError):
-                    continue
-        return None
+        return get_amount(record)
 
 
 class CalculatedMatchEngine:
@@ -455,7 +435,7 @@ class CalculatedMatchEngine:
                                         match_type='calculated',
                                         confidence_score=confidence,
                                         amount_difference=amount_diff,
-                                        amount_diff_percent=amount_diff_percent,
+                                        amount_difference_percent=amount_diff_percent,
                                         match_algorithm='calculated_relationship',
                                         relationship_type='equality',
                                         relationship_formula=relationship_formula
@@ -476,20 +456,20 @@ class CalculatedMatchEngine:
         return None
     
     def _find_by_pattern(self, records: List[Dict[str, Any]], pattern: str) -> List[Dict[str, Any]]:
-        """Find records matching a pattern"""
-        matches = []
-        
-        for record in records:
-            account_code = record.get('account_code', '')
-            
-            # Exact match
-            if account_code == pattern:
-                matches.append(record)
-            # Prefix match (e.g., "3995" matches "3995-0000")
-            elif pattern and account_code.startswith(pattern.split('-')[0]):
-                matches.append(record)
+        """
+        Find records matching a pattern: the exact code or its prefix before '-'
+        (e.g., "3995-0000" matches "3995-0000" and "3995-0100").
         
-        return matches
+        A single pass: find_matches looks up one pattern per record list, so an
+        account-code index would cost a full pass to build and save nothing.
+        """
+        if not pattern:
+            return []
+        prefix = pattern.split('-')[0]  # The exact code always starts with it
+        return [
+            record for record in records
+            if (record.get('account_code') or '').startswith(prefix)
+        ]
     
     def _get_amount(self, record: Dict[str, Any]) -> Optional[Decimal]:
         """Extract amount from record"""
@@ -543,44 +523,46 @@ class InferredMatchEngine:
             # Learn patterns from historical data
             patterns = self._learn_patterns(historical_matches)
             
+            targets_by_code = {}
+            for target_record in target_records:
+                targets_by_code.setdefault(target_record.get('account_code'), []).append(target_record)
+            
             # Apply patterns to current records
             for source_record in source_records:
                 source_account_code = source_record.get('account_code')
-                source_account_name = source_record.get('account_name', '')
                 
                 if source_account_code in patterns:
                     # Found historical pattern
                     pattern = patterns[source_account_code]
                     target_account_code = pattern.get('target_account_code')
                     
-                    # Find matching target record
-                    for target_record in target_records:
-                        if target_record.get('account_code') == target_account_code:
-                            source_amount = self._get_amount(source_record)
-                            target_amount = self._get_amount(target_record)
+                    # Find matching target records
+                    for target_record in targets_by_code.get(target_account_code, []):
+                        source_amount = self._get_amount(source_record)
+                        target_amount = self._get_amount(target_record)
+                        
+                        if source_amount is not None and target_amount is not None:
+                            # Calculate confidence based on historical accuracy
+                            historical_accuracy = pattern.get('accuracy', 0.7)
+                            amount_similarity = self._calculate_amount_similarity(source_amount, target_amount)
                             
-                            if source_amount is not None and target_amount is not None:
-                                # Calculate confidence based on historical accuracy
-                                historical_accuracy = pattern.get('accuracy', 0.7)
-                                amount_similarity = self._calculate_amount_similarity(source_amount, target_amount)
-                                
-                                confidence = float(historical_accuracy * 100 * amount_similarity)
+                            confidence = float(historical_accuracy * 100 * amount_similarity)
+                            
+                            if confidence >= self.min_confidence:
+                                amount_diff = abs(source_amount - target_amount)
+                                max_amount = max(abs(source_amount), abs(target_amount))
+                                amount_diff_percent = float((amount_diff / max_amount) * 100) if max_amount > 0 else 0.0
                                 
-                                if confidence >= self.min_confidence:
-                                    amount_diff = abs(source_amount - target_amount)
-                                    max_amount = max(abs(source_amount), abs(target_amount))
-                                    amount_diff_percent = float((amount_diff / max_amount) * 100) if max_amount > 0 else 0.0
-                                    
-                                    matches.append(MatchResult(
-                                        source_record_id=source_record.get('id') or source_record.get('record_id'),
-                                        target_record_id=target_record.get('id') or target_record.get('record_id'),
-                                        match_type='inferred',
-                                        confidence_score=confidence,
-                                        amount_difference=amount_diff,
-                                        amount_difference_percent=amount_diff_percent,
-                                        match_algorithm='historical_pattern',
-                                        relationship_type='inferred'
-                                    ))
+                                matches.append(MatchResult(
+                                    source_record_id=source_record.get('id') or source_record.get('record_id'),
+                                    target_record_id=target_record.get('id') or target_record.get('record_id'),
+                                    match_type='inferred',
+                                    confidence_score=confidence,
+                                    amount_difference=amount_diff,
+                                    amount_difference_percent=amount_diff_percent,
+                                    match_algorithm='historical_pattern',
+                                    relationship_type='inferred'
+                                ))
         
         # Fallback: Use context-aware matching
         if not matches:
@@ -620,62 +602,64 @@ class InferredMatchEngine:
         source_records: List[Dict[str, Any]],
         target_records: List[Dict[str, Any]]
     ) -> List[MatchResult]:
-        """Context-aware matching when no historical patterns available"""
+        """
+        Context-aware matching when no historical patterns available
+        
+        Best target per source by amount similarity (x70 with a matching account
+        category, x50 without). Only amounts close enough to reach min_confidence
+        can match, so targets are blocked into log-scale amount buckets and each
+        block is scored as one NumPy matrix; ties keep the first target.
+        """
         matches = []
+        max_pct = max_diff_percent_for_similarity(self.min_confidence / 70.0)
+        if max_pct is None:
+            return matches
+        
+        source_amounts = amount_array(source_records)
+        target_amounts = amount_array(target_records)
+        source_categories = np.array(
+            [self._extract_category(r.get('account_code', '')) for r in source_records], dtype=object
+        )
+        target_categories = np.array(
+            [self._extract_category(r.get('account_code', '')) for r in target_records], dtype=object
+        )
         
-        # Simple context matching: match by similar amounts and account categories
-        for source_record in source_records:
-            source_amount = self._get_amount(source_record)
-            source_category = self._extract_category(source_record.get('account_code', ''))
-            
-            if source_amount is None:
-                continue
-            
-            best_match = None
-            best_confidence = 0.0
+        # Small margin so float rounding never drops a pair at the tolerance boundary
+        for source_idx, target_idx in amount_blocks(source_amounts, target_amounts, min(max_pct + 0.5, 100.0)):
+            similarity = amount_similarity(
+                diff_percent(source_amounts[source_idx][:, None], target_amounts[target_idx][None, :])
+            )
+            source_cat = source_categories[source_idx][:, None]
+            target_cat = target_categories[target_idx][None, :]
+            category_match = (source_cat == target_cat) & (source_cat != None) & (target_cat != None)  # noqa: E711
+            confidence = similarity * np.where(category_match, 70.0, 50.0)
+            confidence = np.where((confidence >= self.min_confidence) & (confidence > 0), confidence, -np.inf)
             
-            for target_record in target_records:
-                target_amount = self._get_amount(target_record)
-                target_category = self._extract_category(target_record.get('account_code', ''))
-                
-                if target_amount is None:
+            best = np.argmax(confidence, axis=1)
+            for row, column in enumerate(best):
+                best_confidence = confidence[row, column]
+                if not np.isfinite(best_confidence):
                     continue
-                
-                # Check category match
-                category_match = (source_category == target_category) if source_category and target_category else False
-                
-                # Calculate amount similarity
-                amount_similarity = self._calculate_amount_similarity(source_amount, target_amount)
-                
-                # Combined confidence
-                if category_match:
-                    confidence = amount_similarity * 70.0  # Base confidence for category match
-                else:
-                    confidence = amount_similarity * 50.0  # Lower confidence without category match
-                
-                if confidence > best_confidence and confidence >= self.min_confidence:
-                    best_confidence = confidence
-                    best_match = target_record
-            
-            if best_match:
+                source_record = source_records[source_idx[row]]
+                best_match = target_records[target_idx[column]]
                 source_amount = self._get_amount(source_record)
                 target_amount = self._get_amount(best_match)
                 amount_diff = abs(source_amount - target_amount)
                 max_amount = max(abs(source_amount), abs(target_amount))
                 amount_diff_percent = float((amount_diff / max_amount) * 100) if max_amount > 0 else 0.0
                 
-                matches.append(MatchResult(
+                matches.append((source_idx[row], MatchResult(
                     source_record_id=source_record.get('id') or source_record.get('record_id'),
                     target_record_id=best_match.get('id') or best_match.get('record_id'),
                     match_type='inferred',
-                    confidence_score=best_confidence,
+                    confidence_score=float(best_confidence),
                     amount_difference=amount_diff,
                     amount_difference_percent=amount_diff_percent,
                     match_algorithm='context_aware',
                     relationship_type='inferred'
-                ))
+                )))
         
-        return matches
+        return [match for _, match in sorted(matches, key=lambda m: m[0])]
     
     def _extract_category(self, account_code: str) -> Optional[str]:
         """Extract account category from account code"""
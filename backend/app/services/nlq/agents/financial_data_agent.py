@@ -37,6 +37,20 @@ from app.services.nlq.temporal_processor import temporal_processor
 from app.config.nlq_config import nlq_config
 
 
+def load_chart_of_accounts(db: Session) -> Dict[str, Dict]:
+    """Chart of accounts keyed by account code"""
+    return {
+        record.account_code: {
+            "name": record.account_name,
+            "type": record.account_type,
+            "category": record.category,
+            "parent_code": record.parent_account_code,
+            "level": record.level
+        }
+        for record in db.query(ChartOfAccounts).all()
+    }
+
+
 class FinancialDataAgent:
     """
     Specialized agent for financial data queries with temporal awareness
@@ -50,19 +64,22 @@ class FinancialDataAgent:
     - Natural language response generation
     """
 
-    def __init__(self, db: Session, llm=None):
+    def __init__(self, db: Session, llm=None, chart_of_accounts: Optional[Dict[str, Dict]] = None):
         """
         Initialize financial data agent
 
         Args:
             db: Database session
             llm: Language model for natural language generation
+            chart_of_accounts: Already-loaded chart of accounts (read from db if None)
         """
         self.db = db
         self.llm = llm
 
         # Load chart of accounts for context
-        self.chart_of_accounts = self._load_chart_of_accounts()
+        if chart_of_accounts is None:
+            chart_of_accounts = self._load_chart_of_accounts()
+        self.chart_of_accounts = chart_of_accounts
 
         # Statement type mappings
         self.statement_models = {
@@ -75,17 +92,7 @@ class FinancialDataAgent:
 
     def _load_chart_of_accounts(self) -> Dict[str, Dict]:
         """Load chart of accounts mapping"""
-        coa_records = self.db.query(ChartOfAccounts).all()
-        return {
-            record.account_code: {
-                "name": record.account_name,
-                "type": record.account_type,
-                "category": record.category,
-                "parent_code": record.parent_account_code,
-                "level": record.level
-            }
-            for record in coa_records
-        }
+        return load_chart_of_accounts(self.db)
 
     async def process_query(
         self,
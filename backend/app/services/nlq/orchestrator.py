@@ -8,12 +8,18 @@ Manages:
 - Result synthesis
 - Conversation context
 """
-from typing import Dict, Any, List, Optional, TypedDict, Annotated
+from typing import Dict, Any, List, Optional, Set, Tuple, TypedDict, Annotated
 from datetime import datetime
+import asyncio
+import json
 import operator
+import re
+import time
 from sqlalchemy.orm import Session
 from loguru import logger
 
+from app.db.database import SessionLocal
+
 try:
     from langgraph.graph import StateGraph, END
     LANGGRAPH_AVAILABLE = True
@@ -21,7 +27,7 @@ except ImportError:
     logger.warning("LangGraph not available - orchestrator will use simplified routing")
     LANGGRAPH_AVAILABLE = False
 
-from app.services.nlq.agents.financial_data_agent import FinancialDataAgent
+from app.services.nlq.agents.financial_data_agent import FinancialDataAgent, load_chart_of_accounts
 from app.services.nlq.agents.formula_agent import FormulaAgent
 from app.services.nlq.agents.reconciliation_agent import ReconciliationAgent
 from app.services.nlq.agents.audit_agent import AuditAgent
@@ -38,6 +44,7 @@ class QueryState(TypedDict):
     intent: Dict[str, Any]
     subqueries: List[str]
     agent_results: Annotated[List[Dict], operator.add]
+    agent_timings: List[Dict]
     final_answer: Optional[str]
     confidence_score: float
     error: Optional[str]
@@ -56,22 +63,29 @@ class OrchestratorAgent:
     6. Return final answer
     """
 
-    def __init__(self, db: Session, llm=None):
-        """Initialize orchestrator"""
+    def __init__(self, db: Session, llm=None, session_factory=None):
+        """
+        Initialize orchestrator
+
+        session_factory opens the Session each fanned-out agent runs on
+        (SessionLocal by default); a Session is not shared across threads.
+        """
         self.db = db
         self.llm = llm
-
-        # Initialize available agents
-        self.agents = {
-            "financial_data": FinancialDataAgent(db, llm),
-            "formula": FormulaAgent(db, llm),
-            "reconciliation": ReconciliationAgent(db, llm),
-            "audit": AuditAgent(db, llm),
+        self.session_factory = session_factory or SessionLocal
+
+        # Available agents: factories for the fan-out, instances on self.db for simple routing
+        self.agent_factories = {
+            "financial_data": FinancialDataAgent,
+            "formula": FormulaAgent,
+            "reconciliation": ReconciliationAgent,
+            "audit": AuditAgent,
             # Add more agents as they're implemented
-            # "anomaly": AnomalyDetectionAgent(db, llm),
-            # "validation": ValidationAgent(db, llm),
-            # "alert": AlertAgent(db, llm),
+            # "anomaly": AnomalyDetectionAgent,
+            # "validation": ValidationAgent,
+            # "alert": AlertAgent,
         }
+        self.agents = {name: factory(db, llm) for name, factory in self.agent_factories.items()}
 
         # Build workflow
         if LANGGRAPH_AVAILABLE and nlq_config.ENABLE_MULTI_AGENT:
@@ -159,6 +173,7 @@ class OrchestratorAgent:
             intent={},
             subqueries=[],
             agent_results=[],
+            agent_timings=[],
             final_answer=None,
             confidence_score=0.0,
             error=None
@@ -175,7 +190,9 @@ class OrchestratorAgent:
                 "intent": final_state.get("intent"),
                 "temporal_info": final_state.get("temporal_info"),
                 "agents_used": [r.get("agent") for r in final_state.get("agent_results", [])],
-                "subqueries": final_state.get("subqueries", [])
+                "subqueries": final_state.get("subqueries", []),
+                "agent_timings": final_state.get("agent_timings", []),
+                "partial": any(r.get("timed_out") for r in final_state.get("agent_results", []))
             },
             "confidence_score": final_state.get("confidence_score", 0.0),
             "query": query
@@ -318,23 +335,140 @@ class OrchestratorAgent:
         return state
 
     async def _route_to_agents_node(self, state: QueryState) -> QueryState:
-        """Route query/subqueries to appropriate agents"""
+        """
+        Route query/subqueries to appropriate agents
+
+        Subqueries run concurrently (at most MAX_CONCURRENT_AGENTS at a time),
+        each bounded by AGENT_TIMEOUT_SECONDS. The agents query the database
+        synchronously, so each runs in a worker thread on its own Session.
+        Reference data they share (the chart of accounts) is read once per
+        request and handed to each of them.
+        Subqueries that are the same after temporal normalization run once.
+        An agent that misses its deadline yields a timed-out result, so the
+        others still answer.
+        """
         subqueries = state.get("subqueries") or [state["query"]]
-        agent_results = []
 
+        # Distinct (agent, normalized subquery) tasks, in first-seen order
+        tasks: Dict[Tuple[str, str], Dict[str, Any]] = {}
         for subquery in subqueries:
-            # Classify each subquery
             intent = self._classify_intent_simple(subquery)
             agent_name = intent.get("agent", "financial_data")
+            if agent_name not in self.agent_factories:
+                continue
+            key = (agent_name, self._normalize_subquery(subquery))
+            if key in tasks:
+                tasks[key]["duplicates"].append(subquery)
+            else:
+                tasks[key] = {"agent": agent_name, "subquery": subquery, "duplicates": []}
 
-            if agent_name in self.agents:
-                agent = self.agents[agent_name]
-                result = await agent.process_query(subquery, state["context"])
-                agent_results.append(result)
+        shared = await asyncio.to_thread(self._load_shared_agent_inputs, {t["agent"] for t in tasks.values()})
+        semaphore = asyncio.Semaphore(max(1, nlq_config.MAX_CONCURRENT_AGENTS))
+        outcomes = await asyncio.gather(*[
+            self._run_agent(task["agent"], task["subquery"], state["context"], semaphore, shared.get(task["agent"]))
+            for task in tasks.values()
+        ])
+
+        agent_results = []
+        agent_timings = []
+        for task, (result, timing) in zip(tasks.values(), outcomes):
+            agent_results.append(result)
+            agent_timings.append({**timing, "deduplicated": task["duplicates"]})
 
         state["agent_results"] = agent_results
+        state["agent_timings"] = agent_timings
         return state
 
+    async def _run_agent(
+        self,
+        agent_name: str,
+        subquery: str,
+        context: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+        shared: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Run one agent under the concurrency limit and its deadline; never raises
+
+        A timed-out agent's thread cannot be interrupted: it finishes in the
+        background and closes its Session, while its slot is freed at once.
+        """
+        timeout = nlq_config.AGENT_TIMEOUT_SECONDS
+        queued_at = time.perf_counter()
+        async with semaphore:
+            started_at = time.perf_counter()
+            status = "completed"
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.to_thread(self._run_agent_in_thread, agent_name, subquery, context, shared),
+                    timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Agent {agent_name} timed out after {timeout}s: {subquery}")
+                status = "timed_out"
+                result = {
+                    "success": False,
+                    "agent": agent_name,
+                    "timed_out": True,
+                    "answer": f"The {agent_name} agent did not answer \"{subquery}\" within {timeout} seconds.",
+                    "confidence_score": 0.0
+                }
+            except Exception as e:
+                logger.error(f"Agent {agent_name} failed: {e}", exc_info=True)
+                status = "failed"
+                result = {
+                    "success": False,
+                    "agent": agent_name,
+                    "error": str(e),
+                    "answer": f"The {agent_name} agent failed: {str(e)}",
+                    "confidence_score": 0.0
+                }
+            finished_at = time.perf_counter()
+
+        timing = {
+            "agent": agent_name,
+            "subquery": subquery,
+            "status": status,
+            "queued_ms": round((started_at - queued_at) * 1000, 1),
+            "duration_ms": round((finished_at - started_at) * 1000, 1)
+        }
+        return result, timing
+
+    def _run_agent_in_thread(
+        self,
+        agent_name: str,
+        subquery: str,
+        context: Dict[str, Any],
+        shared: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Answer one subquery with a fresh agent on its own Session (runs in a worker thread)"""
+        db = self.session_factory()
+        try:
+            agent = self.agent_factories[agent_name](db, self.llm, **(shared or {}))
+            return asyncio.run(agent.process_query(subquery, context))
+        finally:
+            db.close()
+
+    def _load_shared_agent_inputs(self, agent_names: Set[str]) -> Dict[str, Dict[str, Any]]:
+        """Per-agent constructor arguments read once for the whole request (runs in a worker thread)"""
+        if "financial_data" not in agent_names:
+            return {}
+        db = self.session_factory()
+        try:
+            return {"financial_data": {"chart_of_accounts": load_chart_of_accounts(db)}}
+        finally:
+            db.close()
+
+    def _normalize_subquery(self, subquery: str) -> str:
+        """Dedup key: lower-cased words with the temporal expression resolved to its filters"""
+        temporal_info = temporal_processor.extract_temporal_info(subquery)
+        text = subquery.lower()
+        if temporal_info.get("has_temporal") and temporal_info.get("original_expression"):
+            text = text.replace(temporal_info["original_expression"].lower(), " ")
+        words = " ".join(re.findall(r"[a-z0-9&]+", text))
+        filters = json.dumps(temporal_info.get("filters") or {}, sort_keys=True, default=str)
+        return f"{words}|{filters}"
+
     def _synthesize_node(self, state: QueryState) -> QueryState:
         """Synthesize results from multiple agents"""
         agent_results = state.get("agent_results", [])
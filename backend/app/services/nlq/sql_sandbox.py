@@ -0,0 +1,251 @@
+"""
+Execution Sandbox for Generated NLQ SQL
+
+Generated SQL is never run as written. It is:
+
+1. parsed into an AST (sqlglot, Postgres dialect); exactly one SELECT (or set
+   operation), no DML/DDL anywhere, no SELECT INTO or row locks
+2. checked against allow-lists of tables and functions; joins must have a
+   join condition (no cross joins / comma joins); CTEs may not reuse a
+   table name
+3. organization-scoped: every table reference is replaced by a subquery
+   filtered to the caller's organization, so scoping can't be forgotten or
+   bypassed by the generated text
+4. capped with a LIMIT of SQL_MAX_ROWS
+5. gated on EXPLAIN total cost (SQL_MAX_PLAN_COST)
+6. run in a READ ONLY transaction with a statement_timeout
+7. cached by normalized SQL, parameters and data version
+"""
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.config.nlq_config import nlq_config
+from app.core.redis_client import cache_get, cache_set, get_data_version
+
+DIALECT = "postgres"
+
+# Queryable tables and the column that scopes them to an organization
+ORGANIZATION_COLUMN = "organization_id"
+PROPERTY_COLUMN = "property_id"
+ALLOWED_TABLES = {
+    "properties": ORGANIZATION_COLUMN,
+    "anomaly_detections": ORGANIZATION_COLUMN,
+    "financial_periods": PROPERTY_COLUMN,
+    "financial_metrics": PROPERTY_COLUMN,
+    "balance_sheet_data": PROPERTY_COLUMN,
+    "income_statement_data": PROPERTY_COLUMN,
+    "income_statement_headers": PROPERTY_COLUMN,
+    "cash_flow_data": PROPERTY_COLUMN,
+    "cash_flow_headers": PROPERTY_COLUMN,
+    "rent_roll_data": PROPERTY_COLUMN,
+    "mortgage_statement_data": PROPERTY_COLUMN,
+    "document_uploads": PROPERTY_COLUMN,
+    "committee_alerts": PROPERTY_COLUMN,
+}
+
+# sqlglot expression classes of the SQL functions generated queries may call
+ALLOWED_FUNCTIONS = {
+    # Aggregates
+    "Sum", "Avg", "Min", "Max", "Count", "Stddev", "StddevSamp", "StddevPop", "Variance",
+    "ArrayAgg", "GroupConcat", "PercentileCont", "PercentileDisc",
+    # Window functions
+    "RowNumber", "Rank", "DenseRank", "Lag", "Lead", "FirstValue", "LastValue",
+    # Scalar
+    "Abs", "Round", "Floor", "Ceil", "Coalesce", "Nullif", "Greatest", "Least", "Cast", "TryCast",
+    "Case", "If", "Upper", "Lower", "Length", "Trim", "Concat", "Substring",
+    "Extract", "DateTrunc", "TimestampTrunc", "CurrentDate", "CurrentTimestamp", "DateAdd", "DateSub",
+}
+
+# Statements (or nested clauses) that never belong in a read-only question
+FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.Command, exp.Into, exp.Lock, exp.Transaction, exp.Commit, exp.Rollback,
+)
+
+
+class SQLSandboxError(ValueError):
+    """Generated SQL rejected by the sandbox."""
+
+
+@dataclass
+class SandboxedQuery:
+    sql: str  # Scoped, limited SQL that will run
+    normalized: str  # Canonical form used in cache keys
+    tables: List[str] = field(default_factory=list)
+
+
+def parse_select(sql: str) -> exp.Expression:
+    """Parse a single read-only SELECT and check it against the allow-lists."""
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=DIALECT) if s is not None]
+    except ParseError as e:
+        raise SQLSandboxError(f"Unparseable SQL: {e}") from e
+    if len(statements) != 1:
+        raise SQLSandboxError("Exactly one statement is allowed")
+    ast = statements[0]
+    if not isinstance(ast, (exp.Select, exp.SetOperation)):
+        raise SQLSandboxError("Only SELECT queries are allowed")
+
+    forbidden = next(ast.find_all(*FORBIDDEN_NODES), None)
+    if forbidden is not None:
+        raise SQLSandboxError(f"Forbidden clause: {forbidden.key.upper()}")
+
+    for func in ast.find_all(exp.Func):
+        if type(func).__name__ not in ALLOWED_FUNCTIONS:
+            name = func.name if isinstance(func, exp.Anonymous) else func.sql_name()
+            raise SQLSandboxError(f"Function not allowed: {name}")
+
+    for join in ast.find_all(exp.Join):
+        if (join.args.get("kind") or "").upper() == "CROSS" or not (join.args.get("on") or join.args.get("using")):
+            raise SQLSandboxError("Joins must have a join condition")
+
+    cte_names = {cte.alias_or_name.lower() for cte in ast.find_all(exp.CTE)}
+    shadowing = sorted(cte_names & set(ALLOWED_TABLES))
+    if shadowing:
+        # A CTE named like a table would be skipped by scoping while its body reads the real table
+        raise SQLSandboxError(f"CTE name shadows a table: {', '.join(shadowing)}")
+    for table in ast.find_all(exp.Table):
+        name = table.name.lower()
+        if not table.db and name in cte_names:
+            continue
+        if table.catalog or (table.db and table.db.lower() != "public") or name not in ALLOWED_TABLES:
+            raise SQLSandboxError(f"Table not allowed: {table.sql(dialect=DIALECT)}")
+    if not any(True for _ in ast.find_all(exp.Table)):
+        raise SQLSandboxError("Missing FROM clause")
+    return ast
+
+
+def validate_sql(sql: str) -> Tuple[bool, str]:
+    """(is_valid, message) for generated SQL, without executing it."""
+    try:
+        parse_select(sql)
+    except SQLSandboxError as e:
+        return False, str(e)
+    return True, "Valid"
+
+
+def _scoped_table(name: str, organization_id: int) -> exp.Select:
+    column = ALLOWED_TABLES[name]
+    if column == ORGANIZATION_COLUMN:
+        condition = f"{ORGANIZATION_COLUMN} = {int(organization_id)}"
+    else:
+        condition = f"{PROPERTY_COLUMN} IN (SELECT id FROM properties WHERE {ORGANIZATION_COLUMN} = {int(organization_id)})"
+    return sqlglot.parse_one(f"SELECT * FROM {name} WHERE {condition}", read=DIALECT)
+
+
+class NLQSqlSandbox:
+    """Validates, scopes and runs generated SQL for one organization."""
+
+    def __init__(
+        self,
+        db: Session,
+        organization_id: int,
+        max_rows: Optional[int] = None,
+        timeout_seconds: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        cache_ttl: Optional[int] = None
+    ):
+        if organization_id is None:
+            raise SQLSandboxError("An organization is required to run generated SQL")
+        self.db = db
+        self.organization_id = int(organization_id)
+        self.max_rows = max_rows or nlq_config.SQL_MAX_ROWS
+        self.timeout_seconds = timeout_seconds or nlq_config.SQL_TIMEOUT_SECONDS
+        self.max_cost = max_cost or nlq_config.SQL_MAX_PLAN_COST
+        self.cache_ttl = nlq_config.SQL_CACHE_TTL_SECONDS if cache_ttl is None else cache_ttl
+
+    def prepare(self, sql: str) -> SandboxedQuery:
+        """Parse, check, organization-scope and limit generated SQL."""
+        ast = parse_select(sql)
+
+        tables = []
+        cte_names = {cte.alias_or_name.lower() for cte in ast.find_all(exp.CTE)}
+        for table in list(ast.find_all(exp.Table)):
+            name = table.name.lower()
+            if not table.db and name in cte_names:
+                continue
+            tables.append(name)
+            alias = table.alias or table.name
+            table.replace(exp.Subquery(
+                this=_scoped_table(name, self.organization_id),
+                alias=exp.TableAlias(this=exp.to_identifier(alias))
+            ))
+
+        limit = ast.args.get("limit")
+        current = limit.expression if isinstance(limit, exp.Limit) else None
+        if not (isinstance(current, exp.Literal) and current.is_int and int(current.this) <= self.max_rows):
+            ast.set("limit", exp.Limit(expression=exp.Literal.number(self.max_rows)))
+
+        return SandboxedQuery(
+            sql=ast.sql(dialect=DIALECT),
+            normalized=ast.sql(dialect=DIALECT, normalize=True),
+            tables=sorted(set(tables))
+        )
+
+    def execute(self, sql: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run generated SQL inside the sandbox.
+
+        Returns:
+            Dict with rows (list of dicts), columns, row_count, plan_cost, cached, sql
+
+        Raises:
+            SQLSandboxError: rejected SQL or a plan over the cost limit
+        """
+        params = params or {}
+        query = self.prepare(sql)
+        cache_key = self._cache_key(query, params)
+        cached = cache_get(cache_key) if self.cache_ttl else None
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        bind = self.db.get_bind()
+        is_postgres = bind.dialect.name == "postgresql"
+        with bind.connect() as conn:
+            with conn.begin() as transaction:
+                plan_cost = None
+                if is_postgres:
+                    conn.execute(text("SET TRANSACTION READ ONLY"))
+                    conn.execute(text(f"SET LOCAL statement_timeout = {int(self.timeout_seconds * 1000)}"))
+                    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query.sql}"), params).scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    plan_cost = float(plan[0]["Plan"]["Total Cost"])
+                    if plan_cost > self.max_cost:
+                        logger.warning(f"NLQ SQL rejected: plan cost {plan_cost:.0f} > {self.max_cost:.0f}")
+                        raise SQLSandboxError(
+                            f"Query too expensive (estimated cost {plan_cost:.0f}, limit {self.max_cost:.0f})"
+                        )
+                result = conn.execute(text(query.sql), params)
+                columns = list(result.keys())
+                rows = [dict(row._mapping) for row in result.fetchmany(self.max_rows)]
+                transaction.rollback()
+
+        payload = {
+            "rows": rows,
+            "columns": columns,
+            "row_count": len(rows),
+            "plan_cost": plan_cost,
+            "sql": query.sql,
+        }
+        if self.cache_ttl:
+            cache_set(cache_key, payload, ttl=self.cache_ttl)
+        logger.info(f"NLQ SQL returned {len(rows)} rows from {', '.join(query.tables)}")
+        return {**payload, "cached": False}
+
+    def _cache_key(self, query: SandboxedQuery, params: Dict[str, Any]) -> str:
+        material = json.dumps(
+            {"sql": query.normalized, "params": params, "version": get_data_version()},
+            sort_keys=True,
+            default=str
+        )
+        return f"nlq:sql:{hashlib.sha256(material.encode('utf-8')).hexdigest()}"
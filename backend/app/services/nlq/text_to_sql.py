@@ -34,6 +34,7 @@ except ImportError:
 from app.config.nlq_config import nlq_config
 from app.services.nlq.temporal_processor import temporal_processor
 from app.services.nlq.schema_generator import get_schema_generator
+from app.services.nlq.sql_sandbox import NLQSqlSandbox, validate_sql
 
 
 class VannaTextToSQL:
@@ -312,25 +313,32 @@ class VannaTextToSQL:
         return enhanced
 
     def _validate_sql(self, sql: str) -> Tuple[bool, str]:
-        """Validate generated SQL"""
-        # Basic validation
-        sql_lower = sql.lower()
+        """Validate generated SQL (parsed, allow-listed; see sql_sandbox)"""
+        return validate_sql(sql)
 
-        # Check for dangerous operations
-        dangerous_keywords = ['drop', 'delete', 'truncate', 'alter', 'create']
-        for keyword in dangerous_keywords:
-            if keyword in sql_lower:
-                return False, f"Dangerous keyword found: {keyword}"
+    def execute_sql(
+        self,
+        db: Session,
+        sql: str,
+        organization_id: int,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run generated SQL in the read-only, organization-scoped sandbox
 
-        # Must be a SELECT query
-        if not sql_lower.strip().startswith('select'):
-            return False, "Only SELECT queries are allowed"
+        Args:
+            db: Database session
+            sql: Generated SQL
+            organization_id: Organization the rows must belong to
+            params: Bind parameters (e.g. from the fallback templates)
 
-        # Must have FROM clause
-        if 'from' not in sql_lower:
-            return False, "Missing FROM clause"
+        Returns:
+            Dict with rows, columns, row_count, plan_cost, cached, sql
 
-        return True, "Valid"
+        Raises:
+            SQLSandboxError: SQL rejected or too expensive to run
+        """
+        return NLQSqlSandbox(db, organization_id).execute(sql, params)
 
     async def _fallback_sql_generation(
         self,
@@ -0,0 +1,134 @@
+"""
+Batched Overpass Queries
+
+Builds a single Overpass QL request covering every OSM category used by
+market intelligence (amenities, transit, schools, green space) for a group of
+nearby properties, then counts features per property and category locally.
+
+Nearby properties are grouped into small areas so one request serves every
+property in the group instead of four separate "around" queries per property.
+"""
+import math
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+Point = Tuple[float, float]
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+# category -> (tag filters matched with OR, search radius in meters)
+OSM_CATEGORIES: "OrderedDict[str, Tuple[List[Tuple[str, str]], int]]" = OrderedDict([
+    ('grocery_stores_1mi', ([('shop', 'supermarket')], 1609)),
+    ('restaurants_1mi', ([('amenity', 'restaurant')], 1609)),
+    ('schools_2mi', ([('amenity', 'school')], 3218)),
+    ('hospitals_5mi', ([('amenity', 'hospital')], 8047)),
+    ('parks_1mi', ([('leisure', 'park')], 1609)),
+    ('bus_stops_0_5mi', ([('highway', 'bus_stop')], 805)),
+    ('subway_stations_1mi', ([('railway', 'station'), ('railway', 'subway_entrance')], 1609)),
+])
+
+AMENITY_KEYS = ['grocery_stores_1mi', 'restaurants_1mi', 'schools_2mi', 'hospitals_5mi', 'parks_1mi']
+
+
+def point_key(latitude: float, longitude: float) -> Point:
+    """Canonical (rounded) coordinates used to key per-property results."""
+    return (round(float(latitude), 4), round(float(longitude), 4))
+
+
+def bounding_box(points: Sequence[Point], margin_m: float) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) covering all points plus margin_m on every side."""
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    dlat = margin_m / METERS_PER_DEGREE_LAT
+    max_abs_lat = min(89.0, max(abs(lat) for lat in lats) + dlat)
+    dlon = margin_m / (METERS_PER_DEGREE_LAT * math.cos(math.radians(max_abs_lat)))
+    return (
+        round(min(lats) - dlat, 6),
+        round(min(lons) - dlon, 6),
+        round(max(lats) + dlat, 6),
+        round(max(lons) + dlon, 6),
+    )
+
+
+def group_points(points: Sequence[Point], tile_degrees: float = 0.1) -> List[List[Point]]:
+    """
+    Greedily group points so each group spans at most tile_degrees in latitude
+    and longitude; each group becomes one Overpass request.
+    """
+    groups: List[List[Point]] = []
+    extents: List[List[float]] = []  # [min_lat, min_lon, max_lat, max_lon] per group
+    for lat, lon in sorted(dict.fromkeys(point_key(*p) for p in points)):
+        for group, ext in zip(groups, extents):
+            if (max(ext[2], lat) - min(ext[0], lat) <= tile_degrees
+                    and max(ext[3], lon) - min(ext[1], lon) <= tile_degrees):
+                group.append((lat, lon))
+                ext[:] = [min(ext[0], lat), min(ext[1], lon), max(ext[2], lat), max(ext[3], lon)]
+                break
+        else:
+            groups.append([(lat, lon)])
+            extents.append([lat, lon, lat, lon])
+    return groups
+
+
+def build_batched_query(points: Sequence[Point], timeout: int = 60) -> str:
+    """One Overpass QL query returning every category around all given points."""
+    statements = []
+    for filters, radius in OSM_CATEGORIES.values():
+        s, w, n, e = bounding_box(points, radius)
+        for key, value in filters:
+            statements.append(f'  nwr["{key}"="{value}"]({s},{w},{n},{e});')
+    body = "\n".join(statements)
+    return f"[out:json][timeout:{timeout}];\n(\n{body}\n);\nout tags center;"
+
+
+def _element_coords(elements: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+    lats, lons, tags = [], [], []
+    for element in elements:
+        lat = element.get('lat')
+        lon = element.get('lon')
+        if lat is None or lon is None:
+            center = element.get('center') or {}
+            lat, lon = center.get('lat'), center.get('lon')
+        if lat is None or lon is None:
+            continue
+        lats.append(float(lat))
+        lons.append(float(lon))
+        tags.append(element.get('tags') or {})
+    return np.asarray(lats, dtype=float), np.asarray(lons, dtype=float), tags
+
+
+def count_features(elements: List[Dict[str, Any]], points: Sequence[Point]) -> Dict[Point, Dict[str, int]]:
+    """
+    Count elements per category within each category's radius of each point.
+
+    Distances are computed as one (points x elements) haversine matrix.
+    """
+    keys = [point_key(*p) for p in points]
+    empty = {key: {category: 0 for category in OSM_CATEGORIES} for key in keys}
+    el_lat, el_lon, el_tags = _element_coords(elements)
+    if not keys or el_lat.size == 0:
+        return empty
+
+    p_lat = np.radians(np.asarray([k[0] for k in keys], dtype=float))[:, None]
+    p_lon = np.radians(np.asarray([k[1] for k in keys], dtype=float))[:, None]
+    e_lat = np.radians(el_lat)[None, :]
+    e_lon = np.radians(el_lon)[None, :]
+    a = np.sin((e_lat - p_lat) / 2) ** 2 + np.cos(p_lat) * np.cos(e_lat) * np.sin((e_lon - p_lon) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    counts = {}
+    for category, (filters, radius) in OSM_CATEGORIES.items():
+        matches = np.fromiter(
+            (any(t.get(k) == v for k, v in filters) for t in el_tags),
+            dtype=bool,
+            count=len(el_tags),
+        )
+        counts[category] = ((distances <= radius) & matches[None, :]).sum(axis=1)
+
+    return {
+        key: {category: int(counts[category][i]) for category in OSM_CATEGORIES}
+        for i, key in enumerate(keys)
+    }
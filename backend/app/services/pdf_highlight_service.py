@@ -0,0 +1,121 @@
+"""
+PDF Highlight Service
+
+Highlights for the PDF viewer come in two forms:
+
+- an overlay payload (page, bbox and the circle to draw) that viewers able to
+  draw over the rendered page use directly, so the PDF itself is untouched
+- an annotated copy of the PDF for iframe viewers, generated once per
+  (upload, source version, bbox) and stored next to the source object, so
+  later requests stream it with range support instead of re-annotating;
+  the copies are a cache and are deleted with their upload
+"""
+import hashlib
+import io
+import logging
+import posixpath
+from typing import Dict, Optional
+
+from app.db.minio_client import delete_file, download_file, get_file_info, list_files, upload_file
+
+logger = logging.getLogger(__name__)
+
+# Padding (points) around the highlighted bbox and the circle's stroke
+CIRCLE_PADDING = 5.0
+CIRCLE_BORDER_WIDTH = 3.0
+CIRCLE_COLOR = (1, 0, 0)  # Red (RGB)
+
+ANNOTATED_PREFIX = "annotated"
+
+
+def highlight_overlay(page: int, x0: float, y0: float, x1: float, y1: float) -> Dict:
+    """Overlay payload for a bbox: the same circle the annotated PDF gets."""
+    center_x = (x0 + x1) / 2
+    center_y = (y0 + y1) / 2
+    radius = max((x1 - x0) / 2, (y1 - y0) / 2) + CIRCLE_PADDING
+    return {
+        "page": page,
+        "bbox": {"x0": x0, "y0": y0, "x1": x1, "y1": y1},
+        "shape": "circle",
+        "center": {"x": center_x, "y": center_y},
+        "radius": radius,
+        "rect": {
+            "x0": center_x - radius,
+            "y0": center_y - radius,
+            "x1": center_x + radius,
+            "y1": center_y + radius,
+        },
+        "stroke_color": list(CIRCLE_COLOR),
+        "stroke_width": CIRCLE_BORDER_WIDTH,
+    }
+
+
+def annotated_prefix(file_path: str, upload_id: int) -> str:
+    """Object name prefix shared by every annotated copy of an upload."""
+    return posixpath.join(posixpath.dirname(file_path), ANNOTATED_PREFIX, f"{upload_id}-")
+
+
+def annotated_object_name(file_path: str, upload_id: int, source_etag: str, overlay: Dict) -> str:
+    """
+    Object name of the annotated copy. Keyed by the source ETag too, so a
+    replaced source never serves a stale annotation.
+    """
+    bbox = overlay["bbox"]
+    key = f"{source_etag}:{overlay['page']}:{bbox['x0']:.2f}:{bbox['y0']:.2f}:{bbox['x1']:.2f}:{bbox['y1']:.2f}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f"{annotated_prefix(file_path, upload_id)}{digest}.pdf"
+
+
+def delete_annotated_variants(file_path: Optional[str], upload_id: int) -> int:
+    """Delete every annotated copy of an upload; returns how many were removed."""
+    if not file_path:
+        return 0
+    deleted = sum(delete_file(name) for name in list_files(prefix=annotated_prefix(file_path, upload_id)))
+    if deleted:
+        logger.info(f"Deleted {deleted} annotated copies of upload {upload_id}")
+    return deleted
+
+
+def annotate_pdf(pdf_data: bytes, overlay: Dict) -> Optional[bytes]:
+    """Embed the overlay circle in the PDF; None if the page doesn't exist."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(stream=io.BytesIO(pdf_data), filetype="pdf")
+    try:
+        page_idx = overlay["page"] - 1
+        if not 0 <= page_idx < len(doc):
+            return None
+        rect = overlay["rect"]
+        annot = doc[page_idx].add_circle_annot(fitz.Rect(rect["x0"], rect["y0"], rect["x1"], rect["y1"]))
+        annot.set_border(width=overlay["stroke_width"])
+        annot.set_colors(stroke=tuple(overlay["stroke_color"]))
+        annot.update()
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+def get_annotated_variant(file_path: str, upload_id: int, source_etag: str, overlay: Dict) -> Optional[str]:
+    """
+    Object name of the annotated copy, creating it on first use.
+
+    Returns None when the copy can't be produced (page out of range, PyMuPDF
+    failure, storage error); callers then serve the original PDF.
+    """
+    object_name = annotated_object_name(file_path, upload_id, source_etag, overlay)
+    if get_file_info(object_name):
+        return object_name
+
+    pdf_data = download_file(file_path)
+    if not pdf_data:
+        return None
+    try:
+        annotated = annotate_pdf(pdf_data, overlay)
+    except Exception as e:
+        logger.warning(f"Could not annotate upload {upload_id}: {e}")
+        return None
+    if annotated is None or not upload_file(annotated, object_name, content_type="application/pdf"):
+        return None
+
+    logger.info(f"Stored annotated copy of upload {upload_id} for page {overlay['page']} as {object_name}")
+    return object_name
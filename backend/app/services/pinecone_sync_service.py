@@ -5,10 +5,12 @@ Handles synchronization between PostgreSQL document_chunks and Pinecone vector d
 Maintains dual storage for redundancy and enables migration from PostgreSQL-only to hybrid.
 """
 import logging
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, update
 
+from app.models.anomaly_threshold import SystemConfig
 from app.models.document_chunk import DocumentChunk
 from app.models.document_upload import DocumentUpload
 from app.services.pinecone_service import PineconeService
@@ -16,6 +18,11 @@ from app.services.embedding_service import EmbeddingService
 
 logger = logging.getLogger(__name__)
 
+# system_config key holding the time of the last complete reconciliation
+RECONCILE_WATERMARK_KEY = "pinecone_reconcile_watermark"
+# Vector ids per Pinecone fetch
+RECONCILE_FETCH_BATCH_SIZE = 100
+
 
 class PineconeSyncService:
     """
@@ -151,20 +158,23 @@ class PineconeSyncService:
                     "error": f"No chunks found for document {document_id}"
                 }
             
-            # Filter chunks that need embedding
-            chunks_to_sync = []
-            for chunk in chunks:
-                if not chunk.embedding:
-                    if force_reembed:
-                        # Generate embedding
-                        self.embedding_service.embed_chunk(
-                            chunk_id=chunk.id,
-                            force_reembed=True
-                        )
-                        self.db.refresh(chunk)
-                    else:
-                        continue  # Skip chunks without embeddings
-                chunks_to_sync.append(chunk)
+            # Embed chunks that lack an embedding in one batch
+            missing = [chunk for chunk in chunks if not chunk.embedding]
+            if missing and force_reembed:
+                embeddings = self.embedding_service.generate_embeddings_batch(
+                    [chunk.chunk_text for chunk in missing]
+                )
+                model = (
+                    self.embedding_service.OPENAI_MODEL if self.embedding_service.embedding_method == 'openai'
+                    else self.embedding_service.SENTENCE_TRANSFORMER_MODEL
+                )
+                for chunk, embedding in zip(missing, embeddings):
+                    if embedding:
+                        chunk.embedding = embedding
+                        chunk.embedding_model = model
+                        chunk.embedding_dimension = len(embedding)
+                self.db.commit()
+            chunks_to_sync = [chunk for chunk in chunks if chunk.embedding]
             
             if not chunks_to_sync:
                 return {
@@ -182,6 +192,8 @@ class PineconeSyncService:
             )
             
             if result.get("success"):
+                self._mark_synced([chunk.id for chunk in chunks_to_sync])
+                self.db.commit()
                 logger.info(f"Synced {len(chunks_to_sync)} chunks for document {document_id} to Pinecone")
                 return {
                     "success": True,
@@ -414,24 +426,34 @@ class PineconeSyncService:
     def reconcile_sync(
         self,
         document_id: Optional[int] = None,
-        property_id: Optional[int] = None
+        property_id: Optional[int] = None,
+        full: bool = False
     ) -> Dict[str, Any]:
         """
         Reconcile sync status between PostgreSQL and Pinecone
         
-        Identifies chunks that are in PostgreSQL but not in Pinecone,
-        and optionally syncs them.
+        Identifies chunks that are in PostgreSQL but not in Pinecone. Only chunks
+        created or changed since the last complete run (the watermark), or not
+        known to be synced, are compared; vectors are fetched in batches.
+        Missing chunks are marked unsynced, so they are compared again on every
+        run until they are synced.
         
         Args:
             document_id: Filter by document ID (optional)
             property_id: Filter by property ID (optional)
+            full: Compare every chunk regardless of the watermark
         
         Returns:
             Dict with reconciliation report
         """
         try:
+            from app.config.pinecone_config import pinecone_config
+            
+            started_at = datetime.now(timezone.utc)
+            watermark = None if full else self._get_watermark()
+            
             # Get chunks with embeddings from PostgreSQL
-            query = self.db.query(DocumentChunk).filter(
+            query = self.db.query(DocumentChunk.id, DocumentChunk.document_type).filter(
                 DocumentChunk.embedding.isnot(None)
             )
             
@@ -441,50 +463,102 @@ class PineconeSyncService:
             if property_id:
                 query = query.filter(DocumentChunk.property_id == property_id)
             
-            chunks = query.all()
-            
-            if not chunks:
-                return {
-                    "success": True,
-                    "total_chunks": 0,
-                    "in_pinecone": 0,
-                    "missing_in_pinecone": 0,
-                    "missing_chunk_ids": []
-                }
+            if watermark:
+                query = query.filter(or_(
+                    DocumentChunk.vector_synced_at.is_(None),
+                    DocumentChunk.created_at > watermark,
+                    DocumentChunk.updated_at > watermark
+                ))
             
-            # Check each chunk
+            total_chunks = 0
             missing_chunk_ids = []
-            in_pinecone_count = 0
-            
-            for chunk in chunks:
-                vector_id = self.pinecone_service._build_vector_id(chunk.id)
-                namespace = self.pinecone_service._get_namespace(chunk.document_type)
+            present_chunk_ids = []
+            
+            # Keyset pages of chunk ids; one fetch per namespace per page
+            after_id = 0
+            while True:
+                page = query.filter(DocumentChunk.id > after_id).order_by(
+                    DocumentChunk.id
+                ).limit(RECONCILE_FETCH_BATCH_SIZE).all()
+                if not page:
+                    break
+                after_id = page[-1].id
+                total_chunks += len(page)
                 
-                try:
-                    from app.config.pinecone_config import pinecone_config
-                    index = pinecone_config.index
-                    fetch_result = index.fetch(ids=[vector_id], namespace=namespace)
-                    
-                    if vector_id not in fetch_result.get('vectors', {}):
-                        missing_chunk_ids.append(chunk.id)
-                    else:
-                        in_pinecone_count += 1
-                except Exception:
-                    # If we can't check, assume missing
-                    missing_chunk_ids.append(chunk.id)
+                by_namespace: Dict[str, Dict[str, int]] = {}
+                for chunk_id, document_type in page:
+                    namespace = self.pinecone_service._get_namespace(document_type)
+                    by_namespace.setdefault(namespace, {})[self.pinecone_service._build_vector_id(chunk_id)] = chunk_id
+                
+                for namespace, ids in by_namespace.items():
+                    try:
+                        fetch_result = pinecone_config.index.fetch(ids=list(ids), namespace=namespace)
+                        found = fetch_result.get('vectors', {})
+                    except Exception as e:
+                        # If we can't check, assume missing
+                        logger.warning(f"Could not fetch vectors from namespace '{namespace}': {str(e)}")
+                        found = {}
+                    for vector_id, chunk_id in ids.items():
+                        (present_chunk_ids if vector_id in found else missing_chunk_ids).append(chunk_id)
+            
+            self._mark_synced(present_chunk_ids, synced_at=started_at)
+            self._mark_synced(missing_chunk_ids, synced_at=None)
+            if not document_id and not property_id:
+                # Only a corpus-wide run may advance the watermark
+                self._set_watermark(started_at)
+            self.db.commit()
             
             return {
                 "success": True,
-                "total_chunks": len(chunks),
-                "in_pinecone": in_pinecone_count,
+                "total_chunks": total_chunks,
+                "in_pinecone": len(present_chunk_ids),
                 "missing_in_pinecone": len(missing_chunk_ids),
-                "missing_chunk_ids": missing_chunk_ids[:100]  # Limit to first 100
+                "missing_chunk_ids": missing_chunk_ids[:100],  # Limit to first 100
+                "since": watermark.isoformat() if watermark else None
             }
             
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error reconciling sync: {str(e)}", exc_info=True)
             return {
                 "success": False,
                 "error": str(e)
             }
-
+    
+    def _mark_synced(self, chunk_ids: List[int], synced_at: Optional[datetime] = ...):
+        """Set vector_synced_at without touching updated_at (which feeds the watermark)"""
+        if not chunk_ids:
+            return
+        if synced_at is ...:
+            synced_at = datetime.now(timezone.utc)
+        for start in range(0, len(chunk_ids), 1000):
+            self.db.execute(
+                update(DocumentChunk)
+                .where(DocumentChunk.id.in_(chunk_ids[start:start + 1000]))
+                .values(vector_synced_at=synced_at, updated_at=DocumentChunk.updated_at),
+                execution_options={"synchronize_session": False}
+            )
+    
+    def _get_watermark(self) -> Optional[datetime]:
+        value = self.db.query(SystemConfig.config_value).filter(
+            SystemConfig.config_key == RECONCILE_WATERMARK_KEY
+        ).scalar()
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            logger.warning(f"Ignoring malformed {RECONCILE_WATERMARK_KEY}: {value!r}")
+            return None
+    
+    def _set_watermark(self, value: datetime):
+        config = self.db.query(SystemConfig).filter(
+            SystemConfig.config_key == RECONCILE_WATERMARK_KEY
+        ).first()
+        if config is None:
+            config = SystemConfig(
+                config_key=RECONCILE_WATERMARK_KEY,
+                description="Time of the last complete PostgreSQL/Pinecone chunk reconciliation"
+            )
+            self.db.add(config)
+        config.config_value = value.isoformat()
@@ -132,75 +132,3 @@ class PublicAPIService:
         """
         # Would store in api_usage_logs table
         return True
-
-
-class WebhookService:
-    """
-    Manages webhook registrations and delivery.
-    
-    Events:
-    - extraction_complete
-    - validation_failed
-    - alert_triggered
-    """
-    
-    def __init__(self, db: Session):
-        """Initialize webhook service."""
-        self.db = db
-    
-    def register_webhook(
-        self,
-        user_id: int,
-        url: str,
-        events: List[str],
-        secret: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """
-        Register webhook URL for events.
-        
-        Args:
-            user_id: User ID
-            url: Webhook URL
-            events: List of events to subscribe to
-            secret: Optional webhook secret for signature verification
-            
-        Returns:
-            Webhook registration details
-        """
-        # Generate secret if not provided
-        if not secret:
-            secret = secrets.token_urlsafe(32)
-        
-        # Store webhook registration (would need webhooks table)
-        return {
-            'webhook_id': secrets.token_urlsafe(16),
-            'url': url,
-            'events': events,
-            'secret': secret,
-            'created_at': datetime.utcnow().isoformat()
-        }
-    
-    def trigger_webhook(
-        self,
-        event: str,
-        data: Dict[str, Any]
-    ) -> Dict[str, int]:
-        """
-        Trigger webhooks for an event.
-        
-        Args:
-            event: Event name
-            data: Event payload
-            
-        Returns:
-            Dict with delivery statistics
-        """
-        # Would query webhooks table, send to all registered URLs
-        # Implement retry logic (3 attempts)
-        # Track delivery status
-        return {
-            'triggered': 0,
-            'delivered': 0,
-            'failed': 0
-        }
-
@@ -1,106 +1,271 @@
 """
 Quota enforcement for SaaS plans (P2).
-Checks document and storage limits before allowing uploads.
+
+Uploads reserve their document count and bytes before the file is stored:
+
+- reserve_quota: one conditional UPDATE ... RETURNING on the organization row
+  checks used + reserved + requested against both limits and adds the request
+  to the reserved counters, so concurrent uploads can't overshoot a limit.
+- confirm_reservation / release_reservation: when the upload finishes or fails
+  the pending reservation moves into the used counters or is given back.
+  The status transition is itself conditional, so each happens once.
+- expire_stale_reservations: gives back reservations of abandoned uploads.
+- refresh_all_orgs_usage: reconciles every org's counters from one grouped
+  query and writes only the orgs that drifted, compare-and-set against the
+  counters it read so concurrent reservations are never overwritten.
 """
-from typing import Optional, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import case, func, or_, update
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
+from app.core.config import settings
 from app.models.organization import Organization
 from app.models.document_upload import DocumentUpload
 from app.models.property import Property
+from app.models.quota_reservation import QuotaReservation
+
+GB = 1024 * 1024 * 1024
+
+# Storage estimate per document when file_size_bytes was never recorded
+FALLBACK_DOCUMENT_BYTES = 500 * 1024
+
+
+def _limit_messages(org: Optional[Organization], documents: int, bytes_requested: int) -> str:
+    """Why a reservation was refused (read after the conditional UPDATE matched no row)."""
+    if not org:
+        return "Organization not found"
+    if org.documents_limit is not None and (
+        (org.documents_used or 0) + (org.documents_reserved or 0) + documents > org.documents_limit
+    ):
+        return f"Document limit reached ({org.documents_limit}). Upgrade plan."
+    return f"Storage limit reached ({org.storage_limit_gb} GB). Upgrade plan."
 
 
-def check_document_quota(db: Session, organization_id: int) -> Tuple[bool, Optional[str]]:
+def reserve_quota(
+    db: Session,
+    organization_id: int,
+    documents: int = 1,
+    bytes_requested: int = 0,
+    ttl_minutes: Optional[int] = None
+) -> Tuple[Optional[QuotaReservation], Optional[str]]:
     """
-    Check if org can upload another document.
-    Returns (allowed, error_message).
+    Atomically reserve quota for an upload.
+    Returns (reservation, error_message); the caller commits.
     """
-    org = db.query(Organization).filter(Organization.id == organization_id).first()
-    if not org:
-        return False, "Organization not found"
-    if org.documents_limit is None:
-        return True, None  # No limit
-    used = org.documents_used or 0
-    if used >= org.documents_limit:
-        return False, f"Document limit reached ({org.documents_limit}). Upgrade plan."
-    return True, None
+    docs_reserved = func.coalesce(Organization.documents_reserved, 0)
+    bytes_reserved = func.coalesce(Organization.storage_reserved_bytes, 0)
+    reserved = db.execute(
+        update(Organization)
+        .where(
+            Organization.id == organization_id,
+            or_(
+                Organization.documents_limit.is_(None),
+                func.coalesce(Organization.documents_used, 0) + docs_reserved + documents
+                <= Organization.documents_limit
+            ),
+            or_(
+                Organization.storage_limit_gb.is_(None),
+                func.coalesce(Organization.storage_used_bytes, 0) + bytes_reserved + bytes_requested
+                <= Organization.storage_limit_gb * GB
+            )
+        )
+        .values(
+            documents_reserved=docs_reserved + documents,
+            storage_reserved_bytes=bytes_reserved + bytes_requested
+        )
+        .returning(Organization.id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if reserved is None:
+        org = db.query(Organization).filter(Organization.id == organization_id).first()
+        return None, _limit_messages(org, documents, bytes_requested)
 
+    ttl = ttl_minutes if ttl_minutes is not None else settings.QUOTA_RESERVATION_TTL_MINUTES
+    reservation = QuotaReservation(
+        organization_id=organization_id,
+        documents=documents,
+        bytes=bytes_requested,
+        status="pending",
+        expires_at=datetime.utcnow() + timedelta(minutes=ttl)
+    )
+    db.add(reservation)
+    db.flush()
+    return reservation, None
 
-def check_storage_quota(db: Session, organization_id: int, additional_bytes: int = 0) -> Tuple[bool, Optional[str]]:
-    """Check if org has storage capacity. Returns (allowed, error_message)."""
-    org = db.query(Organization).filter(Organization.id == organization_id).first()
-    if not org:
-        return False, "Organization not found"
-    if org.storage_limit_gb is None:
-        return True, None
-    limit_bytes = int(float(org.storage_limit_gb) * 1024 * 1024 * 1024)
-    used = org.storage_used_bytes or 0
-    if used + additional_bytes > limit_bytes:
-        return False, f"Storage limit reached ({org.storage_limit_gb} GB). Upgrade plan."
-    return True, None
-
-
-def increment_document_count(db: Session, organization_id: int) -> None:
-    """Increment documents_used after successful upload."""
-    org = db.query(Organization).filter(Organization.id == organization_id).first()
-    if org and org.documents_limit is not None:
-        org.documents_used = (org.documents_used or 0) + 1
-        db.flush()
 
+def _resolve(db: Session, reservation_id: int, status: str, upload_id: Optional[int] = None) -> bool:
+    """Move a pending reservation to `status` and settle the org counters. False if not pending."""
+    values = {"status": status, "resolved_at": datetime.utcnow()}
+    if upload_id is not None:
+        values["upload_id"] = upload_id
+    row = db.execute(
+        update(QuotaReservation)
+        .where(QuotaReservation.id == reservation_id, QuotaReservation.status == "pending")
+        .values(**values)
+        .returning(QuotaReservation.organization_id, QuotaReservation.documents, QuotaReservation.bytes)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return False
+    _settle(db, row.organization_id, row.documents, row.bytes, confirm=status == "confirmed")
+    return True
 
-def increment_storage(db: Session, organization_id: int, bytes_added: int) -> None:
-    """Increment storage_used_bytes after successful upload."""
-    org = db.query(Organization).filter(Organization.id == organization_id).first()
-    if org and org.storage_limit_gb is not None:
-        org.storage_used_bytes = (org.storage_used_bytes or 0) + bytes_added
-        db.flush()
+
+def _settle(db: Session, organization_id: int, documents: int, bytes_held: int, confirm: bool) -> None:
+    """Drop resolved amounts from the reserved counters, adding them to used when confirmed."""
+    values = {
+        "documents_reserved": Organization.documents_reserved - documents,
+        "storage_reserved_bytes": Organization.storage_reserved_bytes - bytes_held,
+    }
+    if confirm:
+        values["documents_used"] = func.coalesce(Organization.documents_used, 0) + documents
+        values["storage_used_bytes"] = func.coalesce(Organization.storage_used_bytes, 0) + bytes_held
+    db.execute(
+        update(Organization)
+        .where(Organization.id == organization_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def confirm_reservation(db: Session, reservation_id: int, upload_id: Optional[int] = None) -> bool:
+    """Count a reserved upload as used after it was stored."""
+    return _resolve(db, reservation_id, "confirmed", upload_id=upload_id)
+
+
+def release_reservation(db: Session, reservation_id: int) -> bool:
+    """Give back a reservation whose upload failed or stored nothing new."""
+    return _resolve(db, reservation_id, "released")
+
+
+def expire_stale_reservations(db: Session, now: Optional[datetime] = None) -> int:
+    """Give back pending reservations past their expiry. Returns count expired."""
+    now = now or datetime.utcnow()
+    rows = db.execute(
+        update(QuotaReservation)
+        .where(QuotaReservation.status == "pending", QuotaReservation.expires_at < now)
+        .values(status="expired", resolved_at=now)
+        .returning(QuotaReservation.organization_id, QuotaReservation.documents, QuotaReservation.bytes)
+        .execution_options(synchronize_session=False)
+    ).all()
+    held: Dict[int, list] = defaultdict(lambda: [0, 0])
+    for row in rows:
+        held[row.organization_id][0] += row.documents
+        held[row.organization_id][1] += row.bytes
+    for organization_id, (documents, bytes_held) in held.items():
+        _settle(db, organization_id, documents, bytes_held, confirm=False)
+    return len(rows)
 
 
 def decrement_document_count(db: Session, organization_id: int) -> None:
     """Decrement documents_used after document deletion."""
-    org = db.query(Organization).filter(Organization.id == organization_id).first()
-    if org and org.documents_used and org.documents_used > 0:
-        org.documents_used -= 1
-        db.flush()
+    db.execute(
+        update(Organization)
+        .where(Organization.id == organization_id, Organization.documents_used > 0)
+        .values(documents_used=Organization.documents_used - 1)
+        .execution_options(synchronize_session=False)
+    )
 
 
 def decrement_storage(db: Session, organization_id: int, bytes_removed: int) -> None:
     """Decrement storage_used_bytes after document deletion."""
-    org = db.query(Organization).filter(Organization.id == organization_id).first()
-    if org and org.storage_used_bytes and org.storage_used_bytes > 0:
-        org.storage_used_bytes = max(0, org.storage_used_bytes - bytes_removed)
-        db.flush()
+    db.execute(
+        update(Organization)
+        .where(Organization.id == organization_id, Organization.storage_used_bytes > 0)
+        .values(storage_used_bytes=case(
+            (Organization.storage_used_bytes > bytes_removed, Organization.storage_used_bytes - bytes_removed),
+            else_=0
+        ))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _storage_total(doc_count: int, storage_sum) -> int:
+    total_storage = int(storage_sum) if storage_sum else 0
+    if total_storage == 0 and doc_count > 0:
+        total_storage = doc_count * FALLBACK_DOCUMENT_BYTES
+    return total_storage
 
 
 def refresh_org_usage(db: Session, organization_id: int) -> None:
     """Recalculate documents_used and storage_used_bytes from actual data.
     Uses file_size_bytes when present; falls back to 500KB/doc estimate for nulls."""
-    doc_count = (
-        db.query(DocumentUpload)
+    doc_count, storage_sum = (
+        db.query(func.count(DocumentUpload.id), func.coalesce(func.sum(DocumentUpload.file_size_bytes), 0))
         .join(Property, DocumentUpload.property_id == Property.id)
         .filter(Property.organization_id == organization_id)
-        .count()
+        .one()
     )
-    storage_sum = (
-        db.query(func.coalesce(func.sum(DocumentUpload.file_size_bytes), 0))
-        .join(Property, DocumentUpload.property_id == Property.id)
-        .filter(Property.organization_id == organization_id)
-        .scalar()
-    )
-    total_storage = int(storage_sum) if storage_sum else 0
-    if total_storage == 0 and doc_count > 0:
-        total_storage = doc_count * 500 * 1024  # 500KB fallback when file_size not set
     org = db.query(Organization).filter(Organization.id == organization_id).first()
     if org:
         org.documents_used = doc_count
-        org.storage_used_bytes = total_storage
+        org.storage_used_bytes = _storage_total(doc_count, storage_sum)
         db.flush()
 
 
 def refresh_all_orgs_usage(db: Session) -> int:
-    """Refresh usage for all orgs. Returns count of orgs updated."""
-    orgs = db.query(Organization).all()
-    for org in orgs:
-        refresh_org_usage(db, org.id)
-    return len(orgs)
+    """
+    Reconcile usage and reserved counters for all orgs.
+
+    The org counters are read first, then one grouped query for stored
+    documents and one for pending reservations. Only orgs whose counters
+    drifted are written, each with a compare-and-set on the counters read: a
+    reserve/confirm/release that commits in between changes them, so that
+    org's write matches no row and is left for the next run instead of
+    overwriting the concurrent change. Returns count of orgs updated.
+    """
+    counters = (
+        Organization.documents_used,
+        Organization.storage_used_bytes,
+        Organization.documents_reserved,
+        Organization.storage_reserved_bytes,
+    )
+    snapshot = db.query(Organization.id, *counters).all()
+
+    usage = {
+        organization_id: (doc_count, _storage_total(doc_count, storage_sum))
+        for organization_id, doc_count, storage_sum in (
+            db.query(
+                Property.organization_id,
+                func.count(DocumentUpload.id),
+                func.coalesce(func.sum(DocumentUpload.file_size_bytes), 0)
+            )
+            .join(Property, DocumentUpload.property_id == Property.id)
+            .filter(Property.organization_id.isnot(None))
+            .group_by(Property.organization_id)
+            .all()
+        )
+    }
+    reserved = {
+        organization_id: (int(documents or 0), int(bytes_held or 0))
+        for organization_id, documents, bytes_held in (
+            db.query(
+                QuotaReservation.organization_id,
+                func.sum(QuotaReservation.documents),
+                func.sum(QuotaReservation.bytes)
+            )
+            .filter(QuotaReservation.status == "pending")
+            .group_by(QuotaReservation.organization_id)
+            .all()
+        )
+    }
+
+    updated = 0
+    for org in snapshot:
+        current = tuple(org[1:])
+        target = usage.get(org.id, (0, 0)) + reserved.get(org.id, (0, 0))
+        if current == target:
+            continue
+        updated += db.execute(
+            update(Organization)
+            .where(
+                Organization.id == org.id,
+                *(column.is_not_distinct_from(value) for column, value in zip(counters, current))
+            )
+            .values(dict(zip((column.key for column in counters), target)))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return updated
@@ -0,0 +1,303 @@
+"""
+Reference Data Cache
+
+Process-wide, versioned cache of slow-changing reference data used on hot
+extraction/matching paths:
+- chart_of_accounts: all ChartOfAccounts rows with code/name/category indexes
+- account_synonyms: active AccountCodeSynonym rows
+- match_patterns: active LearnedMatchPattern rows
+- filename_patterns: FilenamePeriodPattern rows keyed by (pattern, property, document type)
+
+Each dataset is held as an immutable snapshot (namedtuple rows, tuples and
+read-only mappings) that can be shared across threads and outlives the DB
+session that loaded it. A per-dataset version counter in Redis is checked at
+most every `revalidate_seconds`; when it differs from the loaded version the
+dataset is reloaded and the snapshot reference is swapped in one assignment.
+Writers mark datasets changed on their session with mark_reference_data_changed();
+the counters are bumped only after that session commits, so other processes never
+reload before the change is visible. Without Redis, snapshots expire after
+`fallback_ttl_seconds`; with it, `max_age_seconds` bounds staleness from a missed bump.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.models.account_code_synonym import AccountCodeSynonym
+from app.models.chart_of_accounts import ChartOfAccounts
+from app.models.filename_period_pattern import FilenamePeriodPattern
+from app.models.learned_match_pattern import LearnedMatchPattern
+
+logger = logging.getLogger(__name__)
+
+CHART_OF_ACCOUNTS = "chart_of_accounts"
+ACCOUNT_SYNONYMS = "account_synonyms"
+MATCH_PATTERNS = "match_patterns"
+FILENAME_PATTERNS = "filename_patterns"
+DATASETS = (CHART_OF_ACCOUNTS, ACCOUNT_SYNONYMS, MATCH_PATTERNS, FILENAME_PATTERNS)
+
+VERSION_KEY_PREFIX = "reims:refdata:version:"
+
+_PENDING_KEY = "reference_data_changed"
+
+
+def _snapshot_type(model, extra_fields: Tuple[str, ...] = ()):
+    """Immutable row type carrying the model's mapped column attributes (plus extras)."""
+    fields = [attr.key for attr in inspect(model).column_attrs] + list(extra_fields)
+    return namedtuple(f"{model.__name__}Snapshot", fields)
+
+
+AccountRow = _snapshot_type(ChartOfAccounts)
+SynonymRow = _snapshot_type(AccountCodeSynonym)
+MatchPatternRow = _snapshot_type(LearnedMatchPattern)
+FilenamePatternRow = _snapshot_type(FilenamePeriodPattern, ("success_rate",))
+
+
+def _freeze(row_type, obj):
+    return row_type(*(getattr(obj, name) for name in row_type._fields))
+
+
+@dataclass(frozen=True)
+class ChartOfAccountsSnapshot:
+    version: Optional[str]
+    accounts: Tuple[Any, ...]
+    active_accounts: Tuple[Any, ...]
+    active_by_code: Mapping[str, Any]
+    active_by_name: Mapping[str, Any]  # lower-cased account name
+    active_by_category: Mapping[str, Tuple[Any, ...]]
+    calculated_codes: frozenset
+
+
+@dataclass(frozen=True)
+class SynonymSnapshot:
+    version: Optional[str]
+    synonyms: Tuple[Any, ...]  # combined_confidence desc
+    by_canonical_code: Mapping[str, Tuple[Any, ...]]
+
+
+@dataclass(frozen=True)
+class MatchPatternSnapshot:
+    version: Optional[str]
+    patterns: Tuple[Any, ...]  # priority desc, success_rate desc
+
+
+@dataclass(frozen=True)
+class FilenamePatternSnapshot:
+    version: Optional[str]
+    by_key: Mapping[Tuple[str, Optional[int], Optional[str]], Any]  # most-seen row per key
+
+
+def _group(rows, key) -> Mapping[Any, Tuple[Any, ...]]:
+    groups: Dict[Any, list] = {}
+    for row in rows:
+        groups.setdefault(key(row), []).append(row)
+    return MappingProxyType({k: tuple(v) for k, v in groups.items()})
+
+
+def _load_chart_of_accounts(db: Session, version: Optional[str]) -> ChartOfAccountsSnapshot:
+    accounts = tuple(
+        _freeze(AccountRow, a)
+        for a in db.query(ChartOfAccounts).order_by(ChartOfAccounts.id).all()
+    )
+    active = tuple(a for a in accounts if a.is_active)
+    return ChartOfAccountsSnapshot(
+        version=version,
+        accounts=accounts,
+        active_accounts=active,
+        active_by_code=MappingProxyType({a.account_code: a for a in active}),
+        active_by_name=MappingProxyType({a.account_name.lower(): a for a in active if a.account_name}),
+        active_by_category=_group(active, lambda a: a.category or 'unknown'),
+        calculated_codes=frozenset(a.account_code for a in accounts if a.is_calculated),
+    )
+
+
+def _load_synonyms(db: Session, version: Optional[str]) -> SynonymSnapshot:
+    synonyms = tuple(
+        _freeze(SynonymRow, s)
+        for s in db.query(AccountCodeSynonym).filter(
+            AccountCodeSynonym.is_active == True
+        ).order_by(AccountCodeSynonym.combined_confidence.desc(), AccountCodeSynonym.id).all()
+    )
+    return SynonymSnapshot(
+        version=version,
+        synonyms=synonyms,
+        by_canonical_code=_group(synonyms, lambda s: s.canonical_account_code),
+    )
+
+
+def _load_match_patterns(db: Session, version: Optional[str]) -> MatchPatternSnapshot:
+    patterns = tuple(
+        _freeze(MatchPatternRow, p)
+        for p in db.query(LearnedMatchPattern).filter(
+            LearnedMatchPattern.is_active == True
+        ).order_by(
+            LearnedMatchPattern.priority.desc(),
+            LearnedMatchPattern.success_rate.desc(),
+            LearnedMatchPattern.id
+        ).all()
+    )
+    return MatchPatternSnapshot(version=version, patterns=patterns)
+
+
+def _load_filename_patterns(db: Session, version: Optional[str]) -> FilenamePatternSnapshot:
+    by_key: Dict[Tuple[str, Optional[int], Optional[str]], Any] = {}
+    rows = db.query(FilenamePeriodPattern).order_by(
+        FilenamePeriodPattern.times_seen.desc(), FilenamePeriodPattern.id
+    ).all()
+    for row in rows:
+        key = (row.filename_pattern, row.property_id, row.document_type)
+        if key not in by_key:
+            by_key[key] = _freeze(FilenamePatternRow, row)
+    return FilenamePatternSnapshot(version=version, by_key=MappingProxyType(by_key))
+
+
+_LOADERS: Dict[str, Callable[[Session, Optional[str]], Any]] = {
+    CHART_OF_ACCOUNTS: _load_chart_of_accounts,
+    ACCOUNT_SYNONYMS: _load_synonyms,
+    MATCH_PATTERNS: _load_match_patterns,
+    FILENAME_PATTERNS: _load_filename_patterns,
+}
+
+
+class ReferenceDataCache:
+    """Versioned in-process snapshots of reference data, revalidated against Redis."""
+
+    def __init__(
+        self,
+        redis_getter: Optional[Callable[[], Any]] = None,
+        revalidate_seconds: float = 5.0,
+        fallback_ttl_seconds: float = 60.0,
+        max_age_seconds: float = 900.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if redis_getter is None:
+            from app.core.redis_client import get_redis_client
+            redis_getter = get_redis_client
+        self._redis_getter = redis_getter
+        self.revalidate_seconds = revalidate_seconds
+        self.fallback_ttl_seconds = fallback_ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        # dataset -> (snapshot, loaded_at, checked_at)
+        self._entries: Dict[str, Tuple[Any, float, float]] = {}
+        self._locks = {name: threading.Lock() for name in DATASETS}
+        self.stats = {"hits": 0, "revalidations": 0, "loads": 0}
+
+    def chart_of_accounts(self, db: Session) -> ChartOfAccountsSnapshot:
+        return self.get(CHART_OF_ACCOUNTS, db)
+
+    def synonyms(self, db: Session) -> SynonymSnapshot:
+        return self.get(ACCOUNT_SYNONYMS, db)
+
+    def match_patterns(self, db: Session) -> MatchPatternSnapshot:
+        return self.get(MATCH_PATTERNS, db)
+
+    def filename_patterns(self, db: Session) -> FilenamePatternSnapshot:
+        return self.get(FILENAME_PATTERNS, db)
+
+    def get(self, dataset: str, db: Session):
+        """Current snapshot of a dataset, reloading it with `db` only if its version moved."""
+        entry = self._entries.get(dataset)
+        now = self._clock()
+        if entry is not None and now - entry[2] < self.revalidate_seconds:
+            self.stats["hits"] += 1
+            return entry[0]
+
+        with self._locks[dataset]:
+            entry = self._entries.get(dataset)
+            now = self._clock()
+            if entry is not None and now - entry[2] < self.revalidate_seconds:
+                self.stats["hits"] += 1
+                return entry[0]
+
+            # Read the version before loading so a bump during the load triggers another reload
+            self.stats["revalidations"] += 1
+            version = self._read_version(dataset)
+            if entry is not None:
+                snapshot, loaded_at, _ = entry
+                age = now - loaded_at
+                unchanged = (
+                    snapshot.version == version and age < self.max_age_seconds if version is not None
+                    else age < self.fallback_ttl_seconds
+                )
+                if unchanged:
+                    self._entries[dataset] = (snapshot, loaded_at, now)
+                    return snapshot
+
+            snapshot = _LOADERS[dataset](db, version)
+            self.stats["loads"] += 1
+            self._entries[dataset] = (snapshot, now, now)
+            logger.debug(f"Reference data '{dataset}' loaded (version {version})")
+            return snapshot
+
+    def invalidate(self, *datasets: str) -> None:
+        """Bump the shared version of datasets and drop the local snapshots."""
+        datasets = datasets or DATASETS
+        redis_client = self._redis()
+        if redis_client is not None:
+            try:
+                pipe = redis_client.pipeline()
+                for dataset in datasets:
+                    pipe.incr(VERSION_KEY_PREFIX + dataset)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Failed to bump reference data version for {datasets}: {e}")
+        for dataset in datasets:
+            self._entries.pop(dataset, None)
+
+    def _redis(self):
+        try:
+            return self._redis_getter()
+        except Exception as e:
+            logger.debug(f"Reference data cache Redis unavailable: {e}")
+            return None
+
+    def _read_version(self, dataset: str) -> Optional[str]:
+        """Shared version string ("0" if never bumped), or None when Redis is unavailable."""
+        redis_client = self._redis()
+        if redis_client is None:
+            return None
+        try:
+            value = redis_client.get(VERSION_KEY_PREFIX + dataset)
+        except Exception as e:
+            logger.debug(f"Reference data version check failed for '{dataset}': {e}")
+            return None
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value or "0"
+
+
+reference_data_cache = ReferenceDataCache()
+
+
+def get_reference_data_cache() -> ReferenceDataCache:
+    """Process-wide reference data cache"""
+    return reference_data_cache
+
+
+def mark_reference_data_changed(db: Session, *datasets: str) -> None:
+    """
+    Record that `db` changed reference datasets; their versions are bumped once the
+    session commits (and forgotten if it rolls back).
+    """
+    db.info.setdefault(_PENDING_KEY, set()).update(datasets)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions_after_commit(session: Session) -> None:
+    datasets = session.info.pop(_PENDING_KEY, None)
+    if datasets:
+        reference_data_cache.invalidate(*sorted(datasets))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_versions(session: Session, previous_transaction) -> None:
+    # Savepoint rollbacks keep changes made earlier in the outer transaction
+    if not session.in_transaction():
+        session.info.pop(_PENDING_KEY, None)
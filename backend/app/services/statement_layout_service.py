@@ -0,0 +1,88 @@
+"""
+Statement Layout Service
+
+Stores the column layouts FinancialTableParser learns per property and
+document type, and hands them back for the next period's extraction so known
+layouts skip table detection (see utils/layout_template.py).
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.statement_layout import StatementLayout
+
+logger = logging.getLogger(__name__)
+
+# Layouts tried per (property, document type), most recently used first
+MAX_LAYOUTS_PER_TYPE = 5
+
+
+class StatementLayoutService:
+    """Per-property statement layouts for the fast column-slicing parse path"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_layouts(self, property_id: Optional[int], document_type: str) -> List[Dict]:
+        if property_id is None:
+            return []
+        try:
+            rows = (
+                self.db.query(StatementLayout.layout)
+                .filter(
+                    StatementLayout.property_id == property_id,
+                    StatementLayout.document_type == document_type
+                )
+                .order_by(StatementLayout.last_used_at.desc(), StatementLayout.id.desc())
+                .limit(MAX_LAYOUTS_PER_TYPE)
+                .all()
+            )
+        except Exception as e:
+            logger.warning(f"Statement layouts unavailable for property {property_id}: {e}")
+            return []
+        return [layout for (layout,) in rows if layout]
+
+    def record(self, property_id: Optional[int], document_type: str, parsed: Dict) -> Optional[StatementLayout]:
+        """
+        Store or refresh the layout a successful parse used or learned.
+
+        Runs in a savepoint of the caller's transaction, so a concurrent insert
+        of the same layout never fails the extraction.
+        """
+        layout = parsed.get("layout")
+        if property_id is None or not layout or not parsed.get("line_items"):
+            return None
+        try:
+            with self.db.begin_nested():
+                row = (
+                    self.db.query(StatementLayout)
+                    .filter(
+                        StatementLayout.property_id == property_id,
+                        StatementLayout.document_type == document_type,
+                        StatementLayout.fingerprint == layout["fingerprint"]
+                    )
+                    .first()
+                )
+                if row is None:
+                    row = StatementLayout(
+                        property_id=property_id,
+                        document_type=document_type,
+                        fingerprint=layout["fingerprint"],
+                        layout=layout,
+                        hit_count=0
+                    )
+                    self.db.add(row)
+                else:
+                    row.layout = layout
+                if parsed.get("layout_hit"):
+                    row.hit_count = (row.hit_count or 0) + 1
+                row.last_used_at = datetime.utcnow()
+            return row
+        except IntegrityError:
+            logger.debug(f"Layout {layout['fingerprint']} stored concurrently for property {property_id}")
+        except Exception as e:
+            logger.warning(f"Failed to store statement layout for property {property_id}: {e}")
+        return None
@@ -0,0 +1,471 @@
+"""
+Streaming Export Service - portfolio-wide CSV / XLSX / Parquet exports
+
+Unlike ExportService (one property, one period, whole file in memory), this
+service streams statement rows from a server-side cursor across any number of
+properties and periods and writes them incrementally:
+- CSV: generator of byte chunks for StreamingResponse
+- XLSX: openpyxl write-only workbook, one sheet per statement type
+- Parquet: pyarrow ParquetWriter, one row group per fetched batch
+
+Large exports run as background jobs (see app.tasks.export_tasks) that write
+to a temporary file and upload to MinIO with multipart upload.
+"""
+import csv
+import io
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.models.property import Property
+from app.models.financial_period import FinancialPeriod
+from app.models.balance_sheet_data import BalanceSheetData
+from app.models.income_statement_data import IncomeStatementData
+from app.models.cash_flow_data import CashFlowData
+from app.models.rent_roll_data import RentRollData
+from app.models.mortgage_statement_data import MortgageStatementData
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "xlsx", "parquet")
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Leading columns shared by every statement type: (header, kind)
+BASE_COLUMNS: List[Tuple[str, str]] = [
+    ("Property Code", "str"),
+    ("Property Name", "str"),
+    ("Period Year", "int"),
+    ("Period Month", "int"),
+]
+
+# statement type -> (model, sheet title, [(header, attribute, kind)], order-by attributes)
+STATEMENT_SPECS: Dict[str, Tuple[Any, str, List[Tuple[str, str, str]], List[str]]] = {
+    "balance_sheet": (
+        BalanceSheetData,
+        "Balance Sheet",
+        [
+            ("Account Code", "account_code", "str"),
+            ("Account Name", "account_name", "str"),
+            ("Account Category", "account_category", "str"),
+            ("Amount", "amount", "float"),
+            ("Is Calculated", "is_calculated", "bool"),
+        ],
+        ["account_code"],
+    ),
+    "income_statement": (
+        IncomeStatementData,
+        "Income Statement",
+        [
+            ("Account Code", "account_code", "str"),
+            ("Account Name", "account_name", "str"),
+            ("Line Category", "line_category", "str"),
+            ("Period Amount", "period_amount", "float"),
+            ("YTD Amount", "ytd_amount", "float"),
+            ("Period %", "period_percentage", "float"),
+            ("YTD %", "ytd_percentage", "float"),
+        ],
+        ["account_code"],
+    ),
+    "cash_flow": (
+        CashFlowData,
+        "Cash Flow",
+        [
+            ("Account Code", "account_code", "str"),
+            ("Account Name", "account_name", "str"),
+            ("Section", "line_section", "str"),
+            ("Category", "cash_flow_category", "str"),
+            ("Period Amount", "period_amount", "float"),
+            ("YTD Amount", "ytd_amount", "float"),
+        ],
+        ["line_number", "account_code"],
+    ),
+    "rent_roll": (
+        RentRollData,
+        "Rent Roll",
+        [
+            ("Unit Number", "unit_number", "str"),
+            ("Tenant Name", "tenant_name", "str"),
+            ("Lease Start", "lease_start_date", "date"),
+            ("Lease End", "lease_end_date", "date"),
+            ("Area (sqft)", "unit_area_sqft", "float"),
+            ("Monthly Rent", "monthly_rent", "float"),
+            ("Annual Rent", "annual_rent", "float"),
+            ("Occupancy Status", "occupancy_status", "str"),
+        ],
+        ["unit_number"],
+    ),
+    "mortgage_statement": (
+        MortgageStatementData,
+        "Mortgage",
+        [
+            ("Loan Number", "loan_number", "str"),
+            ("Statement Date", "statement_date", "date"),
+            ("Principal Balance", "principal_balance", "float"),
+            ("Interest Rate", "interest_rate", "float"),
+            ("Total Payment Due", "total_payment_due", "float"),
+            ("YTD Interest Paid", "ytd_interest_paid", "float"),
+            ("Monthly Debt Service", "monthly_debt_service", "float"),
+        ],
+        ["loan_number"],
+    ),
+}
+
+ProgressCallback = Callable[[int], None]
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """Convert DB values to plain Python types for the writers."""
+    if value is None:
+        return None
+    if kind == "float":
+        return float(value)
+    if kind == "int":
+        return int(value)
+    if kind == "bool":
+        return bool(value)
+    if kind == "date":
+        return value.date() if isinstance(value, datetime) else value
+    return str(value)
+
+
+class StreamingExportService:
+    """Stream statement rows for many properties/periods into CSV, XLSX or Parquet."""
+
+    def __init__(self, db: Session, batch_size: int = 2000):
+        self.db = db
+        self.batch_size = batch_size
+
+    # ------------------------------------------------------------------
+    # Row source
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_headers(statement_type: str) -> List[str]:
+        _, _, columns, _ = STATEMENT_SPECS[statement_type]
+        return [h for h, _ in BASE_COLUMNS] + [h for h, _, _ in columns]
+
+    @staticmethod
+    def get_kinds(statement_type: str) -> List[str]:
+        _, _, columns, _ = STATEMENT_SPECS[statement_type]
+        return [k for _, k in BASE_COLUMNS] + [k for _, _, k in columns]
+
+    @staticmethod
+    def validate_request(statement_types: Sequence[str], export_format: str) -> None:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        if not statement_types:
+            raise ValueError("At least one statement type is required")
+        unknown = [s for s in statement_types if s not in STATEMENT_SPECS]
+        if unknown:
+            raise ValueError(f"Unsupported statement types: {', '.join(unknown)}")
+        if export_format == "parquet" and not PYARROW_AVAILABLE:
+            raise ValueError("Parquet export requires pyarrow")
+
+    def _build_query(
+        self,
+        statement_type: str,
+        organization_id: Optional[int],
+        property_ids: Optional[List[int]],
+        date_range_start: Optional[date],
+        date_range_end: Optional[date],
+    ):
+        model, _, columns, order_by = STATEMENT_SPECS[statement_type]
+
+        query = self.db.query(
+            Property.property_code,
+            Property.property_name,
+            FinancialPeriod.period_year,
+            FinancialPeriod.period_month,
+            *[getattr(model, attr) for _, attr, _ in columns],
+        ).join(
+            Property, Property.id == model.property_id
+        ).join(
+            FinancialPeriod, FinancialPeriod.id == model.period_id
+        )
+
+        if organization_id is not None:
+            query = query.filter(Property.organization_id == organization_id)
+        if property_ids:
+            query = query.filter(Property.id.in_(property_ids))
+
+        if date_range_start:
+            query = query.filter(
+                or_(
+                    FinancialPeriod.period_year > date_range_start.year,
+                    and_(
+                        FinancialPeriod.period_year == date_range_start.year,
+                        FinancialPeriod.period_month >= date_range_start.month
+                    )
+                )
+            )
+        if date_range_end:
+            query = query.filter(
+                or_(
+                    FinancialPeriod.period_year < date_range_end.year,
+                    and_(
+                        FinancialPeriod.period_year == date_range_end.year,
+                        FinancialPeriod.period_month <= date_range_end.month
+                    )
+                )
+            )
+
+        return query.order_by(
+            Property.property_code,
+            FinancialPeriod.period_year,
+            FinancialPeriod.period_month,
+            *[getattr(model, attr) for attr in order_by],
+            model.id,
+        )
+
+    def count_rows(
+        self,
+        statement_types: Sequence[str],
+        organization_id: Optional[int] = None,
+        property_ids: Optional[List[int]] = None,
+        date_range_start: Optional[date] = None,
+        date_range_end: Optional[date] = None,
+    ) -> int:
+        """Total rows an export will produce (used for job progress)."""
+        return sum(
+            self._build_query(s, organization_id, property_ids, date_range_start, date_range_end)
+            .order_by(None).count()
+            for s in statement_types
+        )
+
+    def iter_rows(
+        self,
+        statement_type: str,
+        organization_id: Optional[int] = None,
+        property_ids: Optional[List[int]] = None,
+        date_range_start: Optional[date] = None,
+        date_range_end: Optional[date] = None,
+    ) -> Iterator[List[Any]]:
+        """Yield coerced rows from a server-side cursor, `batch_size` rows per fetch."""
+        kinds = self.get_kinds(statement_type)
+        query = self._build_query(
+            statement_type, organization_id, property_ids, date_range_start, date_range_end
+        ).yield_per(self.batch_size)
+
+        for row in query:
+            yield [_coerce(v, k) for v, k in zip(row, kinds)]
+
+    # ------------------------------------------------------------------
+    # Writers (operate on any row iterable so they stay DB-agnostic)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def csv_chunks(
+        headers: List[str],
+        rows: Iterable[List[Any]],
+        chunk_rows: int = 1000,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> Iterator[bytes]:
+        """Yield UTF-8 CSV in chunks of `chunk_rows` rows."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        yield b'\xef\xbb\xbf'  # UTF-8 BOM for Excel
+        writer.writerow(headers)
+
+        written = 0
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+            pending += 1
+            if pending >= chunk_rows:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+                if progress_callback:
+                    progress_callback(written)
+
+        tail = buffer.getvalue()
+        if tail:
+            yield tail.encode("utf-8")
+        if progress_callback:
+            progress_callback(written)
+
+    @staticmethod
+    def write_xlsx(
+        fileobj: BinaryIO,
+        sheets: Iterable[Tuple[str, List[str], Iterable[List[Any]]]],
+        progress_callback: Optional[ProgressCallback] = None,
+        progress_every: int = 5000,
+    ) -> int:
+        """
+        Write sheets with an openpyxl write-only workbook.
+
+        Rows are appended and flushed to disk as they arrive, so memory stays flat
+        regardless of row count.
+
+        Returns:
+            Number of data rows written
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        wb = Workbook(write_only=True)
+        written = 0
+        for title, headers, rows in sheets:
+            ws = wb.create_sheet(title=title[:31])
+            header_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.font = Font(bold=True)
+                header_cells.append(cell)
+            ws.append(header_cells)
+
+            for row in rows:
+                ws.append(row)
+                written += 1
+                if progress_callback and written % progress_every == 0:
+                    progress_callback(written)
+
+        if not wb.worksheets:
+            wb.create_sheet(title="Export")
+        wb.save(fileobj)
+        if progress_callback:
+            progress_callback(written)
+        return written
+
+    @staticmethod
+    def write_parquet(
+        fileobj: BinaryIO,
+        headers: List[str],
+        kinds: List[str],
+        rows: Iterable[List[Any]],
+        row_group_size: int = 10000,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> int:
+        """
+        Write rows as Parquet, one row group per `row_group_size` rows.
+
+        Returns:
+            Number of rows written
+        """
+        if not PYARROW_AVAILABLE:
+            raise ValueError("Parquet export requires pyarrow")
+
+        arrow_types = {
+            "str": pa.string(),
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "bool": pa.bool_(),
+            "date": pa.date32(),
+        }
+        schema = pa.schema([(h, arrow_types[k]) for h, k in zip(headers, kinds)])
+
+        written = 0
+        columns: List[List[Any]] = [[] for _ in headers]
+        with pq.ParquetWriter(fileobj, schema) as writer:
+            def flush():
+                writer.write_batch(pa.record_batch(
+                    [pa.array(col, type=f.type) for col, f in zip(columns, schema)],
+                    schema=schema,
+                ))
+                for col in columns:
+                    col.clear()
+
+            for row in rows:
+                for col, value in zip(columns, row):
+                    col.append(value)
+                written += 1
+                if len(columns[0]) >= row_group_size:
+                    flush()
+                    if progress_callback:
+                        progress_callback(written)
+
+            if columns[0] or written == 0:
+                flush()
+
+        if progress_callback:
+            progress_callback(written)
+        return written
+
+    # ------------------------------------------------------------------
+    # High-level entry points
+    # ------------------------------------------------------------------
+
+    def stream_csv(
+        self,
+        statement_type: str,
+        organization_id: Optional[int] = None,
+        property_ids: Optional[List[int]] = None,
+        date_range_start: Optional[date] = None,
+        date_range_end: Optional[date] = None,
+    ) -> Iterator[bytes]:
+        """CSV byte stream for a single statement type (for StreamingResponse)."""
+        rows = self.iter_rows(statement_type, organization_id, property_ids, date_range_start, date_range_end)
+        return self.csv_chunks(self.get_headers(statement_type), rows)
+
+    def write_export(
+        self,
+        fileobj: BinaryIO,
+        export_format: str,
+        statement_types: Sequence[str],
+        organization_id: Optional[int] = None,
+        property_ids: Optional[List[int]] = None,
+        date_range_start: Optional[date] = None,
+        date_range_end: Optional[date] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> int:
+        """
+        Write a complete export file to `fileobj`.
+
+        XLSX puts each statement type on its own sheet. CSV and Parquet hold a
+        single statement type per file; use one call per statement type.
+
+        Returns:
+            Number of data rows written
+        """
+        self.validate_request(statement_types, export_format)
+        filters = (organization_id, property_ids, date_range_start, date_range_end)
+
+        if export_format == "xlsx":
+            sheets = (
+                (STATEMENT_SPECS[s][1], self.get_headers(s), self.iter_rows(s, *filters))
+                for s in statement_types
+            )
+            return self.write_xlsx(fileobj, sheets, progress_callback=progress_callback)
+
+        if len(statement_types) != 1:
+            raise ValueError(f"{export_format.upper()} exports contain one statement type per file")
+        statement_type = statement_types[0]
+        rows = self.iter_rows(statement_type, *filters)
+
+        if export_format == "parquet":
+            return self.write_parquet(
+                fileobj, self.get_headers(statement_type), self.get_kinds(statement_type),
+                rows, progress_callback=progress_callback
+            )
+
+        written = 0
+
+        def track(count: int):
+            nonlocal written
+            written = count
+            if progress_callback:
+                progress_callback(count)
+
+        for chunk in self.csv_chunks(self.get_headers(statement_type), rows, progress_callback=track):
+            fileobj.write(chunk)
+        return written
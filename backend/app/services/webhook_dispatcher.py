@@ -0,0 +1,415 @@
+"""
+Webhook Dispatcher
+
+Asynchronous delivery of webhook_outbox rows:
+- Claims due events with SELECT ... FOR UPDATE SKIP LOCKED and a lease, so
+  several dispatchers can run side by side
+- Batches events per endpoint (one POST carries up to max_batch_size events)
+- Sends through one pooled httpx.AsyncClient with bounded per-endpoint concurrency
+- Retries with exponential backoff and full jitter; gives up after max_attempts
+- Records outcomes with bulk updates and exports latency/failure metrics
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import Integer, and_, cast, func, or_
+from sqlalchemy.orm import Session
+
+from app.models.webhook import WebhookEndpoint, WebhookOutbox
+from app.services.webhook_service import WebhookService
+
+try:
+    from prometheus_client import Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+if PROMETHEUS_AVAILABLE:
+    webhook_events_total = Counter(
+        'webhook_events_total',
+        'Webhook events by delivery outcome',
+        ['outcome']  # delivered, retry, dead
+    )
+
+    webhook_requests_total = Counter(
+        'webhook_requests_total',
+        'Webhook HTTP requests by result',
+        ['result']  # success, http_error, network_error
+    )
+
+    webhook_delivery_latency_seconds = Histogram(
+        'webhook_delivery_latency_seconds',
+        'Time from outbox insert to successful delivery',
+        buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 15.0, 60.0, 300.0, 1800.0, 3600.0]
+    )
+
+    webhook_request_duration_seconds = Histogram(
+        'webhook_request_duration_seconds',
+        'Duration of webhook HTTP requests',
+        buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+    )
+
+    webhook_batch_size = Histogram(
+        'webhook_batch_size',
+        'Events per webhook request',
+        buckets=[1, 2, 5, 10, 25, 50, 100]
+    )
+else:
+    class _DummyMetric:
+        def labels(self, *args, **kwargs): return self
+        def inc(self, *args, **kwargs): pass
+        def observe(self, *args, **kwargs): pass
+
+    webhook_events_total = _DummyMetric()
+    webhook_requests_total = _DummyMetric()
+    webhook_delivery_latency_seconds = _DummyMetric()
+    webhook_request_duration_seconds = _DummyMetric()
+    webhook_batch_size = _DummyMetric()
+
+
+@dataclass
+class OutboxEvent:
+    """Detached snapshot of a claimed outbox row"""
+    id: int
+    endpoint_id: int
+    event_type: str
+    payload: Dict[str, Any]
+    attempts: int
+    created_at: Optional[datetime] = None
+
+
+@dataclass
+class EndpointTarget:
+    """Detached snapshot of an endpoint's delivery settings"""
+    id: int
+    url: str
+    secret: str
+    max_concurrency: int = 4
+    max_batch_size: int = 50
+
+
+@dataclass
+class DeliveryResult:
+    endpoint_id: int
+    event_ids: List[int]
+    success: bool
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+    duration_seconds: float = 0.0
+
+
+@dataclass
+class DispatchStats:
+    claimed: int = 0
+    requests: int = 0
+    delivered: int = 0
+    retried: int = 0
+    dead: int = 0
+
+    def merge(self, other: "DispatchStats") -> None:
+        self.claimed += other.claimed
+        self.requests += other.requests
+        self.delivered += other.delivered
+        self.retried += other.retried
+        self.dead += other.dead
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class WebhookDispatcher:
+    """Deliver outbox events asynchronously with batching, pooling and backoff."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        max_attempts: int = 8,
+        base_backoff_seconds: float = 5.0,
+        max_backoff_seconds: float = 3600.0,
+        claim_limit: int = 500,
+        lease_seconds: int = 120,
+        request_timeout: float = 10.0,
+        max_connections: int = 100,
+        rng: Optional[random.Random] = None,
+    ):
+        if session_factory is None:
+            from app.db.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.base_backoff_seconds = base_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.claim_limit = claim_limit
+        self.lease_seconds = lease_seconds
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self.rng = rng or random.Random()
+
+    # ------------------------------------------------------------------
+    # Policy
+    # ------------------------------------------------------------------
+
+    def compute_backoff(self, attempts: int) -> float:
+        """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^(attempts - 1)))."""
+        ceiling = min(self.max_backoff_seconds, self.base_backoff_seconds * (2 ** max(0, attempts - 1)))
+        return self.rng.uniform(0, ceiling)
+
+    def create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self.request_timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=max(10, self.max_connections // 4),
+            ),
+            headers={"Content-Type": "application/json", "User-Agent": "REIMS-Webhooks/1.0"},
+        )
+
+    # ------------------------------------------------------------------
+    # HTTP delivery (no database access)
+    # ------------------------------------------------------------------
+
+    async def deliver_batch(
+        self,
+        client: httpx.AsyncClient,
+        endpoint: EndpointTarget,
+        events: List[OutboxEvent],
+    ) -> DeliveryResult:
+        """POST a batch of events to one endpoint. Any 2xx response counts as delivered."""
+        body = json.dumps({
+            "delivery_id": str(uuid.uuid4()),
+            "events": [
+                {
+                    "id": e.id,
+                    "type": e.event_type,
+                    "created_at": e.created_at.isoformat() if e.created_at else None,
+                    "data": e.payload,
+                }
+                for e in events
+            ],
+        }, default=str, separators=(",", ":")).encode("utf-8")
+
+        event_types = {e.event_type for e in events}
+        headers = {
+            "X-Webhook-Event": event_types.pop() if len(event_types) == 1 else "batch",
+            "X-Webhook-Signature": WebhookService._generate_signature(endpoint.secret, body),
+            "X-Webhook-Event-Count": str(len(events)),
+        }
+
+        event_ids = [e.id for e in events]
+        started = time.perf_counter()
+        try:
+            response = await client.post(endpoint.url, content=body, headers=headers)
+        except httpx.HTTPError as e:
+            duration = time.perf_counter() - started
+            webhook_requests_total.labels(result="network_error").inc()
+            webhook_request_duration_seconds.observe(duration)
+            return DeliveryResult(endpoint.id, event_ids, False, None, f"{type(e).__name__}: {e}", duration)
+
+        duration = time.perf_counter() - started
+        webhook_request_duration_seconds.observe(duration)
+        webhook_batch_size.observe(len(events))
+        if 200 <= response.status_code < 300:
+            webhook_requests_total.labels(result="success").inc()
+            return DeliveryResult(endpoint.id, event_ids, True, response.status_code, None, duration)
+
+        webhook_requests_total.labels(result="http_error").inc()
+        return DeliveryResult(
+            endpoint.id, event_ids, False, response.status_code,
+            f"HTTP {response.status_code}: {response.text[:200]}", duration
+        )
+
+    async def deliver_all(
+        self,
+        client: httpx.AsyncClient,
+        endpoints: Dict[int, EndpointTarget],
+        events: List[OutboxEvent],
+    ) -> List[DeliveryResult]:
+        """Group events per endpoint, split into batches and send with per-endpoint limits."""
+        by_endpoint: Dict[int, List[OutboxEvent]] = {}
+        for event in events:
+            by_endpoint.setdefault(event.endpoint_id, []).append(event)
+
+        semaphores = {
+            endpoint_id: asyncio.Semaphore(max(1, endpoints[endpoint_id].max_concurrency))
+            for endpoint_id in by_endpoint
+        }
+
+        async def send(endpoint: EndpointTarget, batch: List[OutboxEvent]) -> DeliveryResult:
+            async with semaphores[endpoint.id]:
+                return await self.deliver_batch(client, endpoint, batch)
+
+        jobs = []
+        for endpoint_id, endpoint_events in by_endpoint.items():
+            endpoint = endpoints[endpoint_id]
+            size = max(1, endpoint.max_batch_size)
+            for i in range(0, len(endpoint_events), size):
+                jobs.append(send(endpoint, endpoint_events[i:i + size]))
+
+        return list(await asyncio.gather(*jobs))
+
+    # ------------------------------------------------------------------
+    # Outbox persistence
+    # ------------------------------------------------------------------
+
+    def claim_due_events(self, db: Session) -> Tuple[List[OutboxEvent], Dict[int, EndpointTarget]]:
+        """Lease up to claim_limit due events (including expired leases) for this dispatcher."""
+        now = datetime.now(timezone.utc)
+        rows = db.query(WebhookOutbox).filter(
+            or_(
+                and_(WebhookOutbox.status == "pending", WebhookOutbox.next_attempt_at <= now),
+                and_(WebhookOutbox.status == "delivering", WebhookOutbox.locked_until < now),
+            )
+        ).order_by(WebhookOutbox.id).limit(self.claim_limit).with_for_update(skip_locked=True).all()
+
+        if not rows:
+            db.commit()
+            return [], {}
+
+        lease = now + timedelta(seconds=self.lease_seconds)
+        ids = [row.id for row in rows]
+        events = [
+            OutboxEvent(row.id, row.endpoint_id, row.event_type, row.payload, row.attempts, row.created_at)
+            for row in rows
+        ]
+        db.query(WebhookOutbox).filter(WebhookOutbox.id.in_(ids)).update(
+            {"status": "delivering", "locked_until": lease}, synchronize_session=False
+        )
+
+        endpoint_rows = db.query(WebhookEndpoint).filter(
+            WebhookEndpoint.id.in_({e.endpoint_id for e in events})
+        ).all()
+        endpoints = {
+            ep.id: EndpointTarget(ep.id, ep.url, ep.secret, ep.max_concurrency or 4, ep.max_batch_size or 50)
+            for ep in endpoint_rows if ep.is_active
+        }
+
+        # Events whose endpoint was deactivated are not sent
+        orphaned = [e.id for e in events if e.endpoint_id not in endpoints]
+        if orphaned:
+            db.query(WebhookOutbox).filter(WebhookOutbox.id.in_(orphaned)).update(
+                {"status": "dead", "locked_until": None, "last_error": "Endpoint inactive"},
+                synchronize_session=False
+            )
+        db.commit()
+        return [e for e in events if e.endpoint_id in endpoints], endpoints
+
+    def record_results(
+        self,
+        db: Session,
+        results: List[DeliveryResult],
+        events: List[OutboxEvent],
+    ) -> DispatchStats:
+        """Persist delivery outcomes with bulk statements in one transaction."""
+        stats = DispatchStats(requests=len(results))
+        now = datetime.now(timezone.utc)
+        events_by_id = {e.id: e for e in events}
+
+        delivered_ids: List[int] = []
+        retry_updates: List[Dict[str, Any]] = []
+        endpoint_success: Dict[int, bool] = {}
+
+        for result in results:
+            endpoint_success[result.endpoint_id] = endpoint_success.get(result.endpoint_id, False) or result.success
+            if result.success:
+                delivered_ids.extend(result.event_ids)
+                continue
+            for event_id in result.event_ids:
+                attempts = events_by_id[event_id].attempts + 1
+                dead = attempts >= self.max_attempts
+                retry_updates.append({
+                    "id": event_id,
+                    "status": "dead" if dead else "pending",
+                    "attempts": attempts,
+                    "next_attempt_at": now + timedelta(seconds=self.compute_backoff(attempts)),
+                    "locked_until": None,
+                    "last_error": (result.error or "")[:1000],
+                    "last_status_code": result.status_code,
+                })
+                if dead:
+                    stats.dead += 1
+                else:
+                    stats.retried += 1
+
+        if delivered_ids:
+            db.query(WebhookOutbox).filter(WebhookOutbox.id.in_(delivered_ids)).update(
+                {
+                    "status": "delivered",
+                    "attempts": WebhookOutbox.attempts + 1,
+                    "delivered_at": now,
+                    "locked_until": None,
+                    "last_error": None,
+                    "latency_ms": cast(func.extract("epoch", now - WebhookOutbox.created_at) * 1000, Integer),
+                },
+                synchronize_session=False
+            )
+            stats.delivered = len(delivered_ids)
+            for event_id in delivered_ids:
+                created_at = events_by_id[event_id].created_at
+                if created_at:
+                    if created_at.tzinfo is None:
+                        created_at = created_at.replace(tzinfo=timezone.utc)
+                    webhook_delivery_latency_seconds.observe(max(0.0, (now - created_at).total_seconds()))
+
+        if retry_updates:
+            db.bulk_update_mappings(WebhookOutbox, retry_updates)
+
+        for endpoint_id, ok in endpoint_success.items():
+            values = (
+                {"consecutive_failures": 0, "last_success_at": now}
+                if ok else
+                {"consecutive_failures": WebhookEndpoint.consecutive_failures + 1, "last_failure_at": now}
+            )
+            db.query(WebhookEndpoint).filter(WebhookEndpoint.id == endpoint_id).update(
+                values, synchronize_session=False
+            )
+
+        db.commit()
+
+        webhook_events_total.labels(outcome="delivered").inc(stats.delivered)
+        webhook_events_total.labels(outcome="retry").inc(stats.retried)
+        webhook_events_total.labels(outcome="dead").inc(stats.dead)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+
+    async def dispatch_once(self, client: httpx.AsyncClient) -> DispatchStats:
+        """Claim one batch of due events, deliver them and record the outcome."""
+        db = self.session_factory()
+        try:
+            events, endpoints = self.claim_due_events(db)
+            if not events:
+                return DispatchStats()
+            results = await self.deliver_all(client, endpoints, events)
+            stats = self.record_results(db, results, events)
+            stats.claimed = len(events)
+            return stats
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run(self, time_budget_seconds: float = 50.0, poll_interval: float = 1.0) -> Dict[str, int]:
+        """Dispatch until the time budget is used, polling when the outbox is empty."""
+        deadline = time.monotonic() + time_budget_seconds
+        totals = DispatchStats()
+        async with self.create_client() as client:
+            while time.monotonic() < deadline:
+                stats = await self.dispatch_once(client)
+                totals.merge(stats)
+                if stats.claimed == 0:
+                    await asyncio.sleep(min(poll_interval, max(0.0, deadline - time.monotonic())))
+        return totals.as_dict()
@@ -1,98 +1,148 @@
 """
 Webhook Service
-Manages webhook registrations and deliveries.
+Manages webhook registrations and enqueues deliveries.
+
+Triggering an event only inserts rows into the webhook_outbox table inside the
+caller's transaction; HTTP delivery happens asynchronously in
+WebhookDispatcher (app.services.webhook_dispatcher).
 """
 
 import hmac
 import hashlib
-import requests
-from typing import Dict, Any, List
-from datetime import datetime
+import json
+import logging
+import secrets
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.webhook import WebhookEndpoint, WebhookOutbox
+
+logger = logging.getLogger(__name__)
 
 
 class WebhookService:
     """Manage webhooks for external systems."""
-    
-    def __init__(self):
-        self.max_retries = 3
-    
+
+    def __init__(self, db: Session):
+        self.db = db
+
     def register_webhook(
         self,
         url: str,
         events: List[str],
-        secret: str
+        secret: Optional[str] = None,
+        organization_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        max_concurrency: int = 4,
+        max_batch_size: int = 50
     ) -> Dict[str, Any]:
         """Register a webhook endpoint."""
-        webhook = {
-            "url": url,
-            "events": events,
-            "secret": secret,
-            "created_at": datetime.now().isoformat(),
-            "active": True
+        endpoint = WebhookEndpoint(
+            url=url,
+            events=events,
+            secret=secret or secrets.token_urlsafe(32),
+            organization_id=organization_id,
+            user_id=user_id,
+            is_active=True,
+            max_concurrency=max_concurrency,
+            max_batch_size=max_batch_size,
+        )
+        self.db.add(endpoint)
+        self.db.commit()
+        self.db.refresh(endpoint)
+        return {
+            "webhook_id": endpoint.id,
+            "url": endpoint.url,
+            "events": endpoint.events,
+            "secret": endpoint.secret,
+            "created_at": endpoint.created_at.isoformat() if endpoint.created_at else None,
+            "status": "registered",
         }
-        # Store in database
-        return {"webhook_id": 1, "status": "registered"}
-    
+
+    def deactivate_webhook(self, webhook_id: int, organization_id: Optional[int] = None) -> bool:
+        """Stop deliveries to an endpoint (pending events are left for audit)."""
+        query = self.db.query(WebhookEndpoint).filter(WebhookEndpoint.id == webhook_id)
+        if organization_id is not None:
+            query = query.filter(WebhookEndpoint.organization_id == organization_id)
+        endpoint = query.first()
+        if not endpoint:
+            return False
+        endpoint.is_active = False
+        self.db.commit()
+        return True
+
     def trigger_webhook(
         self,
         event_type: str,
-        payload: Dict[str, Any]
-    ) -> None:
-        """Trigger webhooks for an event."""
-        # Get all webhooks for this event
-        webhooks = self._get_webhooks_for_event(event_type)
-        
-        for webhook in webhooks:
-            self._deliver_webhook(webhook, event_type, payload)
-    
-    def _deliver_webhook(
-        self,
-        webhook: Dict,
-        event_type: str,
-        payload: Dict
-    ) -> None:
-        """Deliver webhook with retries."""
-        signature = self._generate_signature(webhook["secret"], payload)
-        
-        headers = {
-            "X-Webhook-Event": event_type,
-            "X-Webhook-Signature": signature
-        }
-        
-        for attempt in range(self.max_retries):
-            try:
-                response = requests.post(
-                    webhook["url"],
-                    json=payload,
-                    headers=headers,
-                    timeout=30
-                )
-                if response.status_code == 200:
-                    self._log_delivery_success(webhook, payload)
-                    return
-            except Exception as e:
-                if attempt == self.max_retries - 1:
-                    self._log_delivery_failure(webhook, payload, str(e))
-    
-    def _generate_signature(self, secret: str, payload: Dict) -> str:
-        """Generate HMAC signature for verification."""
-        import json
-        payload_str = json.dumps(payload, sort_keys=True)
+        payload: Dict[str, Any],
+        organization_id: Optional[int] = None
+    ) -> int:
+        """
+        Enqueue an event for every subscribed endpoint.
+
+        Rows are added to the current session but not committed, so the event
+        is persisted atomically with the caller's own changes.
+
+        Returns:
+            Number of outbox rows enqueued
+        """
+        webhooks = self._get_webhooks_for_event(event_type, organization_id)
+        if not webhooks:
+            return 0
+
+        # Round-trip through JSON so Decimal/datetime values are stored as plain JSON
+        body = json.loads(json.dumps(payload, default=str))
+        self.db.add_all([
+            WebhookOutbox(
+                endpoint_id=webhook.id,
+                organization_id=webhook.organization_id,
+                event_type=event_type,
+                payload=body,
+                status="pending",
+                attempts=0,
+            )
+            for webhook in webhooks
+        ])
+        self.db.flush()
+        return len(webhooks)
+
+    def get_deliveries(self, webhook_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        """Recent delivery history for an endpoint."""
+        rows = self.db.query(WebhookOutbox).filter(
+            WebhookOutbox.endpoint_id == webhook_id
+        ).order_by(WebhookOutbox.id.desc()).limit(limit).all()
+        return [
+            {
+                "id": row.id,
+                "event_type": row.event_type,
+                "status": row.status,
+                "attempts": row.attempts,
+                "last_status_code": row.last_status_code,
+                "last_error": row.last_error,
+                "created_at": row.created_at,
+                "delivered_at": row.delivered_at,
+                "latency_ms": row.latency_ms,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _generate_signature(secret: str, body: bytes) -> str:
+        """Generate HMAC signature of the exact request body for verification."""
         return hmac.new(
             secret.encode(),
-            payload_str.encode(),
+            body,
             hashlib.sha256
         ).hexdigest()
-    
-    def _get_webhooks_for_event(self, event_type: str) -> List[Dict]:
-        """Get registered webhooks for event."""
-        return []  # Placeholder
-    
-    def _log_delivery_success(self, webhook: Dict, payload: Dict) -> None:
-        """Log successful delivery."""
-        pass
-    
-    def _log_delivery_failure(self, webhook: Dict, payload: Dict, error: str) -> None:
-        """Log failed delivery."""
-        pass
 
+    def _get_webhooks_for_event(
+        self,
+        event_type: str,
+        organization_id: Optional[int] = None
+    ) -> List[WebhookEndpoint]:
+        """Get active endpoints subscribed to the event."""
+        query = self.db.query(WebhookEndpoint).filter(WebhookEndpoint.is_active == True)
+        if organization_id is not None:
+            query = query.filter(WebhookEndpoint.organization_id == organization_id)
+        return [w for w in query.all() if w.subscribes_to(event_type)]
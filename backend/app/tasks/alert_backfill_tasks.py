@@ -120,6 +120,13 @@ def backfill_alerts_batch(self, job_id: int):
 
         trigger_service = AlertTriggerService(db)
 
+        # Evaluate every rule against every period in one vectorized pass; the chunk
+        # loop below only creates alerts for the hits and tracks progress
+        evaluation = trigger_service.rules_service.evaluate_rules_bulk(
+            [(period.property_id, period.id) for period, metrics in period_rows if metrics],
+            ignore_cooldown=ignore_cooldown
+        )
+
         for i in range(0, len(period_rows), chunk_size):
             chunk = period_rows[i:i + chunk_size]
 
@@ -143,11 +150,11 @@ def backfill_alerts_batch(self, job_id: int):
                         })
                         continue
 
-                    alerts = trigger_service.evaluate_and_trigger_alerts(
+                    alerts = trigger_service.create_alerts_for_results(
                         property_id=period.property_id,
                         period_id=period.id,
-                        metrics=metrics,
-                        ignore_cooldown=ignore_cooldown
+                        evaluation_results=evaluation.get((period.property_id, period.id), []),
+                        metrics=metrics
                     )
 
                     alerts_created += len(alerts)
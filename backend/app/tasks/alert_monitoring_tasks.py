@@ -4,7 +4,7 @@ Celery tasks for periodic alert monitoring and escalation
 """
 from celery import shared_task
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 from typing import Dict, List
 from datetime import date, datetime, timedelta
 import logging
@@ -300,39 +300,41 @@ def monitor_all_properties(self):
 
     db = SessionLocal()
     try:
-        # Get all properties
-        properties = db.query(Property).all()
+        # Most recent period per property, in one query
+        latest_end = db.query(
+            FinancialPeriod.property_id,
+            func.max(FinancialPeriod.period_end_date).label("period_end_date")
+        ).group_by(FinancialPeriod.property_id).subquery()
+        
+        recent_periods = db.query(
+            FinancialPeriod.property_id, FinancialPeriod.id
+        ).join(
+            Property, Property.id == FinancialPeriod.property_id
+        ).join(
+            latest_end,
+            and_(
+                latest_end.c.property_id == FinancialPeriod.property_id,
+                latest_end.c.period_end_date == FinancialPeriod.period_end_date
+            )
+        ).order_by(FinancialPeriod.property_id, FinancialPeriod.id.desc()).all()
+        
+        targets = {}
+        for property_id, period_id in recent_periods:
+            targets.setdefault(property_id, period_id)
         
         trigger_service = AlertTriggerService(db)
         
-        results = []
-        for property_obj in properties:
-            try:
-                # Get most recent period
-                recent_period = db.query(FinancialPeriod).filter(
-                    FinancialPeriod.property_id == property_obj.id
-                ).order_by(FinancialPeriod.period_end_date.desc()).first()
-                
-                if not recent_period:
-                    continue
-                
-                # Evaluate alerts
-                alerts = trigger_service.evaluate_and_trigger_alerts(
-                    property_id=property_obj.id,
-                    period_id=recent_period.id
-                )
-                
-                results.append({
-                    "property_id": property_obj.id,
-                    "period_id": recent_period.id,
-                    "alerts_triggered": len(alerts)
-                })
-            except Exception as e:
-                logger.error(
-                    f"Error monitoring property {property_obj.id}: {str(e)}",
-                    exc_info=True
-                )
-                continue
+        # Evaluate every rule against every property's latest period in one pass
+        created = trigger_service.evaluate_and_trigger_alerts_bulk(list(targets.items()))
+        
+        results = [
+            {
+                "property_id": property_id,
+                "period_id": period_id,
+                "alerts_triggered": len(created.get((property_id, period_id), []))
+            }
+            for property_id, period_id in targets.items()
+        ]
         
         total_alerts = sum(r["alerts_triggered"] for r in results)
         
@@ -1,22 +1,27 @@
 """
 Batch Reprocessing Celery Tasks
 
-Handles async batch reprocessing of documents for anomaly detection.
+Handles async batch reprocessing of documents for anomaly detection: a
+dispatcher fans a job out into parallel chunk tasks, and a chord callback
+settles it. Per-document checkpoints make every step restartable.
 """
 
-from celery import Task
+from celery import Task, chain, chord, group
 from celery.exceptions import SoftTimeLimitExceeded
 from app.core.celery_config import celery_app
+from app.core.config import settings
 from app.db.database import SessionLocal
 from app.models.batch_reprocessing_job import BatchReprocessingJob
-from app.models.document_upload import DocumentUpload
-from app.services.extraction_orchestrator import ExtractionOrchestrator
-from sqlalchemy import and_
+from app.services.batch_reprocessing_service import BatchReprocessingService, is_reprocessing_job
 from datetime import datetime
+from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Hard time limit (seconds) of one chunk task; also sizes the job lock held while chunks run
+CHUNK_TIME_LIMIT = 900
+
 
 class DatabaseTask(Task):
     """Base task with database session management"""
@@ -49,24 +54,31 @@ class DatabaseTask(Task):
     name="app.tasks.batch_reprocessing_tasks.reprocess_documents_batch",
     bind=True,
     base=DatabaseTask,
-    time_limit=3600,  # 60 minutes hard limit
-    soft_time_limit=3300  # 55 minutes soft limit
+    time_limit=600,  # 10 minutes hard limit (dispatch only)
+    soft_time_limit=540  # 9 minutes soft limit
 )
 def reprocess_documents_batch(self, job_id: int):
     """
     Celery task: Batch reprocess documents for anomaly detection (idempotent).
     
-    Processes documents in chunks of 10, updating job progress after each chunk.
-    Handles errors gracefully and continues processing remaining documents.
+    Splits the job's unfinished documents into id-range chunks (keyset
+    iteration, skipping documents already checkpointed) and fans them out as
+    a chord: BATCH_REPROCESSING_PARALLEL_CHUNKS lanes, each a chain of chunk
+    tasks, so at most that many chunks of this job run at once. The chord
+    callback settles the job. Re-running the task (restart or resume) only
+    picks up documents without a checkpoint. The job lock stays held until
+    the chord callback releases it, so a duplicate dispatch can't start a
+    second set of chunks while the first is running.
     
     Args:
         job_id: BatchReprocessingJob ID
     
     Returns:
-        dict: Processing summary with counts
+        dict: Dispatch summary
     """
-    from app.utils.task_idempotency import acquire_job_lock, release_job_lock
+    from app.utils.task_idempotency import acquire_job_lock, extend_job_lock, release_job_lock
     task_id = self.request.id
+    dispatched = False
 
     db = SessionLocal()
     try:
@@ -74,6 +86,9 @@ def reprocess_documents_batch(self, job_id: int):
         if not job:
             logger.error(f"Batch job {job_id} not found")
             return {"status": "error", "message": f"Job {job_id} not found"}
+        if not is_reprocessing_job(job):
+            logger.error(f"Batch job {job_id} is not a reprocessing job")
+            return {"status": "error", "message": "Invalid job type"}
         if job.status in ("completed", "cancelled"):
             logger.info(f"Batch job {job_id} already {job.status}, skipping")
             return {"status": "skipped", "message": f"Job already {job.status}"}
@@ -81,207 +96,35 @@ def reprocess_documents_batch(self, job_id: int):
             logger.info(f"Batch job {job_id} already running (duplicate), skipping")
             return {"status": "skipped", "message": "Job already in progress"}
         if job.status != 'running':
-            release_job_lock(job_id, task_id)
             logger.warning(f"Batch job {job_id} is not in 'running' status (current: {job.status})")
             return {"status": "error", "message": f"Job {job_id} is not running"}
         
-        logger.info(f"Starting batch reprocessing for job {job_id}: {job.total_documents} documents")
-        
-        # Query documents matching filters
-        query = db.query(DocumentUpload)
-        
-        # Apply filters (same as in service)
-        filters = []
-        if job.property_ids:
-            filters.append(DocumentUpload.property_id.in_(job.property_ids))
-        
-        if job.date_range_start:
-            filters.append(DocumentUpload.upload_date >= job.date_range_start)
-        
-        if job.date_range_end:
-            filters.append(DocumentUpload.upload_date <= job.date_range_end)
-        
-        if job.document_types:
-            filters.append(DocumentUpload.document_type.in_(job.document_types))
-        
-        if job.extraction_status_filter != 'all':
-            filters.append(DocumentUpload.extraction_status == job.extraction_status_filter)
-        
-        if filters:
-            query = query.filter(and_(*filters))
-        
-        # Get all document IDs
-        documents = query.order_by(DocumentUpload.id).all()
-        
-        if len(documents) != job.total_documents:
-            logger.warning(f"Document count mismatch: expected {job.total_documents}, found {len(documents)}")
-        
-        # Process in chunks
-        chunk_size = 10
-        total_processed = 0
-        successful = 0
-        failed = 0
-        skipped = 0
-        error_details = []  # Track specific error reasons
-        
-        # Initialize orchestrator for anomaly detection
-        orchestrator = ExtractionOrchestrator(db)
-        
-        # Import for validation
-        from app.models.financial_period import FinancialPeriod
+        service = BatchReprocessingService(db)
+        bounds = list(service.iter_chunk_bounds(job, settings.BATCH_REPROCESSING_CHUNK_SIZE))
+        if not bounds:
+            # Everything is already checkpointed (e.g. a resumed job that had finished)
+            return service.finalize_job(job_id)
+        
+        lanes = max(1, min(settings.BATCH_REPROCESSING_PARALLEL_CHUNKS, len(bounds)))
+        header = group(
+            chain(reprocess_document_chunk.si(job_id, after_id, last_id) for after_id, last_id in bounds[lane::lanes])
+            for lane in range(lanes)
+        )
+        # Hold the lock while the longest lane can run; the chord callback releases it
+        lane_length = -(-len(bounds) // lanes)
+        extend_job_lock(job_id, task_id, ttl_seconds=lane_length * CHUNK_TIME_LIMIT + 600)
+        chord(header)(finalize_reprocessing_job.si(job_id, task_id))
+        dispatched = True
+        
+        logger.info(
+            f"Dispatched batch job {job_id}: {len(bounds)} chunks of up to "
+            f"{settings.BATCH_REPROCESSING_CHUNK_SIZE} documents over {lanes} parallel lanes"
+        )
+        return {"status": "dispatched", "job_id": job_id, "chunks": len(bounds), "parallel_chunks": lanes}
         
-        for i in range(0, len(documents), chunk_size):
-            chunk = documents[i:i + chunk_size]
-            
-            # Check if task was revoked
-            if self.is_aborted():
-                logger.info(f"Task revoked for job {job_id}, stopping processing")
-                job.status = 'cancelled'
-                job.completed_at = datetime.now()
-                db.commit()
-                return {"status": "cancelled", "processed": total_processed}
-            
-            # Process chunk
-            for doc in chunk:
-                try:
-                    # Pre-validate document before processing
-                    validation_error = None
-                    
-                    # Check extraction status
-                    if doc.extraction_status != 'completed':
-                        validation_error = f"Extraction status is '{doc.extraction_status}', not 'completed'"
-                    
-                    # Check period_id exists
-                    elif not doc.period_id:
-                        validation_error = "Missing period_id"
-                    
-                    # Check period exists in database
-                    elif not db.query(FinancialPeriod).filter(FinancialPeriod.id == doc.period_id).first():
-                        validation_error = f"Period {doc.period_id} not found in database"
-                    
-                    # Skip if validation fails
-                    if validation_error:
-                        logger.warning(f"Document {doc.id} ({doc.file_name}): Skipping - {validation_error}")
-                        skipped += 1
-                        total_processed += 1
-                        error_details.append({
-                            "document_id": doc.id,
-                            "file_name": doc.file_name,
-                            "reason": validation_error,
-                            "type": "validation"
-                        })
-                        continue
-                    
-                    # Trigger anomaly detection for this document
-                    orchestrator._detect_anomalies_for_document(doc)
-                    db.commit()  # Commit after each successful detection
-                    
-                    successful += 1
-                    total_processed += 1
-                    
-                except ValueError as e:
-                    # Validation errors - skip document
-                    logger.warning(f"Document {doc.id} ({doc.file_name}): Validation error - {str(e)}")
-                    skipped += 1
-                    total_processed += 1
-                    error_details.append({
-                        "document_id": doc.id,
-                        "file_name": doc.file_name,
-                        "reason": str(e),
-                        "type": "validation"
-                    })
-                    db.rollback()  # Rollback any partial changes
-                    continue
-                    
-                except Exception as e:
-                    # Unexpected errors - mark as failed
-                    error_msg = f"Document {doc.id} ({doc.file_name}): Processing error - {str(e)}"
-                    logger.error(error_msg, exc_info=True)
-                    failed += 1
-                    total_processed += 1
-                    error_details.append({
-                        "document_id": doc.id,
-                        "file_name": doc.file_name,
-                        "reason": str(e),
-                        "type": "error"
-                    })
-                    db.rollback()  # Rollback any partial changes
-                    # Continue with next document
-            
-            # Update job progress after each chunk
-            job.processed_documents = total_processed
-            job.successful_count = successful
-            job.failed_count = failed
-            job.skipped_count = skipped
-            job.updated_at = datetime.now()
-            db.commit()
-            
-            # Update task state
-            progress_pct = int((total_processed / job.total_documents) * 100) if job.total_documents > 0 else 0
-            self.update_state(
-                state="PROCESSING",
-                meta={
-                    "job_id": job_id,
-                    "progress": progress_pct,
-                    "processed": total_processed,
-                    "total": job.total_documents,
-                    "successful": successful,
-                    "failed": failed
-                }
-            )
-            
-            logger.info(f"Job {job_id} progress: {total_processed}/{job.total_documents} ({progress_pct}%)")
-        
-        # Mark job as completed
-        job.status = 'completed'
-        job.completed_at = datetime.now()
-        summary = dict(job.results_summary or {})
-        summary.update({
-            "total_processed": total_processed,
-            "successful": successful,
-            "failed": failed,
-            "skipped": skipped,
-            "completion_time": datetime.now().isoformat(),
-            "error_details": error_details[:100]  # Store first 100 errors to avoid bloat
-        })
-        job.results_summary = summary
-        db.commit()
-        
-        logger.info(f"Completed batch job {job_id}: {successful} successful, {failed} failed, {skipped} skipped")
-        
-        # Log summary of error types
-        if error_details:
-            validation_errors = [e for e in error_details if e.get("type") == "validation"]
-            processing_errors = [e for e in error_details if e.get("type") == "error"]
-            logger.info(f"Error breakdown: {len(validation_errors)} validation errors, {len(processing_errors)} processing errors")
-        
-        return {
-            "status": "completed",
-            "job_id": job_id,
-            "total_processed": total_processed,
-            "successful": successful,
-            "failed": failed,
-            "skipped": skipped,
-            "error_summary": {
-                "validation_errors": len([e for e in error_details if e.get("type") == "validation"]),
-                "processing_errors": len([e for e in error_details if e.get("type") == "error"])
-            }
-        }
-        
-    except SoftTimeLimitExceeded:
-        logger.warning(f"Soft time limit exceeded for job {job_id}")
-        job = db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
-        if job:
-            job.status = 'failed'
-            job.completed_at = datetime.now()
-            summary = dict(job.results_summary or {})
-            summary.update({"error": "Time limit exceeded"})
-            job.results_summary = summary
-            db.commit()
-        return {"status": "timeout", "message": "Processing time limit exceeded"}
-    
     except Exception as e:
         logger.error(f"Error in batch reprocessing job {job_id}: {str(e)}", exc_info=True)
+        db.rollback()
         job = db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
         if job:
             job.status = 'failed'
@@ -293,5 +136,55 @@ def reprocess_documents_batch(self, job_id: int):
         return {"status": "error", "message": str(e)}
     
     finally:
-        release_job_lock(job_id, task_id)
+        if not dispatched:
+            release_job_lock(job_id, task_id)
         db.close()
+
+
+@celery_app.task(
+    name="app.tasks.batch_reprocessing_tasks.reprocess_document_chunk",
+    bind=True,
+    base=DatabaseTask,
+    time_limit=CHUNK_TIME_LIMIT,  # 15 minutes hard limit
+    soft_time_limit=CHUNK_TIME_LIMIT - 60  # 14 minutes soft limit
+)
+def reprocess_document_chunk(self, job_id: int, after_id: int, last_id: int):
+    """
+    Celery task: Reprocess one id-range chunk of a batch job.
+    
+    Never raises, so the rest of its lane keeps going; documents it didn't
+    get to stay unfinished and are reported by the finalizer.
+    """
+    try:
+        counts = BatchReprocessingService(self.db).process_chunk(job_id, after_id, last_id)
+        logger.info(f"Job {job_id} chunk ({after_id}, {last_id}]: {counts}")
+        return {"status": "completed", "job_id": job_id, "range": [after_id, last_id], **counts}
+    except SoftTimeLimitExceeded:
+        logger.warning(f"Soft time limit exceeded for job {job_id} chunk ({after_id}, {last_id}]")
+        self.db.rollback()
+        return {"status": "timeout", "job_id": job_id, "range": [after_id, last_id]}
+    except Exception as e:
+        logger.error(f"Error in job {job_id} chunk ({after_id}, {last_id}]: {str(e)}", exc_info=True)
+        self.db.rollback()
+        return {"status": "error", "job_id": job_id, "range": [after_id, last_id], "message": str(e)}
+
+
+@celery_app.task(
+    name="app.tasks.batch_reprocessing_tasks.finalize_reprocessing_job",
+    bind=True,
+    base=DatabaseTask
+)
+def finalize_reprocessing_job(self, job_id: int, lock_owner: Optional[str] = None):
+    """
+    Celery task: chord callback settling a batch job from its checkpoints and
+    releasing the job lock its dispatcher (lock_owner) kept while chunks ran.
+    """
+    from app.utils.task_idempotency import release_job_lock
+    try:
+        return BatchReprocessingService(self.db).finalize_job(job_id)
+    except Exception as e:
+        logger.error(f"Error finalizing batch job {job_id}: {str(e)}", exc_info=True)
+        return {"status": "error", "message": str(e)}
+    finally:
+        if lock_owner:
+            release_job_lock(job_id, lock_owner)
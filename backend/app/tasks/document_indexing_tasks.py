@@ -0,0 +1,126 @@
+"""
+Document Indexing Celery Tasks
+
+Incrementally chunks, embeds and syncs changed documents for RAG, and
+reconciles chunk sync state against Pinecone. Both only touch what changed
+since their last run, so they are cheap to schedule often.
+"""
+
+import logging
+import uuid
+from typing import List, Optional
+
+from app.core.celery_config import celery_app
+from app.db.database import SessionLocal
+from app.services.document_indexing_service import DocumentIndexingService
+from app.utils.task_idempotency import acquire_generic_lock, extend_generic_lock, release_generic_lock
+
+logger = logging.getLogger(__name__)
+
+INDEX_TIME_LIMIT = 3600
+# Held by a corpus-scan chain from its first run to its last; each run refreshes it,
+# so it only expires if a run dies without re-queuing or releasing
+INDEX_CHAIN_LOCK_KEY = "document_index_chain"
+INDEX_CHAIN_LOCK_TTL = 2 * INDEX_TIME_LIMIT
+
+
+@celery_app.task(
+    name="app.tasks.document_indexing_tasks.index_documents",
+    bind=True,
+    time_limit=INDEX_TIME_LIMIT,
+    soft_time_limit=INDEX_TIME_LIMIT - 300
+)
+def index_documents(
+    self,
+    after_id: int = 0,
+    force: bool = False,
+    document_ids: Optional[List[int]] = None,
+    chain_id: Optional[str] = None
+):
+    """
+    Celery task: index up to DOCUMENT_INDEX_MAX_DOCUMENTS_PER_RUN documents.
+
+    Re-queues itself after the last document it handled until the corpus (or
+    the given document_ids) is done, so no single run holds a worker for long.
+    A corpus scan holds a Redis lock across the whole chain: a new scan (e.g.
+    the hourly beat tick) is skipped while one is in flight, so two chains never
+    index the same documents concurrently.
+
+    Args:
+        after_id: Resume the corpus scan after this document id
+        force: Re-index even unchanged documents
+        document_ids: Specific documents to index (whole corpus if None)
+        chain_id: Lock token of the corpus-scan chain this run continues
+
+    Returns:
+        dict: Indexing counters for this run
+    """
+    corpus_scan = document_ids is None
+    if corpus_scan:
+        if chain_id is None:
+            chain_id = self.request.id or uuid.uuid4().hex
+            if not acquire_generic_lock(INDEX_CHAIN_LOCK_KEY, chain_id, INDEX_CHAIN_LOCK_TTL):
+                logger.info("Document indexing skipped: a corpus indexing chain is already running")
+                return {"status": "skipped", "message": "Corpus indexing chain already running"}
+        elif not extend_generic_lock(INDEX_CHAIN_LOCK_KEY, chain_id, INDEX_CHAIN_LOCK_TTL):
+            logger.warning(f"Document indexing chain {chain_id} lost its lock; stopping")
+            return {"status": "skipped", "message": "Corpus indexing chain superseded"}
+
+    requeued = False
+    db = SessionLocal()
+    try:
+        stats = DocumentIndexingService(db).index_documents(
+            document_ids=document_ids, force=force, after_id=after_id
+        )
+        if stats["has_more"]:
+            if document_ids is not None:
+                remaining = document_ids[stats["total_documents"]:]
+                index_documents.apply_async(kwargs={"force": force, "document_ids": remaining})
+            else:
+                index_documents.apply_async(
+                    kwargs={"after_id": stats["last_document_id"], "force": force, "chain_id": chain_id}
+                )
+            requeued = True
+        return {"status": "completed", **stats}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Document indexing failed: {str(e)}", exc_info=True)
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+        if corpus_scan and not requeued:
+            release_generic_lock(INDEX_CHAIN_LOCK_KEY, chain_id)
+
+
+@celery_app.task(
+    name="app.tasks.document_indexing_tasks.reconcile_vector_sync",
+    bind=True,
+    time_limit=1800,
+    soft_time_limit=1700
+)
+def reconcile_vector_sync(self, full: bool = False):
+    """
+    Celery task: check chunks changed since the last reconciliation against Pinecone.
+
+    Args:
+        full: Check every chunk instead of only those past the watermark
+
+    Returns:
+        dict: Reconciliation report
+    """
+    db = SessionLocal()
+    try:
+        try:
+            from app.services.pinecone_sync_service import PineconeSyncService
+            sync_service = PineconeSyncService(db)
+        except Exception as e:
+            logger.warning(f"Skipping vector reconciliation, Pinecone unavailable: {str(e)}")
+            return {"status": "skipped", "message": str(e)}
+        report = sync_service.reconcile_sync(full=full)
+        return {"status": "completed" if report.get("success") else "error", **report}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Vector reconciliation failed: {str(e)}", exc_info=True)
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
@@ -0,0 +1,188 @@
+"""
+Portfolio Export Celery Tasks
+
+Runs large multi-property exports in the background: rows are streamed from
+the database into a temporary file and uploaded to MinIO with multipart upload.
+"""
+
+from datetime import datetime
+import logging
+import os
+import tempfile
+import time
+
+from celery.exceptions import SoftTimeLimitExceeded
+
+from app.core.celery_config import celery_app
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.batch_reprocessing_job import BatchReprocessingJob
+from app.services.export_job_service import JOB_TYPE
+from app.services.streaming_export_service import CONTENT_TYPES, StreamingExportService
+
+logger = logging.getLogger(__name__)
+
+MULTIPART_PART_SIZE = 16 * 1024 * 1024
+PROGRESS_INTERVAL_SECONDS = 2.0
+
+
+class ExportCancelled(Exception):
+    """Raised from the progress callback when the job was revoked."""
+
+
+def _is_revoked(task) -> bool:
+    request = getattr(task, "request", None)
+    if not request:
+        return False
+    if getattr(request, "is_revoked", False):
+        return True
+    task_id = getattr(request, "id", None)
+    if not task_id:
+        return False
+    return celery_app.AsyncResult(task_id).state == "REVOKED"
+
+
+def _fail_job(db, job_id: int, message: str, status: str = 'failed') -> None:
+    db.rollback()
+    job = db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
+    if job:
+        summary = dict(job.results_summary or {})
+        job.status = status
+        job.completed_at = datetime.now()
+        if status == 'failed':
+            summary.update({"error": message})
+        job.results_summary = summary
+        db.commit()
+
+
+@celery_app.task(
+    name="app.tasks.export_tasks.run_portfolio_export",
+    bind=True,
+    time_limit=7200,
+    soft_time_limit=6900
+)
+def run_portfolio_export(self, job_id: int):
+    """
+    Celery task: write a portfolio export and upload it to MinIO.
+
+    XLSX jobs produce one workbook; CSV/Parquet jobs produce one object per
+    statement type. Progress (rows written) is persisted every few seconds.
+
+    Args:
+        job_id: BatchReprocessingJob ID with job_type "portfolio_export"
+
+    Returns:
+        dict: Export summary with uploaded objects
+    """
+    from app.db.minio_client import ensure_bucket_exists, minio_client
+    from app.utils.task_idempotency import acquire_generic_lock, release_generic_lock
+
+    task_id = self.request.id
+    lock_key = f"export_job:{job_id}"
+    db = SessionLocal()
+    try:
+        job = db.query(BatchReprocessingJob).filter(BatchReprocessingJob.id == job_id).first()
+        if not job:
+            logger.error(f"Export job {job_id} not found")
+            return {"status": "error", "message": f"Job {job_id} not found"}
+
+        summary = dict(job.results_summary or {})
+        if summary.get("job_type") != JOB_TYPE:
+            return {"status": "error", "message": "Invalid job type"}
+        if job.status in ("completed", "cancelled"):
+            return {"status": "skipped", "message": f"Job already {job.status}"}
+        if not acquire_generic_lock(lock_key, task_id, ttl_seconds=7200):
+            return {"status": "skipped", "message": "Job already in progress"}
+
+        export_format = summary["export_format"]
+        statement_types = list(job.document_types or [])
+        filters = dict(
+            organization_id=job.organization_id,
+            property_ids=job.property_ids,
+            date_range_start=job.date_range_start,
+            date_range_end=job.date_range_end,
+        )
+
+        if export_format == "xlsx":
+            outputs = [statement_types]
+        else:
+            outputs = [[s] for s in statement_types]
+
+        service = StreamingExportService(db)
+        rows_before = 0
+        last_flush = 0.0
+        files = []
+
+        def on_progress(rows_in_file: int):
+            nonlocal last_flush
+            now = time.monotonic()
+            if now - last_flush < PROGRESS_INTERVAL_SECONDS:
+                return
+            last_flush = now
+            if _is_revoked(self):
+                raise ExportCancelled()
+            job.processed_documents = rows_before + rows_in_file
+            job.updated_at = datetime.now()
+            db.commit()
+            self.update_state(
+                state="PROCESSING",
+                meta={"job_id": job_id, "rows_written": job.processed_documents, "total": job.total_documents}
+            )
+
+        ensure_bucket_exists(settings.MINIO_BUCKET_NAME)
+        with tempfile.TemporaryDirectory(prefix=f"export_{job_id}_") as tmpdir:
+            for output_types in outputs:
+                label = "portfolio" if len(output_types) > 1 else output_types[0]
+                filename = f"{label}_{job_id}.{export_format}"
+                path = os.path.join(tmpdir, filename)
+
+                with open(path, "wb") as fileobj:
+                    rows = service.write_export(
+                        fileobj, export_format, output_types, progress_callback=on_progress, **filters
+                    )
+
+                object_name = f"exports/{job.organization_id or 'global'}/{job_id}/{filename}"
+                minio_client.fput_object(
+                    settings.MINIO_BUCKET_NAME,
+                    object_name,
+                    path,
+                    content_type=CONTENT_TYPES[export_format],
+                    part_size=MULTIPART_PART_SIZE,
+                )
+                rows_before += rows
+                files.append({
+                    "object_name": object_name,
+                    "statement_types": output_types,
+                    "rows": rows,
+                    "size_bytes": os.path.getsize(path),
+                })
+
+        job.processed_documents = rows_before
+        job.successful_count = len(files)
+        job.status = 'completed'
+        job.completed_at = datetime.now()
+        summary.update({"files": files, "completion_time": datetime.now().isoformat()})
+        job.results_summary = summary
+        db.commit()
+
+        logger.info(f"Completed export job {job_id}: {rows_before} rows in {len(files)} file(s)")
+        return {"status": "completed", "job_id": job_id, "rows": rows_before, "files": files}
+
+    except ExportCancelled:
+        logger.info(f"Export job {job_id} revoked, stopping")
+        _fail_job(db, job_id, "Cancelled", status='cancelled')
+        return {"status": "cancelled", "job_id": job_id}
+
+    except SoftTimeLimitExceeded:
+        logger.warning(f"Soft time limit exceeded for export job {job_id}")
+        _fail_job(db, job_id, "Time limit exceeded")
+        return {"status": "timeout", "message": "Export time limit exceeded"}
+
+    except Exception as e:
+        logger.error(f"Error in export job {job_id}: {str(e)}", exc_info=True)
+        _fail_job(db, job_id, str(e))
+        return {"status": "error", "message": str(e)}
+
+    finally:
+        release_generic_lock(lock_key, task_id)
+        db.close()
@@ -260,6 +260,40 @@ def extract_document(self, upload_id: int):
         }
 
 
+@celery_app.task(
+    name="app.tasks.extraction_tasks.validate_upload",
+    bind=True,
+    base=DatabaseTask,
+    time_limit=180,
+    soft_time_limit=150,
+    autoretry_for=(ConnectionError, OSError),
+    retry_backoff=True,
+    max_retries=3,
+)
+def validate_upload(self, upload_id: int):
+    """
+    Celery task: validation pre-stage for uploads accepted with defer_validation.
+
+    Runs property/type/year detection on the stored file, then either marks the
+    upload 'validation_failed' or queues extract_document.
+    """
+    import asyncio
+    from app.services.document_service import DocumentService
+
+    try:
+        result = asyncio.run(DocumentService(self.db).run_deferred_validation(upload_id))
+        logger.info(f"Validation pre-stage for upload_id={upload_id}: {result}")
+        return result
+    except SoftTimeLimitExceeded:
+        logger.error(f"Validation pre-stage timed out for upload_id={upload_id}")
+        upload = self.db.query(DocumentUpload).filter(DocumentUpload.id == upload_id).first()
+        if upload and upload.extraction_status == 'validating':
+            upload.extraction_status = 'failed'
+            upload.notes = "Validation timed out"
+            self.db.commit()
+        return {"success": False, "upload_id": upload_id, "error": "Validation timed out"}
+
+
 @celery_app.task(name="app.tasks.extraction_tasks.retry_failed_extraction")
 def retry_failed_extraction(upload_id: int):
     """
@@ -312,6 +346,22 @@ def recover_stuck_extractions():
         ).limit(50).all()
         
         logger.info(f"Recovery task: Found {len(stuck_uploads)} stuck upload(s)")
+
+        # Deferred uploads whose validation pre-stage was never queued
+        unvalidated_uploads = db.query(DocumentUpload).filter(
+            DocumentUpload.extraction_status == 'validating',
+            DocumentUpload.extraction_task_id.is_(None),
+            DocumentUpload.upload_date > datetime.utcnow() - timedelta(hours=24)
+        ).limit(50).all()
+        for upload in unvalidated_uploads:
+            try:
+                task = validate_upload.delay(upload.id)
+                upload.extraction_task_id = task.id
+                db.commit()
+                recovered_count += 1
+            except Exception as e:
+                error_count += 1
+                logger.error(f"❌ Failed to queue validation for upload_id={upload.id}: {e}")
         
         for upload in stuck_uploads:
             try:
@@ -332,7 +382,7 @@ def recover_stuck_extractions():
         return {
             "recovered": recovered_count,
             "errors": error_count,
-            "total_found": len(stuck_uploads)
+            "total_found": len(stuck_uploads) + len(unvalidated_uploads)
         }
     except Exception as e:
         logger.error(f"Recovery task failed: {e}")
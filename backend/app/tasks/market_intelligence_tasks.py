@@ -3,8 +3,10 @@ Celery tasks for Market Intelligence ingestion and refresh.
 Leverages existing market_data_service routines; uses sample generators as fallback.
 """
 
+import asyncio
 from celery import shared_task
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 from app.db.database import SessionLocal
 from app.models.property import Property
 from app.models.market_intelligence import MarketIntelligence
@@ -24,6 +26,78 @@ def refresh_market_intelligence_task(property_code: str, property_id: Optional[i
     """
     Refresh all market intelligence categories for a property (async).
     """
+    return _refresh_property(property_code, property_id)
+
+
+@shared_task(name="market_intelligence.refresh_portfolio")
+def refresh_portfolio_market_intelligence_task(
+    organization_id: Optional[int] = None,
+    property_ids: Optional[List[int]] = None,
+    max_concurrency: int = 4
+):
+    """
+    Refresh market intelligence for many properties concurrently.
+
+    OSM features for the whole portfolio are prefetched with batched
+    Overpass queries (one per tile of nearby properties), then properties are
+    refreshed in parallel, each with its own database session.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Property.id, Property.property_code, Property.latitude, Property.longitude)
+        if organization_id is not None:
+            query = query.filter(Property.organization_id == organization_id)
+        if property_ids:
+            query = query.filter(Property.id.in_(property_ids))
+        targets = query.all()
+    finally:
+        db.close()
+
+    if not targets:
+        return {"status": "completed", "refreshed": 0, "results": {}}
+
+    results = asyncio.run(_refresh_portfolio(targets, max_concurrency))
+    statuses = [r.get("status") for r in results.values()]
+    logger.info(f"[MI] Portfolio refresh: {len(results)} properties, {statuses.count('success')} fully refreshed")
+    return {
+        "status": "completed",
+        "refreshed": len(results),
+        "succeeded": statuses.count("success"),
+        "partial": statuses.count("partial"),
+        "failed": statuses.count("error"),
+        "results": results,
+    }
+
+
+async def _refresh_portfolio(targets, max_concurrency: int) -> Dict[str, Dict]:
+    points = [
+        (float(t.latitude), float(t.longitude))
+        for t in targets if t.latitude is not None and t.longitude is not None
+    ]
+    if points:
+        db = SessionLocal()
+        try:
+            await _service(db).aprefetch_osm_features(points, max_concurrency=max_concurrency)
+        except Exception as e:
+            logger.warning(f"[MI] OSM prefetch failed, falling back to per-property queries: {e}")
+        finally:
+            db.close()
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def refresh(target):
+        async with semaphore:
+            try:
+                return target.property_code, await asyncio.to_thread(
+                    _refresh_property, target.property_code, target.id
+                )
+            except Exception as e:
+                return target.property_code, {"status": "error", "error": str(e)}
+
+    return dict(await asyncio.gather(*(refresh(t) for t in targets)))
+
+
+def _refresh_property(property_code: str, property_id: Optional[int] = None) -> Dict:
     db = SessionLocal()
     try:
         if property_id is not None:
@@ -74,44 +148,35 @@ def refresh_market_intelligence_task(property_code: str, property_id: Optional[i
             'longitude': longitude,
         }
 
-        # Demographics
-        try:
-            demo = service.fetch_enhanced_demographics(latitude, longitude) if latitude and longitude else None
-            mi.demographics = demo or service.generate_sample_demographics(property_code)
-            results['demographics'] = 'ok'
-        except Exception as e:
-            logger.error(f"[MI] demographics failed: {e}")
-            results['demographics'] = f"error:{e}"
-
-        # Economic
-        try:
-            econ = service.fetch_fred_economic_indicators()
-            mi.economic_indicators = econ or service.generate_sample_economic()
-            results['economic'] = 'ok'
-        except Exception as e:
-            logger.error(f"[MI] economic failed: {e}")
-            results['economic'] = f"error:{e}"
-
-        # Location
-        try:
-            loc = service.fetch_location_intelligence(latitude, longitude) if latitude and longitude else None
-            mi.location_intelligence = loc or service.generate_sample_location(latitude or 37.77, longitude or -122.42)
-            results['location'] = 'ok'
-        except Exception as e:
-            logger.error(f"[MI] location failed: {e}")
-            results['location'] = f"error:{e}"
-
-        # ESG
-        try:
-            esg = None
-            if latitude and longitude:
-                meta = {'property_code': property_code, 'property_type': prop.property_type, 'year_built': getattr(prop, 'year_built', None)}
-                esg = service.fetch_esg_assessment(latitude, longitude, meta)
-            mi.esg_assessment = esg or service.generate_sample_esg()
-            results['esg'] = 'ok'
-        except Exception as e:
-            logger.error(f"[MI] esg failed: {e}")
-            results['esg'] = f"error:{e}"
+        # Demographics, economic, location and ESG are independent external
+        # lookups: fetch them in parallel, then apply sample fallbacks
+        has_coords = bool(latitude and longitude)
+        fetched = service.fetch_property_market_data(
+            latitude if has_coords else None,
+            longitude if has_coords else None,
+            property_data={
+                'property_code': property_code,
+                'property_type': prop.property_type,
+                'year_built': getattr(prop, 'year_built', None)
+            }
+        )
+        fetch_errors = fetched.get('errors', {})
+        fallbacks = {
+            'demographics': ('demographics', lambda: service.generate_sample_demographics(property_code)),
+            'economic': ('economic_indicators', service.generate_sample_economic),
+            'location': ('location_intelligence', lambda: service.generate_sample_location(latitude or 37.77, longitude or -122.42)),
+            'esg': ('esg_assessment', service.generate_sample_esg),
+        }
+        for category, (attr, sample) in fallbacks.items():
+            if category in fetch_errors:
+                results[category] = f"error:{fetch_errors[category]}"
+                continue
+            try:
+                setattr(mi, attr, fetched.get(category) or sample())
+                results[category] = 'ok'
+            except Exception as e:
+                logger.error(f"[MI] {category} failed: {e}")
+                results[category] = f"error:{e}"
 
         # Forecasts
         try:
@@ -0,0 +1,44 @@
+"""
+Quota Celery Tasks
+
+Expires reservations of abandoned uploads and reconciles every organization's
+document/storage counters against the stored documents.
+"""
+
+import logging
+
+from app.core.celery_config import celery_app
+from app.db.database import SessionLocal
+from app.services.quota_service import expire_stale_reservations, refresh_all_orgs_usage
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    name="app.tasks.quota_tasks.reconcile_quota_usage",
+    bind=True,
+    time_limit=600,
+    soft_time_limit=540
+)
+def reconcile_quota_usage(self):
+    """
+    Celery task: expire stale quota reservations, then reconcile usage.
+
+    Returns:
+        dict: Reservations expired and organizations whose counters changed
+    """
+    db = SessionLocal()
+    try:
+        expired = expire_stale_reservations(db)
+        db.commit()
+        orgs_updated = refresh_all_orgs_usage(db)
+        db.commit()
+        if expired or orgs_updated:
+            logger.info(f"Quota reconciliation: expired={expired}, orgs_updated={orgs_updated}")
+        return {"status": "completed", "expired": expired, "orgs_updated": orgs_updated}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Quota reconciliation failed: {str(e)}", exc_info=True)
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+"""
+Webhook Delivery Celery Tasks
+
+Drains the webhook_outbox table. Beat starts one dispatcher run per minute;
+each run keeps polling for its time budget so new events go out within about
+a second. Concurrent runs are safe because rows are claimed with SKIP LOCKED.
+"""
+
+import asyncio
+import logging
+
+from celery.exceptions import SoftTimeLimitExceeded
+
+from app.core.celery_config import celery_app
+from app.services.webhook_dispatcher import WebhookDispatcher
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_TIME_BUDGET_SECONDS = 50.0
+
+
+@celery_app.task(
+    name="app.tasks.webhook_tasks.dispatch_webhook_outbox",
+    bind=True,
+    time_limit=120,
+    soft_time_limit=90
+)
+def dispatch_webhook_outbox(self, time_budget_seconds: float = DISPATCH_TIME_BUDGET_SECONDS):
+    """
+    Celery task: deliver due webhook events.
+
+    Args:
+        time_budget_seconds: How long to keep polling the outbox
+
+    Returns:
+        dict: Totals for claimed, delivered, retried and dead events
+    """
+    try:
+        stats = asyncio.run(WebhookDispatcher().run(time_budget_seconds=time_budget_seconds))
+        if stats["claimed"]:
+            logger.info(f"Webhook dispatch: {stats}")
+        return {"status": "completed", **stats}
+    except SoftTimeLimitExceeded:
+        logger.warning("Soft time limit exceeded for webhook dispatch")
+        return {"status": "timeout"}
+    except Exception as e:
+        logger.error(f"Webhook dispatch failed: {str(e)}", exc_info=True)
+        return {"status": "error", "message": str(e)}
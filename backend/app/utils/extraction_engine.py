@@ -5,10 +5,12 @@ from app.utils.engines.pdfplumber_engine import PDFPlumberEngine
 from app.utils.engines.base_extractor import ExtractionResult
 from app.utils.pdf_classifier import PDFClassifier, DocumentType
 from app.utils.quality_validator import QualityValidator
+from app.utils.property_detector import get_property_detector
 import time
 
 if TYPE_CHECKING:
     from app.services.model_scoring_service import ScoringFactors
+    from app.services.engine_scheduler import EnginePlan
 
 # Optional engines with heavy dependencies - import gracefully
 logger = logging.getLogger(__name__)
@@ -186,8 +188,6 @@ class MultiEngineExtractor:
                 "validation_status": str  # "HIGH_CONFIDENCE", "MEDIUM_CONFIDENCE", "UNCERTAIN"
             }
         """
-        import re
-
         try:
             # Extract text from first page
             result = self.pymupdf.extract_text(pdf_data)
@@ -209,168 +209,9 @@ class MultiEngineExtractor:
                 }
 
             first_page_text = pages[0].get("text", "")
-            first_page_lines = first_page_text.split('\n')
-
-            # Extract header (first 5 non-empty lines)
-            header_lines = [line.strip() for line in first_page_lines[:10] if line.strip()][:5]
-            header_text = ' '.join(header_lines)
-
-            # A/R exclusion patterns (case-insensitive)
-            ar_patterns = [
-                r'receivable\s+from',
-                r'due\s+from',
-                r'owed\s+by',
-                r'a/r\s+',
-                r'account\s+receivable',
-                r'\b\d{4}-\d{4}\b',  # Account codes like 1100-0001
-                r'payable\s+to',
-                r'due\s+to'
-            ]
-
-            # Property detection results
-            property_scores = {}
-
-            for prop in available_properties:
-                prop_code = prop.get('property_code', '')
-                prop_name = prop.get('property_name', '')
-                prop_city = prop.get('city', '')
-
-                if not prop_code:
-                    continue
-
-                # Initialize scoring
-                header_score = 0
-                metadata_score = 0
-                body_score = 0
-                evidence = []
-                ar_mentions = []
-
-                # === LAYER 1: Header/Title Analysis (50% weight, max 50 points) ===
-                header_lower = header_text.lower()
-
-                # Check for property code in header
-                if prop_code.lower() in header_lower:
-                    header_score += 25
-                    evidence.append(f"Code '{prop_code}' in header")
-
-                # Check for property name words in header
-                if prop_name:
-                    name_words = [w for w in prop_name.lower().split() if len(w) > 3]
-                    matched = sum(1 for w in name_words if w in header_lower)
-                    if matched > 0:
-                        name_match_score = (matched / len(name_words)) * 25
-                        header_score += name_match_score
-                        evidence.append(f"Name words ({matched}/{len(name_words)}) in header")
-
-                # === LAYER 2: Metadata Fields (30% weight, max 30 points) ===
-                # Look for "Property:", "Entity:", "Location:" fields
-                metadata_patterns = [
-                    rf'property\s*:?\s*{re.escape(prop_name)}',
-                    rf'entity\s*:?\s*{re.escape(prop_name)}',
-                    rf'location\s*:?\s*{re.escape(prop_name)}',
-                    rf'property\s*:?\s*{re.escape(prop_code)}',
-                ]
-
-                page_lower = first_page_text.lower()
-                for pattern in metadata_patterns:
-                    if re.search(pattern, page_lower, re.IGNORECASE):
-                        metadata_score += 15
-                        evidence.append(f"Metadata field match")
-                        break
-
-                # Check city in metadata
-                if prop_city and re.search(rf'city\s*:?\s*{re.escape(prop_city)}', page_lower, re.IGNORECASE):
-                    metadata_score += 15
-                    evidence.append(f"City '{prop_city}' in metadata")
-
-                # === LAYER 3: Body Content (20% weight, max 20 points) ===
-                # Find mentions NOT in A/R context
-                for line in first_page_lines:
-                    line_lower = line.lower()
-
-                    # Skip if line contains A/R patterns
-                    is_ar_line = any(re.search(pattern, line_lower, re.IGNORECASE) for pattern in ar_patterns)
-
-                    if prop_name and prop_name.lower() in line_lower:
-                        if is_ar_line:
-                            ar_mentions.append(line.strip())
-                        else:
-                            body_score += 5  # Non-A/R mention
-                            if body_score == 5:  # First non-A/R mention
-                                evidence.append(f"Property name in body (non-A/R)")
-
-                    if prop_code.lower() in line_lower:
-                        if is_ar_line:
-                            ar_mentions.append(line.strip())
-                        else:
-                            body_score += 5  # Non-A/R mention
-                            if len([e for e in evidence if 'code in body' in e.lower()]) == 0:
-                                evidence.append(f"Property code in body (non-A/R)")
-
-                # Cap scores at their maximums
-                header_score = min(header_score, 50)
-                metadata_score = min(metadata_score, 30)
-                body_score = min(body_score, 20)
-
-                # Total score
-                total_score = header_score + metadata_score + body_score
-
-                # Store results
-                property_scores[prop_code] = {
-                    "code": prop_code,
-                    "name": prop_name,
-                    "total_score": total_score,
-                    "header_score": header_score,
-                    "metadata_score": metadata_score,
-                    "body_score": body_score,
-                    "evidence": evidence,
-                    "ar_mentions": ar_mentions
-                }
-
-            # Find primary property (highest score)
-            if not property_scores:
-                return {
-                    "primary_property": None,
-                    "referenced_properties": [],
-                    "recommendation": None,
-                    "validation_status": "UNCERTAIN"
-                }
 
-            sorted_properties = sorted(property_scores.items(), key=lambda x: x[1]["total_score"], reverse=True)
-
-            primary_code, primary_data = sorted_properties[0]
-            primary_score = primary_data["total_score"]
-
-            # Find referenced properties (lower scores, with A/R mentions)
-            referenced = []
-            for prop_code, prop_data in sorted_properties[1:]:
-                if prop_data["ar_mentions"] and prop_data["total_score"] < primary_score * 0.5:
-                    referenced.append({
-                        "code": prop_code,
-                        "name": prop_data["name"],
-                        "confidence": round(prop_data["total_score"], 1),
-                        "evidence": prop_data["ar_mentions"][:2]  # First 2 A/R mentions
-                    })
-
-            # Determine validation status
-            if primary_score >= 60:
-                validation_status = "HIGH_CONFIDENCE"
-            elif primary_score >= 40:
-                validation_status = "MEDIUM_CONFIDENCE"
-            else:
-                validation_status = "UNCERTAIN"
-
-            return {
-                "primary_property": {
-                    "code": primary_code,
-                    "name": primary_data["name"],
-                    "confidence": round(primary_score, 1),
-                    "evidence": primary_data["evidence"]
-                } if primary_score >= 20 else None,
-                "referenced_properties": referenced,
-                "recommendation": primary_code if primary_score >= 40 else None,
-                "validation_status": validation_status
-            }
+            # Score every property in one pass with the precompiled detector for this property set
+            return get_property_detector(available_properties).detect(first_page_text)
 
         except Exception as e:
             logger.error(f"Error in detect_property_with_intelligence: {e}")
@@ -839,7 +680,8 @@ class MultiEngineExtractor:
         self,
         pdf_data: bytes,
         strategy: str = "auto",
-        lang: str = "eng"
+        lang: str = "eng",
+        plan: Optional['EnginePlan'] = None
     ) -> Dict:
         """
         Extract text with automatic validation
@@ -848,6 +690,10 @@ class MultiEngineExtractor:
             pdf_data: PDF file as bytes
             strategy: 'auto', 'fast', 'accurate', 'multi_engine'
             lang: Language code for OCR
+            plan: Optional EnginePlan for adaptive engine selection. Used by
+                'multi_engine', and by 'auto' for non-scanned documents once the
+                plan has a proven engine (the proven engine then runs first and
+                the others only on low confidence or failed validation)
         
         Returns:
             dict: Extraction results with quality validation
@@ -860,14 +706,16 @@ class MultiEngineExtractor:
             doc_type = classification.get("document_type", DocumentType.DIGITAL)
             
             # Step 2: Select extraction strategy
-            if strategy == "auto":
+            if strategy == "auto" and plan is not None and not plan.exploring and doc_type != DocumentType.SCANNED:
+                extraction = self._extract_multi_engine(pdf_data, lang, plan=plan)
+            elif strategy == "auto":
                 extraction = self._extract_auto(pdf_data, doc_type, lang)
             elif strategy == "fast":
                 extraction = self._extract_fast(pdf_data)
             elif strategy == "accurate":
                 extraction = self._extract_accurate(pdf_data, lang)
             elif strategy == "multi_engine":
-                extraction = self._extract_multi_engine(pdf_data, lang)
+                extraction = self._extract_multi_engine(pdf_data, lang, plan=plan)
             else:
                 extraction = self._extract_auto(pdf_data, doc_type, lang)
             
@@ -946,26 +794,38 @@ class MultiEngineExtractor:
         
         return self._extract_auto(pdf_data, doc_type, lang)
     
-    def _extract_multi_engine(self, pdf_data: bytes, lang: str) -> Dict:
+    def _extract_multi_engine(self, pdf_data: bytes, lang: str, plan: Optional['EnginePlan'] = None) -> Dict:
         """
         Extract with multiple engines and return best result
         
-        Most accurate but slowest method
+        Most accurate but slowest method. With a plan, the other engine is skipped
+        when the template's proven engine passes validation above the plan's threshold.
         """
-        results = []
-        
-        # Extract with PyMuPDF
-        pymupdf_result = self.pymupdf.extract_text(pdf_data)
-        if pymupdf_result["success"]:
-            results.append(pymupdf_result)
-        
-        # Extract with PDFPlumber
-        pdfplumber_result = self.pdfplumber.extract_text(pdf_data)
-        if pdfplumber_result["success"]:
-            results.append(pdfplumber_result)
+        runners = {
+            "pymupdf": lambda: self.pymupdf.extract_text(pdf_data),
+            "pdfplumber": lambda: self.pdfplumber.extract_text(pdf_data),
+        }
+        if plan is not None:
+            validations = {}
+
+            def validation(result: Dict) -> Dict:
+                if id(result) not in validations:
+                    validations[id(result)] = self.validator.validate_extraction(result)
+                return validations[id(result)]
+
+            text_results = plan.run(
+                "multi_engine",
+                runners,
+                lambda r: validation(r)["confidence_score"] / 100 if r["success"] else 0.0,
+                validated=lambda r: r["success"] and not validation(r)["issues"]
+            )
+        else:
+            text_results = [run() for run in runners.values()]
+        results = [r for r in text_results if r["success"]]
         
-        # If both failed or low quality, try OCR
-        if len(results) < 2 or all(len(r.get("text", "")) < 100 for r in results):
+        # If both failed or low quality, try OCR (not needed when the plan stopped early)
+        stopped_early = len(text_results) < len(runners)
+        if not stopped_early and (len(results) < 2 or all(len(r.get("text", "")) < 100 for r in results)):
             ocr_result = self.ocr.extract_text_from_pdf(pdf_data, lang=lang)
             if ocr_result["success"]:
                 results.append(ocr_result)
@@ -1029,7 +889,8 @@ class MultiEngineExtractor:
     def extract_with_all_models_scored(
         self,
         pdf_data: bytes,
-        lang: str = "eng"
+        lang: str = "eng",
+        plan: Optional['EnginePlan'] = None
     ) -> Dict[str, Any]:
         """
         Extract using ALL available models and score each on 1-10 scale.
@@ -1040,6 +901,8 @@ class MultiEngineExtractor:
         Args:
             pdf_data: Binary PDF data
             lang: Language code for OCR engines (default: "eng")
+            plan: Optional EnginePlan; engines then run cheapest-proven first and
+                stop at the first sufficient one (skipped ones in "skipped_models")
         
         Returns:
             dict: {
@@ -1062,8 +925,6 @@ class MultiEngineExtractor:
                 "successful_models": 5
             }
         """
-        all_results = []
-        
         # List of all available engines with their display names
         engines_to_run = [
             ("PyMuPDF", self.pymupdf),
@@ -1082,119 +943,23 @@ class MultiEngineExtractor:
         
         logger.info(f"Running {len(engines_to_run)} extraction engines for scoring...")
         
-        # Run all engines
-        for engine_name, engine in engines_to_run:
-            try:
-                logger.info(f"Running {engine_name}...")
-                
-                # Handle different engine types
-                # Most engines have extract() method returning ExtractionResult
-                # OCR engine has extract_text_from_pdf() returning Dict
-                extracted_data = {}
-                processing_time_ms = 0.0
-                success = True
-                error = None
-                
-                try:
-                    if hasattr(engine, 'extract'):
-                        result = engine.extract(pdf_data, lang=lang)
-                        
-                        # Extract data (NOT confidence - models don't calculate it)
-                        if hasattr(result, 'extracted_data') and result.extracted_data:
-                            extracted_data = result.extracted_data
-                        
-                        # Get processing time
-                        if hasattr(result, 'processing_time_ms') and result.processing_time_ms:
-                            processing_time_ms = float(result.processing_time_ms)
-                        
-                        success = result.success if hasattr(result, 'success') else True
-                        if not success:
-                            error = getattr(result, 'error_message', 'Extraction failed')
-                    elif hasattr(engine, 'extract_text_from_pdf'):
-                        # OCR engine uses extract_text_from_pdf()
-                        result = engine.extract_text_from_pdf(pdf_data, lang=lang)
-                        
-                        # Convert dict result to extracted_data format
-                        extracted_data = {
-                            'text': result.get('text', ''),
-                            'pages': result.get('pages', []),
-                            'total_pages': result.get('total_pages', 0),
-                            'total_words': result.get('total_words', 0),
-                            'total_chars': result.get('total_chars', 0)
-                        }
-                        processing_time_ms = 0.0  # OCR doesn't track time
-                        success = result.get('success', False)
-                        if not success:
-                            error = result.get('error', 'Extraction failed')
-                    else:
-                        # Fallback: try extract_text() method
-                        result = engine.extract_text(pdf_data)
-                        
-                        # Convert dict result to extracted_data format
-                        extracted_data = {
-                            'text': result.get('text', ''),
-                            'pages': result.get('pages', []),
-                            'total_pages': result.get('total_pages', 0),
-                            'total_words': result.get('total_words', 0),
-                            'total_chars': result.get('total_chars', 0)
-                        }
-                        processing_time_ms = 0.0
-                        success = result.get('success', False)
-                        if not success:
-                            error = result.get('error', 'Extraction failed')
-                except Exception as e:
-                    success = False
-                    error = str(e)
-                    extracted_data = {}
-                
-                # Score externally using client-defined factors (NOT model's internal confidence)
-                scoring_result = self.scoring_service.score_extraction_result(
-                    model_name=engine_name,
-                    extracted_data=extracted_data,
-                    processing_time_ms=processing_time_ms,
-                    success=success,
-                    error=error
-                )
-                
-                score = scoring_result['score']
-                confidence = scoring_result['confidence']
-                
-                # Extract text length from extracted_data
-                text_length = len(extracted_data.get('text', '')) if extracted_data else 0
-                
-                # Prepare result dict
-                result_dict = {
-                    "model": engine_name,
-                    "score": score,
-                    "confidence": confidence,
-                    "success": success,
-                    "text_length": text_length,
-                    "processing_time_ms": round(processing_time_ms, 2),
-                    "extracted_data": extracted_data,
-                    "score_breakdown": scoring_result.get('score_breakdown', {}),
-                    "error": error
-                }
-                
-                # Add page count if available
-                if extracted_data and 'total_pages' in extracted_data:
-                    result_dict["page_count"] = extracted_data['total_pages']
-                
-                all_results.append(result_dict)
-                logger.info(f"{engine_name} completed: score={score}, confidence={confidence:.3f}, text_length={text_length}")
-                
-            except Exception as e:
-                error_msg = str(e)
-                logger.error(f"{engine_name} failed: {error_msg}")
-                all_results.append({
-                    "model": engine_name,
-                    "score": 0.0,
-                    "confidence": 0.0,
-                    "success": False,
-                    "text_length": 0,
-                    "processing_time_ms": 0.0,
-                    "extracted_data": {},
-                    "error": error_msg
-                })
+        # Run engines (all of them, or in plan order until one is sufficient)
+        if plan is not None:
+            from app.services.engine_scheduler import ENGINE_KEYS
+            runners = {
+                ENGINE_KEYS.get(engine_name, engine_name.lower()):
+                    (lambda engine_name=engine_name, engine=engine: self._run_scored_model(engine_name, engine, pdf_data, lang))
+                for engine_name, engine in engines_to_run
+            }
+            all_results = plan.run("all_models", runners, lambda r: r["confidence"] if r["success"] else 0.0)
+            ran = {r["model"] for r in all_results}
+            skipped_models = [engine_name for engine_name, _ in engines_to_run if engine_name not in ran]
+        else:
+            all_results = [
+                self._run_scored_model(engine_name, engine, pdf_data, lang)
+                for engine_name, engine in engines_to_run
+            ]
+            skipped_models = []
         
         # Find best model
         successful_results = [r for r in all_results if r['success']]
@@ -1219,9 +984,124 @@ class MultiEngineExtractor:
             "best_score": round(best_score, 1),
             "total_models": len(all_results),
             "successful_models": len(successful_results),
+            "skipped_models": skipped_models,
             "average_score": round(avg_score, 1)
         }
     
+    def _run_scored_model(self, engine_name: str, engine: Any, pdf_data: bytes, lang: str) -> Dict[str, Any]:
+        """Run one engine for extract_with_all_models_scored and score it externally"""
+        try:
+            logger.info(f"Running {engine_name}...")
+            
+            # Handle different engine types
+            # Most engines have extract() method returning ExtractionResult
+            # OCR engine has extract_text_from_pdf() returning Dict
+            extracted_data = {}
+            processing_time_ms = 0.0
+            success = True
+            error = None
+            
+            try:
+                if hasattr(engine, 'extract'):
+                    result = engine.extract(pdf_data, lang=lang)
+                    
+                    # Extract data (NOT confidence - models don't calculate it)
+                    if hasattr(result, 'extracted_data') and result.extracted_data:
+                        extracted_data = result.extracted_data
+                    
+                    # Get processing time
+                    if hasattr(result, 'processing_time_ms') and result.processing_time_ms:
+                        processing_time_ms = float(result.processing_time_ms)
+                    
+                    success = result.success if hasattr(result, 'success') else True
+                    if not success:
+                        error = getattr(result, 'error_message', 'Extraction failed')
+                elif hasattr(engine, 'extract_text_from_pdf'):
+                    # OCR engine uses extract_text_from_pdf()
+                    result = engine.extract_text_from_pdf(pdf_data, lang=lang)
+                    
+                    # Convert dict result to extracted_data format
+                    extracted_data = {
+                        'text': result.get('text', ''),
+                        'pages': result.get('pages', []),
+                        'total_pages': result.get('total_pages', 0),
+                        'total_words': result.get('total_words', 0),
+                        'total_chars': result.get('total_chars', 0)
+                    }
+                    processing_time_ms = 0.0  # OCR doesn't track time
+                    success = result.get('success', False)
+                    if not success:
+                        error = result.get('error', 'Extraction failed')
+                else:
+                    # Fallback: try extract_text() method
+                    result = engine.extract_text(pdf_data)
+                    
+                    # Convert dict result to extracted_data format
+                    extracted_data = {
+                        'text': result.get('text', ''),
+                        'pages': result.get('pages', []),
+                        'total_pages': result.get('total_pages', 0),
+                        'total_words': result.get('total_words', 0),
+                        'total_chars': result.get('total_chars', 0)
+                    }
+                    processing_time_ms = 0.0
+                    success = result.get('success', False)
+                    if not success:
+                        error = result.get('error', 'Extraction failed')
+            except Exception as e:
+                success = False
+                error = str(e)
+                extracted_data = {}
+            
+            # Score externally using client-defined factors (NOT model's internal confidence)
+            scoring_result = self.scoring_service.score_extraction_result(
+                model_name=engine_name,
+                extracted_data=extracted_data,
+                processing_time_ms=processing_time_ms,
+                success=success,
+                error=error
+            )
+            
+            score = scoring_result['score']
+            confidence = scoring_result['confidence']
+            
+            # Extract text length from extracted_data
+            text_length = len(extracted_data.get('text', '')) if extracted_data else 0
+            
+            # Prepare result dict
+            result_dict = {
+                "model": engine_name,
+                "score": score,
+                "confidence": confidence,
+                "success": success,
+                "text_length": text_length,
+                "processing_time_ms": round(processing_time_ms, 2),
+                "extracted_data": extracted_data,
+                "score_breakdown": scoring_result.get('score_breakdown', {}),
+                "error": error
+            }
+            
+            # Add page count if available
+            if extracted_data and 'total_pages' in extracted_data:
+                result_dict["page_count"] = extracted_data['total_pages']
+            
+            logger.info(f"{engine_name} completed: score={score}, confidence={confidence:.3f}, text_length={text_length}")
+            return result_dict
+            
+        except Exception as e:
+            error_msg = str(e)
+            logger.error(f"{engine_name} failed: {error_msg}")
+            return {
+                "model": engine_name,
+                "score": 0.0,
+                "confidence": 0.0,
+                "success": False,
+                "text_length": 0,
+                "processing_time_ms": 0.0,
+                "extracted_data": {},
+                "error": error_msg
+            }
+    
     def extract_with_consensus(
         self,
         pdf_data: bytes,
@@ -1345,7 +1225,8 @@ class MultiEngineExtractor:
     def extract_with_confidence(
         self,
         pdf_data: bytes,
-        run_all_engines: bool = True
+        run_all_engines: bool = True,
+        plan: Optional['EnginePlan'] = None
     ) -> List[ExtractionResult]:
         """
         NEW METHOD: Extract using all engines and return ExtractionResult objects.
@@ -1356,6 +1237,8 @@ class MultiEngineExtractor:
         Args:
             pdf_data: PDF file as bytes
             run_all_engines: If True, runs all 3 engines. If False, runs based on doc type
+            plan: Optional EnginePlan (with run_all_engines); engines then run
+                cheapest-proven first and stop once one reaches the plan's threshold
         
         Returns:
             List of ExtractionResult objects from each engine
@@ -1363,54 +1246,27 @@ class MultiEngineExtractor:
         results = []
         
         if run_all_engines:
-            # Run all three main engines for maximum confidence
-            
-            # PyMuPDF - Good for text
-            try:
-                pymupdf_result = self.pymupdf.extract(
-                    pdf_data,
-                    extract_tables=False,
-                    extract_metadata=True
-                )
-                results.append(pymupdf_result)
-            except Exception as e:
-                # Add failed result
-                results.append(ExtractionResult(
-                    engine_name="pymupdf",
-                    extracted_data={},
-                    success=False,
-                    error_message=str(e)
-                ))
-            
-            # PDFPlumber - Best for tables
-            try:
-                pdfplumber_result = self.pdfplumber.extract(
-                    pdf_data,
-                    extract_tables=True
-                )
-                results.append(pdfplumber_result)
-            except Exception as e:
-                results.append(ExtractionResult(
-                    engine_name="pdfplumber",
-                    extracted_data={},
-                    success=False,
-                    error_message=str(e)
-                ))
-            
-            # Camelot - Best for complex tables
-            try:
-                camelot_result = self.camelot.extract(
-                    pdf_data,
-                    flavor="both"  # Try both lattice and stream
+            # Run all three main engines for maximum confidence:
+            # PyMuPDF (text), PDFPlumber (tables), Camelot (complex tables, lattice + stream)
+            runners = {
+                "pymupdf": lambda: self._safe_extract(
+                    "pymupdf", lambda: self.pymupdf.extract(pdf_data, extract_tables=False, extract_metadata=True)
+                ),
+                "pdfplumber": lambda: self._safe_extract(
+                    "pdfplumber", lambda: self.pdfplumber.extract(pdf_data, extract_tables=True)
+                ),
+                "camelot": lambda: self._safe_extract(
+                    "camelot", lambda: self.camelot.extract(pdf_data, flavor="both")
+                ),
+            }
+            if plan is not None:
+                results = plan.run(
+                    "confidence",
+                    runners,
+                    lambda r: float(r.confidence_score) if r.success and not r.warnings else 0.0
                 )
-                results.append(camelot_result)
-            except Exception as e:
-                results.append(ExtractionResult(
-                    engine_name="camelot",
-                    extracted_data={},
-                    success=False,
-                    error_message=str(e)
-                ))
+            else:
+                results = [run() for run in runners.values()]
         
         else:
             # Run engines based on document type (optimized)
@@ -1452,3 +1308,15 @@ class MultiEngineExtractor:
                     ))
         
         return results
+    
+    def _safe_extract(self, engine_name: str, extract) -> ExtractionResult:
+        """Run an engine's extract(), turning exceptions into a failed ExtractionResult"""
+        try:
+            return extract()
+        except Exception as e:
+            return ExtractionResult(
+                engine_name=engine_name,
+                extracted_data={},
+                success=False,
+                error_message=str(e)
+            )
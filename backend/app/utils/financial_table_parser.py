@@ -3,14 +3,27 @@ Financial Table Parser - Specialized extraction for financial statement tables
 
 Uses PDFPlumber for table structure preservation and accurate data extraction
 Handles multi-column layouts with proper alignment of account codes and amounts
+
+Known layouts (utils/layout_template.py) skip table detection: pages are sliced
+at the column positions stored for the property's previous periods.
 """
 import pdfplumber
 import io
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from decimal import Decimal
 from datetime import datetime
 
+from app.utils.layout_template import (
+    build_layout,
+    columns_from_rows,
+    find_header,
+    group_lines,
+    line_text,
+    match_layout,
+    slice_rows,
+)
+
 
 class FinancialTableParser:
     """
@@ -29,8 +42,117 @@ class FinancialTableParser:
         self.account_code_pattern = self.account_code_patterns[0]  # Keep for backward compat
         # More specific amount pattern - requires comma OR decimal point to avoid matching account codes
         self.amount_pattern = re.compile(r'[\(\-]?\$?\s*(?:\d{1,3},(?:\d{3},)*\d{3}(?:\.\d{2})?|\d+\.\d{2})\)?')
+        # Column headings that mark a statement table's header row (layout learning)
+        self.statement_header_pattern = re.compile(
+            r'\b(account|code|description|amount|balance|period|month|ytd|year|current|prior|'
+            r'actual|budget|variance|total)\b|%',
+            re.IGNORECASE
+        )
+        
+    def _read_pages(
+        self,
+        pdf,
+        layouts: Optional[List[Dict]] = None,
+        describe_header: Optional[Callable[[List[List]], Tuple[Optional[int], Dict]]] = None
+    ) -> Tuple[List[Tuple[int, List[List[List]], Callable[[], str]]], Optional[Dict], bool, int]:
+        """
+        Tables of every page, with a page text getter (text is only extracted when asked for)
+        
+        If page one matches one of `layouts` (stored for this property and document
+        type), every page is sliced at the stored column positions and table
+        detection is skipped. A page whose slicing misses an amount printed on it
+        abandons the layout for the whole document. Otherwise tables come from
+        pdfplumber as before and the first table on page one becomes the layout
+        for the next period, if it starts with a recognizable header row.
+        
+        Args:
+            pdf: Open pdfplumber document
+            layouts: Known layouts (utils/layout_template.py) to try
+            describe_header: table -> (header row index, layout extras);
+                default _describe_statement_header
+        
+        Returns:
+            (pages as [(page_num, tables, page_text)], layout used or learned, layout_hit,
+             sliced rows carrying an amount - each should become a line item on a hit)
+        """
+        if layouts:
+            first_lines = group_lines(pdf.pages[0].extract_words())
+            match = match_layout(first_lines, layouts)
+            if match is not None:
+                sliced = self._slice_pages(pdf, first_lines, *match)
+                if sliced is not None:
+                    pages, amount_rows = sliced
+                    return pages, match[0], True, amount_rows
+        
+        pages = []
+        layout = None
+        for page_num, page in enumerate(pdf.pages, 1):
+            found = page.find_tables()
+            tables = [table.extract() for table in found]
+            if page_num == 1 and found:
+                layout = self._learn_layout(found[0], tables[0], describe_header or self._describe_statement_header)
+            pages.append((page_num, tables, page.extract_text))
+        return pages, layout, False, 0
+    
+    def _slice_pages(self, pdf, first_lines: List[List[Dict]], layout: Dict, body_start: int):
+        """Pages sliced at the layout's columns and the count of amount rows; None if any amount is lost"""
+        pages = []
+        amount_rows = 0
+        for page_num, page in enumerate(pdf.pages, 1):
+            if page_num == 1:
+                lines, start = first_lines, body_start
+            else:
+                lines = group_lines(page.extract_words())
+                # Continuation pages may not repeat the header: then every line is a candidate row
+                start = find_header(lines, layout) or 0
+            rows = slice_rows(lines, layout, start)
+            
+            line_amounts = [len(self.amount_pattern.findall(line_text(line))) for line in lines[start:]]
+            row_amounts = [sum(len(self.amount_pattern.findall(cell)) for cell in row) for row in rows]
+            if sum(1 for n in line_amounts if n) != sum(1 for n in row_amounts if n) or sum(line_amounts) != sum(row_amounts):
+                return None
+            amount_rows += sum(1 for n in row_amounts if n)
+            
+            text = "\n".join(line_text(line) for line in lines)
+            pages.append((page_num, [rows] if rows else [], lambda text=text: text))
+        return pages, amount_rows
+    
+    def _learn_layout(
+        self,
+        table,
+        rows: List[List],
+        describe_header: Callable[[List[List]], Tuple[Optional[int], Dict]]
+    ) -> Optional[Dict]:
+        """Layout (header text + column positions) of a detected pdfplumber table, None if unusable"""
+        try:
+            header_index, extras = describe_header(rows)
+            if header_index is None or header_index >= len(rows):
+                return None
+            row_cells = [row.cells for row in table.rows]
+            header_cells = [cell for cell in row_cells[header_index] if cell]
+            top = min(cell[1] for cell in header_cells) if header_cells else table.bbox[1]
+            return build_layout(rows[header_index], columns_from_rows(row_cells), top, **extras)
+        except Exception:
+            # Layout learning is an optimisation only
+            return None
+    
+    def _describe_statement_header(self, table: List[List]) -> Tuple[Optional[int], Dict]:
+        """
+        Header row of a balance sheet / income statement / cash flow table
         
-    def extract_balance_sheet_table(self, pdf_data: bytes) -> Dict:
+        A header row has at least two filled cells, no amounts or account codes,
+        and column headings (Account, Amount, YTD, %...). Tables that start
+        with data rows have no header and yield no layout.
+        """
+        for index, row in enumerate(table[:3]):
+            cells = [str(cell).strip() for cell in row if cell and str(cell).strip()]
+            if any(self.amount_pattern.search(cell) or self.account_code_pattern.search(cell) for cell in cells):
+                return None, {}  # Data starts before any header
+            if len(cells) >= 2 and any(self.statement_header_pattern.search(cell) for cell in cells):
+                return index, {}
+        return None, {}
+    
+    def extract_balance_sheet_table(self, pdf_data: bytes, layouts: Optional[List[Dict]] = None) -> Dict:
         """
         Extract balance sheet with table structure and header metadata
         
@@ -38,6 +160,10 @@ class FinancialTableParser:
         - Header metadata: property_name, report_title, period_ending, accounting_basis, report_date
         - Line items with hierarchy and categorization
         
+        Args:
+            pdf_data: PDF bytes
+            layouts: Stored layouts for this property/document type (see _read_pages)
+        
         Returns:
             dict: {
                 "header": {
@@ -52,23 +178,22 @@ class FinancialTableParser:
                 "success": True,
                 "total_items": 50,
                 "extraction_method": "table",
-                "total_pages": 2
+                "total_pages": 2,
+                "layout": {...},  # Layout used or learned (None if no table on page 1)
+                "layout_hit": False
             }
         """
         try:
             pdf = pdfplumber.open(io.BytesIO(pdf_data))
             all_line_items = []
+            pages, layout, layout_hit, amount_rows = self._read_pages(pdf, layouts)
             
             # Extract header metadata from first page
-            first_page = pdf.pages[0]
-            first_page_text = first_page.extract_text()
+            first_page_text = pages[0][2]()
             header_metadata = self._extract_balance_sheet_header(first_page_text)
             
             # Process all pages
-            for page_num, page in enumerate(pdf.pages, 1):
-                # Extract tables from page
-                tables = page.extract_tables()
-                
+            for page_num, tables, page_text in pages:
                 if tables:
                     # Process each table
                     for table in tables:
@@ -76,12 +201,16 @@ class FinancialTableParser:
                         all_line_items.extend(items)
                 else:
                     # Fallback: Extract text with layout
-                    text = page.extract_text()
+                    text = page_text()
                     items = self._parse_balance_sheet_text(text, page_num)
                     all_line_items.extend(items)
             
             pdf.close()
             
+            if layout_hit and (not all_line_items or len(all_line_items) < amount_rows):
+                # Layout matched but rows did not all parse - parse from scratch
+                return self.extract_balance_sheet_table(pdf_data)
+            
             return {
                 "success": True,
                 "header": header_metadata,
@@ -89,7 +218,9 @@ class FinancialTableParser:
                 "total_items": len(all_line_items),
                 "extraction_method": "table" if tables else "text",
                 "document_type": "balance_sheet",
-                "total_pages": len(pdf.pages)
+                "total_pages": len(pdf.pages),
+                "layout": layout,
+                "layout_hit": layout_hit
             }
         
         except Exception as e:
@@ -101,7 +232,7 @@ class FinancialTableParser:
                 "total_items": 0
             }
     
-    def extract_income_statement_table(self, pdf_data: bytes) -> Dict:
+    def extract_income_statement_table(self, pdf_data: bytes, layouts: Optional[List[Dict]] = None) -> Dict:
         """
         Extract income statement with header metadata and multi-column structure
         
@@ -110,6 +241,10 @@ class FinancialTableParser:
         - Line items with 4 columns: Period Amount/%, YTD Amount/%
         - Hierarchy: subtotals, totals, categories, subcategories
         
+        Args:
+            pdf_data: PDF bytes
+            layouts: Stored layouts for this property/document type (see _read_pages)
+        
         Returns:
             dict: {
                 "header": {
@@ -138,23 +273,23 @@ class FinancialTableParser:
                     }
                 ],
                 "success": True,
-                "total_pages": 3
+                "total_pages": 3,
+                "layout": {...},
+                "layout_hit": False
             }
         """
         try:
             pdf = pdfplumber.open(io.BytesIO(pdf_data))
             all_line_items = []
+            pages, layout, layout_hit, amount_rows = self._read_pages(pdf, layouts)
             
             # Extract header metadata from first page
-            first_page = pdf.pages[0]
-            first_page_text = first_page.extract_text()
+            first_page_text = pages[0][2]()
             header_metadata = self._extract_income_statement_header(first_page_text)
             
             # Process all pages
             line_number = 1
-            for page_num, page in enumerate(pdf.pages, 1):
-                tables = page.extract_tables()
-                
+            for page_num, tables, page_text in pages:
                 if tables:
                     for table in tables:
                         items = self._parse_income_statement_table(table, page_num)
@@ -164,7 +299,7 @@ class FinancialTableParser:
                             line_number += 1
                         all_line_items.extend(items)
                 else:
-                    text = page.extract_text()
+                    text = page_text()
                     items = self._parse_income_statement_text(text, page_num)
                     # Assign line numbers
                     for item in items:
@@ -174,6 +309,9 @@ class FinancialTableParser:
             
             pdf.close()
             
+            if layout_hit and (not all_line_items or len(all_line_items) < amount_rows):
+                return self.extract_income_statement_table(pdf_data)
+            
             return {
                 "success": True,
                 "header": header_metadata,
@@ -181,7 +319,9 @@ class FinancialTableParser:
                 "total_items": len(all_line_items),
                 "extraction_method": "table" if tables else "text",
                 "document_type": "income_statement",
-                "total_pages": len(pdf.pages)
+                "total_pages": len(pdf.pages),
+                "layout": layout,
+                "layout_hit": layout_hit
             }
         
         except Exception as e:
@@ -193,7 +333,7 @@ class FinancialTableParser:
                 "total_items": 0
             }
     
-    def extract_cash_flow_table(self, pdf_data: bytes) -> Dict:
+    def extract_cash_flow_table(self, pdf_data: bytes, layouts: Optional[List[Dict]] = None) -> Dict:
         """
         Extract cash flow statement with comprehensive Template v1.0 compliance
         
@@ -206,13 +346,19 @@ class FinancialTableParser:
         - Adjustments section (A/R, Property changes, Depreciation, Escrows, etc.)
         - Cash reconciliation (beginning/ending balances)
         
+        Args:
+            pdf_data: PDF bytes
+            layouts: Stored layouts for this property/document type (see _read_pages)
+        
         Returns:
             dict: {
                 "header": {...},
                 "line_items": [...],
                 "adjustments": [...],
                 "cash_accounts": [...],
-                "success": True
+                "success": True,
+                "layout": {...},
+                "layout_hit": False
             }
         """
         try:
@@ -220,19 +366,18 @@ class FinancialTableParser:
             all_line_items = []
             adjustments = []
             cash_accounts = []
+            pages, layout, layout_hit, amount_rows = self._read_pages(pdf, layouts)
             
             # Extract header metadata from first page
-            first_page = pdf.pages[0]
-            first_page_text = first_page.extract_text()
+            first_page_text = pages[0][2]()
             header_metadata = self._extract_cash_flow_header(first_page_text)
             
             # Track current section for context-aware parsing
             current_section = "INCOME"  # Start with income
             line_number = 1
             
-            for page_num, page in enumerate(pdf.pages, 1):
-                tables = page.extract_tables()
-                text = page.extract_text()
+            for page_num, tables, page_text in pages:
+                text = page_text()
                 
                 # Update section context based on page content
                 current_section = self._detect_cash_flow_section(text, current_section)
@@ -259,6 +404,9 @@ class FinancialTableParser:
             
             pdf.close()
             
+            if layout_hit and (not all_line_items or len(all_line_items) + len(adjustments) + len(cash_accounts) < amount_rows):
+                return self.extract_cash_flow_table(pdf_data)
+            
             return {
                 "success": True,
                 "header": header_metadata,
@@ -270,7 +418,9 @@ class FinancialTableParser:
                 "total_cash_accounts": len(cash_accounts),
                 "extraction_method": "table" if tables else "text",
                 "document_type": "cash_flow",
-                "total_pages": len(pdf.pages)
+                "total_pages": len(pdf.pages),
+                "layout": layout,
+                "layout_hit": layout_hit
             }
         
         except Exception as e:
@@ -284,7 +434,7 @@ class FinancialTableParser:
                 "total_items": 0
             }
     
-    def extract_rent_roll_table(self, pdf_data: bytes) -> Dict:
+    def extract_rent_roll_table(self, pdf_data: bytes, layouts: Optional[List[Dict]] = None) -> Dict:
         """
         Extract rent roll with unit-by-unit tenant data
         
@@ -294,13 +444,20 @@ class FinancialTableParser:
         - Financials: monthly/annual rent, rent per SF, recoveries, misc, deposits
         - Special: gross rent rows, vacant units, multi-unit leases
         
+        Args:
+            pdf_data: PDF bytes
+            layouts: Stored layouts for this property/document type (see _read_pages);
+                a known layout also supplies the column header_map
+        
         Returns:
             dict: {
                 "report_date": "2025-04-30",
                 "property_name": "Hammond Aire Plaza",
                 "property_code": "HMND",
                 "line_items": [...],  # All 24 fields per record
-                "success": True
+                "success": True,
+                "layout": {...},
+                "layout_hit": False
             }
         """
         try:
@@ -309,15 +466,14 @@ class FinancialTableParser:
             report_date = None
             property_name = None
             property_code = None
+            pages, layout, layout_hit, _ = self._read_pages(pdf, layouts, describe_header=self._describe_rent_roll_header)
             
             # Extract report date from first page
-            first_page = pdf.pages[0]
-            first_page_text = first_page.extract_text()
+            first_page_text = pages[0][2]()
             report_date = self._extract_report_date(first_page_text)
             
-            for page_num, page in enumerate(pdf.pages, 1):
-                text = page.extract_text()
-                tables = page.extract_tables()
+            for page_num, tables, page_text in pages:
+                text = page_text()
                 
                 # Extract property name from page
                 page_property_name, page_property_code = self._extract_property_info(text)
@@ -327,7 +483,10 @@ class FinancialTableParser:
                 
                 if tables:
                     for table in tables:
-                        items = self._parse_rent_roll_table(table, page_num, report_date, property_name, property_code)
+                        items = self._parse_rent_roll_table(
+                            table, page_num, report_date, property_name, property_code,
+                            header_map=layout.get("header_map") if layout_hit else None
+                        )
                         all_line_items.extend(items)
                 else:
                     items = self._parse_rent_roll_text(text, page_num, report_date, property_name, property_code)
@@ -335,6 +494,9 @@ class FinancialTableParser:
             
             pdf.close()
             
+            if layout_hit and not all_line_items:
+                return self.extract_rent_roll_table(pdf_data)
+            
             return {
                 "success": True,
                 "report_date": report_date,
@@ -343,7 +505,9 @@ class FinancialTableParser:
                 "line_items": all_line_items,
                 "total_items": len(all_line_items),
                 "extraction_method": "table" if tables else "text",
-                "document_type": "rent_roll"
+                "document_type": "rent_roll",
+                "layout": layout,
+                "layout_hit": layout_hit
             }
         
         except Exception as e:
@@ -797,14 +961,8 @@ class FinancialTableParser:
         
         return line_items
     
-    def _parse_rent_roll_table(self, table: List[List], page_num: int, report_date: str = None, 
-                               property_name: str = None, property_code: str = None) -> List[Dict]:
-        """
-        Parse rent roll table - Template v2.0 implementation
-        
-        Extracts all 24 fields including gross rent rows, tenant IDs, recoveries
-        """
-        line_items = []
+    def _map_rent_roll_header(self, table: List[List]) -> Tuple[Optional[int], Dict]:
+        """Find the rent roll header row and map field names to column indexes"""
         header_row = None
         header_map = {}
         
@@ -857,6 +1015,29 @@ class FinancialTableParser:
                             header_map['loc'] = col_idx
                 break
         
+        return header_row, header_map
+    
+    def _describe_rent_roll_header(self, table: List[List]) -> Tuple[Optional[int], Dict]:
+        """Header row and layout extras (header_map) for rent roll layout learning"""
+        header_row, header_map = self._map_rent_roll_header(table)
+        return header_row, {"header_map": header_map}
+    
+    def _parse_rent_roll_table(self, table: List[List], page_num: int, report_date: str = None, 
+                               property_name: str = None, property_code: str = None,
+                               header_map: Optional[Dict] = None) -> List[Dict]:
+        """
+        Parse rent roll table - Template v2.0 implementation
+        
+        Extracts all 24 fields including gross rent rows, tenant IDs, recoveries.
+        With a header_map (from a stored layout) every row is a data row.
+        """
+        line_items = []
+        
+        if header_map is None:
+            header_row, header_map = self._map_rent_roll_header(table)
+        else:
+            header_row = -1
+        
         if header_row is None:
             # No header found, use default positions
             return []
@@ -2659,7 +2840,7 @@ class FinancialTableParser:
         
         return line_items
 
-    def extract_income_statement_multi_engine(self, pdf_data: bytes) -> Dict:
+    def extract_income_statement_multi_engine(self, pdf_data: bytes, layouts: Optional[List[Dict]] = None) -> Dict:
         """
         Phase 2: Multi-Engine Consensus Extraction for Income Statements
 
@@ -2690,7 +2871,7 @@ class FinancialTableParser:
 
             # Engine 1: PDFPlumber (best for tables)
             print("   🔄 Running PDFPlumber engine...")
-            pdfplumber_result = self.extract_income_statement_table(pdf_data)
+            pdfplumber_result = self.extract_income_statement_table(pdf_data, layouts=layouts)
             if pdfplumber_result.get("success"):
                 results["pdfplumber"] = pdfplumber_result
                 print(f"      ✅ PDFPlumber: {len(pdfplumber_result.get('line_items', []))} line items")
@@ -2903,6 +3084,8 @@ class FinancialTableParser:
             "engines_used": list(results.keys()),
             "total_fields_compared": total_fields,
             "matching_fields": matching_fields,
-            "total_pages": primary.get("total_pages", 0)
+            "total_pages": primary.get("total_pages", 0),
+            "layout": results.get("pdfplumber", {}).get("layout"),
+            "layout_hit": results.get("pdfplumber", {}).get("layout_hit", False)
         }
 
@@ -0,0 +1,69 @@
+"""
+HTTP Range / Conditional Request Helpers
+
+Just enough of RFC 9110 for serving stored files to PDF viewers: single byte
+ranges (`bytes=0-1023`, `bytes=1024-`, `bytes=-500`), strong ETags, and
+`If-None-Match` / `If-Range` validation. Multi-range requests are answered
+with the full body, which the RFC allows.
+"""
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """The Range header is well-formed but lies outside the resource."""
+
+
+def quote_etag(etag: str) -> str:
+    etag = (etag or "").strip()
+    if etag.startswith('"') or etag.startswith('W/"'):
+        return etag
+    return f'"{etag}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as the RFC requires for that header)."""
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = quote_etag(etag).removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+def parse_range(header: Optional[str], size: int, if_range: Optional[str] = None,
+                etag: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) byte range to serve, or None for the whole resource.
+
+    Malformed and multi-range headers are ignored (full response). A stale
+    If-Range validator also means the full response.
+
+    Raises:
+        RangeNotSatisfiable: the range starts past the end of the resource
+    """
+    if not header or size <= 0:
+        return None
+    if if_range is not None and (not etag or if_range.strip() != quote_etag(etag)):
+        return None
+
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or not spec or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
@@ -0,0 +1,157 @@
+"""
+Statement Layout Templates
+
+The same property sends the same report layout every month, so the column
+positions pdfplumber's table finder discovers on one period hold for the next.
+A layout records, for the first table on page one:
+
+- the header row text (normalized: digits, punctuation and month names dropped)
+- the column x-ranges
+- document-specific extras (the rent roll header_map)
+
+and is fingerprinted from the header text and column positions.
+
+A page matches a stored layout when slicing its text lines at the stored column
+positions reproduces the stored header. Matching pages are then parsed by
+direct column slicing of `page.extract_words()` output instead of table
+detection; FinancialTableParser falls back to the full parser on a miss.
+
+Words are pdfplumber word dicts ({"text", "x0", "x1", "top", "bottom"}).
+"""
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Vertical distance (points) within which words belong to the same text line
+LINE_TOLERANCE = 3.0
+
+# Header rows can wrap over a few text lines ("Lease" / "From")
+MAX_HEADER_LINES = 3
+
+# Column positions are rounded to this many points before fingerprinting
+FINGERPRINT_GRID = 2.0
+
+_MONTHS = r"jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|may|june?|july?|aug(ust)?|sep(t|tember)?|oct(ober)?|nov(ember)?|dec(ember)?"
+_VOLATILE = re.compile(rf"\b({_MONTHS})\b|[\d\W_]+", re.IGNORECASE)
+
+
+def normalize_cell(text: Optional[str]) -> str:
+    """Header cell text without the parts that change between periods."""
+    return " ".join(_VOLATILE.sub(" ", str(text or "")).lower().split())
+
+
+def layout_fingerprint(header: Sequence[str], columns: Sequence[Sequence[float]]) -> str:
+    payload = {
+        "header": list(header),
+        "columns": [[round(x / FINGERPRINT_GRID) for x in column] for column in columns],
+    }
+    return hashlib.sha1(json.dumps(payload).encode("utf-8")).hexdigest()[:16]
+
+
+def columns_from_rows(row_cells: Sequence[Sequence[Optional[Sequence[float]]]]) -> List[Tuple[float, float]]:
+    """
+    Column x-ranges from pdfplumber table rows (each row a list of cell bboxes,
+    None for merged cells): the widest extent seen in each column.
+    """
+    width = max((len(cells) for cells in row_cells), default=0)
+    columns = []
+    for index in range(width):
+        bboxes = [cells[index] for cells in row_cells if index < len(cells) and cells[index]]
+        if not bboxes:
+            return []
+        columns.append((min(b[0] for b in bboxes), max(b[2] for b in bboxes)))
+    return columns
+
+
+def build_layout(
+    header_row: Sequence[Optional[str]],
+    columns: Sequence[Sequence[float]],
+    top: float,
+    **extras
+) -> Optional[Dict]:
+    """Layout from a detected table's header row and column ranges; None if unusable."""
+    header = [normalize_cell(cell) for cell in header_row]
+    if len(columns) < 2 or len(header) != len(columns) or not any(header):
+        return None
+    columns = [[round(float(x0), 1), round(float(x1), 1)] for x0, x1 in columns]
+    layout = {
+        "fingerprint": layout_fingerprint(header, columns),
+        "header": header,
+        "columns": columns,
+        "top": round(float(top), 1),
+    }
+    layout.update(extras)
+    return layout
+
+
+def group_lines(words: Sequence[Dict], tolerance: float = LINE_TOLERANCE) -> List[List[Dict]]:
+    """Words grouped into text lines (top to bottom), each line ordered left to right."""
+    lines: List[List[Dict]] = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and abs(word["top"] - lines[-1][0]["top"]) <= tolerance:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w["x0"]) for line in lines]
+
+
+def line_text(line: Sequence[Dict]) -> str:
+    return " ".join(word["text"] for word in line)
+
+
+def slice_line(line: Sequence[Dict], columns: Sequence[Sequence[float]]) -> List[str]:
+    """Cell texts of one line: each word goes to the column containing (or nearest to) its center."""
+    cells: List[List[str]] = [[] for _ in columns]
+    for word in line:
+        center = (word["x0"] + word["x1"]) / 2
+        index = min(
+            range(len(columns)),
+            key=lambda i: 0.0 if columns[i][0] <= center <= columns[i][1]
+            else min(abs(center - columns[i][0]), abs(center - columns[i][1]))
+        )
+        cells[index].append(word["text"])
+    return [" ".join(cell) for cell in cells]
+
+
+def find_header(lines: Sequence[Sequence[Dict]], layout: Dict) -> Optional[int]:
+    """Index of the first line after the layout's header, or None if the header isn't on the page."""
+    columns = layout["columns"]
+    for start in range(len(lines)):
+        merged = [""] * len(columns)
+        for span in range(MAX_HEADER_LINES):
+            if start + span >= len(lines):
+                break
+            for index, cell in enumerate(slice_line(lines[start + span], columns)):
+                merged[index] = f"{merged[index]} {cell}".strip()
+            if [normalize_cell(cell) for cell in merged] == layout["header"]:
+                return start + span + 1
+    return None
+
+
+def match_layout(lines: Sequence[Sequence[Dict]], layouts: Sequence[Dict]) -> Optional[Tuple[Dict, int]]:
+    """First stored layout whose header is found on the page, with the body start line."""
+    for layout in layouts:
+        body_start = find_header(lines, layout)
+        if body_start is not None:
+            return layout, body_start
+    return None
+
+
+def slice_rows(lines: Sequence[Sequence[Dict]], layout: Dict, body_start: Optional[int] = None) -> List[List[str]]:
+    """
+    Table rows of a page by direct column slicing.
+
+    Rows start after the page's header, or at the top of the page when the
+    page doesn't repeat it (continuation pages). Lines filling fewer than two
+    columns - titles, page footers, wrapped continuation text - are not table
+    rows and are dropped.
+    """
+    if body_start is None:
+        body_start = find_header(lines, layout) or 0
+    rows = []
+    for line in lines[body_start:]:
+        cells = slice_line(line, layout["columns"])
+        if sum(1 for cell in cells if cell) >= 2:
+            rows.append(cells)
+    return rows
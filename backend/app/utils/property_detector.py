@@ -0,0 +1,364 @@
+"""
+Property Detector
+
+Precompiled multi-pattern matcher used to detect which property a document
+belongs to. One Aho-Corasick automaton is built over every property code,
+name, significant name word and city in an organization, so a document is
+scored against the whole portfolio with a single pass over its header and
+first page instead of compiling and running regexes per property.
+
+Detectors are cached per property set and rebuilt only when the set changes.
+
+Scoring matches MultiEngineExtractor.detect_property_with_intelligence:
+- Header/Title (max 50): code (+25) and name words (up to +25) in the first 5 lines
+- Metadata (max 30): "Property:/Entity:/Location: <name>", "Property: <code>" (+15),
+  "City: <city>" (+15)
+- Body (max 20): +5 per line mentioning the name or code outside A/R context
+"""
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# A/R exclusion patterns (case-insensitive)
+AR_PATTERNS = [
+    r'receivable\s+from',
+    r'due\s+from',
+    r'owed\s+by',
+    r'a/r\s+',
+    r'account\s+receivable',
+    r'\b\d{4}-\d{4}\b',  # Account codes like 1100-0001
+    r'payable\s+to',
+    r'due\s+to'
+]
+
+_AR_REGEX = re.compile('|'.join(f'(?:{p})' for p in AR_PATTERNS), re.IGNORECASE)
+_NAME_LABEL_REGEX = re.compile(r'(?:property|entity|location)\s*:?\s*$', re.IGNORECASE)
+_CODE_LABEL_REGEX = re.compile(r'property\s*:?\s*$', re.IGNORECASE)
+_CITY_LABEL_REGEX = re.compile(r'city\s*:?\s*$', re.IGNORECASE)
+_ANY_NAME_LABEL_REGEX = re.compile(r'property|entity|location', re.IGNORECASE)
+_LABEL_WINDOW = 256
+
+_KIND_CODE = 'code'
+_KIND_NAME = 'name'
+_KIND_WORD = 'word'
+_KIND_CITY = 'city'
+
+_UNCERTAIN = {
+    "primary_property": None,
+    "referenced_properties": [],
+    "recommendation": None,
+    "validation_status": "UNCERTAIN"
+}
+
+
+class AhoCorasick:
+    """Minimal Aho-Corasick automaton reporting every (overlapping) occurrence."""
+
+    def __init__(self, terms: Sequence[str]):
+        self.terms = list(terms)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for term_id, term in enumerate(self.terms):
+            node = 0
+            for ch in term:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(term_id)
+
+        # Breadth-first so every failure link points at an already-linked node
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start, term_id) for every occurrence of every term."""
+        goto, fail, out, terms = self._goto, self._fail, self._out, self.terms
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for term_id in out[node]:
+                yield i - len(terms[term_id]) + 1, term_id
+
+
+class _Entry:
+    __slots__ = ('index', 'code', 'name', 'city', 'name_words')
+
+    def __init__(self, index: int, code: str, name: str, city: str):
+        self.index = index
+        self.code = code
+        self.name = name
+        self.city = city
+        self.name_words = [w for w in name.lower().split() if len(w) > 3] if name else []
+
+
+class PropertyDetector:
+    """Scores every property of a portfolio against one document in a single pass."""
+
+    def __init__(self, available_properties: Sequence[Dict[str, Any]]):
+        self.entries: List[_Entry] = []
+        self.empty_name_entries: List[int] = []
+        term_ids: Dict[str, int] = {}
+        self._term_owners: List[List[Tuple[int, str]]] = []
+
+        def add_term(term: str, entry_idx: int, kind: str):
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = len(self._term_owners)
+                self._term_owners.append([])
+            self._term_owners[term_id].append((entry_idx, kind))
+
+        for prop in available_properties:
+            code = prop.get('property_code', '') or ''
+            if not code:
+                continue
+            entry = _Entry(len(self.entries), code, prop.get('property_name', '') or '', prop.get('city', '') or '')
+            self.entries.append(entry)
+            add_term(code.lower(), entry.index, _KIND_CODE)
+            if entry.name:
+                add_term(entry.name.lower(), entry.index, _KIND_NAME)
+            else:
+                self.empty_name_entries.append(entry.index)
+            for word in dict.fromkeys(entry.name_words):
+                add_term(word, entry.index, _KIND_WORD)
+            if entry.city:
+                add_term(entry.city.lower(), entry.index, _KIND_CITY)
+
+        self._automaton = AhoCorasick(list(term_ids.keys()))
+
+    def _scan(self, text: str) -> Iterator[Tuple[int, int, str, int]]:
+        """Yield (start, entry_idx, kind, term_length) for every owner of every match."""
+        terms = self._automaton.terms
+        for start, term_id in self._automaton.finditer(text):
+            length = len(terms[term_id])
+            for entry_idx, kind in self._term_owners[term_id]:
+                yield start, entry_idx, kind, length
+
+    def detect(self, first_page_text: str) -> Dict[str, Any]:
+        """Score all properties against the first page text of a document."""
+        if not self.entries:
+            return dict(_UNCERTAIN)
+
+        first_page_lines = first_page_text.split('\n')
+        header_lines = [line.strip() for line in first_page_lines[:10] if line.strip()][:5]
+        header_lower = ' '.join(header_lines).lower()
+        page_lower = first_page_text.lower()
+
+        # Header: which terms of which entries appear at all
+        header_hits: Dict[int, set] = {}
+        header_words: Dict[int, set] = {}
+        for start, entry_idx, kind, length in self._scan(header_lower):
+            header_hits.setdefault(entry_idx, set()).add(kind)
+            if kind == _KIND_WORD:
+                header_words.setdefault(entry_idx, set()).add(header_lower[start:start + length])
+
+        # Page: metadata labels and per-line body mentions
+        lines_lower = page_lower.split('\n')
+        line_starts = []
+        offset = 0
+        for line in lines_lower:
+            line_starts.append(offset)
+            offset += len(line) + 1
+        ar_lines: Dict[int, bool] = {}
+
+        def is_ar_line(line_idx: int) -> bool:
+            flag = ar_lines.get(line_idx)
+            if flag is None:
+                flag = ar_lines[line_idx] = bool(_AR_REGEX.search(lines_lower[line_idx]))
+            return flag
+
+        metadata_name: set = set()
+        metadata_city: set = set()
+        body_hits: Dict[int, Dict[int, set]] = {}
+        for start, entry_idx, kind, _ in self._scan(page_lower):
+            if kind == _KIND_WORD:
+                continue
+            prefix = page_lower[max(0, start - _LABEL_WINDOW):start]
+            if kind == _KIND_CITY:
+                if _CITY_LABEL_REGEX.search(prefix):
+                    metadata_city.add(entry_idx)
+                continue
+            label_regex = _NAME_LABEL_REGEX if kind == _KIND_NAME else _CODE_LABEL_REGEX
+            if label_regex.search(prefix):
+                metadata_name.add(entry_idx)
+            line_idx = bisect_right(line_starts, start) - 1
+            body_hits.setdefault(entry_idx, {}).setdefault(line_idx, set()).add(kind)
+
+        # An empty name makes "property\s*:?\s*" match on the label alone
+        if self.empty_name_entries and _ANY_NAME_LABEL_REGEX.search(page_lower):
+            metadata_name.update(self.empty_name_entries)
+
+        candidates = set(header_hits) | metadata_name | metadata_city | set(body_hits)
+        property_scores: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for entry in self.entries:
+            # Later duplicates of a code replace earlier ones, as in the per-property loop
+            if entry.index not in candidates:
+                property_scores[entry.code] = _empty_score(entry)
+                continue
+            property_scores[entry.code] = self._score_entry(
+                entry, header_hits.get(entry.index, set()), header_words.get(entry.index, set()),
+                entry.index in metadata_name, entry.index in metadata_city,
+                body_hits.get(entry.index, {}), first_page_lines, is_ar_line
+            )
+
+        return _summarize(property_scores)
+
+    @staticmethod
+    def _score_entry(entry, header_kinds, header_words, metadata_name, metadata_city,
+                     body_lines, first_page_lines, is_ar_line) -> Dict[str, Any]:
+        header_score = 0
+        metadata_score = 0
+        body_score = 0
+        evidence = []
+        ar_mentions = []
+
+        if _KIND_CODE in header_kinds:
+            header_score += 25
+            evidence.append(f"Code '{entry.code}' in header")
+        if entry.name_words:
+            matched = sum(1 for w in entry.name_words if w in header_words)
+            if matched > 0:
+                header_score += (matched / len(entry.name_words)) * 25
+                evidence.append(f"Name words ({matched}/{len(entry.name_words)}) in header")
+
+        if metadata_name:
+            metadata_score += 15
+            evidence.append("Metadata field match")
+        if metadata_city:
+            metadata_score += 15
+            evidence.append(f"City '{entry.city}' in metadata")
+
+        code_evidence = False
+        for line_idx in sorted(body_lines):
+            kinds = body_lines[line_idx]
+            ar = is_ar_line(line_idx)
+            line = first_page_lines[line_idx] if line_idx < len(first_page_lines) else ''
+            if _KIND_NAME in kinds:
+                if ar:
+                    ar_mentions.append(line.strip())
+                else:
+                    body_score += 5
+                    if body_score == 5:
+                        evidence.append("Property name in body (non-A/R)")
+            if _KIND_CODE in kinds:
+                if ar:
+                    ar_mentions.append(line.strip())
+                else:
+                    body_score += 5
+                    if not code_evidence:
+                        evidence.append("Property code in body (non-A/R)")
+                        code_evidence = True
+
+        header_score = min(header_score, 50)
+        metadata_score = min(metadata_score, 30)
+        body_score = min(body_score, 20)
+
+        return {
+            "code": entry.code,
+            "name": entry.name,
+            "total_score": header_score + metadata_score + body_score,
+            "header_score": header_score,
+            "metadata_score": metadata_score,
+            "body_score": body_score,
+            "evidence": evidence,
+            "ar_mentions": ar_mentions
+        }
+
+
+def _empty_score(entry: _Entry) -> Dict[str, Any]:
+    return {
+        "code": entry.code, "name": entry.name, "total_score": 0, "header_score": 0,
+        "metadata_score": 0, "body_score": 0, "evidence": [], "ar_mentions": []
+    }
+
+
+def _summarize(property_scores: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Pick the primary property and A/R-referenced properties from the scores."""
+    if not property_scores:
+        return dict(_UNCERTAIN)
+
+    sorted_properties = sorted(property_scores.items(), key=lambda x: x[1]["total_score"], reverse=True)
+    primary_code, primary_data = sorted_properties[0]
+    primary_score = primary_data["total_score"]
+
+    referenced = []
+    for prop_code, prop_data in sorted_properties[1:]:
+        if prop_data["ar_mentions"] and prop_data["total_score"] < primary_score * 0.5:
+            referenced.append({
+                "code": prop_code,
+                "name": prop_data["name"],
+                "confidence": round(prop_data["total_score"], 1),
+                "evidence": prop_data["ar_mentions"][:2]  # First 2 A/R mentions
+            })
+
+    if primary_score >= 60:
+        validation_status = "HIGH_CONFIDENCE"
+    elif primary_score >= 40:
+        validation_status = "MEDIUM_CONFIDENCE"
+    else:
+        validation_status = "UNCERTAIN"
+
+    return {
+        "primary_property": {
+            "code": primary_code,
+            "name": primary_data["name"],
+            "confidence": round(primary_score, 1),
+            "evidence": primary_data["evidence"]
+        } if primary_score >= 20 else None,
+        "referenced_properties": referenced,
+        "recommendation": primary_code if primary_score >= 40 else None,
+        "validation_status": validation_status
+    }
+
+
+# Detector cache keyed by a fingerprint of the property set
+_DETECTOR_CACHE_SIZE = 64
+_detector_cache: "OrderedDict[str, PropertyDetector]" = OrderedDict()
+_detector_lock = threading.Lock()
+
+
+def _fingerprint(available_properties: Sequence[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256()
+    for prop in available_properties:
+        for field in ('property_code', 'property_name', 'city'):
+            digest.update((prop.get(field) or '').encode('utf-8'))
+            digest.update(b'\x1f')
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def get_property_detector(available_properties: Sequence[Dict[str, Any]]) -> PropertyDetector:
+    """Return the cached detector for this property set, building it on first use or after a change."""
+    key = _fingerprint(available_properties)
+    with _detector_lock:
+        detector = _detector_cache.get(key)
+        if detector is not None:
+            _detector_cache.move_to_end(key)
+            return detector
+
+    detector = PropertyDetector(available_properties)
+    with _detector_lock:
+        _detector_cache[key] = detector
+        _detector_cache.move_to_end(key)
+        while len(_detector_cache) > _DETECTOR_CACHE_SIZE:
+            _detector_cache.popitem(last=False)
+    return detector
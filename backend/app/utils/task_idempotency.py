@@ -39,14 +39,26 @@ def acquire_job_lock(job_id: int, task_id: str, ttl_seconds: int = 7200) -> bool
         return True
 
 
-def release_job_lock(job_id: int, task_id: str) -> None:
-    """Release batch job lock if we hold it."""
+def extend_job_lock(job_id: int, task_id: str, ttl_seconds: int) -> None:
+    """Reset the batch job lock's TTL if we hold it (e.g. to cover the chunks a dispatcher queued)."""
+    try:
+        from app.db.redis_client import get_redis
+        redis = get_redis()
+        key = f"reprocess_job:{job_id}"
+        if redis.get(key) == task_id:
+            redis.expire(key, ttl_seconds)
+    except Exception as e:
+        logger.warning(f"Redis job lock extend failed for job_id={job_id}: {e}")
+
+
+def release_job_lock(job_id: int, task_id: Optional[str]) -> None:
+    """Release batch job lock if we hold it (task_id None: whoever holds it, for stalled jobs)."""
     try:
         from app.db.redis_client import get_redis
         redis = get_redis()
         key = f"reprocess_job:{job_id}"
         current = redis.get(key)
-        if current == task_id:
+        if task_id is None or current == task_id:
             redis.delete(key)
     except Exception as e:
         logger.warning(f"Redis job lock release failed for job_id={job_id}: {e}")
@@ -116,6 +128,32 @@ def acquire_generic_lock(key: str, task_id: str, ttl_seconds: int = 3600) -> boo
         return True
 
 
+def extend_generic_lock(key: str, task_id: str, ttl_seconds: int) -> bool:
+    """Reset a generic lock's TTL if we hold it. Returns False if another task holds it (or it expired)."""
+    try:
+        from app.db.redis_client import get_redis
+        redis = get_redis()
+        if redis.get(key) != task_id:
+            return False
+        redis.expire(key, ttl_seconds)
+        return True
+    except Exception as e:
+        logger.warning(f"Redis lock extend failed for {key}: {e}")
+        return True
+
+
+def release_generic_lock(key: str, task_id: str) -> None:
+    """Release a generic lock if we hold it."""
+    try:
+        from app.db.redis_client import get_redis
+        redis = get_redis()
+        current = redis.get(key)
+        if current == task_id:
+            redis.delete(key)
+    except Exception as e:
+        logger.warning(f"Redis lock release failed for {key}: {e}")
+
+
 def release_alert_backfill_lock(job_id: int, task_id: str) -> None:
     """Release alert backfill lock if we hold it."""
     try:
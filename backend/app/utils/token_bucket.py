@@ -0,0 +1,167 @@
+"""
+Token Bucket Rate Limiter
+
+Distributed token buckets backed by Redis so every worker process shares one
+budget per external API. Acquisition is a single atomic Lua call that
+reserves a token and returns how long the caller must wait for it, so callers
+sleep exactly once instead of polling. Falls back to in-process buckets when
+Redis is unavailable.
+"""
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] bucket key; ARGV: capacity, refill rate (tokens/sec), tokens requested, max wait (sec)
+# Returns the wait in seconds as a string; a value > max wait means nothing was reserved.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local max_wait = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens < requested then
+  wait = (requested - tokens) / rate
+end
+if wait <= max_wait then
+  tokens = tokens - requested
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate + max_wait) + 60)
+return tostring(wait)
+"""
+
+
+@dataclass
+class BucketConfig:
+    """Bucket capacity (burst size) and refill rate in tokens per second."""
+    capacity: float
+    refill_per_second: float
+
+    @classmethod
+    def per_minute(cls, limit: int, burst: Optional[int] = None) -> "BucketConfig":
+        return cls(capacity=float(burst or max(1, limit // 10)), refill_per_second=limit / 60.0)
+
+
+class _LocalBucket:
+    """In-process token bucket used when Redis is not reachable."""
+
+    def __init__(self, config: BucketConfig):
+        self.config = config
+        self.tokens = config.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, requested: float, max_wait: float) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.config.capacity,
+                self.tokens + (now - self.updated) * self.config.refill_per_second
+            )
+            self.updated = now
+            wait = 0.0
+            if self.tokens < requested:
+                wait = (requested - self.tokens) / self.config.refill_per_second
+            if wait <= max_wait:
+                self.tokens -= requested
+            return wait
+
+
+class TokenBucketRateLimiter:
+    """
+    Per-source token buckets shared across processes through Redis.
+
+    Example:
+        limiter = TokenBucketRateLimiter({'census': BucketConfig.per_minute(50)})
+        limiter.acquire('census')          # blocks for the reserved slot
+        await limiter.acquire_async('census')
+    """
+
+    def __init__(
+        self,
+        buckets: Dict[str, BucketConfig],
+        default: Optional[BucketConfig] = None,
+        key_prefix: str = "ratelimit:bucket",
+        redis_getter: Optional[Callable[[], object]] = None,
+    ):
+        self.buckets = dict(buckets)
+        self.default = default or BucketConfig.per_minute(60)
+        self.key_prefix = key_prefix
+        if redis_getter is None:
+            from app.core.redis_client import get_redis_client
+            redis_getter = get_redis_client
+        self._redis_getter = redis_getter
+        self._script = None
+        self._script_client = None
+        self._local: Dict[str, _LocalBucket] = {}
+        self._local_lock = threading.Lock()
+
+    def config_for(self, source: str) -> BucketConfig:
+        return self.buckets.get(source, self.default)
+
+    def _local_bucket(self, source: str) -> _LocalBucket:
+        with self._local_lock:
+            bucket = self._local.get(source)
+            if bucket is None:
+                bucket = self._local[source] = _LocalBucket(self.config_for(source))
+            return bucket
+
+    def reserve(self, source: str, tokens: float = 1.0, max_wait: float = 300.0) -> float:
+        """
+        Reserve tokens and return the wait (seconds) before they may be used.
+
+        A return value greater than max_wait means nothing was reserved.
+        """
+        config = self.config_for(source)
+        client = None
+        try:
+            client = self._redis_getter()
+        except Exception as e:
+            logger.debug(f"Rate limiter Redis unavailable: {e}")
+
+        if client is not None:
+            try:
+                if self._script is None or self._script_client is not client:
+                    self._script = client.register_script(_TOKEN_BUCKET_LUA)
+                    self._script_client = client
+                wait = self._script(
+                    keys=[f"{self.key_prefix}:{source}"],
+                    args=[config.capacity, config.refill_per_second, tokens, max_wait],
+                )
+                return float(wait)
+            except Exception as e:
+                logger.warning(f"Redis token bucket failed for {source}, using local bucket: {e}")
+
+        return self._local_bucket(source).reserve(tokens, max_wait)
+
+    def acquire(self, source: str, tokens: float = 1.0, max_wait: float = 300.0) -> bool:
+        """Block until the reserved tokens are available. Returns False if the wait exceeds max_wait."""
+        wait = self.reserve(source, tokens, max_wait)
+        if wait > max_wait:
+            logger.warning(f"Rate limit wait for {source} ({wait:.1f}s) exceeds {max_wait:.0f}s")
+            return False
+        if wait > 0:
+            logger.info(f"Rate limit: waiting {wait:.2f}s for {source}")
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, source: str, tokens: float = 1.0, max_wait: float = 300.0) -> bool:
+        """Async variant of acquire(); the event loop keeps running while waiting."""
+        wait = await asyncio.to_thread(self.reserve, source, tokens, max_wait)
+        if wait > max_wait:
+            logger.warning(f"Rate limit wait for {source} ({wait:.1f}s) exceeds {max_wait:.0f}s")
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
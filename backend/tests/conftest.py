@@ -1,14 +1,33 @@
 """
 Pytest configuration and fixtures for REIMS tests.
 """
+import os
+
 import pytest
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import types as sqltypes
+from sqlalchemy.dialects.postgresql import ARRAY, INET, JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
+import app.models  # noqa: F401  (registers every table on Base.metadata)
 from app.db.database import Base
 
 
+# Postgres-only column types, rendered so the models can be created on SQLite
+@compiles(JSONB, "sqlite")
+@compiles(ARRAY, "sqlite")
+@compiles(sqltypes.ARRAY, "sqlite")
+def _json_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(INET, "sqlite")
+def _inet_on_sqlite(type_, compiler, **kw):
+    return "VARCHAR(45)"
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a test database session."""
@@ -29,6 +48,49 @@ def db_session():
     session.close()
 
 
+def _with_referenced_tables(tables):
+    """The given tables plus every table they reference through foreign keys."""
+    found = {}
+    pending = list(tables)
+    while pending:
+        table = pending.pop()
+        if table.name not in found:
+            found[table.name] = table
+            pending.extend(fk.column.table for fk in table.foreign_keys)
+    return list(found.values())
+
+
+@pytest.fixture(scope="function")
+def pg_session(request):
+    """
+    Create a Postgres session for tests marked ``postgres``.
+
+    Skipped unless TEST_DATABASE_URL points at a Postgres database. The marker's
+    models (and the tables they reference) are created inside a
+    transaction that is rolled back afterwards; commits made by the code under
+    test only release savepoints.
+    """
+    url = os.getenv("TEST_DATABASE_URL", "")
+    if not url.startswith("postgresql"):
+        pytest.skip("TEST_DATABASE_URL is not set to a Postgres database")
+
+    marker = request.node.get_closest_marker("postgres")
+    models = marker.kwargs.get("models", ()) if marker else ()
+
+    engine = create_engine(url)
+    connection = engine.connect()
+    transaction = connection.begin()
+    Base.metadata.create_all(bind=connection, tables=_with_referenced_tables(m.__table__ for m in models))
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+
+    yield session
+
+    session.close()
+    transaction.rollback()
+    connection.close()
+    engine.dispose()
+
+
 @pytest.fixture(scope="function")
 def mock_user():
     """Create a mock user for testing."""
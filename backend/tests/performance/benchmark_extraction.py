@@ -0,0 +1,486 @@
+"""
+Benchmark harness for the extraction pipeline.
+
+Feeds synthetic statements (see synthetic_statements.py) through the real
+ExtractionOrchestrator code paths against a local Postgres and times each
+stage: parse, match, dedup, insert, validate, anomalies and metrics. Stage
+times are exclusive (dedup time is not counted again under insert). Results
+report pages/sec and rows/sec per document type and can be compared with a
+stored baseline; a stage slower, or a throughput lower, than the baseline by
+more than the threshold counts as a regression.
+
+MinIO and OCR are not involved: PDF bytes are handed to the orchestrator
+directly and text comes from pdfplumber. All data is written under a dedicated
+benchmark property (code BNCH), so point --database-url at a scratch database.
+
+Usage:
+    python tests/performance/benchmark_extraction.py --size medium --repeat 3
+    python tests/performance/benchmark_extraction.py --size medium --save-baseline
+    python tests/performance/benchmark_extraction.py --size medium --threshold 0.25
+"""
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import io
+import json
+import logging
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from synthetic_statements import (
+    DOCUMENT_TYPES,
+    PROPERTY_CODE,
+    PROPERTY_NAME,
+    SIZE_PRESETS,
+    SyntheticDocument,
+    generate_corpus,
+)
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("parse", "match", "dedup", "insert", "validate", "anomalies", "metrics")
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "extraction_baseline.json")
+DEFAULT_THRESHOLD = 0.20
+# Stages faster than this in both runs are timer noise, not regressions
+DEFAULT_MIN_SECONDS = 0.05
+
+INSERT_METHODS = {
+    "balance_sheet": "_insert_balance_sheet_data",
+    "income_statement": "_insert_income_statement_data",
+    "cash_flow": "_insert_cash_flow_data",
+    "rent_roll": "_insert_rent_roll_data",
+    "mortgage_statement": "_insert_mortgage_statement_data",
+}
+
+
+class BenchmarkError(Exception):
+    """A synthetic document did not make it through the pipeline"""
+
+
+class StageTimer:
+    """
+    Wall-clock time per stage. Stages can nest; a parent is only charged for
+    the time not spent in its children.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.totals: Dict[str, float] = defaultdict(float)
+        self._stack: List[List] = []  # [stage, seconds spent in child stages]
+
+    @contextmanager
+    def stage(self, name: str):
+        start = self.clock()
+        self._stack.append([name, 0.0])
+        try:
+            yield
+        finally:
+            elapsed = self.clock() - start
+            _, child_seconds = self._stack.pop()
+            self.totals[name] += elapsed - child_seconds
+            if self._stack:
+                self._stack[-1][1] += elapsed
+
+    @contextmanager
+    def wrap(self, obj, attr: str, name: str):
+        """Time every call of obj.attr as stage `name` while the context is open."""
+        original = getattr(obj, attr)
+        instance_attr = attr in getattr(obj, "__dict__", {})
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return original(*args, **kwargs)
+
+        setattr(obj, attr, timed)
+        try:
+            yield
+        finally:
+            if instance_attr or isinstance(obj, type):
+                setattr(obj, attr, original)
+            else:
+                delattr(obj, attr)
+
+    def reset(self) -> Dict[str, float]:
+        totals, self.totals = dict(self.totals), defaultdict(float)
+        return totals
+
+
+@dataclass
+class DocumentTypeResult:
+    """Aggregated timings for every document of one type in a run."""
+    document_type: str
+    documents: int = 0
+    pages: int = 0
+    rows: int = 0
+    stage_seconds: Dict[str, float] = field(default_factory=lambda: {stage: 0.0 for stage in STAGES})
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.stage_seconds.values())
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.total_seconds if self.total_seconds > 0 else 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.total_seconds if self.total_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "documents": self.documents,
+            "pages": self.pages,
+            "rows": self.rows,
+            "stage_seconds": {stage: round(seconds, 4) for stage, seconds in self.stage_seconds.items()},
+            "total_seconds": round(self.total_seconds, 4),
+            "pages_per_second": round(self.pages_per_second, 3),
+            "rows_per_second": round(self.rows_per_second, 3),
+            "errors": self.errors,
+        }
+
+
+@dataclass
+class Regression:
+    document_type: str
+    metric: str
+    baseline: float
+    current: float
+    change: float  # fractional slowdown, e.g. 0.35 = 35% worse
+
+    def __str__(self) -> str:
+        return (
+            f"{self.document_type}.{self.metric}: {self.baseline:.4f} -> {self.current:.4f} "
+            f"({self.change * 100:+.1f}% worse)"
+        )
+
+
+def extract_pdf_text(pdf_data: bytes) -> str:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(pdf_data)) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def ensure_benchmark_uploads(db: Session, document_types) -> Dict[str, Any]:
+    """Benchmark property, period (Dec 2099) and one upload row per document type."""
+    from app.models.document_upload import DocumentUpload
+    from app.models.financial_period import FinancialPeriod
+    from app.models.property import Property
+
+    prop = db.query(Property).filter(Property.property_code == PROPERTY_CODE).first()
+    if not prop:
+        prop = Property(property_code=PROPERTY_CODE, property_name=PROPERTY_NAME, property_type="Retail")
+        db.add(prop)
+        db.flush()
+
+    period = db.query(FinancialPeriod).filter(
+        FinancialPeriod.property_id == prop.id,
+        FinancialPeriod.period_year == 2099,
+        FinancialPeriod.period_month == 12
+    ).first()
+    if not period:
+        period = FinancialPeriod(
+            property_id=prop.id,
+            period_year=2099,
+            period_month=12,
+            period_start_date=date(2099, 12, 1),
+            period_end_date=date(2099, 12, 31),
+            fiscal_year=2099,
+            fiscal_quarter=4
+        )
+        db.add(period)
+        db.flush()
+
+    uploads = {}
+    for document_type in document_types:
+        upload = db.query(DocumentUpload).filter(
+            DocumentUpload.property_id == prop.id,
+            DocumentUpload.period_id == period.id,
+            DocumentUpload.document_type == document_type
+        ).first()
+        if not upload:
+            upload = DocumentUpload(
+                property_id=prop.id,
+                period_id=period.id,
+                document_type=document_type,
+                file_name=f"{PROPERTY_CODE}_{document_type}.pdf",
+                file_path=f"benchmark/{PROPERTY_CODE}/{document_type}.pdf",
+                extraction_status="pending"
+            )
+            db.add(upload)
+            db.flush()
+        uploads[document_type] = upload
+    db.commit()
+    return uploads
+
+
+def run_document(orchestrator, timer: StageTimer, upload, document: SyntheticDocument) -> Tuple[int, List[str]]:
+    """
+    Run one document through the orchestrator stages.
+
+    Returns (records inserted, errors). A parse/insert failure raises
+    BenchmarkError; metrics, anomaly and validation failures are recorded and
+    skipped, as extract_and_parse_document treats them as non-critical.
+    """
+    db = orchestrator.db
+    upload.file_name = document.file_name
+    upload.file_size_bytes = len(document.pdf_data)
+
+    with timer.stage("parse"):
+        text = extract_pdf_text(document.pdf_data)
+
+    result = orchestrator._parse_and_insert_financial_data(
+        upload=upload,
+        extracted_text=text,
+        confidence_score=95.0,
+        pdf_data=document.pdf_data
+    )
+    if not result.get("success"):
+        db.rollback()
+        raise BenchmarkError(f"{document.file_name}: {result.get('error')}")
+    with timer.stage("insert"):
+        db.commit()
+
+    errors = []
+    for stage, step in (
+        ("metrics", orchestrator._calculate_financial_metrics),
+        ("anomalies", orchestrator._detect_anomalies_for_document),
+        ("validate", orchestrator._run_validations),
+    ):
+        try:
+            with timer.stage(stage):
+                step(upload)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            errors.append(f"{document.file_name}: {stage} failed: {e}")
+
+    return result.get("records_inserted", 0), errors
+
+
+def run_extraction_benchmark(db: Session, corpus: List[SyntheticDocument], repeat: int = 1) -> Dict:
+    """
+    Time the corpus `repeat` times and keep the median of each stage per
+    document type. Returns a JSON-serialisable report.
+    """
+    from app.models.document_upload import DocumentUpload
+    from app.services.deduplication_service import get_deduplication_service
+    from app.services.extraction_orchestrator import ExtractionOrchestrator
+    from app.services.mortgage_extraction_service import MortgageExtractionService
+
+    document_types = sorted({d.document_type for d in corpus}, key=DOCUMENT_TYPES.index)
+    uploads = ensure_benchmark_uploads(db, document_types)
+    orchestrator = ExtractionOrchestrator(db)
+    dedup_service = get_deduplication_service()
+    timer = StageTimer()
+
+    runs: Dict[str, List[DocumentTypeResult]] = defaultdict(list)
+    with timer.wrap(orchestrator, "_extract_with_tables", "parse"), \
+            timer.wrap(orchestrator.template_extractor, "extract_using_template", "parse"), \
+            timer.wrap(MortgageExtractionService, "extract_mortgage_data", "parse"), \
+            timer.wrap(orchestrator, "_match_accounts_intelligent", "match"), \
+            timer.wrap(dedup_service, "deduplicate_items", "dedup"), \
+            timer.wrap(dedup_service, "validate_no_duplicates", "dedup"), \
+            timer.wrap(orchestrator, INSERT_METHODS["balance_sheet"], "insert"), \
+            timer.wrap(orchestrator, INSERT_METHODS["income_statement"], "insert"), \
+            timer.wrap(orchestrator, INSERT_METHODS["cash_flow"], "insert"), \
+            timer.wrap(orchestrator, INSERT_METHODS["rent_roll"], "insert"), \
+            timer.wrap(orchestrator, INSERT_METHODS["mortgage_statement"], "insert"):
+        for iteration in range(repeat):
+            results = {t: DocumentTypeResult(t) for t in document_types}
+            for document in corpus:
+                result = results[document.document_type]
+                upload = db.get(DocumentUpload, uploads[document.document_type].id)
+                timer.reset()
+                try:
+                    rows, errors = run_document(orchestrator, timer, upload, document)
+                except BenchmarkError as e:
+                    rows, errors = 0, [str(e)]
+                for error in errors:
+                    logger.error(error)
+                result.errors.extend(errors)
+                for stage, seconds in timer.reset().items():
+                    result.stage_seconds[stage] += seconds
+                result.documents += 1
+                result.pages += document.pages
+                result.rows += rows
+            for document_type, result in results.items():
+                runs[document_type].append(result)
+            logger.info(f"Benchmark iteration {iteration + 1}/{repeat} done")
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "repeat": repeat,
+        "corpus": {
+            t: {"documents": runs[t][0].documents, "pages": runs[t][0].pages}
+            for t in document_types
+        },
+        "results": {t: _median_result(t, runs[t]).to_dict() for t in document_types},
+    }
+    return report
+
+
+def _median_result(document_type: str, runs: List[DocumentTypeResult]) -> DocumentTypeResult:
+    median = DocumentTypeResult(
+        document_type,
+        documents=runs[0].documents,
+        pages=runs[0].pages,
+        rows=int(statistics.median(r.rows for r in runs)),
+    )
+    median.stage_seconds = {stage: statistics.median(r.stage_seconds[stage] for r in runs) for stage in STAGES}
+    median.errors = sorted({e for r in runs for e in r.errors})
+    return median
+
+
+def compare_to_baseline(
+    report: Dict,
+    baseline: Dict,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_seconds: float = DEFAULT_MIN_SECONDS
+) -> List[Regression]:
+    """
+    Regressions of `report` against `baseline`: stage times more than `threshold`
+    slower (ignoring stages under `min_seconds` in both runs) and pages/sec or
+    rows/sec more than `threshold` lower. Document types missing from either
+    report are skipped.
+    """
+    regressions = []
+    for document_type, current in report.get("results", {}).items():
+        previous = baseline.get("results", {}).get(document_type)
+        if not previous:
+            continue
+
+        for stage in STAGES:
+            before = previous["stage_seconds"].get(stage, 0.0)
+            after = current["stage_seconds"].get(stage, 0.0)
+            if max(before, after) < min_seconds:
+                continue
+            change = after / before - 1 if before > 0 else float("inf")
+            if change > threshold:
+                regressions.append(Regression(document_type, f"stage_seconds.{stage}", before, after, change))
+
+        for metric in ("pages_per_second", "rows_per_second"):
+            before, after = previous.get(metric, 0.0), current.get(metric, 0.0)
+            if before <= 0:
+                continue
+            change = before / after - 1 if after > 0 else float("inf")
+            if change > threshold:
+                regressions.append(Regression(document_type, metric, before, after, change))
+    return regressions
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_report(report: Dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def print_report(report: Dict) -> None:
+    header = f"{'document type':<20}{'pages':>7}{'rows':>8}{'pages/s':>10}{'rows/s':>10}" + "".join(
+        f"{stage:>11}" for stage in STAGES
+    )
+    print(header)
+    print("-" * len(header))
+    for document_type, result in report["results"].items():
+        print(
+            f"{document_type:<20}{result['pages']:>7}{result['rows']:>8}"
+            f"{result['pages_per_second']:>10.2f}{result['rows_per_second']:>10.1f}"
+            + "".join(f"{result['stage_seconds'][stage]:>10.3f}s" for stage in STAGES)
+        )
+        for error in result["errors"]:
+            print(f"    ❌ {error}")
+
+
+def parse_sizes(size: str, overrides: List[str]) -> Dict[str, int]:
+    sizes = dict(SIZE_PRESETS[size])
+    for override in overrides or []:
+        document_type, _, rows = override.partition("=")
+        if document_type not in DOCUMENT_TYPES or not rows.isdigit():
+            raise argparse.ArgumentTypeError(f"Expected <document_type>=<rows>, got '{override}'")
+        sizes[document_type] = int(rows)
+    return sizes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline on synthetic statements")
+    parser.add_argument("--size", choices=sorted(SIZE_PRESETS), default="small")
+    parser.add_argument("--rows", action="append", metavar="TYPE=ROWS", help="Override rows for one document type")
+    parser.add_argument("--types", nargs="+", choices=DOCUMENT_TYPES, help="Document types to include (default: all)")
+    parser.add_argument("--documents", type=int, default=1, help="Documents per type")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per document; stage medians are reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="Database to benchmark against (default: settings.DATABASE_URL)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown fraction")
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS)
+    args = parser.parse_args(argv)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.core.config import settings
+
+    logging.basicConfig(level=logging.INFO)
+    sizes = parse_sizes(args.size, args.rows)
+    print(f"📄 Generating synthetic corpus ({args.size}): {sizes}")
+    corpus = generate_corpus(sizes, documents_per_type=args.documents, seed=args.seed, document_types=args.types)
+
+    engine = create_engine(args.database_url or settings.DATABASE_URL)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        report = run_extraction_benchmark(db, corpus, repeat=args.repeat)
+    finally:
+        db.close()
+    report["size"] = args.size
+    report["sizes"] = sizes
+
+    print_report(report)
+    if args.output:
+        save_report(report, args.output)
+
+    if args.save_baseline:
+        save_report(report, args.baseline)
+        print(f"✅ Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"⚠️  No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    if baseline.get("sizes") != sizes:
+        print(f"⚠️  Baseline was recorded with different sizes ({baseline.get('sizes')}); comparison may be misleading")
+
+    regressions = compare_to_baseline(report, baseline, args.threshold, args.min_seconds)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print(f"✅ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Synthetic Statement Corpora for Extraction Benchmarks
+
+Generates balance sheet, income statement, cash flow, rent roll and mortgage
+statement PDFs in the layouts FinancialTableParser and MortgageExtractionService
+expect: ruled tables with "####-#### Name" account cells and comma-formatted
+amounts, a Template v1.0 header block, rent roll column headers, and labelled
+mortgage fields. Content is deterministic for a given seed so runs compare
+like with like.
+
+Requires reportlab (already a backend dependency).
+"""
+import io
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+PROPERTY_NAME = "Benchmark Plaza"
+PROPERTY_CODE = "BNCH"
+PERIOD_LABEL = "Dec 2099"
+
+DOCUMENT_TYPES = ("balance_sheet", "income_statement", "cash_flow", "rent_roll", "mortgage_statement")
+
+# Rows per document (line items, rent roll units, mortgage transaction lines)
+SIZE_PRESETS: Dict[str, Dict[str, int]] = {
+    "small": {"balance_sheet": 60, "income_statement": 80, "cash_flow": 80, "rent_roll": 40, "mortgage_statement": 12},
+    "medium": {"balance_sheet": 250, "income_statement": 300, "cash_flow": 300, "rent_roll": 200, "mortgage_statement": 60},
+    "large": {"balance_sheet": 1000, "income_statement": 1200, "cash_flow": 1200, "rent_roll": 800, "mortgage_statement": 240},
+}
+
+_ACCOUNT_WORDS = [
+    "Cash", "Operating", "Escrow", "Receivable", "Prepaid", "Deposits", "Buildings", "Improvements",
+    "Accrued", "Payable", "Mortgage", "Interest", "Capital", "Distributions", "Rentals", "Recoveries",
+    "Utilities", "Repairs", "Maintenance", "Insurance", "Taxes", "Management", "Leasing", "Landscaping",
+    "Security", "Janitorial", "Marketing", "Legal", "Professional", "Depreciation", "Amortization",
+]
+
+_SECTIONS = {
+    "balance_sheet": [("ASSETS", 100, 1999), ("LIABILITIES", 2000, 2999), ("CAPITAL", 3000, 3999)],
+    "income_statement": [("INCOME", 4000, 4999), ("OPERATING EXPENSES", 5000, 6499), ("ADDITIONAL EXPENSES", 6500, 8999)],
+    "cash_flow": [("INCOME", 4000, 4999), ("OPERATING EXPENSES", 5000, 6499), ("ADJUSTMENTS", 1000, 2999)],
+}
+
+_TENANTS = ["Coffee", "Fitness", "Dental", "Pizza", "Nails", "Bank", "Books", "Salon", "Pharmacy", "Grill"]
+
+
+@dataclass
+class SyntheticDocument:
+    """One generated PDF plus what a perfect extraction would recover."""
+    document_type: str
+    file_name: str
+    pdf_data: bytes
+    pages: int
+    rows: int
+    expected: List[Dict] = field(default_factory=list)
+
+
+def _amount(value: float) -> str:
+    text = f"{abs(value):,.2f}"
+    return f"({text})" if value < 0 else text
+
+
+def _account_rows(document_type: str, size: int, rng: random.Random) -> List[Dict]:
+    sections = _SECTIONS[document_type]
+    rows = []
+    for i in range(size):
+        section, low, high = sections[i * len(sections) // size]
+        span = high - low + 1
+        code = f"{low + (i * 7) % span:04d}-{(i // span) % 100:02d}{i % 100:02d}"
+        name = f"{rng.choice(_ACCOUNT_WORDS)} {rng.choice(_ACCOUNT_WORDS)} {i}"
+        period_amount = round(rng.uniform(-5_000, 250_000), 2)
+        rows.append({
+            "section": section,
+            "account_code": code,
+            "account_name": name,
+            "amount": period_amount,
+            "period_amount": period_amount,
+            "ytd_amount": round(period_amount * rng.uniform(6, 12), 2),
+            "period_percentage": round(rng.uniform(0, 40), 2),
+            "ytd_percentage": round(rng.uniform(0, 40), 2),
+        })
+    return rows
+
+
+def _rent_roll_rows(size: int, rng: random.Random) -> List[Dict]:
+    rows = []
+    for i in range(size):
+        area = rng.randint(800, 12_000)
+        monthly = round(area * rng.uniform(1.2, 3.5), 2)
+        lease_from = date(2090, 1, 1) + timedelta(days=rng.randint(0, 3000))
+        rows.append({
+            "unit_number": f"{100 + i:03d}",
+            "tenant_name": f"{rng.choice(_TENANTS)} {rng.choice(_ACCOUNT_WORDS)} {i} LLC (t{i:07d})",
+            "lease_type": rng.choice(["Retail NNN", "Retail Gross", "Office"]),
+            "area_sqft": area,
+            "lease_from_date": lease_from,
+            "lease_to_date": lease_from + timedelta(days=365 * rng.randint(3, 10)),
+            "monthly_rent": monthly,
+            "annual_rent": round(monthly * 12, 2),
+            "security_deposit": round(monthly, 2),
+        })
+    return rows
+
+
+def _header_lines(document_type: str) -> List[str]:
+    titles = {
+        "balance_sheet": "Balance Sheet",
+        "income_statement": "Income Statement",
+        "cash_flow": "Cash Flow",
+        "rent_roll": "Rent Roll with Lease Charges",
+    }
+    lines = [f"{PROPERTY_NAME} ({PROPERTY_CODE})", titles[document_type]]
+    if document_type == "rent_roll":
+        lines.append("As of Date: 12/31/2099")
+    else:
+        lines += [f"Period = {PERIOD_LABEL}", "Book = Accrual", "Thursday, January 14, 2100 09:30 AM"]
+    return lines
+
+
+def _render(header: List[str], tables: List[List[List[str]]], repeat_header_rows: int = 0) -> Tuple[bytes, int]:
+    """Render header paragraphs and ruled tables (the first table may repeat its header rows); returns (pdf bytes, page count)."""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    buffer = io.BytesIO()
+    pages = []
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(letter), leftMargin=24, rightMargin=24, topMargin=24, bottomMargin=24)
+    styles = getSampleStyleSheet()
+    story = [Paragraph(line, styles["Normal"]) for line in header]
+    for index, rows in enumerate(tables):
+        story.append(Spacer(1, 8))
+        table = Table(rows, repeatRows=repeat_header_rows if index == 0 else 0)
+        table.setStyle(TableStyle([
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+            ("FONTSIZE", (0, 0), (-1, -1), 7),
+        ]))
+        story.append(table)
+
+    def count_page(canvas, _doc):
+        pages.append(canvas.getPageNumber())
+
+    doc.build(story, onFirstPage=count_page, onLaterPages=count_page)
+    return buffer.getvalue(), len(pages)
+
+
+def _render_text(lines: List[str]) -> Tuple[bytes, int]:
+    """Render plain text lines, one per row, breaking pages as needed."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    buffer = io.BytesIO()
+    canvas = pdf_canvas.Canvas(buffer, pagesize=letter)
+    top, bottom, step = letter[1] - 40, 40, 12
+    y, pages = top, 1
+    for line in lines:
+        if y < bottom:
+            canvas.showPage()
+            y, pages = top, pages + 1
+        canvas.drawString(40, y, line)
+        y -= step
+    canvas.save()
+    return buffer.getvalue(), pages
+
+
+def generate_statement(
+    document_type: str,
+    size: int,
+    seed: int = 0,
+    column_headers: bool = False,
+    repeat_headers: bool = True
+) -> SyntheticDocument:
+    """
+    Generate one synthetic statement of `size` rows.
+
+    Balance sheets, income statements and cash flows have no column header row
+    unless column_headers is set; repeat_headers then repeats it on every page.
+    """
+    rng = random.Random(f"{document_type}:{size}:{seed}")
+    file_name = f"{PROPERTY_CODE}_{document_type}_{size}_{seed}.pdf"
+
+    if document_type == "balance_sheet":
+        rows = _account_rows(document_type, size, rng)
+        tables = []
+        for section, _, _ in _SECTIONS[document_type]:
+            section_rows = [r for r in rows if r["section"] == section]
+            if section_rows:
+                tables.append([[f"{r['account_code']} {r['account_name']}", _amount(r["amount"])] for r in section_rows])
+        if column_headers:
+            tables[0].insert(0, ["Account", "Balance"])
+        pdf_data, pages = _render(_header_lines(document_type), tables, repeat_header_rows=int(column_headers and repeat_headers))
+    elif document_type in ("income_statement", "cash_flow"):
+        rows = _account_rows(document_type, size, rng)
+        tables = [[
+            [
+                f"{r['account_code']} {r['account_name']}", _amount(r["period_amount"]), f"{r['period_percentage']:.2f}%",
+                _amount(r["ytd_amount"]), f"{r['ytd_percentage']:.2f}%",
+            ]
+            for r in rows
+        ]]
+        if column_headers:
+            tables[0].insert(0, ["Account", "Period Amount", "%", "YTD Amount", "%"])
+        pdf_data, pages = _render(_header_lines(document_type), tables, repeat_header_rows=int(column_headers and repeat_headers))
+    elif document_type == "rent_roll":
+        rows = _rent_roll_rows(size, rng)
+        header = [
+            "Unit", "Lease", "Lease Type", "Area", "Lease From", "Lease To", "Term",
+            "Tenancy Years", "Monthly Rent", "Annual Rent", "Security Deposit Received",
+        ]
+        body = [
+            [
+                r["unit_number"], r["tenant_name"], r["lease_type"], f"{r['area_sqft']:,}",
+                r["lease_from_date"].strftime("%m/%d/%Y"), r["lease_to_date"].strftime("%m/%d/%Y"),
+                str((r["lease_to_date"] - r["lease_from_date"]).days // 30), "1.50",
+                _amount(r["monthly_rent"]), _amount(r["annual_rent"]), _amount(r["security_deposit"]),
+            ]
+            for r in rows
+        ]
+        pdf_data, pages = _render(_header_lines(document_type), [[header] + body], repeat_header_rows=1)
+    elif document_type == "mortgage_statement":
+        principal = round(rng.uniform(5_000_000, 25_000_000), 2)
+        rows = [{
+            "loan_number": "30699" + str(seed).zfill(5),
+            "statement_date": date(2099, 12, 31),
+            "principal_balance": principal,
+        }]
+        lines = [
+            "MORTGAGE LOAN STATEMENT",
+            f"Property: {PROPERTY_NAME} ({PROPERTY_CODE})",
+            "LOAN INFORMATION",
+            f"Loan Number: {rows[0]['loan_number']}",
+            "Statement Date: 12/31/2099",
+            "Payment Due Date: 01/01/2100",
+            f"Principal Balance: ${principal:,.2f}",
+            "Interest Rate: 4.250%",
+            "BALANCES",
+            f"Principal Balance ${principal:,.2f}",
+            f"Tax Escrow Balance ${rng.uniform(10_000, 90_000):,.2f}",
+            "TRANSACTION HISTORY",
+        ]
+        for i in range(size):
+            day = date(2099, 1, 1) + timedelta(days=i % 365)
+            lines.append(f"{day:%m/%d/%Y}  Payment {i:05d}  Principal ${rng.uniform(5_000, 20_000):,.2f}  Interest ${rng.uniform(20_000, 60_000):,.2f}")
+        pdf_data, pages = _render_text(lines)
+    else:
+        raise ValueError(f"Unknown document type: {document_type}")
+
+    return SyntheticDocument(
+        document_type=document_type,
+        file_name=file_name,
+        pdf_data=pdf_data,
+        pages=pages,
+        rows=len(rows),
+        expected=rows,
+    )
+
+
+def generate_corpus(
+    sizes: Dict[str, int],
+    documents_per_type: int = 1,
+    seed: int = 0,
+    document_types: Optional[List[str]] = None
+) -> List[SyntheticDocument]:
+    """Generate `documents_per_type` statements for each document type at its configured size."""
+    corpus = []
+    for document_type in document_types or DOCUMENT_TYPES:
+        if document_type not in sizes:
+            continue
+        for i in range(documents_per_type):
+            corpus.append(generate_statement(document_type, sizes[document_type], seed=seed + i))
+    return corpus
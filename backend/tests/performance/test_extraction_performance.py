@@ -0,0 +1,165 @@
+"""
+Extraction Pipeline Benchmark Tests
+
+Checks the benchmark harness itself (stage accounting, baseline comparison,
+synthetic corpus shapes) and, when BENCHMARK_DATABASE_URL points at a scratch
+Postgres, runs a small corpus end to end against the stored baseline.
+"""
+import os
+
+import pytest
+
+from benchmark_extraction import (
+    STAGES,
+    Regression,
+    StageTimer,
+    compare_to_baseline,
+    load_baseline,
+    DEFAULT_BASELINE_PATH,
+)
+from synthetic_statements import SIZE_PRESETS, generate_corpus, generate_statement
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def result(stage_seconds, pages=10, rows=100):
+    stages = {stage: 0.0 for stage in STAGES}
+    stages.update(stage_seconds)
+    total = sum(stages.values())
+    return {
+        "pages": pages,
+        "rows": rows,
+        "stage_seconds": stages,
+        "pages_per_second": pages / total,
+        "rows_per_second": rows / total,
+    }
+
+
+class TestStageTimer:
+    """Stage accounting"""
+
+    def test_nested_stages_are_exclusive(self):
+        clock = FakeClock()
+        timer = StageTimer(clock=clock)
+        with timer.stage("insert"):
+            clock.now += 1.0
+            with timer.stage("dedup"):
+                clock.now += 0.25
+            clock.now += 0.5
+        assert timer.reset() == {"insert": 1.5, "dedup": 0.25}
+        assert timer.reset() == {}
+
+    def test_wrap_times_calls_and_restores_the_attribute(self):
+        clock = FakeClock()
+        timer = StageTimer(clock=clock)
+
+        class Parser:
+            def parse(self, pages):
+                clock.now += pages
+                return pages * 2
+
+        parser = Parser()
+        with timer.wrap(parser, "parse", "parse"):
+            assert parser.parse(3) == 6
+        assert "parse" not in vars(parser)
+        assert parser.parse(1) == 2
+        assert timer.totals == {"parse": 3.0}
+
+
+class TestBaselineComparison:
+    """Regression detection against a stored baseline"""
+
+    def test_flags_slower_stages_and_lower_throughput(self):
+        baseline = {"results": {"balance_sheet": result({"parse": 1.0, "insert": 0.5, "validate": 0.01})}}
+        report = {"results": {"balance_sheet": result({"parse": 1.5, "insert": 0.55, "validate": 0.04})}}
+
+        regressions = compare_to_baseline(report, baseline, threshold=0.2, min_seconds=0.05)
+
+        assert {r.metric for r in regressions} == {
+            "stage_seconds.parse", "pages_per_second", "rows_per_second",
+        }
+        parse = next(r for r in regressions if r.metric == "stage_seconds.parse")
+        assert parse.change == pytest.approx(0.5)
+        assert "+50.0% worse" in str(parse)
+
+    def test_within_threshold_and_unknown_types_pass(self):
+        baseline = {"results": {"rent_roll": result({"parse": 1.0})}}
+        report = {"results": {
+            "rent_roll": result({"parse": 1.1}),
+            "cash_flow": result({"parse": 9.0}),
+        }}
+        assert compare_to_baseline(report, baseline, threshold=0.2) == []
+
+    def test_regression_str(self):
+        regression = Regression("cash_flow", "rows_per_second", 100.0, 50.0, 1.0)
+        assert str(regression).startswith("cash_flow.rows_per_second: 100.0000 -> 50.0000")
+
+
+class TestSyntheticCorpus:
+    """Generated statements come back out of FinancialTableParser"""
+
+    @pytest.fixture(autouse=True)
+    def _pdf_dependencies(self):
+        pytest.importorskip("reportlab")
+        pytest.importorskip("pdfplumber")
+
+    def test_account_statements_round_trip(self):
+        from app.utils.financial_table_parser import FinancialTableParser
+
+        parser = FinancialTableParser()
+        for document_type, extract in (
+            ("balance_sheet", parser.extract_balance_sheet_table),
+            ("income_statement", parser.extract_income_statement_table),
+        ):
+            document = generate_statement(document_type, 40)
+            parsed = extract(document.pdf_data)
+            assert parsed["success"] is True
+            codes = {item["account_code"] for item in parsed["line_items"]}
+            assert {row["account_code"] for row in document.expected} <= codes
+
+    def test_rent_roll_round_trip_and_page_count_scales(self):
+        from app.utils.financial_table_parser import FinancialTableParser
+
+        small = generate_statement("rent_roll", 20)
+        large = generate_statement("rent_roll", 200)
+        parsed = FinancialTableParser().extract_rent_roll_table(small.pdf_data)
+        assert {item["unit_number"] for item in parsed["line_items"]} >= {r["unit_number"] for r in small.expected}
+        assert large.pages > small.pages
+
+    def test_corpus_is_deterministic(self):
+        first = generate_corpus(SIZE_PRESETS["small"], document_types=["cash_flow", "mortgage_statement"])
+        second = generate_corpus(SIZE_PRESETS["small"], document_types=["cash_flow", "mortgage_statement"])
+        assert [d.expected for d in first] == [d.expected for d in second]
+        assert [d.document_type for d in first] == ["cash_flow", "mortgage_statement"]
+
+
+@pytest.mark.slow
+@pytest.mark.integration
+@pytest.mark.skipif(not os.getenv("BENCHMARK_DATABASE_URL"), reason="BENCHMARK_DATABASE_URL not set")
+def test_extraction_throughput_against_baseline():
+    """Small corpus end to end; fails on regressions beyond BENCHMARK_THRESHOLD (default 20%)"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from benchmark_extraction import run_extraction_benchmark
+
+    db = sessionmaker(bind=create_engine(os.environ["BENCHMARK_DATABASE_URL"]))()
+    try:
+        report = run_extraction_benchmark(db, generate_corpus(SIZE_PRESETS["small"]), repeat=3)
+    finally:
+        db.close()
+
+    for document_type, outcome in report["results"].items():
+        assert not outcome["errors"], f"{document_type}: {outcome['errors']}"
+        assert outcome["rows"] > 0
+
+    baseline = load_baseline(os.getenv("BENCHMARK_BASELINE", DEFAULT_BASELINE_PATH))
+    if baseline is None:
+        pytest.skip("No extraction baseline recorded yet")
+    regressions = compare_to_baseline(report, baseline, threshold=float(os.getenv("BENCHMARK_THRESHOLD", "0.2")))
+    assert not regressions, "\n".join(str(r) for r in regressions)
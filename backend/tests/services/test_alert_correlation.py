@@ -0,0 +1,105 @@
+from sqlalchemy import event
+
+from app.models.committee_alert import AlertSeverity, AlertStatus, AlertType, CommitteeAlert, CommitteeType
+from app.services.alert_correlation_service import AlertCorrelationService
+
+
+def add_alerts(session, *specs):
+    alerts = [
+        CommitteeAlert(
+            property_id=property_id, related_metric=metric, severity=severity,
+            alert_type=AlertType.VARIANCE_BREACH, status=AlertStatus.ACTIVE, title=f"{metric} variance",
+            description="", assigned_committee=CommitteeType.FINANCE_SUBCOMMITTEE
+        )
+        for property_id, metric, severity in specs
+    ]
+    session.add_all(alerts)
+    session.commit()
+    return [a.id for a in alerts]
+
+
+def count_updates(session):
+    updates = []
+
+    @event.listens_for(session.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE committee_alerts"):
+            updates.append(statement)
+
+    return updates
+
+
+def memberships(session):
+    session.expire_all()
+    return {a.id: (a.incident_group_id, a.correlation_group_id) for a in session.query(CommitteeAlert).all()}
+
+
+def test_account_storm_becomes_connected_incidents_in_bulk(db_session):
+    ids = add_alerts(
+        db_session,
+        (1, "Electricity", AlertSeverity.WARNING),
+        (2, "Water", AlertSeverity.INFO),
+        (1, "R&M Repairs", AlertSeverity.WARNING),
+        (3, "Maintenance Costs", AlertSeverity.URGENT),
+        (2, "DSCR", AlertSeverity.CRITICAL),
+        (3, "DSCR", AlertSeverity.WARNING),
+        (1, "Rent Income", AlertSeverity.INFO),
+        (2, "Water Rent Recovery", AlertSeverity.CRITICAL),  # utility and revenue: bridges the two
+        (3, "Occupancy", AlertSeverity.INFO),
+    )
+    updates = count_updates(db_session)
+
+    result = AlertCorrelationService(db_session).correlate_alerts(ids, correlation_type="account")
+
+    groups = sorted(g["alerts"] for g in result["correlated_groups"])
+    assert groups == [[ids[0], ids[1], ids[6], ids[7]], [ids[2], ids[3]], [ids[4], ids[5]]]
+    assert result["uncorrelated"] == [ids[8]]
+    assert len(updates) == 1
+
+    rows = memberships(db_session)
+    for group in result["correlated_groups"]:
+        parent = db_session.get(CommitteeAlert, group["parent_alert_id"])
+        assert parent.alert_metadata["child_alert_ids"] == group["alerts"]
+        assert {rows[i] for i in group["alerts"]} == {(parent.incident_group_id, parent.id)}
+    assert rows[ids[8]] == (None, None)
+    severities = {
+        tuple(g["alerts"]): db_session.get(CommitteeAlert, g["parent_alert_id"]).severity
+        for g in result["correlated_groups"]
+    }
+    assert severities == {
+        (ids[0], ids[1], ids[6], ids[7]): AlertSeverity.CRITICAL,
+        (ids[2], ids[3]): AlertSeverity.URGENT,
+        (ids[4], ids[5]): AlertSeverity.CRITICAL,
+    }
+
+
+def test_new_alerts_join_open_incidents_without_merging_them(db_session):
+    service = AlertCorrelationService(db_session)
+    first = add_alerts(db_session, (1, "DSCR", AlertSeverity.WARNING), (1, "LTV", AlertSeverity.WARNING))
+    second = add_alerts(db_session, (2, "DSCR", AlertSeverity.WARNING), (2, "Occupancy", AlertSeverity.INFO))
+    property_1 = service.correlate_new_alerts(first, correlation_type="property")["correlated_groups"][0]
+    property_2 = service.correlate_new_alerts(second, correlation_type="property")["correlated_groups"][0]
+
+    # Another property 1 alert joins the open incident instead of opening a new one
+    (late,) = add_alerts(db_session, (1, "Occupancy", AlertSeverity.CRITICAL))
+    joined = service.correlate_new_alerts([late], correlation_type="property")["correlated_groups"]
+    assert [(g["parent_alert_id"], g["alerts"], g["child_alert_count"]) for g in joined] == [
+        (property_1["parent_alert_id"], first + [late], 3)
+    ]
+    parent_1 = db_session.get(CommitteeAlert, property_1["parent_alert_id"])
+    assert parent_1.severity == AlertSeverity.CRITICAL
+
+    # A same-metric alert links both incidents: it joins the older one, the younger one is left alone
+    (bridge,) = add_alerts(db_session, (3, "DSCR", AlertSeverity.INFO))
+    linked = service.correlate_new_alerts([bridge], correlation_type="account")["correlated_groups"]
+    assert [(g["parent_alert_id"], g["child_alert_count"]) for g in linked] == [(property_1["parent_alert_id"], 4)]
+
+    rows = memberships(db_session)
+    parent_2 = db_session.get(CommitteeAlert, property_2["parent_alert_id"])
+    for alert_id in first + [late, bridge]:
+        assert rows[alert_id] == (parent_1.incident_group_id, parent_1.id)
+    for alert_id in second:
+        assert rows[alert_id] == (parent_2.incident_group_id, parent_2.id)
+    assert parent_2.status == AlertStatus.ACTIVE
+    assert parent_2.alert_metadata["child_alert_ids"] == second
+    assert parent_1.alert_metadata["child_alert_ids"] == sorted(first + [late, bridge])
@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.models.committee_alert import AlertSeverity, AlertStatus, AlertType, CommitteeAlert
+from app.models.financial_period import FinancialPeriod
+from app.models.property import Property
+from app.services.alert_deduplication_service import AlertDeduplicationService
+
+# The dedup upsert is Postgres SQL (ON CONFLICT on the partial unique index, jsonb merge)
+pytestmark = pytest.mark.postgres(models=[CommitteeAlert])
+
+
+@pytest.fixture
+def session(pg_session):
+    pg_session.add_all([Property(id=i, property_code=f"P{i}", property_name=f"Property {i}") for i in (1, 2)])
+    pg_session.add(FinancialPeriod(id=7, property_id=1, period_year=2024, period_month=7,
+                                   period_start_date=date(2024, 7, 1), period_end_date=date(2024, 7, 31)))
+    pg_session.commit()
+    return pg_session
+
+
+def count_statements(session):
+    statements = []
+
+    @event.listens_for(session.get_bind(), "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements
+
+
+def anomaly(property_id, severity, anomaly_id, metric="noi"):
+    return {"property_id": property_id, "period_id": 7, "field_name": metric, "anomaly_type": "z_score",
+            "severity": severity, "anomaly_id": anomaly_id}
+
+
+def test_batch_merges_in_run_duplicates_and_inserts_with_one_upsert(session):
+    service = AlertDeduplicationService(session)
+    statements = count_statements(session)
+
+    result = service.deduplicate_alerts([anomaly(1, "medium", 10), anomaly(2, "low", 11), anomaly(1, "critical", 12)])
+
+    assert sum(s.startswith("INSERT") for s in statements) == 1
+    assert [a.property_id for a in result] == [1, 2]
+    first = result[0]
+    assert first.alert_type == AlertType.ANOMALY_DETECTED and first.status == AlertStatus.ACTIVE
+    assert first.severity == AlertSeverity.CRITICAL and first.financial_period_id == 7
+    assert first.dedup_key == service._generate_dedup_key(anomaly(1, "medium", 10))
+    assert first.alert_metadata["occurrence_count"] == 2
+    assert [o["anomaly_id"] for o in first.alert_metadata["occurrences"]] == [10, 12]
+    assert result[1].severity == AlertSeverity.WARNING
+
+
+def test_repeat_run_appends_to_open_alert_and_closed_alerts_do_not_conflict(session):
+    service = AlertDeduplicationService(session)
+    first = service.deduplicate_alerts([anomaly(1, "medium", 10)])[0]
+
+    # Next detection run: same key updates the open alert, new key creates one
+    again = service.deduplicate_alerts([anomaly(1, "high", 20), anomaly(1, "low", 21, metric="dscr")])
+    session.expire_all()
+    assert again[0].id == first.id
+    assert again[0].severity == AlertSeverity.URGENT
+    assert [o["anomaly_id"] for o in again[0].alert_metadata["occurrences"]] == [10, 20]
+    assert again[0].alert_metadata["occurrence_count"] == 2
+    assert again[0].alert_metadata["period_id"] == 7
+    assert session.query(CommitteeAlert).count() == 2
+
+    # A lower severity never downgrades; a resolved alert no longer absorbs occurrences
+    assert service.deduplicate_alerts([anomaly(1, "low", 30)])[0].severity == AlertSeverity.URGENT
+    again[0].status = AlertStatus.RESOLVED
+    session.commit()
+    reopened = service.deduplicate_alerts([anomaly(1, "medium", 40)])[0]
+    assert reopened.id != first.id and reopened.alert_metadata["occurrence_count"] == 1
+    assert session.query(CommitteeAlert).count() == 3
+
+
+def test_empty_batch_does_not_touch_the_database(session):
+    statements = count_statements(session)
+    assert AlertDeduplicationService(session).deduplicate_alerts([]) == []
+    assert statements == []
@@ -0,0 +1,118 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from app.services.alert_rule_evaluator import CompiledAlertEvaluator, compile_rules, resolve_metric_column
+from app.services.alert_rules_service import AlertRulesService
+
+
+def make_rule(rule_id, field_name, condition, threshold, property_id=None, cooldown_period=None, last_triggered_at=None):
+    return SimpleNamespace(
+        id=rule_id,
+        rule_name=f"rule-{rule_id}",
+        field_name=field_name,
+        condition=condition,
+        threshold_value=Decimal(str(threshold)) if threshold is not None else None,
+        property_specific=property_id is not None,
+        property_id=property_id,
+        severity="warning",
+        severity_mapping=None,
+        cooldown_period=cooldown_period,
+        last_triggered_at=last_triggered_at,
+        execution_count=0,
+        is_in_cooldown=lambda: bool(
+            cooldown_period and last_triggered_at
+            and datetime.utcnow() < last_triggered_at + timedelta(minutes=cooldown_period)
+        ),
+    )
+
+
+def metrics_frame(columns):
+    """Two properties x four monthly periods; period ids 1-4 and 11-14."""
+    rows = []
+    for property_id, offset in ((1, 0), (2, 10)):
+        for month in range(1, 5):
+            row = {"property_id": property_id, "period_id": offset + month, "period_end_date": date(2024, month, 28)}
+            for column, values in columns.items():
+                row[column] = values[property_id][month - 1]
+            rows.append(row)
+    # Out of order on purpose: prepare_frame sorts by period_end_date
+    return pd.DataFrame(rows[::-1])
+
+
+def test_compile_resolves_aliases_and_drops_unusable_rules():
+    rules = [
+        make_rule(1, "DSCR", "less_than", 1.25),
+        make_rule(2, "noi", "greater_than", 0),
+        make_rule(3, "not_a_metric", "less_than", 1),
+        make_rule(4, "occupancy", "less_than", 85, property_id=7),
+    ]
+    compiled = compile_rules(rules)
+    assert [(c.rule.id, c.column, c.property_id) for c in compiled] == [(1, "dscr", None), (4, "occupancy_rate", 7)]
+    assert resolve_metric_column("net_operating_income") == "net_operating_income"
+    assert resolve_metric_column("period_end_date") is None
+
+
+def test_threshold_and_window_conditions_are_vectorized():
+    rules = [
+        make_rule(1, "dscr", "less_than", 1.25),
+        make_rule(2, "occupancy_rate", "less_than", 90, property_id=2),
+        make_rule(3, "net_operating_income", "percentage_change", 20),
+        make_rule(4, "dscr", "z_score", 1.0),
+    ]
+    evaluator = CompiledAlertEvaluator(rules)
+    frame = evaluator.prepare_frame(metrics_frame({
+        "dscr": {1: [Decimal("1.5"), Decimal("1.5"), Decimal("1.4"), Decimal("1.1")], 2: [1.3, 1.3, 1.3, 1.3]},
+        "occupancy_rate": {1: [80, 80, 80, 80], 2: [95, 95, 88, None]},
+        "net_operating_income": {1: [100, 100, 130, 120], 2: [50, None, 50, 60]},
+    }))
+
+    hits = evaluator.evaluate(frame)
+    found = {(h.rule.id, h.period_id) for h in hits}
+    assert found == {
+        (1, 4),            # DSCR 1.1 < 1.25
+        (2, 13),           # occupancy only checked for property 2; None never triggers
+        (3, 3), (3, 14),   # +30% and +20%; a missing previous period never triggers
+        (4, 3), (4, 4),    # >1 std below the trailing mean; a constant series gives z=0
+    }
+    change = next(h for h in hits if (h.rule.id, h.period_id) == (3, 3))
+    assert change.breach_magnitude == pytest.approx(0.3)
+    assert change.details == {"previous_value": 100.0, "percentage_change": pytest.approx(30.0)}
+    below = next(h for h in hits if h.rule.id == 1)
+    assert below.breach_magnitude == pytest.approx((1.1 - 1.25) / 1.25)
+
+    assert {(h.rule.id, h.period_id) for h in evaluator.evaluate(frame, {(1, 3)})} == {(3, 3), (4, 3)}
+
+
+def test_bulk_evaluation_applies_cooldown_to_hits_in_target_order(monkeypatch):
+    rules = [
+        make_rule(1, "dscr", "less_than", 1.25, cooldown_period=60),
+        make_rule(2, "dscr", "less_than", 1.25),
+        make_rule(3, "dscr", "less_than", 1.25, cooldown_period=60, last_triggered_at=datetime.utcnow()),
+    ]
+    frame = metrics_frame({"dscr": {1: [1.0, 1.0, 1.0, 1.0], 2: [1.0, 1.0, 1.0, 1.0]}})
+    commits = []
+    db = SimpleNamespace(commit=lambda: commits.append(True))
+    service = AlertRulesService(db)
+    monkeypatch.setattr(service, "get_active_rules_for_properties", lambda property_ids: rules)
+    monkeypatch.setattr(
+        CompiledAlertEvaluator, "load_frame", lambda self, db, property_ids: self.prepare_frame(frame.copy())
+    )
+
+    targets = [(2, 12), (1, 2), (1, 3)]
+    results = service.evaluate_rules_bulk(targets)
+
+    assert list(results) == targets
+    assert [r["rule"].id for r in results[(2, 12)]] == [1, 2]
+    assert [r["rule"].id for r in results[(1, 2)]] == [2]
+    assert rules[0].execution_count == 1 and rules[1].execution_count == 3 and rules[2].execution_count == 0
+    assert commits == [True]
+    assert results[(2, 12)][0]["message"].startswith("Dscr is 1.00, which is below the threshold of 1.25")
+
+    for rule in rules:
+        rule.execution_count = 0
+    results = service.evaluate_rules_bulk(targets, ignore_cooldown=True)
+    assert [len(results[t]) for t in targets] == [3, 3, 3]
@@ -0,0 +1,71 @@
+from sqlalchemy import event
+
+from app.models.committee_alert import AlertSeverity, AlertType, CommitteeAlert, CommitteeType
+from app.models.property import Property
+from app.models.webhook import WebhookEndpoint, WebhookOutbox
+from app.services.alert_trigger_service import AlertTriggerService
+
+
+class FakeRule:
+    def __init__(self, rule_id, fail=False):
+        self.id = rule_id
+        self.fail = fail
+
+
+class FakeCreationService:
+    """Adds the alert without committing, like AlertCreationService(commit=False)."""
+
+    def __init__(self, db, events):
+        self.db = db
+        self.events = events
+
+    def create_alert_from_rule_result(self, rule, property_id, period_id, evaluation_result, metrics=None, commit=True):
+        assert commit is False
+        alert = CommitteeAlert(
+            property_id=property_id, alert_type=AlertType.DSCR_BREACH, severity=AlertSeverity.CRITICAL,
+            title=f"Rule {rule.id}", description="breach", assigned_committee=CommitteeType.FINANCE_SUBCOMMITTEE,
+        )
+        self.db.add(alert)
+        self.db.flush()
+        if rule.fail:
+            raise ValueError("rule failed after flushing its alert")
+        return alert
+
+    def run_follow_up_actions(self, alert):
+        self.events.append(("follow_up", alert.title))
+
+
+def make_service(session):
+    session.add(Property(id=1, property_code="P1", property_name="Tower", organization_id=None))
+    session.add(WebhookEndpoint(url="http://example.test/hook", events=["alert_triggered"], secret="s", is_active=True))
+    session.commit()
+
+    events = []
+    event.listen(session.get_bind(), "commit", lambda conn: events.append(("commit",)))  # Database commits, not savepoints
+    service = AlertTriggerService(session)
+    service.creation_service = FakeCreationService(session, events)
+    return service, events
+
+
+def test_alerts_and_outbox_rows_are_persisted_by_one_commit(db_session):
+    service, events = make_service(db_session)
+
+    created = service.create_alerts_for_results(1, 7, [{"rule": FakeRule(1)}, {"rule": FakeRule(2)}])
+
+    assert [a["title"] for a in created] == ["Rule 1", "Rule 2"]
+    # Alerts and outbox rows share the first commit; follow-up actions (and correlation) come after it
+    assert events[:3] == [("commit",), ("follow_up", "Rule 1"), ("follow_up", "Rule 2")]
+    outbox = db_session.query(WebhookOutbox).one()
+    assert outbox.event_type == "alert_triggered"
+    assert [a["alert_id"] for a in outbox.payload["alerts"]] == [a["alert_id"] for a in created]
+
+
+def test_failing_rule_is_rolled_back_to_its_savepoint(db_session):
+    service, events = make_service(db_session)
+
+    created = service.create_alerts_for_results(1, 7, [{"rule": FakeRule(1, fail=True)}, {"rule": FakeRule(2)}])
+
+    assert [a["title"] for a in created] == ["Rule 2"]
+    assert [a.title for a in db_session.query(CommitteeAlert).all()] == ["Rule 2"]
+    assert db_session.query(WebhookOutbox).count() == 1
+    assert events[:2] == [("commit",), ("follow_up", "Rule 2")]
@@ -0,0 +1,215 @@
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.anomaly_detection import AnomalyDetection
+from app.models.batch_reprocessing_item import BatchReprocessingItem
+from app.models.batch_reprocessing_job import BatchReprocessingJob
+from app.models.document_upload import DocumentUpload
+from app.models.financial_period import FinancialPeriod
+from app.models.property import Property
+from app.services.batch_reprocessing_service import BatchReprocessingService
+from app.tasks import batch_reprocessing_tasks
+
+
+@pytest.fixture
+def session(db_session):
+    db_session.add_all([
+        Property(id=1, property_code="P1", property_name="One", organization_id=1),
+        Property(id=2, property_code="P2", property_name="Two", organization_id=2),
+        FinancialPeriod(id=10, property_id=1, period_year=2025, period_month=1,
+                        period_start_date=date(2025, 1, 1), period_end_date=date(2025, 1, 31)),
+    ])
+    specs = [
+        (1, 10, "completed", "a.pdf"),
+        (1, 10, "completed", "b.pdf"),
+        (1, 10, "failed", "c.pdf"),         # skipped: extraction not completed
+        (1, 10, "completed", "boom.pdf"),   # detection raises
+        (2, 10, "completed", "other.pdf"),  # other organization
+        (1, 999, "completed", "d.pdf"),     # skipped: unknown period
+        (1, 10, "completed", "e.pdf"),
+        (1, 10, "completed", "f.pdf"),
+    ]
+    db_session.add_all([
+        DocumentUpload(id=i, property_id=p, period_id=period, extraction_status=status,
+                       document_type="balance_sheet", file_name=name, version=i)
+        for i, (p, period, status, name) in enumerate(specs, start=1)
+    ])
+    db_session.add(BatchReprocessingJob(id=1, organization_id=1, extraction_status_filter="all", status="running",
+                                        total_documents=7, results_summary={"job_type": "anomaly_reprocessing"}))
+    db_session.commit()
+    return db_session
+
+
+def detector(seen):
+    def detect(doc):
+        if doc.file_name == "boom.pdf":
+            raise RuntimeError("detector crashed")
+        seen.append(doc.id)
+    return detect
+
+
+def test_chunks_checkpoint_each_document_and_resume_skips_finished_work(session):
+    service = BatchReprocessingService(session)
+    job = session.get(BatchReprocessingJob, 1)
+
+    bounds = list(service.iter_chunk_bounds(job, chunk_size=3))
+    assert bounds == [(0, 3), (3, 7), (7, 8)]
+
+    seen = []
+    assert service.process_chunk(1, *bounds[0], detect=detector(seen)) == {"successful": 2, "failed": 0, "skipped": 1}
+
+    # A restarted dispatcher only sees what is left; a redelivered chunk does nothing
+    assert list(service.iter_chunk_bounds(job, chunk_size=3)) == [(0, 7), (7, 8)]
+    assert service.process_chunk(1, *bounds[0], detect=detector(seen)) == {"successful": 0, "failed": 0, "skipped": 0}
+
+    for after_id, last_id in service.iter_chunk_bounds(job, chunk_size=3):
+        service.process_chunk(1, after_id, last_id, detect=detector(seen))
+    assert seen == [1, 2, 7, 8]
+
+    session.expire_all()
+    job = session.get(BatchReprocessingJob, 1)
+    assert (job.processed_documents, job.successful_count, job.failed_count, job.skipped_count) == (7, 4, 1, 2)
+
+    result = service.finalize_job(1)
+    assert result["status"] == "completed"
+    assert result["remaining"] == 0
+    assert result["error_summary"] == {"validation_errors": 2, "processing_errors": 1}
+    assert job.results_summary["job_type"] == "anomaly_reprocessing"
+    assert [e["file_name"] for e in job.results_summary["error_details"]] == ["c.pdf", "boom.pdf", "d.pdf"]
+
+
+def test_unfinished_jobs_fail_resumably_and_cancellation_stops_chunks(session):
+    service = BatchReprocessingService(session)
+    job = session.get(BatchReprocessingJob, 1)
+    service.process_chunk(1, 0, 3, detect=detector([]))
+
+    result = service.finalize_job(1)
+    assert (result["status"], result["remaining"]) == ("failed", 4)
+    assert "resume" in job.results_summary["error"]
+
+    job.status = "cancelled"
+    session.commit()
+    assert service.process_chunk(1, 3, 8, detect=detector([])) == {"successful": 0, "failed": 0, "skipped": 0}
+    assert session.query(BatchReprocessingItem).count() == 3
+
+
+def test_retry_after_crash_replaces_the_interrupted_attempts_anomalies(session):
+    service = BatchReprocessingService(session)
+    raised = []
+
+    def detect(doc):
+        # Like the orchestrator: each anomaly commits on its own, tagged with the job
+        session.add(AnomalyDetection(document_id=doc.id, field_name="1010-0000", anomaly_type="z_score",
+                                     severity="high", confidence=0.9, metadata_json={"batch_job_id": 1}))
+        session.commit()
+
+    # Earlier job and manual detections on document 1 are not this job's partial work
+    session.add_all([
+        AnomalyDetection(document_id=1, field_name="1010-0000", anomaly_type="z_score", severity="high",
+                         confidence=0.9, metadata_json={"batch_job_id": 99}),
+        AnomalyDetection(document_id=1, field_name="1010-0000", anomaly_type="z_score", severity="high",
+                         confidence=0.9, metadata_json=None),
+    ])
+    session.commit()
+    detect(session.get(DocumentUpload, 1))  # The worker died before the checkpoint
+
+    service.process_chunk(1, 0, 3, detect=detect, raise_alerts=lambda discard: raised.append(discard))
+
+    tagged = [a.metadata_json for a in session.query(AnomalyDetection).filter_by(document_id=1)]
+    assert sorted(str(m) for m in tagged) == ["None", "{'batch_job_id': 1}", "{'batch_job_id': 99}"]
+    assert raised == [False, False, True]  # Alerts only for checkpointed, successful documents
+
+
+def test_resume_only_restarts_failed_or_stalled_reprocessing_jobs(session, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(batch_reprocessing_tasks.reprocess_documents_batch, "delay",
+                        lambda job_id: dispatched.append(job_id) or SimpleNamespace(id=f"task-{job_id}"))
+    now = datetime.utcnow()
+    session.add_all([
+        BatchReprocessingJob(id=2, organization_id=1, status="failed", results_summary={"job_type": "portfolio_export"}),
+        BatchReprocessingJob(id=3, organization_id=1, status="running", updated_at=now,
+                             results_summary={"job_type": "anomaly_reprocessing"}),
+        BatchReprocessingJob(id=4, organization_id=1, status="running", updated_at=now - timedelta(hours=2),
+                             results_summary={"job_type": "anomaly_reprocessing"}),
+        BatchReprocessingJob(id=5, organization_id=1, status="failed", results_summary=None),
+    ])
+    session.commit()
+    service = BatchReprocessingService(session)
+
+    with pytest.raises(ValueError, match="not found"):
+        service.resume_batch_job(2)
+    with pytest.raises(ValueError, match="still running"):
+        service.resume_batch_job(3)
+
+    assert service.resume_batch_job(4)["task_id"] == "task-4"
+    assert service.resume_batch_job(5)["status"] == "running"  # legacy job without job_type
+    assert dispatched == [4, 5]
+    # A resumed job is fresh again, so a second resume is rejected
+    with pytest.raises(ValueError, match="still running"):
+        service.resume_batch_job(4)
+
+
+def test_export_jobs_are_invisible_to_reprocessing_endpoints(session):
+    session.add(BatchReprocessingJob(id=2, organization_id=1, status="running",
+                                     results_summary={"job_type": "portfolio_export"}))
+    session.commit()
+    service = BatchReprocessingService(session)
+
+    for action in (service.get_job_status, service.cancel_job, service.start_batch_job):
+        with pytest.raises(ValueError, match="not found"):
+            action(2)
+    assert session.get(BatchReprocessingJob, 2).status == "running"
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values, self.ttls = {}, {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key], self.ttls[key] = value, ex
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_dispatcher_keeps_the_job_lock_until_the_chord_callback(session, monkeypatch):
+    from app.db import redis_client
+
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    monkeypatch.setattr(batch_reprocessing_tasks, "SessionLocal", lambda: session)
+    callbacks = []
+    monkeypatch.setattr(batch_reprocessing_tasks, "chord",
+                        lambda header: lambda callback: callbacks.append(callback))
+
+    dispatch = batch_reprocessing_tasks.reprocess_documents_batch
+    dispatch.push_request(id="dispatch-1")
+    try:
+        assert dispatch.run(1)["status"] == "dispatched"
+    finally:
+        dispatch.pop_request()
+    assert redis.values == {"reprocess_job:1": "dispatch-1"}
+    assert redis.ttls["reprocess_job:1"] >= batch_reprocessing_tasks.CHUNK_TIME_LIMIT
+
+    # A duplicate dispatch while the chunks run is skipped
+    dispatch.push_request(id="dispatch-2")
+    try:
+        assert dispatch.run(1)["status"] == "skipped"
+    finally:
+        dispatch.pop_request()
+
+    assert callbacks[0].args == (1, "dispatch-1")
+    monkeypatch.setattr(BatchReprocessingService, "finalize_job", lambda self, job_id: {"status": "completed"})
+    batch_reprocessing_tasks.finalize_reprocessing_job.run(*callbacks[0].args)
+    assert redis.values == {}
@@ -0,0 +1,125 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.models.balance_sheet_data import BalanceSheetData
+from app.models.cross_property_benchmark import CrossPropertyBenchmark
+from app.models.financial_period import FinancialPeriod
+from app.models.income_statement_data import IncomeStatementData
+from app.models.property import Property
+from app.services.cross_property_intelligence import CrossPropertyIntelligenceService
+
+JAN, FEB = date(2025, 1, 1), date(2025, 2, 1)
+CASH, RENT = "0122-0000", "4010-0000"
+
+
+def add_properties(session):
+    types = ["Retail", "Retail", "Retail", "Office", "Office"]
+    session.add_all([
+        Property(id=i, property_code=f"P{i}", property_name=f"P{i}", property_type=t, status="active")
+        for i, t in enumerate(types, start=1)
+    ])
+    session.add(Property(id=6, property_code="P6", property_name="Sold", property_type="Retail", status="sold"))
+    for pid in range(1, 7):
+        for month in (1, 2):
+            session.add(FinancialPeriod(
+                id=pid * 10 + month, property_id=pid, period_year=2025, period_month=month,
+                period_start_date=date(2025, month, 1), period_end_date=date(2025, month, 28)
+            ))
+    session.flush()
+
+
+def add_cash(session, pid, month, amount):
+    session.add(BalanceSheetData(property_id=pid, period_id=pid * 10 + month, account_code=CASH,
+                                 account_name="Cash", amount=amount))
+
+
+def add_rent(session, pid, month, amount):
+    session.add(IncomeStatementData(property_id=pid, period_id=pid * 10 + month, account_code=RENT,
+                                    account_name="Rent", period_amount=amount))
+
+
+@pytest.fixture
+def service(db_session):
+    add_properties(db_session)
+    for pid, cash in [(1, 100), (2, 200), (3, 300), (4, 400), (5, 5000), (6, 99999)]:
+        add_cash(db_session, pid, 1, cash)
+        add_rent(db_session, pid, 1, cash / 10)
+    add_cash(db_session, 1, 1, 50)  # two lines for the same account are summed
+    db_session.commit()
+    service = CrossPropertyIntelligenceService(db_session)
+    service.enabled = True
+    service.min_properties = 3
+    return service
+
+
+def cell(session, account, period, group="all"):
+    return session.query(CrossPropertyBenchmark).filter_by(
+        account_code=account, benchmark_period=period, property_group=group).one_or_none()
+
+
+def test_one_query_builds_every_account_and_group(service):
+    session = service.db
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    assert service.build_benchmark_cube() == 4  # cash and rent, for all and Retail; Office has 2 < 3
+    assert sum("GROUP BY" in s for s in statements) == 1
+
+    cash = cell(session, CASH, JAN)
+    assert cash.property_count == 5  # sold property excluded
+    assert cash.distribution == [[1, 150.0], [2, 200.0], [3, 300.0], [4, 400.0], [5, 5000.0]]
+    assert float(cash.portfolio_median) == 300.0
+    assert cell(session, CASH, JAN, "Retail").property_ids == [1, 2, 3]
+    assert cell(session, CASH, JAN, "Office") is None
+    assert float(cell(session, RENT, JAN).portfolio_mean) == pytest.approx(120.0)
+
+
+def test_lookups_read_the_cube(service):
+    session = service.db
+    service.build_benchmark_cube()
+
+    ranking = service.get_property_ranking(5, CASH)
+    assert (ranking["rank"], ranking["percentile_rank"], ranking["total_properties"]) == (1, 90.0, 5)
+    assert ranking["z_score"] > 1.9
+
+    assert [o["property_id"] for o in service.get_outliers(CASH, threshold=1.5)] == [5]
+    outlier = service.detect_cross_property_anomalies(5, CASH, 50000.0)
+    assert outlier["type"] == "cross_property_outlier"
+    # Retail properties compare within their type first
+    assert service.detect_cross_property_anomalies(1, CASH, 1000.0)["property_group"] == "Retail"
+    assert service.detect_cross_property_anomalies(2, CASH, 200.0) is None
+
+
+def test_refresh_for_period_updates_only_that_period(service):
+    session = service.db
+    service.build_benchmark_cube()
+    for pid, cash in [(1, 10), (2, 20), (3, 30)]:
+        add_cash(session, pid, 2, cash)
+    session.commit()
+
+    assert service.refresh_for_period(3, 32) == 2  # cash/all and cash/Retail for February
+    assert cell(session, CASH, FEB).property_ids == [1, 2, 3]
+    assert cell(session, CASH, JAN).property_count == 5
+    assert service.get_benchmark(CASH).benchmark_period == FEB
+
+    # A correction that drops a property below the minimum removes the stale cell
+    session.query(BalanceSheetData).filter_by(period_id=32).delete()
+    session.commit()
+    assert service.refresh_for_period(3, 32) == 0
+    assert cell(session, CASH, FEB) is None
+    assert cell(session, CASH, JAN) is not None
+
+
+def test_benchmark_account_codes_lists_one_statements_accounts(service):
+    add_cash(service.db, 6, 2, 1)  # sold property only
+    service.db.add(BalanceSheetData(property_id=6, period_id=61, account_code="0999-0000",
+                                    account_name="Sold only", amount=1))
+    service.db.add(BalanceSheetData(property_id=2, period_id=21, account_code="0001-0000",
+                                    account_name="Petty cash", amount=1))
+    service.db.commit()
+
+    assert service.benchmark_account_codes("balance_sheet") == ["0001-0000", CASH]
+    assert service.benchmark_account_codes("income_statement") == [RENT]
@@ -0,0 +1,202 @@
+from datetime import date
+from decimal import Decimal as D
+
+import pytest
+
+from app.models.balance_sheet_data import BalanceSheetData
+from app.models.cash_account_reconciliation import CashAccountReconciliation
+from app.models.cash_flow_data import CashFlowData
+from app.models.cash_flow_header import CashFlowHeader
+from app.models.financial_metrics import FinancialMetrics
+from app.models.financial_period import FinancialPeriod
+from app.models.income_statement_data import IncomeStatementData
+from app.models.income_statement_header import IncomeStatementHeader
+from app.models.mortgage_statement_data import MortgageStatementData
+from app.models.property import Property
+from app.models.rent_roll_data import RentRollData
+from app.services.bulk_metrics_service import METRIC_FIELDS, BulkMetricsService
+from app.services.metrics_service import MetricsService
+
+
+# The bulk upsert is Postgres SQL (INSERT ... ON CONFLICT (property_id, period_id))
+pytestmark = pytest.mark.postgres(models=[
+    Property, FinancialPeriod, BalanceSheetData, IncomeStatementData, IncomeStatementHeader,
+    CashFlowHeader, CashFlowData, CashAccountReconciliation, RentRollData, MortgageStatementData, FinancialMetrics,
+])
+
+PAIRS = [(1, 11), (1, 12), (1, 13), (2, 21), (3, 31)]
+
+
+def bs(property_id, period_id, code, amount, calculated=False):
+    return BalanceSheetData(property_id=property_id, period_id=period_id, account_code=code,
+                            account_name=code, amount=D(amount), is_calculated=calculated)
+
+
+def inc(property_id, period_id, code, amount, calculated=False):
+    return IncomeStatementData(property_id=property_id, period_id=period_id, account_code=code,
+                               account_name=code, period_amount=D(amount), is_calculated=calculated)
+
+
+def is_header(property_id, period_id, period_type):
+    return IncomeStatementHeader(
+        property_id=property_id, period_id=period_id, property_name="P", property_code="P",
+        report_period_start=date(2024, 1, 1), report_period_end=date(2024, 1, 31), period_type=period_type,
+        accounting_basis="Accrual", total_income=0, total_operating_expenses=0, total_expenses=0,
+        net_operating_income=0, net_income=0
+    )
+
+
+def cf_header(id, property_id, period_id, beginning, ending):
+    return CashFlowHeader(
+        id=id, property_id=property_id, period_id=period_id, property_name="P", property_code="P",
+        report_period_start=date(2024, 1, 1), report_period_end=date(2024, 1, 31), accounting_basis="Accrual",
+        total_income=0, total_operating_expenses=0, total_expenses=0, net_operating_income=0, net_income=0,
+        cash_flow=0, beginning_cash_balance=D(beginning), ending_cash_balance=D(ending)
+    )
+
+
+def unit(property_id, period_id, number, status, sqft, monthly, annual=None):
+    return RentRollData(property_id=property_id, period_id=period_id, unit_number=number, tenant_name=number,
+                        occupancy_status=status, unit_area_sqft=sqft and D(sqft),
+                        monthly_rent=monthly and D(monthly), annual_rent=annual and D(annual))
+
+
+def loan(property_id, period_id, number, principal, **fields):
+    return MortgageStatementData(property_id=property_id, period_id=period_id, loan_number=number,
+                                 statement_date=date(2024, 11, 30), principal_balance=D(principal), **fields)
+
+
+def seeded_metrics():
+    """Metrics stored before the run: Dec NOI and property value for property 1, occupancy for property 2."""
+    return [
+        FinancialMetrics(property_id=1, period_id=12, net_operating_income=D('600000.00'),
+                         net_property_value=D('4000000.00'), total_revenue=D('1.00'), dscr=D('9.0000')),
+        FinancialMetrics(property_id=2, period_id=21, occupancy_rate=D('88.00'), total_units=10),
+    ]
+
+
+def seed(session):
+    session.add_all([Property(id=i, property_code=f"P{i}", property_name=f"Property {i}") for i in (1, 2, 3)])
+    session.add_all([
+        FinancialPeriod(id=11, property_id=1, period_year=2024, period_month=11,
+                        period_start_date=date(2024, 11, 1), period_end_date=date(2024, 11, 30)),
+        FinancialPeriod(id=12, property_id=1, period_year=2024, period_month=12,
+                        period_start_date=date(2024, 12, 1), period_end_date=date(2024, 12, 31)),
+        FinancialPeriod(id=13, property_id=1, period_year=2025, period_month=1,
+                        period_start_date=date(2025, 1, 1), period_end_date=date(2025, 1, 31)),
+        FinancialPeriod(id=21, property_id=2, period_year=2024, period_month=12,
+                        period_start_date=date(2024, 1, 1), period_end_date=date(2024, 12, 31)),
+        FinancialPeriod(id=31, property_id=3, period_year=2024, period_month=12,
+                        period_start_date=date(2024, 12, 1), period_end_date=date(2024, 12, 31)),
+    ])
+    session.flush()
+
+    # Property 1, Nov: every statement, monthly income statement without stored totals
+    session.add_all([
+        bs(1, 11, '1999-0000', '5000000.00'), bs(1, 11, '0499-9000', '400000.00'),
+        bs(1, 11, '1099-0000', '4200000.00'), bs(1, 11, '2999-0000', '3500000.00'),
+        bs(1, 11, '2590-0000', '150000.00'), bs(1, 11, '2900-0000', '3350000.00'),
+        bs(1, 11, '3999-0000', '1500000.00'), bs(1, 11, '0122-0000', '120000.00'),
+        bs(1, 11, '0126-0000', '8000.00'), bs(1, 11, '0305-0000', '25000.00'),
+        bs(1, 11, '0306-0000', '1000.00', calculated=True), bs(1, 11, '0510-0000', '1000000.00'),
+        bs(1, 11, '0610-0000', '3500000.00'), bs(1, 11, '0710-0000', '300000.00'),
+        bs(1, 11, '1061-0000', '-500000.00'), bs(1, 11, '1071-0000', '-100000.00'),
+        bs(1, 11, '1310-0000', '40000.00'), bs(1, 11, '2611-0000', '2000000.00'),
+        bs(1, 11, '2613-0000', '500000.00'), bs(1, 11, '2650-0000', '250000.00'),
+        bs(1, 11, '3910-0000', '1400000.00'), bs(1, 11, '3995-0000', '100000.00'),
+        inc(1, 11, '4010-0000', '90000.00'), inc(1, 11, '4090-0000', '-500.00'),
+        inc(1, 11, '5010-0000', '20000.00'), inc(1, 11, '6010-0000', '10000.00'),
+        inc(1, 11, '6299-0000', '55000.00'), inc(1, 11, '7010-0000', '15000.00'),
+        inc(1, 11, '8010-0000', '5000.00'), inc(1, 11, '4999-0000', '1.00', calculated=True),
+        inc(1, 11, '9090-0000', '39500.00'),
+        is_header(1, 11, "Monthly"),
+        cf_header(1, 1, 11, '100000.00', '110000.00'),
+        CashFlowData(property_id=1, period_id=11, account_code='a', account_name='a', line_number=1,
+                     period_amount=D('30000.00'), cash_flow_category='operating'),
+        CashFlowData(property_id=1, period_id=11, account_code='b', account_name='b', line_number=2,
+                     period_amount=D('-12000.00'), cash_flow_category='financing'),
+        CashAccountReconciliation(header_id=1, property_id=1, period_id=11, account_name='Total Cash',
+                                  account_type='operating', beginning_balance=D('99000.00'),
+                                  ending_balance=D('111000.00'), difference=D('12000.00'), is_total_row=True),
+        unit(1, 11, 'A-101', 'occupied', '1000.00', '2000.00', '24000.00'),
+        unit(1, 11, 'A-102', 'vacant', '800.00', None),
+        unit(1, 11, 'A-103', 'occupied', '1200.00', '2500.00', '30000.00'),
+        unit(1, 11, 'ATM-1', 'occupied', '10.00', '100.00', '1200.00'),
+        loan(1, 11, 'L1', '2000000.00', interest_rate=D('5.0000'), monthly_debt_service=D('12000.00'),
+             ytd_interest_paid=D('8000.00'), total_loan_balance=D('2100000.00')),
+        loan(1, 11, 'L2', '1000000.00', interest_rate=D('6.0000'), annual_debt_service=D('90000.00'),
+             ytd_interest_paid=D('5000.00')),
+    ])
+
+    # Property 1, Dec: no income statement or mortgages (falls back to Nov); NOI and property value stored earlier
+    session.add_all(seeded_metrics())
+    session.add_all([
+        bs(1, 12, '1999-0000', '5100000.00'), bs(1, 12, '0499-9000', '0.00'), bs(1, 12, '2590-0000', '0.00'),
+        bs(1, 12, '2999-0000', '3400000.00'), bs(1, 12, '3999-0000', '1700000.00'),
+        cf_header(2, 1, 12, '110000.00', '115000.00'),
+        CashFlowData(property_id=1, period_id=12, account_code='a', account_name='a', line_number=1,
+                     period_amount=D('5000.00'), cash_flow_category='operating'),
+        unit(1, 12, 'A-101', 'occupied', '1000.00', '2100.00'),
+        unit(1, 12, 'COMMON', 'vacant', None, None),
+    ])
+
+    # Property 1, Jan: nothing extracted yet
+    # Property 2: annual income statement with a large negative other-income adjustment
+    session.add_all([
+        bs(2, 21, '1999-0000', '900000.00'), bs(2, 21, '2999-0000', '0.00'),
+        inc(2, 21, '4999-0000', '200000.00'), inc(2, 21, '4010-0000', '250000.00'),
+        inc(2, 21, '4090-0000', '-50000.00'), inc(2, 21, '5010-0000', '80000.00'),
+        inc(2, 21, '9090-0000', '70000.00'),
+        is_header(2, 21, "Annual"),
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def session(pg_session):
+    seed(pg_session)
+    return pg_session
+
+
+def stored(session):
+    session.expire_all()
+    return {
+        (row.property_id, row.period_id): {field: getattr(row, field) for field in METRIC_FIELDS}
+        for row in session.query(FinancialMetrics).all()
+    }
+
+
+def test_bulk_metrics_match_the_per_record_path(session):
+    service = MetricsService(session)
+    for property_id, period_id in PAIRS:
+        service.calculate_all_metrics(property_id, period_id)
+    expected = stored(session)
+
+    # Same inputs for the bulk path: back to the metrics stored before the run
+    session.query(FinancialMetrics).delete()
+    session.add_all(seeded_metrics())
+    session.commit()
+    assert BulkMetricsService(session, chunk_size=2).calculate(PAIRS) == len(PAIRS)
+
+    assert set(expected) == set(PAIRS)
+    assert stored(session) == expected
+
+    # The fixtures exercise the fallbacks, not just empty rows
+    assert expected[(1, 11)]["dscr"] is not None
+    assert expected[(1, 12)]["net_operating_income"] == D('600000.00')
+    assert expected[(1, 13)]["total_annual_debt_service"] == D('234000.00')
+    assert expected[(2, 21)]["operating_margin"] is not None
+    assert expected[(2, 21)]["total_units"] is None
+
+
+def test_recalculation_is_idempotent_and_leaves_other_pairs_alone(session):
+    before = stored(session)[(2, 21)]
+    service = BulkMetricsService(session)
+    assert service.calculate_for_properties([1]) == 3
+    first = stored(session)
+    assert set(first) == {(1, 11), (1, 12), (1, 13), (2, 21)}
+    assert first[(2, 21)] == before
+
+    service.calculate_for_properties([1])
+    assert stored(session) == first
+    assert session.query(FinancialMetrics).count() == 4
@@ -0,0 +1,191 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models.document_chunk import DocumentChunk
+from app.models.document_upload import DocumentUpload
+from app.models.extraction_log import ExtractionLog
+from app.models.financial_period import FinancialPeriod
+from app.models.property import Property
+from app.services.document_chunking_service import DocumentChunkingService
+from app.services.document_indexing_service import DocumentIndexingService
+
+
+class FakeEmbeddings:
+    embedding_method = "sentence_transformers"
+    OPENAI_MODEL = "text-embedding-3-small"
+    SENTENCE_TRANSFORMER_MODEL = "all-MiniLM-L6-v2"
+
+    def __init__(self):
+        self.batches = []
+
+    def generate_embeddings_batch(self, texts, batch_size=100):
+        self.batches.append(len(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakePinecone:
+    def __init__(self):
+        self.vectors = {}
+        self.upserts = 0
+
+    def _get_namespace(self, document_type):
+        return document_type
+
+    def _build_vector_id(self, chunk_id):
+        return f"chunk_{chunk_id}"
+
+    def _build_metadata(self, **kwargs):
+        return kwargs
+
+    def upsert_vectors(self, vectors, namespace=""):
+        self.upserts += 1
+        for vector in vectors:
+            self.vectors[vector["id"]] = namespace
+        return {"success": True, "upserted_count": len(vectors)}
+
+    def delete_vectors(self, vector_ids=None, namespace="", filter=None):
+        for vector_id in vector_ids:
+            self.vectors.pop(vector_id, None)
+        return {"success": True}
+
+
+def paragraphs(label, count):
+    return "\n\n".join(f"{label} paragraph {i} " + "x" * 60 for i in range(count))
+
+
+@pytest.fixture
+def session(db_session):
+    db_session.add(Property(id=1, property_code="P1", property_name="One"))
+    db_session.add(FinancialPeriod(id=1, property_id=1, period_year=2025, period_month=1,
+                                   period_start_date=date(2025, 1, 1), period_end_date=date(2025, 1, 31)))
+    for doc_id in range(1, 6):
+        db_session.add(ExtractionLog(id=doc_id, filename=f"doc{doc_id}.pdf",
+                                     extracted_text=paragraphs(f"doc{doc_id}", 5)))
+        db_session.add(DocumentUpload(id=doc_id, property_id=1, period_id=1, document_type="balance_sheet",
+                                      file_name=f"doc{doc_id}.pdf", extraction_id=doc_id,
+                                      extraction_status="completed", version=doc_id))
+    db_session.commit()
+    return db_session
+
+
+def make_indexer(session, embeddings, pinecone, batch_size=4):
+    return DocumentIndexingService(
+        session, embedding_service=embeddings, pinecone_service=pinecone,
+        chunking_service=DocumentChunkingService(session, chunk_size=100, chunk_overlap=10),
+        batch_size=batch_size
+    )
+
+
+def test_indexes_in_bounded_batches_and_skips_unchanged(session):
+    embeddings, pinecone = FakeEmbeddings(), FakePinecone()
+    stats = make_indexer(session, embeddings, pinecone).index_documents()
+
+    assert (stats["indexed"], stats["failed"], stats["has_more"]) == (5, 0, False)
+    assert stats["total_chunks"] == stats["embedded"] == stats["synced"] == 25
+    assert max(embeddings.batches) <= 4 and sum(embeddings.batches) == 25
+    assert len(pinecone.vectors) == 25
+    chunks = session.query(DocumentChunk).all()
+    assert all(c.content_hash and c.vector_synced_at and c.embedding for c in chunks)
+
+    embeddings.batches.clear()
+    stats = make_indexer(session, embeddings, pinecone).index_documents()
+    assert (stats["unchanged"], stats["indexed"], embeddings.batches) == (5, 0, [])
+
+
+def test_changed_document_is_reindexed_and_stale_vectors_removed(session):
+    embeddings, pinecone = FakeEmbeddings(), FakePinecone()
+    make_indexer(session, embeddings, pinecone).index_documents()
+    old_ids = {c.id for c in session.query(DocumentChunk).filter_by(document_id=2)}
+
+    session.get(ExtractionLog, 2).extracted_text = paragraphs("revised", 3)
+    session.commit()
+    stats = make_indexer(session, embeddings, pinecone).index_documents()
+
+    assert (stats["indexed"], stats["unchanged"], stats["total_chunks"]) == (1, 4, 3)
+    new_chunks = session.query(DocumentChunk).filter_by(document_id=2).all()
+    assert len(new_chunks) == 3 and not old_ids & {c.id for c in new_chunks}
+    assert not any(f"chunk_{i}" in pinecone.vectors for i in old_ids)
+    assert len(pinecone.vectors) == 23
+
+
+def test_run_stops_at_max_documents_and_resumes(session):
+    embeddings, pinecone = FakeEmbeddings(), FakePinecone()
+    first = make_indexer(session, embeddings, pinecone).index_documents(max_documents=2)
+    assert (first["indexed"], first["has_more"], first["last_document_id"]) == (2, True, 2)
+
+    rest = make_indexer(session, embeddings, pinecone).index_documents(after_id=first["last_document_id"])
+    assert (rest["indexed"], rest["unchanged"], rest["has_more"]) == (3, 0, False)
+
+
+def test_failed_embedding_leaves_document_for_the_next_run(session):
+    class FailingEmbeddings(FakeEmbeddings):
+        def generate_embeddings_batch(self, texts, batch_size=100):
+            raise RuntimeError("embedding backend down")
+
+    stats = make_indexer(session, FailingEmbeddings(), FakePinecone()).index_documents(document_ids=[1])
+    assert (stats["failed"], stats["indexed"]) == (1, 0)
+    assert session.query(DocumentChunk).count() == 0
+
+    stats = make_indexer(session, FakeEmbeddings(), FakePinecone()).index_documents(document_ids=[1])
+    assert stats["indexed"] == 1
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def expire(self, key, ttl):
+        pass
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_beat_tick_is_skipped_while_a_corpus_chain_is_in_flight(monkeypatch):
+    from app.db import redis_client
+    from app.tasks import document_indexing_tasks as tasks
+
+    redis = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: redis)
+    monkeypatch.setattr(tasks, "SessionLocal", lambda: Session())
+    runs = []
+
+    class FakeIndexer:
+        def __init__(self, db):
+            pass
+
+        def index_documents(self, document_ids=None, force=False, after_id=0):
+            runs.append(after_id)
+            return {"has_more": after_id == 0, "last_document_id": 2, "total_documents": 2}
+
+    queued = []
+    monkeypatch.setattr(tasks, "DocumentIndexingService", FakeIndexer)
+    monkeypatch.setattr(tasks.index_documents, "apply_async", lambda kwargs: queued.append(kwargs))
+
+    def run(task_id, **kwargs):
+        tasks.index_documents.push_request(id=task_id)
+        try:
+            return tasks.index_documents.run(**kwargs)
+        finally:
+            tasks.index_documents.pop_request()
+
+    assert run("tick-1")["status"] == "completed"
+    assert queued == [{"after_id": 2, "force": False, "chain_id": "tick-1"}]
+    assert redis.values == {tasks.INDEX_CHAIN_LOCK_KEY: "tick-1"}
+
+    # The next tick finds the chain in flight; its continuation runs and releases the lock at the end
+    assert run("tick-2")["status"] == "skipped"
+    assert run("link-2", **queued[0])["status"] == "completed"
+    assert runs == [0, 2] and redis.values == {}
+    assert run("tick-3")["status"] == "completed"
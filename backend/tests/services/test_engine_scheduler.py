@@ -0,0 +1,101 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.document_upload import DocumentUpload
+from app.models.extraction_log import ExtractionLog
+from app.services.engine_scheduler import EnginePlan, EngineScheduler, EngineStats, template_fingerprint
+
+
+def runners_for(confidences, calls):
+    def runner(engine):
+        def run():
+            calls.append(engine)
+            return confidences[engine]
+        return run
+    return {engine: runner(engine) for engine in confidences}
+
+
+def test_fingerprint_ignores_period_and_amounts():
+    december = "ESP Apartments\nBalance Sheet\nAs of December 31, 2024\n1010-0000 Cash 12,345.67"
+    january = "ESP Apartments\nBalance Sheet\nAs of Jan 31, 2025\n1010-0000 Cash 9,876.54"
+    other = "ESP Apartments\nIncome Statement\nFor the period ending January 31, 2025"
+
+    assert template_fingerprint(december, "digital") == template_fingerprint(january, "digital")
+    assert template_fingerprint(december, "digital") != template_fingerprint(other, "digital")
+    assert template_fingerprint(december, "digital") != template_fingerprint(december, "scanned")
+    assert template_fingerprint("  2024 / 12 ", "digital") is None
+
+
+def test_explores_until_an_engine_is_proven_then_skips_and_escalates():
+    calls = []
+    confidences = {"camelot": 0.95, "pdfplumber": 0.9, "pymupdf": 0.7}
+
+    exploring = EnginePlan(stats={"pymupdf": EngineStats(runs=1, wins=1)})
+    exploring.run("confidence", runners_for(confidences, calls), lambda c: c)
+    assert calls == ["pymupdf", "pdfplumber", "camelot"]
+    assert exploring.outcomes() == {"confidences": confidences, "skipped": [], "escalated": False}
+
+    # pdfplumber proven for this template: it runs first and the others are skipped
+    calls.clear()
+    proven = EnginePlan(stats={"pdfplumber": EngineStats(runs=5, wins=5), "pymupdf": EngineStats(runs=5, wins=1)})
+    assert proven.order(["camelot", "pymupdf", "pdfplumber", "ocr"]) == ["pdfplumber", "camelot", "ocr", "pymupdf"]
+    proven.run("confidence", runners_for(confidences, calls), lambda c: c)
+    assert calls == ["pdfplumber"]
+    assert proven.skipped == ["camelot", "pymupdf"]
+
+    # This period's document falls below threshold: escalate to the next engine
+    calls.clear()
+    low = dict(confidences, pdfplumber=0.5)
+    proven.run("all_models", runners_for(low, calls), lambda c: c)
+    assert calls == ["pdfplumber", "camelot"]
+    assert proven.escalated is True
+
+    # Confident but failing validation also escalates
+    calls.clear()
+    failing = EnginePlan(stats={"pdfplumber": EngineStats(runs=5, wins=5)})
+    failing.run("multi_engine", runners_for(confidences, calls), lambda c: c, validated=lambda c: c != 0.9)
+    assert calls == ["pdfplumber", "pymupdf", "camelot"]
+    assert failing.escalated is True
+
+    # A replanned document keeps what ran under its first plan
+    replanned = EnginePlan()
+    replanned.absorb(failing)
+    assert replanned.outcomes() == {"confidences": {"pdfplumber": 0.9, "pymupdf": 0.7, "camelot": 0.95},
+                                    "skipped": [], "escalated": True}
+
+
+def test_win_rates_come_from_recent_extractions_of_the_same_template():
+    engine = create_engine("sqlite://")
+    ExtractionLog.__table__.create(engine)
+    DocumentUpload.__table__.create(engine)
+    session = Session(bind=engine)
+
+    def extraction(property_id, period_id, fingerprint, confidences):
+        log = ExtractionLog(filename="bs.pdf", template_fingerprint=fingerprint, engine_outcomes={"confidences": confidences})
+        session.add(log)
+        session.flush()
+        session.add(DocumentUpload(
+            property_id=property_id, period_id=period_id, document_type="balance_sheet",
+            file_name="bs.pdf", file_path="x/bs.pdf", extraction_id=log.id
+        ))
+
+    for period_id in range(1, 4):
+        extraction(1, period_id, "abc", {"pymupdf": 0.97, "pdfplumber": 0.9, "camelot": 0.6})
+    extraction(1, 4, "other", {"pymupdf": 0.1})
+    extraction(2, 1, "abc", {"pymupdf": 0.1})
+    session.commit()
+
+    scheduler = EngineScheduler(session, confidence_threshold=0.85, min_samples=3, min_win_rate=0.9, history=20)
+    stats = scheduler.win_rates(1, "balance_sheet", "abc")
+    assert {name: (s.runs, s.wins) for name, s in stats.items()} == {
+        "pymupdf": (3, 3), "pdfplumber": (3, 3), "camelot": (3, 0),
+    }
+
+    plan = scheduler.plan(1, "balance_sheet", "abc")
+    assert not plan.exploring
+    assert plan.order(["camelot", "pdfplumber", "pymupdf"]) == ["pymupdf", "pdfplumber", "camelot"]
+    assert scheduler.plan(1, "balance_sheet", None).exploring
+
+    # Before a document's text is extracted it is planned with the latest template
+    assert scheduler.latest_fingerprint(1, "balance_sheet") == "other"
+    assert scheduler.latest_fingerprint(1, "income_statement") is None
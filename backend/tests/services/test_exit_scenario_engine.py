@@ -0,0 +1,173 @@
+import time
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registers referenced tables for the FKs)
+from app.models.property import Property
+from app.services import exit_scenario_engine as engine
+from app.services.exit_strategy_service import ExitStrategyService
+
+
+def reference_irr(cash_flows):
+    # Real root of the NPV polynomial in x = 1 / (1 + r)
+    roots = np.roots(cash_flows[::-1])
+    real = roots[np.isreal(roots) & (roots.real > 0)].real
+    return 1 / real[0] - 1
+
+
+def test_batched_irr_matches_polynomial_roots_and_flags_no_solution():
+    cash_flows = np.array([
+        [-1000, 100, 100, 100, 1100],
+        [-1000, 0, 0, 0, 2000],
+        [-500, 600, 0, 0, 0],
+        [-1000, 50, 50, 50, 50],
+        [-1000, -10, -10, -10, -10],  # never recovers: no IRR
+    ], dtype=float)
+    irr = engine.irr(cash_flows)
+    for row, value in zip(cash_flows[:4], irr[:4]):
+        assert value == pytest.approx(reference_irr(row), abs=1e-9)
+    assert irr[0] == pytest.approx(0.10)
+    assert np.isnan(irr[4])
+    assert engine.npv(irr[:4], cash_flows[:4]) == pytest.approx(np.zeros(4), abs=1e-6)
+
+
+def test_vectorized_amortization_matches_closed_form():
+    rates = np.array([0.0, 0.055, 0.08])
+    payment = engine.monthly_payment(1_000_000, rates, 10)
+    assert payment[0] == pytest.approx(1_000_000 / 120)
+    assert payment[1] == pytest.approx(10852.63, abs=0.01)
+    balance = engine.remaining_balance(1_000_000, rates, 10, [0, 10, 5])
+    assert balance[0] == pytest.approx(1_000_000)
+    assert balance[1] == pytest.approx(0, abs=1e-6)
+
+    # Month-by-month amortization of the 8% loan
+    remaining = 1_000_000.0
+    for _ in range(60):
+        remaining = remaining * (1 + 0.08 / 12) - payment[2]
+    assert balance[2] == pytest.approx(remaining)
+
+
+def test_debt_service_stops_once_the_loan_is_paid_off():
+    flows = engine.hold_and_sell_cash_flows(
+        noi=100_000, equity=400_000, loan_amount=500_000, interest_rate=0.06, noi_growth=0.0,
+        exit_cap_rate=0.08, hold_years=12, loan_term_years=10,
+    )[0]
+    debt_service = 12 * engine.monthly_payment(500_000, 0.06, 10)
+    assert flows[1:11] == pytest.approx(np.full(10, 100_000 - debt_service))
+    assert flows[11] == pytest.approx(100_000)
+    assert flows[12] == pytest.approx(100_000 + 100_000 / 0.08)  # Nothing left to repay at the sale
+
+
+def test_total_losses_count_as_worst_outcomes_in_the_distribution():
+    cash_flows = np.array([
+        [-1000, 100, 100, 100, 1100],
+        [-1000, 50, 50, 50, 50],
+        [-1000, -10, -10, -10, -10],  # never recovers: no IRR, total loss
+        [-1, 0, 0, 0, 1e9],  # above IRR_UPPER_BOUND: no IRR, not a loss
+    ], dtype=float)
+    irr = engine.loss_adjusted_irr(cash_flows, engine.irr(cash_flows))
+    assert irr[2] == -1.0 and np.isnan(irr[3])
+
+    summary = engine.distribution_summary(irr, percentiles=(0, 100))
+    assert summary["p0"] == -1.0 and summary["p100"] == pytest.approx(0.10)
+    assert summary["missing_share"] == 0.25
+    assert engine.distribution_summary([np.nan])["missing_share"] == 1.0
+
+
+def test_grid_rows_match_single_scenario_cash_flows():
+    grid = engine.scenario_grid([0.07, 0.08], [0.05, 0.06], [0.0, 0.03], [3, 5])
+    flows = engine.hold_and_sell_cash_flows(
+        noi=100_000, equity=400_000, loan_amount=900_000, interest_rate=grid["interest_rate"],
+        noi_growth=grid["noi_growth"], exit_cap_rate=grid["exit_cap_rate"], hold_years=grid["hold_years"],
+        selling_cost_rate=0.06,
+    )
+    assert flows.shape == (16, 6)
+
+    for i in (0, 7, 15):
+        hold = grid["hold_years"][i]
+        single = engine.hold_and_sell_cash_flows(
+            100_000, 400_000, 900_000, grid["interest_rate"][i], grid["noi_growth"][i],
+            grid["exit_cap_rate"][i], hold, selling_cost_rate=0.06,
+        )[0]
+        assert flows[i] == pytest.approx(np.pad(single, (0, 5 - hold)))
+        assert not flows[i, hold + 1:].any()
+
+    # Zero-padding after the exit year leaves IRR unchanged
+    short = grid["hold_years"] == 3
+    trimmed = engine.irr(flows[short][:, :4])
+    assert engine.irr(flows[short]) == pytest.approx(trimmed)
+
+
+class FakeCapRate:
+    def calculate_cap_rate(self, property_id):
+        return {"success": True, "noi": 800_000, "cap_rate": 0.07, "property_value": 800_000 / 0.07}
+
+
+class FakeLTV:
+    def calculate_ltv(self, property_id):
+        return {"success": True, "ltv": 0.6}
+
+
+@pytest.fixture
+def service():
+    engine_ = create_engine("sqlite://")
+    Property.__table__.create(engine_)
+    session = Session(bind=engine_)
+    session.add(Property(id=1, property_code="P1", property_name="Tower"))
+    session.commit()
+    service = ExitStrategyService.__new__(ExitStrategyService)
+    service.db = session
+    service.cap_rate_service = FakeCapRate()
+    service.ltv_service = FakeLTV()
+    return service
+
+
+def test_monte_carlo_distribution_is_fast_and_ordered(service):
+    started = time.perf_counter()
+    result = service.run_monte_carlo(1, n_draws=20_000, seed=7)
+    elapsed = time.perf_counter() - started
+
+    assert result["success"] and elapsed < 1.0
+    irr, npv = result["irr"], result["npv"]
+    assert irr["p10"] < irr["p50"] < irr["p90"]
+    assert npv["p10"] < npv["p50"] < npv["p90"]
+    assert 0 <= result["probability_negative_npv"] <= 1
+    assert result["assumptions"]["exit_cap_rate_mean"] == pytest.approx(0.075)
+    assert service.run_monte_carlo(1, n_draws=500, seed=7)["irr"] == \
+        service.run_monte_carlo(1, n_draws=500, seed=7)["irr"]
+
+
+def test_scenario_grid_responds_to_each_assumption(service):
+    result = service.run_scenario_grid(
+        1, exit_cap_rates=[0.07, 0.08], interest_rates=[0.05, 0.07],
+        noi_growth_rates=[0.0, 0.03], hold_periods=[5],
+    )
+    assert result["scenario_count"] == 8
+    by_key = {(s["exit_cap_rate"], s["interest_rate"], s["noi_growth_rate"]): s["irr"] for s in result["scenarios"]}
+    assert by_key[(0.07, 0.05, 0.03)] > by_key[(0.08, 0.05, 0.03)]  # higher exit cap, lower price
+    assert by_key[(0.07, 0.05, 0.03)] > by_key[(0.07, 0.07, 0.03)]  # costlier debt
+    assert by_key[(0.07, 0.05, 0.03)] > by_key[(0.07, 0.05, 0.0)]  # slower growth
+    assert result["best_scenario"]["irr"] == max(by_key.values())
+
+
+def test_interest_rate_sensitivity_reprices_refinance_in_one_pass(service, monkeypatch):
+    calls = []
+    original = service.analyze_exit_strategies
+    monkeypatch.setattr(service, "analyze_exit_strategies",
+                        lambda *args, **kwargs: calls.append(1) or original(*args, **kwargs))
+
+    result = service.get_interest_rate_sensitivity(1, rate_scenarios=[-1.0, 0.0, 1.0])
+
+    assert len(calls) == 1
+    down, base, up = result["sensitivity_analysis"]
+    strategies = result["base_case"]["strategies"]
+    assert base["refinance_irr"] == pytest.approx(strategies["refinance"]["irr_percentage"])
+    assert base["hold_npv"] == pytest.approx(strategies["hold"]["npv"])
+    assert down["refinance_irr"] > base["refinance_irr"] > up["refinance_irr"]
+    assert down["hold_irr"] == base["hold_irr"] == up["hold_irr"]
+    assert down["hold_npv"] > base["hold_npv"] > up["hold_npv"]
+    assert Decimal(str(result["base_case"]["assumptions"]["discount_rate"])) == Decimal("0.1")
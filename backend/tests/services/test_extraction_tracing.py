@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models.extraction_log import ExtractionLog
+from app.monitoring.extraction_tracing import ExtractionTrace, traced_stage
+from app.services.extraction_timing_service import ExtractionTimingService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_nested_stages_are_exclusive_and_failures_recorded():
+    clock = Clock()
+    trace = ExtractionTrace("balance_sheet", upload_id=7, clock=clock)
+
+    with trace.document():
+        with trace.stage("download"):
+            clock.now += 0.2
+        with trace.stage("insert"):
+            clock.now += 0.5
+            with trace.stage("dedup"):
+                clock.now += 0.1
+            with trace.stage("dedup"):
+                clock.now += 0.05
+        with pytest.raises(ValueError):
+            with trace.stage("anomalies"):
+                clock.now += 0.3
+                raise ValueError("boom")
+        with traced_stage(None, "metrics"):
+            clock.now += 1.0  # untraced
+
+    assert trace.breakdown() == {
+        "document_type": "balance_sheet",
+        "total_ms": 2150.0,
+        "stages": {"download": 200.0, "insert": 500.0, "dedup": 150.0, "anomalies": 300.0},
+        "calls": {"dedup": 2},
+        "failed": ["anomalies"],
+    }
+
+
+def make_log(session, document_type, stages, total_ms, age_days=0):
+    session.add(ExtractionLog(
+        filename="f.pdf",
+        stage_timings={"document_type": document_type, "total_ms": total_ms, "stages": stages},
+        created_at=datetime.utcnow() - timedelta(days=age_days),
+    ))
+
+
+def test_stage_percentiles_group_by_document_type_in_stage_order():
+    engine = create_engine("sqlite://")
+    ExtractionLog.__table__.create(engine)
+    session = Session(bind=engine)
+    for i in range(1, 11):
+        make_log(session, "balance_sheet", {"insert": 10.0 * i, "parse": 100.0}, total_ms=200.0 + i)
+    make_log(session, "rent_roll", {"parse": 5.0}, total_ms=9.0)
+    make_log(session, "balance_sheet", {"insert": 99999.0}, total_ms=99999.0, age_days=90)
+    session.add(ExtractionLog(filename="untimed.pdf"))
+    session.commit()
+
+    rows = ExtractionTimingService(session).stage_percentiles(days=30)
+
+    assert [(r["document_type"], r["stage"]) for r in rows] == [
+        ("balance_sheet", "total"), ("balance_sheet", "parse"), ("balance_sheet", "insert"),
+        ("rent_roll", "total"), ("rent_roll", "parse"),
+    ]
+    insert = rows[2]
+    assert insert["samples"] == 10
+    assert insert["p50_ms"] == 55.0
+    assert insert["p95_ms"] == pytest.approx(95.5)
+    assert insert["mean_ms"] == 55.0
+
+    only_rent_roll = ExtractionTimingService(session).stage_percentiles(document_type="rent_roll")
+    assert {r["document_type"] for r in only_rent_roll} == {"rent_roll"}
@@ -0,0 +1,128 @@
+import random
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from app.services import fuzzy_match_core
+from app.services.fuzzy_match_core import amount_blocks, assign, diff_percent, name_scores
+from app.services.matching_engines import CalculatedMatchEngine, FuzzyMatchEngine, InferredMatchEngine
+
+
+def test_amount_blocks_cover_every_pair_within_tolerance():
+    rng = random.Random(7)
+    source = np.array([rng.choice([-1, 1]) * 10 ** rng.uniform(0, 6) for _ in range(300)] + [0.0, np.nan])
+    target = np.array([a * rng.uniform(0.9, 1.1) for a in source[:300]] + [0.0, 5.0])
+
+    blocked = set()
+    for source_idx, target_idx in amount_blocks(source, target, 5.0):
+        blocked.update((int(s), int(t)) for s in source_idx for t in target_idx)
+
+    pct = diff_percent(source[:, None], target[None, :])
+    within = {(int(s), int(t)) for s, t in zip(*np.nonzero(pct <= 5.0))}
+    assert within <= blocked
+    assert len(blocked) < len(source) * len(target) / 10
+    assert not any(s == len(source) - 1 for s, _ in blocked)  # missing amounts never block
+
+
+def test_assignment_is_one_to_one_and_beats_greedy():
+    # Greedy takes (0, 0) at 90 and leaves source 1 with nothing; optimal total is 85 + 80
+    candidates = [(0, 0, 90.0, "a"), (0, 1, 85.0, "a"), (1, 0, 80.0, "a"), (0, 0, 70.0, "b")]
+    assert assign(candidates) == [(0, 1, 85.0, "a"), (1, 0, 80.0, "a")]
+
+
+def test_assignment_falls_back_to_greedy_beyond_hungarian_limit(monkeypatch):
+    monkeypatch.setattr(fuzzy_match_core, "HUNGARIAN_MAX_CELLS", 1)
+    candidates = [(0, 0, 90.0, "a"), (0, 1, 85.0, "a"), (1, 0, 80.0, "a")]
+    assert assign(candidates) == [(0, 0, 90.0, "a")]
+
+
+def test_blocked_name_scores_match_dense_scores(monkeypatch):
+    sources = ["Property Tax Payable", "Accrued Interest", "Mortgage Payable - Wells", "Zzzz"]
+    targets = ["Property Taxes Payable", "Accrued Interest Expense", "Mortgage Payable Wells Fargo", "Cash"]
+    dense = name_scores(sources, targets, 70.0)
+    monkeypatch.setattr(fuzzy_match_core, "DENSE_NAME_CELLS", 0)
+    blocked = name_scores(sources, targets, 70.0)
+    assert blocked.keys() == dense.keys()
+    assert all(blocked[k] == pytest.approx(dense[k]) for k in dense)
+
+
+def test_fuzzy_engine_combines_name_and_code_range_matches():
+    sources = [
+        {"id": 1, "account_name": "Property Tax Payable", "account_code": "2100-0000", "amount": 1000},
+        {"id": 2, "account_name": "Property Taxes Payable", "account_code": "2100-0100", "amount": 5000},
+        {"id": 3, "account_name": "", "account_code": "2610-0100", "amount": 250000},
+        {"id": 4, "account_name": "Unrelated", "account_code": "9999-0000", "amount": 10},
+    ]
+    targets = [
+        {"id": 10, "account_name": "Property Taxes Payable", "account_code": "2100-0000", "amount": "1000"},
+        {"id": 11, "account_name": "Property Tax Payable", "account_code": "2100-0000", "amount": 5000},
+        {"id": 12, "account_name": "Wells Fargo Mortgage", "account_code": "2610-0000", "amount": 250100},
+    ]
+
+    matches = FuzzyMatchEngine(min_confidence=70.0).find_matches(
+        sources, targets, "balance_sheet_data", "mortgage_statement_data"
+    )
+
+    assert [(m.source_record_id, m.target_record_id, m.match_algorithm) for m in matches] == [
+        (1, 10, "fuzzy_string"), (2, 11, "fuzzy_string"), (3, 12, "account_code_range"),
+    ]
+    assert len({m.target_record_id for m in matches}) == len(matches)
+    code_match = matches[2]
+    assert code_match.amount_difference == Decimal("100")
+    assert code_match.confidence_score == pytest.approx(85.0 - 5 * 100 / 250100 * 100)
+
+
+def brute_force_context_matches(engine, sources, targets):
+    """Per-source best target exactly as the original nested loop scored it."""
+    results = []
+    for source in sources:
+        source_amount = engine._get_amount(source)
+        source_category = engine._extract_category(source.get("account_code", ""))
+        if source_amount is None:
+            continue
+        best, best_confidence = None, 0.0
+        for target in targets:
+            target_amount = engine._get_amount(target)
+            if target_amount is None:
+                continue
+            target_category = engine._extract_category(target.get("account_code", ""))
+            category_match = source_category == target_category if source_category and target_category else False
+            similarity = engine._calculate_amount_similarity(source_amount, target_amount)
+            confidence = similarity * (70.0 if category_match else 50.0)
+            if confidence > best_confidence and confidence >= engine.min_confidence:
+                best, best_confidence = target, confidence
+        if best is not None:
+            results.append((source["id"], best["id"], best_confidence))
+    return results
+
+
+def test_context_aware_matching_equals_brute_force():
+    rng = random.Random(3)
+    codes = ["2000-0000", "2600-0100", "4000-0000", "5000-0200", "7777-0000", ""]
+
+    def record(i):
+        amount = None if i % 17 == 0 else round(rng.choice([1, -1]) * 10 ** rng.uniform(1, 5), 2)
+        return {"id": i, "account_code": rng.choice(codes), "amount": amount}
+
+    sources = [record(i) for i in range(120)]
+    targets = [record(1000 + i) for i in range(150)]
+    targets += [dict(t, id=t["id"] + 5000) for t in targets[:20]]  # exact ties keep the first target
+
+    for min_confidence in (30.0, 50.0, 65.0):
+        engine = InferredMatchEngine(min_confidence=min_confidence)
+        vectorized = engine._context_aware_matching(sources, targets)
+        expected = brute_force_context_matches(engine, sources, targets)
+        assert [(m.source_record_id, m.target_record_id) for m in vectorized] == [e[:2] for e in expected]
+        assert [m.confidence_score for m in vectorized] == pytest.approx([e[2] for e in expected])
+
+
+def test_calculated_engine_matches_code_prefix_and_skips_missing_codes():
+    source = [{"id": 1, "account_code": "3995-0000", "amount": 500}, {"id": 2, "account_code": None, "amount": 500}]
+    target = [{"id": 10, "account_code": "9090-0000", "amount": 500}, {"id": 11, "account_code": "9090-0100", "amount": 100},
+              {"id": 12, "account_code": "4010-0000", "amount": 500}]
+
+    matches = CalculatedMatchEngine().find_matches(source, target, "BS", "IS", "BS.3995-0000 = IS.9090-0000")
+
+    assert [(m.source_record_id, m.target_record_id) for m in matches] == [(1, 10), (1, 11)]
+    assert matches[0].confidence_score == 95.0
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.llm_request_coordinator import LLMRequestCoordinator
+from app.services.local_llm_service import LLMConfig, LLMProvider, LLMTaskType, LocalLLMService
+
+MODEL = "qwen2.5:14b"
+
+
+class FakeOllama:
+    """Minimal Ollama stand-in that records chat calls and peak concurrency."""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.chat_calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._send({"models": [{"name": MODEL}]})
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake.lock:
+                    fake.chat_calls += 1
+                    fake.active += 1
+                    fake.peak_active = max(fake.peak_active, fake.active)
+                time.sleep(fake.delay)
+                with fake.lock:
+                    fake.active -= 1
+                prompt = payload["messages"][-1]["content"]
+                self._send({"message": {"content": f"echo: {prompt}"}})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    monkeypatch.delenv("OLLAMA_BASE_URLS", raising=False)
+    with FakeOllama() as server:
+        yield server
+
+
+def _service(url: str, max_concurrent: int = 2) -> LocalLLMService:
+    config = LLMConfig(provider=LLMProvider.OLLAMA, model=MODEL, ollama_base_url=url)
+    return LocalLLMService(config, coordinator=LLMRequestCoordinator(max_concurrent_per_model=max_concurrent))
+
+
+async def test_identical_prompt_served_from_cache(fake_ollama):
+    service = _service(fake_ollama.url)
+
+    first = await service.generate("Summarize NOI", task_type=LLMTaskType.SUMMARY)
+    second = await service.generate("Summarize NOI", task_type=LLMTaskType.SUMMARY)
+
+    assert first == second == "echo: Summarize NOI"
+    assert fake_ollama.chat_calls == 1
+    assert service.get_request_stats()["cache_hits"] == 1
+    await service.close()
+
+
+async def test_parameters_are_part_of_cache_key(fake_ollama):
+    service = _service(fake_ollama.url)
+
+    await service.generate("Summarize NOI", task_type=LLMTaskType.SUMMARY, temperature=0.1)
+    await service.generate("Summarize NOI", task_type=LLMTaskType.SUMMARY, temperature=0.7)
+    await service.generate("Summarize NOI", task_type=LLMTaskType.SUMMARY, use_cache=False)
+
+    assert fake_ollama.chat_calls == 3
+    await service.close()
+
+
+async def test_concurrent_identical_requests_are_coalesced(fake_ollama):
+    service = _service(fake_ollama.url)
+
+    results = await asyncio.gather(*[
+        service.generate("Explain DSCR", task_type=LLMTaskType.SUMMARY, use_cache=False)
+        for _ in range(5)
+    ])
+
+    assert set(results) == {"echo: Explain DSCR"}
+    assert fake_ollama.chat_calls == 1
+    assert service.get_request_stats()["coalesced"] == 4
+    await service.close()
+
+
+async def test_per_model_concurrency_limit_queues_requests(fake_ollama):
+    service = _service(fake_ollama.url, max_concurrent=1)
+
+    await asyncio.gather(*[
+        service.generate(f"Prompt {i}", task_type=LLMTaskType.SUMMARY) for i in range(3)
+    ])
+
+    stats = service.get_request_stats()
+    assert fake_ollama.chat_calls == 3
+    assert fake_ollama.peak_active == 1
+    assert stats["max_queue_wait_seconds"] > 0
+    assert stats["waiting"] == {} and stats["in_flight"] == {}
+    await service.close()
+
+
+async def test_failed_call_is_not_cached_and_propagates_to_waiters():
+    coordinator = LLMRequestCoordinator()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise RuntimeError("model crashed")
+
+    key = coordinator.build_cache_key("ollama", MODEL, [{"role": "user", "content": "x"}])
+    results = await asyncio.gather(
+        coordinator.run(key, MODEL, "ollama", failing),
+        coordinator.run(key, MODEL, "ollama", failing),
+        return_exceptions=True,
+    )
+
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert coordinator.get_stats()["cache_entries"] == 0
@@ -0,0 +1,199 @@
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.services import market_data_service
+from app.services.market_data_cache import MarketDataCache
+from app.services.market_data_service import MarketDataService, cache_with_ttl
+from app.utils.token_bucket import BucketConfig, TokenBucketRateLimiter
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    """Run against the in-process tiers only."""
+    cache = MarketDataCache(namespace="test_market_data", max_local_entries=8, redis_getter=lambda: None)
+    limiter = TokenBucketRateLimiter({}, default=BucketConfig(capacity=100, refill_per_second=100), redis_getter=lambda: None)
+    monkeypatch.setattr(market_data_service, "_market_data_cache", cache)
+    monkeypatch.setattr(market_data_service, "_rate_limiter", limiter)
+    return cache
+
+
+class FakeSession:
+    def add(self, obj):
+        pass
+
+    def add_all(self, objs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class CountingService:
+    calls = 0
+
+    @cache_with_ttl(ttl_seconds=60)
+    def lookup(self, latitude, longitude, year=None):
+        CountingService.calls += 1
+        if latitude is None:
+            return None
+        return {"lat": latitude, "lon": longitude, "year": year}
+
+
+def test_cache_key_ignores_instance_and_applies_defaults():
+    CountingService.calls = 0
+    first = CountingService().lookup(33.4, -112.0)
+    second = CountingService().lookup(latitude=33.4, longitude=-112.0, year=None)
+    assert first == second
+    assert CountingService.calls == 1
+
+    CountingService().lookup(33.4, -112.0, year=2023)
+    assert CountingService.calls == 2
+
+
+def test_failed_lookups_are_not_cached():
+    CountingService.calls = 0
+    CountingService().lookup(None, None)
+    CountingService().lookup(None, None)
+    assert CountingService.calls == 2
+
+
+def test_local_tier_is_bounded_and_expires(local_only):
+    for i in range(20):
+        local_only.set(local_only.build_key("ep", {"i": i}), i, ttl_seconds=60)
+    assert len(local_only) == 8
+    assert local_only.get(local_only.build_key("ep", {"i": 0})) == (False, None)
+    assert local_only.get(local_only.build_key("ep", {"i": 19})) == (True, 19)
+
+    key = local_only.build_key("ep", {"short": True})
+    local_only.set(key, "v", ttl_seconds=0)
+    assert local_only.get(key) == (False, None)
+
+
+def redis_cache(**kwargs):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeRedis()
+    return MarketDataCache(namespace="test_market_data", redis_getter=lambda: client, **kwargs), client
+
+
+def test_redis_tier_round_trips_types():
+    cache, _ = redis_cache()
+    value = {
+        "point": (33.4, -112.0),
+        "price": Decimal("12.50"),
+        "as_of": date(2025, 6, 30),
+        "tags": {"retail"},
+        "by_year": {2024: [1, (2, 3)]},
+    }
+    key = cache.build_key("ep", {"i": 1})
+    cache.set(key, value, ttl_seconds=60)
+    cache.clear_local()
+
+    hit, cached = cache.get(key)
+    assert hit and cache.stats["redis_hits"] == 1
+    assert cached == value
+    assert isinstance(cached["point"], tuple) and isinstance(cached["price"], Decimal)
+    assert isinstance(cached["by_year"][2024][1], tuple)
+
+
+def test_redis_tier_is_bounded():
+    cache, client = redis_cache(max_redis_entries=3, max_value_bytes=64)
+    keys = [cache.build_key("ep", {"i": i}) for i in range(5)]
+    for ttl, key in enumerate(keys, start=60):
+        cache.set(key, "v", ttl_seconds=ttl)
+
+    # The soonest-expiring entries are evicted along with their index members
+    assert client.zcard(cache.index_key) == 3
+    assert [client.exists(k) for k in keys] == [0, 0, 1, 1, 1]
+    assert cache.stats["redis_evictions"] == 2
+
+    big = cache.build_key("ep", {"big": True})
+    cache.set(big, "x" * 100, ttl_seconds=60)
+    assert not client.exists(big)
+    assert cache.get(big) == (True, "x" * 100)
+
+
+def test_geocode_skips_request_when_rate_limit_wait_is_exceeded(monkeypatch):
+    service = MarketDataService(db=FakeSession())
+    monkeypatch.setattr(service, "_wait_for_rate_limit", lambda source: False)
+    monkeypatch.setattr(market_data_service.requests, "get", lambda *a, **k: pytest.fail("request sent"))
+    monkeypatch.setattr(market_data_service.httpx, "post", lambda *a, **k: pytest.fail("request sent"))
+
+    assert service.geocode_address("1 Main St") is None
+    assert service._fetch_and_cluster_comps({"latitude": 33.4, "longitude": -112.0}) == ([], [])
+    # Nothing was cached, so both lookups retry once the bucket refills
+    assert len(market_data_service._market_data_cache) == 0
+
+
+def test_token_bucket_reserves_exact_waits():
+    limiter = TokenBucketRateLimiter(
+        {"slow": BucketConfig(capacity=2, refill_per_second=10)},
+        redis_getter=lambda: None,
+    )
+    waits = [limiter.reserve("slow") for _ in range(5)]
+    assert waits[0] == 0 and waits[1] == 0
+    assert waits[2] == pytest.approx(0.1, abs=0.02)
+    assert waits[3] == pytest.approx(0.2, abs=0.02)
+    assert waits[4] == pytest.approx(0.3, abs=0.02)
+
+    # A wait beyond max_wait reserves nothing
+    assert limiter.reserve("slow", max_wait=0.05) > 0.05
+    assert limiter.reserve("slow") == pytest.approx(0.4, abs=0.02)
+
+
+def test_fetch_property_market_data_runs_sources_in_parallel(monkeypatch):
+    service = MarketDataService(db=FakeSession())
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def slow(name):
+        def fetch(*args, **kwargs):
+            with lock:
+                active["now"] += 1
+                active["peak"] = max(active["peak"], active["now"])
+            time.sleep(0.2)
+            service.log_data_pull(name, "test", "success")
+            with lock:
+                active["now"] -= 1
+            return {"source": name}
+        return fetch
+
+    for attr, name in [
+        ("fetch_enhanced_demographics", "census"),
+        ("fetch_fred_economic_indicators", "fred"),
+        ("fetch_location_intelligence", "osm"),
+        ("fetch_esg_assessment", "esg"),
+    ]:
+        monkeypatch.setattr(service, attr, slow(name))
+
+    flushed = []
+    monkeypatch.setattr(service, "_flush_audit_buffer", lambda entries: flushed.append(entries))
+
+    started = time.perf_counter()
+    results = service.fetch_property_market_data(33.4, -112.0, property_data={"property_type": "retail"})
+    elapsed = time.perf_counter() - started
+
+    assert results["demographics"] == {"source": "census"}
+    assert results["esg"] == {"source": "esg"}
+    assert results["errors"] == {}
+    assert active["peak"] == 4
+    assert elapsed < 0.6
+    assert len(flushed) == 1 and len(flushed[0]) == 4
+    assert service._audit_buffer is None
+
+
+def test_fetch_property_market_data_skips_location_sources_without_coordinates(monkeypatch):
+    service = MarketDataService(db=FakeSession())
+    monkeypatch.setattr(service, "fetch_fred_economic_indicators", lambda msa_code=None: {"msa": msa_code})
+    monkeypatch.setattr(service, "_flush_audit_buffer", lambda entries: None)
+
+    results = service.fetch_property_market_data(None, None, msa_code="38060")
+    assert results["economic"] == {"msa": "38060"}
+    assert results["demographics"] is None and results["location"] is None and results["esg"] is None
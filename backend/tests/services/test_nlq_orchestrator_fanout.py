@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+
+from app.config.nlq_config import nlq_config
+from app.services.nlq.orchestrator import OrchestratorAgent
+
+
+class SlowAgent:
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+        self.calls = []
+        self.sessions = []
+        self.shared = []
+
+    def bind(self, db, llm=None, **shared):
+        self.sessions.append(db)
+        self.shared.append(shared)
+        return self
+
+    async def process_query(self, query, context=None):
+        self.calls.append(query)
+        await asyncio.sleep(self.delay)
+        return {"success": True, "agent": self.name, "answer": f"{self.name}: {query}", "confidence_score": 0.9}
+
+
+class BlockingAgent(SlowAgent):
+    """Like the real agents: synchronous database calls inside async def"""
+
+    async def process_query(self, query, context=None):
+        self.calls.append((query, threading.get_ident()))
+        time.sleep(self.delay)
+        return {"success": True, "agent": self.name, "answer": f"{self.name}: {query}", "confidence_score": 0.9}
+
+
+class FakeSession:
+    queries = []
+
+    def __init__(self):
+        self.closed = False
+
+    def query(self, model):
+        FakeSession.queries.append(model)
+        return self
+
+    def all(self):
+        return []
+
+    def close(self):
+        self.closed = True
+
+
+def make_orchestrator(**agents):
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.db = None
+    orchestrator.llm = None
+    orchestrator.session_factory = FakeSession
+    orchestrator.agent_factories = {name: agent.bind for name, agent in agents.items()}
+    orchestrator.agents = agents
+    return orchestrator
+
+
+def route(orchestrator, subqueries):
+    state = {"query": " and ".join(subqueries), "context": {}, "subqueries": subqueries}
+    return asyncio.run(orchestrator._route_to_agents_node(state))
+
+
+def test_subqueries_run_concurrently_and_duplicates_run_once(monkeypatch):
+    monkeypatch.setattr(nlq_config, "MAX_CONCURRENT_AGENTS", 3)
+    monkeypatch.setattr(nlq_config, "AGENT_TIMEOUT_SECONDS", 5)
+    formula = SlowAgent("formula", 0.2)
+    data = SlowAgent("financial_data", 0.2)
+    orchestrator = make_orchestrator(formula=formula, financial_data=data)
+
+    started = time.perf_counter()
+    state = route(orchestrator, [
+        "What is the DSCR for ESP in Q4 2025",
+        "what is the dscr for ESP in q4 2025?",
+        "Show me the balance sheet for HMND",
+        "What is the DSCR for ESP in Q3 2025",
+    ])
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.5  # three distinct 0.2s calls, not four sequential ones
+    assert formula.calls == ["What is the DSCR for ESP in Q4 2025", "What is the DSCR for ESP in Q3 2025"]
+    assert len(data.calls) == 1
+    assert [r["agent"] for r in state["agent_results"]] == ["formula", "financial_data", "formula"]
+    timings = state["agent_timings"]
+    assert timings[0]["deduplicated"] == ["what is the dscr for ESP in q4 2025?"]
+    assert all(t["status"] == "completed" and t["duration_ms"] >= 150 for t in timings)
+
+
+def test_slow_agent_yields_partial_answer(monkeypatch):
+    monkeypatch.setattr(nlq_config, "MAX_CONCURRENT_AGENTS", 1)
+    monkeypatch.setattr(nlq_config, "AGENT_TIMEOUT_SECONDS", 0.1)
+    orchestrator = make_orchestrator(formula=SlowAgent("formula", 0.5), financial_data=SlowAgent("financial_data", 0))
+
+    state = route(orchestrator, ["What is the DSCR for ESP", "Show me the balance sheet for ESP"])
+
+    timed_out, answered = state["agent_results"]
+    assert timed_out["timed_out"] is True and timed_out["confidence_score"] == 0.0
+    assert answered["success"] is True
+    assert [t["status"] for t in state["agent_timings"]] == ["timed_out", "completed"]
+    assert state["agent_timings"][1]["queued_ms"] >= 90  # waited for the single slot
+
+    synthesized = orchestrator._synthesize_node(state)
+    assert "did not answer" in synthesized["final_answer"]
+    assert "financial_data: Show me the balance sheet for ESP" in synthesized["final_answer"]
+
+
+def test_blocking_agents_run_in_parallel_threads_on_their_own_sessions(monkeypatch):
+    monkeypatch.setattr(nlq_config, "MAX_CONCURRENT_AGENTS", 3)
+    monkeypatch.setattr(nlq_config, "AGENT_TIMEOUT_SECONDS", 5)
+    formula = BlockingAgent("formula", 0.3)
+    data = BlockingAgent("financial_data", 0.3)
+    orchestrator = make_orchestrator(formula=formula, financial_data=data)
+
+    started = time.perf_counter()
+    state = route(orchestrator, [
+        "What is the DSCR for ESP in Q4 2025",
+        "Show me the balance sheet for HMND",
+        "What is the DSCR for ESP in Q3 2025",
+    ])
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.6  # three blocking 0.3s agents overlap instead of taking 0.9s
+    assert all(r["success"] for r in state["agent_results"])
+    threads = {ident for _, ident in formula.calls + data.calls}
+    assert len(threads) == 3 and threading.get_ident() not in threads
+    sessions = formula.sessions + data.sessions
+    assert len({id(db) for db in sessions}) == 3 and all(db.closed for db in sessions)
+
+
+def test_blocking_agent_past_its_deadline_yields_partial_answer(monkeypatch):
+    monkeypatch.setattr(nlq_config, "MAX_CONCURRENT_AGENTS", 2)
+    monkeypatch.setattr(nlq_config, "AGENT_TIMEOUT_SECONDS", 0.2)
+    orchestrator = make_orchestrator(
+        formula=BlockingAgent("formula", 1.0), financial_data=BlockingAgent("financial_data", 0)
+    )
+
+    async def timed_route():
+        state = {"query": "", "context": {}, "subqueries": ["What is the DSCR for ESP", "Show me the balance sheet for ESP"]}
+        started = time.perf_counter()
+        state = await orchestrator._route_to_agents_node(state)
+        return state, time.perf_counter() - started
+
+    # asyncio.run itself waits for the abandoned thread on exit; the node does not
+    state, elapsed = asyncio.run(timed_route())
+
+    assert elapsed < 0.6
+    assert [t["status"] for t in state["agent_timings"]] == ["timed_out", "completed"]
+    assert state["agent_results"][1]["answer"] == "financial_data: Show me the balance sheet for ESP"
+
+
+def test_chart_of_accounts_is_read_once_per_request(monkeypatch):
+    monkeypatch.setattr(nlq_config, "MAX_CONCURRENT_AGENTS", 3)
+    monkeypatch.setattr(nlq_config, "AGENT_TIMEOUT_SECONDS", 5)
+    monkeypatch.setattr(FakeSession, "queries", [])
+    data = BlockingAgent("financial_data", 0)
+    orchestrator = make_orchestrator(formula=BlockingAgent("formula", 0), financial_data=data)
+
+    route(orchestrator, [
+        "Show me the balance sheet for ESP in Q2 2025",
+        "Show me the balance sheet for ESP in Q3 2025",
+        "Show me the balance sheet for ESP in Q4 2025",
+    ])
+
+    assert len(data.calls) == 3
+    assert len(FakeSession.queries) == 1
+    charts = [shared["chart_of_accounts"] for shared in data.shared]
+    assert len(charts) == 3 and all(chart is charts[0] for chart in charts)
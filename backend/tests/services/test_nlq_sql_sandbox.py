@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registers referenced tables for the FKs)
+from app.models.financial_period import FinancialPeriod
+from app.models.property import Property
+from app.services.nlq import sql_sandbox
+from app.services.nlq.sql_sandbox import NLQSqlSandbox, SQLSandboxError, validate_sql
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM properties",
+    "SELECT 1 FROM properties; DROP TABLE properties",
+    "WITH gone AS (DELETE FROM properties RETURNING *) SELECT * FROM gone",
+    "SELECT pg_sleep(60) FROM properties",
+    "SELECT * FROM properties, financial_periods",
+    "SELECT * FROM properties p CROSS JOIN financial_periods fp",
+    "SELECT * FROM users",
+    "SELECT * FROM pg_catalog.pg_tables",
+    "SELECT * FROM properties FOR UPDATE",
+])
+def test_rejects_unsafe_sql(sql):
+    is_valid, _ = validate_sql(sql)
+    assert not is_valid
+
+
+def test_cte_cannot_shadow_a_scoped_table():
+    sql = "WITH properties AS (SELECT * FROM properties) SELECT * FROM properties"
+    assert not validate_sql(sql)[0]
+    with pytest.raises(SQLSandboxError):
+        NLQSqlSandbox(None, organization_id=1).prepare(sql)
+    with pytest.raises(SQLSandboxError):
+        NLQSqlSandbox(None, organization_id=1).prepare(
+            'WITH "Properties" AS (SELECT id FROM financial_periods) SELECT * FROM properties'
+        )
+
+    # Other CTE names are kept, and the tables inside them are still scoped
+    query = NLQSqlSandbox(None, organization_id=1).prepare(
+        "WITH p AS (SELECT id FROM properties) SELECT * FROM p"
+    )
+    assert "organization_id = 1" in query.sql and query.tables == ["properties"]
+
+
+def test_accepts_columns_that_contain_dangerous_words():
+    # The old substring check rejected these ("created_at", "deleted")
+    assert validate_sql("SELECT property_code, created_at FROM properties WHERE status <> 'deleted'") == (True, "Valid")
+
+
+def test_every_table_is_scoped_and_limit_capped():
+    sandbox = NLQSqlSandbox(None, organization_id=7, max_rows=100)
+    query = sandbox.prepare(
+        "SELECT p.property_code, fp.period_year FROM properties p "
+        "JOIN financial_periods fp ON fp.property_id = p.id LIMIT 5000"
+    )
+    assert query.tables == ["financial_periods", "properties"]
+    assert "(SELECT * FROM properties WHERE organization_id = 7) AS p" in query.sql
+    assert "(SELECT * FROM financial_periods WHERE property_id IN " \
+           "(SELECT id FROM properties WHERE organization_id = 7)) AS fp" in query.sql
+    assert query.sql.endswith("LIMIT 100")
+    assert sandbox.prepare("SELECT id FROM properties LIMIT 10").sql.endswith("LIMIT 10")
+
+
+def test_execute_returns_only_the_organizations_rows_and_caches(monkeypatch):
+    engine = create_engine("sqlite://")
+    for model in (Property, FinancialPeriod):
+        model.__table__.create(engine)
+    session = Session(bind=engine)
+    session.add_all([
+        Property(id=1, property_code="P1", property_name="One", organization_id=1),
+        Property(id=2, property_code="P2", property_name="Two", organization_id=2),
+        FinancialPeriod(id=10, property_id=1, period_year=2025, period_month=1,
+                        period_start_date=date(2025, 1, 1), period_end_date=date(2025, 1, 31)),
+        FinancialPeriod(id=20, property_id=2, period_year=2025, period_month=1,
+                        period_start_date=date(2025, 1, 1), period_end_date=date(2025, 1, 31)),
+    ])
+    session.commit()
+
+    cache = {}
+    monkeypatch.setattr(sql_sandbox, "cache_get", cache.get)
+    monkeypatch.setattr(sql_sandbox, "cache_set", lambda key, value, ttl=300: cache.__setitem__(key, value))
+    monkeypatch.setattr(sql_sandbox, "get_data_version", lambda: 0)
+
+    sandbox = NLQSqlSandbox(session, organization_id=1, cache_ttl=60)
+    sql = ("SELECT p.property_code, fp.id AS period_id FROM financial_periods fp "
+           "JOIN properties p ON p.id = fp.property_id WHERE fp.period_year = :year")
+    result = sandbox.execute(sql, {"year": 2025})
+    assert result["rows"] == [{"property_code": "P1", "period_id": 10}]
+    assert result["cached"] is False
+
+    assert sandbox.execute(sql, {"year": 2025})["cached"] is True
+    assert sandbox.execute(sql, {"year": 2024})["rows"] == []
+
+    with pytest.raises(SQLSandboxError):
+        sandbox.execute("UPDATE properties SET organization_id = 1")
@@ -0,0 +1,185 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from app.services import market_data_service
+from app.services.market_data_cache import MarketDataCache
+from app.services.market_data_service import MarketDataService
+from app.services.overpass_query_builder import (
+    OSM_CATEGORIES,
+    build_batched_query,
+    count_features,
+    group_points,
+)
+from app.utils.token_bucket import BucketConfig, TokenBucketRateLimiter
+
+PHOENIX = (33.4484, -112.0740)
+TEMPE = (33.4255, -111.9400)
+SCOTTSDALE = (33.4942, -111.9261)
+TUCSON = (32.2226, -110.9747)
+
+ACS_HEADERS = ["B01003_001E", "B19013_001E", "B25077_001E", "B25064_001E", "B23025_005E",
+               "B23025_003E", "B01002_001E", "B15003_001E", "state", "county", "tract"]
+ACS_VALUES = ["4200", "71000", "350000", "1450", "120", "2400", "34.5", "3000", "04", "013", "010101"]
+
+
+class FakeOpenData:
+    """Local stand-in for Overpass and the Census geocoder/ACS/PEP endpoints."""
+
+    def __init__(self):
+        self.overpass_queries = []
+        self.census_paths = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body):
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+                fake.overpass_queries.append(form["data"][0])
+                lat, lon = PHOENIX
+                self._send({"elements": [
+                    {"type": "node", "lat": lat + 0.001, "lon": lon, "tags": {"shop": "supermarket"}},
+                    {"type": "way", "center": {"lat": lat, "lon": lon + 0.002}, "tags": {"leisure": "park"}},
+                    {"type": "node", "lat": lat + 0.003, "lon": lon, "tags": {"highway": "bus_stop"}},
+                    {"type": "node", "lat": lat + 0.02, "lon": lon, "tags": {"amenity": "school"}},
+                    {"type": "node", "lat": TEMPE[0], "lon": TEMPE[1] + 0.001, "tags": {"amenity": "restaurant"}},
+                ]})
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                fake.census_paths.append(path)
+                if path.startswith("/geocoder"):
+                    self._send({"result": {"geographies": {"Census Tracts": [
+                        {"STATE": "04", "COUNTY": "013", "TRACT": "010101"}
+                    ]}}})
+                elif path.endswith("/acs/acs5"):
+                    self._send([ACS_HEADERS, ACS_VALUES])
+                elif path.endswith("/pep/population"):
+                    self._send([["POP", "NAME", "state", "county"], ["4500000", "Maricopa County", "04", "013"]])
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeSession:
+    def add(self, obj):
+        pass
+
+    def add_all(self, objs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    cache = MarketDataCache(namespace="test_overpass", redis_getter=lambda: None)
+    limiter = TokenBucketRateLimiter({}, default=BucketConfig(capacity=100, refill_per_second=100), redis_getter=lambda: None)
+    monkeypatch.setattr(market_data_service, "_market_data_cache", cache)
+    monkeypatch.setattr(market_data_service, "_rate_limiter", limiter)
+
+
+@pytest.fixture
+def stub():
+    with FakeOpenData() as fake:
+        yield fake
+
+
+@pytest.fixture
+def service(stub, monkeypatch):
+    svc = MarketDataService(db=FakeSession())
+    monkeypatch.setattr(svc, "OVERPASS_API_URLS", [f"{stub.url}/api/interpreter"])
+    monkeypatch.setattr(svc, "CENSUS_API_BASE", f"{stub.url}/data")
+    monkeypatch.setattr(svc, "CENSUS_GEOCODER_URL", f"{stub.url}/geocoder/geographies/coordinates")
+    svc.osrm_base_url = None
+    return svc
+
+
+def test_batched_query_covers_every_category_once():
+    query = build_batched_query([PHOENIX, TEMPE])
+    assert query.count('nwr["amenity"="school"]') == 1
+    assert query.count('nwr["railway"="subway_entrance"]') == 1
+    assert query.strip().endswith("out tags center;")
+
+
+def test_group_points_splits_distant_properties():
+    tiles = group_points([PHOENIX, TEMPE, SCOTTSDALE, TUCSON, PHOENIX], tile_degrees=0.5)
+    assert sorted(len(t) for t in tiles) == [1, 3]
+
+
+def test_count_features_respects_category_radius():
+    elements = [
+        {"lat": PHOENIX[0] + 0.01, "lon": PHOENIX[1], "tags": {"amenity": "school"}},   # ~1.1 km
+        {"lat": PHOENIX[0] + 0.05, "lon": PHOENIX[1], "tags": {"amenity": "school"}},   # ~5.6 km
+        {"lat": PHOENIX[0] + 0.05, "lon": PHOENIX[1], "tags": {"amenity": "hospital"}},
+        {"lat": PHOENIX[0], "lon": PHOENIX[1], "tags": {"railway": "subway_entrance"}},
+    ]
+    counts = count_features(elements, [PHOENIX])[PHOENIX]
+    assert set(counts) == set(OSM_CATEGORIES)
+    assert counts["schools_2mi"] == 1
+    assert counts["hospitals_5mi"] == 1
+    assert counts["subway_stations_1mi"] == 1
+    assert counts["restaurants_1mi"] == 0
+
+
+async def test_prefetch_uses_one_overpass_request_per_tile(service, stub):
+    features = await service.aprefetch_osm_features([PHOENIX, TEMPE, SCOTTSDALE, TUCSON], tile_degrees=0.5)
+    assert len(stub.overpass_queries) == 2
+    assert features[PHOENIX]["grocery_stores_1mi"] == 1
+    assert features[PHOENIX]["parks_1mi"] == 1
+    assert features[TEMPE]["restaurants_1mi"] == 1
+
+    # Location intelligence and ESG for prefetched properties reuse the cache
+    location = service.fetch_location_intelligence(*PHOENIX)
+    assert location["data"]["amenities"]["grocery_stores_1mi"] == 1
+    assert location["data"]["transit_access"]["bus_stops_0_5mi"] == 1
+    assert service._fetch_schools_osm(*PHOENIX) == 1
+    assert len(stub.overpass_queries) == 2
+
+
+def test_uncached_location_fetches_all_categories_in_one_request(service, stub):
+    service._fetch_amenities_osm(*TUCSON)
+    service._calculate_transit_access(*TUCSON)
+    service._fetch_green_space_osm(*TUCSON)
+    service._fetch_schools_osm(*TUCSON)
+    assert len(stub.overpass_queries) == 1
+
+
+def test_concurrent_fetch_against_census_and_overpass_stub(service, stub):
+    results = service.fetch_property_market_data(*PHOENIX, categories=["demographics", "location"])
+    demographics = results["demographics"]["data"]
+    assert demographics["population"] == 4200
+    assert demographics["geography"]["county_fips"] == "013"
+    assert results["demographics"]["supplementary_sources"][0]["data"]["population"] == 4500000
+    assert results["location"]["data"]["amenities"]["parks_1mi"] == 1
+    assert results["errors"] == {}
+    assert any(p.startswith("/geocoder") for p in stub.census_paths)
@@ -0,0 +1,114 @@
+import pytest
+
+from app.db import minio_client
+from app.services import pdf_highlight_service
+from app.services.pdf_highlight_service import (
+    annotated_object_name,
+    delete_annotated_variants,
+    get_annotated_variant,
+    highlight_overlay,
+)
+from app.utils.http_range import RangeNotSatisfiable, etag_matches, parse_range, quote_etag
+
+
+class RangedObject:
+    def __init__(self, data):
+        self.data = data
+        self.closed = self.released = False
+
+    def stream(self, amt):
+        for start in range(0, len(self.data), amt):
+            yield self.data[start:start + amt]
+
+    def close(self):
+        self.closed = True
+
+    def release_conn(self):
+        self.released = True
+
+
+class RangedMinio:
+    def __init__(self, body):
+        self.body = body
+        self.opened = []
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0):
+        data = self.body[offset:offset + length] if length else self.body[offset:]
+        self.opened.append(RangedObject(data))
+        return self.opened[-1]
+
+
+def test_single_byte_ranges_are_parsed():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+
+    # Full response for no, malformed or multi-range headers
+    assert parse_range(None, 1000) is None
+    assert parse_range("bytes=5-1", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=0-1,5-9", 1000) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_conditional_headers_use_the_etag():
+    etag = quote_etag("abc123")
+    assert etag == '"abc123"'
+    assert etag_matches('"zzz", W/"abc123"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"zzz"', etag)
+
+    assert parse_range("bytes=0-9", 100, if_range='"abc123"', etag=etag) == (0, 9)
+    assert parse_range("bytes=0-9", 100, if_range='"stale"', etag=etag) is None
+
+
+def test_ranged_reads_stream_only_the_requested_bytes(monkeypatch):
+    body = bytes(range(256)) * 40
+    fake = RangedMinio(body)
+    monkeypatch.setattr(minio_client, "minio_client", fake)
+
+    chunks = list(minio_client.stream_file_range("org/1/doc.pdf", offset=1000, length=3000, chunk_size=1024))
+
+    assert b"".join(chunks) == body[1000:4000]
+    assert [len(chunk) for chunk in chunks] == [1024, 1024, 952]
+    assert fake.opened[0].closed and fake.opened[0].released
+
+
+def test_annotated_copies_are_cached_per_upload_and_bbox(monkeypatch):
+    stored = {}
+    annotated = []
+    monkeypatch.setattr(pdf_highlight_service, "get_file_info", lambda name: {"etag": "x"} if name in stored else None)
+    monkeypatch.setattr(pdf_highlight_service, "download_file", lambda name: b"%PDF-source")
+    monkeypatch.setattr(pdf_highlight_service, "upload_file",
+                        lambda data, name, content_type: stored.setdefault(name, data) is not None)
+    monkeypatch.setattr(pdf_highlight_service, "annotate_pdf", lambda data, overlay: annotated.append(overlay) or b"%PDF-marked")
+
+    overlay = highlight_overlay(2, 100.0, 200.0, 140.0, 210.0)
+    assert overlay["radius"] == 25.0
+    assert overlay["rect"] == {"x0": 95.0, "y0": 180.0, "x1": 145.0, "y1": 230.0}
+
+    name = get_annotated_variant("org/1/2024/doc.pdf", 7, "etag-1", overlay)
+    assert name.startswith("org/1/2024/annotated/7-")
+    assert get_annotated_variant("org/1/2024/doc.pdf", 7, "etag-1", overlay) == name
+    assert len(annotated) == 1
+    assert stored == {name: b"%PDF-marked"}
+
+    # A replaced source or another bbox gets its own copy
+    assert annotated_object_name("org/1/2024/doc.pdf", 7, "etag-2", overlay) != name
+    other = highlight_overlay(2, 100.0, 300.0, 140.0, 310.0)
+    assert annotated_object_name("org/1/2024/doc.pdf", 7, "etag-1", other) != name
+
+
+def test_annotated_copies_are_deleted_with_their_upload(monkeypatch):
+    stored = {"org/1/2024/doc.pdf", "org/1/2024/annotated/7-aaaa.pdf", "org/1/2024/annotated/7-bbbb.pdf",
+              "org/1/2024/annotated/70-cccc.pdf"}
+    monkeypatch.setattr(pdf_highlight_service, "list_files",
+                        lambda prefix: sorted(name for name in stored if name.startswith(prefix)))
+    monkeypatch.setattr(pdf_highlight_service, "delete_file", lambda name: stored.discard(name) is None)
+
+    assert delete_annotated_variants("org/1/2024/doc.pdf", 7) == 2
+    assert stored == {"org/1/2024/doc.pdf", "org/1/2024/annotated/70-cccc.pdf"}
+    assert delete_annotated_variants(None, 7) == 0
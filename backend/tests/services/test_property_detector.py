@@ -0,0 +1,123 @@
+import random
+import re
+
+from app.utils import property_detector
+from app.utils.property_detector import AhoCorasick, PropertyDetector, get_property_detector
+
+PROPERTIES = [
+    {"property_code": "ESP001", "property_name": "Eastern Shore Plaza", "city": "Phoenix"},
+    {"property_code": "HMND001", "property_name": "Hammond Aire Shopping Center", "city": "Baton Rouge"},
+    {"property_code": "TCSH001", "property_name": "Town Center Shopping", "city": "Tempe"},
+    {"property_code": "WEND001", "property_name": "Wendover Commons", "city": "Greensboro"},
+    {"property_code": "NONAME", "property_name": "", "city": ""},
+]
+
+SAMPLE = """Eastern Shore Plaza
+Balance Sheet ESP001
+As of December 31, 2024
+Property: Eastern Shore Plaza
+City: Phoenix
+
+Cash - Operating          12,500.00
+Receivable from Hammond Aire Shopping Center   4,210.00
+1100-0001 Due from TCSH001                   990.00
+Eastern Shore Plaza reserves                 1,000.00
+Notes: ESP001 management fee
+"""
+
+
+def reference_detect(first_page_text, available_properties):
+    """The original per-property regex implementation, kept as the scoring oracle."""
+    first_page_lines = first_page_text.split('\n')
+    header_lines = [line.strip() for line in first_page_lines[:10] if line.strip()][:5]
+    header_lower = ' '.join(header_lines).lower()
+    page_lower = first_page_text.lower()
+    property_scores = {}
+    for prop in available_properties:
+        code, name, city = prop.get('property_code', ''), prop.get('property_name', ''), prop.get('city', '')
+        if not code:
+            continue
+        header_score = metadata_score = body_score = 0
+        evidence, ar_mentions = [], []
+        if code.lower() in header_lower:
+            header_score += 25
+            evidence.append(f"Code '{code}' in header")
+        if name:
+            words = [w for w in name.lower().split() if len(w) > 3]
+            matched = sum(1 for w in words if w in header_lower)
+            if matched > 0:
+                header_score += (matched / len(words)) * 25
+                evidence.append(f"Name words ({matched}/{len(words)}) in header")
+        for pattern in [rf'property\s*:?\s*{re.escape(name)}', rf'entity\s*:?\s*{re.escape(name)}',
+                        rf'location\s*:?\s*{re.escape(name)}', rf'property\s*:?\s*{re.escape(code)}']:
+            if re.search(pattern, page_lower, re.IGNORECASE):
+                metadata_score += 15
+                evidence.append("Metadata field match")
+                break
+        if city and re.search(rf'city\s*:?\s*{re.escape(city)}', page_lower, re.IGNORECASE):
+            metadata_score += 15
+            evidence.append(f"City '{city}' in metadata")
+        for line in first_page_lines:
+            line_lower = line.lower()
+            is_ar = any(re.search(p, line_lower, re.IGNORECASE) for p in property_detector.AR_PATTERNS)
+            if name and name.lower() in line_lower:
+                if is_ar:
+                    ar_mentions.append(line.strip())
+                else:
+                    body_score += 5
+                    if body_score == 5:
+                        evidence.append("Property name in body (non-A/R)")
+            if code.lower() in line_lower:
+                if is_ar:
+                    ar_mentions.append(line.strip())
+                else:
+                    body_score += 5
+                    if not [e for e in evidence if 'code in body' in e.lower()]:
+                        evidence.append("Property code in body (non-A/R)")
+        header_score, metadata_score, body_score = min(header_score, 50), min(metadata_score, 30), min(body_score, 20)
+        property_scores[code] = {"name": name, "total_score": header_score + metadata_score + body_score,
+                                 "evidence": evidence, "ar_mentions": ar_mentions}
+    return property_detector._summarize(property_scores)
+
+
+def test_automaton_reports_overlapping_matches():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted((start, automaton.terms[t]) for start, t in automaton.finditer("ushers"))
+    assert found == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_detects_primary_and_ar_referenced_properties():
+    result = PropertyDetector(PROPERTIES).detect(SAMPLE)
+    assert result["recommendation"] == "ESP001"
+    assert result["validation_status"] == "HIGH_CONFIDENCE"
+    assert result["primary_property"]["evidence"][:2] == ["Code 'ESP001' in header", "Name words (3/3) in header"]
+    referenced = {p["code"]: p for p in result["referenced_properties"]}
+    assert referenced["HMND001"]["evidence"] == ["Receivable from Hammond Aire Shopping Center   4,210.00"]
+    assert "TCSH001" in referenced
+    assert result == reference_detect(SAMPLE, PROPERTIES)
+
+
+def test_matches_reference_scoring_on_generated_pages():
+    rng = random.Random(7)
+    fragments = [
+        "Property: ", "Entity:", "Location : ", "City: ", "Receivable from ", "due to ", "1200-0040 ",
+        "Total ", "\n", "\n\n", "  ", "Rent Roll ", "Income Statement ",
+    ]
+    for prop in PROPERTIES:
+        fragments += [prop["property_code"], prop["property_name"], prop["city"], prop["property_name"].upper()]
+        fragments += [w for w in prop["property_name"].split()]
+    detector = PropertyDetector(PROPERTIES)
+    for _ in range(300):
+        text = "".join(rng.choice(fragments) + rng.choice(["", " ", "\n"]) for _ in range(rng.randint(3, 40)))
+        assert detector.detect(text) == reference_detect(text, PROPERTIES), text
+
+
+def test_detector_is_cached_until_property_set_changes():
+    first = get_property_detector(PROPERTIES)
+    assert get_property_detector([dict(p) for p in PROPERTIES]) is first
+
+    renamed = [dict(p) for p in PROPERTIES]
+    renamed[0]["property_name"] = "Eastern Shore Centre"
+    rebuilt = get_property_detector(renamed)
+    assert rebuilt is not first
+    assert rebuilt.detect("Property: Eastern Shore Centre")["primary_property"]["code"] == "ESP001"
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.document_upload import DocumentUpload
+from app.models.organization import Organization
+from app.models.property import Property
+from app.models.quota_reservation import QuotaReservation
+from app.services.quota_service import (
+    confirm_reservation,
+    expire_stale_reservations,
+    refresh_all_orgs_usage,
+    release_reservation,
+    reserve_quota,
+)
+
+MB = 1024 * 1024
+
+
+def counters(session, org_id):
+    session.expire_all()
+    org = session.get(Organization, org_id)
+    return org.documents_used, org.documents_reserved, org.storage_used_bytes, org.storage_reserved_bytes
+
+
+def test_reservations_hold_quota_until_confirmed_or_released(db_session):
+    db_session.add(Organization(id=1, name="Acme", slug="acme", documents_limit=2, storage_limit_gb=1,
+                                documents_used=0, storage_used_bytes=0))
+    db_session.commit()
+
+    first, err = reserve_quota(db_session, 1, bytes_requested=5 * MB)
+    second, _ = reserve_quota(db_session, 1, bytes_requested=3 * MB)
+    assert err is None and second is not None
+    # Two uploads in flight already hold the whole document limit
+    assert reserve_quota(db_session, 1) == (None, "Document limit reached (2). Upgrade plan.")
+    assert counters(db_session, 1) == (0, 2, 0, 8 * MB)
+
+    assert confirm_reservation(db_session, first.id, upload_id=None)
+    assert not confirm_reservation(db_session, first.id)
+    assert release_reservation(db_session, second.id)
+    assert not release_reservation(db_session, first.id)
+    assert counters(db_session, 1) == (1, 0, 5 * MB, 0)
+
+    assert reserve_quota(db_session, 1, bytes_requested=2 * 1024 * MB)[1] == "Storage limit reached (1.00 GB). Upgrade plan."
+    assert reserve_quota(db_session, 99) == (None, "Organization not found")
+
+
+def test_stale_reservations_expire_and_reconciliation_writes_only_drifted_orgs(db_session):
+    db_session.add_all([
+        Organization(id=1, name="Acme", slug="acme", documents_used=7, storage_used_bytes=0),
+        Organization(id=2, name="Unlimited", slug="unlimited", documents_used=0, storage_used_bytes=0),
+        Property(id=10, organization_id=1, property_code="ACME001", property_name="Acme Plaza"),
+    ])
+    db_session.add_all([
+        DocumentUpload(property_id=10, period_id=period_id, document_type="balance_sheet",
+                       file_name="bs.pdf", file_path="x/bs.pdf", file_size_bytes=size)
+        for period_id, size in ((1, 2 * MB), (2, 3 * MB))
+    ])
+    db_session.commit()
+
+    stale, _ = reserve_quota(db_session, 2, bytes_requested=MB, ttl_minutes=1)
+    fresh, _ = reserve_quota(db_session, 2, bytes_requested=2 * MB)
+    db_session.commit()
+
+    assert expire_stale_reservations(db_session, now=datetime.utcnow() + timedelta(minutes=5)) == 1
+    assert db_session.get(QuotaReservation, stale.id).status == "expired"
+    assert counters(db_session, 2) == (0, 1, 0, 2 * MB)
+
+    # Org 1 drifted (7 documents counted, 2 stored); org 2 is already consistent
+    assert refresh_all_orgs_usage(db_session) == 1
+    assert counters(db_session, 1) == (2, 0, 5 * MB, 0)
+    assert counters(db_session, 2) == (0, 1, 0, 2 * MB)
+    assert refresh_all_orgs_usage(db_session) == 0
+    assert fresh.status == "pending"
+
+
+def test_reconciliation_never_overwrites_a_concurrent_reservation(db_session):
+    db_session.add_all([
+        Organization(id=1, name="Acme", slug="acme", documents_used=7, storage_used_bytes=0),
+        Property(id=10, organization_id=1, property_code="ACME001", property_name="Acme Plaza"),
+        DocumentUpload(property_id=10, period_id=1, document_type="balance_sheet",
+                       file_name="bs.pdf", file_path="x/bs.pdf", file_size_bytes=2 * MB),
+    ])
+    db_session.commit()
+
+    # An upload reserves quota on another connection right after the
+    # reconciliation has read the org counters and the pending reservations
+    concurrent = Session(bind=db_session.get_bind())
+    state = {"reserved": None}
+
+    @event.listens_for(db_session.get_bind(), "after_cursor_execute")
+    def reserve_after_reconciliation_reads(conn, cursor, statement, parameters, context, executemany):
+        if state["reserved"] is None and "quota_reservations" in statement and statement.startswith("SELECT"):
+            state["reserved"], _ = reserve_quota(concurrent, 1, bytes_requested=MB)
+            concurrent.commit()
+
+    assert refresh_all_orgs_usage(db_session) == 0
+    db_session.commit()
+    event.remove(db_session.get_bind(), "after_cursor_execute", reserve_after_reconciliation_reads)
+    assert counters(db_session, 1) == (7, 1, 0, MB)
+
+    # The next run sees the reservation and fixes the drift without losing it
+    assert refresh_all_orgs_usage(db_session) == 1
+    assert counters(db_session, 1) == (1, 1, 2 * MB, MB)
+    assert release_reservation(db_session, state["reserved"].id)
+    assert counters(db_session, 1) == (1, 0, 2 * MB, 0)
@@ -0,0 +1,130 @@
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.services import reference_data_cache as refdata
+from app.services.filename_pattern_learning_service import FilenamePatternLearningService
+from app.services.reference_data_cache import (
+    CHART_OF_ACCOUNTS,
+    FILENAME_PATTERNS,
+    FilenamePatternRow,
+    FilenamePatternSnapshot,
+    ReferenceDataCache,
+    mark_reference_data_changed,
+)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.up = True
+
+    def get(self, key):
+        if not self.up:
+            raise ConnectionError("redis down")
+        return self.values.get(key)
+
+    def pipeline(self):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.keys = []
+
+            def incr(self, key):
+                self.keys.append(key)
+
+            def execute(self):
+                for key in self.keys:
+                    redis.values[key] = str(int(redis.values.get(key, 0)) + 1)
+
+        return Pipeline()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_loader(calls):
+    def load(db, version):
+        calls.append(version)
+        return SimpleNamespace(version=version, load_number=len(calls))
+    return load
+
+
+def test_snapshot_is_reused_until_the_shared_version_moves(monkeypatch):
+    calls = []
+    monkeypatch.setitem(refdata._LOADERS, CHART_OF_ACCOUNTS, counting_loader(calls))
+    redis, clock = FakeRedis(), Clock()
+    writer = ReferenceDataCache(redis_getter=lambda: redis, revalidate_seconds=5, clock=clock)
+    reader = ReferenceDataCache(redis_getter=lambda: redis, revalidate_seconds=5, clock=clock)
+
+    first = reader.get(CHART_OF_ACCOUNTS, db=None)
+    clock.now = 4
+    assert reader.get(CHART_OF_ACCOUNTS, db=None) is first
+    clock.now = 6
+    assert reader.get(CHART_OF_ACCOUNTS, db=None) is first  # revalidated, version unchanged
+    assert calls == ["0"] and reader.stats["revalidations"] == 2
+
+    writer.invalidate(CHART_OF_ACCOUNTS)
+    assert reader.get(CHART_OF_ACCOUNTS, db=None) is first  # still inside the revalidation window
+    clock.now = 12
+    second = reader.get(CHART_OF_ACCOUNTS, db=None)
+    assert second is not first and second.version == "1"
+    assert calls == ["0", "1"]
+
+
+def test_without_redis_snapshots_expire_on_fallback_ttl(monkeypatch):
+    calls = []
+    monkeypatch.setitem(refdata._LOADERS, CHART_OF_ACCOUNTS, counting_loader(calls))
+    redis, clock = FakeRedis(), Clock()
+    redis.up = False
+    cache = ReferenceDataCache(redis_getter=lambda: redis, revalidate_seconds=1, fallback_ttl_seconds=30, clock=clock)
+
+    first = cache.get(CHART_OF_ACCOUNTS, db=None)
+    clock.now = 20
+    assert cache.get(CHART_OF_ACCOUNTS, db=None) is first
+    clock.now = 31
+    assert cache.get(CHART_OF_ACCOUNTS, db=None) is not first
+    assert calls == [None, None]
+
+
+def test_versions_are_bumped_only_when_the_writing_session_commits(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(refdata, "reference_data_cache", ReferenceDataCache(redis_getter=lambda: redis))
+    key = refdata.VERSION_KEY_PREFIX + FILENAME_PATTERNS
+
+    session = Session(bind=create_engine("sqlite://"))
+    session.execute(text("SELECT 1"))
+    mark_reference_data_changed(session, FILENAME_PATTERNS)
+    session.rollback()
+    session.commit()
+    assert key not in redis.values
+
+    mark_reference_data_changed(session, FILENAME_PATTERNS)
+    mark_reference_data_changed(session, FILENAME_PATTERNS)
+    assert key not in redis.values
+    session.commit()
+    assert redis.values[key] == "1"
+
+
+def test_filename_pattern_lookup_reads_the_snapshot(monkeypatch):
+    pattern = "RentRoll-{M}.{YY}.pdf"
+    row = FilenamePatternRow(**{
+        **{name: None for name in FilenamePatternRow._fields},
+        "filename_pattern": pattern, "property_id": 3, "document_type": "rent_roll",
+        "detected_month": 1, "detected_year": 2025, "times_seen": 12, "success_rate": 100.0,
+    })
+    snapshot = FilenamePatternSnapshot(version="4", by_key={(pattern, 3, "rent_roll"): row})
+    cache = SimpleNamespace(filename_patterns=lambda db: snapshot)
+    monkeypatch.setattr("app.services.filename_pattern_learning_service.get_reference_data_cache", lambda: cache)
+
+    service = FilenamePatternLearningService(db=None)
+    result = service.apply_learned_pattern("RentRoll-1.25.pdf", property_id=3, document_type="rent_roll")
+    assert result["month"] == 1 and result["confidence"] == 99.0
+    assert service.apply_learned_pattern("RentRoll-1.25.pdf", property_id=4, document_type="rent_roll") is None
@@ -0,0 +1,169 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registers properties for the FK)
+from app.models.statement_layout import StatementLayout
+from app.services.statement_layout_service import StatementLayoutService
+from app.utils.layout_template import build_layout, columns_from_rows, group_lines, match_layout, slice_rows
+
+COLUMNS = [(40.0, 110.0), (110.0, 330.0), (330.0, 420.0), (420.0, 520.0)]
+
+
+def words(top, *cells):
+    """One text line: (x0, text) pairs, each word ~6pt per character wide"""
+    return [
+        {"text": text, "x0": x0, "x1": x0 + 6 * len(text), "top": top + (0.5 if i % 2 else 0.0), "bottom": top + 10}
+        for i, (x0, text) in enumerate(cells)
+    ]
+
+
+def statement_page(period, rows, title_top=20.0):
+    page = []
+    page += words(title_top, (200, "Balance"), (250, "Sheet"))
+    page += words(title_top + 14, (200, "Period"), (240, "="), (252, period), (280, "2025"))
+    # Header wraps over two lines in the "Current Balance" column
+    page += words(60, (45, "Account"), (115, "Description"), (340, "Prior"), (430, "Current"))
+    page += words(72, (45, "Code"), (340, "Balance"), (430, "Balance"))
+    top = 90
+    for code, name, prior, current in rows:
+        page += words(top, (45, code), *[(115 + 45 * i, part) for i, part in enumerate(name.split())],
+                      (350, prior), (440, current))
+        top += 14
+    page += words(top + 20, (250, "Page"), (280, "1"))
+    return page
+
+
+def learned_layout():
+    header = ["Account\nCode", "Description", "Prior\nBalance", "Current\nBalance"]
+    row_cells = [[(x0, 60, x1, 84) for x0, x1 in COLUMNS], [None, (110, 84, 330, 98), None, None]]
+    return build_layout(header, columns_from_rows(row_cells), top=60.0)
+
+
+def test_known_layout_is_matched_and_sliced_for_a_new_period():
+    layout = learned_layout()
+    assert layout["header"] == ["account code", "description", "prior balance", "current balance"]
+
+    lines = group_lines(statement_page("Feb", [
+        ("0122-0000", "Cash Operating", "10,000.00", "12,345.67"),
+        ("0305-0000", "A/R Tenants", "(1,200.00)", "3,000.00"),
+    ]))
+    matched, body_start = match_layout(lines, [layout])
+
+    assert matched is layout
+    assert slice_rows(lines, layout, body_start) == [
+        ["0122-0000", "Cash Operating", "10,000.00", "12,345.67"],
+        ["0305-0000", "A/R Tenants", "(1,200.00)", "3,000.00"],
+    ]
+
+
+def test_other_layouts_miss():
+    layout = learned_layout()
+    # Same headings, but the prior and current balances share one column
+    merged = build_layout(
+        ["Account Code", "Description", "Prior Balance Current Balance"],
+        [(40, 110), (110, 330), (330, 520)],
+        top=60.0
+    )
+    assert merged["fingerprint"] != layout["fingerprint"]
+    lines = group_lines(statement_page("Mar", [("0122-0000", "Cash", "1.00", "2.00")]))
+    assert match_layout(lines, [merged]) is None
+    assert match_layout(lines, [merged, layout])[0] is layout
+
+    # A continuation page without the header is sliced from the top; its title fills one column
+    continuation = group_lines(words(20, (200, "Balance"), (250, "Sheet")) + words(70, (45, "0510-0000"), (440, "5.00")))
+    assert slice_rows(continuation, layout) == [["0510-0000", "", "", "5.00"]]
+
+
+def test_layouts_are_stored_per_property_and_counted_on_hits():
+    engine = create_engine("sqlite://")
+    StatementLayout.__table__.create(engine)
+    session = Session(bind=engine)
+    service = StatementLayoutService(session)
+    layout = learned_layout()
+
+    service.record(1, "balance_sheet", {"layout": layout, "layout_hit": False, "line_items": [{}]})
+    service.record(1, "balance_sheet", {"layout": layout, "layout_hit": True, "line_items": [{}]})
+    service.record(1, "balance_sheet", {"layout": layout, "layout_hit": True, "line_items": []})
+    session.commit()
+
+    assert service.get_layouts(1, "balance_sheet") == [layout]
+    assert service.get_layouts(1, "income_statement") == []
+    assert service.get_layouts(2, "balance_sheet") == []
+    assert session.query(StatementLayout).one().hit_count == 1
+
+
+class FakePage:
+    def __init__(self, words):
+        self.words = words
+
+    def extract_words(self):
+        return self.words
+
+    def find_tables(self):
+        return []
+
+    def extract_text(self):
+        return ""
+
+
+class FakePdf:
+    def __init__(self, *pages):
+        self.pages = [FakePage(words) for words in pages]
+
+
+def test_hit_that_would_drop_an_amount_falls_back_to_table_detection():
+    from app.utils.financial_table_parser import FinancialTableParser
+
+    parser = FinancialTableParser()
+    layout = learned_layout()
+    rows = [("0122-0000", "Cash Operating", "10,000.00", "12,345.67")]
+    pdf = FakePdf(statement_page("Feb", rows))
+    pages, used, hit, amount_rows = parser._read_pages(pdf, [layout])
+    assert (used, hit, amount_rows) == (layout, True, 1)
+
+    # A continuation line with only an amount fills one column and would be dropped
+    pdf = FakePdf(statement_page("Feb", rows) + words(200, (440, "7,500.00")))
+    pages, used, hit, _ = parser._read_pages(pdf, [layout])
+    assert hit is False and used is None
+
+
+def test_layout_is_only_learned_from_a_header_row():
+    from app.utils.financial_table_parser import FinancialTableParser
+
+    parser = FinancialTableParser()
+    assert parser._describe_statement_header([["Account", "Balance"], ["0122-0000 Cash", "1,000.00"]]) == (0, {})
+    assert parser._describe_statement_header([["Management Insurance", ""], ["0122-0000 Cash", "1,000.00"]]) == (None, {})
+    assert parser._describe_statement_header([["0122-0000 Cash", "1,000.00"]]) == (None, {})
+
+
+@pytest.mark.parametrize("document_type", ["balance_sheet", "income_statement", "cash_flow"])
+@pytest.mark.parametrize("repeat_headers", [True, False])
+def test_layout_hit_matches_full_parse(document_type, repeat_headers):
+    pytest.importorskip("pdfplumber")
+    pytest.importorskip("reportlab")
+    from app.utils.financial_table_parser import FinancialTableParser
+    from tests.performance.synthetic_statements import generate_statement
+
+    parser = FinancialTableParser()
+    extract = getattr(parser, {
+        "balance_sheet": "extract_balance_sheet_table",
+        "income_statement": "extract_income_statement_table",
+        "cash_flow": "extract_cash_flow_table",
+    }[document_type])
+    document = generate_statement(document_type, 150, column_headers=True, repeat_headers=repeat_headers)
+    assert document.pages > 1
+
+    full = extract(document.pdf_data)
+    hit = extract(document.pdf_data, layouts=[full["layout"]])
+
+    def amounts(result):
+        key = "amount" if document_type == "balance_sheet" else "period_amount"
+        return sorted((item["account_code"], item[key]) for item in result["line_items"] if item.get("account_code"))
+
+    assert hit["layout_hit"] is True
+    assert amounts(hit) == amounts(full)
+    assert len(amounts(hit)) == len(document.expected)
+
+    # Statements without a column header row learn no layout (and so never take the fast path)
+    assert extract(generate_statement(document_type, 60).pdf_data)["layout"] is None
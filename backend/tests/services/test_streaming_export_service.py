@@ -0,0 +1,87 @@
+import io
+from datetime import date
+
+import pytest
+from openpyxl import load_workbook
+
+from app.services.streaming_export_service import (
+    PYARROW_AVAILABLE,
+    STATEMENT_SPECS,
+    StreamingExportService,
+)
+
+
+def _rows(n):
+    for i in range(n):
+        yield ["ESP001", "Eastern Shore Plaza", 2024, (i % 12) + 1, f"4{i:03d}-0000", f"Account {i}", "Revenue", float(i), True]
+
+
+def test_headers_and_kinds_cover_every_statement_type():
+    for statement_type in STATEMENT_SPECS:
+        headers = StreamingExportService.get_headers(statement_type)
+        kinds = StreamingExportService.get_kinds(statement_type)
+        assert headers[:2] == ["Property Code", "Property Name"]
+        assert len(headers) == len(kinds)
+
+
+def test_validate_request_rejects_unknown_inputs():
+    with pytest.raises(ValueError):
+        StreamingExportService.validate_request(["balance_sheet"], "pdf")
+    with pytest.raises(ValueError):
+        StreamingExportService.validate_request(["general_ledger"], "csv")
+    with pytest.raises(ValueError):
+        StreamingExportService.validate_request([], "csv")
+
+
+def test_csv_chunks_stream_in_batches_and_report_progress():
+    headers = StreamingExportService.get_headers("balance_sheet")
+    progress = []
+
+    chunks = list(StreamingExportService.csv_chunks(headers, _rows(2500), chunk_rows=1000, progress_callback=progress.append))
+
+    assert chunks[0] == b'\xef\xbb\xbf'
+    body = b"".join(chunks[1:]).decode("utf-8").splitlines()
+    assert body[0].startswith("Property Code,Property Name")
+    assert len(body) == 2501
+    assert progress == [1000, 2000, 2500]
+
+
+def test_write_xlsx_uses_one_sheet_per_statement():
+    buffer = io.BytesIO()
+    sheets = [
+        ("Balance Sheet", StreamingExportService.get_headers("balance_sheet"), _rows(3)),
+        ("Income Statement", StreamingExportService.get_headers("income_statement"), iter([])),
+    ]
+
+    written = StreamingExportService.write_xlsx(buffer, sheets)
+
+    buffer.seek(0)
+    wb = load_workbook(buffer, read_only=True)
+    assert written == 3
+    assert wb.sheetnames == ["Balance Sheet", "Income Statement"]
+    rows = list(wb["Balance Sheet"].iter_rows(values_only=True))
+    assert rows[0][0] == "Property Code"
+    assert rows[1][4] == "4000-0000"
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow not installed")
+def test_write_parquet_round_trips_typed_columns():
+    import pyarrow.parquet as pq
+
+    headers = StreamingExportService.get_headers("rent_roll")
+    kinds = StreamingExportService.get_kinds("rent_roll")
+    rows = [
+        ["ESP001", "Eastern Shore Plaza", 2024, 12, "A-101", "Acme", date(2023, 1, 1), None, 1200.0, 2500.0, 30000.0, "occupied"]
+        for _ in range(25)
+    ]
+    buffer = io.BytesIO()
+
+    written = StreamingExportService.write_parquet(buffer, headers, kinds, rows, row_group_size=10)
+
+    buffer.seek(0)
+    parquet = pq.ParquetFile(buffer)
+    table = parquet.read()
+    assert written == 25
+    assert parquet.num_row_groups == 3
+    assert table.column("Lease Start")[0].as_py() == date(2023, 1, 1)
+    assert table.column("Monthly Rent")[0].as_py() == 2500.0
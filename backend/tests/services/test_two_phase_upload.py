@@ -0,0 +1,192 @@
+import hashlib
+import io
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from starlette.datastructures import Headers, UploadFile
+
+from app.db import minio_client
+from app.models.document_upload import DocumentUpload
+from app.models.financial_period import FinancialPeriod
+from app.models.property import Property
+from app.services import document_service, quota_service
+from app.services.document_service import DocumentService
+from app.services.document_type_detector import DocumentTypeDetector
+
+
+class RecordingMinio:
+    def __init__(self, read_size=5):
+        self.read_size = read_size
+        self.calls = []
+        self.received = b""
+
+    def put_object(self, bucket_name, object_name, data, length, part_size=0, content_type=None):
+        self.calls.append({"bucket": bucket_name, "object": object_name, "length": length, "part_size": part_size})
+        while True:
+            chunk = data.read(self.read_size)
+            if not chunk:
+                break
+            self.received += chunk
+
+
+def make_upload(name, body, content_type="application/pdf"):
+    return UploadFile(io.BytesIO(body), filename=name, headers=Headers({"content-type": content_type}))
+
+
+def test_upload_stream_hashes_while_streaming_multipart(monkeypatch):
+    fake = RecordingMinio()
+    monkeypatch.setattr(minio_client, "minio_client", fake)
+    monkeypatch.setattr(minio_client, "ensure_bucket_exists", lambda bucket_name: True)
+    body = b"%PDF-1.7 " + bytes(range(256)) * 3
+
+    stored = minio_client.upload_stream(io.BytesIO(body), "org/1/doc.pdf", "application/pdf", "bucket", part_size=5 * 1024 * 1024)
+
+    assert stored == {"file_hash": hashlib.sha256(body).hexdigest(), "file_size": len(body)}
+    assert fake.received == body
+    assert fake.calls[0]["length"] == -1
+    assert fake.calls[0]["part_size"] == 5 * 1024 * 1024
+
+
+async def test_bulk_prescan_runs_content_detection_concurrently(monkeypatch):
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def slow_detect(content, include_period=True):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.2)
+        with lock:
+            active["now"] -= 1
+        return {"detected_type": "balance_sheet", "confidence": 90, "size": len(content)}, (
+            {"year": 2024, "month": 1} if include_period else None
+        )
+
+    monkeypatch.setattr(document_service, "_detect_document_content", slow_detect)
+    files = [make_upload(f"Balance Sheet {m:02d}.2024.pdf", b"%PDF" + b"x" * m) for m in range(1, 7)]
+    files.append(make_upload("Income Statement.csv", b"a,b\n1,2\n", "text/csv"))
+    files.append(make_upload("notes.txt", b"not supported", "text/plain"))
+
+    service = DocumentService(db=None)
+    started = time.perf_counter()
+    scans = await service._prescan_bulk_files(files, DocumentTypeDetector(), max_concurrency=3)
+    elapsed = time.perf_counter() - started
+
+    assert active["peak"] == 3
+    assert elapsed < 0.6  # 6 files x 0.2s with 3 workers
+    assert [s["type_detection"]["size"] for s in scans[:6]] == [5, 6, 7, 8, 9, 10]
+    assert scans[0]["period_detection"] == {"year": 2024, "month": 1}
+    # CSV with a recognisable filename skips content detection but keeps its content
+    assert scans[6]["type_detection"] is None and scans[6]["content"] == b"a,b\n1,2\n"
+    # Unsupported formats are left to the per-file format validation
+    assert scans[7]["content"] is None
+    # Files remain readable for the per-file steps
+    assert await files[0].read() == b"%PDFx"
+
+
+async def test_bulk_prescan_captures_detection_errors(monkeypatch):
+    def broken(content, include_period=True):
+        raise ValueError("corrupt PDF")
+
+    monkeypatch.setattr(document_service, "_detect_document_content", broken)
+    scans = await DocumentService(db=None)._prescan_bulk_files(
+        [make_upload("Rent Roll Jan 2024.pdf", b"%PDF")], DocumentTypeDetector()
+    )
+    assert isinstance(scans[0]["error"], ValueError)
+    assert scans[0]["content"] == b"%PDF"
+
+
+async def test_bulk_scans_hold_one_window_of_contents(monkeypatch):
+    monkeypatch.setattr(document_service, "_detect_document_content", lambda content, include_period=True: (None, None))
+    files = [make_upload(f"Balance Sheet {m:02d}.2024.pdf", b"%PDF" + b"x" * m) for m in range(1, 8)]
+    service = DocumentService(db=None)
+    prescan = service._prescan_bulk_files
+    windows = []
+
+    async def recording_prescan(batch, detector, max_concurrency=4):
+        windows.append(len(batch))
+        return await prescan(batch, detector, max_concurrency)
+
+    service._prescan_bulk_files = recording_prescan
+    scans = []
+    async for file, scan in service._iter_bulk_scans(files, DocumentTypeDetector(), max_concurrency=2):
+        scans.append(scan)
+        assert scan["content"] == b"%PDF" + b"x" * len(scans)
+        assert sum(windows) <= len(scans) + 3  # never more than one window (2 x 2 files) ahead
+
+    assert windows == [4, 3]
+    assert all(scan["content"] is None for scan in scans)
+
+
+@pytest.fixture
+def upload_db(db_session, monkeypatch):
+    # Same partial unique index as migration 20260130_0010
+    db_session.execute(text(
+        "CREATE UNIQUE INDEX uq_document_uploads_org_prop_period_doctype_filehash "
+        "ON document_uploads (organization_id, property_id, period_id, document_type, file_hash) "
+        "WHERE file_hash IS NOT NULL"
+    ))
+    db_session.add(Property(id=1, organization_id=1, property_code="P1", property_name="One"))
+    db_session.add(FinancialPeriod(id=1, property_id=1, organization_id=1, period_year=2025, period_month=1,
+                                   period_start_date=date(2025, 1, 1), period_end_date=date(2025, 1, 31)))
+    db_session.commit()
+
+    stored = {}
+
+    def fake_upload_stream(stream, path, content_type, bucket):
+        body = stream.read()
+        stored[path] = body
+        return {"file_hash": hashlib.sha256(body).hexdigest(), "file_size": len(body)}
+
+    monkeypatch.setattr(document_service, "upload_stream", fake_upload_stream)
+    monkeypatch.setattr(minio_client, "download_file", lambda path, bucket: stored.get(path))
+    monkeypatch.setattr(minio_client, "delete_file", lambda path, bucket: stored.pop(path, None) is not None)
+    monkeypatch.setattr(quota_service, "decrement_document_count", lambda db, org_id: None)
+    monkeypatch.setattr(quota_service, "decrement_storage", lambda db, org_id, size: None)
+    return db_session, stored
+
+
+async def accept_and_validate(session, body, mismatch=None):
+    service = DocumentService(session)
+
+    async def validate_content(*args):
+        return mismatch
+
+    service._validate_document_content = validate_content
+    accepted = await service.accept_upload(
+        session.get(Property, 1), session.get(FinancialPeriod, 1), 2025, 1,
+        "balance_sheet", make_upload("Balance Sheet.pdf", body)
+    )
+    return accepted, await service.run_deferred_validation(accepted["upload_id"])
+
+
+async def test_deferred_upload_replaces_duplicate_under_file_hash_index(upload_db):
+    session, stored = upload_db
+    body = b"%PDF-1.7 same statement"
+
+    _, first = await accept_and_validate(session, body)
+    accepted, second = await accept_and_validate(session, body)
+
+    assert second["success"] and accepted["replaced"] == [first["upload_id"]]
+    uploads = session.query(DocumentUpload).all()
+    assert [u.id for u in uploads] == [second["upload_id"]]
+    assert uploads[0].file_hash == hashlib.sha256(body).hexdigest()
+    assert list(stored.values()) == [body]
+
+
+async def test_rejected_upload_releases_file_hash_slot(upload_db):
+    session, stored = upload_db
+    body = b"%PDF-1.7 statement for the wrong property"
+
+    _, rejected = await accept_and_validate(session, body, mismatch={"property_mismatch": True})
+    rejected_row = session.get(DocumentUpload, rejected["upload_id"])
+    assert (rejected_row.extraction_status, rejected_row.is_active, rejected_row.file_hash) == (
+        "validation_failed", False, None
+    )
+
+    accepted, validated = await accept_and_validate(session, body)
+    assert validated["success"] and accepted["replaced"] == []
+    assert session.get(DocumentUpload, accepted["upload_id"]).file_hash == hashlib.sha256(body).hexdigest()
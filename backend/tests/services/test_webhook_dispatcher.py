@@ -0,0 +1,122 @@
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+from app.services.webhook_dispatcher import (
+    EndpointTarget,
+    OutboxEvent,
+    WebhookDispatcher,
+)
+
+
+class FakeReceiver:
+    """Webhook receiver that records requests and peak concurrency."""
+
+    def __init__(self, status: int = 200, delay: float = 0.05):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.peak_active = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                with fake.lock:
+                    fake.active += 1
+                    fake.peak_active = max(fake.peak_active, fake.active)
+                    fake.requests.append((dict(self.headers), body))
+                time.sleep(fake.delay)
+                with fake.lock:
+                    fake.active -= 1
+                self.send_response(fake.status)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _events(endpoint_id: int, count: int, start: int = 1):
+    return [
+        OutboxEvent(id=i, endpoint_id=endpoint_id, event_type="alert_triggered", payload={"n": i}, attempts=0)
+        for i in range(start, start + count)
+    ]
+
+
+async def test_deliver_all_batches_and_signs_requests():
+    dispatcher = WebhookDispatcher(session_factory=lambda: None)
+    with FakeReceiver() as receiver:
+        endpoint = EndpointTarget(id=1, url=receiver.url, secret="s3cret", max_concurrency=2, max_batch_size=10)
+        async with dispatcher.create_client() as client:
+            results = await dispatcher.deliver_all(client, {1: endpoint}, _events(1, 35))
+
+    assert len(results) == 4
+    assert all(r.success for r in results)
+    assert sorted(len(r.event_ids) for r in results) == [5, 10, 10, 10]
+    assert receiver.peak_active <= 2
+
+    headers, body = receiver.requests[0]
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert headers["X-Webhook-Signature"] == expected
+    assert headers["X-Webhook-Event"] == "alert_triggered"
+    delivered = sorted(e["id"] for _, b in receiver.requests for e in json.loads(b)["events"])
+    assert delivered == list(range(1, 36))
+
+
+async def test_failed_delivery_reports_status_and_error():
+    dispatcher = WebhookDispatcher(session_factory=lambda: None)
+    with FakeReceiver(status=503) as receiver:
+        endpoint = EndpointTarget(id=7, url=receiver.url, secret="x")
+        async with dispatcher.create_client() as client:
+            result = await dispatcher.deliver_batch(client, endpoint, _events(7, 3))
+
+    assert not result.success
+    assert result.status_code == 503
+    assert result.event_ids == [1, 2, 3]
+    assert "503" in result.error
+
+
+async def test_unreachable_endpoint_is_network_error():
+    dispatcher = WebhookDispatcher(session_factory=lambda: None, request_timeout=1.0)
+    endpoint = EndpointTarget(id=1, url="http://127.0.0.1:9/hook", secret="x")
+    async with dispatcher.create_client() as client:
+        result = await dispatcher.deliver_batch(client, endpoint, _events(1, 1))
+
+    assert not result.success
+    assert result.status_code is None
+    assert result.error
+
+
+def test_backoff_uses_full_jitter_within_cap():
+    dispatcher = WebhookDispatcher(
+        session_factory=lambda: None,
+        base_backoff_seconds=2.0,
+        max_backoff_seconds=60.0,
+        rng=random.Random(42),
+    )
+    for attempts in range(1, 12):
+        ceiling = min(60.0, 2.0 * 2 ** (attempts - 1))
+        samples = [dispatcher.compute_backoff(attempts) for _ in range(200)]
+        assert all(0 <= s <= ceiling for s in samples)
+        assert max(samples) > ceiling * 0.5